@@ -0,0 +1,596 @@
+"""HTTP/1.1 client and server built on top of streams.
+
+The status line, request line and header parsing, as well as the
+formatting of request and response heads, are shared with http.client
+and http.server.
+"""
+
+__all__ = (
+    'HTTPClientConnection', 'HTTPClientResponse', 'open_http_connection',
+    'HTTPRequest', 'HTTPResponseWriter', 'start_http_server',
+)
+
+import http.client
+import http.server
+import io
+
+from . import streams
+from .log import logger
+
+
+_MAXLINE = 65536
+_HEAD_END = b'\r\n\r\n'
+
+# Size of the pieces returned when iterating over a message body.
+_READ_SIZE = 2 ** 16
+
+
+class _HeadSocket:
+    """Socket stand-in handing an already received head to http.client."""
+
+    def __init__(self, head):
+        self._head = head
+
+    def makefile(self, mode):
+        return io.BytesIO(self._head)
+
+
+async def _read_head(reader):
+    # Return the status or request line and the header lines, or b'' if the
+    # stream ended before a new message started.
+    try:
+        return await reader.readuntil(_HEAD_END)
+    except streams.IncompleteReadError as exc:
+        if not exc.partial.strip():
+            return b''
+        raise http.client.IncompleteRead(exc.partial)
+    except streams.LimitOverrunError:
+        raise http.client.LineTooLong('header line')
+
+
+class _BodyReader:
+    """Read a message body delimited by a length, chunks or end of stream.
+
+    Implements the same framing rules as http.client.HTTPResponse.
+    """
+
+    def __init__(self, reader, length=None, chunked=False):
+        self._reader = reader
+        self._length = length       # bytes left, or None up to EOF
+        self._chunked = chunked
+        self._chunk_left = None     # bytes left in the current chunk
+        self.eof = length == 0
+
+    async def read(self, n=-1):
+        """Read up to n bytes, or until the end of the body if n < 0.
+
+        Return at most one piece of the body if n >= 0, which is empty
+        only at the end of the body.
+        """
+        if n < 0:
+            chunks = []
+            while True:
+                data = await self.read(_READ_SIZE)
+                if not data:
+                    return b''.join(chunks)
+                chunks.append(data)
+        if self.eof or not n:
+            return b''
+        if self._chunked:
+            return await self._read_chunked(n)
+        if self._length is not None:
+            n = min(n, self._length)
+        data = await self._reader.read(n)
+        if self._length is not None:
+            if not data:
+                raise http.client.IncompleteRead(b'', self._length)
+            self._length -= len(data)
+            self.eof = not self._length
+        elif not data:
+            self.eof = True
+        return data
+
+    async def _read_chunked(self, n):
+        if not self._chunk_left:
+            if self._chunk_left is not None:
+                await self._readexactly(2)  # the CRLF at the end of the chunk
+            line = await self._readline('chunk size')
+            i = line.find(b';')
+            if i >= 0:
+                line = line[:i]  # strip chunk-extensions
+            try:
+                self._chunk_left = int(line, 16)
+            except ValueError:
+                raise http.client.IncompleteRead(b'')
+            if not self._chunk_left:
+                # last chunk: discard the trailer up to the CRLF terminator
+                while True:
+                    line = await self._readline('trailer line')
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                self.eof = True
+                return b''
+        data = await self._reader.read(min(n, self._chunk_left))
+        if not data:
+            raise http.client.IncompleteRead(b'', self._chunk_left)
+        self._chunk_left -= len(data)
+        return data
+
+    async def _readline(self, line_type):
+        try:
+            line = await self._reader.readuntil(b'\n')
+        except streams.IncompleteReadError as exc:
+            return exc.partial
+        except streams.LimitOverrunError:
+            raise http.client.LineTooLong(line_type)
+        if len(line) > _MAXLINE:
+            raise http.client.LineTooLong(line_type)
+        return line
+
+    async def _readexactly(self, n):
+        try:
+            return await self._reader.readexactly(n)
+        except streams.IncompleteReadError as exc:
+            raise http.client.IncompleteRead(exc.partial, n)
+
+    async def discard(self):
+        """Read and discard the rest of the body."""
+        while await self.read(_READ_SIZE):
+            pass
+
+
+class _BodyMixin:
+
+    async def read(self, n=-1):
+        """Read up to n bytes of the body, or all of it if n < 0.
+
+        With n >= 0, the data available is returned as soon as possible,
+        and b'' is only returned at the end of the body.
+        """
+        return await self._body.read(n)
+
+    def at_eof(self):
+        """Return True if the whole body has been read."""
+        return self._body.eof
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        data = await self._body.read(_READ_SIZE)
+        if not data:
+            raise StopAsyncIteration
+        return data
+
+
+def _is_chunked(transfer_encoding):
+    # RFC 7230 section 3.3.3: the message is chunked only if "chunked" is
+    # the last of the transfer codings; other codings are the body's
+    return transfer_encoding.rpartition(',')[2].strip().lower() == 'chunked'
+
+
+async def _write_body(writer, body, chunked):
+    # Send a request or response body given as a bytes-like object, or an
+    # iterable or asynchronous iterable of bytes-like objects.
+    if body is None:
+        pass
+    elif hasattr(body, '__aiter__'):
+        async for data in body:
+            await _write_chunk(writer, data, chunked)
+    elif isinstance(body, (bytes, bytearray, memoryview)):
+        await _write_chunk(writer, body, chunked)
+    else:
+        for data in body:
+            await _write_chunk(writer, data, chunked)
+    if chunked:
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+
+async def _write_chunk(writer, data, chunked):
+    if not data:
+        return
+    if chunked:
+        writer.write(b'%X\r\n' % len(data))
+        writer.write(data)
+        writer.write(b'\r\n')
+    else:
+        writer.write(data)
+    # flow control: wait until the transport's buffer has drained
+    await writer.drain()
+
+
+# Client
+
+class _RequestEncoder(http.client.HTTPConnection):
+    """Format request heads using the header logic of HTTPConnection."""
+
+    pipelining = True
+
+    def __init__(self, host, port, default_port):
+        self.default_port = default_port
+        super().__init__(host, port)
+        self.data = []
+
+    def send(self, data):
+        self.data.append(data)
+
+
+class HTTPClientResponse(_BodyMixin):
+    """The response to a request made with HTTPClientConnection.
+
+    The status line and headers are parsed by http.client.HTTPResponse,
+    and are available as the same attributes (status, reason, version,
+    headers, will_close).  The body is read with the read() coroutine, or
+    by iterating over the response with async for.
+    """
+
+    def __init__(self, reader, response):
+        self.status = response.status
+        self.reason = response.reason
+        self.version = response.version
+        self.headers = self.msg = response.headers
+        self.will_close = response.will_close
+        length = response.length
+        chunked = response.chunked
+        tr_enc = response.headers.get('transfer-encoding')
+        if tr_enc:
+            # http.client only recognizes a single "chunked" coding
+            chunked = _is_chunked(tr_enc)
+            length = 0 if response.length == 0 else None
+            # without chunked coding, the body ends with the connection
+            self.will_close = not chunked or response._check_close()
+        # without a length, the body extends up to the end of the stream
+        self._body = _BodyReader(reader, length, chunked)
+
+    def __repr__(self):
+        return '<%s %s %s>' % (type(self).__name__, self.status, self.reason)
+
+    def getheader(self, name, default=None):
+        """Return the value of the header matching name, or default."""
+        headers = self.headers.get_all(name)
+        if headers is None:
+            return default
+        return ', '.join(headers)
+
+
+class HTTPClientConnection:
+    """An HTTP/1.1 connection to a server, reused between requests.
+
+    Use open_http_connection() to create instances.  The connection is
+    re-established if the server closed it after the previous response.
+    """
+
+    def __init__(self, connect, host, port, default_port):
+        self._connect = connect
+        self.host = host
+        self.port = port
+        self._default_port = default_port
+        self._reader = self._writer = None
+        self._response = None
+
+    async def _open(self):
+        self._reader, self._writer = await self._connect()
+
+    async def request(self, method, url, body=None, headers={}):
+        """Send a request and return its HTTPClientResponse.
+
+        body may be None, a bytes-like object, a str (encoded to
+        ISO-8859-1), or an iterable or asynchronous iterable of bytes-like
+        objects, which is sent with the chunked transfer coding unless a
+        Content-Length header is given.
+
+        The unread part of the body of the previous response is discarded.
+        """
+        response = self._response
+        if response is not None:
+            self._response = None
+            if response.will_close:
+                self.close()
+            else:
+                await response._body.discard()
+        if self._writer is None:
+            await self._open()
+
+        if isinstance(body, str):
+            body = http.client._encode(body, 'body')
+        header_names = {name.lower() for name in headers}
+        chunked = False
+        encoder = _RequestEncoder(self.host, self.port, self._default_port)
+        if (body is None or
+                isinstance(body, (bytes, bytearray, memoryview))):
+            encoder.request(method, url, body, headers)
+            body = None
+        else:
+            if not header_names & {'content-length', 'transfer-encoding'}:
+                headers = dict(headers)
+                headers['Transfer-Encoding'] = 'chunked'
+                chunked = True
+            encoder.request(method, url, None, headers)
+        self._writer.write(b''.join(encoder.data))
+        try:
+            await _write_body(self._writer, body, chunked)
+            await self._writer.drain()
+            self._response = response = await self._read_response(method)
+        except:
+            self.close()
+            raise
+        return response
+
+    async def _read_response(self, method):
+        while True:
+            head = await _read_head(self._reader)
+            if not head:
+                raise http.client.RemoteDisconnected(
+                    'Remote end closed connection without response')
+            response = http.client.HTTPResponse(_HeadSocket(head),
+                                                method=method)
+            # skip informational responses such as "100 Continue"
+            version, status, reason = response._read_status()
+            if not 100 <= status < 200:
+                break
+        response = http.client.HTTPResponse(_HeadSocket(head), method=method)
+        response.begin()
+        return HTTPClientResponse(self._reader, response)
+
+    def close(self):
+        """Close the connection."""
+        self._response = None
+        writer = self._writer
+        if writer is not None:
+            self._reader = self._writer = None
+            writer.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+async def open_http_connection(host, port=None, *, ssl=None, loop=None,
+                               limit=streams._DEFAULT_LIMIT, **kwds):
+    """Connect to an HTTP server and return an HTTPClientConnection.
+
+    The arguments are those of open_connection(); port defaults to 80, or
+    443 if ssl is given.
+    """
+    default_port = http.client.HTTPS_PORT if ssl else http.client.HTTP_PORT
+    if port is None:
+        port = default_port
+
+    def connect():
+        return streams.open_connection(host, port, ssl=ssl, loop=loop,
+                                       limit=limit, **kwds)
+
+    conn = HTTPClientConnection(connect, host, port, default_port)
+    await conn._open()
+    return conn
+
+
+# Server
+
+class _RequestParser(http.server.BaseHTTPRequestHandler):
+    """Parse request heads and format response heads like http.server.
+
+    The output is collected in wfile, to be written to the transport.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # always send a status line and headers, even in error responses
+    # to malformed requests
+    default_request_version = 'HTTP/1.0'
+
+    def __init__(self, head, client_address):
+        self.client_address = client_address
+        self.rfile = io.BytesIO(head)
+        self.wfile = io.BytesIO()
+        self.raw_requestline = self.rfile.readline(_MAXLINE + 1)
+
+    def take_output(self):
+        data = self.wfile.getvalue()
+        self.wfile.seek(0)
+        self.wfile.truncate()
+        return data
+
+    def address_string(self):
+        if isinstance(self.client_address, tuple):
+            return str(self.client_address[0])
+        return str(self.client_address)
+
+    def log_message(self, format, *args):
+        logger.debug('%s - %s', self.address_string(), format % args)
+
+
+class HTTPRequest(_BodyMixin):
+    """A request received by a server started with start_http_server().
+
+    The method, path, request_version and headers attributes are parsed
+    by http.server.BaseHTTPRequestHandler.  The body is read with the
+    read() coroutine, or by iterating over the request with async for.
+    """
+
+    def __init__(self, parser, reader, body_length, chunked):
+        self.method = parser.command
+        self.path = parser.path
+        self.request_version = parser.request_version
+        self.headers = parser.headers
+        self.client_address = parser.client_address
+        self._body = _BodyReader(reader, body_length, chunked)
+
+    def __repr__(self):
+        return '<%s %s %s>' % (type(self).__name__, self.method, self.path)
+
+
+class HTTPResponseWriter:
+    """Send the response to an HTTPRequest.
+
+    The send_response(), send_header(), end_headers() and send_error()
+    methods are those of http.server.BaseHTTPRequestHandler.  Unless a
+    Content-Length header is sent, the body of an HTTP/1.1 response is
+    sent with the chunked transfer coding.
+    """
+
+    def __init__(self, parser, writer):
+        self._parser = parser
+        self._writer = writer
+        self._chunked = False
+        self._has_length = False
+        self._started = False       # has send_response() been called?
+        self.headers_sent = False
+        self.finished = False
+
+    @property
+    def close_connection(self):
+        return self._parser.close_connection
+
+    def send_response(self, code, message=None):
+        """Start the response with a status line and the standard headers."""
+        self._started = True
+        self._code = code
+        self._parser.send_response(code, message)
+
+    def send_header(self, keyword, value):
+        """Add a header to the response head."""
+        name = keyword.lower()
+        if name == 'content-length':
+            self._has_length = True
+        elif name == 'transfer-encoding':
+            self._chunked = _is_chunked(value)
+            self._has_length = True
+            if not self._chunked:
+                # the end of the body is marked by closing the connection
+                self._parser.close_connection = True
+        self._parser.send_header(keyword, value)
+
+    def end_headers(self):
+        """End the response head and send it."""
+        parser = self._parser
+        if (not self._has_length and self._code >= 200 and
+                self._code not in (204, 304) and
+                parser.command != 'HEAD'):
+            if parser.request_version >= 'HTTP/1.1':
+                parser.send_header('Transfer-Encoding', 'chunked')
+                self._chunked = True
+            else:
+                # the end of the body is marked by closing the connection
+                parser.close_connection = True
+        parser.end_headers()
+        self.headers_sent = True
+        self._writer.write(parser.take_output())
+
+    def send_error(self, code, message=None, explain=None):
+        """Send a complete error response; the connection is closed."""
+        self._started = self.headers_sent = self.finished = True
+        self._parser.send_error(code, message, explain)
+        self._writer.write(self._parser.take_output())
+
+    async def write(self, data):
+        """Send a piece of the body, waiting for the transport to drain."""
+        if not self.headers_sent:
+            raise RuntimeError('end_headers() must be called before write()')
+        if self.finished:
+            raise RuntimeError('the response is already finished')
+        if self._parser.command == 'HEAD':
+            return
+        await _write_chunk(self._writer, data, self._chunked)
+
+    async def finish(self):
+        """End the response body.  Called after the handler returns."""
+        if self.finished:
+            return
+        if not self._started:
+            self.send_response(http.HTTPStatus.NO_CONTENT)
+        if not self.headers_sent:
+            self.end_headers()
+        self.finished = True
+        if self._chunked and self._parser.command != 'HEAD':
+            self._writer.write(b'0\r\n\r\n')
+        await self._writer.drain()
+
+
+async def _serve_connection(handler, reader, writer):
+    client_address = writer.get_extra_info('peername')
+    try:
+        while True:
+            try:
+                head = await _read_head(reader)
+            except http.client.IncompleteRead:
+                # the client closed the connection in the middle of the head
+                break
+            except http.client.LineTooLong:
+                parser = _RequestParser(b'', client_address)
+                parser.request_version = 'HTTP/1.1'
+                parser.command = None
+                parser.requestline = ''
+                parser.send_error(
+                    http.HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+                writer.write(parser.take_output())
+                break
+            if not head:
+                break
+            parser = _RequestParser(head, client_address)
+            if not parser.parse_request():
+                writer.write(parser.take_output())
+                break
+            # a "100 Continue" response, if the client expects it
+            writer.write(parser.take_output())
+
+            headers = parser.headers
+            tr_enc = headers.get('transfer-encoding')
+            chunked = bool(tr_enc)
+            if chunked and not _is_chunked(tr_enc):
+                # the length of the request body cannot be determined
+                parser.send_error(http.HTTPStatus.BAD_REQUEST,
+                                  'Bad Transfer-Encoding')
+                writer.write(parser.take_output())
+                break
+            length = None if chunked else 0
+            if not chunked and headers.get('content-length'):
+                try:
+                    length = int(headers['content-length'])
+                    if length < 0:
+                        raise ValueError
+                except ValueError:
+                    parser.send_error(http.HTTPStatus.BAD_REQUEST,
+                                      'Bad Content-Length')
+                    writer.write(parser.take_output())
+                    break
+            request = HTTPRequest(parser, reader, length, chunked)
+            response = HTTPResponseWriter(parser, writer)
+            try:
+                await handler(request, response)
+            except (ConnectionError, http.client.IncompleteRead):
+                break
+            except Exception:
+                logger.exception('Error in HTTP request handler for %r',
+                                 request)
+                if response.headers_sent:
+                    # the response can't be completed
+                    break
+                response.send_error(http.HTTPStatus.INTERNAL_SERVER_ERROR)
+            await response.finish()
+            if response.close_connection:
+                break
+            # make the connection ready for the next request
+            await request._body.discard()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_http_server(handler, host=None, port=None, *, loop=None,
+                            limit=streams._DEFAULT_LIMIT, **kwds):
+    """Start an HTTP/1.1 server with persistent connections.
+
+    handler is a coroutine function called with an HTTPRequest and an
+    HTTPResponseWriter for each request; the response is finished when it
+    returns.  The other arguments are those of start_server(), and the
+    return value is the same Server object.
+    """
+    async def client_connected(reader, writer):
+        await _serve_connection(handler, reader, writer)
+
+    return await streams.start_server(client_connected, host, port,
+                                      loop=loop, limit=limit, **kwds)
@@ -25,13 +25,19 @@ runctx.__doc__ = _pyprofile.runctx.__doc__
 # ____________________________________________________________
 
 class Profile(_lsprof.Profiler):
-    """Profile(timer=None, timeunit=None, subcalls=True, builtins=True)
+    """Profile(timer=None, timeunit=None, subcalls=True, builtins=True,
+               allthreads=False, taskfunc=None)
 
     Builds a profiler object using the specified timer function.
     The default timer is a fast built-in one based on real time.
     For custom timer functions returning integers, timeunit can
     be a float specifying a scale (i.e. how long each integer unit
     is, in seconds).
+    If allthreads is true, the profiler is enabled in all the threads
+    rather than only in the calling one.  If taskfunc is given, it is
+    called without arguments when a coroutine starts running to get the
+    current task (e.g. asyncio.current_task), to which the time spent
+    in the coroutine is attributed.
     """
 
     # Most of the functionality is in the base class.
@@ -51,8 +57,11 @@ class Profile(_lsprof.Profiler):
         self.disable()
         self.snapshot_stats()
 
-    def snapshot_stats(self):
+    def snapshot_stats(self, reset=False):
         entries = self.getstats()
+        if reset:
+            # Start a new period without stopping the profiler
+            self.reset()
         self.stats = {}
         callersdicts = {}
         # call information
@@ -15,6 +15,7 @@ import sys
 import importlib.util
 import py_compile
 import struct
+import time
 
 try:
     from concurrent.futures import ProcessPoolExecutor
@@ -22,7 +23,17 @@ except ImportError:
     ProcessPoolExecutor = None
 from functools import partial
 
-__all__ = ["compile_dir","compile_file","compile_path"]
+__all__ = ["compile_dir","compile_file","compile_path","write_manifest",
+           "read_cache","write_cache"]
+
+# The incremental compilation cache maps the absolute paths of the source
+# files to (cfile, dfile, invalidation mode, mtime, size, source hash) tuples,
+# recorded when the source file was compiled to cfile.
+_CACHE_TAG = 'compileall'
+_CACHE_VERSION = 1
+
+# Maximum number of files sent at once to a worker process.
+_MAX_CHUNKSIZE = 64
 
 def _walk_dir(dir, ddir=None, maxlevels=10, quiet=0):
     if quiet < 2 and isinstance(dir, os.PathLike):
@@ -53,7 +64,8 @@ def _walk_dir(dir, ddir=None, maxlevels=10, quiet=0):
 
 def compile_dir(dir, maxlevels=10, ddir=None, force=False, rx=None,
                 quiet=0, legacy=False, optimize=-1, workers=1,
-                invalidation_mode=py_compile.PycInvalidationMode.TIMESTAMP):
+                invalidation_mode=py_compile.PycInvalidationMode.TIMESTAMP,
+                cache=None, stats=None):
     """Byte-compile all modules in the given directory tree.
 
     Arguments (only dir is required):
@@ -69,6 +81,9 @@ def compile_dir(dir, maxlevels=10, ddir=None, force=False, rx=None,
     optimize:  optimization level or -1 for level of the interpreter
     workers:   maximum number of parallel workers
     invalidation_mode: how the up-to-dateness of the pyc will be checked
+    cache:     incremental compilation cache, as returned by read_cache()
+    stats:     if given, a dict in which to count the compiled, up to date
+               and failed files
     """
     if workers is not None and workers < 0:
         raise ValueError('workers must be greater or equal to 0')
@@ -78,25 +93,103 @@ def compile_dir(dir, maxlevels=10, ddir=None, force=False, rx=None,
     success = True
     if workers is not None and workers != 1 and ProcessPoolExecutor is not None:
         workers = workers or None
+        files = list(files)
+        # Send the files in chunks to limit the overhead of the inter-process
+        # communication, while keeping several chunks per worker to balance
+        # the load.
+        chunksize = len(files) // ((workers or os.cpu_count() or 1) * 4)
+        chunksize = max(1, min(chunksize, _MAX_CHUNKSIZE))
+        kwargs = dict(ddir=ddir, force=force, rx=rx, quiet=quiet,
+                      legacy=legacy, optimize=optimize,
+                      invalidation_mode=invalidation_mode)
         with ProcessPoolExecutor(max_workers=workers) as executor:
-            results = executor.map(partial(compile_file,
-                                           ddir=ddir, force=force,
-                                           rx=rx, quiet=quiet,
-                                           legacy=legacy,
-                                           optimize=optimize,
-                                           invalidation_mode=invalidation_mode),
-                                   files)
-            success = min(results, default=True)
+            if cache is None and stats is None:
+                results = executor.map(partial(compile_file, **kwargs),
+                                       files, chunksize=chunksize)
+                success = min(results, default=True)
+            else:
+                # The workers return the updated cache entries and counts,
+                # which are merged here.
+                keys = [os.path.abspath(file) for file in files]
+                entries = [None if cache is None else cache.get(key)
+                           for key in keys]
+                results = executor.map(partial(_compile_file_worker,
+                                               use_cache=cache is not None,
+                                               **kwargs),
+                                       files, entries, chunksize=chunksize)
+                for key, (ok, entry, counts) in zip(keys, results):
+                    if not ok:
+                        success = False
+                    if cache is not None:
+                        if entry is None:
+                            cache.pop(key, None)
+                        else:
+                            cache[key] = entry
+                    if stats is not None:
+                        for name, count in counts.items():
+                            stats[name] = stats.get(name, 0) + count
     else:
         for file in files:
             if not compile_file(file, ddir, force, rx, quiet,
-                                legacy, optimize, invalidation_mode):
+                                legacy, optimize, invalidation_mode,
+                                cache=cache, stats=stats):
                 success = False
     return success
 
+def _compile_file_worker(fullname, entry, use_cache, **kwargs):
+    # Compile a file in a worker process, with a cache holding only its
+    # entry.  Return the result, the new cache entry and the counts.
+    key = os.path.abspath(fullname)
+    cache = None
+    if use_cache:
+        cache = {} if entry is None else {key: entry}
+    stats = {}
+    ok = compile_file(fullname, cache=cache, stats=stats, **kwargs)
+    return ok, None if cache is None else cache.get(key), stats
+
+def _count(stats, name):
+    if stats is not None:
+        stats[name] = stats.get(name, 0) + 1
+
+def _cache_entry(key, st, cfile, dfile, invalidation_mode, source_hash=None):
+    if source_hash is None:
+        with open(key, 'rb') as f:
+            source_hash = importlib.util.source_hash(f.read())
+    return (cfile, dfile, invalidation_mode.value, st.st_mtime, st.st_size,
+            source_hash)
+
+def _cache_up_to_date(cache, key, st, cfile, dfile, invalidation_mode):
+    """Check the cache entry of the source file key, without opening cfile.
+
+    The entry is up to date if the source file has not changed since it was
+    compiled to cfile in the same way.  Hash-based pycs stay valid as long
+    as the contents of the source file are the same, whatever its mtime.
+    """
+    try:
+        e_cfile, e_dfile, mode, mtime, size, source_hash = cache[key]
+    except (KeyError, TypeError, ValueError):
+        return False
+    if ((e_cfile, e_dfile, mode) != (cfile, dfile, invalidation_mode.value)
+            or not os.path.isfile(cfile)):
+        return False
+    if mtime == st.st_mtime and size == st.st_size:
+        return True
+    if (invalidation_mode == py_compile.PycInvalidationMode.TIMESTAMP
+            or size != st.st_size):
+        return False
+    try:
+        entry = _cache_entry(key, st, cfile, dfile, invalidation_mode)
+    except OSError:
+        return False
+    if entry[-1] != source_hash:
+        return False
+    cache[key] = entry
+    return True
+
 def compile_file(fullname, ddir=None, force=False, rx=None, quiet=0,
                  legacy=False, optimize=-1,
-                 invalidation_mode=py_compile.PycInvalidationMode.TIMESTAMP):
+                 invalidation_mode=py_compile.PycInvalidationMode.TIMESTAMP,
+                 cache=None, stats=None):
     """Byte-compile one file.
 
     Arguments (only fullname is required):
@@ -110,6 +203,11 @@ def compile_file(fullname, ddir=None, force=False, rx=None, quiet=0,
     legacy:    if True, produce legacy pyc paths instead of PEP 3147 paths
     optimize:  optimization level or -1 for level of the interpreter
     invalidation_mode: how the up-to-dateness of the pyc will be checked
+    cache:     incremental compilation cache, as returned by read_cache();
+               the file is skipped if its entry is up to date, and the entry
+               is updated once the file is compiled
+    stats:     if given, a dict in which to count the compiled, up to date
+               and failed files
     """
     success = True
     if quiet < 2 and isinstance(fullname, os.PathLike):
@@ -136,6 +234,19 @@ def compile_file(fullname, ddir=None, force=False, rx=None, quiet=0,
             cache_dir = os.path.dirname(cfile)
         head, tail = name[:-3], name[-3:]
         if tail == '.py':
+            st = None
+            if cache is not None:
+                key = os.path.abspath(fullname)
+                try:
+                    st = os.stat(fullname)
+                except OSError:
+                    cache.pop(key, None)
+                else:
+                    if not force and _cache_up_to_date(cache, key, st, cfile,
+                                                       dfile,
+                                                       invalidation_mode):
+                        _count(stats, 'up_to_date')
+                        return success
             if not force:
                 try:
                     mtime = int(os.stat(fullname).st_mtime)
@@ -144,9 +255,24 @@ def compile_file(fullname, ddir=None, force=False, rx=None, quiet=0,
                     with open(cfile, 'rb') as chandle:
                         actual = chandle.read(12)
                     if expect == actual:
+                        if (st is not None and invalidation_mode ==
+                                py_compile.PycInvalidationMode.TIMESTAMP):
+                            cache[key] = _cache_entry(key, st, cfile, dfile,
+                                                      invalidation_mode)
+                        _count(stats, 'up_to_date')
                         return success
                 except OSError:
                     pass
+            entry = None
+            if st is not None:
+                # Hash the source before compiling it: if it is modified
+                # meanwhile, the entry will not match on the next run.
+                cache.pop(key, None)
+                try:
+                    entry = _cache_entry(key, st, cfile, dfile,
+                                         invalidation_mode)
+                except OSError:
+                    pass
             if not quiet:
                 print('Compiling {!r}...'.format(fullname))
             try:
@@ -155,6 +281,7 @@ def compile_file(fullname, ddir=None, force=False, rx=None, quiet=0,
                                         invalidation_mode=invalidation_mode)
             except py_compile.PyCompileError as err:
                 success = False
+                _count(stats, 'failed')
                 if quiet >= 2:
                     return success
                 elif quiet:
@@ -168,6 +295,7 @@ def compile_file(fullname, ddir=None, force=False, rx=None, quiet=0,
                 print(msg)
             except (SyntaxError, UnicodeError, OSError) as e:
                 success = False
+                _count(stats, 'failed')
                 if quiet >= 2:
                     return success
                 elif quiet:
@@ -178,11 +306,17 @@ def compile_file(fullname, ddir=None, force=False, rx=None, quiet=0,
             else:
                 if ok == 0:
                     success = False
+                    _count(stats, 'failed')
+                else:
+                    _count(stats, 'compiled')
+                    if entry is not None:
+                        cache[key] = entry
     return success
 
 def compile_path(skip_curdir=1, maxlevels=0, force=False, quiet=0,
                  legacy=False, optimize=-1,
-                 invalidation_mode=py_compile.PycInvalidationMode.TIMESTAMP):
+                 invalidation_mode=py_compile.PycInvalidationMode.TIMESTAMP,
+                 cache=None, stats=None):
     """Byte-compile all module on sys.path.
 
     Arguments (all optional):
@@ -194,6 +328,8 @@ def compile_path(skip_curdir=1, maxlevels=0, force=False, quiet=0,
     legacy: as for compile_dir() (default False)
     optimize: as for compile_dir() (default -1)
     invalidation_mode: as for compiler_dir()
+    cache: as for compile_dir() (default None)
+    stats: as for compile_dir() (default None)
     """
     success = True
     for dir in sys.path:
@@ -210,10 +346,76 @@ def compile_path(skip_curdir=1, maxlevels=0, force=False, quiet=0,
                 legacy=legacy,
                 optimize=optimize,
                 invalidation_mode=invalidation_mode,
+                cache=cache,
+                stats=stats,
             )
     return success
 
 
+def read_cache(filename):
+    """Read an incremental compilation cache.
+
+    Return an empty cache if filename does not exist or was written by
+    another version of Python.
+    """
+    import marshal
+    try:
+        with open(filename, 'rb') as f:
+            tag, version, (magic, cache) = marshal.load(f)
+    except (FileNotFoundError, EOFError, ValueError, TypeError):
+        return {}
+    if (tag != _CACHE_TAG or version != _CACHE_VERSION or
+            magic != importlib.util.MAGIC_NUMBER or
+            not isinstance(cache, dict)):
+        return {}
+    return cache
+
+def write_cache(filename, cache):
+    """Write an incremental compilation cache, as updated by compile_dir(),
+    compile_file() or compile_path()."""
+    from importlib._bootstrap_external import _write_atomic
+    import marshal
+    data = marshal.dumps((_CACHE_TAG, _CACHE_VERSION,
+                          (importlib.util.MAGIC_NUMBER, cache)))
+    _write_atomic(os.fspath(filename), data)
+
+
+def write_manifest(filename, pycs):
+    """Write a manifest of trusted bytecode files.
+
+    Arguments:
+
+    filename: the manifest file to write
+    pycs:     the cached bytecode files trusted at import time, without
+              checking their source files, when the manifest is named by
+              the -X pycmanifest option or the PYTHONPYCMANIFEST
+              environment variable
+    """
+    from importlib._bootstrap_external import (_PYC_MANIFEST_TAG,
+                                               _PYC_MANIFEST_VERSION,
+                                               _write_atomic)
+    import marshal
+    pycs = frozenset(os.path.abspath(os.fspath(pyc)) for pyc in pycs)
+    data = marshal.dumps((_PYC_MANIFEST_TAG, _PYC_MANIFEST_VERSION, pycs))
+    _write_atomic(os.fspath(filename), data)
+
+def _manifest_pycs(dests, maxlevels, rx=None):
+    """Yield the cached bytecode files of the source files of dests, at the
+    optimization level of the interpreter."""
+    for dest in dests:
+        if os.path.isfile(dest):
+            files = [dest]
+        else:
+            files = _walk_dir(dest, maxlevels=maxlevels, quiet=2)
+        for fullname in files:
+            if not fullname.endswith('.py'):
+                continue
+            if rx is not None and rx.search(fullname):
+                continue
+            cfile = importlib.util.cache_from_source(fullname)
+            if os.path.isfile(cfile):
+                yield cfile
+
 def main():
     """Script main program."""
     import argparse
@@ -258,9 +460,23 @@ def main():
     parser.add_argument('--invalidation-mode', default='timestamp',
                         choices=sorted(invalidation_modes),
                         help='How the pycs will be invalidated at runtime')
+    parser.add_argument('--manifest', metavar='FILE', default=None,
+                        help=('write a manifest of the compiled files to '
+                              'FILE, for their pycs to be loaded without '
+                              'checking the source files when FILE is given '
+                              'by -X pycmanifest or PYTHONPYCMANIFEST'))
+    parser.add_argument('--cache', metavar='FILE', default=None,
+                        help=('skip the files unchanged since they were '
+                              'compiled according to the incremental '
+                              'compilation cache FILE, and update it'))
+    parser.add_argument('--stats', action='store_true',
+                        help=('print the numbers of compiled, up to date and '
+                              'failed files, and the elapsed time'))
 
     args = parser.parse_args()
     compile_dests = args.compile_dest
+    if args.manifest and args.legacy:
+        parser.error('--manifest cannot be used with -b')
 
     if args.rx:
         import re
@@ -289,6 +505,12 @@ def main():
     ivl_mode = args.invalidation_mode.replace('-', '_').upper()
     invalidation_mode = py_compile.PycInvalidationMode[ivl_mode]
 
+    cache = None
+    if args.cache:
+        cache = read_cache(args.cache)
+    stats = {} if args.stats else None
+    start = time.perf_counter()
+
     success = True
     try:
         if compile_dests:
@@ -296,24 +518,59 @@ def main():
                 if os.path.isfile(dest):
                     if not compile_file(dest, args.ddir, args.force, args.rx,
                                         args.quiet, args.legacy,
-                                        invalidation_mode=invalidation_mode):
+                                        invalidation_mode=invalidation_mode,
+                                        cache=cache, stats=stats):
                         success = False
                 else:
                     if not compile_dir(dest, maxlevels, args.ddir,
                                        args.force, args.rx, args.quiet,
                                        args.legacy, workers=args.workers,
-                                       invalidation_mode=invalidation_mode):
+                                       invalidation_mode=invalidation_mode,
+                                       cache=cache, stats=stats):
                         success = False
-            return success
         else:
-            return compile_path(legacy=args.legacy, force=args.force,
-                                quiet=args.quiet,
-                                invalidation_mode=invalidation_mode)
+            success = compile_path(legacy=args.legacy, force=args.force,
+                                   quiet=args.quiet,
+                                   invalidation_mode=invalidation_mode,
+                                   cache=cache, stats=stats)
+            compile_dests = [dir for dir in sys.path
+                             if dir and dir != os.curdir]
+            maxlevels = 0
     except KeyboardInterrupt:
         if args.quiet < 2:
             print("\n[interrupted]")
         return False
-    return True
+    finally:
+        # Keep the entries of the files compiled before an interruption.
+        if cache is not None:
+            try:
+                write_cache(args.cache, cache)
+            except OSError as e:
+                if args.quiet < 2:
+                    print("Error writing the cache {!r}: {}".format(
+                        args.cache, e))
+                success = False
+    if stats is not None and not args.quiet:
+        print("{} compiled, {} up to date, {} failed in {:.2f} sec".format(
+            stats.get('compiled', 0), stats.get('up_to_date', 0),
+            stats.get('failed', 0), time.perf_counter() - start))
+    if args.manifest:
+        # A failed compilation may leave an outdated pyc behind, which must
+        # not be trusted.
+        if not success:
+            if args.quiet < 2:
+                print("Not writing the manifest {!r}: compilation "
+                      "failed".format(args.manifest))
+            return False
+        try:
+            write_manifest(args.manifest,
+                           _manifest_pycs(compile_dests, maxlevels, args.rx))
+        except OSError as e:
+            if args.quiet < 2:
+                print("Error writing the manifest {!r}: {}".format(
+                    args.manifest, e))
+            return False
+    return success
 
 
 if __name__ == '__main__':
@@ -85,7 +85,7 @@ __all__ = ["HTTPResponse", "HTTPConnection",
            "IncompleteRead", "InvalidURL", "ImproperConnectionState",
            "CannotSendRequest", "CannotSendHeader", "ResponseNotReady",
            "BadStatusLine", "LineTooLong", "RemoteDisconnected", "error",
-           "responses"]
+           "responses", "request_many"]
 
 HTTP_PORT = 80
 HTTPS_PORT = 443
@@ -108,6 +108,10 @@ responses = {v: v.phrase for v in http.HTTPStatus.__members__.values()}
 # maximal amount of data to read at one time in _safe_read
 MAXAMOUNT = 1048576
 
+# maximal amount of raw data fed at one time to a content decoder, and
+# default amount of decoded data returned by read1() and peek()
+_DECODE_BLOCKSIZE = 65536
+
 # maximal line length when calling readline().
 _MAXLINE = 65536
 _MAXHEADERS = 100
@@ -144,6 +148,10 @@ _is_illegal_header_value = re.compile(rb'\n(?![ \t])|\r(?![ \t\n])').search
 # servers will otherwise respond with a 411
 _METHODS_EXPECTING_BODY = {'PATCH', 'POST', 'PUT'}
 
+# Requests using these methods can safely be sent again when the server
+# closed a pipelined connection before answering them (RFC 7231, 4.2.2)
+_IDEMPOTENT_METHODS = {'DELETE', 'GET', 'HEAD', 'OPTIONS', 'PUT', 'TRACE'}
+
 
 def _encode(data, name='data'):
     """Call data.encode("latin-1") but show a better error message."""
@@ -214,6 +222,119 @@ def parse_headers(fp, _class=HTTPMessage):
     return email.parser.Parser(_class=_class).parsestr(hstring)
 
 
+class _ZlibDecoder:
+    """Decompressor for the "gzip" and "deflate" content codings.
+
+    Provides the max_length, needs_input and eof interface of
+    bz2.BZ2Decompressor and lzma.LZMADecompressor on top of
+    zlib.decompressobj().
+    """
+
+    def __init__(self, wbits, raw_fallback=False):
+        import zlib
+        self._zlib = zlib
+        self._obj = zlib.decompressobj(wbits)
+        # Many servers send raw deflate data instead of the zlib format
+        # required for the "deflate" coding; keep the head of the stream
+        # around to retry it as raw deflate.
+        self._head = b'' if raw_fallback else None
+        self.needs_input = True
+
+    @property
+    def eof(self):
+        return self._obj.eof
+
+    def decompress(self, data, max_length=-1):
+        tail = self._obj.unconsumed_tail
+        if tail:
+            data = tail + data
+        max_length = max(max_length, 0)
+        if self._head is not None:
+            self._head += data
+            try:
+                result = self._obj.decompress(data, max_length)
+            except self._zlib.error:
+                self._obj = self._zlib.decompressobj(-self._zlib.MAX_WBITS)
+                result = self._obj.decompress(self._head, max_length)
+                self._head = None
+            if result:
+                self._head = None
+        else:
+            result = self._obj.decompress(data, max_length)
+        self.needs_input = not (self._obj.unconsumed_tail or
+                                max_length and len(result) >= max_length)
+        return result
+
+class _MultiDecoder:
+    """Decompressor for several content codings applied one after the
+    other, given by a Content-Encoding list such as "deflate, gzip".
+    """
+
+    def __init__(self, decoders):
+        # in the order of the decoding, the reverse of the header's one
+        self._decoders = decoders
+
+    @property
+    def eof(self):
+        return self._decoders[-1].eof
+
+    @property
+    def needs_input(self):
+        return self._decoders[-1].needs_input
+
+    def decompress(self, data, max_length=-1):
+        *inner, last = self._decoders
+        for decoder in inner:
+            # only the last decoder limits its output
+            data = decoder.decompress(data) if not decoder.eof else b''
+        return last.decompress(data, max_length)
+
+def _make_decoder(content_encoding):
+    """Return a decompressor for the Content-Encoding header value, or
+    None if it contains no coding or an unsupported one."""
+    codings = [coding.strip().lower()
+               for coding in content_encoding.split(',')]
+    decoders = []
+    for coding in reversed(codings):
+        if coding in ('', 'identity'):
+            continue
+        decoder = _make_coding_decoder(coding)
+        if decoder is None:
+            return None
+        decoders.append(decoder)
+    if not decoders:
+        return None
+    if len(decoders) == 1:
+        return decoders[0]
+    return _MultiDecoder(decoders)
+
+def _make_coding_decoder(coding):
+    """Return a decompressor for the content coding, or None."""
+    try:
+        if coding in ('gzip', 'x-gzip'):
+            return _ZlibDecoder(16 + 15)
+        if coding == 'deflate':
+            return _ZlibDecoder(15, raw_fallback=True)
+        if coding in ('bzip2', 'x-bzip2'):
+            import bz2
+            return bz2.BZ2Decompressor()
+        if coding in ('xz', 'x-xz', 'lzma'):
+            import lzma
+            return lzma.LZMADecompressor()
+    except ImportError:
+        pass
+    return None
+
+def _accept_encoding():
+    """Return the Accept-Encoding header value used with decode_content."""
+    codings = []
+    for coding in ('gzip', 'deflate'):
+        if _make_coding_decoder(coding) is not None:
+            codings.append(coding)
+    codings.append('identity')
+    return ', '.join(codings)
+
+
 class HTTPResponse(io.BufferedIOBase):
 
     # See RFC 2616 sec 19.6 and RFC 1945 sec 6 for details.
@@ -223,7 +344,8 @@ class HTTPResponse(io.BufferedIOBase):
     # text following RFC 2047.  The basic status line parsing only
     # accepts iso-8859-1.
 
-    def __init__(self, sock, debuglevel=0, method=None, url=None):
+    def __init__(self, sock, debuglevel=0, method=None, url=None, *,
+                 decode_content=False):
         # If the response includes a content-length header, we need to
         # make sure that the client doesn't read more than the
         # specified number of bytes.  If it does, it will block until
@@ -234,6 +356,9 @@ class HTTPResponse(io.BufferedIOBase):
         self.fp = sock.makefile("rb")
         self.debuglevel = debuglevel
         self._method = method
+        self.decode_content = decode_content
+        self._decoder = None        # decompressor for Content-Encoding
+        self._decoded = b''         # decoded data returned by peek()
 
         # The HTTPResponse object is returned via urllib.  The clients
         # of http and urllib expect different attributes for the
@@ -366,6 +491,12 @@ class HTTPResponse(io.BufferedIOBase):
             self.length is None):
             self.will_close = True
 
+        # should the body be transparently decoded?
+        if self.decode_content and self.length != 0:
+            content_enc = self.headers.get("content-encoding")
+            if content_enc:
+                self._decoder = _make_decoder(content_enc)
+
     def _check_close(self):
         conn = self.headers.get("connection")
         if self.version == 11:
@@ -434,6 +565,9 @@ class HTTPResponse(io.BufferedIOBase):
         return self.fp is None
 
     def read(self, amt=None):
+        if self._decoder is not None:
+            return self._read_decoded(-1 if amt is None else amt)
+
         if self.fp is None:
             return b""
 
@@ -470,6 +604,12 @@ class HTTPResponse(io.BufferedIOBase):
         of bytes read.
         """
 
+        if self._decoder is not None:
+            data = self._read_decoded(len(b))
+            n = len(data)
+            memoryview(b)[:n] = data
+            return n
+
         if self.fp is None:
             return 0
 
@@ -630,10 +770,68 @@ class HTTPResponse(io.BufferedIOBase):
             total_bytes += n
         return total_bytes
 
+    def _read_decoded(self, amt):
+        """Read amt bytes (everything if amt is negative) of the decoded
+        body, or less at the end of the body.
+        """
+        value = []
+        while amt:
+            data = self._read1_decoded(amt)
+            if not data:
+                break
+            value.append(data)
+            if amt > 0:
+                amt -= len(data)
+        return b"".join(value)
+
+    def _read1_decoded(self, n):
+        # Return at most n (unlimited if negative) bytes of the decoded body,
+        # decompressing at most one block of raw data.
+        if n == 0 or self.closed:
+            return b""
+        data = self._decoded
+        if data:
+            if 0 < n < len(data):
+                self._decoded = data[n:]
+                return data[:n]
+            self._decoded = b""
+            return data
+        return self._decode_block(n)
+
+    def _decode_block(self, max_length):
+        # Return the next non-empty piece of at most max_length (unlimited
+        # if negative) decoded bytes, or b"" at the end of the body.
+        decoder = self._decoder
+        while True:
+            if decoder.eof:
+                # Discard anything following the compressed stream, so that
+                # the connection can be reused.
+                while self._raw_read1(_DECODE_BLOCKSIZE):
+                    pass
+                if self.fp is not None and self.length == 0:
+                    self._close_conn()   # we read everything
+                return b""
+            if not decoder.needs_input:
+                data = decoder.decompress(b"", max_length)
+                if data:
+                    return data
+            raw = self._raw_read1(_DECODE_BLOCKSIZE)
+            if not raw:
+                # the compressed stream was truncated
+                raise IncompleteRead(b"")
+            data = decoder.decompress(raw, max_length)
+            if data:
+                return data
+
     def read1(self, n=-1):
         """Read with at most one underlying system call.  If at least one
         byte is buffered, return that instead.
         """
+        if self._decoder is not None:
+            return self._read1_decoded(n if n >= 0 else _DECODE_BLOCKSIZE)
+        return self._raw_read1(n)
+
+    def _raw_read1(self, n):
         if self.fp is None or self._method == "HEAD":
             return b""
         if self.chunked:
@@ -650,6 +848,10 @@ class HTTPResponse(io.BufferedIOBase):
     def peek(self, n=-1):
         # Having this enables IOBase.readline() to read more than one
         # byte at a time
+        if self._decoder is not None:
+            if not self._decoded:
+                self._decoded = self._read1_decoded(max(n, _DECODE_BLOCKSIZE))
+            return self._decoded
         if self.fp is None or self._method == "HEAD":
             return b""
         if self.chunked:
@@ -657,6 +859,9 @@ class HTTPResponse(io.BufferedIOBase):
         return self.fp.peek(n)
 
     def readline(self, limit=-1):
+        if self._decoder is not None:
+            # Fallback to IOBase readline which uses peek() and read()
+            return super().readline(limit)
         if self.fp is None or self._method == "HEAD":
             return b""
         if self.chunked:
@@ -776,6 +981,32 @@ class HTTPResponse(io.BufferedIOBase):
         '''
         return self.status
 
+class _PipelineSocket:
+    """Socket stand-in used for the responses of a pipelined connection.
+
+    All the responses must read from the same buffered file, since the
+    buffer may already hold the beginning of the following responses.
+    Closing a response does not close that file; the connection does.
+    """
+
+    def __init__(self, fp):
+        self._fp = fp
+
+    def makefile(self, mode):
+        return _PipelineFile(self._fp)
+
+class _PipelineFile:
+
+    def __init__(self, fp):
+        self._fp = fp
+
+    def __getattr__(self, name):
+        return getattr(self._fp, name)
+
+    def close(self):
+        pass
+
+
 class HTTPConnection:
 
     _http_vsn = 11
@@ -785,6 +1016,8 @@ class HTTPConnection:
     default_port = HTTP_PORT
     auto_open = 1
     debuglevel = 0
+    decode_content = False
+    pipelining = False
 
     @staticmethod
     def _is_textIO(stream):
@@ -834,6 +1067,8 @@ class HTTPConnection:
         self.__response = None
         self.__state = _CS_IDLE
         self._method = None
+        self._pending = collections.deque() # methods of pipelined requests
+        self._sock_file = None              # file shared by their responses
         self._tunnel_host = None
         self._tunnel_port = None
         self._tunnel_headers = {}
@@ -934,7 +1169,13 @@ class HTTPConnection:
     def close(self):
         """Close the connection to the HTTP server."""
         self.__state = _CS_IDLE
+        # responses to pipelined requests can't be read anymore
+        self._pending.clear()
         try:
+            sock_file = self._sock_file
+            if sock_file:
+                self._sock_file = None
+                sock_file.close()
             sock = self.sock
             if sock:
                 self.sock = None
@@ -1165,10 +1406,14 @@ class HTTPConnection:
             #       libraries are updated to recognize other forms, then this
             #       code should be changed (removed or updated).
 
-            # we only want a Content-Encoding of "identity" since we don't
-            # support encodings such as x-gzip or x-deflate.
+            # unless responses are decoded, we only want a Content-Encoding
+            # of "identity" since we don't support encodings such as x-gzip
+            # or x-deflate.
             if not skip_accept_encoding:
-                self.putheader('Accept-Encoding', 'identity')
+                if self.decode_content:
+                    self.putheader('Accept-Encoding', _accept_encoding())
+                else:
+                    self.putheader('Accept-Encoding', 'identity')
 
             # we can accept "chunked" Transfer-Encodings, but no others
             # NOTE: no TE header implies *only* "chunked"
@@ -1222,6 +1467,10 @@ class HTTPConnection:
         else:
             raise CannotSendHeader()
         self._send_output(message_body, encode_chunked=encode_chunked)
+        if self.pipelining:
+            # further requests may be sent before reading the response
+            self._pending.append(self._method)
+            self.__state = _CS_IDLE
 
     def request(self, method, url, body=None, headers={}, *,
                 encode_chunked=False):
@@ -1307,14 +1556,30 @@ class HTTPConnection:
         #   2) persistent: the response was retained and we await its
         #                  isclosed() status to become true.
         #
-        if self.__state != _CS_REQ_SENT or self.__response:
+        # with pipelining, the responses are returned in the order of the
+        # requests and each one must be completely read before the next one
+        if self.pipelining:
+            if not self._pending or self.__response:
+                raise ResponseNotReady(self.__state)
+            if self._sock_file is None:
+                self._sock_file = self.sock.makefile("rb")
+            sock = _PipelineSocket(self._sock_file)
+            method = self._pending.popleft()
+        elif self.__state != _CS_REQ_SENT or self.__response:
             raise ResponseNotReady(self.__state)
+        else:
+            sock = self.sock
+            method = self._method
 
+        kwds = {'method': method}
+        if self.decode_content:
+            # only passed when enabled, for the benefit of custom
+            # response classes that don't support it
+            kwds['decode_content'] = True
         if self.debuglevel > 0:
-            response = self.response_class(self.sock, self.debuglevel,
-                                           method=self._method)
+            response = self.response_class(sock, self.debuglevel, **kwds)
         else:
-            response = self.response_class(self.sock, method=self._method)
+            response = self.response_class(sock, **kwds)
 
         try:
             try:
@@ -1323,9 +1588,14 @@ class HTTPConnection:
                 self.close()
                 raise
             assert response.will_close != _UNKNOWN
-            self.__state = _CS_IDLE
+            if not self.pipelining:
+                self.__state = _CS_IDLE
 
             if response.will_close:
+                if self.pipelining:
+                    # requests sent after this one won't be answered
+                    response.fp = self._sock_file
+                    self._sock_file = None
                 # this effectively passes the connection to the response
                 self.close()
             else:
@@ -1393,6 +1663,120 @@ else:
 
     __all__.append("HTTPSConnection")
 
+def request_many(host, requests, port=None, *, connections=2, depth=8,
+                 connection_class=HTTPConnection, **kwargs):
+    """Send requests to a server over a few pipelined connections.
+
+    requests is a sequence of (method, url[, body[, headers]]) tuples.
+    They are distributed over at most `connections' instances of
+    connection_class, created with host, port and kwargs, each of which
+    keeps up to `depth' requests in flight.  Return a list of
+    (response, data) pairs in the order of the requests, where data is
+    the whole response body.
+
+    Requests with a non-idempotent method, such as POST, are not
+    pipelined: they are sent once the responses to the previous requests
+    of their connection have been read, and the next requests wait for
+    their response.  Requests left unanswered because the server closed a
+    connection are sent again on a new connection if their method is
+    idempotent.
+    """
+    if connections < 1 or depth < 1:
+        raise ValueError("connections and depth must be positive")
+    requests = list(requests)
+    results = [None] * len(requests)
+    workers = []
+    try:
+        for i in range(min(connections, len(requests))):
+            conn = connection_class(host, port, **kwargs)
+            conn.pipelining = True
+            workers.append(_PipelineWorker(
+                conn, range(i, len(requests), connections)))
+        while workers:
+            for worker in workers:
+                worker.send(requests, depth)
+            for worker in workers:
+                worker.receive(requests, results)
+            for worker in workers[:]:
+                if not worker.todo and not worker.in_flight:
+                    workers.remove(worker)
+                    worker.conn.close()
+    finally:
+        for worker in workers:
+            worker.conn.close()
+    return results
+
+
+class _PipelineWorker:
+    """The state of one of the connections used by request_many()."""
+
+    def __init__(self, conn, indices):
+        self.conn = conn
+        self.todo = collections.deque(indices)  # indices of requests to send
+        self.in_flight = collections.deque()    # and of requests sent
+        self.answered = 0       # number of responses read on this socket
+        self.broken = False     # sending on this socket failed
+
+    def send(self, requests, depth):
+        while self.todo and len(self.in_flight) < depth and not self.broken:
+            # RFC 7230 section 6.3.2: non-idempotent requests must not be
+            # pipelined, neither after other requests nor before them.
+            if self.in_flight and not self._idempotent(
+                    requests[self.in_flight[-1]]):
+                break
+            index = self.todo[0]
+            if self.in_flight and not self._idempotent(requests[index]):
+                break
+            self.todo.popleft()
+            try:
+                self.conn.request(*requests[index])
+            except ConnectionError:
+                # the server may have closed the connection after answering
+                # the requests in flight: read them before reconnecting
+                self.todo.appendleft(index)
+                if not self.in_flight:
+                    raise
+                self.broken = True
+            else:
+                self.in_flight.append(index)
+
+    @staticmethod
+    def _idempotent(request):
+        return request[0].upper() in _IDEMPOTENT_METHODS
+
+    def receive(self, requests, results):
+        if not self.in_flight:
+            return
+        try:
+            response = self.conn.getresponse()
+        except ConnectionError:
+            if not self.answered:
+                raise
+        else:
+            index = self.in_flight.popleft()
+            results[index] = (response, response.read())
+            self.answered += 1
+            if not response.will_close:
+                if self.broken and not self.in_flight:
+                    self._reset(requests)
+                return
+        self._reset(requests)
+
+    def _reset(self, requests):
+        # Close the connection, and schedule the requests left unanswered
+        # to be sent again on a new one.
+        self.conn.close()
+        for index in self.in_flight:
+            if not self._idempotent(requests[index]):
+                method = requests[index][0]
+                raise RemoteDisconnected("Remote end closed connection without "
+                                         "response to a %s request" % method)
+        self.todo.extendleft(reversed(self.in_flight))
+        self.in_flight.clear()
+        self.answered = 0
+        self.broken = False
+
+
 class HTTPException(Exception):
     # Subclasses that define an __init__ must call Exception.__init__
     # or define self.args.  Otherwise, str() will fail.
@@ -30,6 +30,7 @@ __all__ = ['Cookie', 'CookieJar', 'CookiePolicy', 'DefaultCookiePolicy',
 
 import copy
 import datetime
+import heapq
 import re
 import time
 import urllib.parse, urllib.request
@@ -1240,17 +1241,81 @@ class CookieJar:
 
         self._cookies_lock = _threading.RLock()
         self._cookies = {}
+        self._expiry_heap = []
+        self._expiry_cookies = None
+        self._expiry_limit = 0
+        self._domain_positions = {}
+        self._domain_positions_cookies = None
+        self._next_domain_position = 0
 
     def set_policy(self, policy):
         self._policy = policy
 
-    def _cookies_for_domain(self, domain, request):
+    def _indexed_lookup(self):
+        # The domain and path checks of DefaultCookiePolicy are plain string
+        # suffix and prefix tests, so the matching keys of self._cookies can
+        # be probed for directly instead of testing every stored domain and
+        # path.  Policies overriding these checks get the full scan.
+        policy_class = type(self._policy)
+        return (isinstance(self._policy, DefaultCookiePolicy) and
+                policy_class.domain_return_ok is
+                DefaultCookiePolicy.domain_return_ok and
+                policy_class.path_return_ok is
+                DefaultCookiePolicy.path_return_ok)
+
+    def _rebuild_domain_positions(self):
+        # The cookies are returned in the insertion order of their domain
+        # in self._cookies (before being sorted by path length), so the
+        # positions of the domains are recorded.
+        self._domain_positions_cookies = self._cookies
+        self._domain_positions = {domain: i
+                                  for i, domain in enumerate(self._cookies)}
+        self._next_domain_position = len(self._domain_positions)
+
+    def _candidate_domains(self, request):
+        """Return the stored domains that may match request.
+
+        Domains are returned in the order of self._cookies, like a full
+        scan does.
+
+        """
+        req_host, erhn = eff_request_host(request)
+        domains = []
+        seen = set()
+        for host in (req_host, erhn):
+            if not host.startswith("."):
+                host = "." + host
+            for i in range(len(host) + 1):
+                domain = host[i:]
+                if domain in self._cookies and domain not in seen:
+                    seen.add(domain)
+                    domains.append(domain)
+        positions = self._domain_positions
+        if (self._domain_positions_cookies is not self._cookies or
+                not all(domain in positions for domain in domains)):
+            self._rebuild_domain_positions()
+            positions = self._domain_positions
+        domains.sort(key=positions.__getitem__)
+        return domains
+
+    def _candidate_paths(self, cookies_by_path, request):
+        req_path = request_path(request)
+        if len(cookies_by_path) <= len(req_path):
+            return list(cookies_by_path)
+        return [req_path[:i] for i in range(len(req_path), -1, -1)
+                if req_path[:i] in cookies_by_path]
+
+    def _cookies_for_domain(self, domain, request, indexed=False):
         cookies = []
         if not self._policy.domain_return_ok(domain, request):
             return []
         _debug("Checking %s for cookies to return", domain)
         cookies_by_path = self._cookies[domain]
-        for path in cookies_by_path.keys():
+        if indexed:
+            paths = self._candidate_paths(cookies_by_path, request)
+        else:
+            paths = list(cookies_by_path)
+        for path in paths:
             if not self._policy.path_return_ok(path, request):
                 continue
             cookies_by_name = cookies_by_path[path]
@@ -1265,8 +1330,13 @@ class CookieJar:
     def _cookies_for_request(self, request):
         """Return a list of cookies to be returned to server."""
         cookies = []
-        for domain in self._cookies.keys():
-            cookies.extend(self._cookies_for_domain(domain, request))
+        if self._indexed_lookup():
+            for domain in self._candidate_domains(request):
+                cookies.extend(
+                    self._cookies_for_domain(domain, request, indexed=True))
+        else:
+            for domain in self._cookies.keys():
+                cookies.extend(self._cookies_for_domain(domain, request))
         return cookies
 
     def _cookie_attrs(self, cookies):
@@ -1643,14 +1713,41 @@ class CookieJar:
         c = self._cookies
         self._cookies_lock.acquire()
         try:
-            if cookie.domain not in c: c[cookie.domain] = {}
+            if cookie.domain not in c:
+                c[cookie.domain] = {}
+                if self._domain_positions_cookies is c:
+                    self._domain_positions[cookie.domain] = \
+                        self._next_domain_position
+                    self._next_domain_position += 1
             c2 = c[cookie.domain]
             if cookie.path not in c2: c2[cookie.path] = {}
             c3 = c2[cookie.path]
             c3[cookie.name] = cookie
+            if cookie.expires is not None and self._expiry_cookies is c:
+                self._push_expiry(cookie)
+                if len(self._expiry_heap) > self._expiry_limit:
+                    self._rebuild_expiry_heap()
         finally:
             self._cookies_lock.release()
 
+    def _push_expiry(self, cookie):
+        heapq.heappush(self._expiry_heap,
+                       (cookie.expires, cookie.domain, cookie.path,
+                        cookie.name, id(cookie)))
+
+    def _rebuild_expiry_heap(self):
+        # Heap entries are checked against the stored cookies when they are
+        # popped, so replaced and removed cookies leave stale entries behind.
+        # The heap is rebuilt from scratch when self._cookies was replaced
+        # or when the stale entries outnumber the live ones.
+        self._expiry_cookies = self._cookies
+        self._expiry_heap = [
+            (cookie.expires, cookie.domain, cookie.path, cookie.name,
+             id(cookie))
+            for cookie in self if cookie.expires is not None]
+        heapq.heapify(self._expiry_heap)
+        self._expiry_limit = 2 * len(self._expiry_heap) + 64
+
     def extract_cookies(self, response, request):
         """Extract cookies from response, where allowable given the request."""
         _debug("extract_cookies: %s", response.info())
@@ -1716,13 +1813,33 @@ class CookieJar:
         .save() method won't save expired cookies anyway (unless you ask
         otherwise by passing a true ignore_expires argument).
 
+        The cookies are found from the expiry times they had when they were
+        set: a cookie whose expiry time is brought forward after it was set
+        should be set again with .set_cookie().
+
         """
         self._cookies_lock.acquire()
         try:
             now = time.time()
-            for cookie in self:
+            if self._expiry_cookies is not self._cookies:
+                self._rebuild_expiry_heap()
+            heap = self._expiry_heap
+            renewed = []
+            while heap and heap[0][0] <= now:
+                expires, domain, path, name, ident = heapq.heappop(heap)
+                try:
+                    cookie = self._cookies[domain][path][name]
+                except KeyError:
+                    continue
+                if id(cookie) != ident:
+                    continue
                 if cookie.is_expired(now):
-                    self.clear(cookie.domain, cookie.path, cookie.name)
+                    self.clear(domain, path, name)
+                elif cookie.expires is not None and cookie.expires != expires:
+                    # the expiry time was extended after the cookie was set
+                    renewed.append(cookie)
+            for cookie in renewed:
+                self._push_expiry(cookie)
         finally:
             self._cookies_lock.release()
 
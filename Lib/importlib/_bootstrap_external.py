@@ -808,6 +808,22 @@ class SourceLoader(_LoaderBasics):
         except NotImplementedError:
             bytecode_path = None
         else:
+            if bytecode_path in _get_pyc_manifest():
+                # Deployment mode: the bytecode is trusted without looking
+                # at the source file.
+                try:
+                    data = self.get_data(bytecode_path)
+                    _classify_pyc(data, fullname, {'name': fullname,
+                                                   'path': bytecode_path})
+                except (ImportError, EOFError, OSError):
+                    pass
+                else:
+                    _bootstrap._verbose_message('{} trusted for {}',
+                                                bytecode_path, source_path)
+                    return _compile_bytecode(memoryview(data)[16:],
+                                             name=fullname,
+                                             bytecode_path=bytecode_path,
+                                             source_path=source_path)
             try:
                 st = self.path_stats(source_path)
             except OSError:
@@ -1307,6 +1323,92 @@ class PathFinder:
         return spec.loader
 
 
+# Deployment indexes #########################################################
+
+_PATH_INDEX_TAG = 'pathindex'
+_PATH_INDEX_VERSION = 1
+_path_index = None
+
+_PYC_MANIFEST_TAG = 'pycmanifest'
+_PYC_MANIFEST_VERSION = 2
+_pyc_manifest = None
+
+
+def _env_file(name, xoption=None):
+    """Return the file name given by the -X option *xoption* or else by the
+    environment variable *name*, or None if neither is set."""
+    if xoption is not None:
+        filename = sys._xoptions.get(xoption)
+        if filename is not None and filename is not True:
+            return filename
+    if sys.flags.ignore_environment:
+        return None
+    if not sys.platform.startswith(_CASE_INSENSITIVE_PLATFORMS_STR_KEY):
+        name = name.encode('ascii')
+    return _os.environ.get(name) or None
+
+
+def _load_marshal_file(filename, tag, version, kind):
+    """Return the data of a marshal file written as (tag, version, data).
+
+    None is returned if the file cannot be read, or if it is of another
+    format or version or if the data is not an instance of kind.
+
+    """
+    try:
+        with _io.FileIO(filename, 'r') as file:
+            file_tag, file_version, data = marshal.loads(file.read())
+    except (OSError, EOFError, ValueError, TypeError) as exc:
+        _bootstrap._verbose_message('cannot read {!r}: {}', filename, exc)
+        return None
+    if (file_tag != tag or file_version != version or
+            not isinstance(data, kind)):
+        _bootstrap._verbose_message('bad {} file {!r}', tag, filename)
+        return None
+    return data
+
+
+def _get_path_index():
+    """Return the directory index named by the PYTHONPATHINDEX environment
+    variable.
+
+    The index maps directory paths to (mtime, contents) pairs, contents
+    mapping the name of each directory entry to True for directories and
+    False for other files.  An empty dict is returned if no index is set
+    or if it cannot be read.
+
+    """
+    global _path_index
+    if _path_index is None:
+        filename = _env_file('PYTHONPATHINDEX')
+        index = None
+        if filename is not None:
+            index = _load_marshal_file(filename, _PATH_INDEX_TAG,
+                                       _PATH_INDEX_VERSION, dict)
+        _path_index = index or {}
+    return _path_index
+
+
+def _get_pyc_manifest():
+    """Return the set of trusted bytecode paths.
+
+    The manifest is named by the -X pycmanifest option or the
+    PYTHONPYCMANIFEST environment variable.  The listed bytecode files are
+    loaded without checking their source files.  An empty set is returned
+    if no manifest is set or if it cannot be read.
+
+    """
+    global _pyc_manifest
+    if _pyc_manifest is None:
+        filename = _env_file('PYTHONPYCMANIFEST', 'pycmanifest')
+        manifest = None
+        if filename is not None:
+            manifest = _load_marshal_file(filename, _PYC_MANIFEST_TAG,
+                                          _PYC_MANIFEST_VERSION, frozenset)
+        _pyc_manifest = manifest or frozenset()
+    return _pyc_manifest
+
+
 class FileFinder:
 
     """File-based finder.
@@ -1329,6 +1431,9 @@ class FileFinder:
         self._path_mtime = -1
         self._path_cache = set()
         self._relaxed_path_cache = set()
+        # Kinds of the directory entries (True for directories) when the
+        # cache was filled from the path index, sparing the stat calls.
+        self._path_kinds = {}
 
     def invalidate_caches(self):
         """Invalidate the directory mtime."""
@@ -1365,7 +1470,7 @@ class FileFinder:
         except OSError:
             mtime = -1
         if mtime != self._path_mtime:
-            self._fill_cache()
+            self._fill_cache(mtime)
             self._path_mtime = mtime
         # tail_module keeps the original casing, for __file__ and friends
         if _relax_case():
@@ -1385,13 +1490,16 @@ class FileFinder:
             else:
                 # If a namespace package, return the path if we don't
                 #  find a module in the next section.
-                is_namespace = _path_isdir(base_path)
+                is_namespace = self._path_kinds.get(cache_module)
+                if is_namespace is None:
+                    is_namespace = _path_isdir(base_path)
         # Check for a file w/ a proper suffix exists.
         for suffix, loader_class in self._loaders:
             full_path = _path_join(self.path, tail_module + suffix)
             _bootstrap._verbose_message('trying {}', full_path, verbosity=2)
             if cache_module + suffix in cache:
-                if _path_isfile(full_path):
+                if (self._path_kinds.get(cache_module + suffix) is False or
+                        _path_isfile(full_path)):
                     return self._get_spec(loader_class, fullname, full_path,
                                           None, target)
         if is_namespace:
@@ -1401,15 +1509,26 @@ class FileFinder:
             return spec
         return None
 
-    def _fill_cache(self):
-        """Fill the cache of potential modules and packages for this directory."""
+    def _fill_cache(self, mtime=None):
+        """Fill the cache of potential modules and packages for this directory.
+
+        If mtime is given and matches the modification time recorded for the
+        directory in the path index, the indexed contents are used instead of
+        listing the directory.
+
+        """
         path = self.path
-        try:
-            contents = _os.listdir(path or _os.getcwd())
-        except (FileNotFoundError, PermissionError, NotADirectoryError):
-            # Directory has either been removed, turned into a file, or made
-            # unreadable.
-            contents = []
+        self._path_kinds = {}
+        entry = _get_path_index().get(path) if mtime is not None else None
+        if entry is not None and entry[0] == mtime:
+            self._path_kinds = contents = entry[1]
+        else:
+            try:
+                contents = _os.listdir(path or _os.getcwd())
+            except (FileNotFoundError, PermissionError, NotADirectoryError):
+                # Directory has either been removed, turned into a file, or
+                # made unreadable.
+                contents = []
         # We store two cached versions, to handle runtime changes of the
         # PYTHONCASEOK environment variable.
         if not sys.platform.startswith('win'):
@@ -1454,6 +1573,139 @@ class FileFinder:
         return 'FileFinder({!r})'.format(self.path)
 
 
+# Module archive #############################################################
+
+# A module archive starts with a header made of _ARCHIVE_MAGIC, the magic
+# number of the bytecode, and the offset and size of the index as 64-bit
+# little-endian integers.  The index is a marshalled dict mapping module names
+# to (offset, size, is_package, origin) tuples locating their marshalled code
+# objects in the archive, each aligned on 8 bytes so that the archive can
+# also be used through mmap.
+_ARCHIVE_MAGIC = b'PYAR'
+_ARCHIVE_HEADER_SIZE = 24
+
+
+class ArchiveLoader(FileLoader, _LoaderBasics):
+
+    """Loader for modules packed in a module archive.
+
+    The path of the loader is the original path of the source file, which is
+    only used for get_source() and resources.
+
+    """
+
+    def __init__(self, finder, fullname, path):
+        FileLoader.__init__(self, fullname, path)
+        self.finder = finder
+
+    def is_package(self, fullname):
+        return self.finder._index[fullname][2]
+
+    def get_code(self, fullname):
+        return self.finder.get_code(fullname)
+
+    def get_source(self, fullname):
+        try:
+            source_bytes = self.get_data(self.path)
+        except OSError:
+            return None
+        return decode_source(source_bytes)
+
+
+class ArchiveFinder:
+
+    """Meta path finder for the modules packed in a module archive.
+
+    The archive is opened once and each module is read with a single read of
+    its code object, without further file system calls.  The archived code
+    is used even if the source files were modified since the archive was
+    built.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        file = _io.FileIO(path, 'r')
+        try:
+            header = file.read(_ARCHIVE_HEADER_SIZE)
+            if (len(header) != _ARCHIVE_HEADER_SIZE or
+                    header[:4] != _ARCHIVE_MAGIC):
+                raise ImportError('bad module archive {!r}'.format(path),
+                                  path=path)
+            if header[4:8] != MAGIC_NUMBER:
+                raise ImportError('bad magic number in module archive '
+                                  '{!r}'.format(path), path=path)
+            file.seek(_r_long(header[8:16]))
+            index = marshal.loads(file.read(_r_long(header[16:24])))
+            if not isinstance(index, dict):
+                raise ImportError('bad module archive index in {!r}'.format(
+                                  path), path=path)
+        except BaseException:
+            file.close()
+            raise
+        self._file = file
+        self._index = index
+        self._lock = _thread.allocate_lock()
+
+    def __repr__(self):
+        return 'ArchiveFinder({!r})'.format(self.path)
+
+    def invalidate_caches(self):
+        """The archive never changes: do nothing."""
+
+    def close(self):
+        """Close the archive file; no module is found in it anymore."""
+        with self._lock:
+            self._index = {}
+            self._file.close()
+
+    def find_spec(self, fullname, path=None, target=None):
+        try:
+            offset, size, is_package, origin = self._index[fullname]
+        except KeyError:
+            return None
+        loader = ArchiveLoader(self, fullname, origin)
+        smsl = [_path_split(origin)[0]] if is_package else None
+        spec = spec_from_file_location(fullname, origin, loader=loader,
+                                       submodule_search_locations=smsl)
+        return spec
+
+    def get_code(self, fullname):
+        """Return the code object of the module *fullname*."""
+        try:
+            offset, size, is_package, origin = self._index[fullname]
+        except KeyError:
+            raise ImportError('{!r} is not in the module archive '
+                              '{!r}'.format(fullname, self.path),
+                              name=fullname, path=self.path) from None
+        with self._lock:
+            if self._file.closed:
+                raise ImportError('module archive {!r} is closed'.format(
+                                  self.path), name=fullname, path=self.path)
+            self._file.seek(offset)
+            data = self._file.read(size)
+        if len(data) != size:
+            raise EOFError('truncated module archive {!r}'.format(self.path))
+        _bootstrap._verbose_message('code object of {} from {}', fullname,
+                                    self.path)
+        return marshal.loads(data)
+
+
+def _get_archive_finder():
+    """Return an ArchiveFinder for the module archive named by the -X
+    modulearchive option or the PYTHONMODULEARCHIVE environment variable,
+    or None."""
+    filename = _env_file('PYTHONMODULEARCHIVE', 'modulearchive')
+    if filename is None:
+        return None
+    try:
+        return ArchiveFinder(filename)
+    except (OSError, ImportError, EOFError, ValueError, TypeError) as exc:
+        _bootstrap._verbose_message('cannot use module archive {!r}: {}',
+                                    filename, exc)
+        return None
+
+
 # Import setup ###############################################################
 
 def _fix_up_module(ns, name, pathname, cpathname=None):
@@ -1559,4 +1811,7 @@ def _install(_bootstrap_module):
     _setup(_bootstrap_module)
     supported_loaders = _get_supported_file_loaders()
     sys.path_hooks.extend([FileFinder.path_hook(*supported_loaders)])
+    archive_finder = _get_archive_finder()
+    if archive_finder is not None:
+        sys.meta_path.append(archive_finder)
     sys.meta_path.append(PathFinder)
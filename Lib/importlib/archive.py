@@ -0,0 +1,158 @@
+"""Build module archives, served by importlib.machinery.ArchiveFinder.
+
+A module archive packs the compiled code objects of many modules in a
+single file.  When the -X modulearchive option or the PYTHONMODULEARCHIVE
+environment variable names an archive, an ArchiveFinder is installed in
+sys.meta_path at startup and imports the packed modules from it, without
+searching sys.path nor reading the source and bytecode files.  The
+standard library is packed with::
+
+    python -m importlib.archive -o FILE
+
+"""
+import marshal
+import os
+import re
+import sys
+
+from ._bootstrap_external import (_ARCHIVE_MAGIC, _ARCHIVE_HEADER_SIZE,
+                                  MAGIC_NUMBER, _write_atomic)
+
+__all__ = ['find_modules', 'build_archive', 'read_index']
+
+# Test packages are not packed by default.
+DEFAULT_EXCLUDE = r'(^|\.)(tests?|idle_test)(\.|$)'
+
+_ALIGNMENT = 8
+
+
+def find_modules(path, prefix=''):
+    """Yield (fullname, source_path, is_package) for the source modules and
+    the regular packages found in the directory *path*, recursively.
+
+    The module names are prefixed with *prefix*.
+
+    """
+    try:
+        names = sorted(os.listdir(path))
+    except OSError:
+        return
+    for name in names:
+        fullpath = os.path.join(path, name)
+        base, ext = os.path.splitext(name)
+        if ext == '.py' and base.isidentifier() and base != '__init__':
+            if os.path.isfile(fullpath):
+                yield prefix + base, fullpath, False
+        elif name.isidentifier() and os.path.isdir(fullpath):
+            init = os.path.join(fullpath, '__init__.py')
+            if os.path.isfile(init):
+                yield prefix + name, init, True
+                yield from find_modules(fullpath, prefix + name + '.')
+
+
+def _align(offset):
+    return -offset % _ALIGNMENT
+
+
+def build_archive(filename, paths=None, *, exclude=DEFAULT_EXCLUDE,
+                  optimize=-1, quiet=False):
+    """Pack the modules found in the directories *paths* in the archive
+    *filename*.
+
+    *paths* defaults to the directory of the standard library.  The modules
+    whose name matches the regular expression *exclude* are skipped, and so
+    are the modules of the later directories which are shadowed by modules
+    of the earlier ones.  The modules are compiled with the *optimize*
+    level, as for compile().  Return the number of packed modules.
+
+    """
+    if paths is None:
+        paths = [os.path.dirname(os.__file__)]
+    if isinstance(exclude, str):
+        exclude = re.compile(exclude)
+    modules = {}
+    shadowed = set()
+    for path in paths:
+        path = os.path.abspath(path)
+        top_levels = set()
+        for fullname, source_path, is_package in find_modules(path):
+            top_level = fullname.partition('.')[0]
+            if top_level in shadowed:
+                continue
+            top_levels.add(top_level)
+            if exclude is not None and exclude.search(fullname):
+                continue
+            modules[fullname] = source_path, is_package
+        shadowed |= top_levels
+
+    chunks = [bytes(_ARCHIVE_HEADER_SIZE)]
+    offset = _ARCHIVE_HEADER_SIZE
+    index = {}
+    for fullname, (source_path, is_package) in sorted(modules.items()):
+        try:
+            with open(source_path, 'rb') as f:
+                source = f.read()
+            code = compile(source, source_path, 'exec', dont_inherit=True,
+                           optimize=optimize)
+        except (SyntaxError, ValueError, OSError) as exc:
+            if not quiet:
+                print('Skipping {}: {}'.format(fullname, exc),
+                      file=sys.stderr)
+            continue
+        data = marshal.dumps(code)
+        index[fullname] = offset, len(data), is_package, source_path
+        padding = bytes(_align(len(data)))
+        chunks.append(data)
+        chunks.append(padding)
+        offset += len(data) + len(padding)
+    data = marshal.dumps(index)
+    chunks.append(data)
+    chunks[0] = (_ARCHIVE_MAGIC + MAGIC_NUMBER +
+                 offset.to_bytes(8, 'little') +
+                 len(data).to_bytes(8, 'little'))
+    _write_atomic(os.fspath(filename), b''.join(chunks))
+    return len(index)
+
+
+def read_index(filename):
+    """Return the index of the archive *filename*, mapping module names to
+    (offset, size, is_package, source_path) tuples."""
+    with open(filename, 'rb') as f:
+        header = f.read(_ARCHIVE_HEADER_SIZE)
+        if (len(header) != _ARCHIVE_HEADER_SIZE or
+                header[:4] != _ARCHIVE_MAGIC or header[4:8] != MAGIC_NUMBER):
+            raise ValueError('{!r} is not a module archive for this '
+                             'interpreter'.format(filename))
+        f.seek(int.from_bytes(header[8:16], 'little'))
+        return marshal.loads(f.read(int.from_bytes(header[16:24], 'little')))
+
+
+def main(args=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='python -m importlib.archive',
+        description='Pack modules in an archive, to be named by the -X '
+                    'modulearchive option or the PYTHONMODULEARCHIVE '
+                    'environment variable.')
+    parser.add_argument('-o', '--output', required=True,
+                        help='archive file to write')
+    parser.add_argument('-x', metavar='REGEXP', dest='exclude',
+                        default=DEFAULT_EXCLUDE,
+                        help='skip the modules whose name matches the '
+                             'regular expression (default: the test '
+                             'packages)')
+    parser.add_argument('-q', action='store_true', dest='quiet',
+                        help='do not report the modules failing to compile')
+    parser.add_argument('paths', metavar='DIRECTORY', nargs='*',
+                        help='directories to pack (default: the standard '
+                             'library)')
+    options = parser.parse_args(args)
+    count = build_archive(options.output, options.paths or None,
+                          exclude=options.exclude or None,
+                          quiet=options.quiet)
+    print('Packed {} modules in {}'.format(count, options.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -14,6 +14,8 @@ from ._bootstrap_external import FileFinder
 from ._bootstrap_external import SourceFileLoader
 from ._bootstrap_external import SourcelessFileLoader
 from ._bootstrap_external import ExtensionFileLoader
+from ._bootstrap_external import ArchiveFinder
+from ._bootstrap_external import ArchiveLoader
 
 
 def all_suffixes():
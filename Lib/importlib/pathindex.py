@@ -0,0 +1,99 @@
+"""Build the directory index used by FileFinder to skip listing directories.
+
+When the PYTHONPATHINDEX environment variable names an index file,
+importlib.machinery.FileFinder takes the contents of the directories it
+searches from the index instead of listing them, as long as the
+modification time recorded for a directory still matches.  The index is
+built with::
+
+    python -m importlib.pathindex -o FILE [DIRECTORY ...]
+
+which indexes the sys.path entries by default.
+
+"""
+import marshal
+import os
+import sys
+
+from ._bootstrap_external import _PATH_INDEX_TAG, _PATH_INDEX_VERSION
+from ._bootstrap_external import _path_join, _write_atomic
+
+__all__ = ['scan_directory', 'build_index', 'write_index']
+
+
+def scan_directory(path):
+    """Return the (mtime, contents) index entry of the directory *path*.
+
+    *contents* maps the name of each directory entry to True for
+    directories and False for other files.
+
+    """
+    # Stat the directory first: if it is modified while being scanned, the
+    # entry will not be used.
+    mtime = os.stat(path).st_mtime
+    contents = {}
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            contents[entry.name] = is_dir
+    return mtime, contents
+
+
+def build_index(paths=None, *, recursive=True):
+    """Return an index of the directories *paths* (sys.path by default).
+
+    If *recursive* is true, the subdirectories which can be packages are
+    indexed as well.  Paths which are not directories are skipped.
+
+    """
+    if paths is None:
+        paths = sys.path
+    index = {}
+    todo = [path for path in paths if path]
+    while todo:
+        path = todo.pop()
+        if path in index:
+            continue
+        try:
+            entry = scan_directory(path)
+        except OSError:
+            continue
+        index[path] = entry
+        if recursive:
+            todo.extend(_path_join(path, name)
+                        for name, is_dir in entry[1].items()
+                        if is_dir and name.isidentifier())
+    return index
+
+
+def write_index(filename, index):
+    """Write *index*, as returned by build_index(), to *filename*."""
+    data = marshal.dumps((_PATH_INDEX_TAG, _PATH_INDEX_VERSION, index))
+    _write_atomic(os.fspath(filename), data)
+
+
+def main(args=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='python -m importlib.pathindex',
+        description='Build an index of the directories searched for modules, '
+                    'to be named by the PYTHONPATHINDEX environment variable.')
+    parser.add_argument('-o', '--output', required=True,
+                        help='index file to write')
+    parser.add_argument('-l', action='store_false', dest='recursive',
+                        help="don't index the subdirectories")
+    parser.add_argument('paths', metavar='DIRECTORY', nargs='*',
+                        help='directories to index (default: sys.path)')
+    options = parser.parse_args(args)
+    paths = [os.path.abspath(path) for path in options.paths] or None
+    index = build_index(paths, recursive=options.recursive)
+    write_index(options.output, index)
+    print('Indexed {} directories in {}'.format(len(index), options.output))
+
+
+if __name__ == '__main__':
+    main()
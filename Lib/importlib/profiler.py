@@ -0,0 +1,408 @@
+"""Profile the time taken by imports.
+
+An ImportProfiler records, for each module imported while it is enabled,
+the time spent finding, loading and executing the module, the file system
+calls made meanwhile and the modules it imported in turn::
+
+    from importlib.profiler import ImportProfiler, format_tree
+
+    with ImportProfiler() as profiler:
+        import json
+    print('\\n'.join(format_tree(profiler.roots)))
+
+Unlike the -X importtime option, the results are available as a tree of
+ImportRecord objects.  A program is profiled from the command line with::
+
+    python -m importlib.profiler [-s KEY | --folded] (-m module | script) ...
+
+"""
+import _imp
+import _thread
+import os
+import sys
+import time
+import types
+
+from . import _bootstrap
+from . import _bootstrap_external
+
+__all__ = ['ImportRecord', 'ImportProfiler',
+           'format_tree', 'format_table', 'format_folded']
+
+_timer = time.perf_counter
+
+# The functions whose calls through _call_with_frames_removed() execute the
+# module code, as opposed to finding or loading it.
+_EXEC_FUNCTIONS = frozenset([exec, _imp.exec_dynamic, _imp.exec_builtin,
+                             _imp.create_dynamic, _imp.create_builtin])
+
+# The file system calls counted, with the attributes of the _os and _io
+# modules of _bootstrap_external making them.
+_SYSCALLS = {
+    'stat': ('_os', 'stat'),
+    'listdir': ('_os', 'listdir'),
+    'getcwd': ('_os', 'getcwd'),
+    'open': ('_io', 'FileIO'),
+}
+
+
+class ImportRecord:
+
+    """The timings of the import of a module.
+
+    The times are in seconds.  cumulative_time covers the whole import,
+    including the imports of other modules it triggered, which are listed
+    in children.  find_time, load_time and exec_time respectively cover
+    finding the module spec, creating the module and reading its code, and
+    executing the module.  syscalls maps the names of the file system calls
+    to the number of times they were made by the import system for this
+    module, not counting its children.
+
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.origin = None
+        self.failed = False
+        self.children = []
+        self.cumulative_time = 0.0
+        self.find_time = 0.0
+        self.load_time = 0.0
+        self.exec_time = 0.0
+        self.syscalls = {}
+        self._exec_depth = 0
+
+    def __repr__(self):
+        return '<ImportRecord {!r} cumulative={:.6f} self={:.6f}>'.format(
+            self.name, self.cumulative_time, self.self_time)
+
+    @property
+    def self_time(self):
+        """The cumulative time minus the cumulative time of the children."""
+        return self.cumulative_time - sum(child.cumulative_time
+                                          for child in self.children)
+
+    def walk(self, stack=()):
+        """Yield (stack, record) pairs for this record and its descendants,
+        depth first, stack being the tuple of the records above it."""
+        yield stack, self
+        stack += (self,)
+        for child in self.children:
+            yield from child.walk(stack)
+
+
+class _CountingModule:
+
+    """Proxy a module, counting the calls to some of its functions."""
+
+    def __init__(self, module, profiler, functions):
+        self._module = module
+        for name, syscall in functions.items():
+            setattr(self, name,
+                    profiler._counting(syscall, getattr(module, name)))
+
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+
+class ImportProfiler:
+
+    """Record the imports made while enabled.
+
+    The records of the top-level imports, in the order they were made, are
+    listed in roots.  Only one profiler can be enabled at a time.
+
+    """
+
+    _enabled = None
+
+    def __init__(self):
+        self.roots = []
+        self._stacks = {}
+        self._patches = []
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *args):
+        self.disable()
+
+    def enable(self):
+        """Start recording the imports."""
+        if ImportProfiler._enabled is not None:
+            raise RuntimeError('an import profiler is already enabled')
+        ImportProfiler._enabled = self
+        # The import system looks these functions up in the bootstrap
+        # modules on each import, so replacing them is enough.
+        self._orig_find_and_load = self._patch(
+            _bootstrap, '_find_and_load', self._find_and_load)
+        self._orig_find_spec = self._patch(
+            _bootstrap, '_find_spec', self._find_spec)
+        self._orig_load_unlocked = self._patch(
+            _bootstrap, '_load_unlocked', self._load_unlocked)
+        self._patch(_bootstrap, '_call_with_frames_removed',
+                    self._call_with_frames_removed)
+        for module_name in sorted({module
+                                   for module, _ in _SYSCALLS.values()}):
+            functions = {function: syscall
+                         for syscall, (module, function) in _SYSCALLS.items()
+                         if module == module_name}
+            module = getattr(_bootstrap_external, module_name)
+            self._patch(_bootstrap_external, module_name,
+                        _CountingModule(module, self, functions))
+
+    def disable(self):
+        """Stop recording the imports."""
+        if ImportProfiler._enabled is not self:
+            return
+        while self._patches:
+            module, name, original = self._patches.pop()
+            setattr(module, name, original)
+        self._stacks.clear()
+        ImportProfiler._enabled = None
+
+    def records(self):
+        """Yield (stack, record) pairs for all the records, depth first."""
+        for root in self.roots:
+            yield from root.walk()
+
+    def _patch(self, module, name, replacement):
+        original = getattr(module, name)
+        setattr(module, name, replacement)
+        self._patches.append((module, name, original))
+        return original
+
+    def _current(self):
+        stack = self._stacks.get(_thread.get_ident())
+        return stack[-1] if stack else None
+
+    def _find_and_load(self, name, import_):
+        record = ImportRecord(name)
+        stack = self._stacks.setdefault(_thread.get_ident(), [])
+        (stack[-1].children if stack else self.roots).append(record)
+        stack.append(record)
+        start = _timer()
+        try:
+            return self._orig_find_and_load(name, import_)
+        except BaseException:
+            record.failed = True
+            raise
+        finally:
+            record.cumulative_time = _timer() - start
+            stack.pop()
+
+    def _find_spec(self, name, path, target=None):
+        record = self._current()
+        if record is None or record.name != name:
+            return self._orig_find_spec(name, path, target)
+        start = _timer()
+        try:
+            spec = self._orig_find_spec(name, path, target)
+        finally:
+            record.find_time += _timer() - start
+        if spec is not None:
+            record.origin = spec.origin
+        return spec
+
+    def _load_unlocked(self, spec):
+        record = self._current()
+        if record is None or record.name != spec.name:
+            return self._orig_load_unlocked(spec)
+        start = _timer()
+        exec_time = record.exec_time
+        try:
+            return self._orig_load_unlocked(spec)
+        finally:
+            record.load_time += (_timer() - start -
+                                 (record.exec_time - exec_time))
+
+    def _call_with_frames_removed(self, f, *args, **kwds):
+        record = self._current()
+        if (record is None or record._exec_depth or
+                f not in _EXEC_FUNCTIONS):
+            return f(*args, **kwds)
+        record._exec_depth += 1
+        start = _timer()
+        try:
+            return f(*args, **kwds)
+        finally:
+            record.exec_time += _timer() - start
+            record._exec_depth -= 1
+
+    def _counting(self, syscall, function):
+        def counting(*args, **kwds):
+            record = self._current()
+            if record is not None:
+                record.syscalls[syscall] = record.syscalls.get(syscall, 0) + 1
+            return function(*args, **kwds)
+        return counting
+
+
+def _importlib_code(code):
+    """Return a copy of code, and of the code of the functions it defines,
+    attributed to the importlib._bootstrap module."""
+    consts = tuple(_importlib_code(const)
+                   if isinstance(const, types.CodeType) else const
+                   for const in code.co_consts)
+    return types.CodeType(
+        code.co_argcount, code.co_kwonlyargcount, code.co_nlocals,
+        code.co_stacksize, code.co_flags, code.co_code, consts,
+        code.co_names, code.co_varnames,
+        _bootstrap._find_and_load.__code__.co_filename, code.co_name,
+        code.co_firstlineno, code.co_lnotab, code.co_freevars,
+        code.co_cellvars)
+
+# The replacements of the bootstrap functions show in the tracebacks of the
+# failed imports.  Attribute them to importlib._bootstrap so that the import
+# system removes them from the tracebacks along with the importlib frames,
+# which it only does for chunks of importlib frames ending with a call to
+# _call_with_frames_removed().
+for _function in (ImportProfiler._find_and_load, ImportProfiler._find_spec,
+                  ImportProfiler._load_unlocked,
+                  ImportProfiler._call_with_frames_removed,
+                  ImportProfiler._counting):
+    _function.__code__ = _importlib_code(_function.__code__)
+del _function
+
+
+def _usec(seconds):
+    return int(seconds * 1e6)
+
+
+def _syscall_count(record):
+    return sum(record.syscalls.values())
+
+
+_SORT_KEYS = {
+    'self': lambda record: record.self_time,
+    'cumulative': lambda record: record.cumulative_time,
+    'find': lambda record: record.find_time,
+    'load': lambda record: record.load_time,
+    'exec': lambda record: record.exec_time,
+    'syscalls': _syscall_count,
+}
+
+_HEADER = '{:>10} {:>10} {:>10} {:>10} {:>10} {:>8}  {}'.format(
+    'cumul[us]', 'self[us]', 'find[us]', 'load[us]', 'exec[us]',
+    'syscalls', 'module')
+
+
+def _format_record(record, name):
+    return '{:>10} {:>10} {:>10} {:>10} {:>10} {:>8}  {}'.format(
+        _usec(record.cumulative_time), _usec(record.self_time),
+        _usec(record.find_time), _usec(record.load_time),
+        _usec(record.exec_time), _syscall_count(record), name)
+
+
+def format_tree(roots, min_time=0.0):
+    """Return the lines of a tree of the records *roots* and their children.
+
+    The records whose cumulative time is lower than *min_time* seconds are
+    omitted, along with their children.  Failed imports are marked with a
+    ``!`` after their name.
+
+    """
+    lines = [_HEADER]
+    def add(record, depth):
+        if record.cumulative_time < min_time:
+            return
+        name = '  ' * depth + record.name + ('!' if record.failed else '')
+        lines.append(_format_record(record, name))
+        for child in record.children:
+            add(child, depth + 1)
+    for root in roots:
+        add(root, 0)
+    return lines
+
+
+def format_table(roots, sort='self', limit=None):
+    """Return the lines of a table of all the records, from *roots* down,
+    sorted by *sort* in decreasing order.
+
+    *sort* is one of ``'self'``, ``'cumulative'``, ``'find'``, ``'load'``,
+    ``'exec'`` and ``'syscalls'``.  At most *limit* records are listed if it
+    is not None.
+
+    """
+    try:
+        key = _SORT_KEYS[sort]
+    except KeyError:
+        raise ValueError('invalid sort key: {!r}'.format(sort)) from None
+    records = [record for root in roots for _, record in root.walk()]
+    records.sort(key=key, reverse=True)
+    if limit is not None:
+        records = records[:limit]
+    return [_HEADER] + [_format_record(record, record.name)
+                        for record in records]
+
+
+def format_folded(roots):
+    """Return the records in the folded stack format of the flame graph
+    tools: a line per record with the names of the modules from the root
+    down to it, separated by semicolons, followed by its self time in
+    microseconds."""
+    return ['{} {}'.format(';'.join([parent.name for parent in stack] +
+                                    [record.name]),
+                           _usec(record.self_time))
+            for root in roots for stack, record in root.walk()]
+
+
+def main(args=None):
+    import argparse
+    import runpy
+
+    parser = argparse.ArgumentParser(
+        prog='python -m importlib.profiler',
+        description='Run a script or a module and report the time taken by '
+                    'its imports.')
+    parser.add_argument('-o', '--outfile', default=None,
+                        help='write the report to OUTFILE instead of stdout')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('-s', '--sort', choices=sorted(_SORT_KEYS),
+                       default=None,
+                       help='report a table of the modules sorted by SORT '
+                            'instead of a tree')
+    group.add_argument('--folded', action='store_true',
+                       help='report the imports in the folded stack format '
+                            'of the flame graph tools')
+    parser.add_argument('-n', '--limit', type=int, default=None,
+                        help='report at most LIMIT modules in the table')
+    parser.add_argument('-t', '--min-time', type=float, default=0.0,
+                        help='omit the imports taking less than MIN_TIME '
+                             'milliseconds from the tree')
+    parser.add_argument('-m', dest='module', action='store_true',
+                        help='run the library module TARGET as a script')
+    parser.add_argument('target', help='the script or module to run')
+    parser.add_argument('args', nargs=argparse.REMAINDER,
+                        help='the arguments of the script or module')
+    options = parser.parse_args(args)
+
+    sys.argv[:] = [options.target] + options.args
+    if not options.module:
+        sys.path.insert(0, os.path.dirname(options.target))
+    profiler = ImportProfiler()
+    try:
+        with profiler:
+            if options.module:
+                runpy.run_module(options.target, run_name='__main__',
+                                 alter_sys=True)
+            else:
+                runpy.run_path(options.target, run_name='__main__')
+    finally:
+        if options.folded:
+            lines = format_folded(profiler.roots)
+        elif options.sort:
+            lines = format_table(profiler.roots, options.sort,
+                                 options.limit)
+        else:
+            lines = format_tree(profiler.roots, options.min_time / 1000)
+        if options.outfile is None:
+            print('\n'.join(lines))
+        else:
+            with open(options.outfile, 'w') as f:
+                f.write('\n'.join(lines) + '\n')
+
+
+if __name__ == '__main__':
+    main()
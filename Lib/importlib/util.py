@@ -10,11 +10,15 @@ from ._bootstrap_external import cache_from_source
 from ._bootstrap_external import decode_source
 from ._bootstrap_external import source_from_cache
 from ._bootstrap_external import spec_from_file_location
+from ._bootstrap_external import SourceFileLoader
+from ._bootstrap_external import SourcelessFileLoader
+from ._bootstrap_external import ArchiveLoader
 
 from contextlib import contextmanager
 import _imp
 import functools
 import sys
+import threading
 import types
 import warnings
 
@@ -222,37 +226,51 @@ class _LazyModule(types.ModuleType):
 
     def __getattribute__(self, attr):
         """Trigger the load of the module and return the attribute."""
-        # All module metadata must be garnered from __spec__ in order to avoid
-        # using mutated values.
-        # Stop triggering this method.
-        self.__class__ = types.ModuleType
-        # Get the original name to make sure no object substitution occurred
-        # in sys.modules.
-        original_name = self.__spec__.name
-        # Figure out exactly what attributes were mutated between the creation
-        # of the module and now.
-        attrs_then = self.__spec__.loader_state['__dict__']
-        original_type = self.__spec__.loader_state['__class__']
-        attrs_now = self.__dict__
-        attrs_updated = {}
-        for key, value in attrs_now.items():
-            # Code that set the attribute may have kept a reference to the
-            # assigned object, making identity more important than equality.
-            if key not in attrs_then:
-                attrs_updated[key] = value
-            elif id(attrs_now[key]) != id(attrs_then[key]):
-                attrs_updated[key] = value
-        self.__spec__.loader.exec_module(self)
-        # If exec_module() was used directly there is no guarantee the module
-        # object was put into sys.modules.
-        if original_name in sys.modules:
-            if id(self) != id(sys.modules[original_name]):
-                raise ValueError(f"module object for {original_name!r} "
-                                  "substituted in sys.modules during a lazy "
-                                  "load")
-        # Update after loading since that's what would happen in an eager
-        # loading situation.
-        self.__dict__.update(attrs_updated)
+        __spec__ = object.__getattribute__(self, '__spec__')
+        loader_state = __spec__.loader_state
+        with loader_state['lock']:
+            # Only the first thread to get the lock triggers the load and
+            # resets the module's class; the others then just getattr().
+            if issubclass(type(self), _LazyModule):
+                # Reentrant calls from the same thread, e.g. by
+                # exec_module() or self-referential imports, must not
+                # trigger the load again nor deadlock.
+                if loader_state['is_loading']:
+                    return object.__getattribute__(self, attr)
+                loader_state['is_loading'] = True
+                __dict__ = object.__getattribute__(self, '__dict__')
+                # All module metadata must be garnered from __spec__ in order
+                # to avoid using mutated values.
+                # Get the original name to make sure no object substitution
+                # occurred in sys.modules.
+                original_name = __spec__.name
+                # Figure out exactly what attributes were mutated between the
+                # creation of the module and now.
+                attrs_then = loader_state['__dict__']
+                attrs_now = __dict__
+                attrs_updated = {}
+                for key, value in attrs_now.items():
+                    # Code that set the attribute may have kept a reference to
+                    # the assigned object, making identity more important than
+                    # equality.
+                    if key not in attrs_then:
+                        attrs_updated[key] = value
+                    elif id(attrs_now[key]) != id(attrs_then[key]):
+                        attrs_updated[key] = value
+                __spec__.loader.exec_module(self)
+                # If exec_module() was used directly there is no guarantee the
+                # module object was put into sys.modules.
+                if original_name in sys.modules:
+                    if id(self) != id(sys.modules[original_name]):
+                        raise ValueError(f"module object for {original_name!r} "
+                                          "substituted in sys.modules during a "
+                                          "lazy load")
+                # Update after loading since that's what would happen in an
+                # eager loading situation.
+                __dict__.update(attrs_updated)
+                # Finally, stop triggering this method, once the module is
+                # fully loaded.
+                self.__class__ = types.ModuleType
         return getattr(self, attr)
 
     def __delattr__(self, attr):
@@ -296,5 +314,126 @@ class LazyLoader(abc.Loader):
         loader_state = {}
         loader_state['__dict__'] = module.__dict__.copy()
         loader_state['__class__'] = module.__class__
+        # The lock serializes the loads of the module by several threads.
+        loader_state['lock'] = threading.RLock()
+        loader_state['is_loading'] = False
         module.__spec__.loader_state = loader_state
         module.__class__ = _LazyModule
+
+
+# Attributes set by module_from_spec() which the import system reads on the
+# parent packages when importing submodules.
+_IMPORT_ATTRS = frozenset({'__name__', '__spec__', '__path__'})
+
+
+class _LazyImportModule(_LazyModule):
+
+    """A lazy module which is not loaded by the accesses of the import system.
+
+    The import metadata and the submodules bound by the import system are
+    returned without loading the module, so that lazy packages stay lazy
+    while their submodules are imported, including by
+    ``from package import submodule``.
+
+    """
+
+    def __getattribute__(self, attr):
+        namespace = object.__getattribute__(self, '__dict__')
+        if attr in namespace:
+            value = namespace[attr]
+            if attr in _IMPORT_ATTRS:
+                return value
+            if isinstance(value, types.ModuleType):
+                name = '{}.{}'.format(namespace['__spec__'].name, attr)
+                if getattr(value.__spec__, 'name', None) == name:
+                    return value
+        return super().__getattribute__(attr)
+
+
+class _LazyImportLoader(LazyLoader):
+
+    """A LazyLoader creating _LazyImportModule instances."""
+
+    def exec_module(self, module):
+        super().exec_module(module)
+        module.__class__ = _LazyImportModule
+
+
+# Loaders supporting lazy loading: the module object is created by the
+# import system and only its execution is deferred.
+_LAZY_LOADERS = (SourceFileLoader, SourcelessFileLoader, ArchiveLoader)
+
+
+def _in_modules(fullname, names):
+    """Return True if fullname or one of its parent packages is in names."""
+    if fullname in names:
+        return True
+    while '.' in fullname:
+        fullname = fullname.rpartition('.')[0]
+        if fullname in names:
+            return True
+    return False
+
+
+class LazyFinder(abc.MetaPathFinder):
+
+    """A meta path finder wrapper making the modules found lazy.
+
+    The specs returned by *finder* for source and bytecode modules get a
+    LazyLoader, so that the modules are only executed when one of their
+    attributes is first accessed.  If *allow* is not None, only the modules
+    it names, and their submodules, are made lazy.  The modules named by
+    *deny*, and their submodules, are never made lazy.
+
+    """
+
+    def __init__(self, finder, allow=None, deny=()):
+        self.finder = finder
+        self.allow = None if allow is None else frozenset(allow)
+        self.deny = frozenset(deny)
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self.finder)
+
+    def is_lazy(self, fullname):
+        """Return True if the module fullname may be loaded lazily."""
+        if self.allow is not None and not _in_modules(fullname, self.allow):
+            return False
+        return not _in_modules(fullname, self.deny)
+
+    def find_spec(self, fullname, path=None, target=None):
+        spec = self.finder.find_spec(fullname, path, target)
+        if (spec is not None and isinstance(spec.loader, _LAZY_LOADERS) and
+                self.is_lazy(fullname)):
+            spec.loader = _LazyImportLoader(spec.loader)
+        return spec
+
+    def invalidate_caches(self):
+        if hasattr(self.finder, 'invalidate_caches'):
+            self.finder.invalidate_caches()
+
+
+def enable_lazy_imports(*, allow=None, deny=()):
+    """Make the modules imported from now on lazy.
+
+    The finders of sys.meta_path are wrapped in LazyFinder instances with
+    the *allow* and *deny* arguments.  The modules already imported are
+    not affected.
+
+    """
+    disable_lazy_imports()
+    sys.meta_path[:] = [LazyFinder(finder, allow, deny)
+                        if hasattr(finder, 'find_spec') else finder
+                        for finder in sys.meta_path]
+
+
+def disable_lazy_imports():
+    """Stop making the imported modules lazy.
+
+    The modules which were imported lazily are still loaded on their first
+    use.
+
+    """
+    sys.meta_path[:] = [finder.finder if isinstance(finder, LazyFinder)
+                        else finder
+                        for finder in sys.meta_path]
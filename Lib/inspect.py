@@ -45,6 +45,7 @@ import tokenize
 import token
 import types
 import warnings
+import weakref
 import functools
 import builtins
 from operator import attrgetter
@@ -1794,6 +1795,13 @@ def _signature_bound_method(sig):
     functions to bound methods.
     """
 
+    # Signatures are immutable, the result is kept on the signature
+    # to be reused for the signatures taken from the caches.
+    try:
+        return sig._bound_signature
+    except AttributeError:
+        pass
+
     params = tuple(sig.parameters.values())
 
     if not params or params[0].kind in (_VAR_KEYWORD, _KEYWORD_ONLY):
@@ -1812,7 +1820,9 @@ def _signature_bound_method(sig):
         # It's a var-positional parameter.
         # Do nothing. '(*args[, ...])' -> '(*args[, ...])'
 
-    return sig.replace(parameters=params)
+    bound_sig = sig.replace(parameters=params)
+    sig._bound_signature = bound_sig
+    return bound_sig
 
 
 def _signature_is_builtin(obj):
@@ -1947,10 +1957,73 @@ def _signature_strip_non_python_syntax(signature):
     return clean_signature, self_parameter, last_positional_only
 
 
+# Maximum number of signatures kept in each of the signature caches.  The
+# least recently used ones are evicted first.
+_SIGNATURE_CACHE_SIZE = 256
+
+def _signature_cache_get(cache, key):
+    """Private helper: return the entry of key in a signature cache, or None,
+    marking it as recently used."""
+    try:
+        entry = cache[key]
+    except KeyError:
+        return None
+    try:
+        cache.move_to_end(key)
+    except KeyError:
+        # evicted by another thread
+        pass
+    return entry
+
+def _signature_cache_set(cache, key, entry):
+    """Private helper: store entry in a signature cache, evicting the least
+    recently used entries."""
+    cache[key] = entry
+    while len(cache) > _SIGNATURE_CACHE_SIZE:
+        try:
+            cache.popitem(last=False)
+        except KeyError:
+            # emptied by another thread
+            break
+
+
+# Maps (Signature class, text signature, module name, bound argument
+# stripped) to the Signatures parsed from the '__text_signature__'
+# of builtins.  The signatures whose default values are looked up in
+# the module globals or in sys.modules are not cached, since these
+# values may change.
+_signature_fromstr_cache = OrderedDict()
+
 def _signature_fromstr(cls, obj, s, skip_bound_arg=True):
     """Private helper to parse content of '__text_signature__'
     and return a Signature based on it.
     """
+    # Possibly strip the bound argument:
+    #    - We *always* strip first bound argument if
+    #      it is a module.
+    #    - We don't strip first bound argument if
+    #      skip_bound_arg is False.
+    _self = getattr(obj, '__self__', None)
+    strip_self = _self is not None and (ismodule(_self) or skip_bound_arg)
+    module_name = getattr(obj, '__module__', None)
+    key = (cls, s, module_name, strip_self)
+    try:
+        sig = _signature_cache_get(_signature_fromstr_cache, key)
+    except TypeError:
+        # Unhashable module name
+        key = sig = None
+    if sig is not None:
+        return sig
+
+    sig, uses_globals = _signature_fromstr_uncached(cls, obj, s, module_name,
+                                                    strip_self)
+    if key is not None and not uses_globals:
+        _signature_cache_set(_signature_fromstr_cache, key, sig)
+    return sig
+
+def _signature_fromstr_uncached(cls, obj, s, module_name, strip_self):
+    """Private helper: return the Signature parsed from s, and whether
+    names were looked up in the module globals or in sys.modules."""
     # Lazy import ast because it's relatively heavy and
     # it's not used for other than this function.
     import ast
@@ -1978,12 +2051,12 @@ def _signature_fromstr(cls, obj, s, skip_bound_arg=True):
 
     module = None
     module_dict = {}
-    module_name = getattr(obj, '__module__', None)
     if module_name:
         module = sys.modules.get(module_name, None)
         if module:
             module_dict = module.__dict__
     sys_module_dict = sys.modules
+    uses_globals = False
 
     def parse_name(node):
         assert isinstance(node, ast.arg)
@@ -1992,6 +2065,8 @@ def _signature_fromstr(cls, obj, s, skip_bound_arg=True):
         return node.arg
 
     def wrap_value(s):
+        nonlocal uses_globals
+        uses_globals = True
         try:
             value = eval(s, module_dict)
         except NameError:
@@ -2072,23 +2147,15 @@ def _signature_fromstr(cls, obj, s, skip_bound_arg=True):
         p(f.args.kwarg, empty)
 
     if self_parameter is not None:
-        # Possibly strip the bound argument:
-        #    - We *always* strip first bound argument if
-        #      it is a module.
-        #    - We don't strip first bound argument if
-        #      skip_bound_arg is False.
         assert parameters
-        _self = getattr(obj, '__self__', None)
-        self_isbound = _self is not None
-        self_ismodule = ismodule(_self)
-        if self_isbound and (self_ismodule or skip_bound_arg):
+        if strip_self:
             parameters.pop(0)
         else:
             # for builtins, self parameter is always positional-only!
             p = parameters[0].replace(kind=Parameter.POSITIONAL_ONLY)
             parameters[0] = p
 
-    return cls(parameters, return_annotation=cls.empty)
+    return cls(parameters, return_annotation=cls.empty), uses_globals
 
 
 def _signature_from_builtin(cls, func, skip_bound_arg=True):
@@ -2107,6 +2174,29 @@ def _signature_from_builtin(cls, func, skip_bound_arg=True):
     return _signature_fromstr(cls, func, s, skip_bound_arg)
 
 
+# Maps the ids of the Python functions to (weak reference to the function,
+# Signature class, state, Signature), state being the result of
+# _signature_function_state() for the function.  The cache is bounded,
+# since the Signatures keep the default values and the annotations alive,
+# which may refer to the functions.
+_signature_function_cache = OrderedDict()
+
+def _signature_function_state(func):
+    """Private helper: returns what the Signature of the given python
+    function is built from, to tell whether a cached one is still valid."""
+    # The default values and the annotations can be any objects, and the
+    # dicts can be changed in place: they are compared by identity.  Their
+    # ids can't be reused while the cached Signature keeps them alive.
+    defaults = func.__defaults__
+    if defaults is not None:
+        defaults = [id(value) for value in defaults]
+    kwdefaults = func.__kwdefaults__
+    if kwdefaults is not None:
+        kwdefaults = [(name, id(value)) for name, value in kwdefaults.items()]
+    annotations = [(name, id(value))
+                   for name, value in func.__annotations__.items()]
+    return (func.__code__, defaults, kwdefaults, annotations)
+
 def _signature_from_function(cls, func):
     """Private helper: constructs Signature for the given python function."""
 
@@ -2118,7 +2208,23 @@ def _signature_from_function(cls, func):
             # If it's not a pure Python function, and not a duck type
             # of pure function:
             raise TypeError('{!r} is not a Python function'.format(func))
+    else:
+        state = _signature_function_state(func)
+        entry = _signature_cache_get(_signature_function_cache, id(func))
+        if entry is not None:
+            ref, cached_cls, cached_state, sig = entry
+            if (ref() is func and cached_cls is cls and
+                    cached_state[0] is state[0] and
+                    cached_state[1:] == state[1:]):
+                return sig
+        sig = _signature_from_function_uncached(cls, func, False)
+        _signature_cache_set(_signature_function_cache, id(func),
+                             (weakref.ref(func), cls, state, sig))
+        return sig
+
+    return _signature_from_function_uncached(cls, func, is_duck_function)
 
+def _signature_from_function_uncached(cls, func, is_duck_function):
     Parameter = cls._parameter_cls
 
     # Parameter information.
@@ -2733,7 +2839,7 @@ class Signature:
         to parameters (simulating 'functools.partial' behavior.)
     """
 
-    __slots__ = ('_return_annotation', '_parameters')
+    __slots__ = ('_return_annotation', '_parameters', '_bound_signature')
 
     _parameter_cls = Parameter
     _bound_arguments_cls = BoundArguments
@@ -5,12 +5,13 @@ is not found, it will look down the module search path for a file by
 that name.
 """
 
+from collections import namedtuple, OrderedDict
 import functools
 import sys
 import os
 import tokenize
 
-__all__ = ["getline", "clearcache", "checkcache"]
+__all__ = ["getline", "clearcache", "checkcache", "cacheinfo", "setmaxsize"]
 
 def getline(filename, lineno, module_globals=None):
     lines = getlines(filename, module_globals)
@@ -26,22 +27,108 @@ def getline(filename, lineno, module_globals=None):
 # or a tuple (size, mtime, lines, fullname) once loaded.
 cache = {}
 
+# The entries stored in the cache by updatecache(), in least recently used
+# order, and their total size.  They are evicted when the total size
+# exceeds _maxsize.  The entries stored by other modules are not tracked.
+_lru = OrderedDict()
+_currsize = 0
+
+_maxsize = 32 * 1024 * 1024
+_hits = _misses = _evictions = 0
+
+CacheInfo = namedtuple("CacheInfo",
+                       ["hits", "misses", "evictions", "maxsize", "currsize"])
+
 
 def clearcache():
     """Clear the cache entirely."""
 
-    global cache
+    global cache, _lru, _currsize, _hits, _misses, _evictions
     cache = {}
+    _lru = OrderedDict()
+    _currsize = 0
+    _hits = _misses = _evictions = 0
+
+
+def cacheinfo():
+    """Report the cache statistics.
+
+    Return a named tuple of the number of hits and misses of getline() and
+    getlines(), the number of files evicted from the cache, and the maximum
+    and current total sizes in bytes of the files read by updatecache().
+    """
+
+    return CacheInfo(_hits, _misses, _evictions, _maxsize, _currsize)
+
+
+def setmaxsize(maxsize):
+    """Set the maximum total size in bytes of the files read into the cache.
+
+    The least recently used files are evicted beyond it.  The cache is
+    unbounded if *maxsize* is None.
+    """
+
+    global _maxsize
+    if maxsize is not None and maxsize < 0:
+        raise ValueError("maxsize must be None or a non-negative integer")
+    _maxsize = maxsize
+    _evict()
+
+
+def _add(filename, entry):
+    # Store an entry read by updatecache() as the most recently used.
+    global _currsize
+    _forget(filename)
+    cache[filename] = entry
+    _lru[filename] = entry
+    _currsize += entry[0]
+    _evict(filename)
+
+
+def _forget(filename):
+    # Stop tracking the entry of filename, removed from the cache.
+    global _currsize
+    entry = _lru.pop(filename, None)
+    if entry is not None:
+        _currsize -= entry[0]
+
+
+def _evict(keep=None):
+    # Evict the least recently used files read by updatecache(), except
+    # keep, until their total size is below the maximum size.
+    global _evictions
+    if _maxsize is None:
+        return
+    while _currsize > _maxsize and _lru:
+        filename = next(iter(_lru))
+        if filename == keep:
+            if len(_lru) == 1:
+                break
+            _lru.move_to_end(filename)
+            continue
+        entry = _lru.get(filename)
+        _forget(filename)
+        # The entry may have been replaced or removed by other modules
+        if cache.get(filename) is entry:
+            del cache[filename]
+            _evictions += 1
 
 
 def getlines(filename, module_globals=None):
     """Get the lines for a Python source file from the cache.
     Update the cache if it doesn't contain an entry for this file already."""
 
+    global _hits
     if filename in cache:
         entry = cache[filename]
         if len(entry) != 1:
-            return cache[filename][2]
+            _hits += 1
+            if filename in _lru:
+                try:
+                    _lru.move_to_end(filename)
+                except KeyError:
+                    pass
+            return entry[2]
 
     try:
         return updatecache(filename, module_globals)
@@ -74,9 +161,11 @@ def checkcache(filename=None):
             stat = os.stat(fullname)
         except OSError:
             del cache[filename]
+            _forget(filename)
             continue
         if size != stat.st_size or mtime != stat.st_mtime:
             del cache[filename]
+            _forget(filename)
 
 
 def updatecache(filename, module_globals=None):
@@ -84,9 +173,12 @@ def updatecache(filename, module_globals=None):
     If something's wrong, print a message, discard the cache entry,
     and return an empty list."""
 
+    global _misses
+    _misses += 1
     if filename in cache:
         if len(cache[filename]) != 1:
             del cache[filename]
+            _forget(filename)
     if not filename or (filename.startswith('<') and filename.endswith('>')):
         return []
 
@@ -108,11 +200,9 @@ def updatecache(filename, module_globals=None):
                     # No luck, the PEP302 loader cannot find the source
                     # for this module.
                     return []
-                cache[filename] = (
-                    len(data), None,
-                    [line+'\n' for line in data.splitlines()], fullname
-                )
-                return cache[filename][2]
+                lines = [line+'\n' for line in data.splitlines()]
+                _add(filename, (len(data), None, lines, fullname))
+                return lines
 
         # Try looking through the module search path, which is only useful
         # when handling a relative filename.
@@ -140,7 +230,7 @@ def updatecache(filename, module_globals=None):
     if lines and not lines[-1].endswith('\n'):
         lines[-1] += '\n'
     size, mtime = stat.st_size, stat.st_mtime
-    cache[filename] = size, mtime, lines, fullname
+    _add(filename, (size, mtime, lines, fullname))
     return lines
 
 
@@ -1,19 +1,21 @@
 """Utilities to support packages."""
 
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 from functools import singledispatch as simplegeneric
 import importlib
 import importlib.util
 import importlib.machinery
 import os
 import os.path
+import stat
 import sys
+import threading
 from types import ModuleType
 import warnings
 
 __all__ = [
     'get_importer', 'iter_importers', 'get_loader', 'find_loader',
-    'walk_packages', 'iter_modules', 'get_data',
+    'walk_packages', 'iter_modules', 'get_data', 'clear_cache',
     'ImpImporter', 'ImpLoader', 'read_code', 'extend_path',
     'ModuleInfo',
 ]
@@ -50,7 +52,8 @@ def read_code(stream):
     return marshal.load(stream)
 
 
-def walk_packages(path=None, prefix='', onerror=None):
+def walk_packages(path=None, prefix='', onerror=None, *,
+                  import_packages=True, workers=1):
     """Yields ModuleInfo for all modules recursively
     on path, or, if path is None, all accessible modules.
 
@@ -62,7 +65,10 @@ def walk_packages(path=None, prefix='', onerror=None):
 
     Note that this function must import all *packages* (NOT all
     modules!) on the given path, in order to access the __path__
-    attribute to find submodules.
+    attribute to find submodules, unless 'import_packages' is false.
+    The packages found in directories and zip files are then searched
+    without being imported, as if their __path__ was not modified by
+    their __init__ module.
 
     'onerror' is a function which gets called with one argument (the
     name of the package which was being imported) if any exception
@@ -70,6 +76,14 @@ def walk_packages(path=None, prefix='', onerror=None):
     supplied, ImportErrors are caught and ignored, while all other
     exceptions are propagated, terminating the search.
 
+    'workers' is the number of threads listing the directories of
+    the packages in advance, or None for a number based on the number
+    of processors.
+
+    If 'import_packages' is false or 'workers' is not 1, the contents
+    of the directories are cached for the next searches, see
+    clear_cache().
+
     Examples:
 
     # list all modules python can access
@@ -78,33 +92,70 @@ def walk_packages(path=None, prefix='', onerror=None):
     # list all submodules of ctypes
     walk_packages(ctypes.__path__, ctypes.__name__+'.')
     """
+    if workers is not None and workers < 1:
+        raise ValueError('workers must be greater or equal to 1')
+    if workers == 1:
+        yield from _walk_packages(path, prefix, onerror, import_packages,
+                                  None)
+        return
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from _walk_packages(path, prefix, onerror, import_packages,
+                                  executor)
+
 
+def _walk_packages(path, prefix, onerror, import_packages, executor):
     def seen(p, m={}):
         if p in m:
             return True
         m[p] = True
 
-    for info in iter_modules(path, prefix):
+    if executor is not None:
+        _prefetch_dirs(sys.path if path is None else path, executor)
+
+    cached = not import_packages or executor is not None
+    for info in _iter_modules(path, prefix, cached):
         yield info
 
         if info.ispkg:
-            try:
-                __import__(info.name)
-            except ImportError:
-                if onerror is not None:
-                    onerror(info.name)
-            except Exception:
-                if onerror is not None:
-                    onerror(info.name)
-                else:
-                    raise
-            else:
+            path = None
+            if not import_packages:
+                path = _get_package_path(info.module_finder,
+                                         info.name.rpartition('.')[2])
+            if path is None:
+                try:
+                    __import__(info.name)
+                except ImportError:
+                    if onerror is not None:
+                        onerror(info.name)
+                    continue
+                except Exception:
+                    if onerror is not None:
+                        onerror(info.name)
+                        continue
+                    else:
+                        raise
                 path = getattr(sys.modules[info.name], '__path__', None) or []
 
-                # don't traverse path items we've seen before
-                path = [p for p in path if not seen(p)]
+            # don't traverse path items we've seen before
+            path = [p for p in path if not seen(p)]
 
-                yield from walk_packages(path, info.name+'.', onerror)
+            yield from _walk_packages(path, info.name+'.', onerror,
+                                      import_packages, executor)
+
+
+def _prefetch_dirs(path, executor):
+    # List the directories of path and their subdirectories in parallel,
+    # for iter_modules() to find their contents in the cache.
+    dirs = [p for p in path if isinstance(p, str)]
+    subdirs = [os.path.join(dir, name)
+               for dir, contents in zip(dirs,
+                                        executor.map(_cached_scan_dir, dirs))
+               if contents
+               for name, is_dir in contents.items()
+               if is_dir and name.isidentifier()]
+    for _ in executor.map(_cached_scan_dir, subdirs):
+        pass
 
 
 def iter_modules(path=None, prefix=''):
@@ -117,6 +168,11 @@ def iter_modules(path=None, prefix=''):
     'prefix' is a string to output on the front of every module name
     on output.
     """
+    return _iter_modules(path, prefix, False)
+
+
+def _iter_modules(path, prefix, cached):
+    # Implement iter_modules(), using the directory cache if cached is true.
     if path is None:
         importers = iter_importers()
     elif isinstance(path, str):
@@ -127,7 +183,12 @@ def iter_modules(path=None, prefix=''):
 
     yielded = {}
     for i in importers:
-        for name, ispkg in iter_importer_modules(i, prefix):
+        if (cached and iter_importer_modules.dispatch(type(i)) is
+                _iter_file_finder_modules):
+            modules = _iter_file_finder_modules(i, prefix, cached=True)
+        else:
+            modules = iter_importer_modules(i, prefix)
+        for name, ispkg in modules:
             if name not in yielded:
                 yielded[name] = 1
                 yield ModuleInfo(i, name, ispkg)
@@ -140,19 +201,96 @@ def iter_importer_modules(importer, prefix=''):
     return importer.iter_modules(prefix)
 
 
+@simplegeneric
+def _get_package_path(importer, name):
+    # Return the __path__ of the package name found by importer, as set by
+    # the import system, or None if unknown.
+    return None
+
+
+def _scan_dir(path):
+    """Return a dict mapping the names of the entries of the directory path
+    to True for the directories, or None if path is not a directory.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISDIR(st.st_mode):
+        return None
+    return _scan_contents(path)
+
+
+def _scan_contents(path):
+    contents = {}
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                contents[entry.name] = is_dir
+    except OSError:
+        # ignore unreadable directories like import does
+        return {}
+    return contents
+
+
+# Maps the directories listed by _cached_scan_dir() to their
+# ((mtime, inode), contents), the least recently used first.
+_scan_cache = OrderedDict()
+_scan_cache_lock = threading.Lock()
+_SCAN_CACHE_SIZE = 4096
+
+def _cached_scan_dir(path):
+    """Like _scan_dir(), but cache the contents while the modification time
+    of the directory stays the same.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISDIR(st.st_mode):
+        return None
+    key = (st.st_mtime_ns, st.st_ino)
+    # The prefetching threads of walk_packages() share the cache.
+    with _scan_cache_lock:
+        cached = _scan_cache.get(path)
+        if cached is not None and cached[0] == key:
+            _scan_cache.move_to_end(path)
+            return cached[1]
+    contents = _scan_contents(path)
+    with _scan_cache_lock:
+        _scan_cache[path] = (key, contents)
+        _scan_cache.move_to_end(path)
+        while len(_scan_cache) > _SCAN_CACHE_SIZE:
+            _scan_cache.popitem(last=False)
+    return contents
+
+
+def clear_cache():
+    """Clear the cache of the directory contents used by walk_packages().
+
+    The cache is validated by the modification time of the directories,
+    which may not change when they are modified twice in a short period.
+    """
+    with _scan_cache_lock:
+        _scan_cache.clear()
+
+
 # Implement a file walker for the normal importlib path hook
-def _iter_file_finder_modules(importer, prefix=''):
-    if importer.path is None or not os.path.isdir(importer.path):
+def _iter_file_finder_modules(importer, prefix='', cached=False):
+    if importer.path is None:
+        return
+    scan_dir = _cached_scan_dir if cached else _scan_dir
+    contents = scan_dir(importer.path)
+    if contents is None:
         return
 
     yielded = {}
     import inspect
-    try:
-        filenames = os.listdir(importer.path)
-    except OSError:
-        # ignore unreadable directories like import does
-        filenames = []
-    filenames.sort()  # handle packages before same-named modules
+    filenames = sorted(contents)  # handle packages before same-named modules
 
     for fn in filenames:
         modname = inspect.getmodulename(fn)
@@ -162,13 +300,9 @@ def _iter_file_finder_modules(importer, prefix=''):
         path = os.path.join(importer.path, fn)
         ispkg = False
 
-        if not modname and os.path.isdir(path) and '.' not in fn:
+        if not modname and contents[fn] and '.' not in fn:
             modname = fn
-            try:
-                dircontents = os.listdir(path)
-            except OSError:
-                # ignore unreadable directories like import does
-                dircontents = []
+            dircontents = scan_dir(path) or ()
             for fn in dircontents:
                 subname = inspect.getmodulename(fn)
                 if subname=='__init__':
@@ -185,6 +319,15 @@ iter_importer_modules.register(
     importlib.machinery.FileFinder, _iter_file_finder_modules)
 
 
+def _file_finder_package_path(importer, name):
+    if importer.path is None:
+        return None
+    return [os.path.join(importer.path, name)]
+
+_get_package_path.register(
+    importlib.machinery.FileFinder, _file_finder_package_path)
+
+
 def _import_imp():
     global imp
     with warnings.catch_warnings():
@@ -398,6 +541,11 @@ try:
 
     iter_importer_modules.register(zipimporter, iter_zipimport_modules)
 
+    def _zipimport_package_path(importer, name):
+        return [os.path.join(importer.archive, importer.prefix, name)]
+
+    _get_package_path.register(zipimporter, _zipimport_package_path)
+
 except ImportError:
     pass
 
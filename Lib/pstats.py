@@ -25,10 +25,12 @@ import os
 import time
 import marshal
 import re
+import heapq
+from array import array
 from enum import Enum
 from functools import cmp_to_key
 
-__all__ = ["Stats", "SortKey"]
+__all__ = ["Stats", "SortKey", "StatsTable"]
 
 
 class SortKey(str, Enum):
@@ -121,13 +123,13 @@ class Stats:
             return
         elif isinstance(arg, str):
             with open(arg, 'rb') as f:
-                self.stats = marshal.load(f)
-            try:
-                file_stats = os.stat(arg)
-                arg = time.ctime(file_stats.st_mtime) + "    " + arg
-            except:  # in case this is not unix
-                pass
-            self.files = [arg]
+                if f.peek(len(COLUMNAR_MAGIC)).startswith(COLUMNAR_MAGIC):
+                    table = StatsTable()
+                    table._load(f)
+                    self.stats = table._to_dict()
+                else:
+                    self.stats = marshal.load(f)
+            self.files = [_file_label(arg)]
         elif hasattr(arg, 'create_stats'):
             arg.create_stats()
             self.stats = arg.stats
@@ -465,6 +467,295 @@ class Stats:
             print(f8(ct/cc), end=' ', file=self.stream)
         print(func_std_string(func), file=self.stream)
 
+# Files written by StatsTable.dump() start with this
+COLUMNAR_MAGIC = b'PSTATS\x00\x01'
+
+class StatsTable:
+    """Statistics of profiles stored in columns, for merging many of them.
+
+    A StatsTable holds the same data as a Stats object, but the statistics
+    of the functions and of their callers are stored in arrays indexed by
+    function rather than in a dictionary of tuples.  Adding a profile only
+    adds its numbers to the arrays, so that the statistics of a large number
+    of profiles can be merged incrementally, one at a time.
+
+    The constructor and the add() method take the names of files written by
+    Profile.dump_stats(), Stats.dump_stats() or StatsTable.dump(), Stats,
+    StatsTable or profiler objects, or statistics dictionaries.  A Stats
+    object can be created from a StatsTable: Stats(table).
+    """
+
+    def __init__(self, *args):
+        self.files = []
+        self._index = {}        # maps the functions to their indexes
+        self._funcs = []
+        self._cc = array('q')   # primitive calls
+        self._nc = array('q')   # calls
+        self._tt = array('d')   # internal time
+        self._ct = array('d')   # cumulative time
+        # Maps the (callee, caller) pairs of indexes to the index of the
+        # call in the following arrays, in the order of the cProfile
+        # caller statistics.
+        self._calls = {}
+        self._call_nc = array('q')
+        self._call_cc = array('q')
+        self._call_tt = array('d')
+        self._call_ct = array('d')
+        # The profile module records the number of calls from each caller
+        # only; these are stored as call_nc and call_cc.
+        self._counts_only = None
+        self.add(*args)
+
+    def __len__(self):
+        return len(self._funcs)
+
+    def add(self, *args):
+        """Add the statistics of the given profiles."""
+        for arg in args:
+            if isinstance(arg, str):
+                with open(arg, 'rb') as f:
+                    if f.peek(len(COLUMNAR_MAGIC)).startswith(COLUMNAR_MAGIC):
+                        self._load(f)
+                    else:
+                        self._add_dict(marshal.load(f))
+                self.files.append(_file_label(arg))
+            elif isinstance(arg, StatsTable):
+                self._add_table(arg)
+                self.files += arg.files
+            elif isinstance(arg, Stats):
+                self._add_dict(arg.stats)
+                self.files += arg.files
+            elif isinstance(arg, dict):
+                self._add_dict(arg)
+            elif hasattr(arg, 'create_stats'):
+                arg.create_stats()
+                self._add_dict(arg.stats)
+            else:
+                raise TypeError("Cannot add statistics from %r" % (arg,))
+        return self
+
+    def _func_index(self, func):
+        index = self._index.get(func)
+        if index is None:
+            index = self._index[func] = len(self._funcs)
+            self._funcs.append(func)
+            self._cc.append(0)
+            self._nc.append(0)
+            self._tt.append(0.0)
+            self._ct.append(0.0)
+        return index
+
+    def _call_index(self, key):
+        index = self._calls.get(key)
+        if index is None:
+            index = self._calls[key] = len(self._call_nc)
+            self._call_nc.append(0)
+            self._call_cc.append(0)
+            self._call_tt.append(0.0)
+            self._call_ct.append(0.0)
+        return index
+
+    def _set_counts_only(self, counts_only):
+        if self._counts_only is None:
+            self._counts_only = counts_only
+        elif self._counts_only != counts_only:
+            raise ValueError("cannot merge the statistics of the profile "
+                             "and cProfile modules")
+
+    def _add_dict(self, stats):
+        func_index = self._func_index
+        call_index = self._call_index
+        for func, (cc, nc, tt, ct, callers) in stats.items():
+            i = func_index(func)
+            self._cc[i] += cc
+            self._nc[i] += nc
+            self._tt[i] += tt
+            self._ct[i] += ct
+            for caller, value in callers.items():
+                j = call_index((i, func_index(caller)))
+                if isinstance(value, tuple):
+                    self._set_counts_only(False)
+                    nc, cc, tt, ct = value
+                    self._call_tt[j] += tt
+                    self._call_ct[j] += ct
+                else:
+                    self._set_counts_only(True)
+                    nc = cc = value
+                self._call_nc[j] += nc
+                self._call_cc[j] += cc
+
+    def _add_columns(self, funcs, cc, nc, tt, ct,
+                     callees, callers, call_nc, call_cc, call_tt, call_ct,
+                     counts_only):
+        if callees:
+            self._set_counts_only(counts_only)
+        remap = [self._func_index(func) for func in funcs]
+        self_cc = self._cc
+        self_nc = self._nc
+        self_tt = self._tt
+        self_ct = self._ct
+        for k, i in enumerate(remap):
+            self_cc[i] += cc[k]
+            self_nc[i] += nc[k]
+            self_tt[i] += tt[k]
+            self_ct[i] += ct[k]
+        call_index = self._call_index
+        self_call_nc = self._call_nc
+        self_call_cc = self._call_cc
+        self_call_tt = self._call_tt
+        self_call_ct = self._call_ct
+        for k in range(len(callees)):
+            j = call_index((remap[callees[k]], remap[callers[k]]))
+            self_call_nc[j] += call_nc[k]
+            self_call_cc[j] += call_cc[k]
+            self_call_tt[j] += call_tt[k]
+            self_call_ct[j] += call_ct[k]
+
+    def _call_columns(self):
+        callees = array('q')
+        callers = array('q')
+        for callee, caller in self._calls:
+            callees.append(callee)
+            callers.append(caller)
+        return callees, callers
+
+    def _add_table(self, table):
+        callees, callers = table._call_columns()
+        self._add_columns(table._funcs, table._cc, table._nc, table._tt,
+                          table._ct, callees, callers,
+                          table._call_nc, table._call_cc, table._call_tt,
+                          table._call_ct, table._counts_only)
+
+    def dump(self, filename):
+        """Write the statistics to a file, in a compact columnar format
+        which can be loaded by StatsTable and Stats."""
+        strings = {}
+        files = array('q')
+        lines = array('q')
+        names = array('q')
+        for path, line, name in self._funcs:
+            files.append(strings.setdefault(path, len(strings)))
+            lines.append(line)
+            names.append(strings.setdefault(name, len(strings)))
+        callees, callers = self._call_columns()
+        columns = [files, lines, names, self._cc, self._nc, self._tt,
+                   self._ct, callees, callers, self._call_nc,
+                   self._call_cc, self._call_tt, self._call_ct]
+        data = (sys.byteorder, bool(self._counts_only), tuple(strings),
+                tuple((column.typecode, column.tobytes())
+                      for column in map(_narrow, columns)))
+        with open(filename, 'wb') as f:
+            f.write(COLUMNAR_MAGIC)
+            marshal.dump(data, f)
+
+    def _load(self, f):
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError("not a columnar statistics file")
+        byteorder, counts_only, strings, data = marshal.load(f)
+        columns = []
+        for typecode, column_data in data:
+            column = array(typecode)
+            column.frombytes(column_data)
+            if byteorder != sys.byteorder:
+                column.byteswap()
+            columns.append(column)
+        files, lines, names = columns[:3]
+        funcs = [(strings[files[k]], lines[k], strings[names[k]])
+                 for k in range(len(files))]
+        self._add_columns(funcs, *columns[3:], counts_only)
+
+    def _to_dict(self):
+        stats = {}
+        for i, func in enumerate(self._funcs):
+            stats[func] = (self._cc[i], self._nc[i], self._tt[i],
+                           self._ct[i], {})
+        funcs = self._funcs
+        for (i, j), k in self._calls.items():
+            if self._counts_only:
+                value = self._call_nc[k]
+            else:
+                value = (self._call_nc[k], self._call_cc[k],
+                         self._call_tt[k], self._call_ct[k])
+            stats[funcs[i]][4][funcs[j]] = value
+        return stats
+
+    def create_stats(self):
+        # Used by Stats(table)
+        self.stats = self._to_dict()
+
+    _sort_columns = {
+        'calls': '_nc', 'ncalls': '_nc', 'pcalls': '_cc',
+        'time': '_tt', 'tottime': '_tt',
+        'cumulative': '_ct', 'cumtime': '_ct',
+    }
+
+    def top(self, n=None, key=SortKey.CUMULATIVE, module=None):
+        """Return the statistics of the n functions with the largest values
+        of key, or of all the functions if n is None, in decreasing order.
+
+        key is one of 'calls', 'pcalls', 'time' and 'cumulative', their
+        aliases or the SortKey equivalents.  If module is given, it is a
+        regular expression and only the functions whose file name matches
+        it are considered.  Each function is returned as a
+        (func, cc, nc, tt, ct) tuple, func being its (file name, line
+        number, function name) tuple.
+        """
+        if isinstance(key, SortKey):
+            key = key.value
+        try:
+            column = getattr(self, self._sort_columns[key])
+        except KeyError:
+            raise ValueError("invalid sort key %r" % (key,)) from None
+        indexes = range(len(self._funcs))
+        if module is not None:
+            search = re.compile(module).search
+            funcs = self._funcs
+            indexes = [i for i in indexes if search(funcs[i][0])]
+        if n is None:
+            indexes = sorted(indexes, key=column.__getitem__, reverse=True)
+        else:
+            indexes = heapq.nlargest(n, indexes, key=column.__getitem__)
+        return [(self._funcs[i], self._cc[i], self._nc[i], self._tt[i],
+                 self._ct[i]) for i in indexes]
+
+    def callers(self, func):
+        """Return a dictionary mapping the callers of func to the caller
+        statistics, in the format of Stats.stats."""
+        callee = self._index.get(func)
+        result = {}
+        for (i, j), k in self._calls.items():
+            if i == callee:
+                if self._counts_only:
+                    result[self._funcs[j]] = self._call_nc[k]
+                else:
+                    result[self._funcs[j]] = (self._call_nc[k],
+                                              self._call_cc[k],
+                                              self._call_tt[k],
+                                              self._call_ct[k])
+        return result
+
+
+def _file_label(filename):
+    try:
+        file_stats = os.stat(filename)
+        return time.ctime(file_stats.st_mtime) + "    " + filename
+    except:  # in case this is not unix
+        return filename
+
+def _narrow(column):
+    """Return an array with the values of the array of integers column
+    using the smallest item size."""
+    if column.typecode == 'd' or not column:
+        return column
+    low = min(column)
+    high = max(column)
+    for typecode in 'bhi':
+        limit = 1 << (8 * array(typecode).itemsize - 1)
+        if -limit <= low and high < limit:
+            return array(typecode, column)
+    return column
+
+
 class TupleComp:
     """This class provides a generic function for comparing any two tuples.
     Each instance records a list of tuple-indices (from most significant
@@ -0,0 +1,351 @@
+#! /usr/bin/env python3
+
+"""Statistical profiler sampling the stacks of the running threads.
+
+Unlike cProfile and profile, which record every call and return, this
+profiler periodically captures the stacks of the threads and counts how
+often each function is found on them.  Its overhead depends on the sampling
+interval rather than on the number of calls made by the program, which
+makes it usable on production workloads.  The samples are reported in the
+pstats format, compatible with the other profilers, or in the collapsed
+stack format of the flame graph tools.
+
+The stacks are sampled by a background thread, or by a SIGPROF signal
+handler on the platforms providing signal.setitimer().
+"""
+
+__all__ = ["run", "runctx", "Profile"]
+
+import _thread
+import sys
+import threading
+import time
+import profile as _pyprofile
+
+# Sampling interval, in seconds
+DEFAULT_INTERVAL = 0.001
+
+# ____________________________________________________________
+# Simple interface
+
+def run(statement, filename=None, sort=-1):
+    return _pyprofile._Utils(Profile).run(statement, filename, sort)
+
+def runctx(statement, globals, locals, filename=None, sort=-1):
+    return _pyprofile._Utils(Profile).runctx(statement, globals, locals,
+                                             filename, sort)
+
+run.__doc__ = _pyprofile.run.__doc__
+runctx.__doc__ = _pyprofile.runctx.__doc__
+
+# ____________________________________________________________
+
+class Profile:
+    """Profile(interval=0.001, all_threads=True, use_signal=False)
+
+    Builds a profiler object sampling the stacks every interval seconds.
+    By default the stacks of all the threads are sampled; only the stack of
+    the thread enabling the profiler is if all_threads is false.  The
+    samples are taken by a background thread, at intervals of wall-clock
+    time, unless use_signal is true, in which case they are taken by a
+    SIGPROF signal handler, at intervals of CPU time of the process.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, all_threads=True,
+                 use_signal=False):
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if use_signal:
+            import signal
+            if not hasattr(signal, 'setitimer'):
+                raise ValueError("signal sampling is not supported on "
+                                 "this platform")
+        self.interval = interval
+        self.all_threads = all_threads
+        self.use_signal = use_signal
+        self.sample_count = 0
+        # Maps the tuples of the ids of the code objects of the sampled
+        # stacks, innermost first, to [code objects outermost first,
+        # number of samples, sampled time]
+        self._stacks = {}
+        self._enabled = False
+        self._thread_id = None
+        self._sampler = None
+        self._stop = None
+        self._old_handler = None
+        self._last = None
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    def enable(self):
+        """Start sampling the stacks."""
+        if self._enabled:
+            return
+        self._thread_id = _thread.get_ident()
+        if self.use_signal:
+            import signal
+            self._timer = time.process_time
+            self._last = self._timer()
+            self._old_handler = signal.signal(signal.SIGPROF,
+                                              self._handle_signal)
+            signal.setitimer(signal.ITIMER_PROF, self.interval,
+                             self.interval)
+        else:
+            self._timer = time.perf_counter
+            self._last = self._timer()
+            self._stop = _thread.allocate_lock()
+            self._stop.acquire()
+            self._sampler = threading.Thread(target=self._run_sampler,
+                                             name='sampleprof', daemon=True)
+            self._sampler.start()
+        self._enabled = True
+
+    def disable(self):
+        """Stop sampling the stacks."""
+        if not self._enabled:
+            return
+        if self.use_signal:
+            import signal
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, self._old_handler)
+            self._old_handler = None
+        else:
+            self._stop.release()
+            self._sampler.join()
+            self._sampler = self._stop = None
+        self._enabled = False
+
+    def clear(self):
+        """Discard the samples taken so far."""
+        self._stacks.clear()
+        self.sample_count = 0
+
+    def _run_sampler(self):
+        sampler_id = _thread.get_ident()
+        interval = self.interval
+        stop = self._stop
+        while not stop.acquire(timeout=interval):
+            frames = sys._current_frames()
+            del frames[sampler_id]
+            if not self.all_threads:
+                frame = frames.get(self._thread_id)
+                frames = {} if frame is None else {self._thread_id: frame}
+            self._sample(frames)
+
+    def _handle_signal(self, signum, frame):
+        # The handler's own frame is replaced by the interrupted frame.
+        if self.all_threads:
+            frames = sys._current_frames()
+            frames[_thread.get_ident()] = frame
+        else:
+            frames = {self._thread_id: frame}
+        self._sample(frames)
+
+    def _sample(self, frames):
+        now = self._timer()
+        elapsed = now - self._last
+        self._last = now
+        stacks = self._stacks
+        for frame in frames.values():
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            # Hashing the ids is much cheaper than hashing the code objects;
+            # the entry keeps the code objects alive.
+            key = tuple(map(id, codes))
+            entry = stacks.get(key)
+            if entry is None:
+                codes.reverse()
+                stacks[key] = [tuple(codes), 1, elapsed]
+            else:
+                entry[1] += 1
+                entry[2] += elapsed
+        self.sample_count += 1
+
+    def stacks(self):
+        """Return a list of (stack, samples, time) tuples for the sampled
+        stacks, stack being a tuple of code objects, outermost first."""
+        return [tuple(entry) for entry in list(self._stacks.values())]
+
+    def print_stats(self, sort=-1):
+        import pstats
+        if not self._stacks:
+            # pstats rejects empty statistics
+            print("No samples were taken")
+            return
+        pstats.Stats(self).strip_dirs().sort_stats(sort).print_stats()
+
+    def dump_stats(self, file):
+        import marshal
+        with open(file, 'wb') as f:
+            self.create_stats()
+            marshal.dump(self.stats, f)
+
+    def create_stats(self):
+        self.disable()
+        self.snapshot_stats()
+
+    def snapshot_stats(self):
+        """Convert the samples to the statistics of the pstats module.
+
+        The call counts are the numbers of samples in which the functions
+        were found.  The internal time of a function is the time sampled
+        while it was on top of the stack, and its cumulative time the time
+        sampled while it was anywhere on the stack.
+        """
+        stats = {}
+        for codes, samples, elapsed in self.stacks():
+            funcs = [label(code) for code in codes]
+            callee = None
+            seen = set()
+            for func in reversed(funcs):
+                tt = elapsed if callee is None else 0.0
+                if func not in seen:
+                    seen.add(func)
+                    cc, nc, func_tt, ct, callers = stats.get(func) or (
+                        0, 0, 0.0, 0.0, {})
+                    stats[func] = (cc + samples, nc + samples, func_tt + tt,
+                                   ct + elapsed, callers)
+                if callee is not None:
+                    callers = stats[callee][4]
+                    nc, cc, caller_tt, ct = callers.get(func, (0, 0, 0.0, 0.0))
+                    callers[func] = (nc + samples, cc + samples,
+                                     caller_tt + callee_tt, ct + elapsed)
+                callee = func
+                callee_tt = tt
+        self.stats = stats
+
+    def folded(self):
+        """Return the samples in the collapsed stack format of the flame
+        graph tools: a line per stack with the names of the functions from
+        the outermost one, separated by semicolons, followed by the number
+        of samples."""
+        counts = {}
+        for codes, samples, elapsed in self.stacks():
+            stack = ';'.join(map(_frame_name, codes))
+            counts[stack] = counts.get(stack, 0) + samples
+        return ['{} {}'.format(stack, samples)
+                for stack, samples in sorted(counts.items())]
+
+    def dump_folded(self, file):
+        self.disable()
+        with open(file, 'w') as f:
+            for line in self.folded():
+                f.write(line + '\n')
+
+    # The following two methods can be called by clients to use
+    # a profiler to profile a statement, given as a string.
+
+    def run(self, cmd):
+        import __main__
+        dict = __main__.__dict__
+        return self.runctx(cmd, dict, dict)
+
+    def runctx(self, cmd, globals, locals):
+        self.enable()
+        try:
+            exec(cmd, globals, locals)
+        finally:
+            self.disable()
+        return self
+
+    # This method is more useful to profile a single function call.
+    def runcall(self, func, *args, **kw):
+        self.enable()
+        try:
+            return func(*args, **kw)
+        finally:
+            self.disable()
+
+# ____________________________________________________________
+
+def label(code):
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+def _frame_name(code):
+    return '{} ({}:{})'.format(code.co_name, code.co_filename,
+                               code.co_firstlineno)
+
+# ____________________________________________________________
+
+def main():
+    import os
+    import runpy
+    from optparse import OptionParser
+    usage = ("sampleprof.py [-o output_file_path] [-s sort] [-i interval] "
+             "[--folded] [--signal] [-m module | scriptfile] [arg] ...")
+    parser = OptionParser(usage=usage)
+    parser.allow_interspersed_args = False
+    parser.add_option('-o', '--outfile', dest="outfile",
+        help="Save stats to <outfile>", default=None)
+    parser.add_option('-s', '--sort', dest="sort",
+        help="Sort order when printing to stdout, based on pstats.Stats class",
+        default=-1)
+    parser.add_option('-i', '--interval', dest="interval", type="float",
+        help="Sampling interval in milliseconds (default: %default)",
+        default=DEFAULT_INTERVAL * 1000)
+    parser.add_option('--folded', dest="folded", action="store_true",
+        help="Report the collapsed stacks of the flame graph tools",
+        default=False)
+    parser.add_option('--signal', dest="use_signal", action="store_true",
+        help="Sample on SIGPROF, at intervals of CPU time", default=False)
+    parser.add_option('--main-thread', dest="all_threads",
+        action="store_false", help="Only sample the main thread",
+        default=True)
+    parser.add_option('-m', dest="module", action="store_true",
+        help="Profile a library module", default=False)
+
+    if not sys.argv[1:]:
+        parser.print_usage()
+        sys.exit(2)
+
+    (options, args) = parser.parse_args()
+    sys.argv[:] = args
+
+    if len(args) > 0:
+        if options.module:
+            code = "run_module(modname, run_name='__main__')"
+            globs = {
+                'run_module': runpy.run_module,
+                'modname': args[0]
+            }
+        else:
+            progname = args[0]
+            sys.path.insert(0, os.path.dirname(progname))
+            with open(progname, 'rb') as fp:
+                code = compile(fp.read(), progname, 'exec')
+            globs = {
+                '__file__': progname,
+                '__name__': '__main__',
+                '__package__': None,
+                '__cached__': None,
+            }
+        prof = Profile(options.interval / 1000, options.all_threads,
+                       options.use_signal)
+        try:
+            prof.runctx(code, globs, None)
+        except SystemExit:
+            pass
+        finally:
+            if options.folded:
+                if options.outfile is not None:
+                    prof.dump_folded(options.outfile)
+                else:
+                    print('\n'.join(prof.folded()))
+            elif options.outfile is not None:
+                prof.dump_stats(options.outfile)
+            else:
+                prof.print_stats(options.sort)
+    else:
+        parser.print_usage()
+    return parser
+
+# When invoked as main program, invoke the profiler on a script
+if __name__ == '__main__':
+    main()
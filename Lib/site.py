@@ -144,51 +144,165 @@ def _init_pathinfo():
     return d
 
 
-def addpackage(sitedir, name, known_paths):
-    """Process a .pth file within the site-packages directory:
-       For each line in the file, either combine it with sitedir to a path
-       and add that to known_paths, or execute it if it starts with 'import '.
+def _pth_error(n, fullname):
+    print("Error processing line {:d} of {}:\n".format(n+1, fullname),
+          file=sys.stderr)
+    import traceback
+    for record in traceback.format_exception(*sys.exc_info()):
+        for line in record.splitlines():
+            print('  '+line, file=sys.stderr)
+    print("\nRemainder of file ignored", file=sys.stderr)
+
+
+def _processpth(sitedir, name, known_paths, actions):
+    """Process a .pth file, recording its effects in the actions list.
+
+    The actions are (line number, kind, value) tuples, kind being "import"
+    for the executed lines and "path" for the directories, which are only
+    added to sys.path if they exist.  Return False if the file could not be
+    processed entirely.
     """
-    if known_paths is None:
-        known_paths = _init_pathinfo()
-        reset = True
-    else:
-        reset = False
     fullname = os.path.join(sitedir, name)
     try:
         f = open(fullname, "r")
     except OSError:
-        return
+        return False
     with f:
         for n, line in enumerate(f):
             if line.startswith("#"):
                 continue
             try:
                 if line.startswith(("import ", "import\t")):
+                    actions.append((n, "import", line))
                     exec(line)
                     continue
                 line = line.rstrip()
                 dir, dircase = makepath(sitedir, line)
+                actions.append((n, "path", dir))
                 if not dircase in known_paths and os.path.exists(dir):
                     sys.path.append(dir)
                     known_paths.add(dircase)
             except Exception:
-                print("Error processing line {:d} of {}:\n".format(n+1, fullname),
-                      file=sys.stderr)
-                import traceback
-                for record in traceback.format_exception(*sys.exc_info()):
-                    for line in record.splitlines():
-                        print('  '+line, file=sys.stderr)
-                print("\nRemainder of file ignored", file=sys.stderr)
-                break
+                _pth_error(n, fullname)
+                return False
+    return True
+
+
+def _replaypth(sitedir, name, known_paths, actions):
+    """Replay the actions recorded by _processpth() for a .pth file."""
+    for n, kind, value in actions:
+        try:
+            if kind == "import":
+                exec(value)
+            else:
+                # The directories may have been created or removed since
+                # the .pth file was processed: check them again.
+                dircase = os.path.normcase(value)
+                if not dircase in known_paths and os.path.exists(value):
+                    sys.path.append(value)
+                    known_paths.add(dircase)
+        except Exception:
+            _pth_error(n, os.path.join(sitedir, name))
+            break
+
+
+def addpackage(sitedir, name, known_paths):
+    """Process a .pth file within the site-packages directory:
+       For each line in the file, either combine it with sitedir to a path
+       and add that to known_paths, or execute it if it starts with 'import '.
+    """
+    if known_paths is None:
+        known_paths = _init_pathinfo()
+        reset = True
+    else:
+        reset = False
+    _processpth(sitedir, name, known_paths, [])
     if reset:
         known_paths = None
     return known_paths
 
 
+# The site cache maps the site directories to (mtime, pths) tuples, pths
+# listing the (name, mtime, size, actions) of their .pth files.  It is read
+# from and written to the file named by the -X sitecache option or the
+# PYTHONSITECACHE environment variable.
+_SITE_CACHE_TAG = "sitecache"
+_SITE_CACHE_VERSION = 2
+_site_cache = None
+_site_cache_changed = False
+
+
+def _site_cache_file():
+    filename = sys._xoptions.get('sitecache')
+    if filename is None and not sys.flags.ignore_environment:
+        filename = os.environ.get('PYTHONSITECACHE')
+    if not filename or filename is True:
+        return None
+    return filename
+
+
+def _load_site_cache():
+    """Return the site cache, or None if it is disabled."""
+    global _site_cache
+    if _site_cache is None:
+        filename = _site_cache_file()
+        if filename is None:
+            return None
+        import marshal
+        _site_cache = {}
+        try:
+            with open(filename, 'rb') as f:
+                tag, version, cache = marshal.load(f)
+            if (tag == _SITE_CACHE_TAG and version == _SITE_CACHE_VERSION and
+                    isinstance(cache, dict)):
+                _site_cache = cache
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+    return _site_cache
+
+
+def _save_site_cache():
+    """Write the site cache if it was changed, ignoring errors."""
+    global _site_cache_changed
+    if not _site_cache_changed:
+        return
+    _site_cache_changed = False
+    filename = _site_cache_file()
+    if filename is None:
+        return
+    import marshal
+    data = marshal.dumps((_SITE_CACHE_TAG, _SITE_CACHE_VERSION, _site_cache))
+    tmp = '{}.{}'.format(filename, os.getpid())
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, filename)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def _cached_pths(sitedir, entry):
+    """Return the cached .pth files of sitedir if they are up to date."""
+    try:
+        mtime, pths = entry
+        if os.stat(sitedir).st_mtime != mtime:
+            return None
+        for name, mtime, size, actions in pths:
+            st = os.stat(os.path.join(sitedir, name))
+            if st.st_mtime != mtime or st.st_size != size:
+                return None
+    except (OSError, TypeError, ValueError):
+        return None
+    return pths
+
+
 def addsitedir(sitedir, known_paths=None):
     """Add 'sitedir' argument to sys.path if missing and handle .pth files in
     'sitedir'"""
+    global _site_cache_changed
     if known_paths is None:
         known_paths = _init_pathinfo()
         reset = True
@@ -198,13 +312,41 @@ def addsitedir(sitedir, known_paths=None):
     if not sitedircase in known_paths:
         sys.path.append(sitedir)        # Add path component
         known_paths.add(sitedircase)
-    try:
-        names = os.listdir(sitedir)
-    except OSError:
-        return
-    names = [name for name in names if name.endswith(".pth")]
-    for name in sorted(names):
-        addpackage(sitedir, name, known_paths)
+    cache = _load_site_cache()
+    pths = None
+    if cache is not None:
+        pths = _cached_pths(sitedir, cache.get(sitedir))
+    if pths is not None:
+        for name, mtime, size, actions in pths:
+            _replaypth(sitedir, name, known_paths, actions)
+    else:
+        try:
+            if cache is not None:
+                mtime = os.stat(sitedir).st_mtime
+            names = os.listdir(sitedir)
+        except OSError:
+            return
+        names = [name for name in names if name.endswith(".pth")]
+        pths = []
+        cacheable = cache is not None
+        for name in sorted(names):
+            actions = []
+            st = None
+            if cacheable:
+                try:
+                    st = os.stat(os.path.join(sitedir, name))
+                except OSError:
+                    pass
+            if (_processpth(sitedir, name, known_paths, actions) and
+                    st is not None):
+                pths.append((name, st.st_mtime, st.st_size, actions))
+            else:
+                # Don't cache the directory: the errors are reported again
+                # on the next run.
+                cacheable = False
+        if cacheable:
+            cache[sitedir] = (mtime, pths)
+            _site_cache_changed = True
     if reset:
         known_paths = None
     return known_paths
@@ -555,6 +697,7 @@ def main():
         ENABLE_USER_SITE = check_enableusersite()
     known_paths = addusersitepackages(known_paths)
     known_paths = addsitepackages(known_paths)
+    _save_site_cache()
     setquit()
     setcopyright()
     sethelper()
@@ -0,0 +1,297 @@
+"""Tests for httpstreams.py."""
+
+import concurrent.futures
+import gc
+import http.client
+import unittest
+from unittest import mock
+
+import asyncio
+from asyncio import httpstreams
+from test.test_asyncio import utils as test_utils
+
+
+async def echo_handler(request, response):
+    body = await request.read()
+    if request.path == '/error':
+        raise ValueError('handler failure')
+    if request.path == '/missing':
+        response.send_error(404)
+        return
+    if request.path == '/empty':
+        return
+    response.send_response(200)
+    response.send_header('X-Method', request.method)
+    response.send_header('X-Client', str(request.client_address[1]))
+    if request.path == '/stream':
+        response.end_headers()
+        for i in range(3):
+            await response.write(b'part %d\n' % i)
+        return
+    data = request.path.encode('ascii') + b'\n' + body
+    response.send_header('Content-Length', str(len(data)))
+    response.end_headers()
+    await response.write(data)
+
+
+async def async_body():
+    for i in range(3):
+        yield b'chunk %d;' % i
+
+
+class HTTPStreamsTests(test_utils.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        self.set_event_loop(self.loop)
+        self.servers = []
+        self.connections = []
+
+    def tearDown(self):
+        for conn in self.connections:
+            conn.close()
+        for server in self.servers:
+            server.close()
+            self.loop.run_until_complete(server.wait_closed())
+        # let the request handlers see the end of their connections
+        for i in range(5):
+            test_utils.run_briefly(self.loop)
+
+        self.loop.close()
+        gc.collect()
+        super().tearDown()
+
+    def start_server(self, handler=echo_handler, **kwds):
+        server = self.loop.run_until_complete(httpstreams.start_http_server(
+            handler, '127.0.0.1', 0, loop=self.loop, **kwds))
+        self.servers.append(server)
+        return server.sockets[0].getsockname()[:2]
+
+    def connect(self, address):
+        conn = self.loop.run_until_complete(
+            httpstreams.open_http_connection(*address, loop=self.loop))
+        self.connections.append(conn)
+        return conn
+
+    def test_keep_alive(self):
+        conn = self.connect(self.start_server())
+
+        async def go():
+            clients = set()
+            for i in range(3):
+                response = await conn.request('GET', '/path%d' % i)
+                self.assertEqual(response.status, 200)
+                self.assertEqual(response.reason, 'OK')
+                self.assertEqual(response.version, 11)
+                self.assertFalse(response.will_close)
+                self.assertEqual(await response.read(), b'/path%d\n' % i)
+                self.assertTrue(response.at_eof())
+                clients.add(response.getheader('X-Client'))
+            # the same connection was used for all the requests
+            self.assertEqual(len(clients), 1)
+
+        self.loop.run_until_complete(go())
+
+    def test_request_body(self):
+        conn = self.connect(self.start_server())
+
+        async def go():
+            response = await conn.request('POST', '/post', b'data')
+            self.assertEqual(await response.read(), b'/post\ndata')
+            response = await conn.request('PUT', '/put', 'text')
+            self.assertEqual(await response.read(), b'/put\ntext')
+            response = await conn.request('POST', '/chunked', async_body())
+            self.assertEqual(await response.read(),
+                             b'/chunked\nchunk 0;chunk 1;chunk 2;')
+            response = await conn.request('POST', '/iterable',
+                                          [b'a', b'', b'b'])
+            self.assertEqual(await response.read(), b'/iterable\nab')
+
+        self.loop.run_until_complete(go())
+
+    def test_streaming_response(self):
+        conn = self.connect(self.start_server())
+
+        async def go():
+            response = await conn.request('GET', '/stream')
+            self.assertEqual(response.getheader('Transfer-Encoding'),
+                             'chunked')
+            parts = []
+            async for data in response:
+                parts.append(data)
+            self.assertEqual(b''.join(parts), b'part 0\npart 1\npart 2\n')
+            # an unread response is discarded by the next request
+            await conn.request('GET', '/stream')
+            response = await conn.request('HEAD', '/path')
+            self.assertEqual(response.getheader('X-Method'), 'HEAD')
+            self.assertEqual(await response.read(), b'')
+            response = await conn.request('GET', '/empty')
+            self.assertEqual(response.status, 204)
+            self.assertEqual(await response.read(), b'')
+            response = await conn.request('GET', '/path')
+            self.assertEqual(await response.read(), b'/path\n')
+
+        self.loop.run_until_complete(go())
+
+    def test_errors(self):
+        conn = self.connect(self.start_server())
+
+        async def go():
+            response = await conn.request('GET', '/missing')
+            self.assertEqual(response.status, 404)
+            self.assertTrue(response.will_close)
+            await response.read()
+            with mock.patch('asyncio.httpstreams.logger') as m_log:
+                # the connection is re-established
+                response = await conn.request('GET', '/error')
+                self.assertEqual(response.status, 500)
+                m_log.exception.assert_called_once()
+
+        self.loop.run_until_complete(go())
+
+    def test_blocking_client(self):
+        # the server can be used with http.client
+        address = self.start_server()
+
+        def request():
+            conn = http.client.HTTPConnection(*address)
+            try:
+                conn.request('POST', '/post', body=iter([b'x', b'y']))
+                response = conn.getresponse()
+                data = response.read()
+                conn.request('GET', '/stream')
+                return data, conn.getresponse().read()
+            finally:
+                conn.close()
+
+        executor = concurrent.futures.ThreadPoolExecutor(1)
+        self.addCleanup(executor.shutdown)
+        result = self.loop.run_until_complete(
+            self.loop.run_in_executor(executor, request))
+        self.assertEqual(result, (b'/post\nxy', b'part 0\npart 1\npart 2\n'))
+
+    def test_bad_request(self):
+        address = self.start_server()
+
+        async def go():
+            reader, writer = await asyncio.open_connection(*address,
+                                                           loop=self.loop)
+            writer.write(b'GET / HTTP/2.0\r\n\r\n')
+            data = await reader.read()
+            writer.close()
+            return data
+
+        data = self.loop.run_until_complete(go())
+        self.assertTrue(data.startswith(b'HTTP/1.1 505 '))
+
+    def raw_request(self, address, request):
+        async def go():
+            reader, writer = await asyncio.open_connection(*address,
+                                                           loop=self.loop)
+            writer.write(request)
+            data = await reader.read()
+            writer.close()
+            return data
+
+        return self.loop.run_until_complete(go())
+
+    def test_head_too_large(self):
+        address = self.start_server(limit=256)
+        data = self.raw_request(
+            address, b'GET / HTTP/1.1\r\nX-Large: ' + b'x' * 512)
+        self.assertTrue(data.startswith(b'HTTP/1.1 431 '))
+
+    def test_incomplete_head(self):
+        address = self.start_server()
+
+        async def go():
+            reader, writer = await asyncio.open_connection(*address,
+                                                           loop=self.loop)
+            writer.write(b'GET / HTTP/1.1\r\nHost: localhost\r\n')
+            writer.write_eof()
+            data = await reader.read()
+            writer.close()
+            return data
+
+        # the connection is closed without a response
+        self.assertEqual(self.loop.run_until_complete(go()), b'')
+
+    def test_transfer_codings(self):
+        address = self.start_server()
+        # only the last transfer coding must be "chunked"
+        data = self.raw_request(address,
+                                b'POST /post HTTP/1.1\r\n'
+                                b'Transfer-Encoding: gzip, Chunked\r\n'
+                                b'Connection: close\r\n\r\n'
+                                b'4\r\nbody\r\n0\r\n\r\n')
+        self.assertTrue(data.startswith(b'HTTP/1.1 200 '))
+        self.assertTrue(data.endswith(b'\r\n\r\n/post\nbody'))
+        # no request smuggling with a body of unknown length
+        data = self.raw_request(address,
+                                b'POST /post HTTP/1.1\r\n'
+                                b'Transfer-Encoding: chunked, gzip\r\n'
+                                b'\r\n'
+                                b'GET /stream HTTP/1.1\r\n\r\n')
+        self.assertTrue(data.startswith(b'HTTP/1.1 400 '))
+        self.assertNotIn(b'part 0', data)
+
+    def test_response_transfer_codings(self):
+        async def handler(request, response):
+            response.send_response(200)
+            response.send_header('Transfer-Encoding',
+                                 request.path.lstrip('/'))
+            response.end_headers()
+            await response.write(b'data')
+
+        conn = self.connect(self.start_server(handler))
+
+        async def go(transfer_encoding):
+            response = await conn.request('GET', '/' + transfer_encoding)
+            return response.will_close, await response.read()
+
+        self.assertEqual(self.loop.run_until_complete(go('gzip,chunked')),
+                         (False, b'data'))
+        # without chunked coding, the body ends with the connection
+        self.assertEqual(self.loop.run_until_complete(go('gzip')),
+                         (True, b'data'))
+
+    def test_http10_client(self):
+        address = self.start_server()
+
+        async def go():
+            reader, writer = await asyncio.open_connection(*address,
+                                                           loop=self.loop)
+            writer.write(b'GET /stream HTTP/1.0\r\n\r\n')
+            data = await reader.read()
+            writer.close()
+            return data
+
+        data = self.loop.run_until_complete(go())
+        # without chunked transfer coding, the connection is closed
+        self.assertTrue(data.startswith(b'HTTP/1.1 200 '))
+        self.assertTrue(data.endswith(b'\r\n\r\npart 0\npart 1\npart 2\n'))
+
+    def test_http10_server(self):
+        with test_utils.run_test_server() as httpd:
+            conn = self.connect(httpd.address)
+
+            async def go():
+                response = await conn.request('GET', '/')
+                self.assertEqual(response.status, 200)
+                return await response.read()
+
+            self.assertEqual(self.loop.run_until_complete(go()),
+                             b'Test message')
+
+    def test_remote_disconnected(self):
+        async def handler(request, response):
+            raise ConnectionResetError
+
+        conn = self.connect(self.start_server(handler))
+        with self.assertRaises(http.client.RemoteDisconnected):
+            self.loop.run_until_complete(conn.request('GET', '/'))
+
+
+if __name__ == '__main__':
+    unittest.main()
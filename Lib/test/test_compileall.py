@@ -11,6 +11,7 @@ import tempfile
 import time
 import unittest
 import io
+import marshal
 
 from unittest import mock, skipUnless
 try:
@@ -161,6 +162,101 @@ class CompileallTests(unittest.TestCase):
         self.assertRegex(line, r'Listing ([^WindowsPath|PosixPath].*)')
         self.assertTrue(os.path.isfile(self.bc_path))
 
+    def test_compile_dir_cache(self):
+        cache = {}
+        stats = {}
+        self.assertTrue(compileall.compile_dir(self.directory, quiet=2,
+                                               cache=cache, stats=stats))
+        self.assertEqual(stats, {'compiled': 3})
+        entry = cache[self.source_path]
+        self.assertEqual(entry[:3], (self.bc_path, None,
+            py_compile.PycInvalidationMode.TIMESTAMP.value))
+        with open(self.source_path, 'rb') as f:
+            self.assertEqual(entry[-1], importlib.util.source_hash(f.read()))
+
+        # The pycs are not opened for the files unchanged since then
+        stats.clear()
+        with mock.patch('compileall.open', create=True) as open_mock:
+            compileall.compile_dir(self.directory, quiet=2, cache=cache,
+                                   stats=stats)
+            open_mock.assert_not_called()
+        self.assertEqual(stats, {'up_to_date': 3})
+
+        # A modified file is compiled again
+        stats.clear()
+        with open(self.source_path, 'w') as file:
+            file.write('x = 456\n')
+        os.utime(self.source_path, (1, 1))
+        compileall.compile_dir(self.directory, quiet=2, cache=cache,
+                               stats=stats)
+        self.assertEqual(stats, {'compiled': 1, 'up_to_date': 2})
+        self.assertEqual(cache[self.source_path][3], 1)
+
+        # So is a file whose pyc was removed
+        stats.clear()
+        os.unlink(self.bc_path2)
+        compileall.compile_dir(self.directory, quiet=2, cache=cache,
+                               stats=stats)
+        self.assertEqual(stats, {'compiled': 1, 'up_to_date': 2})
+        self.assertTrue(os.path.isfile(self.bc_path2))
+
+    def test_compile_file_cache_hash(self):
+        mode = py_compile.PycInvalidationMode.CHECKED_HASH
+        cache = {}
+        compileall.compile_file(self.source_path, quiet=2, cache=cache,
+                                invalidation_mode=mode)
+        # Hash-based pycs stay valid while the contents are the same
+        stats = {}
+        os.utime(self.source_path, (1, 1))
+        compileall.compile_file(self.source_path, quiet=2, cache=cache,
+                                invalidation_mode=mode, stats=stats)
+        self.assertEqual(stats, {'up_to_date': 1})
+        self.assertEqual(cache[self.source_path][3], 1)
+        # The invalidation mode is part of the entry
+        compileall.compile_file(self.source_path, quiet=2, cache=cache,
+                                stats=stats)
+        self.assertEqual(stats, {'up_to_date': 1, 'compiled': 1})
+
+    def test_compile_file_cache_error(self):
+        self.add_bad_source_file()
+        cache = {}
+        stats = {}
+        self.assertFalse(compileall.compile_file(self.bad_source_path,
+                                                 quiet=2, cache=cache,
+                                                 stats=stats))
+        self.assertEqual(cache, {})
+        self.assertEqual(stats, {'failed': 1})
+
+    def test_read_write_cache(self):
+        filename = os.path.join(self.directory, 'cache')
+        self.assertEqual(compileall.read_cache(filename), {})
+        cache = {}
+        compileall.compile_dir(self.directory, quiet=2, cache=cache)
+        compileall.write_cache(filename, cache)
+        self.assertEqual(compileall.read_cache(filename), cache)
+        with open(filename, 'wb') as file:
+            file.write(b'garbage')
+        self.assertEqual(compileall.read_cache(filename), {})
+
+    @skipUnless(_have_multiprocessing, "requires multiprocessing")
+    def test_compile_workers_cache(self):
+        cache = {}
+        stats = {}
+        self.assertTrue(compileall.compile_dir(self.directory, quiet=2,
+                                               workers=2, cache=cache,
+                                               stats=stats))
+        self.assertEqual(stats, {'compiled': 3})
+        self.assertEqual(sorted(cache), sorted([self.source_path,
+                                                self.source_path2,
+                                                self.source_path3]))
+        self.add_bad_source_file()
+        stats.clear()
+        self.assertFalse(compileall.compile_dir(self.directory, quiet=2,
+                                                workers=2, cache=cache,
+                                                stats=stats))
+        self.assertEqual(stats, {'up_to_date': 3, 'failed': 1})
+        self.assertNotIn(self.bad_source_path, cache)
+
     @mock.patch('compileall.ProcessPoolExecutor')
     def test_compile_pool_called(self, pool_mock):
         compileall.compile_dir(self.directory, quiet=True, workers=5)
@@ -532,6 +628,79 @@ class CommandLineTests(unittest.TestCase):
             data = fp.read()
         self.assertEqual(int.from_bytes(data[4:8], 'little'), 0b01)
 
+    def test_manifest(self):
+        manifest = os.path.join(self.directory, 'manifest')
+        script_helper.make_script(self.pkgdir, 'f1', 'x = 1')
+        self.assertRunOK('-q', '--manifest', manifest, self.pkgdir)
+        # the source is not checked for the modules in the manifest
+        fn = script_helper.make_script(self.pkgdir, 'f1', 'x = 2')
+        os.utime(fn, (time.time() + 60,) * 2)
+        script = script_helper.make_script(self.directory, 'run',
+                                           'import foo.f1; print(foo.f1.x)')
+        for args, env, x in [
+                (['-X', 'pycmanifest=' + manifest], {}, b'1'),
+                ([], {'PYTHONPYCMANIFEST': manifest}, b'1'),
+                (['-E'], {'PYTHONPYCMANIFEST': manifest}, b'2'),
+                ([], {}, b'2')]:
+            with self.subTest(args=args, env=env):
+                rc, out, err = script_helper.assert_python_ok(
+                    *args, script, __isolated=False,
+                    PYTHONDONTWRITEBYTECODE='1', **env)
+                self.assertEqual(out.strip(), x)
+
+    def test_manifest_optimization_level(self):
+        # only the bytecode of the optimization level of compileall is
+        # trusted
+        manifest = os.path.join(self.directory, 'manifest')
+        script_helper.make_script(self.pkgdir, 'f1', 'x = 1')
+        script_helper.assert_python_ok('-O', '-S', '-m', 'compileall', '-q',
+                                       '--manifest', manifest, self.pkgdir)
+        self.assertRunOK('-q', self.pkgdir)
+        source = os.path.join(self.pkgdir, 'f1.py')
+        with open(manifest, 'rb') as f:
+            pycs = marshal.load(f)[2]
+        self.assertIn(importlib.util.cache_from_source(source, optimization=1),
+                      pycs)
+        self.assertNotIn(importlib.util.cache_from_source(source,
+                                                          optimization=''),
+                         pycs)
+        fn = script_helper.make_script(self.pkgdir, 'f1', 'x = 2')
+        os.utime(fn, (time.time() + 60,) * 2)
+        script = script_helper.make_script(self.directory, 'run',
+                                           'import foo.f1; print(foo.f1.x)')
+        for args, x in [(['-O'], b'1'), ([], b'2'), (['-OO'], b'2')]:
+            with self.subTest(args=args):
+                rc, out, err = script_helper.assert_python_ok(
+                    *args, '-X', 'pycmanifest=' + manifest, script,
+                    __isolated=False, PYTHONDONTWRITEBYTECODE='1')
+                self.assertEqual(out.strip(), x)
+
+    def test_manifest_compile_error(self):
+        manifest = os.path.join(self.directory, 'manifest')
+        script_helper.make_script(self.pkgdir, 'bing', 'syntax(error')
+        rc, out, err = self.assertRunNotOK('-q', '--manifest', manifest,
+                                           self.pkgdir)
+        self.assertRegex(out, b'Not writing the manifest')
+        self.assertFalse(os.path.exists(manifest))
+        rc, out, err = self.assertRunNotOK('-b', '--manifest', manifest,
+                                           self.pkgdir)
+        self.assertRegex(err, b'cannot be used with -b')
+
+    def test_cache(self):
+        cache = os.path.join(self.directory, 'cache')
+        out = self.assertRunOK('-q', '--cache', cache, '--stats', self.pkgdir)
+        self.assertEqual(out, b'')
+        self.assertCompiled(self.barfn)
+        out = self.assertRunOK('--cache', cache, '--stats', self.pkgdir)
+        self.assertNotIn(b'Compiling', out)
+        self.assertIn(b'0 compiled, 2 up to date, 0 failed', out)
+        # -f ignores the cache, but updates it
+        out = self.assertRunOK('-f', '--cache', cache, '--stats',
+                               self.pkgdir)
+        self.assertIn(b'2 compiled, 0 up to date, 0 failed', out)
+        out = self.assertRunOK('--cache', cache, '--stats', self.pkgdir)
+        self.assertIn(b'0 compiled, 2 up to date, 0 failed', out)
+
     @skipUnless(_have_multiprocessing, "requires multiprocessing")
     def test_workers(self):
         bar2fn = script_helper.make_script(self.directory, 'bar2', '')
@@ -1,7 +1,9 @@
 """Test suite for the cProfile module."""
 
 import sys
-from test.support import run_unittest, TESTFN, unlink
+import threading
+import weakref
+from test.support import run_unittest, TESTFN, unlink, gc_collect
 
 # rip off all interesting stuff from test_profile
 import cProfile
@@ -49,6 +51,124 @@ class CProfileTest(ProfileTest):
         # Test successful run
         assert_python_ok('-m', 'cProfile', '-m', 'timeit', '-n', '1')
 
+    def make_timer(self):
+        # A timer only advanced by the returned tick() function
+        now = 0
+        def timer():
+            return now
+        def tick(n):
+            nonlocal now
+            now += n
+        return timer, tick
+
+    def test_all_threads(self):
+        timer, tick = self.make_timer()
+        go = threading.Event()
+        def waiter():
+            go.wait()
+            tick(7)
+        # A thread running before the profiler is enabled
+        before = threading.Thread(target=waiter)
+        before.start()
+        prof = self.profilerclass(timer, 1.0, allthreads=True)
+        prof.enable()
+        try:
+            self.assertIs(sys.getprofile(), prof)
+            after = threading.Thread(target=tick, args=(5,))
+            after.start()
+            after.join()
+            go.set()
+            before.join()
+            tick(3)
+        finally:
+            prof.disable()
+        self.assertIsNone(sys.getprofile())
+        self.assertIsNone(threading._profile_hook)
+
+        threads = prof.getthreadstats()
+        self.assertEqual(threads[after.ident], 5)
+        self.assertEqual(threads[before.ident], 7)
+        self.assertGreaterEqual(threads[threading.get_ident()], 3)
+        prof.snapshot_stats()
+        cc, nc, tt, ct, callers = prof.stats[cProfile.label(tick.__code__)]
+        self.assertEqual((nc, tt), (3, 15))
+
+    def test_calling_thread_only(self):
+        timer, tick = self.make_timer()
+        prof = self.profilerclass(timer, 1.0)
+        prof.enable()
+        try:
+            thread = threading.Thread(target=tick, args=(5,))
+            thread.start()
+            thread.join()
+            tick(3)
+        finally:
+            prof.disable()
+        self.assertEqual(list(prof.getthreadstats()), [threading.get_ident()])
+        prof.snapshot_stats()
+        cc, nc, tt, ct, callers = prof.stats[cProfile.label(tick.__code__)]
+        self.assertEqual((nc, tt), (1, 3))
+
+    def test_tasks(self):
+        import asyncio
+        timer, tick = self.make_timer()
+        async def work(n):
+            tick(n)
+            await asyncio.sleep(0)
+            tick(n)
+        async def main():
+            tasks = [asyncio.ensure_future(work(n)) for n in (1, 10)]
+            await asyncio.wait(tasks)
+            return [asyncio.current_task()] + tasks
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        prof = self.profilerclass(timer, 1.0,
+                                  taskfunc=asyncio.current_task)
+        main_task, task1, task2 = prof.runcall(loop.run_until_complete,
+                                               main())
+        self.assertEqual(prof.gettaskstats(),
+                         {main_task: 0, task1: 2, task2: 20})
+        prof.reset()
+        self.assertEqual(prof.gettaskstats(), {})
+        self.assertRaises(TypeError, self.profilerclass, taskfunc=42)
+
+    def test_reset(self):
+        timer, tick = self.make_timer()
+        prof = self.profilerclass(timer, 1.0)
+        def outer():
+            tick(1)
+            prof.snapshot_stats(reset=True)
+            tick(4)
+        prof.enable()
+        try:
+            outer()
+            self.assertIs(sys.getprofile(), prof)
+        finally:
+            prof.disable()
+        tick_label = cProfile.label(tick.__code__)
+        outer_label = cProfile.label(outer.__code__)
+        # The call to outer() was in progress during the snapshot
+        self.assertEqual(prof.stats[tick_label][:4], (1, 1, 1, 1))
+        self.assertNotIn(outer_label, prof.stats)
+        prof.snapshot_stats()
+        self.assertEqual(prof.stats[tick_label][:4], (1, 1, 4, 4))
+        self.assertEqual(prof.stats[outer_label][:4], (1, 1, 0, 4))
+
+    def test_gc(self):
+        # The profilers in reference cycles are collected
+        def cycle_through_taskfunc():
+            prof = self.profilerclass(taskfunc=lambda: prof)
+            return prof
+        def cycle_through_timer():
+            prof = self.profilerclass(timer=lambda: len(prof.__dict__))
+            prof.runcall(int)
+            return prof
+        for make_cycle in (cycle_through_taskfunc, cycle_through_timer):
+            with self.subTest(make_cycle.__name__):
+                ref = weakref.ref(make_cycle())
+                gc_collect()
+                self.assertIsNone(ref())
+
 
 def test_main():
     run_unittest(CProfileTest)
@@ -601,6 +601,95 @@ class CookieTests(unittest.TestCase):
                          {})
         self.assertEqual(cookie.expires, 1444312383)
 
+    def test_clear_expired_cookies(self):
+        c = CookieJar()
+        now = int(time.time())
+        def set_cookie(name, domain, expires):
+            c.set_cookie(Cookie(0, name, "value", None, False, domain,
+                                False, False, "/", False, False, expires,
+                                False, None, None, {}))
+        set_cookie("old", "www.acme.com", now - 10)
+        set_cookie("new", "www.acme.com", now + 3600)
+        set_cookie("session", "www.acme.com", None)
+        c.clear_expired_cookies()
+        self.assertEqual(sorted(cookie.name for cookie in c),
+                         ["new", "session"])
+
+        # replaced cookies and cookies whose expiry time was extended
+        set_cookie("new", "www.acme.com", now - 10)
+        set_cookie("other", "www.acme.com", now - 10)
+        c._cookies["www.acme.com"]["/"]["other"].expires = now + 3600
+        c.clear_expired_cookies()
+        self.assertEqual(sorted(cookie.name for cookie in c),
+                         ["other", "session"])
+        c.clear("www.acme.com", "/", "other")
+        c.clear_expired_cookies()
+        self.assertEqual(len(c), 1)
+
+        # cookies set after the jar was cleared
+        c.clear()
+        set_cookie("old", "www.acme.com", now - 10)
+        c.clear_expired_cookies()
+        self.assertEqual(len(c), 0)
+
+        # cookies whose expiry time was brought forward and which were set
+        # again
+        set_cookie("new", "www.acme.com", now + 3600)
+        set_cookie("session", "www.acme.com", None)
+        c.clear_expired_cookies()
+        self.assertEqual(len(c), 2)
+        for cookie in list(c):
+            cookie.expires = now - 10
+            c.set_cookie(cookie)
+        c.clear_expired_cookies()
+        self.assertEqual(len(c), 0)
+
+        # expires remains a plain attribute
+        set_cookie("new", "www.acme.com", now + 3600)
+        cookie, = c
+        self.assertEqual(vars(cookie)["expires"], now + 3600)
+
+    def test_expiry_heap_rebuilt(self):
+        # the stale entries of replaced cookies don't accumulate
+        c = CookieJar()
+        c.clear_expired_cookies()
+        now = int(time.time())
+        for i in range(1000):
+            c.set_cookie(Cookie(0, "spam", "value", None, False,
+                                "www.acme.com", False, False, "/", False,
+                                False, now + 3600 + i, False, None, None, {}))
+        self.assertEqual(len(c), 1)
+        self.assertLessEqual(len(c._expiry_heap), 2 * len(c) + 64)
+
+    def test_many_domains(self):
+        # only the domains and paths matching the request are examined,
+        # with the same result as a full scan
+        class ScanningPolicy(DefaultCookiePolicy):
+            def domain_return_ok(self, domain, request):
+                checked.append(domain)
+                return super().domain_return_ok(domain, request)
+        checked = []
+        c = CookieJar()
+        scan = CookieJar(ScanningPolicy())
+        headers = ['spam%d=1; path=/%d' % (i, i) for i in range(50)]
+        headers.append('eggs=1; domain=.acme.com')
+        headers.append('ham=1; domain=acme.com; path=/3/x')
+        # same path length as eggs, but in a domain stored after .acme.com
+        headers.append('bacon=1')
+        for i in range(20):
+            url = "http://www%d.acme.com/" % i
+            interact_netscape(c, url, *headers)
+            interact_netscape(scan, url, *headers)
+        self.assertEqual(len(c), len(scan))
+        self.assertEqual(len(c), 20 * 51 + 2)
+        for url in ["http://www3.acme.com/3/xyz", "http://www3.acme.com/",
+                    "http://acme.com/3/x", "http://www.acme.com/3/",
+                    "http://www3.acme.com:80/31", "http://www33.acme.com/"]:
+            del checked[:]
+            self.assertEqual(interact_netscape(c, url),
+                             interact_netscape(scan, url))
+            self.assertEqual(len(checked), 21)
+
         # XXX RFC 2965 expiry rules (some apply to V0 too)
 
     def test_default_path(self):
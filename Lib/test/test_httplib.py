@@ -6,6 +6,19 @@ import os
 import array
 import socket
 import threading
+try:
+    import bz2
+except ImportError:
+    bz2 = None
+try:
+    import gzip
+    import zlib
+except ImportError:
+    gzip = zlib = None
+try:
+    import lzma
+except ImportError:
+    lzma = None
 
 import unittest
 TestCase = unittest.TestCase
@@ -1300,6 +1313,186 @@ class ExtendedReadTestChunked(ExtendedReadTest):
     )
 
 
+@unittest.skipUnless(gzip, 'requires gzip')
+class ExtendedReadTestGzip(ExtendedReadTest):
+    """
+    Test peek(), read1(), readline() with a decoded gzip body
+    """
+    lines_expected = ExtendedReadTest.lines_expected
+    if gzip:
+        lines = (b'HTTP/1.1 200 OK\r\n'
+                 b'Content-Encoding: gzip\r\n\r\n' +
+                 gzip.compress(lines_expected))
+
+    def setUp(self):
+        sock = FakeSocket(self.lines)
+        resp = client.HTTPResponse(sock, method="GET", decode_content=True)
+        resp.begin()
+        resp.fp = io.BufferedReader(resp.fp)
+        self.resp = resp
+
+
+class ContentDecodingTest(TestCase):
+    body = b''.join(b'line %d of the response body\n' % i
+                    for i in range(10000))
+
+    def make_response(self, coded_body, coding, chunked=False,
+                      decode_content=True, method='GET'):
+        headers = b'HTTP/1.1 200 OK\r\nContent-Encoding: %s\r\n' % coding
+        if chunked:
+            headers += b'Transfer-Encoding: chunked\r\n\r\n'
+            n = 1000
+            body = b''.join(b'%x\r\n%s\r\n' % (len(coded_body[i:i+n]),
+                                                coded_body[i:i+n])
+                            for i in range(0, len(coded_body), n))
+            body += b'0\r\n\r\n'
+        else:
+            headers += b'Content-Length: %d\r\n\r\n' % len(coded_body)
+            body = coded_body
+        sock = FakeSocket(headers + body + b'extra data')
+        resp = client.HTTPResponse(sock, method=method,
+                                   decode_content=decode_content)
+        resp.begin()
+        return sock, resp
+
+    def check_decoding(self, coded_body, coding):
+        for chunked in (False, True):
+            with self.subTest(chunked=chunked):
+                sock, resp = self.make_response(coded_body, coding, chunked)
+                self.assertEqual(resp.read(), self.body)
+                self.assertTrue(resp.isclosed())
+                # the connection can be reused
+                self.assertEqual(sock.file.read(), b'extra data')
+
+                sock, resp = self.make_response(coded_body, coding, chunked)
+                parts = []
+                while True:
+                    data = resp.read(1000)
+                    if not data:
+                        break
+                    if len(parts) < len(self.body) // 1000:
+                        self.assertEqual(len(data), 1000)
+                    parts.append(data)
+                self.assertEqual(b''.join(parts), self.body)
+                self.assertTrue(resp.isclosed())
+
+    @unittest.skipUnless(gzip, 'requires gzip')
+    def test_gzip(self):
+        self.check_decoding(gzip.compress(self.body), b'gzip')
+        self.check_decoding(gzip.compress(self.body), b'x-gzip')
+
+    @unittest.skipUnless(zlib, 'requires zlib')
+    def test_deflate(self):
+        self.check_decoding(zlib.compress(self.body), b'deflate')
+        # raw deflate data is decoded as well
+        compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        raw = compressor.compress(self.body) + compressor.flush()
+        self.check_decoding(raw, b'deflate')
+
+    @unittest.skipUnless(bz2, 'requires bz2')
+    def test_bzip2(self):
+        self.check_decoding(bz2.compress(self.body), b'bzip2')
+
+    @unittest.skipUnless(lzma, 'requires lzma')
+    def test_xz(self):
+        self.check_decoding(lzma.compress(self.body), b'xz')
+
+    @unittest.skipUnless(gzip, 'requires gzip')
+    def test_readinto_read1(self):
+        sock, resp = self.make_response(gzip.compress(self.body), b'gzip',
+                                        chunked=True)
+        b = bytearray(4096)
+        n = resp.readinto(b)
+        self.assertEqual(n, 4096)
+        self.assertEqual(b, self.body[:4096])
+        data = resp.read1(100)
+        self.assertEqual(data, self.body[4096:4196])
+        parts = [data]
+        while True:
+            data = resp.read1()
+            if not data:
+                break
+            self.assertLessEqual(len(data), client._DECODE_BLOCKSIZE)
+            parts.append(data)
+        self.assertEqual(b''.join(parts), self.body[4096:])
+        self.assertEqual(resp.readinto(b), 0)
+
+    @unittest.skipUnless(gzip, 'requires gzip')
+    def test_disabled(self):
+        coded_body = gzip.compress(self.body)
+        sock, resp = self.make_response(coded_body, b'gzip',
+                                        decode_content=False)
+        self.assertEqual(resp.read(), coded_body)
+
+    @unittest.skipUnless(gzip, 'requires gzip')
+    def test_coding_list(self):
+        self.check_decoding(gzip.compress(self.body), b'gzip, identity')
+        self.check_decoding(gzip.compress(self.body), b'identity,GZIP')
+
+    @unittest.skipUnless(gzip and bz2, 'requires gzip and bz2')
+    def test_several_codings(self):
+        self.check_decoding(gzip.compress(bz2.compress(self.body)),
+                            b'bzip2, gzip')
+
+    def test_unknown_coding(self):
+        sock, resp = self.make_response(b'spam', b'br')
+        self.assertEqual(resp.read(), b'spam')
+        sock, resp = self.make_response(b'spam', b'gzip, br')
+        self.assertEqual(resp.read(), b'spam')
+
+    @unittest.skipUnless(gzip, 'requires gzip')
+    def test_read_after_close(self):
+        sock, resp = self.make_response(gzip.compress(self.body), b'gzip')
+        self.assertEqual(resp.read(100), self.body[:100])
+        resp.close()
+        self.assertEqual(resp.read(), b'')
+        self.assertEqual(resp.read(100), b'')
+        self.assertEqual(resp.read1(), b'')
+        self.assertEqual(resp.readinto(bytearray(10)), 0)
+
+    @unittest.skipUnless(gzip, 'requires gzip')
+    def test_head(self):
+        sock, resp = self.make_response(b'', b'gzip', method='HEAD')
+        self.assertEqual(resp.read(), b'')
+
+    @unittest.skipUnless(gzip, 'requires gzip')
+    def test_truncated(self):
+        coded_body = gzip.compress(self.body)
+        sock = FakeSocket(b'HTTP/1.1 200 OK\r\nContent-Encoding: gzip\r\n'
+                          b'Connection: close\r\n\r\n' +
+                          coded_body[:len(coded_body) // 2])
+        resp = client.HTTPResponse(sock, method='GET', decode_content=True)
+        resp.begin()
+        self.assertRaises(client.IncompleteRead, resp.read)
+
+    def test_accept_encoding(self):
+        conn = client.HTTPConnection('example.com')
+        conn.sock = FakeSocket(None)
+        conn.request('GET', '/')
+        self.assertIn(b'Accept-Encoding: identity\r\n', conn.sock.data)
+
+        conn = client.HTTPConnection('example.com')
+        conn.decode_content = True
+        conn.sock = FakeSocket(None)
+        conn.request('GET', '/')
+        expected = b'gzip, deflate, identity' if zlib else b'identity'
+        self.assertIn(b'Accept-Encoding: ' + expected + b'\r\n',
+                      conn.sock.data)
+
+    @unittest.skipUnless(gzip, 'requires gzip')
+    def test_getresponse(self):
+        coded_body = gzip.compress(self.body)
+        conn = client.HTTPConnection('example.com')
+        conn.decode_content = True
+        conn.sock = FakeSocket(b'HTTP/1.1 200 OK\r\n'
+                               b'Content-Encoding: gzip\r\n'
+                               b'Content-Length: %d\r\n\r\n' %
+                               len(coded_body) + coded_body)
+        conn.request('GET', '/')
+        resp = conn.getresponse()
+        self.assertEqual(resp.read(), self.body)
+
+
 class Readliner:
     """
     a simple readline class that uses an arbitrary read function and buffering
@@ -1564,6 +1757,148 @@ class PersistenceTest(TestCase):
         self.assertEqual(conn.connections, 2)
 
 
+class PipeliningTest(TestCase):
+
+    responses = (
+        'HTTP/1.1 200 OK\r\n'
+        'Content-Length: 5\r\n'
+        '\r\n'
+        'first'
+        'HTTP/1.1 200 OK\r\n'
+        'Content-Length: 6\r\n'
+        '\r\n'
+        'HTTP/1.1 200 OK\r\n'
+        'Transfer-Encoding: chunked\r\n'
+        '\r\n'
+        '5\r\n'
+        'third\r\n'
+        '0\r\n'
+        '\r\n'
+    )
+
+    def test_pipelining(self):
+        conn = FakeSocketHTTPConnection(self.responses)
+        conn.pipelining = True
+        conn.request('GET', '/first')
+        conn.request('HEAD', '/second')
+        conn.request('GET', '/third')
+        self.assertEqual(conn.sock.data.count(b' HTTP/1.1\r\n'), 3)
+        response = conn.getresponse()
+        # the previous response must be read first
+        self.assertRaises(client.ResponseNotReady, conn.getresponse)
+        self.assertEqual(response.read(), b'first')
+        response = conn.getresponse()
+        self.assertEqual(response.getheader('Content-Length'), '6')
+        self.assertEqual(response.read(), b'')
+        conn.request('GET', '/fourth')
+        self.assertEqual(conn.getresponse().read(), b'third')
+        self.assertEqual(conn.connections, 1)
+        # no response was sent for the fourth request
+        self.assertRaises(client.RemoteDisconnected, conn.getresponse)
+        self.assertIsNone(conn.sock)
+        self.assertRaises(client.ResponseNotReady, conn.getresponse)
+
+    def test_will_close(self):
+        conn = FakeSocketHTTPConnection(
+            'HTTP/1.1 200 OK\r\n'
+            'Connection: close\r\n'
+            'Content-Length: 5\r\n'
+            '\r\n'
+            'first')
+        conn.pipelining = True
+        conn.request('GET', '/first')
+        conn.request('GET', '/second')
+        response = conn.getresponse()
+        self.assertIsNone(conn.sock)
+        self.assertEqual(response.read(), b'first')
+        self.assertTrue(response.isclosed())
+        # the second request was discarded with the connection
+        self.assertRaises(client.ResponseNotReady, conn.getresponse)
+        conn.request('GET', '/second')
+        self.assertEqual(conn.connections, 2)
+
+    def test_request_many(self):
+        import http.server
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            connections = set()
+
+            def do_GET(self):
+                body = self.path.encode('ascii')
+                self.connections.add(self.client_address)
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                # close some connections with unanswered requests pending
+                if self.path.endswith('7'):
+                    self.send_header('Connection', 'close')
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(body)
+
+            do_HEAD = do_GET
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers['Content-Length']))
+                self.do_GET()
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((HOST, 0), Handler)
+        self.addCleanup(server.server_close)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.shutdown)
+
+        requests = [('GET', '/%d' % i) for i in range(50)]
+        requests.append(('HEAD', '/head'))
+        requests[10:10] = [('POST', '/post%d' % i, b'data') for i in range(3)]
+        results = client.request_many(HOST, requests,
+                                      port=server.server_address[1],
+                                      connections=3, depth=4)
+        self.assertEqual(len(results), len(requests))
+        for (method, url, *body), (response, data) in zip(requests,
+                                                          results):
+            self.assertEqual(response.status, 200)
+            self.assertEqual(data, b'' if method == 'HEAD'
+                                   else url.encode('ascii'))
+        # 3 connections, plus one for each 'Connection: close' response
+        self.assertGreaterEqual(len(Handler.connections), 3 + 5)
+
+        self.assertEqual(client.request_many(HOST, []), [])
+        self.assertRaises(ValueError, client.request_many, HOST, requests,
+                          connections=0)
+
+    def test_request_many_not_idempotent(self):
+        # non-idempotent requests are sent on an idle connection, and
+        # nothing is pipelined after them
+        class Connection:
+            def __init__(self):
+                self.sent = []
+            def request(self, method, url, *args):
+                self.sent.append(method)
+
+        requests = [('GET', '/'), ('GET', '/'), ('post', '/'), ('POST', '/'),
+                    ('PUT', '/'), ('GET', '/')]
+        worker = client._PipelineWorker(Connection(), range(len(requests)))
+        sent = worker.conn.sent
+        worker.send(requests, 8)
+        self.assertEqual(sent, ['GET', 'GET'])
+        worker.in_flight.clear()
+        worker.send(requests, 8)
+        self.assertEqual(sent[2:], ['post'])
+        worker.send(requests, 8)
+        self.assertEqual(sent[3:], [])
+        worker.in_flight.clear()
+        worker.send(requests, 8)
+        self.assertEqual(sent[3:], ['POST'])
+        worker.in_flight.clear()
+        worker.send(requests, 8)
+        self.assertEqual(sent[4:], ['PUT', 'GET'])
+
+
 class HTTPSTest(TestCase):
 
     def setUp(self):
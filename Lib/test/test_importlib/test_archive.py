@@ -0,0 +1,157 @@
+from importlib import archive, machinery
+import importlib.util
+import os
+import tempfile
+from test import support
+from test.support import script_helper
+import unittest
+
+
+class ModuleArchiveTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.root = os.path.join(self.tempdir.name, 'root')
+        self.make_file('mod.py', 'x = "mod"\n')
+        self.make_file('bad.py', 'syntax(error\n')
+        self.make_file('not-a-module.py', '')
+        self.make_file('pkg/__init__.py', 'x = "pkg"\n')
+        self.make_file('pkg/sub.py', 'from . import tests\n')
+        self.make_file('pkg/data.txt', 'resource')
+        self.make_file('pkg/tests/__init__.py', '')
+        self.make_file('namespace/mod.py', '')
+        self.filename = os.path.join(self.tempdir.name, 'modules.pyar')
+
+    def make_file(self, name, content):
+        path = os.path.join(self.root, *name.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def build(self, *args, **kwargs):
+        with support.captured_stderr() as stderr:
+            count = archive.build_archive(self.filename, [self.root],
+                                          *args, **kwargs)
+        return count, stderr.getvalue()
+
+    def test_find_modules(self):
+        modules = sorted(archive.find_modules(self.root))
+        self.assertEqual(modules, [
+            ('bad', os.path.join(self.root, 'bad.py'), False),
+            ('mod', os.path.join(self.root, 'mod.py'), False),
+            ('pkg', os.path.join(self.root, 'pkg', '__init__.py'), True),
+            ('pkg.sub', os.path.join(self.root, 'pkg', 'sub.py'), False),
+            ('pkg.tests', os.path.join(self.root, 'pkg', 'tests',
+                                       '__init__.py'), True),
+        ])
+
+    def test_build_archive(self):
+        count, stderr = self.build()
+        self.assertEqual(count, 3)
+        self.assertIn('Skipping bad', stderr)
+        index = archive.read_index(self.filename)
+        self.assertEqual(sorted(index), ['mod', 'pkg', 'pkg.sub'])
+        offset, size, is_package, origin = index['pkg']
+        self.assertEqual(offset % 8, 0)
+        self.assertTrue(is_package)
+        self.assertEqual(origin, os.path.join(self.root, 'pkg', '__init__.py'))
+
+        count, stderr = self.build(exclude=None, quiet=True)
+        self.assertEqual(count, 4)
+        self.assertEqual(stderr, '')
+
+    def test_shadowed_modules(self):
+        other = os.path.join(self.tempdir.name, 'other')
+        os.mkdir(other)
+        with open(os.path.join(other, 'mod.py'), 'w'):
+            pass
+        with open(os.path.join(other, 'other.py'), 'w'):
+            pass
+        archive.build_archive(self.filename, [other, self.root], quiet=True)
+        index = archive.read_index(self.filename)
+        self.assertEqual(sorted(index), ['mod', 'other', 'pkg', 'pkg.sub'])
+        self.assertEqual(index['mod'][3], os.path.join(other, 'mod.py'))
+
+    def test_finder(self):
+        self.build()
+        finder = machinery.ArchiveFinder(self.filename)
+        self.addCleanup(finder.close)
+        self.assertIsNone(finder.find_spec('bad'))
+        self.assertIsNone(finder.find_spec('pkg.tests'))
+
+        spec = finder.find_spec('pkg')
+        self.assertIsInstance(spec.loader, machinery.ArchiveLoader)
+        self.assertEqual(spec.origin, os.path.join(self.root, 'pkg',
+                                                   '__init__.py'))
+        self.assertEqual(spec.submodule_search_locations,
+                         [os.path.join(self.root, 'pkg')])
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        self.assertEqual(module.x, 'pkg')
+        self.assertEqual(spec.loader.get_source('pkg'), 'x = "pkg"\n')
+        reader = spec.loader.get_resource_reader('pkg')
+        with reader.open_resource('data.txt') as f:
+            self.assertEqual(f.read(), b'resource')
+
+        spec = finder.find_spec('mod')
+        self.assertIsNone(spec.submodule_search_locations)
+        self.assertFalse(spec.loader.is_package('mod'))
+        # the code comes from the archive, not from the source file
+        self.make_file('mod.py', 'x = "modified"\n')
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        self.assertEqual(module.x, 'mod')
+        with self.assertRaises(ImportError):
+            finder.get_code('missing')
+
+    def test_close(self):
+        self.build()
+        finder = machinery.ArchiveFinder(self.filename)
+        spec = finder.find_spec('mod')
+        finder.close()
+        self.assertIsNone(finder.find_spec('mod'))
+        with self.assertRaises(ImportError):
+            spec.loader.get_code('mod')
+        finder.close()
+
+    def test_bad_archive(self):
+        with open(self.filename, 'wb') as f:
+            f.write(b'not an archive' * 10)
+        with self.assertRaises(ImportError):
+            machinery.ArchiveFinder(self.filename)
+        with self.assertRaises(ValueError):
+            archive.read_index(self.filename)
+
+    def test_startup(self):
+        self.build()
+        code = ('import sys, mod, pkg.sub, pkg.tests, namespace.mod; '
+                'print(type(mod.__loader__).__name__, '
+                'type(pkg.sub.__loader__).__name__, '
+                'type(pkg.tests.__loader__).__name__, '
+                'pkg.sub.tests.__name__)')
+        for args, env in [(['-X', 'modulearchive=' + self.filename], {}),
+                          ([], {'PYTHONMODULEARCHIVE': self.filename})]:
+            with self.subTest(args=args, env=env):
+                rc, out, err = script_helper.assert_python_ok(
+                    *args, '-c', code, PYTHONPATH=self.root, **env)
+                self.assertEqual(out.split(), [b'ArchiveLoader',
+                                               b'ArchiveLoader',
+                                               b'SourceFileLoader',
+                                               b'pkg.tests'])
+        # a missing archive is ignored
+        rc, out, err = script_helper.assert_python_ok(
+            '-X', 'modulearchive=' + self.filename + '.missing', '-c', code,
+            PYTHONPATH=self.root)
+        self.assertEqual(out.split()[0], b'SourceFileLoader')
+
+    def test_main(self):
+        with support.captured_stdout() as stdout:
+            archive.main(['-o', self.filename, '-q', '-x', '^pkg', self.root])
+        self.assertIn('Packed 1 modules', stdout.getvalue())
+        self.assertEqual(list(archive.read_index(self.filename)), ['mod'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
 import importlib
 from importlib import abc
 from importlib import util
+import os
 import sys
+import tempfile
+from test import support
+import threading
 import types
 import unittest
 
@@ -140,6 +144,141 @@ class LazyLoaderTests(unittest.TestCase):
             # Force the load; just care that no exception is raised.
             module.__name__
 
+    @support.reap_threads
+    def test_module_load_race(self):
+        # The threads accessing the module while it is being loaded by
+        # another thread wait for the end of the load.
+        module = self.new_module('import time; time.sleep(0.1); attr = 42')
+        results = []
+        def access():
+            try:
+                results.append(module.attr)
+            except AttributeError as exc:
+                results.append(exc)
+        threads = [threading.Thread(target=access) for i in range(5)]
+        with support.start_threads(threads):
+            pass
+        self.assertEqual(results, [42] * 5)
+
+    def test_reentrant_load(self):
+        # The module can be accessed while it is loaded, as exec_module()
+        # does.
+        loader = TestingImporter()
+        loader.source_code = 'attr = 42'
+        exec_module = loader.exec_module
+        def reentrant_exec_module(module):
+            self.assertEqual(module.__name__, TestingImporter.module_name)
+            exec_module(module)
+        loader.exec_module = reentrant_exec_module
+        spec = util.spec_from_loader(TestingImporter.module_name,
+                                     util.LazyLoader(loader))
+        module = types.ModuleType(TestingImporter.module_name)
+        module.__spec__ = spec
+        module.__loader__ = spec.loader
+        spec.loader.exec_module(module)
+        self.assertEqual(module.attr, 42)
+        self.assertIs(type(module), types.ModuleType)
+
+
+class LazyImportTests(unittest.TestCase):
+
+    modules = ('lazy_mod', 'lazy_pkg', 'lazy_pkg.sub', 'lazy_pkg.other')
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.root = tempdir.name
+        record = 'import sys; sys._lazy_import_log.append(__name__)\n'
+        self.make_file('lazy_mod.py', record + 'attr = 42\n')
+        os.mkdir(os.path.join(self.root, 'lazy_pkg'))
+        self.make_file(os.path.join('lazy_pkg', '__init__.py'), record)
+        self.make_file(os.path.join('lazy_pkg', 'sub.py'),
+                       record + 'attr = "sub"\n')
+        self.make_file(os.path.join('lazy_pkg', 'other.py'), record)
+        sys._lazy_import_log = self.log = []
+        self.addCleanup(delattr, sys, '_lazy_import_log')
+        meta_path = sys.meta_path[:]
+        self.addCleanup(sys.meta_path.__setitem__, slice(None), meta_path)
+        path = support.DirsOnSysPath(self.root)
+        path.__enter__()
+        self.addCleanup(path.__exit__)
+        uncache = test_util.uncache(*self.modules)
+        uncache.__enter__()
+        self.addCleanup(uncache.__exit__, None, None, None)
+        importlib.invalidate_caches()
+
+    def make_file(self, name, content):
+        with open(os.path.join(self.root, name), 'w') as f:
+            f.write(content)
+
+    def test_lazy_module(self):
+        util.enable_lazy_imports()
+        self.assertTrue(all(isinstance(finder, util.LazyFinder)
+                            for finder in sys.meta_path))
+        import lazy_mod
+        self.assertEqual(self.log, [])
+        self.assertEqual(lazy_mod.__name__, 'lazy_mod')
+        self.assertEqual(self.log, [])
+        self.assertEqual(lazy_mod.attr, 42)
+        self.assertEqual(self.log, ['lazy_mod'])
+        self.assertIs(type(lazy_mod), types.ModuleType)
+
+    def test_submodules(self):
+        util.enable_lazy_imports()
+        # the package is not loaded by importing its submodules
+        import lazy_pkg.sub
+        from lazy_pkg import sub
+        self.assertEqual(self.log, [])
+        self.assertIs(lazy_pkg.sub, sub)
+        self.assertEqual(self.log, [])
+        self.assertEqual(sub.attr, 'sub')
+        self.assertEqual(self.log, ['lazy_pkg.sub'])
+        lazy_pkg.__file__
+        self.assertEqual(self.log, ['lazy_pkg.sub', 'lazy_pkg'])
+
+    def test_from_import(self):
+        util.enable_lazy_imports()
+        # the package has to be loaded to look for the name
+        from lazy_pkg import other
+        self.assertEqual(self.log, ['lazy_pkg'])
+        self.assertIs(other, sys.modules['lazy_pkg.other'])
+        self.assertEqual(other.__name__, 'lazy_pkg.other')
+        self.assertEqual(self.log, ['lazy_pkg'])
+        # from-imports of attributes load the module
+        from lazy_mod import attr
+        self.assertEqual(attr, 42)
+        self.assertEqual(self.log, ['lazy_pkg', 'lazy_mod'])
+
+    def test_allow_deny(self):
+        util.enable_lazy_imports(allow=['lazy_pkg'], deny=['lazy_pkg.other'])
+        import lazy_mod
+        import lazy_pkg.sub
+        import lazy_pkg.other
+        self.assertEqual(self.log, ['lazy_mod', 'lazy_pkg.other'])
+        finder = sys.meta_path[-1]
+        self.assertTrue(finder.is_lazy('lazy_pkg'))
+        self.assertTrue(finder.is_lazy('lazy_pkg.sub.mod'))
+        self.assertFalse(finder.is_lazy('lazy_pkg.other.mod'))
+        self.assertFalse(finder.is_lazy('lazy_pkg_other'))
+
+    def test_disable(self):
+        meta_path = sys.meta_path[:]
+        util.enable_lazy_imports()
+        util.enable_lazy_imports()
+        util.disable_lazy_imports()
+        self.assertEqual(sys.meta_path, meta_path)
+        import lazy_mod
+        self.assertEqual(self.log, ['lazy_mod'])
+
+    def test_builtin_modules(self):
+        util.enable_lazy_imports()
+        with test_util.uncache('_testbuffer', 'this'):
+            import _testbuffer
+            self.assertIs(type(_testbuffer), types.ModuleType)
+            with support.captured_stdout() as stdout:
+                import this
+            self.assertIsNot(type(this), types.ModuleType)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,117 @@
+import importlib._bootstrap_external
+from importlib import machinery, pathindex
+import os
+import sys
+import tempfile
+from test import support
+from test.support import script_helper
+import unittest
+from unittest import mock
+
+
+class PathIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.root = self.tempdir.name
+        os.mkdir(os.path.join(self.root, 'pkg'))
+        os.mkdir(os.path.join(self.root, 'pkg', 'sub'))
+        os.mkdir(os.path.join(self.root, 'not-a-package'))
+        os.mkdir(os.path.join(self.root, 'namespace'))
+        for name in ('mod.py', os.path.join('pkg', '__init__.py'),
+                     os.path.join('not-a-package', 'mod.py')):
+            with open(os.path.join(self.root, name), 'w'):
+                pass
+
+    def get_finder(self, path):
+        return machinery.FileFinder(
+            path, (machinery.SourceFileLoader, machinery.SOURCE_SUFFIXES))
+
+    def use_index(self, index):
+        patcher = mock.patch.object(importlib._bootstrap_external,
+                                    '_path_index', index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_scan_directory(self):
+        mtime, contents = pathindex.scan_directory(self.root)
+        self.assertEqual(mtime, os.stat(self.root).st_mtime)
+        self.assertEqual(contents, {'mod.py': False, 'pkg': True,
+                                    'not-a-package': True,
+                                    'namespace': True})
+
+    def test_build_index(self):
+        index = pathindex.build_index([self.root, '', self.root + '.missing'])
+        self.assertEqual(sorted(index), sorted([
+            self.root,
+            os.path.join(self.root, 'pkg'),
+            os.path.join(self.root, 'pkg', 'sub'),
+            os.path.join(self.root, 'namespace')]))
+        index = pathindex.build_index([self.root], recursive=False)
+        self.assertEqual(list(index), [self.root])
+
+    def test_finder_uses_index(self):
+        index = pathindex.build_index([self.root])
+        # entries only known to the index are trusted
+        index[self.root][1]['ghost.py'] = False
+        self.use_index(index)
+        finder = self.get_finder(self.root)
+        with mock.patch.object(importlib._bootstrap_external._os,
+                               'listdir') as listdir:
+            spec = finder.find_spec('ghost')
+            self.assertEqual(spec.origin, os.path.join(self.root, 'ghost.py'))
+            self.assertIsNotNone(finder.find_spec('mod'))
+            self.assertIsNotNone(finder.find_spec('pkg'))
+            spec = finder.find_spec('namespace')
+            self.assertIsNone(spec.loader)
+            self.assertEqual(spec.submodule_search_locations,
+                             [os.path.join(self.root, 'namespace')])
+            self.assertIsNone(finder.find_spec('missing'))
+            listdir.assert_not_called()
+
+    def test_stale_index(self):
+        index = pathindex.build_index([self.root])
+        index[self.root][1]['ghost.py'] = False
+        self.use_index(index)
+        with open(os.path.join(self.root, 'new.py'), 'w'):
+            pass
+        os.utime(self.root, (0, 0))
+        finder = self.get_finder(self.root)
+        # the directory was modified: it is listed again
+        self.assertIsNone(finder.find_spec('ghost'))
+        self.assertIsNotNone(finder.find_spec('new'))
+
+    def test_environment_variable(self):
+        filename = os.path.join(self.root, 'index')
+        pathindex.write_index(filename, pathindex.build_index([self.root]))
+        code = ('import importlib._bootstrap_external as m; '
+                'print(sorted(m._get_path_index()))')
+        rc, out, err = script_helper.assert_python_ok(
+            '-c', code, PYTHONPATHINDEX=filename)
+        index = eval(out.decode())
+        self.assertIn(self.root, index)
+        self.assertEqual(len(index), 4)
+        # -E ignores the index
+        rc, out, err = script_helper.assert_python_ok(
+            '-E', '-c', code, PYTHONPATHINDEX=filename)
+        self.assertEqual(out.strip(), b'[]')
+        # an unreadable index is ignored
+        rc, out, err = script_helper.assert_python_ok(
+            '-c', code, PYTHONPATHINDEX=filename + '.missing')
+        self.assertEqual(out.strip(), b'[]')
+
+    def test_main(self):
+        filename = os.path.join(self.root, 'index')
+        with support.captured_stdout() as stdout:
+            pathindex.main(['-o', filename, '-l', self.root])
+        self.assertIn('Indexed 1 directories', stdout.getvalue())
+        rc, out, err = script_helper.assert_python_ok(
+            '-c', 'import mod, pkg; print(pkg.__file__)',
+            PYTHONPATHINDEX=filename, PYTHONPATH=self.root)
+        self.assertEqual(out.strip().decode(),
+                         os.path.join(self.root, 'pkg', '__init__.py'))
+
+
+if __name__ == '__main__':
+    unittest.main()
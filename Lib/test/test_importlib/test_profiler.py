@@ -0,0 +1,168 @@
+from importlib import _bootstrap, _bootstrap_external, profiler
+import os
+import sys
+import tempfile
+import traceback
+from test import support
+from test.support import script_helper
+import unittest
+
+
+class ImportProfilerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.root = self.tempdir.name
+        self.make_file('pkg/__init__.py', 'from . import sub\n')
+        self.make_file('pkg/sub.py', 'import leaf\n')
+        self.make_file('leaf.py', 'x = 1\n')
+        self.make_file('broken.py', 'import nosuchmodule\n')
+        self.addCleanup(support.modules_cleanup, *support.modules_setup())
+        sys.path.insert(0, self.root)
+        self.addCleanup(sys.path.remove, self.root)
+
+    def make_file(self, name, content):
+        path = os.path.join(self.root, *name.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def profile(self, name):
+        with profiler.ImportProfiler() as prof:
+            __import__(name)
+        return prof
+
+    def test_records(self):
+        prof = self.profile('pkg')
+        self.assertEqual([(len(stack), record.name)
+                          for stack, record in prof.records()],
+                         [(0, 'pkg'), (1, 'pkg.sub'), (2, 'leaf')])
+        pkg = prof.roots[0]
+        sub, = pkg.children
+        leaf, = sub.children
+        self.assertFalse(pkg.failed)
+        self.assertEqual(leaf.origin, os.path.join(self.root, 'leaf.py'))
+        for record in (pkg, sub, leaf):
+            self.assertGreater(record.find_time, 0)
+            self.assertGreater(record.load_time, 0)
+            self.assertGreater(record.exec_time, 0)
+            self.assertGreaterEqual(record.cumulative_time,
+                                    record.find_time + record.load_time)
+        self.assertGreaterEqual(pkg.exec_time, sub.cumulative_time)
+        self.assertAlmostEqual(pkg.self_time,
+                               pkg.cumulative_time - sub.cumulative_time)
+        self.assertEqual(leaf.self_time, leaf.cumulative_time)
+        # FileFinder lists the directory and the loader opens the file
+        self.assertGreaterEqual(leaf.syscalls['open'], 1)
+        self.assertGreaterEqual(leaf.syscalls['stat'], 1)
+
+    def test_failed_import(self):
+        find_and_load = _bootstrap._find_and_load
+        with self.assertRaises(ImportError):
+            self.profile('broken')
+        # The profiler is disabled by the exception
+        self.assertIs(_bootstrap._find_and_load, find_and_load)
+        self.assertIsNone(profiler.ImportProfiler._enabled)
+
+    def test_failed_record(self):
+        prof = profiler.ImportProfiler()
+        with prof, self.assertRaises(ImportError):
+            import broken
+        broken, = prof.roots
+        self.assertTrue(broken.failed)
+        missing, = broken.children
+        self.assertEqual(missing.name, 'nosuchmodule')
+        self.assertTrue(missing.failed)
+        self.assertIsNone(missing.origin)
+        self.assertIn('nosuchmodule!', '\n'.join(profiler.format_tree(
+            prof.roots)))
+
+    def import_frames(self, name, profile):
+        # Return the (filename, function name) pairs of the traceback of a
+        # failed import
+        try:
+            if profile:
+                with profiler.ImportProfiler():
+                    __import__(name)
+            else:
+                __import__(name)
+        except Exception as exc:
+            return [(frame.filename, frame.name)
+                    for frame in traceback.extract_tb(exc.__traceback__)]
+        self.fail('no exception raised')
+
+    def test_traceback(self):
+        # the frames of the profiler are removed like the importlib frames
+        error = self.make_file('error.py', '1/0\n')
+        for name, expected in [('error', 2), ('nosuchmodule', 1),
+                               ('broken', 2)]:
+            with self.subTest(name=name):
+                frames = self.import_frames(name, True)
+                self.assertEqual(frames, self.import_frames(name, False))
+                self.assertEqual(len(frames), expected)
+        self.assertEqual(self.import_frames('error', True)[-1],
+                         (error, '<module>'))
+
+    def test_enable_disable(self):
+        find_and_load = _bootstrap._find_and_load
+        os_module = _bootstrap_external._os
+        prof = profiler.ImportProfiler()
+        prof.enable()
+        try:
+            self.assertIsNot(_bootstrap._find_and_load, find_and_load)
+            self.assertIsNot(_bootstrap_external._os, os_module)
+            with self.assertRaises(RuntimeError):
+                profiler.ImportProfiler().enable()
+        finally:
+            prof.disable()
+        self.assertIs(_bootstrap._find_and_load, find_and_load)
+        self.assertIs(_bootstrap_external._os, os_module)
+        prof.disable()
+        # Modules already imported are not recorded
+        with prof:
+            import leaf
+            import leaf
+        self.assertEqual([record.name for record in prof.roots], ['leaf'])
+
+    def test_format(self):
+        prof = self.profile('pkg')
+        lines = profiler.format_tree(prof.roots)
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].endswith('module'))
+        self.assertTrue(lines[1].endswith('  pkg'))
+        self.assertTrue(lines[3].endswith('      leaf'))
+        self.assertEqual(profiler.format_tree(prof.roots, min_time=3600),
+                         lines[:1])
+
+        lines = profiler.format_table(prof.roots, sort='cumulative')
+        self.assertEqual([line.split()[-1] for line in lines[1:]],
+                         ['pkg', 'pkg.sub', 'leaf'])
+        self.assertEqual(len(profiler.format_table(prof.roots, limit=1)), 2)
+        with self.assertRaises(ValueError):
+            profiler.format_table(prof.roots, sort='name')
+
+        lines = profiler.format_folded(prof.roots)
+        self.assertEqual([line.split()[0] for line in lines],
+                         ['pkg', 'pkg;pkg.sub', 'pkg;pkg.sub;leaf'])
+        for line in lines:
+            self.assertGreaterEqual(int(line.split()[1]), 0)
+
+    def test_main(self):
+        script = self.make_file('script.py', 'import pkg\n')
+        rc, out, err = script_helper.assert_python_ok(
+            '-m', 'importlib.profiler', '--folded', script)
+        self.assertIn(b'pkg;pkg.sub;leaf ', out)
+        outfile = os.path.join(self.root, 'report')
+        rc, out, err = script_helper.assert_python_ok(
+            '-m', 'importlib.profiler', '-o', outfile, '-s', 'self',
+            '-m', 'pkg.sub', 'arg', PYTHONPATH=self.root)
+        with open(outfile) as f:
+            report = f.read()
+        self.assertIn('leaf', report)
+        self.assertIn('pkg', report)
+
+
+if __name__ == '__main__':
+    unittest.main()
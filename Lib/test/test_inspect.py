@@ -18,6 +18,7 @@ import unicodedata
 import unittest
 import unittest.mock
 import warnings
+import weakref
 
 try:
     from concurrent.futures import ThreadPoolExecutor
@@ -3042,6 +3043,101 @@ class TestSignatureObject(unittest.TestCase):
         l = list(signature.parameters)
         self.assertEqual(l, unsorted_keyword_only_parameters)
 
+    def test_signature_cache(self):
+        def foo(a, b=1, *, c=2): pass
+        class Foo:
+            def __init__(self, a, b=1): pass
+            def meth(self, a): pass
+
+        sig = inspect.signature(foo)
+        self.assertIs(inspect.signature(foo), sig)
+        self.assertIs(inspect.signature(Foo), inspect.signature(Foo))
+        self.assertIs(inspect.signature(Foo(0).meth),
+                      inspect.signature(Foo(0).meth))
+        self.assertEqual(str(inspect.signature(Foo(0).meth)), '(a)')
+        # The cached signatures are per Signature class
+        self.assertIsInstance(MySignature.from_callable(foo), MySignature)
+        self.assertIs(type(inspect.signature(foo)), inspect.Signature)
+
+    def test_signature_cache_invalidation(self):
+        def foo(a, b: int = 1, *, c=2) -> None: pass
+        def bar(x): pass
+
+        self.assertEqual(str(inspect.signature(foo)),
+                         '(a, b: int = 1, *, c=2) -> None')
+        foo.__defaults__ = (3,)
+        self.assertEqual(str(inspect.signature(foo)),
+                         '(a, b: int = 3, *, c=2) -> None')
+        foo.__kwdefaults__['c'] = 4
+        self.assertEqual(str(inspect.signature(foo)),
+                         '(a, b: int = 3, *, c=4) -> None')
+        foo.__kwdefaults__ = {'c': 5}
+        self.assertEqual(str(inspect.signature(foo)),
+                         '(a, b: int = 3, *, c=5) -> None')
+        foo.__annotations__['b'] = str
+        del foo.__annotations__['return']
+        self.assertEqual(str(inspect.signature(foo)),
+                         '(a, b: str = 3, *, c=5)')
+        # Equal values are not mistaken for the cached ones
+        foo.__defaults__ = (3.0,)
+        self.assertEqual(str(inspect.signature(foo)),
+                         '(a, b: str = 3.0, *, c=5)')
+        foo.__code__ = bar.__code__
+        foo.__defaults__ = foo.__kwdefaults__ = None
+        self.assertEqual(str(inspect.signature(foo)), '(x)')
+
+        foo.__signature__ = inspect.signature(lambda y: None)
+        self.assertEqual(str(inspect.signature(foo)), '(y)')
+        del foo.__signature__
+        self.assertEqual(str(inspect.signature(foo)), '(x)')
+        foo.__wrapped__ = lambda z: None
+        self.assertEqual(str(inspect.signature(foo)), '(z)')
+        self.assertEqual(str(inspect.signature(foo, follow_wrapped=False)),
+                         '(x)')
+
+    @unittest.skipIf(MISSING_C_DOCSTRINGS,
+                     "Signature information for builtins requires docstrings")
+    def test_signature_cache_builtin(self):
+        self.assertIs(inspect.signature(len), inspect.signature(len))
+        self.assertEqual(str(inspect.signature([].append)), '(object, /)')
+        self.assertEqual(str(inspect.signature(list.append)),
+                         '(self, object, /)')
+        self.assertEqual(str(inspect.signature([].append)), '(object, /)')
+
+    def test_signature_cache_bounded(self):
+        # A default value referring to its function doesn't keep it alive
+        # once the entry is evicted from the cache
+        def foo(a=None): pass
+        foo.__defaults__ = (foo,)
+        ref = weakref.ref(foo)
+        inspect.signature(foo)
+        del foo
+        others = [lambda x: None
+                  for i in range(inspect._SIGNATURE_CACHE_SIZE)]
+        for other in others:
+            inspect.signature(other)
+        support.gc_collect()
+        self.assertIsNone(ref())
+        self.assertLessEqual(len(inspect._signature_function_cache),
+                             inspect._SIGNATURE_CACHE_SIZE)
+
+    def test_signature_cache_fromstr_globals(self):
+        # The text signatures using module globals are not cached
+        module = types.ModuleType('fake_builtins')
+        module.CONSTANT = 1
+        func = types.SimpleNamespace(__module__='fake_builtins')
+        with support.swap_item(sys.modules, 'fake_builtins', module):
+            sig = inspect._signature_fromstr(inspect.Signature, func,
+                                             '(a=CONSTANT)')
+            self.assertEqual(str(sig), '(a=1)')
+            module.CONSTANT = 2
+            sig = inspect._signature_fromstr(inspect.Signature, func,
+                                             '(a=CONSTANT)')
+            self.assertEqual(str(sig), '(a=2)')
+            sig = inspect._signature_fromstr(inspect.Signature, func, '(a=3)')
+            self.assertIs(inspect._signature_fromstr(inspect.Signature, func,
+                                                     '(a=3)'), sig)
+
 
 class TestParameterObject(unittest.TestCase):
     def test_signature_parameter_kinds(self):
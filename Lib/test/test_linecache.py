@@ -237,6 +237,109 @@ class LineCacheTests(unittest.TestCase):
         self.assertEqual(lines3, [])
         self.assertEqual(linecache.getlines(FILENAME), lines)
 
+    def test_cacheinfo(self):
+        linecache.clearcache()
+        self.assertEqual(linecache.cacheinfo()[:3], (0, 0, 0))
+        for entry in MODULES:
+            filename = os.path.join(MODULE_PATH, entry) + '.py'
+            linecache.getline(filename, 1)
+            linecache.getline(filename, 2)
+        info = linecache.cacheinfo()
+        self.assertEqual((info.hits, info.misses, info.evictions), (2, 2, 0))
+        self.assertEqual(info.currsize, sum(
+            os.stat(os.path.join(MODULE_PATH, entry) + '.py').st_size
+            for entry in MODULES))
+        linecache.clearcache()
+        info = linecache.cacheinfo()
+        self.assertEqual((info.hits, info.misses, info.currsize), (0, 0, 0))
+
+    def test_maxsize(self):
+        self.addCleanup(linecache.setmaxsize, linecache.cacheinfo().maxsize)
+        self.assertRaises(ValueError, linecache.setmaxsize, -1)
+        linecache.clearcache()
+        filenames = []
+        for i, source in enumerate([SOURCE_1, SOURCE_2, SOURCE_3]):
+            filename = support.TESTFN + str(i)
+            self.addCleanup(support.unlink, filename)
+            with open(filename, 'w') as fp:
+                fp.write(source)
+            filenames.append(filename)
+        # Entries not read by linecache itself are never evicted
+        linecache.cache['<fake>'] = (10**9, None, ['line\n'], '<fake>')
+        linecache.setmaxsize(len(SOURCE_1) + len(SOURCE_3))
+
+        linecache.getline(filenames[0], 1)
+        linecache.getline(filenames[1], 1)
+        self.assertNotIn(filenames[0], linecache.cache)
+        self.assertIn(filenames[1], linecache.cache)
+        # The least recently used files are evicted first
+        linecache.getline(filenames[2], 1)
+        linecache.getline(filenames[1], 2)
+        linecache.getline(filenames[2], 2)
+        linecache.getline(filenames[0], 3)
+        self.assertEqual(linecache.getline(filenames[0], 5),
+                         '    return result\n')
+        self.assertNotIn(filenames[1], linecache.cache)
+        self.assertIn(filenames[2], linecache.cache)
+        self.assertEqual(linecache.getline('<fake>', 1), 'line\n')
+        self.assertEqual(linecache.cacheinfo().evictions, 2)
+
+        # A file larger than the maximum size is still cached
+        linecache.setmaxsize(0)
+        self.assertEqual(list(linecache.cache), ['<fake>'])
+        self.assertEqual(linecache.getlines(filenames[1]),
+                         SOURCE_2.splitlines(True))
+        self.assertIn(filenames[1], linecache.cache)
+
+        linecache.setmaxsize(None)
+        for filename in filenames:
+            linecache.getline(filename, 1)
+        self.assertEqual(linecache.cacheinfo().maxsize, None)
+        self.assertEqual(len(linecache.cache), 4)
+
+    def test_line_access(self):
+        # Only \n ends the lines, as when reading the file in text mode
+        source = 'a = 1\x0c\nb = """\x1c"""\n\nc = 3'
+        self.addCleanup(support.unlink, support.TESTFN)
+        with open(support.TESTFN, 'w') as fp:
+            fp.write(source)
+        expected = ['a = 1\x0c\n', 'b = """\x1c"""\n', '\n', 'c = 3\n']
+        self.assertEqual(linecache.getlines(support.TESTFN), expected)
+        for lineno, line in enumerate(expected, 1):
+            self.assertEqual(linecache.getline(support.TESTFN, lineno), line)
+        self.assertEqual(linecache.getline(support.TESTFN, 5), '')
+        # The cache entries keep their layout, with a list of lines
+        self.assertEqual(linecache.cache[support.TESTFN],
+                         (os.stat(support.TESTFN).st_size,
+                          os.stat(support.TESTFN).st_mtime,
+                          expected, support.TESTFN))
+
+    def test_currsize(self):
+        self.addCleanup(linecache.setmaxsize, linecache.cacheinfo().maxsize)
+        self.addCleanup(linecache.clearcache)
+        linecache.clearcache()
+        filenames = [os.path.join(MODULE_PATH, entry) + '.py'
+                     for entry in MODULES]
+        sizes = [os.stat(filename).st_size for filename in filenames]
+        for filename in filenames:
+            linecache.getline(filename, 1)
+        self.assertEqual(linecache.cacheinfo().currsize, sum(sizes))
+        # Entries removed or replaced by other modules
+        del linecache.cache[filenames[0]]
+        linecache.checkcache(filenames[0])
+        linecache.cache[filenames[1]] = (10**9, None, ['line\n'], '<fake>')
+        linecache.setmaxsize(0)
+        self.assertEqual(linecache.cacheinfo().evictions, 0)
+        self.assertEqual(linecache.cacheinfo().currsize, 0)
+        self.assertEqual(linecache.getline(filenames[1], 1), 'line\n')
+        # updatecache() replaces the entries
+        linecache.setmaxsize(None)
+        linecache.updatecache(filenames[0])
+        linecache.updatecache(filenames[0])
+        self.assertEqual(linecache.cacheinfo().currsize, sizes[0])
+        linecache.checkcache()
+        self.assertEqual(linecache.cacheinfo().currsize, sizes[0])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,6 @@
 from test.support import run_unittest, unload, check_warnings, CleanImport
 import unittest
+import unittest.mock
 import sys
 import importlib
 from importlib.util import spec_from_file_location
@@ -176,6 +177,89 @@ class PkgutilTests(unittest.TestCase):
                 continue
             del sys.modules[pkg]
 
+    def make_tree(self, root, files):
+        for name in files:
+            path = os.path.join(root, *name.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write('raise RuntimeError("imported")\n')
+
+    def test_walkpackages_no_import(self):
+        self.make_tree(self.dirname, [
+            'test_walkpackages_noimport/__init__.py',
+            'test_walkpackages_noimport/mod.py',
+            'test_walkpackages_noimport/sub/__init__.py',
+            'test_walkpackages_noimport/sub/mod.py',
+            'test_walkpackages_noimport/notpkg/mod.py',
+        ])
+        zip_file = os.path.join(self.dirname, 'test_walkpackages.zip')
+        with zipfile.ZipFile(zip_file, 'w') as z:
+            z.writestr('test_walkpackages_zip/__init__.py', 'raise Error')
+            z.writestr('test_walkpackages_zip/sub/__init__.py', '')
+            z.writestr('test_walkpackages_zip/sub/mod.py', '')
+        expected = [
+            'test_walkpackages_noimport',
+            'test_walkpackages_noimport.mod',
+            'test_walkpackages_noimport.sub',
+            'test_walkpackages_noimport.sub.mod',
+            'test_walkpackages_zip',
+            'test_walkpackages_zip.sub',
+            'test_walkpackages_zip.sub.mod',
+        ]
+        for workers in (1, 2, None):
+            with self.subTest(workers=workers):
+                actual = [info.name for info in pkgutil.walk_packages(
+                    [self.dirname, zip_file], import_packages=False,
+                    workers=workers)]
+                self.assertEqual(actual, expected)
+        for name in expected:
+            self.assertNotIn(name, sys.modules)
+        with self.assertRaises(ValueError):
+            list(pkgutil.walk_packages([self.dirname], workers=0))
+
+    def test_walk_packages_cache(self):
+        pkgutil.clear_cache()
+        self.addCleanup(pkgutil.clear_cache)
+        self.make_tree(self.dirname, ['test_walk_cache/__init__.py',
+                                      'test_walk_cache_mod.py'])
+        expected = [('test_walk_cache', True), ('test_walk_cache_mod', False)]
+        def walk_packages():
+            return [(info.name, info.ispkg)
+                    for info in pkgutil.walk_packages([self.dirname],
+                                                      import_packages=False)]
+        def iter_modules():
+            return [(info.name, info.ispkg)
+                    for info in pkgutil.iter_modules([self.dirname])]
+        self.assertEqual(walk_packages(), expected)
+        # the directories are listed once
+        with unittest.mock.patch('os.scandir') as scandir:
+            self.assertEqual(walk_packages(), expected)
+            scandir.assert_not_called()
+        # and listed again once modified
+        self.make_tree(self.dirname, ['test_walk_cache_new.py'])
+        os.utime(self.dirname, (0, 0))
+        expected.append(('test_walk_cache_new', False))
+        self.assertEqual(walk_packages(), expected)
+        # iter_modules() does not use the cache
+        self.assertEqual(iter_modules(), expected)
+        self.assertEqual(len(pkgutil._scan_cache), 2)
+        pkgutil.clear_cache()
+        self.assertEqual(iter_modules(), expected)
+        self.assertEqual(len(pkgutil._scan_cache), 0)
+
+    def test_walk_packages_cache_size(self):
+        pkgutil.clear_cache()
+        self.addCleanup(pkgutil.clear_cache)
+        self.make_tree(self.dirname, ['test_walk_cache%d/__init__.py' % i
+                                      for i in range(5)])
+        with unittest.mock.patch('pkgutil._SCAN_CACHE_SIZE', 3):
+            names = [info.name for info in pkgutil.walk_packages(
+                [self.dirname], import_packages=False)]
+        self.assertEqual(names, ['test_walk_cache%d' % i for i in range(5)])
+        self.assertEqual(list(pkgutil._scan_cache),
+                         [os.path.join(self.dirname, 'test_walk_cache%d' % i)
+                          for i in range(2, 5)])
+
     def test_walk_packages_raises_on_string_or_bytes_input(self):
 
         str_input = 'test_dir'
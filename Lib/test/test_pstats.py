@@ -76,5 +76,86 @@ class StatsTestCase(unittest.TestCase):
                           'calls')
 
 
+class StatsTableTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stats_file = support.findfile('pstats.pck')
+        self.stats = pstats.Stats(self.stats_file)
+
+    def assertStatsAlmostEqual(self, first, second):
+        self.assertEqual(first.keys(), second.keys())
+        for func, (cc, nc, tt, ct, callers) in first.items():
+            other = second[func]
+            self.assertEqual((cc, nc), other[:2])
+            self.assertAlmostEqual(tt, other[2])
+            self.assertAlmostEqual(ct, other[3])
+            self.assertEqual(callers.keys(), other[4].keys())
+            for caller, value in callers.items():
+                self.assertEqual(value[:2], other[4][caller][:2])
+                self.assertAlmostEqual(value[2], other[4][caller][2])
+                self.assertAlmostEqual(value[3], other[4][caller][3])
+
+    def test_merge(self):
+        table = pstats.StatsTable(self.stats_file, self.stats)
+        self.assertEqual(len(table), len(self.stats.stats))
+        expected = pstats.Stats(self.stats_file).add(self.stats)
+        self.assertStatsAlmostEqual(pstats.Stats(table).stats,
+                                    expected.stats)
+        self.assertEqual(table.files, expected.files)
+
+    def test_dump(self):
+        self.addCleanup(support.unlink, support.TESTFN)
+        table = pstats.StatsTable(self.stats)
+        table.dump(support.TESTFN)
+        loaded = pstats.StatsTable(support.TESTFN)
+        self.assertEqual(pstats.Stats(loaded).stats, self.stats.stats)
+        # Stats loads the columnar files too
+        stats = pstats.Stats(support.TESTFN)
+        self.assertEqual(stats.stats, self.stats.stats)
+        stats.add(support.TESTFN)
+        loaded.add(support.TESTFN)
+        self.assertStatsAlmostEqual(pstats.Stats(loaded).stats, stats.stats)
+
+    def test_counts_only(self):
+        # The profile module only counts the calls from the callers
+        stats = {('a.py', 1, 'f'): (2, 3, 0.5, 1.0, {('b.py', 2, 'g'): 3}),
+                 ('b.py', 2, 'g'): (1, 1, 0.5, 1.5, {})}
+        self.addCleanup(support.unlink, support.TESTFN)
+        pstats.StatsTable(stats).dump(support.TESTFN)
+        table = pstats.StatsTable(support.TESTFN, stats)
+        self.assertEqual(table.callers(('a.py', 1, 'f')),
+                         {('b.py', 2, 'g'): 6})
+        self.assertRaises(ValueError, table.add, self.stats)
+        self.assertRaises(TypeError, table.add, 42)
+
+    def test_top(self):
+        table = pstats.StatsTable(self.stats)
+        funcs = sorted(self.stats.stats.items(),
+                       key=lambda item: item[1][3], reverse=True)
+        top = table.top(5)
+        self.assertEqual([row[0] for row in top],
+                         [func for func, stat in funcs[:5]])
+        func, cc, nc, tt, ct = top[0]
+        self.assertEqual((cc, nc, tt, ct), self.stats.stats[func][:4])
+        self.assertEqual(len(table.top()), len(self.stats.stats))
+        for key, index in ('calls', 2), ('pcalls', 1), ('time', 3), \
+                          (SortKey.TIME, 3):
+            values = [row[index] for row in table.top(key=key)]
+            self.assertEqual(values, sorted(values, reverse=True))
+        self.assertRaises(ValueError, table.top, 5, 'name')
+
+        top = table.top(module=r'sre_parse\.py$')
+        self.assertTrue(top)
+        self.assertEqual(len(top), sum(1 for func in self.stats.stats
+                                       if func[0].endswith('sre_parse.py')))
+        self.assertTrue(all(row[0][0].endswith('sre_parse.py')
+                            for row in top))
+
+    def test_callers(self):
+        table = pstats.StatsTable(self.stats)
+        for func, stat in self.stats.stats.items():
+            self.assertEqual(table.callers(func), stat[4])
+        self.assertEqual(table.callers(('nosuchfile', 1, 'f')), {})
+
+
 if __name__ == "__main__":
     unittest.main()
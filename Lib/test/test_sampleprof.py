@@ -0,0 +1,127 @@
+"""Test suite for the sampleprof module."""
+
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import unittest
+from test import support
+from test.support.script_helper import assert_python_ok
+
+import sampleprof
+
+
+def busy(duration):
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        pass
+
+
+def caller(duration):
+    busy(duration)
+
+
+class SampleProfTest(unittest.TestCase):
+
+    def profile(self, **kwargs):
+        prof = sampleprof.Profile(0.001, **kwargs)
+        prof.runcall(caller, 0.2)
+        self.assertGreater(prof.sample_count, 0)
+        return prof
+
+    def test_bad_interval(self):
+        self.assertRaises(ValueError, sampleprof.Profile, 0)
+        self.assertRaises(ValueError, sampleprof.Profile, -1.0)
+
+    def check_stats(self, prof):
+        prof.create_stats()
+        busy_label = sampleprof.label(busy.__code__)
+        caller_label = sampleprof.label(caller.__code__)
+        cc, nc, tt, ct, callers = prof.stats[busy_label]
+        self.assertGreater(nc, 0)
+        self.assertGreater(tt, 0)
+        self.assertGreaterEqual(ct, tt)
+        self.assertIn(caller_label, callers)
+        self.assertEqual(callers[caller_label][0], nc)
+        cc, nc, tt, ct, callers = prof.stats[caller_label]
+        self.assertLess(tt, ct)
+
+        stats = pstats.Stats(prof, stream=io.StringIO())
+        stats.sort_stats('cumulative').print_stats()
+        self.assertIn('(busy)', stats.stream.getvalue())
+
+    def test_thread_sampling(self):
+        self.check_stats(self.profile())
+
+    @unittest.skipUnless(hasattr(__import__('signal'), 'setitimer'),
+                         'requires signal.setitimer()')
+    def test_signal_sampling(self):
+        import signal
+        handler = signal.getsignal(signal.SIGPROF)
+        self.check_stats(self.profile(use_signal=True))
+        self.assertEqual(signal.getsignal(signal.SIGPROF), handler)
+
+    def test_all_threads(self):
+        def spin():
+            busy(0.2)
+        for all_threads in True, False:
+            with self.subTest(all_threads=all_threads):
+                thread = threading.Thread(target=spin)
+                with sampleprof.Profile(0.001,
+                                        all_threads=all_threads) as prof:
+                    thread.start()
+                    caller(0.2)
+                    thread.join()
+                codes = {code for stack, samples, elapsed in prof.stacks()
+                         for code in stack}
+                self.assertIn(caller.__code__, codes)
+                self.assertEqual(spin.__code__ in codes, all_threads)
+
+    def test_folded(self):
+        prof = self.profile()
+        lines = prof.folded()
+        self.assertEqual(sum(int(line.rpartition(' ')[2]) for line in lines),
+                         sum(samples
+                             for stack, samples, elapsed in prof.stacks()))
+        stack = 'caller ({0}:{1});busy ({0}:{2})'.format(
+            __file__, caller.__code__.co_firstlineno,
+            busy.__code__.co_firstlineno)
+        self.assertTrue(any(stack in line for line in lines))
+        prof.clear()
+        self.assertEqual(prof.folded(), [])
+        self.assertEqual(prof.sample_count, 0)
+
+    def test_dump_stats(self):
+        self.addCleanup(support.unlink, support.TESTFN)
+        prof = self.profile()
+        prof.dump_stats(support.TESTFN)
+        with open(support.TESTFN, 'rb') as f:
+            self.assertEqual(marshal.load(f), prof.stats)
+        stats = pstats.Stats(support.TESTFN, stream=io.StringIO())
+        self.assertIn(sampleprof.label(busy.__code__), stats.stats)
+
+    def test_main(self):
+        self.addCleanup(support.unlink, support.TESTFN)
+        with open(support.TESTFN, 'w') as f:
+            f.write('import time\n'
+                    'def spin():\n'
+                    '    deadline = time.perf_counter() + 0.2\n'
+                    '    while time.perf_counter() < deadline:\n'
+                    '        pass\n'
+                    'spin()\n')
+        rc, out, err = assert_python_ok('-m', 'sampleprof', '--folded',
+                                        support.TESTFN)
+        self.assertIn(b';spin (', out)
+        rc, out, err = assert_python_ok('-m', 'sampleprof', '-s', 'tottime',
+                                        support.TESTFN)
+        self.assertIn(b'(spin)', out)
+        rc, out, err = assert_python_ok('-m', 'sampleprof', '-m', 'timeit',
+                                        '-n', '1', 'pass')
+        self.assertIn(b'1 loop', out)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -19,6 +19,7 @@ import subprocess
 import sysconfig
 import tempfile
 from copy import copy
+from unittest import mock
 
 # These tests are not particularly useful if Python was invoked with -S.
 # If you add tests that are useful under -S, this skip should be moved
@@ -180,6 +181,95 @@ class HelperFunctionsTests(unittest.TestCase):
         finally:
             pth_file.cleanup()
 
+    def use_site_cache(self):
+        old_cache = site._site_cache, site._site_cache_changed
+        def restore():
+            site._site_cache, site._site_cache_changed = old_cache
+        self.addCleanup(restore)
+        site._site_cache = {}
+        site._site_cache_changed = False
+        return site._site_cache
+
+    def test_addsitedir_cache(self):
+        cache = self.use_site_cache()
+        pth_dir = os.path.abspath(TESTFN)
+        os.mkdir(pth_dir)
+        self.addCleanup(test.support.rmtree, pth_dir)
+        os.mkdir(os.path.join(pth_dir, 'sub'))
+        self.make_pth("# comment\nimport sys\nsub\nmissing\n", pth_dir)
+        site.addsitedir(pth_dir, set())
+        self.assertTrue(site._site_cache_changed)
+        mtime, pths = cache[pth_dir]
+        self.assertEqual([(name, actions) for name, _, _, actions in pths],
+                         [(TESTFN + '.pth',
+                           [(1, 'import', 'import sys\n'),
+                            (2, 'path', os.path.join(pth_dir, 'sub')),
+                            (3, 'path', os.path.join(pth_dir, 'missing'))])])
+        self.assertNotIn(os.path.join(pth_dir, 'missing'), sys.path)
+
+        # The directory is not listed and the .pth file is not read again
+        sys.path[:] = self.sys_path
+        with mock.patch('os.listdir') as listdir, \
+             mock.patch('builtins.open') as open_:
+            site.addsitedir(pth_dir, set())
+            listdir.assert_not_called()
+            open_.assert_not_called()
+        self.assertIn(os.path.join(pth_dir, 'sub'), sys.path)
+        self.assertNotIn(os.path.join(pth_dir, 'missing'), sys.path)
+
+        # The existence of the directories is checked again
+        sys.path[:] = self.sys_path
+        os.rmdir(os.path.join(pth_dir, 'sub'))
+        os.mkdir(os.path.join(pth_dir, 'missing'))
+        os.utime(pth_dir, (mtime, mtime))
+        site.addsitedir(pth_dir, set())
+        self.assertEqual(cache[pth_dir][1], pths)
+        self.assertNotIn(os.path.join(pth_dir, 'sub'), sys.path)
+        self.assertIn(os.path.join(pth_dir, 'missing'), sys.path)
+
+    def test_addsitedir_cache_invalidation(self):
+        cache = self.use_site_cache()
+        pth_dir = os.path.abspath(TESTFN)
+        os.mkdir(pth_dir)
+        self.addCleanup(test.support.rmtree, pth_dir)
+        os.mkdir(os.path.join(pth_dir, 'sub'))
+        os.mkdir(os.path.join(pth_dir, 'other'))
+        self.make_pth("sub\n", pth_dir)
+        site.addsitedir(pth_dir, set())
+        self.assertIn(os.path.join(pth_dir, 'sub'), sys.path)
+
+        # A modified .pth file is processed again
+        sys.path[:] = self.sys_path
+        with open(os.path.join(pth_dir, TESTFN + '.pth'), 'w') as f:
+            f.write("other\n")
+        site.addsitedir(pth_dir, set())
+        self.assertNotIn(os.path.join(pth_dir, 'sub'), sys.path)
+        self.assertIn(os.path.join(pth_dir, 'other'), sys.path)
+        actions = cache[pth_dir][1][0][3]
+        self.assertEqual(actions,
+                         [(0, 'path', os.path.join(pth_dir, 'other'))])
+
+        # So is a directory with a new .pth file
+        sys.path[:] = self.sys_path
+        self.make_pth("sub\n", pth_dir, pth_name='new')
+        os.utime(pth_dir, (0, 0))
+        site.addsitedir(pth_dir, set())
+        self.assertIn(os.path.join(pth_dir, 'sub'), sys.path)
+        self.assertEqual(len(cache[pth_dir][1]), 2)
+
+    def test_addsitedir_cache_error(self):
+        cache = self.use_site_cache()
+        pth_dir = os.path.abspath(TESTFN)
+        os.mkdir(pth_dir)
+        self.addCleanup(test.support.rmtree, pth_dir)
+        self.make_pth("import nosuchmodule\n", pth_dir)
+        with captured_stderr() as err_out:
+            site.addsitedir(pth_dir, set())
+        self.assertRegex(err_out.getvalue(), 'ModuleNotFoundError')
+        # The error is reported again on the next run
+        self.assertNotIn(pth_dir, cache)
+        self.assertFalse(site._site_cache_changed)
+
     def test_getuserbase(self):
         self.assertEqual(site._getuserbase(), sysconfig._getuserbase())
 
@@ -486,6 +576,37 @@ class StartupImportTests(unittest.TestCase):
                           }.difference(sys.builtin_module_names)
         self.assertFalse(modules.intersection(collection_mods), stderr)
 
+    @unittest.skipUnless(site.ENABLE_USER_SITE, "requires the user site")
+    def test_startup_site_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'sitecache')
+            env = dict(os.environ, PYTHONUSERBASE=tmpdir)
+            code = 'import site; print(site.getusersitepackages())'
+            usersite = subprocess.check_output([sys.executable, '-c', code],
+                                               env=env, encoding='utf-8')
+            usersite = usersite.strip()
+            os.makedirs(os.path.join(usersite, 'sub'))
+            with open(os.path.join(usersite, 'test.pth'), 'w') as f:
+                f.write('sub\n')
+            code = ('import site, sys; '
+                    'print(list(site._site_cache), sys.path[-1])')
+            for args, extra in [(['-X', 'sitecache=' + filename], {}),
+                                ([], {'PYTHONSITECACHE': filename})]:
+                with self.subTest(args=args, env=extra):
+                    for run in range(2):
+                        output = subprocess.check_output(
+                            [sys.executable, *args, '-c', code],
+                            env=dict(env, **extra), encoding='utf-8')
+                        self.assertTrue(os.path.exists(filename))
+                        cached, last = output.rsplit(None, 1)
+                        self.assertIn(usersite, eval(cached))
+                        self.assertEqual(last, os.path.join(usersite, 'sub'))
+                    os.unlink(filename)
+            # -E ignores the environment variable
+            subprocess.check_call([sys.executable, '-E', '-c', 'pass'],
+                                  env=dict(env, PYTHONSITECACHE=filename))
+            self.assertFalse(os.path.exists(filename))
+
     def test_startup_interactivehook(self):
         r = subprocess.Popen([sys.executable, '-c',
             'import sys; sys.exit(hasattr(sys, "__interactivehook__"))']).wait()
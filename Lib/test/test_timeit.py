@@ -2,10 +2,14 @@ import timeit
 import unittest
 import sys
 import io
+import json
+import math
 from textwrap import dedent
 
+from test import support
 from test.support import captured_stdout
 from test.support import captured_stderr
+from test.support.script_helper import assert_python_ok, assert_python_failure
 
 # timeit's default number of iterations.
 DEFAULT_NUMBER = 1000000
@@ -194,6 +198,24 @@ class TestTimeit(unittest.TestCase):
         self.repeat(self.fake_callable_stmt, self.fake_callable_setup,
                 repeat=3, number=5)
 
+    def test_repeat_warmup(self):
+        self.fake_timer = FakeTimer()
+        t = timeit.Timer(stmt=self.fake_stmt, setup=self.fake_setup,
+                         timer=self.fake_timer)
+        delta_times = t.repeat(repeat=3, number=5, warmup=2)
+        self.assertEqual(self.fake_timer.setup_calls, 5)
+        self.assertEqual(self.fake_timer.count, 25)
+        self.assertEqual(delta_times, 3 * [5.0])
+
+    def test_repeat_function_warmup(self):
+        timer = FakeTimer()
+        delta_times = timeit.repeat(self.fake_stmt, self.fake_setup,
+                                    timer=timer, repeat=3, number=5,
+                                    warmup=2)
+        self.assertEqual(timer.setup_calls, 5)
+        self.assertEqual(timer.count, 25)
+        self.assertEqual(delta_times, 3 * [5.0])
+
     # Takes too long to run in debug build.
     #def test_repeat_function(self):
     #    delta_times = timeit.repeat(self.fake_stmt, self.fake_setup,
@@ -354,6 +376,111 @@ class TestTimeit(unittest.TestCase):
             s = self.run_main(switches=['-n1', '1/0'])
         self.assert_exc_string(error_stringio.getvalue(), 'ZeroDivisionError')
 
+    def test_main_warmup(self):
+        timer = FakeTimer(seconds_per_increment=2.0)
+        s = self.run_main(switches=['-n35', '-w2'], timer=timer)
+        self.assertEqual(s, "35 loops, best of 5: 2 sec per loop\n")
+        self.assertEqual(timer.count, 7 * 35)
+
+    def test_main_stats(self):
+        s = self.run_main(seconds_per_increment=2.0,
+                switches=['-n35', '--stats'])
+        self.assertEqual(s, dedent("""\
+                35 loops, best of 5: 2 sec per loop
+                mean 2 sec +- 0 nsec, median 2 sec
+                5th percentile 2 sec, 95th percentile 2 sec, no outliers
+            """))
+
+    def test_main_json(self):
+        self.addCleanup(support.unlink, support.TESTFN)
+        s = self.run_main(seconds_per_increment=2.0,
+                switches=['-n35', '-w1', '--json', support.TESTFN])
+        self.assertEqual(s, "35 loops, best of 5: 2 sec per loop\n")
+        with open(support.TESTFN) as f:
+            result = json.load(f)
+        self.assertEqual(result['stmt'], self.fake_stmt)
+        self.assertEqual(result['setup'], 'pass')
+        self.assertEqual(result['timer'], 'perf_counter')
+        self.assertEqual(result['number'], 35)
+        self.assertEqual(result['warmup'], 1)
+        self.assertEqual(result['processes'], 0)
+        self.assertEqual(result['timings'], 5 * [2.0])
+        self.assertEqual(result['stats'], timeit.summarize(5 * [2.0]))
+
+    def test_main_compare(self):
+        filenames = [support.TESTFN + '1', support.TESTFN + '2']
+        for filename, timings in zip(filenames, ([2.0, 2.1, 1.9, 2.0],
+                                                 [1.0, 1.1, 0.9, 1.0])):
+            self.addCleanup(support.unlink, filename)
+            with open(filename, 'w') as f:
+                json.dump({'timings': timings}, f)
+        with captured_stdout() as s:
+            timeit.main(['--compare'] + filenames)
+        lines = s.getvalue().splitlines()
+        self.assertEqual(lines[0], "%s: 2 sec +- 81.6 msec "
+                         "(median 2 sec, 4 timings)" % filenames[0])
+        self.assertEqual(lines[1], "%s: 1 sec +- 81.6 msec "
+                         "(median 1 sec, 4 timings)" % filenames[1])
+        self.assertTrue(lines[2].startswith(
+            "%s is 2.00x faster than %s (t = " % tuple(filenames[::-1])))
+        with captured_stdout() as s:
+            timeit.main(['--compare', filenames[0], filenames[0]])
+        self.assertEqual(s.getvalue().splitlines()[2],
+                         "Not significant (t = 0.00)")
+        with captured_stderr() as s:
+            self.assertEqual(timeit.main(['--compare', filenames[0]]), 2)
+        self.assertEqual(s.getvalue(), "--compare requires two result files\n")
+
+    def test_main_processes(self):
+        rc, out, err = assert_python_ok('-m', 'timeit', '-P2', '-r3', '-n10',
+                                        'print(end="x")')
+        self.assertRegex(out, br'^10 loops, best of 6: ')
+        rc, out, err = assert_python_failure('-m', 'timeit', '-P2', '1/0')
+        self.assertIn(b'ZeroDivisionError', err)
+        self.assertIn(b'timeit worker process failed with exit code 1', err)
+
+    def test_repeat_in_processes(self):
+        number, timings = timeit.repeat_in_processes(
+            'x += 1', 'x = 0', processes=2, repeat=3, warmup=1)
+        self.assertGreater(number, 0)
+        self.assertEqual(len(timings), 6)
+        number, timings = timeit.repeat_in_processes(
+            processes=3, repeat=1, number=7, process_time=True)
+        self.assertEqual(number, 7)
+        self.assertEqual(len(timings), 3)
+
+    def test_summarize(self):
+        stats = timeit.summarize([5.0, 1.0, 2.0, 3.0, 4.0, 100.0])
+        self.assertEqual(stats['count'], 6)
+        self.assertEqual(stats['min'], 1.0)
+        self.assertEqual(stats['max'], 100.0)
+        self.assertEqual(stats['mean'], 115 / 6)
+        self.assertEqual(stats['median'], 3.5)
+        self.assertAlmostEqual(stats['stdev'], 39.6253286001)
+        self.assertEqual(stats['p5'], 1.25)
+        self.assertEqual(stats['p95'], 76.25)
+        self.assertEqual(stats['outliers'], 1)
+        stats = timeit.summarize([2.0])
+        self.assertEqual((stats['mean'], stats['stdev'], stats['p95']),
+                         (2.0, 0.0, 2.0))
+        self.assertRaises(ValueError, timeit.summarize, [])
+
+    def test_compare(self):
+        old = timeit.summarize([4.0, 4.1, 3.9, 4.0])
+        new = timeit.summarize([2.0, 2.1, 1.9, 2.0])
+        t, ratio = timeit.compare(old, new)
+        self.assertGreater(t, 2.0)
+        self.assertEqual(ratio, 2.0)
+        t, ratio = timeit.compare(new, old)
+        self.assertLess(t, -2.0)
+        self.assertEqual(ratio, 0.5)
+        # Without variance, any difference is significant
+        t, ratio = timeit.compare(timeit.summarize([2.0]),
+                                  timeit.summarize([1.0]))
+        self.assertEqual((t, ratio), (math.inf, 2.0))
+        t, ratio = timeit.compare(old, old)
+        self.assertEqual((t, ratio), (0.0, 1.0))
+
     def autorange(self, seconds_per_increment=1/1024, callback=None):
         timer = FakeTimer(seconds_per_increment=seconds_per_increment)
         t = timeit.Timer(stmt=self.fake_stmt, setup=self.fake_setup, timer=timer)
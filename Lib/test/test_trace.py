@@ -118,6 +118,29 @@ class TestLineCounts(unittest.TestCase):
 
         self.assertEqual(self.tracer.results().counts, expected)
 
+    def test_counts_accumulate(self):
+        self.tracer.runfunc(traced_func_linear, 2, 5)
+        self.tracer.runfunc(traced_func_linear, 2, 5)
+
+        firstlineno = get_firstlineno(traced_func_linear)
+        expected = {}
+        for i in range(1, 5):
+            expected[(self.my_py_filename, firstlineno + i)] = 2
+        self.assertEqual(self.tracer.results().counts, expected)
+
+    def test_counts_attribute(self):
+        # the counts attribute is up to date without calling results()
+        firstlineno = get_firstlineno(traced_func_linear)
+        key = (self.my_py_filename, firstlineno + 1)
+        self.tracer.runfunc(traced_func_linear, 2, 5)
+        self.assertEqual(self.tracer.counts[key], 1)
+        self.tracer.runfunc(traced_func_linear, 2, 5)
+        self.assertEqual(self.tracer.counts[key], 2)
+        self.assertEqual(self.tracer.results().counts[key], 2)
+        self.tracer.counts = {}
+        self.tracer.runfunc(traced_func_linear, 2, 5)
+        self.assertEqual(self.tracer.counts[key], 1)
+
     def test_traced_func_loop(self):
         self.tracer.runfunc(traced_func_loop, 2, 3)
 
@@ -189,6 +212,31 @@ class TestLineCounts(unittest.TestCase):
             }
             self.assertEqual(tracer.results().counts, expected)
 
+class TestLineCoverage(unittest.TestCase):
+    """White-box testing of line coverage, via runfunc"""
+    def setUp(self):
+        self.addCleanup(sys.settrace, sys.gettrace())
+        self.tracer = Trace(count=1, trace=0, coverage=True)
+        self.my_py_filename = fix_ext_py(__file__)
+
+    def test_traced_func_loop(self):
+        self.tracer.runfunc(traced_func_loop, 2, 3)
+        self.tracer.runfunc(traced_func_loop, 2, 3)
+
+        # executed lines are only counted once
+        firstlineno = get_firstlineno(traced_func_loop)
+        expected = {}
+        for i in range(1, 5):
+            expected[(self.my_py_filename, firstlineno + i)] = 1
+        self.assertEqual(self.tracer.results().counts, expected)
+
+    def test_fully_covered(self):
+        self.tracer.runfunc(traced_func_linear, 2, 5)
+        # code blocks whose lines were all executed are no longer traced
+        code = traced_func_linear.__code__
+        self.assertIsNone(self.tracer._code_counts[id(code)][3])
+
+
 class TestRunExecCounts(unittest.TestCase):
     """A simple sanity test of line-counting, via runctx (exec)"""
     def setUp(self):
@@ -383,6 +431,8 @@ class TestCoverageCommandLineOutput(unittest.TestCase):
     def tearDown(self):
         unlink(self.codefile)
         unlink(self.coverfile)
+        unlink(TESTFN + '1')
+        unlink(TESTFN + '2')
 
     def test_cover_files_written_no_highlight(self):
         argv = '-m trace --count'.split() + [self.codefile]
@@ -406,6 +456,24 @@ class TestCoverageCommandLineOutput(unittest.TestCase):
                 >>>>>>     print('unreachable')
             '''))
 
+    def test_merge_parallel_runs(self):
+        for counts in TESTFN + '1', TESTFN + '2':
+            argv = ['-m', 'trace', '--count', '--coverage', '--no-report',
+                    '--file', counts, self.codefile]
+            assert_python_ok(*argv)
+            self.assertTrue(os.path.exists(counts))
+        self.assertFalse(os.path.exists(self.coverfile))
+
+        argv = ['-m', 'trace', '--report', '--merge', TESTFN + '1',
+                '--merge', TESTFN + '2']
+        status, stdout, stderr = assert_python_ok(*argv)
+        with open(self.coverfile) as f:
+            self.assertEqual(f.read(),
+                "    2: x = 42\n"
+                "    2: if []:\n"
+                "           print('unreachable')\n"
+            )
+
 class TestCommandLine(unittest.TestCase):
 
     def test_failures(self):
@@ -415,6 +483,7 @@ class TestCommandLine(unittest.TestCase):
             (b'argument -R/--no-report: not allowed with argument -r/--report', '-rR'),
             (b'must specify one of --trace, --count, --report, --listfuncs, or --trackcalls', '-g'),
             (b'-r/--report requires -f/--file', '-r'),
+            (b'--coverage can only be used with --count', '--coverage', '-t'),
             (b'--summary can only be used with --count or --report', '-sT'),
             (b'unrecognized arguments: -y', '-y'))
         for message, *args in _errors:
@@ -888,6 +888,31 @@ class TestStack(unittest.TestCase):
         linecache.updatecache('/foo.py', globals())
         self.assertEqual(s[0].line, "import sys")
 
+    def test_captured_stack(self):
+        s = traceback.CapturedStack(traceback.walk_stack(None), limit=5)
+        expected = traceback.StackSummary.extract(
+            traceback.walk_stack(None), limit=5)
+        self.assertEqual(len(s), 5)
+        # Only the line of this frame differs
+        self.assertEqual(s.summary()[1:], expected[1:])
+        self.assertIsInstance(s.summary(), traceback.StackSummary)
+        self.assertIs(s.summary(), s.summary())
+        self.assertEqual(s, s.summary())
+        self.assertEqual(s.format()[1:], expected.format()[1:])
+        self.assertEqual(len(s), 5)
+
+    def test_captured_stack_deferred_lookup_lines(self):
+        linecache.clearcache()
+        c = test_code('/foo.py', 'method')
+        f = test_frame(c, None, None)
+        s = traceback.CapturedStack(iter([(f, 6)]))
+        self.assertEqual(len(s), 1)
+        self.assertEqual({}, linecache.cache)
+        linecache.updatecache('/foo.py', globals())
+        self.assertEqual(s.format(),
+                         ['  File "/foo.py", line 6, in method\n'
+                          '    import sys\n'])
+
     def test_from_list(self):
         s = traceback.StackSummary.from_list([('foo.py', 1, 'fred', 'line')])
         self.assertEqual(
@@ -1066,6 +1091,35 @@ class TestTracebackException(unittest.TestCase):
         linecache.updatecache('/foo.py', globals())
         self.assertEqual(exc.stack[0].line, "import sys")
 
+    def test_lazy(self):
+        def recurse(n):
+            if n:
+                recurse(n-1)
+            else:
+                1/0
+        try:
+            try:
+                recurse(10)
+            except Exception as e:
+                raise ValueError from e
+        except Exception:
+            exc_info = sys.exc_info()
+        exc = traceback.TracebackException(*exc_info, lazy=True)
+        expected = traceback.TracebackException(*exc_info)
+        self.assertIsInstance(exc._stack, traceback.CapturedStack)
+        self.assertIsInstance(exc.__cause__._stack, traceback.CapturedStack)
+        self.assertEqual(exc, expected)
+        self.assertEqual(list(exc.format()), list(expected.format()))
+        self.assertIsInstance(exc.stack, traceback.StackSummary)
+        self.assertEqual(exc.__cause__.stack, expected.__cause__.stack)
+
+        exc = traceback.TracebackException(*exc_info, limit=5, lazy=True)
+        self.assertEqual(len(exc.stack), 1)
+        self.assertEqual(len(exc.__cause__.stack), 5)
+
+        self.assertRaises(ValueError, traceback.TracebackException,
+                          *exc_info, lazy=True, capture_locals=True)
+
     def test_locals(self):
         linecache.updatecache('/foo.py', globals())
         e = Exception("uh oh")
@@ -1,5 +1,6 @@
 import contextlib
 import os
+import pickle
 import sys
 import tracemalloc
 import unittest
@@ -180,6 +181,112 @@ class TestTracemallocEnabled(unittest.TestCase):
         domain2, size2, traceback2 = trace2
         self.assertIs(traceback2, traceback1)
 
+    def test_get_traces_share_traces(self):
+        # Ensure that identical traces are not duplicated
+        tracemalloc.clear_traces()
+        data = [allocate_bytes(123) for count in range(3)]
+        obj_traceback = data[0][1]
+
+        traces = [trace for trace in tracemalloc._get_traces()
+                  if trace[2] == obj_traceback._frames]
+        self.assertEqual(len(traces), 3)
+        self.assertIs(traces[1], traces[0])
+        self.assertIs(traces[2], traces[0])
+
+    def test_get_statistics(self):
+        tracemalloc.clear_traces()
+        obj_size = 12345
+        data = [allocate_bytes(obj_size) for count in range(5)]
+        obj_traceback = data[0][1]
+        snapshot = tracemalloc.take_snapshot()
+
+        for key_type, cumulative in (('traceback', False),
+                                     ('lineno', False), ('lineno', True),
+                                     ('filename', False), ('filename', True)):
+            with self.subTest(key_type=key_type, cumulative=cumulative):
+                stats = tracemalloc.get_statistics(key_type, cumulative)
+                self.assertEqual(stats, sorted(stats, reverse=True,
+                    key=tracemalloc.Statistic._sort_key))
+                if key_type == 'filename':
+                    key = traceback_filename(obj_traceback[0].filename)
+                else:
+                    key = obj_traceback
+                stat = [stat for stat in stats if stat.traceback == key][0]
+                expected = [stat
+                            for stat in snapshot.statistics(key_type,
+                                                            cumulative)
+                            if stat.traceback == key][0]
+                if key_type == 'filename':
+                    self.assertGreaterEqual(stat.size, 5 * obj_size)
+                    self.assertGreaterEqual(stat.count, 5)
+                else:
+                    self.assertEqual((stat.size, stat.count),
+                                     (5 * obj_size, 5))
+                    self.assertEqual(stat, expected)
+
+        self.assertRaises(ValueError, tracemalloc.get_statistics, 'unknown')
+        self.assertRaises(ValueError,
+                          tracemalloc.get_statistics, 'traceback', True)
+
+        tracemalloc.stop()
+        with self.assertRaises(RuntimeError):
+            tracemalloc.get_statistics('lineno')
+
+    def test_compare_statistics(self):
+        tracemalloc.clear_traces()
+        stats = tracemalloc.get_statistics('lineno')
+        obj_size = 12345
+        obj, obj_traceback = allocate_bytes(obj_size)
+        stats2 = tracemalloc.get_statistics('lineno')
+
+        diff = tracemalloc.compare_statistics(stats, stats2)
+        self.assertEqual(diff, sorted(diff, reverse=True,
+            key=tracemalloc.StatisticDiff._sort_key))
+        stat = [stat for stat in diff if stat.traceback == obj_traceback][0]
+        self.assertEqual(stat, tracemalloc.StatisticDiff(
+            obj_traceback, obj_size, obj_size, 1, 1))
+
+        diff = tracemalloc.compare_statistics(stats2, stats)
+        stat = [stat for stat in diff if stat.traceback == obj_traceback][0]
+        self.assertEqual(stat, tracemalloc.StatisticDiff(
+            obj_traceback, 0, -obj_size, 0, -1))
+
+    def test_sampling(self):
+        self.assertEqual(tracemalloc.get_sampling(), 1)
+
+        tracemalloc.stop()
+        self.assertRaises(ValueError, tracemalloc.start, sampling=0)
+
+        tracemalloc.start(sampling=10)
+        self.assertEqual(tracemalloc.get_sampling(), 10)
+        data = [allocate_bytes(123) for count in range(10000)]
+        obj_traceback = data[0][1]
+        stats = tracemalloc.get_statistics('lineno')
+        stat = [stat for stat in stats if stat.traceback == obj_traceback][0]
+        # one memory block in 10 on average
+        self.assertGreater(stat.count, 500)
+        self.assertLess(stat.count, 1500)
+        self.assertEqual(stat.size, stat.count * 123)
+
+        tracemalloc.stop()
+        tracemalloc.start()
+        self.assertEqual(tracemalloc.get_sampling(), 1)
+
+    def test_realloc(self):
+        # Memory blocks resized by realloc() remain traced, even when the
+        # allocator moves them to the raw memory allocator
+        tracemalloc.clear_traces()
+        lists = []
+        for i in range(100):
+            items = []
+            for j in range(300):
+                items.append(None)
+            lists.append(items)
+        size, peak_size = tracemalloc.get_traced_memory()
+        # list objects can be taken from a free list
+        self.assertGreater(size,
+                           0.9 * sum(sys.getsizeof(items) for items in lists))
+
     def test_get_traced_memory(self):
         # Python allocates some internals objects, so the test must tolerate
         # a small difference between the expected size and the real usage
@@ -254,6 +361,16 @@ class TestTracemallocEnabled(unittest.TestCase):
                          "the tracemalloc module must be tracing memory "
                          "allocations to take a snapshot")
 
+    def test_snapshot_load_pickle(self):
+        # snapshots written by Python 3.7 and older are pickled
+        snapshot = tracemalloc.take_snapshot()
+        with open(support.TESTFN, "wb") as fp:
+            pickle.dump(snapshot, fp, pickle.HIGHEST_PROTOCOL)
+        self.addCleanup(support.unlink, support.TESTFN)
+
+        snapshot2 = tracemalloc.Snapshot.load(support.TESTFN)
+        self.assertEqual(snapshot2.traces, snapshot.traces)
+
     def test_snapshot_save_attr(self):
         # take a snapshot with a new attribute
         snapshot = tracemalloc.take_snapshot()
@@ -537,6 +654,49 @@ class TestSnapshot(unittest.TestCase):
             tracemalloc.Statistic(tb_a_5, 2, 1),
         ])
 
+    def test_snapshot_group_by_shared_traces(self):
+        trace = (0, 10, (('a.py', 2), ('b.py', 4)))
+        raw_traces = [
+            trace,
+            (0, 5, (('a.py', 5), ('b.py', 4))),
+            trace,
+            (0, 10, (('a.py', 2), ('b.py', 4))),
+        ]
+        snapshot = tracemalloc.Snapshot(raw_traces, 2)
+        tb_a_2 = traceback_lineno('a.py', 2)
+        tb_a_5 = traceback_lineno('a.py', 5)
+        tb_b_4 = traceback_lineno('b.py', 4)
+
+        stats = snapshot.statistics('lineno')
+        self.assertEqual(stats, [
+            tracemalloc.Statistic(tb_a_2, 30, 3),
+            tracemalloc.Statistic(tb_a_5, 5, 1),
+        ])
+        stats = snapshot.statistics('lineno', True)
+        self.assertEqual(stats, [
+            tracemalloc.Statistic(tb_b_4, 35, 4),
+            tracemalloc.Statistic(tb_a_2, 30, 3),
+            tracemalloc.Statistic(tb_a_5, 5, 1),
+        ])
+
+    def test_dump_load(self):
+        snapshot, snapshot2 = create_snapshots()
+        raw_traces = snapshot2.traces._traces
+        raw_traces.insert(0, raw_traces[-1])
+        self.addCleanup(support.unlink, support.TESTFN)
+
+        # write the traces in several records
+        with patch.object(tracemalloc, '_DUMP_CHUNK', 3):
+            snapshot2.dump(support.TESTFN)
+        loaded = tracemalloc.Snapshot.load(support.TESTFN)
+        self.assertEqual(loaded.traceback_limit, 2)
+        self.assertEqual(loaded.traces, snapshot2.traces)
+        # identical traces remain shared
+        loaded_traces = loaded.traces._traces
+        self.assertIs(loaded_traces[-1], loaded_traces[0])
+        self.assertEqual(loaded.statistics('traceback'),
+                         snapshot2.statistics('traceback'))
+
     def test_trace_format(self):
         snapshot, snapshot2 = create_snapshots()
         trace = snapshot.traces[0]
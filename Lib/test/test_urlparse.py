@@ -1,5 +1,8 @@
+import sys
+import threading
 import unittest
 import urllib.parse
+from test import support
 
 RFC1808_BASE = "http://a/b/c/d;p?q#f"
 RFC2396_BASE = "http://a/b/c/d;p?q"
@@ -957,6 +960,121 @@ class UrlParseTestCase(unittest.TestCase):
         self.assertEqual(p1.path, '863-1234')
         self.assertEqual(p1.params, 'phone-context=+1-914-555')
 
+    def test_parse_cache_lru(self):
+        urllib.parse.clear_cache()
+        self.addCleanup(urllib.parse.clear_cache)
+        maxsize = urllib.parse.MAX_CACHE_SIZE
+        urls = ['http://www.python.org/%d' % i for i in range(maxsize + 1)]
+        urllib.parse.urlsplit(urls[0])
+        for url in urls[1:maxsize]:
+            urllib.parse.urlsplit(url)
+        # Using the oldest entry makes it the most recently used one.
+        urllib.parse.urlsplit(urls[0])
+        urllib.parse.urlsplit(urls[maxsize])
+        info = urllib.parse.cache_info()['urlsplit']
+        self.assertEqual(info, (1, maxsize + 1, maxsize, maxsize))
+        urllib.parse.urlsplit(urls[0])
+        self.assertEqual(urllib.parse.cache_info()['urlsplit'].hits, 2)
+        # urls[1] was evicted instead.
+        urllib.parse.urlsplit(urls[1])
+        self.assertEqual(urllib.parse.cache_info()['urlsplit'].misses,
+                         maxsize + 2)
+        urllib.parse.clear_cache()
+        self.assertEqual(urllib.parse.cache_info()['urlsplit'],
+                         (0, 0, maxsize, 0))
+
+    def test_quoters_cache_bounded(self):
+        urllib.parse.clear_cache()
+        self.addCleanup(urllib.parse.clear_cache)
+        maxsize = urllib.parse.MAX_CACHE_SIZE
+        for i in range(maxsize + 10):
+            urllib.parse.quote('a b', safe=str(i))
+        info = urllib.parse.cache_info()['quote']
+        self.assertEqual(info.currsize, maxsize)
+        self.assertEqual(info.misses, maxsize + 10)
+        urllib.parse.quote('a b', safe=str(maxsize + 9))
+        self.assertEqual(urllib.parse.cache_info()['quote'].hits, 1)
+
+    def test_parse_cache_threads(self):
+        # Entries evicted by other threads between the lookup and the
+        # update of the recency order are not an error.
+        urllib.parse.clear_cache()
+        self.addCleanup(urllib.parse.clear_cache)
+        errors = []
+        def split_urls():
+            try:
+                for i in range(2000):
+                    url = 'http://h/%d' % (i % 3)
+                    self.assertEqual(urllib.parse.urlsplit(url).path,
+                                     '/%d' % (i % 3))
+                    urllib.parse.quote('a b', safe=str(i % 3))
+            except Exception as exc:
+                errors.append(exc)
+        old_interval = sys.getswitchinterval()
+        self.addCleanup(sys.setswitchinterval, old_interval)
+        sys.setswitchinterval(1e-6)
+        with support.swap_attr(urllib.parse, 'MAX_CACHE_SIZE', 1):
+            threads = [threading.Thread(target=split_urls)
+                       for i in range(8)]
+            with support.start_threads(threads):
+                pass
+        self.assertEqual(errors, [])
+
+    def test_parse_cache_concurrent_eviction(self):
+        # Simulate another thread evicting the entry just looked up, or
+        # emptying the cache while it is being trimmed.
+        class Cache(urllib.parse._LRUCache):
+            def __getitem__(self, key):
+                value = super().__getitem__(key)
+                del self[key]
+                return value
+            def __len__(self):
+                return 2 * urllib.parse.MAX_CACHE_SIZE
+        cache = Cache()
+        cache['a'] = 1
+        self.assertEqual(cache.lookup('a'), 1)
+        cache.store('b', 2)
+        self.assertEqual(cache.info().hits, 1)
+
+    def test_urlsplit_many(self):
+        urls = ['http://www.python.org/doc/#frag', 'path?q',
+                'http://www.python.org/doc/#frag', 'mailto:a@b']
+        result = urllib.parse.urlsplit_many(urls)
+        self.assertEqual(result, [urllib.parse.urlsplit(u) for u in urls])
+        self.assertIs(result[0], result[2])
+        result = urllib.parse.urlsplit_many(
+            iter([b'http://a/b#c', bytearray(b'http://a/b#c')]),
+            allow_fragments=False)
+        expected = urllib.parse.urlsplit(b'http://a/b#c', allow_fragments=False)
+        self.assertEqual(result, [expected, expected])
+        self.assertEqual(urllib.parse.urlsplit_many(['x'], scheme='http'),
+                         [('http', '', 'x', '', '')])
+        self.assertEqual(urllib.parse.urlsplit_many([]), [])
+        with self.assertRaises(TypeError):
+            urllib.parse.urlsplit_many([b'http://a/'], scheme='http')
+        with self.assertRaises(ValueError):
+            urllib.parse.urlsplit_many(['http://[::1/'])
+
+    def test_quote_many(self):
+        strings = ['/El Niño/', '', 'abc', b'a&\xef', 'a~b c']
+        for safe in ('/', '', b'&', '\xfc'):
+            with self.subTest(safe=safe):
+                self.assertEqual(urllib.parse.quote_many(strings, safe),
+                                 [urllib.parse.quote(s, safe)
+                                  for s in strings])
+        self.assertEqual(
+            urllib.parse.quote_many(['\xfc'], encoding='latin-1'), ['%FC'])
+        self.assertEqual(
+            urllib.parse.quote_many(['\u20ac'], encoding='ascii',
+                                    errors='xmlcharrefreplace'),
+            ['%26%238364%3B'])
+        with self.assertRaises(TypeError):
+            urllib.parse.quote_many([b'a'], encoding='utf-8')
+        with self.assertRaises(TypeError):
+            urllib.parse.quote_many([b'a'], errors='strict')
+        with self.assertRaises(TypeError):
+            urllib.parse.quote_many([1])
+
     def test_Quoter_repr(self):
         quoter = urllib.parse.Quoter(urllib.parse._ALWAYS_SAFE)
         self.assertIn('Quoter', repr(quoter))
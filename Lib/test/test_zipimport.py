@@ -556,6 +556,44 @@ class UncompressedZipImportTestCase(ImportHooksBaseTestCase):
             z.close()
             os.remove(TEMP_ZIP)
 
+    def testGetDataModifiedArchive(self):
+        # The archive is read from a cached open file, which must follow the
+        # changes of the file.
+        self.addCleanup(support.unlink, TEMP_ZIP)
+        name = "testdata.dat"
+        for data in [b'a' * 100, b'b' * 5000, b'c' * 10]:
+            with ZipFile(TEMP_ZIP, "w") as z:
+                z.compression = self.compression
+                z.writestr(name, data)
+                z.writestr("other.dat", data[::-1])
+            zipimport._zip_directory_cache.clear()
+            zi = zipimport.zipimporter(TEMP_ZIP)
+            self.assertEqual(zi.get_data(name), data)
+            # The directory is shared by the importers of the archive
+            zi2 = zipimport.zipimporter(TEMP_ZIP)
+            self.assertIs(zi2._files, zi._files)
+            self.assertEqual(zi2.get_data("other.dat"), data[::-1])
+            if hasattr(zipimport, '_zip_file_cache'):
+                self.assertIn(TEMP_ZIP, zipimport._zip_file_cache)
+
+        if hasattr(zipimport, '_zip_file_cache'):
+            # The modification time is compared to the nanosecond
+            cached = zipimport._zip_file_cache[TEMP_ZIP]
+            mtime_ns = os.stat(TEMP_ZIP).st_mtime_ns
+            os.utime(TEMP_ZIP, ns=(mtime_ns, mtime_ns + 1))
+            if os.stat(TEMP_ZIP).st_mtime_ns != mtime_ns:
+                self.assertEqual(zi.get_data(name), data)
+                self.assertIsNot(zipimport._zip_file_cache[TEMP_ZIP], cached)
+
+        # Reading past the end of a truncated archive fails cleanly
+        with open(TEMP_ZIP, "r+b") as f:
+            f.truncate(30)
+        self.assertRaises((OSError, EOFError), zi.get_data, name)
+        os.remove(TEMP_ZIP)
+        self.assertRaises(OSError, zi.get_data, name)
+        if hasattr(zipimport, '_zip_file_cache'):
+            self.assertNotIn(TEMP_ZIP, zipimport._zip_file_cache)
+
     def testImporterAttr(self):
         src = """if 1:  # indent hack
         def get_file():
@@ -9,7 +9,9 @@ the Python Cookbook, published by O'Reilly.
 Library usage: see the Timer class.
 
 Command line usage:
-    python timeit.py [-n N] [-r N] [-s S] [-p] [-h] [--] [statement]
+    python timeit.py [-n N] [-r N] [-s S] [-p] [-P N] [-w N] [--stats]
+                     [--json FILE] [-h] [--] [statement]
+    python timeit.py --compare FILE FILE
 
 Options:
   -n/--number N: how many times to execute 'statement' (default: see below)
@@ -19,6 +21,12 @@ Options:
   -p/--process: use time.process_time() (default is time.perf_counter())
   -v/--verbose: print raw timing results; repeat for more digits precision
   -u/--unit: set the output time unit (nsec, usec, msec, or sec)
+  -P/--processes N: run the timings in N fresh processes, one after the
+                    other (default 0: time in the current process)
+  -w/--warmup N: how many timings to run and discard first (default 0)
+  --stats: print the mean, median, standard deviation and percentiles
+  --json FILE: write the timings and their statistics to FILE as JSON
+  --compare: compare the two JSON result files given instead of statement
   -h/--help: print this usage message and exit
   --: separate options from statement, use when statement starts with -
   statement: statement to be timed (default 'pass')
@@ -30,6 +38,8 @@ treated similarly.
 
 If -n is not given, a suitable number of loops is calculated by trying
 successive powers of 10 until the total time is at least 0.2 seconds.
+With -P, the number of loops is calculated by the first process and used
+by all the others.
 
 Note: there is a certain baseline overhead associated with executing a
 pass statement.  It differs between versions.  The code here doesn't try
@@ -44,6 +54,8 @@ Functions:
 
     timeit(string, string) -> float
     repeat(string, string) -> list
+    repeat_in_processes(string, string) -> (int, list)
+    summarize(list) -> dict
     default_timer() -> float
 
 """
@@ -53,11 +65,13 @@ import sys
 import time
 import itertools
 
-__all__ = ["Timer", "timeit", "repeat", "default_timer"]
+__all__ = ["Timer", "timeit", "repeat", "repeat_in_processes", "summarize",
+           "compare", "default_timer"]
 
 dummy_src_name = "<timeit-src>"
 default_number = 1000000
 default_repeat = 5
+default_processes = 4
 default_timer = time.perf_counter
 
 _globals = globals
@@ -179,14 +193,17 @@ class Timer:
                 gc.enable()
         return timing
 
-    def repeat(self, repeat=default_repeat, number=default_number):
+    def repeat(self, repeat=default_repeat, number=default_number,
+               warmup=0):
         """Call timeit() a few times.
 
         This is a convenience function that calls the timeit()
         repeatedly, returning a list of results.  The first argument
         specifies how many times to call timeit(), defaulting to 5;
         the second argument specifies the timer argument, defaulting
-        to one million.
+        to one million.  The third argument specifies how many times
+        to call timeit() first, discarding the results, so that caches
+        are filled and lazy initializations done before measuring.
 
         Note: it's tempting to calculate mean and standard deviation
         from the result vector and report these.  However, this is not
@@ -199,6 +216,8 @@ class Timer:
         interested in.  After that, you should look at the entire
         vector and apply common sense rather than statistics.
         """
+        for i in range(warmup):
+            self.timeit(number)
         r = []
         for i in range(repeat):
             t = self.timeit(number)
@@ -232,9 +251,125 @@ def timeit(stmt="pass", setup="pass", timer=default_timer,
     return Timer(stmt, setup, timer, globals).timeit(number)
 
 def repeat(stmt="pass", setup="pass", timer=default_timer,
-           repeat=default_repeat, number=default_number, globals=None):
+           repeat=default_repeat, number=default_number, globals=None,
+           warmup=0):
     """Convenience function to create Timer object and call repeat method."""
-    return Timer(stmt, setup, timer, globals).repeat(repeat, number)
+    return Timer(stmt, setup, timer, globals).repeat(repeat, number, warmup)
+
+def repeat_in_processes(stmt="pass", setup="pass",
+                        processes=default_processes, repeat=default_repeat,
+                        number=0, warmup=0, process_time=False):
+    """Call the repeat method of Timer objects in fresh processes.
+
+    The string statements are timed by 'processes' Python processes run
+    one after the other, each one running 'warmup' discarded timings and
+    'repeat' timings of 'number' loops, so that the results do not depend
+    on the state of a single process.  If 'number' is 0, it is determined
+    by the autorange method in the first process.  The timer is
+    time.process_time() if 'process_time' is true, the default timer
+    otherwise.
+
+    Returns (number, timings), 'timings' being the list of the timings
+    of all the processes.  RuntimeError is raised if a process fails,
+    after it has printed its traceback to stderr.
+    """
+    import json, subprocess
+    args = [sys.executable, *subprocess._args_from_interpreter_flags(),
+            '-m', 'timeit', '--worker', '-r', str(repeat),
+            '-w', str(warmup), '-s', setup]
+    if process_time:
+        args.append('-p')
+    timings = []
+    for i in range(processes):
+        proc = subprocess.run(args + ['-n', str(number), '--', stmt],
+                              stdout=subprocess.PIPE,
+                              universal_newlines=True)
+        if proc.returncode:
+            raise RuntimeError("timeit worker process failed with exit "
+                               "code %d" % proc.returncode)
+        # The statement may write to stdout too: the result is on the
+        # last line.
+        result = json.loads(proc.stdout.rstrip('\n').rpartition('\n')[2])
+        number = result['number']
+        timings.extend(result['timings'])
+    return number, timings
+
+def _percentile(values, percent):
+    # Linear interpolation between the closest ranks of the sorted values
+    k = (len(values) - 1) * percent / 100
+    i = int(k)
+    if i + 1 < len(values):
+        return values[i] + (values[i + 1] - values[i]) * (k - i)
+    return values[i]
+
+def summarize(timings):
+    """Return a dict of statistics on a non-empty list of timings.
+
+    The keys are 'count', 'min', 'max', 'mean', 'median', 'stdev' (0.0
+    for a single timing), 'p5' and 'p95' (the 5th and 95th percentiles)
+    and 'outliers', the number of timings further than 1.5 times the
+    interquartile range from the first or the third quartile.
+    """
+    import statistics
+    values = sorted(timings)
+    if not values:
+        raise ValueError("summarize() requires at least one timing")
+    q1 = _percentile(values, 25)
+    q3 = _percentile(values, 75)
+    low = q1 - 1.5 * (q3 - q1)
+    high = q3 + 1.5 * (q3 - q1)
+    return {
+        'count': len(values),
+        'min': values[0],
+        'max': values[-1],
+        'mean': statistics.mean(values),
+        'median': statistics.median(values),
+        'stdev': statistics.stdev(values) if len(values) > 1 else 0.0,
+        'p5': _percentile(values, 5),
+        'p95': _percentile(values, 95),
+        'outliers': sum(1 for value in values if not low <= value <= high),
+    }
+
+def compare(old, new):
+    """Compare two dicts of statistics returned by summarize().
+
+    Returns (t, ratio): 't' is Welch's t statistic of the difference of
+    the means, the difference being significant if abs(t) >= 2 (roughly
+    a 95% confidence that it is not due to noise), and 'ratio' is the
+    ratio of the old median to the new one, greater than 1.0 if new is
+    faster.
+    """
+    import math
+    se = math.sqrt(old['stdev'] ** 2 / old['count'] +
+                   new['stdev'] ** 2 / new['count'])
+    diff = old['mean'] - new['mean']
+    if se:
+        t = diff / se
+    else:
+        t = math.copysign(math.inf, diff) if diff else 0.0
+    return t, old['median'] / new['median']
+
+def _compare(filenames, format_time):
+    import json
+    stats = []
+    for filename in filenames:
+        with open(filename) as f:
+            result = json.load(f)
+        stats.append(summarize(result['timings']))
+        print("%s: %s +- %s (median %s, %d timings)"
+              % (filename, format_time(stats[-1]['mean']),
+                 format_time(stats[-1]['stdev']),
+                 format_time(stats[-1]['median']), stats[-1]['count']))
+    t, ratio = compare(*stats)
+    if abs(t) < 2.0:
+        print("Not significant (t = %.2f)" % t)
+    else:
+        if ratio >= 1.0:
+            change = "%.2fx faster" % ratio
+        else:
+            change = "%.2fx slower" % (1.0 / ratio)
+        print("%s is %s than %s (t = %.2f)"
+              % (filenames[1], change, filenames[0], t))
 
 def main(args=None, *, _wrap_timer=None):
     """Main program, used when run as a script.
@@ -257,10 +392,12 @@ def main(args=None, *, _wrap_timer=None):
         args = sys.argv[1:]
     import getopt
     try:
-        opts, args = getopt.getopt(args, "n:u:s:r:tcpvh",
+        opts, args = getopt.getopt(args, "n:u:s:r:tcpvhP:w:",
                                    ["number=", "setup=", "repeat=",
                                     "time", "clock", "process",
-                                    "verbose", "unit=", "help"])
+                                    "verbose", "unit=", "help",
+                                    "processes=", "warmup=", "stats",
+                                    "json=", "compare", "worker"])
     except getopt.error as err:
         print(err)
         print("use -h/--help for command line help")
@@ -275,6 +412,13 @@ def main(args=None, *, _wrap_timer=None):
     time_unit = None
     units = {"nsec": 1e-9, "usec": 1e-6, "msec": 1e-3, "sec": 1.0}
     precision = 3
+    process_time = False
+    processes = 0
+    warmup = 0
+    show_stats = False
+    json_file = None
+    compare = False
+    worker = False
     for o, a in opts:
         if o in ("-n", "--number"):
             number = int(a)
@@ -293,6 +437,19 @@ def main(args=None, *, _wrap_timer=None):
                 repeat = 1
         if o in ("-p", "--process"):
             timer = time.process_time
+            process_time = True
+        if o in ("-P", "--processes"):
+            processes = max(int(a), 0)
+        if o in ("-w", "--warmup"):
+            warmup = max(int(a), 0)
+        if o == "--stats":
+            show_stats = True
+        if o == "--json":
+            json_file = a
+        if o == "--compare":
+            compare = True
+        if o == "--worker":
+            worker = True
         if o in ("-v", "--verbose"):
             if verbose:
                 precision += 1
@@ -302,6 +459,27 @@ def main(args=None, *, _wrap_timer=None):
             return 0
     setup = "\n".join(setup) or "pass"
 
+    def format_time(dt):
+        unit = time_unit
+
+        if unit is not None:
+            scale = units[unit]
+        else:
+            scales = [(scale, unit) for unit, scale in units.items()]
+            scales.sort(reverse=True)
+            for scale, unit in scales:
+                if dt >= scale:
+                    break
+
+        return "%.*g %s" % (precision, dt / scale, unit)
+
+    if compare:
+        if len(args) != 2:
+            print("--compare requires two result files", file=sys.stderr)
+            return 2
+        _compare(args, format_time)
+        return None
+
     # Include the current directory, so that local imports work (sys.path
     # contains the directory of this script, rather than the current
     # directory)
@@ -310,44 +488,47 @@ def main(args=None, *, _wrap_timer=None):
     if _wrap_timer is not None:
         timer = _wrap_timer(timer)
 
-    t = Timer(stmt, setup, timer)
-    if number == 0:
-        # determine number so that 0.2 <= total time < 2.0
-        callback = None
-        if verbose:
-            def callback(number, time_taken):
-                msg = "{num} loop{s} -> {secs:.{prec}g} secs"
-                plural = (number != 1)
-                print(msg.format(num=number, s='s' if plural else '',
-                                  secs=time_taken, prec=precision))
+    if processes:
         try:
-            number, _ = t.autorange(callback)
+            number, raw_timings = repeat_in_processes(
+                stmt, setup, processes, repeat, number, warmup,
+                process_time)
+        except RuntimeError as err:
+            print(err, file=sys.stderr)
+            return 1
+        repeat = len(raw_timings)
+    else:
+        t = Timer(stmt, setup, timer)
+        if number == 0:
+            # determine number so that 0.2 <= total time < 2.0
+            callback = None
+            if verbose:
+                def callback(number, time_taken):
+                    msg = "{num} loop{s} -> {secs:.{prec}g} secs"
+                    plural = (number != 1)
+                    print(msg.format(num=number, s='s' if plural else '',
+                                      secs=time_taken, prec=precision))
+            try:
+                number, _ = t.autorange(callback)
+            except:
+                t.print_exc()
+                return 1
+
+            if verbose:
+                print()
+
+        try:
+            raw_timings = t.repeat(repeat, number, warmup)
         except:
             t.print_exc()
             return 1
 
-        if verbose:
+        if worker:
+            import json
+            # Start a new line, in case the statement wrote to stdout
             print()
-
-    try:
-        raw_timings = t.repeat(repeat, number)
-    except:
-        t.print_exc()
-        return 1
-
-    def format_time(dt):
-        unit = time_unit
-
-        if unit is not None:
-            scale = units[unit]
-        else:
-            scales = [(scale, unit) for unit, scale in units.items()]
-            scales.sort(reverse=True)
-            for scale, unit in scales:
-                if dt >= scale:
-                    break
-
-        return "%.*g %s" % (precision, dt / scale, unit)
+            print(json.dumps({'number': number, 'timings': raw_timings}))
+            return None
 
     if verbose:
         print("raw times: %s" % ", ".join(map(format_time, raw_timings)))
@@ -359,6 +540,32 @@ def main(args=None, *, _wrap_timer=None):
           % (number, 's' if number != 1 else '',
              repeat, format_time(best)))
 
+    if show_stats:
+        stats = summarize(timings)
+        print("mean %s +- %s, median %s"
+              % (format_time(stats['mean']), format_time(stats['stdev']),
+                 format_time(stats['median'])))
+        outliers = stats['outliers']
+        print("5th percentile %s, 95th percentile %s, %s outlier%s"
+              % (format_time(stats['p5']), format_time(stats['p95']),
+                 outliers or 'no', 's' if outliers != 1 else ''))
+
+    if json_file is not None:
+        import json
+        result = {
+            'stmt': stmt,
+            'setup': setup,
+            'timer': 'process_time' if process_time else 'perf_counter',
+            'number': number,
+            'warmup': warmup,
+            'processes': processes,
+            'timings': timings,
+            'stats': summarize(timings),
+        }
+        with open(json_file, 'w') as f:
+            json.dump(result, f, indent=4)
+            f.write('\n')
+
     best = min(timings)
     worst = max(timings)
     if worst >= best * 4:
@@ -49,6 +49,7 @@ Sample use, programmatically
 """
 __all__ = ['Trace', 'CoverageResults']
 
+import array
 import linecache
 import os
 import re
@@ -292,11 +293,15 @@ class CoverageResults:
                 n_lines, percent, modulename, filename = sums[m]
                 print("%5d   %3d%%   %s   (%s)" % sums[m])
 
+        self._write_counts()
+
+    def _write_counts(self):
         if self.outfile:
             # try and store counts and module info into self.outfile
             try:
-                pickle.dump((self.counts, self.calledfuncs, self.callers),
-                            open(self.outfile, 'wb'), 1)
+                with open(self.outfile, 'wb') as f:
+                    pickle.dump((self.counts, self.calledfuncs, self.callers),
+                                f, 1)
             except OSError as err:
                 print("Can't save counts files because %s" % err, file=sys.stderr)
 
@@ -394,12 +399,17 @@ def _find_executable_linenos(filename):
 class Trace:
     def __init__(self, count=1, trace=1, countfuncs=0, countcallers=0,
                  ignoremods=(), ignoredirs=(), infile=None, outfile=None,
-                 timing=False):
+                 timing=False, coverage=False):
         """
         @param count true iff it should count number of times each
                      line is executed
         @param trace true iff it should print out each line that is
                      being counted
+        @param coverage true iff `count' should only record which lines
+                     are executed: the count of an executed line is 1.
+                     Much faster since the code blocks stop being traced
+                     once all their lines were executed.  Ignored if
+                     `trace' is true
         @param countfuncs true iff it should just output a list of
                      (filename, modulename, funcname,) for functions
                      that were called at least once;  This overrides
@@ -415,7 +425,11 @@ class Trace:
         self.infile = infile
         self.outfile = outfile
         self.ignore = _Ignore(ignoremods, ignoredirs)
-        self.counts = {}   # keys are (filename, linenumber)
+        self._counts = {}   # keys are (filename, linenumber)
+        # maps the ids of the code objects to [code object, first line
+        # number, array of the line counts, local trace function]
+        self._code_counts = {}
+        self.coverage = coverage
         self.pathtobasename = {} # for memoizing os.path.basename
         self.donothing = 0
         self.trace = trace
@@ -436,8 +450,7 @@ class Trace:
             self.globaltrace = self.globaltrace_lt
             self.localtrace = self.localtrace_trace
         elif count:
-            self.globaltrace = self.globaltrace_lt
-            self.localtrace = self.localtrace_count
+            self.globaltrace = self.globaltrace_count
         else:
             # Ahem -- do nothing?  Okay.
             self.donothing = 1
@@ -553,13 +566,89 @@ class Trace:
             else:
                 return None
 
+    @property
+    def counts(self):
+        """The line counts, keyed by (filename, lineno)."""
+        self._fold_code_counts()
+        return self._counts
+
+    @counts.setter
+    def counts(self, counts):
+        self._fold_code_counts()
+        self._counts = counts
+
+    def _fold_code_counts(self):
+        # Move the counts recorded per code object into self._counts.
+        counts = self._counts
+        for code, base, code_counts, localtrace in self._code_counts.values():
+            if code_counts is None:
+                continue
+            filename = code.co_filename
+            for i, count in enumerate(code_counts):
+                if count:
+                    code_counts[i] = 0
+                    key = filename, base + i
+                    counts[key] = counts.get(key, 0) + count
+
+    def globaltrace_count(self, frame, why, arg):
+        """Handler for call events when counting lines without tracing them.
+
+        If the code block being entered is to be ignored, or if all its
+        lines were already executed in coverage mode, returns `None', else
+        returns the local trace function counting the lines of this code.
+        """
+        if why == 'call':
+            entry = self._code_counts.get(id(frame.f_code))
+            if entry is None:
+                entry = self._add_code_counts(frame)
+            return entry[3]
+
+    def _add_code_counts(self, frame):
+        code = frame.f_code
+        entry = self._code_counts[id(code)] = [code, 0, None, None]
+        filename = frame.f_globals.get('__file__', None)
+        if not filename:
+            return entry
+        # XXX _modname() doesn't work right for packages, so
+        # the ignore support won't work right for packages
+        modulename = _modname(filename)
+        if modulename is None or self.ignore.names(filename, modulename):
+            return entry
+
+        # Count the lines into an array indexed by line number rather than
+        # in a dict keyed by (filename, lineno) tuples.
+        linenos = {lineno for _, lineno in dis.findlinestarts(code)}
+        base = min(linenos)
+        counts = array.array('L', [0]) * (max(linenos) - base + 1)
+        if self.coverage:
+            def localtrace(frame, why, arg):
+                if why == "line":
+                    lineno = frame.f_lineno
+                    if lineno in linenos:
+                        linenos.remove(lineno)
+                        counts[lineno - base] = 1
+                        if not linenos:
+                            # All the lines were executed: stop tracing
+                            # this code block.
+                            entry[3] = None
+                            frame.f_trace = None
+                            return None
+                return localtrace
+        else:
+            def localtrace(frame, why, arg):
+                if why == "line":
+                    counts[frame.f_lineno - base] += 1
+                return localtrace
+        entry[1:] = base, counts, localtrace
+        return entry
+
     def localtrace_trace_and_count(self, frame, why, arg):
         if why == "line":
             # record the file name and line number of every trace
             filename = frame.f_code.co_filename
             lineno = frame.f_lineno
             key = filename, lineno
-            self.counts[key] = self.counts.get(key, 0) + 1
+            self._counts[key] = self._counts.get(key, 0) + 1
 
             if self.start_time:
                 print('%.2f' % (_time() - self.start_time), end=' ')
@@ -586,7 +675,7 @@ class Trace:
             filename = frame.f_code.co_filename
             lineno = frame.f_lineno
             key = filename, lineno
-            self.counts[key] = self.counts.get(key, 0) + 1
+            self._counts[key] = self._counts.get(key, 0) + 1
         return self.localtrace
 
     def results(self):
@@ -631,8 +720,16 @@ def main():
             help='Do not generate the coverage report files. '
                  'Useful if you want to accumulate over several runs.')
 
+    grp.add_argument('--coverage', action='store_true',
+            help='With --count, only record which lines are executed, which '
+                 'is much faster: the count of an executed line is 1. '
+                 'Cannot be specified alongside --trace.')
     grp.add_argument('-f', '--file',
             help='File to accumulate counts over several runs')
+    grp.add_argument('--merge', action='append', default=[], metavar='FILE',
+            help='Merge the counts of FILE, written by another run with '
+                 '--file, into the results. Can be specified multiple times, '
+                 'for example to combine the counts of parallel runs')
     grp.add_argument('-C', '--coverdir',
             help='Directory where the report files go. The coverage report '
                  'for <package>.<module> will be written to file '
@@ -679,10 +776,16 @@ def main():
     opts.ignore_dir = [parse_ignore_dir(s)
                        for i in opts.ignore_dir for s in i.split(os.pathsep)]
 
+    def merge_results(results):
+        for filename in opts.merge:
+            results.update(CoverageResults(infile=filename))
+        return results
+
     if opts.report:
-        if not opts.file:
-            parser.error('-r/--report requires -f/--file')
+        if not opts.file and not opts.merge:
+            parser.error('-r/--report requires -f/--file or --merge')
         results = CoverageResults(infile=opts.file, outfile=opts.file)
+        results = merge_results(results)
         return results.write_results(opts.missing, opts.summary, opts.coverdir)
 
     if not any([opts.trace, opts.count, opts.listfuncs, opts.trackcalls]):
@@ -692,6 +795,10 @@ def main():
     if opts.listfuncs and (opts.count or opts.trace):
         parser.error('cannot specify both --listfuncs and (--trace or --count)')
 
+    if opts.coverage and (opts.trace or not opts.count):
+        parser.error('--coverage can only be used with --count, '
+                     'without --trace')
+
     if opts.summary and not opts.count:
         parser.error('--summary can only be used with --count or --report')
 
@@ -704,7 +811,7 @@ def main():
     t = Trace(opts.count, opts.trace, countfuncs=opts.listfuncs,
               countcallers=opts.trackcalls, ignoremods=opts.ignore_module,
               ignoredirs=opts.ignore_dir, infile=opts.file,
-              outfile=opts.file, timing=opts.timing)
+              outfile=opts.file, timing=opts.timing, coverage=opts.coverage)
     try:
         with open(opts.filename) as fp:
             code = compile(fp.read(), opts.filename, 'exec')
@@ -721,10 +828,12 @@ def main():
     except SystemExit:
         pass
 
-    results = t.results()
+    results = merge_results(t.results())
 
     if not opts.no_report:
         results.write_results(opts.missing, opts.summary, opts.coverdir)
+    else:
+        results._write_counts()
 
 if __name__=='__main__':
     main()
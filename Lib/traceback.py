@@ -9,8 +9,8 @@ __all__ = ['extract_stack', 'extract_tb', 'format_exception',
            'format_exception_only', 'format_list', 'format_stack',
            'format_tb', 'print_exc', 'format_exc', 'print_exception',
            'print_last', 'print_stack', 'print_tb', 'clear_frames',
-           'FrameSummary', 'StackSummary', 'TracebackException',
-           'walk_stack', 'walk_tb']
+           'FrameSummary', 'StackSummary', 'CapturedStack',
+           'TracebackException', 'walk_stack', 'walk_tb']
 
 #
 # Formatting and printing lists of traceback lines.
@@ -310,6 +310,19 @@ def walk_tb(tb):
         tb = tb.tb_next
 
 
+def _limit_frame_gen(frame_gen, limit):
+    if limit is None:
+        limit = getattr(sys, 'tracebacklimit', None)
+        if limit is not None and limit < 0:
+            limit = 0
+    if limit is not None:
+        if limit >= 0:
+            frame_gen = itertools.islice(frame_gen, limit)
+        else:
+            frame_gen = collections.deque(frame_gen, maxlen=-limit)
+    return frame_gen
+
+
 class StackSummary(list):
     """A stack of frames."""
 
@@ -327,15 +340,7 @@ class StackSummary(list):
         :param capture_locals: If True, the local variables from each frame will
             be captured as object representations into the FrameSummary.
         """
-        if limit is None:
-            limit = getattr(sys, 'tracebacklimit', None)
-            if limit is not None and limit < 0:
-                limit = 0
-        if limit is not None:
-            if limit >= 0:
-                frame_gen = itertools.islice(frame_gen, limit)
-            else:
-                frame_gen = collections.deque(frame_gen, maxlen=-limit)
+        frame_gen = _limit_frame_gen(frame_gen, limit)
 
         result = klass()
         fnames = set()
@@ -425,6 +430,71 @@ class StackSummary(list):
         return result
 
 
+class CapturedStack:
+    """A stack of frames captured cheaply, to be summarized when needed.
+
+    Only the code object, line number and globals of each frame are kept,
+    not the frames themselves: the StackSummary is built, and the lines
+    looked up in the linecache, when :meth:`summary` or :meth:`format` is
+    first called.
+    """
+
+    __slots__ = ('_frames', '_summary')
+
+    def __init__(self, frame_gen, *, limit=None):
+        """Capture the frames yielded by frame_gen.
+
+        :param frame_gen: A generator that yields (frame, lineno) tuples to
+            include in the stack, as walk_stack() and walk_tb() do.
+        :param limit: None to include all frames or the number of frames to
+            include, as for StackSummary.extract.
+        """
+        # A flat list takes a third of the memory of a list of tuples
+        frames = []
+        for f, lineno in _limit_frame_gen(frame_gen, limit):
+            frames += (f.f_code, lineno, f.f_globals)
+        self._frames = frames
+        self._summary = None
+
+    def __len__(self):
+        if self._summary is not None:
+            return len(self._summary)
+        return len(self._frames) // 3
+
+    def __eq__(self, other):
+        if isinstance(other, CapturedStack):
+            other = other.summary()
+        elif not isinstance(other, list):
+            return NotImplemented
+        return self.summary() == other
+
+    def __repr__(self):
+        return "<CapturedStack of {} frames>".format(len(self))
+
+    def summary(self):
+        """Return the StackSummary of the captured frames."""
+        if self._summary is None:
+            result = StackSummary()
+            fnames = set()
+            it = iter(self._frames)
+            for code, lineno, f_globals in zip(it, it, it):
+                filename = code.co_filename
+                fnames.add(filename)
+                linecache.lazycache(filename, f_globals)
+                result.append(FrameSummary(
+                    filename, lineno, code.co_name, lookup_line=False))
+            for filename in fnames:
+                linecache.checkcache(filename)
+            self._summary = result
+            # The globals are no longer needed
+            self._frames = None
+        return self._summary
+
+    def format(self):
+        """Format the stack ready for printing, as StackSummary.format."""
+        return self.summary().format()
+
+
 class TracebackException:
     """An exception ready for rendering.
 
@@ -440,7 +510,9 @@ class TracebackException:
     - :attr:`__context__` A TracebackException of the original *__context__*.
     - :attr:`__suppress_context__` The *__suppress_context__* value from the
       original exception.
-    - :attr:`stack` A `StackSummary` representing the traceback.
+    - :attr:`stack` A `StackSummary` representing the traceback.  If the
+      TracebackException was created with *lazy* true, it is built from a
+      `CapturedStack` when first accessed.
     - :attr:`exc_type` The class of the original traceback.
     - :attr:`filename` For syntax errors - the filename where the error
       occurred.
@@ -454,10 +526,12 @@ class TracebackException:
     """
 
     def __init__(self, exc_type, exc_value, exc_traceback, *, limit=None,
-            lookup_lines=True, capture_locals=False, _seen=None):
+            lookup_lines=True, capture_locals=False, lazy=False, _seen=None):
         # NB: we need to accept exc_traceback, exc_value, exc_traceback to
         # permit backwards compat with the existing API, otherwise we
         # need stub thunk objects just to glue it together.
+        if lazy and capture_locals:
+            raise ValueError("capture_locals cannot be used with lazy")
         # Handle loops in __cause__ or __context__.
         if _seen is None:
             _seen = set()
@@ -473,6 +547,7 @@ class TracebackException:
                 limit=limit,
                 lookup_lines=False,
                 capture_locals=capture_locals,
+                lazy=lazy,
                 _seen=_seen)
         else:
             cause = None
@@ -485,6 +560,7 @@ class TracebackException:
                 limit=limit,
                 lookup_lines=False,
                 capture_locals=capture_locals,
+                lazy=lazy,
                 _seen=_seen)
         else:
             context = None
@@ -494,9 +570,12 @@ class TracebackException:
         self.__suppress_context__ = \
             exc_value.__suppress_context__ if exc_value else False
         # TODO: locals.
-        self.stack = StackSummary.extract(
-            walk_tb(exc_traceback), limit=limit, lookup_lines=lookup_lines,
-            capture_locals=capture_locals)
+        if lazy:
+            self._stack = CapturedStack(walk_tb(exc_traceback), limit=limit)
+        else:
+            self._stack = StackSummary.extract(
+                walk_tb(exc_traceback), limit=limit,
+                lookup_lines=lookup_lines, capture_locals=capture_locals)
         self.exc_type = exc_type
         # Capture now to permit freeing resources: only complication is in the
         # unofficial API _format_final_exc_line
@@ -508,7 +587,7 @@ class TracebackException:
             self.text = exc_value.text
             self.offset = exc_value.offset
             self.msg = exc_value.msg
-        if lookup_lines:
+        if lookup_lines and not lazy:
             self._load_lines()
 
     @classmethod
@@ -516,6 +595,17 @@ class TracebackException:
         """Create a TracebackException from an exception."""
         return cls(type(exc), exc, exc.__traceback__, *args, **kwargs)
 
+    @property
+    def stack(self):
+        stack = self._stack
+        if isinstance(stack, CapturedStack):
+            stack = self._stack = stack.summary()
+        return stack
+
+    @stack.setter
+    def stack(self, stack):
+        self._stack = stack
+
     def _load_lines(self):
         """Private API. force all lines in the stack to be loaded."""
         for frame in self.stack:
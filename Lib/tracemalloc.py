@@ -1,13 +1,22 @@
+from collections import Counter
 from collections.abc import Sequence, Iterable
 from functools import total_ordering
+import array
 import fnmatch
 import linecache
+import marshal
 import os.path
 import pickle
+import sys
 
 # Import types and functions implemented in C
 from _tracemalloc import *
-from _tracemalloc import _get_object_traceback, _get_traces
+from _tracemalloc import _get_object_traceback, _get_traces, _get_statistics
+
+# Header of the files written by Snapshot.dump()
+_DUMP_MAGIC = b'TRACEMALLOC\x00\x01\n'
+# Number of traces written per record of a dump
+_DUMP_CHUNK = 2 ** 16
 
 
 def _format_size(size, sign):
@@ -401,8 +410,40 @@ class Snapshot:
         """
         Write the snapshot into a file.
         """
+        # The attributes other than the traces are pickled, then the traces
+        # are written by chunks: each record holds the tracebacks and the
+        # distinct traces not written yet, followed by the indexes of the
+        # distinct traces of the chunk.
+        traces = self.traces._traces
+        state = self.__dict__.copy()
+        del state['traces']
+        traceback_indexes = {}
+        trace_indexes = {}
         with open(filename, "wb") as fp:
-            pickle.dump(self, fp, pickle.HIGHEST_PROTOCOL)
+            fp.write(_DUMP_MAGIC)
+            pickle.dump((type(self), state, sys.byteorder), fp,
+                        pickle.HIGHEST_PROTOCOL)
+            for start in range(0, len(traces), _DUMP_CHUNK):
+                chunk = traces[start:start + _DUMP_CHUNK]
+                # identical traces usually share the same tuple
+                chunk_ids = list(map(id, chunk))
+                new_tracebacks = []
+                new_traces = []
+                for key, trace in dict(zip(chunk_ids, chunk)).items():
+                    if key in trace_indexes:
+                        continue
+                    domain, size, traceback = trace
+                    index = traceback_indexes.get(id(traceback))
+                    if index is None:
+                        index = len(traceback_indexes)
+                        traceback_indexes[id(traceback)] = index
+                        new_tracebacks.append(traceback)
+                    trace_indexes[key] = len(trace_indexes)
+                    new_traces.append((domain, size, index))
+                indexes = array.array('I', map(trace_indexes.__getitem__,
+                                               chunk_ids))
+                marshal.dump((new_tracebacks, new_traces, indexes.tobytes()),
+                             fp)
 
     @staticmethod
     def load(filename):
@@ -410,7 +451,30 @@ class Snapshot:
         Load a snapshot from a file.
         """
         with open(filename, "rb") as fp:
-            return pickle.load(fp)
+            if fp.peek(len(_DUMP_MAGIC))[:len(_DUMP_MAGIC)] != _DUMP_MAGIC:
+                # snapshot pickled by Python 3.7 and older
+                return pickle.load(fp)
+            fp.read(len(_DUMP_MAGIC))
+            cls, state, byteorder = pickle.load(fp)
+            tracebacks = []
+            distinct_traces = []
+            traces = []
+            while True:
+                try:
+                    new_tracebacks, new_traces, indexes = marshal.load(fp)
+                except EOFError:
+                    break
+                tracebacks.extend(new_tracebacks)
+                distinct_traces.extend([(domain, size, tracebacks[index])
+                                        for domain, size, index in new_traces])
+                indexes = array.array('I', indexes)
+                if byteorder != sys.byteorder:
+                    indexes.byteswap()
+                traces.extend(map(distinct_traces.__getitem__, indexes))
+        snapshot = cls.__new__(cls)
+        snapshot.__dict__.update(state)
+        snapshot.traces = _Traces(traces)
+        return snapshot
 
     def _filter_trace(self, include_filters, exclude_filters, trace):
         if include_filters:
@@ -455,11 +519,19 @@ class Snapshot:
             raise ValueError("cumulative mode cannot by used "
                              "with key type %r" % key_type)
 
+        # Identical traces usually share the same tuple: count the traces by
+        # identity, which is much cheaper than hashing their tracebacks, and
+        # group each distinct trace once.
+        traces = self.traces._traces
+        counts = Counter(map(id, traces))
+        distinct_traces = dict(zip(map(id, traces), traces))
+
         stats = {}
         tracebacks = {}
         if not cumulative:
-            for trace in self.traces._traces:
-                domain, size, trace_traceback = trace
+            for key, count in counts.items():
+                domain, size, trace_traceback = distinct_traces[key]
+                size *= count
                 try:
                     traceback = tracebacks[trace_traceback]
                 except KeyError:
@@ -474,13 +546,14 @@ class Snapshot:
                 try:
                     stat = stats[traceback]
                     stat.size += size
-                    stat.count += 1
+                    stat.count += count
                 except KeyError:
-                    stats[traceback] = Statistic(traceback, size, 1)
+                    stats[traceback] = Statistic(traceback, size, count)
         else:
             # cumulative statistics
-            for trace in self.traces._traces:
-                domain, size, trace_traceback = trace
+            for key, count in counts.items():
+                domain, size, trace_traceback = distinct_traces[key]
+                size *= count
                 for frame in trace_traceback:
                     try:
                         traceback = tracebacks[frame]
@@ -494,9 +567,9 @@ class Snapshot:
                     try:
                         stat = stats[traceback]
                         stat.size += size
-                        stat.count += 1
+                        stat.count += count
                     except KeyError:
-                        stats[traceback] = Statistic(traceback, size, 1)
+                        stats[traceback] = Statistic(traceback, size, count)
         return stats
 
     def statistics(self, key_type, cumulative=False):
@@ -532,3 +605,30 @@ def take_snapshot():
     traces = _get_traces()
     traceback_limit = get_traceback_limit()
     return Snapshot(traces, traceback_limit)
+
+
+def get_statistics(key_type, cumulative=False):
+    """
+    Get statistics on the traced memory blocks grouped by key_type, without
+    taking a snapshot. Return a sorted list of Statistic instances.
+    """
+    if not is_tracing():
+        raise RuntimeError("the tracemalloc module must be tracing memory "
+                           "allocations to get statistics")
+    statistics = [Statistic(Traceback(frames), size, count)
+                  for frames, size, count in _get_statistics(key_type,
+                                                             cumulative)]
+    statistics.sort(reverse=True, key=Statistic._sort_key)
+    return statistics
+
+
+def compare_statistics(old_statistics, new_statistics):
+    """
+    Compute the differences between two lists of Statistic instances grouped
+    by the same key type. Return a sorted list of StatisticDiff instances.
+    """
+    old_group = {stat.traceback: stat for stat in old_statistics}
+    new_group = {stat.traceback: stat for stat in new_statistics}
+    statistics = _compare_grouped_stats(old_group, new_group)
+    statistics.sort(reverse=True, key=StatisticDiff._sort_key)
+    return statistics
@@ -32,10 +32,10 @@ import sys
 import collections
 
 __all__ = ["urlparse", "urlunparse", "urljoin", "urldefrag",
-           "urlsplit", "urlunsplit", "urlencode", "parse_qs",
-           "parse_qsl", "quote", "quote_plus", "quote_from_bytes",
-           "unquote", "unquote_plus", "unquote_to_bytes",
-           "DefragResult", "ParseResult", "SplitResult",
+           "urlsplit", "urlsplit_many", "urlunsplit", "urlencode",
+           "parse_qs", "parse_qsl", "quote", "quote_many", "quote_plus",
+           "quote_from_bytes", "unquote", "unquote_plus", "unquote_to_bytes",
+           "cache_info", "DefragResult", "ParseResult", "SplitResult",
            "DefragResultBytes", "ParseResultBytes", "SplitResultBytes"]
 
 # A classification of schemes.
@@ -76,15 +76,76 @@ scheme_chars = ('abcdefghijklmnopqrstuvwxyz'
                 '0123456789'
                 '+-.')
 
-# XXX: Consider replacing with functools.lru_cache
-MAX_CACHE_SIZE = 20
-_parse_cache = {}
+# Maximum number of entries kept in each of the parse and quoters caches.
+# Least recently used entries are evicted first once the limit is reached.
+MAX_CACHE_SIZE = 128
+
+_CacheInfo = collections.namedtuple(
+    'CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+class _LRUCache(collections.OrderedDict):
+    """An ordered mapping evicting its least recently used entries.
+
+    Unlike functools.lru_cache, the cache is keyed explicitly, so that
+    str and bytes callers share the parsed results, and it can be cleared
+    and inspected as a whole by clear_cache() and cache_info().
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.hits = self.misses = 0
+
+    def lookup(self, key):
+        """Return the value cached for key (or None), marking it as used."""
+        try:
+            value = self[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        # The caches are shared by all the threads: another one may have
+        # evicted the entry since it was read.
+        try:
+            self.move_to_end(key)
+        except KeyError:
+            pass
+        self.hits += 1
+        return value
+
+    def store(self, key, value):
+        """Cache value for key, evicting the oldest entries if needed."""
+        self[key] = value
+        # MAX_CACHE_SIZE is looked up on each call so that it can be tuned
+        # at runtime.
+        while len(self) > max(MAX_CACHE_SIZE, 1):
+            try:
+                self.popitem(last=False)
+            except KeyError:
+                # emptied by another thread
+                break
+
+    def clear(self):
+        super().clear()
+        self.hits = self.misses = 0
+
+    def info(self):
+        return _CacheInfo(self.hits, self.misses, MAX_CACHE_SIZE, len(self))
+
+_parse_cache = _LRUCache()
 
 def clear_cache():
     """Clear the parse cache and the quoters cache."""
     _parse_cache.clear()
     _safe_quoters.clear()
 
+def cache_info():
+    """Report statistics of the parse cache and the quoters cache.
+
+    Return a dict mapping 'urlsplit' and 'quote' to named tuples
+    (hits, misses, maxsize, currsize), like functools.lru_cache does.
+    """
+    return {'urlsplit': _parse_cache.info(),
+            'quote': _safe_quoters.info()}
+
 
 # Helpers for bytes handling
 # For 3.2, we deliberately require applications that
@@ -400,11 +461,40 @@ def urlsplit(url, scheme='', allow_fragments=True):
     url, scheme, _coerce_result = _coerce_args(url, scheme)
     allow_fragments = bool(allow_fragments)
     key = url, scheme, allow_fragments, type(url), type(scheme)
-    cached = _parse_cache.get(key, None)
+    cached = _parse_cache.lookup(key)
     if cached:
         return _coerce_result(cached)
-    if len(_parse_cache) >= MAX_CACHE_SIZE: # avoid runaway growth
-        clear_cache()
+    v = _urlsplit(url, scheme, allow_fragments)
+    _parse_cache.store(key, v)
+    return _coerce_result(v)
+
+def urlsplit_many(urls, scheme='', allow_fragments=True):
+    """Like urlsplit(), but parse an iterable of URLs and return a list.
+
+    Duplicate URLs in urls are only parsed once.  The results are not
+    stored in the shared parse cache, so a large batch does not evict the
+    entries used by other urlsplit() callers."""
+    allow_fragments = bool(allow_fragments)
+    batch_cache = {}
+    result = []
+    append = result.append
+    for url in urls:
+        try:
+            append(batch_cache[url])
+            continue
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable input (e.g. bytearray): parse without memoizing.
+            append(urlsplit(url, scheme, allow_fragments))
+            continue
+        u, s, _coerce_result = _coerce_args(url, scheme)
+        v = batch_cache[url] = _coerce_result(_urlsplit(u, s, allow_fragments))
+        append(v)
+    return result
+
+def _urlsplit(url, scheme, allow_fragments):
+    # Uncached implementation of urlsplit() working on str arguments.
     netloc = query = fragment = ''
     i = url.find(':')
     if i > 0:
@@ -419,9 +509,7 @@ def urlsplit(url, scheme='', allow_fragments=True):
                 url, fragment = url.split('#', 1)
             if '?' in url:
                 url, query = url.split('?', 1)
-            v = SplitResult('http', netloc, url, query, fragment)
-            _parse_cache[key] = v
-            return _coerce_result(v)
+            return SplitResult('http', netloc, url, query, fragment)
         for c in url[:i]:
             if c not in scheme_chars:
                 break
@@ -442,9 +530,7 @@ def urlsplit(url, scheme='', allow_fragments=True):
         url, fragment = url.split('#', 1)
     if '?' in url:
         url, query = url.split('?', 1)
-    v = SplitResult(scheme, netloc, url, query, fragment)
-    _parse_cache[key] = v
-    return _coerce_result(v)
+    return SplitResult(scheme, netloc, url, query, fragment)
 
 def urlunparse(components):
     """Put a parsed URL back together again.  This may result in a
@@ -719,7 +805,7 @@ _ALWAYS_SAFE = frozenset(b'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
                          b'0123456789'
                          b'_.-~')
 _ALWAYS_SAFE_BYTES = bytes(_ALWAYS_SAFE)
-_safe_quoters = {}
+_safe_quoters = _LRUCache()
 
 class Quoter(collections.defaultdict):
     """A mapping from bytes (in range(0,256)) to strings.
@@ -790,6 +876,40 @@ def quote(string, safe='/', encoding=None, errors=None):
             raise TypeError("quote() doesn't support 'errors' for bytes")
     return quote_from_bytes(string, safe)
 
+def quote_many(strings, safe='/', encoding=None, errors=None):
+    """Like quote(), but quote each item of an iterable and return a list.
+
+    The safe set is normalized and its quoter looked up only once for the
+    whole batch, which is cheaper than calling quote() for every item.
+    """
+    str_encoding = 'utf-8' if encoding is None else encoding
+    str_errors = 'strict' if errors is None else errors
+    safe = _normalize_safe(safe)
+    always_safe = _ALWAYS_SAFE_BYTES + safe
+    quoter = None
+    result = []
+    append = result.append
+    for string in strings:
+        if isinstance(string, str):
+            if not string:
+                append(string)
+                continue
+            string = string.encode(str_encoding, str_errors)
+        else:
+            if encoding is not None:
+                raise TypeError("quote() doesn't support 'encoding' for bytes")
+            if errors is not None:
+                raise TypeError("quote() doesn't support 'errors' for bytes")
+            if not isinstance(string, (bytes, bytearray)):
+                raise TypeError("quote_from_bytes() expected bytes")
+        if not string.rstrip(always_safe):
+            append(string.decode())
+            continue
+        if quoter is None:
+            quoter = _get_quoter(safe)
+        append(''.join([quoter(char) for char in string]))
+    return result
+
 def quote_plus(string, safe='', encoding=None, errors=None):
     """Like quote(), but also replace ' ' with '+', as required for quoting
     HTML form values. Plus signs in the original string are escaped unless
@@ -816,19 +936,26 @@ def quote_from_bytes(bs, safe='/'):
         raise TypeError("quote_from_bytes() expected bytes")
     if not bs:
         return ''
-    if isinstance(safe, str):
-        # Normalize 'safe' by converting to bytes and removing non-ASCII chars
-        safe = safe.encode('ascii', 'ignore')
-    else:
-        safe = bytes([c for c in safe if c < 128])
+    safe = _normalize_safe(safe)
     if not bs.rstrip(_ALWAYS_SAFE_BYTES + safe):
         return bs.decode()
-    try:
-        quoter = _safe_quoters[safe]
-    except KeyError:
-        _safe_quoters[safe] = quoter = Quoter(safe).__getitem__
+    quoter = _get_quoter(safe)
     return ''.join([quoter(char) for char in bs])
 
+def _normalize_safe(safe):
+    if isinstance(safe, str):
+        # Normalize 'safe' by converting to bytes and removing non-ASCII chars
+        return safe.encode('ascii', 'ignore')
+    return bytes([c for c in safe if c < 128])
+
+def _get_quoter(safe):
+    # Return the cached quoter function for the normalized safe bytes.
+    quoter = _safe_quoters.lookup(safe)
+    if quoter is None:
+        quoter = Quoter(safe).__getitem__
+        _safe_quoters.store(safe, quoter)
+    return quoter
+
 def urlencode(query, doseq=False, safe='', encoding=None, errors=None,
               quote_via=quote_plus):
     """Encode a dict or sequence of two-element tuples into a URL query string.
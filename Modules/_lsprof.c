@@ -1,5 +1,6 @@
 #include "Python.h"
 #include "frameobject.h"
+#include "pythread.h"
 #include "rotatingtree.h"
 
 /*** Selection of a high-precision timer ***/
@@ -90,8 +91,17 @@ typedef struct _ProfilerContext {
     long long subt;
     struct _ProfilerContext *previous;
     ProfilerEntry *ctxEntry;
+    PyObject *task; /* the task this call started a step of, or NULL */
+    int inTask; /* true if this call runs in a step of a task */
 } ProfilerContext;
 
+/* represents a thread, with its own stack of ProfilerContexts */
+typedef struct _ProfilerThread {
+    rotating_node_t header; /* the key is the thread identifier */
+    ProfilerContext *context; /* saved while another thread runs */
+    long long it; /* inline time of the calls made in this thread */
+} ProfilerThread;
+
 typedef struct {
     PyObject_HEAD
     rotating_node_t *profilerEntries;
@@ -100,18 +110,62 @@ typedef struct {
     int flags;
     PyObject *externalTimer;
     double externalTimerUnit;
+    rotating_node_t *profilerThreads;
+    ProfilerThread *currentThread;
+    PyObject *taskFunc;
+    PyObject *taskStats; /* dict mapping the tasks to their time */
 } ProfilerObject;
 
 #define POF_ENABLED     0x001
 #define POF_SUBCALLS    0x002
 #define POF_BUILTINS    0x004
+#define POF_ALLTHREADS  0x008
 #define POF_NOMEMORY    0x100
 
+#define CO_TASK_FLAGS   (CO_COROUTINE | CO_ITERABLE_COROUTINE | \
+                         CO_ASYNC_GENERATOR)
+
 static PyTypeObject PyProfiler_Type;
 
 #define PyProfiler_Check(op) PyObject_TypeCheck(op, &PyProfiler_Type)
 #define PyProfiler_CheckExact(op) (Py_TYPE(op) == &PyProfiler_Type)
 
+/*** Threads ***/
+
+/* Make currentProfilerContext the stack of the running thread, saving the
+   stack of the thread which was running before.  This is needed at the
+   start of each event, and after calling Python code which could have
+   released the GIL.  On memory errors the event is not recorded: the
+   current thread is left to NULL. */
+static void
+switchThread(ProfilerObject *pObj)
+{
+    void *key = (void *)PyThread_get_thread_ident();
+    ProfilerThread *thread = pObj->currentThread;
+
+    if (thread != NULL) {
+        if (thread->header.key == key)
+            return;
+        thread->context = pObj->currentProfilerContext;
+    }
+    thread = (ProfilerThread*) RotatingTree_Get(&pObj->profilerThreads, key);
+    if (thread == NULL) {
+        thread = (ProfilerThread*) PyMem_Malloc(sizeof(ProfilerThread));
+        if (thread == NULL) {
+            pObj->flags |= POF_NOMEMORY;
+            pObj->currentThread = NULL;
+            pObj->currentProfilerContext = NULL;
+            return;
+        }
+        thread->header.key = key;
+        thread->context = NULL;
+        thread->it = 0;
+        RotatingTree_Add(&pObj->profilerThreads, &thread->header);
+    }
+    pObj->currentThread = thread;
+    pObj->currentProfilerContext = thread->context;
+}
+
 /*** External Timers ***/
 
 #define DOUBLE_TIMER_PRECISION   4294967296.0
@@ -121,6 +175,11 @@ static long long CallExternalTimer(ProfilerObject *pObj)
 {
     long long result;
     PyObject *o = PyObject_Call(pObj->externalTimer, empty_tuple, NULL);
+    /* The timer may have released the GIL and let the profiler run in
+       another thread.  The stacks of all the threads are flushed with the
+       profiler disabled: they must not be switched then. */
+    if (pObj->flags & POF_ENABLED)
+        switchThread(pObj);
     if (o == NULL) {
         PyErr_WriteUnraisable(pObj->externalTimer);
         return 0;
@@ -150,6 +209,18 @@ static long long CallExternalTimer(ProfilerObject *pObj)
                                         CallExternalTimer(pObj) :       \
                                         hpTimer())
 
+/* the duration of a timer unit, in seconds */
+static double
+timerFactor(ProfilerObject *pObj)
+{
+    if (!pObj->externalTimer)
+        return hpTimerUnit();
+    else if (pObj->externalTimerUnit > 0.0)
+        return pObj->externalTimerUnit;
+    else
+        return 1.0 / DOUBLE_TIMER_PRECISION;
+}
+
 /*** ProfilerObject ***/
 
 static PyObject *
@@ -232,7 +303,9 @@ newProfilerEntry(ProfilerObject *pObj, void *key, PyObject *userObj)
         return NULL;
     }
     userObj = normalizeUserObj(userObj);
-    if (userObj == NULL) {
+    switchThread(pObj);
+    if (userObj == NULL || pObj->currentThread == NULL) {
+        Py_XDECREF(userObj);
         PyErr_Clear();
         PyMem_Free(self);
         pObj->flags |= POF_NOMEMORY;
@@ -298,15 +371,31 @@ static int freeEntry(rotating_node_t *header, void *arg)
     return 0;
 }
 
+static int freeThread(rotating_node_t *header, void *arg)
+{
+    ProfilerThread *thread = (ProfilerThread*) header;
+    while (thread->context) {
+        ProfilerContext *c = thread->context;
+        thread->context = c->previous;
+        Py_XDECREF(c->task);
+        PyMem_Free(c);
+    }
+    PyMem_Free(thread);
+    return 0;
+}
+
 static void clearEntries(ProfilerObject *pObj)
 {
     RotatingTree_Enum(pObj->profilerEntries, freeEntry, NULL);
     pObj->profilerEntries = EMPTY_ROTATING_TREE;
     /* release the memory hold by the ProfilerContexts */
-    if (pObj->currentProfilerContext) {
-        PyMem_Free(pObj->currentProfilerContext);
-        pObj->currentProfilerContext = NULL;
-    }
+    if (pObj->currentThread)
+        pObj->currentThread->context = pObj->currentProfilerContext;
+    RotatingTree_Enum(pObj->profilerThreads, freeThread, NULL);
+    pObj->profilerThreads = EMPTY_ROTATING_TREE;
+    pObj->currentThread = NULL;
+    pObj->currentProfilerContext = NULL;
+    Py_CLEAR(pObj->taskStats);
     while (pObj->freelistProfilerContext) {
         ProfilerContext *c = pObj->freelistProfilerContext;
         pObj->freelistProfilerContext = c->previous;
@@ -316,11 +405,15 @@ static void clearEntries(ProfilerObject *pObj)
 }
 
 static void
-initContext(ProfilerObject *pObj, ProfilerContext *self, ProfilerEntry *entry)
+initContext(ProfilerObject *pObj, ProfilerContext *self, ProfilerEntry *entry,
+            PyObject *task)
 {
     self->ctxEntry = entry;
     self->subt = 0;
     self->previous = pObj->currentProfilerContext;
+    self->task = task;
+    self->inTask = task != NULL ||
+                   (self->previous != NULL && self->previous->inTask);
     pObj->currentProfilerContext = self;
     ++entry->recursionLevel;
     if ((pObj->flags & POF_SUBCALLS) && self->previous) {
@@ -335,6 +428,40 @@ initContext(ProfilerObject *pObj, ProfilerContext *self, ProfilerEntry *entry)
     self->t0 = CALL_TIMER(pObj);
 }
 
+/* Add the time of a step of a task to its total */
+static void
+addTaskTime(ProfilerObject *pObj, PyObject *task, long long tt)
+{
+    PyObject *last_type, *last_value, *last_tb;
+    PyObject *total;
+    double seconds = tt * timerFactor(pObj);
+
+    PyErr_Fetch(&last_type, &last_value, &last_tb);
+    if (pObj->taskStats == NULL) {
+        pObj->taskStats = PyDict_New();
+        if (pObj->taskStats == NULL)
+            goto error;
+    }
+    total = PyDict_GetItem(pObj->taskStats, task);
+    if (total != NULL)
+        seconds += PyFloat_AS_DOUBLE(total);
+    total = PyFloat_FromDouble(seconds);
+    if (total == NULL)
+        goto error;
+    if (PyDict_SetItem(pObj->taskStats, task, total) < 0) {
+        Py_DECREF(total);
+        goto error;
+    }
+    Py_DECREF(total);
+    goto restorePyerr;
+
+error:
+    PyErr_Clear();
+    pObj->flags |= POF_NOMEMORY;
+restorePyerr:
+    PyErr_Restore(last_type, last_value, last_tb);
+}
+
 static void
 Stop(ProfilerObject *pObj, ProfilerContext *self, ProfilerEntry *entry)
 {
@@ -343,6 +470,12 @@ Stop(ProfilerObject *pObj, ProfilerContext *self, ProfilerEntry *entry)
     if (self->previous)
         self->previous->subt += tt;
     pObj->currentProfilerContext = self->previous;
+    if (pObj->currentThread)
+        pObj->currentThread->it += it;
+    if (self->task) {
+        addTaskTime(pObj, self->task, tt);
+        Py_CLEAR(self->task);
+    }
     if (--entry->recursionLevel == 0)
         entry->tt += tt;
     else
@@ -364,6 +497,23 @@ Stop(ProfilerObject *pObj, ProfilerContext *self, ProfilerEntry *entry)
     }
 }
 
+/* Return a new reference to the current task, or NULL if there is none */
+static PyObject *
+getCurrentTask(ProfilerObject *pObj)
+{
+    PyObject *task = _PyObject_CallNoArg(pObj->taskFunc);
+    switchThread(pObj);
+    if (task == NULL) {
+        /* asyncio.current_task() raises RuntimeError outside of a running
+           event loop, for example */
+        PyErr_Clear();
+    }
+    else if (task == Py_None) {
+        Py_CLEAR(task);
+    }
+    return task;
+}
+
 static void
 ptrace_enter_call(PyObject *self, void *key, PyObject *userObj)
 {
@@ -372,6 +522,7 @@ ptrace_enter_call(PyObject *self, void *key, PyObject *userObj)
     ProfilerObject *pObj = (ProfilerObject*)self;
     ProfilerEntry *profEntry;
     ProfilerContext *pContext;
+    PyObject *task = NULL;
 
     /* In the case of entering a generator expression frame via a
      * throw (gen_send_ex(.., 1)), we may already have an
@@ -388,6 +539,17 @@ ptrace_enter_call(PyObject *self, void *key, PyObject *userObj)
         if (profEntry == NULL)
             goto restorePyerr;
     }
+    /* the outermost coroutine running in a task starts a step of the task */
+    if (pObj->taskFunc != NULL && PyCode_Check(userObj) &&
+        (((PyCodeObject *)userObj)->co_flags & CO_TASK_FLAGS) &&
+        !(pObj->currentProfilerContext &&
+          pObj->currentProfilerContext->inTask)) {
+        task = getCurrentTask(pObj);
+        if (pObj->currentThread == NULL) {
+            Py_XDECREF(task);
+            goto restorePyerr;
+        }
+    }
     /* grab a ProfilerContext out of the free list */
     pContext = pObj->freelistProfilerContext;
     if (pContext) {
@@ -398,11 +560,12 @@ ptrace_enter_call(PyObject *self, void *key, PyObject *userObj)
         pContext = (ProfilerContext*)
             PyMem_Malloc(sizeof(ProfilerContext));
         if (pContext == NULL) {
+            Py_XDECREF(task);
             pObj->flags |= POF_NOMEMORY;
             goto restorePyerr;
         }
     }
-    initContext(pObj, pContext, profEntry);
+    initContext(pObj, pContext, profEntry, task);
 
 restorePyerr:
     PyErr_Restore(last_type, last_value, last_tb);
@@ -425,6 +588,7 @@ ptrace_leave_call(PyObject *self, void *key)
     }
     else {
         pObj->currentProfilerContext = pContext->previous;
+        Py_CLEAR(pContext->task);
     }
     /* put pContext into the free list */
     pContext->previous = pObj->freelistProfilerContext;
@@ -435,6 +599,10 @@ static int
 profiler_callback(PyObject *self, PyFrameObject *frame, int what,
                   PyObject *arg)
 {
+    switchThread((ProfilerObject *)self);
+    if (((ProfilerObject *)self)->currentThread == NULL)
+        return 0;
+
     switch (what) {
 
     /* the 'frame' of a called function is about to start its execution */
@@ -631,12 +799,7 @@ profiler_getstats(ProfilerObject *pObj, PyObject* noarg)
     statscollector_t collect;
     if (pending_exception(pObj))
         return NULL;
-    if (!pObj->externalTimer)
-        collect.factor = hpTimerUnit();
-    else if (pObj->externalTimerUnit > 0.0)
-        collect.factor = pObj->externalTimerUnit;
-    else
-        collect.factor = 1.0 / DOUBLE_TIMER_PRECISION;
+    collect.factor = timerFactor(pObj);
     collect.list = PyList_New(0);
     if (collect.list == NULL)
         return NULL;
@@ -648,6 +811,71 @@ profiler_getstats(ProfilerObject *pObj, PyObject* noarg)
     return collect.list;
 }
 
+static int statsForThread(rotating_node_t *node, void *arg)
+{
+    ProfilerThread *thread = (ProfilerThread*) node;
+    statscollector_t *collect = (statscollector_t*) arg;
+    PyObject *ident, *seconds;
+    int err;
+
+    ident = PyLong_FromUnsignedLong((unsigned long)thread->header.key);
+    if (ident == NULL)
+        return -1;
+    seconds = PyFloat_FromDouble(collect->factor * thread->it);
+    if (seconds == NULL) {
+        Py_DECREF(ident);
+        return -1;
+    }
+    err = PyDict_SetItem(collect->list, ident, seconds);
+    Py_DECREF(ident);
+    Py_DECREF(seconds);
+    return err;
+}
+
+PyDoc_STRVAR(getthreadstats_doc, "\
+getthreadstats() -> dict\n\
+\n\
+Return a dictionary mapping the identifiers of the threads\n\
+in which calls were profiled to the time spent in these\n\
+calls, in seconds.\n\
+");
+
+static PyObject*
+profiler_getthreadstats(ProfilerObject *pObj, PyObject* noarg)
+{
+    statscollector_t collect;
+    if (pending_exception(pObj))
+        return NULL;
+    collect.factor = timerFactor(pObj);
+    collect.list = PyDict_New();
+    if (collect.list == NULL)
+        return NULL;
+    if (RotatingTree_Enum(pObj->profilerThreads, statsForThread, &collect)
+        != 0) {
+        Py_DECREF(collect.list);
+        return NULL;
+    }
+    return collect.list;
+}
+
+PyDoc_STRVAR(gettaskstats_doc, "\
+gettaskstats() -> dict\n\
+\n\
+Return a dictionary mapping the tasks returned by the\n\
+taskfunc of the profiler to the time spent in their\n\
+coroutines, in seconds.\n\
+");
+
+static PyObject*
+profiler_gettaskstats(ProfilerObject *pObj, PyObject* noarg)
+{
+    if (pending_exception(pObj))
+        return NULL;
+    if (pObj->taskStats == NULL)
+        return PyDict_New();
+    return PyDict_Copy(pObj->taskStats);
+}
+
 static int
 setSubcalls(ProfilerObject *pObj, int nvalue)
 {
@@ -679,6 +907,66 @@ If 'builtins' is True, records the time spent in\n\
 built-in functions separately from their caller.\n\
 ");
 
+static void
+setThreadProfile(PyThreadState *tstate, Py_tracefunc func, PyObject *arg)
+{
+    /* same as PyEval_SetProfile(), for any thread state */
+    PyObject *temp = tstate->c_profileobj;
+    Py_XINCREF(arg);
+    tstate->c_profilefunc = NULL;
+    tstate->c_profileobj = NULL;
+    tstate->use_tracing = tstate->c_tracefunc != NULL;
+    Py_XDECREF(temp);
+    tstate->c_profilefunc = func;
+    tstate->c_profileobj = arg;
+    tstate->use_tracing = (func != NULL) || (tstate->c_tracefunc != NULL);
+}
+
+/* Install or remove the profiler in all the threads of the interpreter.
+   The threads started later by the threading module install it from
+   threading.setprofile(). */
+static int
+setAllThreadsProfile(ProfilerObject *pObj, int enable)
+{
+    PyThreadState *tstate = PyThreadState_GET();
+    PyThreadState *t;
+    PyObject *threading, *hook, *res;
+
+    if (!enable) {
+        for (t = PyInterpreterState_ThreadHead(tstate->interp); t != NULL;
+             t = PyThreadState_Next(t)) {
+            if (t->c_profileobj == (PyObject *)pObj)
+                setThreadProfile(t, NULL, NULL);
+        }
+    }
+    threading = PyImport_ImportModule("threading");
+    if (threading == NULL)
+        return -1;
+    if (enable) {
+        hook = PyObject_GetAttrString((PyObject *)pObj, "_threadhook");
+        if (hook == NULL) {
+            Py_DECREF(threading);
+            return -1;
+        }
+    }
+    else {
+        Py_INCREF(Py_None);
+        hook = Py_None;
+    }
+    res = PyObject_CallMethod(threading, "setprofile", "O", hook);
+    Py_DECREF(hook);
+    Py_DECREF(threading);
+    if (res == NULL)
+        return -1;
+    Py_DECREF(res);
+    if (enable) {
+        for (t = PyInterpreterState_ThreadHead(tstate->interp); t != NULL;
+             t = PyThreadState_Next(t))
+            setThreadProfile(t, profiler_callback, (PyObject *)pObj);
+    }
+    return 0;
+}
+
 static PyObject*
 profiler_enable(ProfilerObject *self, PyObject *args, PyObject *kwds)
 {
@@ -690,14 +978,40 @@ profiler_enable(ProfilerObject *self, PyObject *args, PyObject *kwds)
         return NULL;
     if (setSubcalls(self, subcalls) < 0 || setBuiltins(self, builtins) < 0)
         return NULL;
-    PyEval_SetProfile(profiler_callback, (PyObject*)self);
+    if (self->flags & POF_ALLTHREADS) {
+        if (setAllThreadsProfile(self, 1) < 0)
+            return NULL;
+    }
+    else
+        PyEval_SetProfile(profiler_callback, (PyObject*)self);
     self->flags |= POF_ENABLED;
     Py_RETURN_NONE;
 }
 
-static void
-flush_unmatched(ProfilerObject *pObj)
+PyDoc_STRVAR(threadhook_doc, "\
+_threadhook(frame, event, arg)\n\
+\n\
+Install the profiler in the running thread.  Passed to\n\
+threading.setprofile() by enable() to profile the threads\n\
+started while the profiler is enabled.\n\
+");
+
+static PyObject*
+profiler_threadhook(ProfilerObject *self, PyObject *args)
+{
+    if (self->flags & POF_ENABLED)
+        PyEval_SetProfile(profiler_callback, (PyObject*)self);
+    else
+        PyEval_SetProfile(NULL, NULL);
+    Py_RETURN_NONE;
+}
+
+static int flushThread(rotating_node_t *header, void *arg)
 {
+    ProfilerThread *thread = (ProfilerThread*) header;
+    ProfilerObject *pObj = (ProfilerObject*) arg;
+    pObj->currentThread = thread;
+    pObj->currentProfilerContext = thread->context;
     while (pObj->currentProfilerContext) {
         ProfilerContext *pContext = pObj->currentProfilerContext;
         ProfilerEntry *profEntry= pContext->ctxEntry;
@@ -708,7 +1022,18 @@ flush_unmatched(ProfilerObject *pObj)
         if (pContext)
             PyMem_Free(pContext);
     }
+    thread->context = NULL;
+    return 0;
+}
 
+static void
+flush_unmatched(ProfilerObject *pObj)
+{
+    if (pObj->currentThread)
+        pObj->currentThread->context = pObj->currentProfilerContext;
+    RotatingTree_Enum(pObj->profilerThreads, flushThread, pObj);
+    pObj->currentThread = NULL;
+    pObj->currentProfilerContext = NULL;
 }
 
 PyDoc_STRVAR(disable_doc, "\
@@ -720,10 +1045,14 @@ Stop collecting profiling information.\n\
 static PyObject*
 profiler_disable(ProfilerObject *self, PyObject* noarg)
 {
+    int err = 0;
     self->flags &= ~POF_ENABLED;
-    PyEval_SetProfile(NULL, NULL);
+    if (self->flags & POF_ALLTHREADS)
+        err = setAllThreadsProfile(self, 0);
+    else
+        PyEval_SetProfile(NULL, NULL);
     flush_unmatched(self);
-    if (pending_exception(self))
+    if (err < 0 || pending_exception(self))
         return NULL;
     Py_RETURN_NONE;
 }
@@ -741,14 +1070,141 @@ profiler_clear(ProfilerObject *pObj, PyObject* noarg)
     Py_RETURN_NONE;
 }
 
+static int resetSubEntry(rotating_node_t *header, void *arg)
+{
+    ProfilerSubEntry *subentry = (ProfilerSubEntry*) header;
+    subentry->tt = 0;
+    subentry->it = 0;
+    subentry->callcount = 0;
+    subentry->recursivecallcount = 0;
+    return 0;
+}
+
+static int resetEntry(rotating_node_t *header, void *arg)
+{
+    ProfilerEntry *entry = (ProfilerEntry*) header;
+    entry->tt = 0;
+    entry->it = 0;
+    entry->callcount = 0;
+    entry->recursivecallcount = 0;
+    RotatingTree_Enum(entry->calls, resetSubEntry, NULL);
+    return 0;
+}
+
+static int resetThread(rotating_node_t *header, void *arg)
+{
+    ProfilerThread *thread = (ProfilerThread*) header;
+    long long now = *(long long *)arg;
+    ProfilerContext *c;
+    thread->it = 0;
+    /* the calls in progress are accounted from now on */
+    for (c = thread->context; c != NULL; c = c->previous) {
+        c->t0 = now;
+        c->subt = 0;
+    }
+    return 0;
+}
+
+PyDoc_STRVAR(reset_doc, "\
+reset()\n\
+\n\
+Reset the profiling information collected so far to zero,\n\
+without disabling the profiler.  The calls in progress\n\
+are timed from the reset.\n\
+");
+
+static PyObject*
+profiler_reset(ProfilerObject *pObj, PyObject* noarg)
+{
+    long long now = CALL_TIMER(pObj);
+    PyObject *taskStats;
+    if (pObj->currentThread)
+        pObj->currentThread->context = pObj->currentProfilerContext;
+    RotatingTree_Enum(pObj->profilerEntries, resetEntry, NULL);
+    RotatingTree_Enum(pObj->profilerThreads, resetThread, &now);
+    /* releasing the tasks can run arbitrary code */
+    taskStats = pObj->taskStats;
+    pObj->taskStats = NULL;
+    Py_XDECREF(taskStats);
+    if (pending_exception(pObj))
+        return NULL;
+    Py_RETURN_NONE;
+}
+
+/* Arguments of the visitors of the rotating trees in profiler_traverse() */
+typedef struct {
+    ProfilerObject *pObj;
+    visitproc visit;
+    void *arg;
+} traverse_args;
+
+static int
+traverseContexts(ProfilerContext *c, visitproc visit, void *arg)
+{
+    for (; c != NULL; c = c->previous) {
+        Py_VISIT(c->task);
+    }
+    return 0;
+}
+
+static int traverseEntry(rotating_node_t *header, void *arg)
+{
+    ProfilerEntry *entry = (ProfilerEntry*) header;
+    traverse_args *args = (traverse_args *)arg;
+    visitproc visit = args->visit;
+    Py_VISIT(entry->userObj);
+    return 0;
+}
+
+static int traverseThread(rotating_node_t *header, void *arg)
+{
+    ProfilerThread *thread = (ProfilerThread*) header;
+    traverse_args *args = (traverse_args *)arg;
+    /* the contexts of the current thread are not saved in it */
+    if (thread == args->pObj->currentThread)
+        return 0;
+    return traverseContexts(thread->context, args->visit, args->arg);
+}
+
+static int
+profiler_traverse(ProfilerObject *op, visitproc visit, void *arg)
+{
+    traverse_args args = {op, visit, arg};
+    int err;
+
+    Py_VISIT(op->externalTimer);
+    Py_VISIT(op->taskFunc);
+    Py_VISIT(op->taskStats);
+    err = RotatingTree_Enum(op->profilerEntries, traverseEntry, &args);
+    if (err)
+        return err;
+    err = traverseContexts(op->currentProfilerContext, visit, arg);
+    if (err)
+        return err;
+    return RotatingTree_Enum(op->profilerThreads, traverseThread, &args);
+}
+
+static int
+profiler_tp_clear(ProfilerObject *op)
+{
+    Py_CLEAR(op->externalTimer);
+    Py_CLEAR(op->taskFunc);
+    clearEntries(op);
+    return 0;
+}
+
 static void
 profiler_dealloc(ProfilerObject *op)
 {
-    if (op->flags & POF_ENABLED)
+    PyObject_GC_UnTrack(op);
+    if (op->flags & POF_ENABLED) {
+        op->flags &= ~POF_ENABLED;
         PyEval_SetProfile(NULL, NULL);
+    }
     flush_unmatched(op);
     clearEntries(op);
     Py_XDECREF(op->externalTimer);
+    Py_XDECREF(op->taskFunc);
     Py_TYPE(op)->tp_free(op);
 }
 
@@ -759,19 +1215,40 @@ profiler_init(ProfilerObject *pObj, PyObject *args, PyObject *kw)
     double timeunit = 0.0;
     int subcalls = 1;
     int builtins = 1;
+    int allthreads = 0;
+    PyObject *taskfunc = NULL;
     static char *kwlist[] = {"timer", "timeunit",
-                                   "subcalls", "builtins", 0};
+                                   "subcalls", "builtins",
+                                   "allthreads", "taskfunc", 0};
 
-    if (!PyArg_ParseTupleAndKeywords(args, kw, "|Odii:Profiler", kwlist,
+    if (!PyArg_ParseTupleAndKeywords(args, kw, "|OdiiiO:Profiler", kwlist,
                                      &timer, &timeunit,
-                                     &subcalls, &builtins))
+                                     &subcalls, &builtins,
+                                     &allthreads, &taskfunc))
         return -1;
 
     if (setSubcalls(pObj, subcalls) < 0 || setBuiltins(pObj, builtins) < 0)
         return -1;
+    if (taskfunc == Py_None)
+        taskfunc = NULL;
+    if (taskfunc != NULL && !PyCallable_Check(taskfunc)) {
+        PyErr_SetString(PyExc_TypeError, "taskfunc must be callable");
+        return -1;
+    }
+    if (pObj->flags & POF_ENABLED) {
+        PyErr_SetString(PyExc_RuntimeError,
+                        "cannot reinitialize an enabled profiler");
+        return -1;
+    }
+    if (allthreads)
+        pObj->flags |= POF_ALLTHREADS;
+    else
+        pObj->flags &= ~POF_ALLTHREADS;
     pObj->externalTimerUnit = timeunit;
     Py_XINCREF(timer);
     Py_XSETREF(pObj->externalTimer, timer);
+    Py_XINCREF(taskfunc);
+    Py_XSETREF(pObj->taskFunc, taskfunc);
     return 0;
 }
 
@@ -784,17 +1261,31 @@ static PyMethodDef profiler_methods[] = {
                     METH_NOARGS,                        disable_doc},
     {"clear",           (PyCFunction)profiler_clear,
                     METH_NOARGS,                        clear_doc},
+    {"reset",           (PyCFunction)profiler_reset,
+                    METH_NOARGS,                        reset_doc},
+    {"getthreadstats",  (PyCFunction)profiler_getthreadstats,
+                    METH_NOARGS,                        getthreadstats_doc},
+    {"gettaskstats",    (PyCFunction)profiler_gettaskstats,
+                    METH_NOARGS,                        gettaskstats_doc},
+    {"_threadhook",     (PyCFunction)profiler_threadhook,
+                    METH_VARARGS,                       threadhook_doc},
     {NULL, NULL}
 };
 
 PyDoc_STRVAR(profiler_doc, "\
-Profiler(timer=None, timeunit=None, subcalls=True, builtins=True)\n\
+Profiler(timer=None, timeunit=None, subcalls=True, builtins=True,\n\
+         allthreads=False, taskfunc=None)\n\
 \n\
     Builds a profiler object using the specified timer function.\n\
     The default timer is a fast built-in one based on real time.\n\
     For custom timer functions returning integers, timeunit can\n\
     be a float specifying a scale (i.e. how long each integer unit\n\
     is, in seconds).\n\
+    If allthreads is true, the profiler is enabled in all the threads\n\
+    rather than only in the calling one.  If taskfunc is given, it is\n\
+    called without arguments when a coroutine starts running to get the\n\
+    current task (e.g. asyncio.current_task), to which the time spent\n\
+    in the coroutine is attributed.\n\
 ");
 
 static PyTypeObject PyProfiler_Type = {
@@ -817,10 +1308,11 @@ static PyTypeObject PyProfiler_Type = {
     0,                                      /* tp_getattro */
     0,                                      /* tp_setattro */
     0,                                      /* tp_as_buffer */
-    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE, /* tp_flags */
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE |
+        Py_TPFLAGS_HAVE_GC,                 /* tp_flags */
     profiler_doc,                           /* tp_doc */
-    0,                                      /* tp_traverse */
-    0,                                      /* tp_clear */
+    (traverseproc)profiler_traverse,        /* tp_traverse */
+    (inquiry)profiler_tp_clear,             /* tp_clear */
     0,                                      /* tp_richcompare */
     0,                                      /* tp_weaklistoffset */
     0,                                      /* tp_iter */
@@ -836,7 +1328,7 @@ static PyTypeObject PyProfiler_Type = {
     (initproc)profiler_init,                /* tp_init */
     PyType_GenericAlloc,                    /* tp_alloc */
     PyType_GenericNew,                      /* tp_new */
-    PyObject_Del,                           /* tp_free */
+    PyObject_GC_Del,                        /* tp_free */
 };
 
 static PyMethodDef moduleMethods[] = {
@@ -49,7 +49,11 @@ static struct {
     /* use domain in trace key?
        Variable protected by the GIL. */
     int use_domain;
-} tracemalloc_config = {TRACEMALLOC_NOT_INITIALIZED, 0, 1, 0};
+
+    /* trace one memory block in sampling on average, 1 by default.
+       Variable protected by the GIL. */
+    int sampling;
+} tracemalloc_config = {TRACEMALLOC_NOT_INITIALIZED, 0, 1, 0, 1};
 
 #if defined(TRACE_RAW_MALLOC)
 /* This lock is needed because tracemalloc_free() is called without
@@ -102,6 +106,29 @@ typedef struct {
     frame_t frames[1];
 } traceback_t;
 
+/* Key of the identical traces: pack the structure to compare keys
+   with memcmp(). */
+typedef struct
+#ifdef __GNUC__
+__attribute__((packed))
+#elif defined(_MSC_VER)
+#pragma pack(push, 4)
+#endif
+{
+    traceback_t *traceback;
+    size_t size;
+    unsigned int domain;
+} trace_key_t;
+#ifdef _MSC_VER
+#pragma pack(pop)
+#endif
+
+/* Total size and number of memory blocks of a group of traces */
+typedef struct {
+    size_t size;
+    size_t count;
+} stat_t;
+
 #define TRACEBACK_SIZE(NFRAME) \
         (sizeof(traceback_t) + sizeof(frame_t) * (NFRAME - 1))
 
@@ -139,6 +166,12 @@ static _Py_hashtable_t *tracemalloc_filenames = NULL;
    Protected by the GIL. */
 static traceback_t *tracemalloc_traceback = NULL;
 
+/* Number of memory blocks to allocate before tracing the next one when
+   sampling memory blocks, and state of the generator drawing it.
+   Protected by TABLES_LOCK(). */
+static size_t tracemalloc_sample_countdown = 1;
+static uint32_t tracemalloc_sample_seed = 2463534242U;
+
 /* Hash table used as a set to intern tracebacks:
    traceback_t* => traceback_t*
    Protected by the GIL */
@@ -279,6 +312,35 @@ hashtable_compare_pointer_t(_Py_hashtable_t *ht, const void *pkey,
 }
 
 
+static Py_uhash_t
+hashtable_hash_frame(_Py_hashtable_t *ht, const void *pkey)
+{
+    frame_t frame;
+    Py_uhash_t hash;
+
+    _Py_HASHTABLE_READ_KEY(ht, pkey, frame);
+
+    hash = (Py_uhash_t)_Py_HashPointer(frame.filename);
+    hash ^= frame.lineno;
+    return hash;
+}
+
+
+static Py_uhash_t
+hashtable_hash_trace_key(_Py_hashtable_t *ht, const void *pkey)
+{
+    trace_key_t key;
+    Py_uhash_t hash;
+
+    _Py_HASHTABLE_READ_KEY(ht, pkey, key);
+
+    hash = (Py_uhash_t)_Py_HashPointer(key.traceback);
+    hash ^= (Py_uhash_t)key.size * 1000003;
+    hash ^= key.domain;
+    return hash;
+}
+
+
 static _Py_hashtable_t *
 hashtable_new(size_t key_size, size_t data_size,
               _Py_hashtable_hash_func hash_func,
@@ -593,6 +655,22 @@ tracemalloc_remove_trace(unsigned int domain, uintptr_t ptr)
             tracemalloc_remove_trace(DEFAULT_DOMAIN, (uintptr_t)(ptr))
 
 
+/* Return 1 if the memory block is traced, 0 otherwise */
+static int
+tracemalloc_is_traced(unsigned int domain, uintptr_t ptr)
+{
+    assert(tracemalloc_config.tracing);
+
+    if (tracemalloc_config.use_domain) {
+        pointer_t key = {ptr, domain};
+        return (_Py_HASHTABLE_GET_ENTRY(tracemalloc_traces, key) != NULL);
+    }
+    else {
+        return (_Py_HASHTABLE_GET_ENTRY(tracemalloc_traces, ptr) != NULL);
+    }
+}
+
+
 static int
 tracemalloc_add_trace(unsigned int domain, uintptr_t ptr,
                       size_t size)
@@ -661,6 +739,37 @@ tracemalloc_add_trace(unsigned int domain, uintptr_t ptr,
             tracemalloc_add_trace(DEFAULT_DOMAIN, (uintptr_t)(ptr), size)
 
 
+/* Return 1 if the new memory block must be traced, 0 otherwise.
+
+   When sampling, the number of blocks allocated between two traced blocks
+   is drawn uniformly in [1; 2*sampling-1] rather than being constant, to
+   not miss allocation patterns repeating every sampling blocks.
+   The caller must hold TABLES_LOCK(). */
+static int
+tracemalloc_sample(void)
+{
+    uint32_t x;
+
+    if (tracemalloc_config.sampling == 1) {
+        return 1;
+    }
+    if (--tracemalloc_sample_countdown != 0) {
+        return 0;
+    }
+
+    /* xorshift32 */
+    x = tracemalloc_sample_seed;
+    x ^= x << 13;
+    x ^= x >> 17;
+    x ^= x << 5;
+    tracemalloc_sample_seed = x;
+
+    tracemalloc_sample_countdown =
+        1 + x % (2 * (size_t)tracemalloc_config.sampling - 1);
+    return 1;
+}
+
+
 static void*
 tracemalloc_alloc(int use_calloc, void *ctx, size_t nelem, size_t elsize)
 {
@@ -677,7 +786,7 @@ tracemalloc_alloc(int use_calloc, void *ctx, size_t nelem, size_t elsize)
         return NULL;
 
     TABLES_LOCK();
-    if (ADD_TRACE(ptr, nelem * elsize) < 0) {
+    if (tracemalloc_sample() && ADD_TRACE(ptr, nelem * elsize) < 0) {
         /* Failed to allocate a trace for the new memory block */
         TABLES_UNLOCK();
         alloc->free(alloc->ctx, ptr);
@@ -693,6 +802,16 @@ tracemalloc_realloc(void *ctx, void *ptr, size_t new_size)
 {
     PyMemAllocatorEx *alloc = (PyMemAllocatorEx *)ctx;
     void *ptr2;
+    int traced = 1;
+
+    if (ptr != NULL && tracemalloc_config.sampling != 1) {
+        /* when sampling, only the memory blocks which were sampled remain
+           traced.  Check it before calling realloc(): a reentrant call
+           to realloc() from the allocator may remove the trace. */
+        TABLES_LOCK();
+        traced = tracemalloc_is_traced(DEFAULT_DOMAIN, (uintptr_t)ptr);
+        TABLES_UNLOCK();
+    }
 
     ptr2 = alloc->realloc(alloc->ctx, ptr, new_size);
     if (ptr2 == NULL)
@@ -709,7 +828,7 @@ tracemalloc_realloc(void *ctx, void *ptr, size_t new_size)
             REMOVE_TRACE(ptr);
         }
 
-        if (ADD_TRACE(ptr2, new_size) < 0) {
+        if (traced && ADD_TRACE(ptr2, new_size) < 0) {
             /* Memory allocation failed. The error cannot be reported to
                the caller, because realloc() may already have shrunk the
                memory block and so removed bytes.
@@ -727,7 +846,7 @@ tracemalloc_realloc(void *ctx, void *ptr, size_t new_size)
         /* new allocation */
 
         TABLES_LOCK();
-        if (ADD_TRACE(ptr2, new_size) < 0) {
+        if (tracemalloc_sample() && ADD_TRACE(ptr2, new_size) < 0) {
             /* Failed to allocate a trace for the new memory block */
             TABLES_UNLOCK();
             alloc->free(alloc->ctx, ptr2);
@@ -1061,7 +1180,7 @@ tracemalloc_deinit(void)
 
 
 static int
-tracemalloc_start(int max_nframe)
+tracemalloc_start(int max_nframe, int sampling)
 {
     PyMemAllocatorEx alloc;
     size_t size;
@@ -1073,6 +1192,11 @@ tracemalloc_start(int max_nframe)
         return -1;
     }
 
+    if (sampling < 1) {
+        PyErr_SetString(PyExc_ValueError, "sampling must be at least 1");
+        return -1;
+    }
+
     if (tracemalloc_init() < 0) {
         return -1;
     }
@@ -1084,6 +1208,8 @@ tracemalloc_start(int max_nframe)
 
     assert(1 <= max_nframe && max_nframe <= MAX_NFRAME);
     tracemalloc_config.max_nframe = max_nframe;
+    tracemalloc_config.sampling = sampling;
+    tracemalloc_sample_countdown = 1 + (size_t)(sampling - 1) / 2;
 
     /* allocate a buffer to store a new traceback */
     size = TRACEBACK_SIZE(max_nframe);
@@ -1286,6 +1412,7 @@ trace_to_pyobject(unsigned int domain, trace_t *trace,
 typedef struct {
     _Py_hashtable_t *traces;
     _Py_hashtable_t *tracebacks;
+    _Py_hashtable_t *trace_objs;
     PyObject *list;
 } get_traces_t;
 
@@ -1296,6 +1423,7 @@ tracemalloc_get_traces_fill(_Py_hashtable_t *traces, _Py_hashtable_entry_t *entr
     get_traces_t *get_traces = user_data;
     unsigned int domain;
     trace_t trace;
+    trace_key_t key;
     PyObject *tracemalloc_obj;
     int res;
 
@@ -1309,9 +1437,28 @@ tracemalloc_get_traces_fill(_Py_hashtable_t *traces, _Py_hashtable_entry_t *entr
     }
     _Py_HASHTABLE_ENTRY_READ_DATA(traces, entry, trace);
 
-    tracemalloc_obj = trace_to_pyobject(domain, &trace, get_traces->tracebacks);
-    if (tracemalloc_obj == NULL)
-        return 1;
+    /* identical traces share the same tuple */
+    key.traceback = trace.traceback;
+    key.size = trace.size;
+    key.domain = domain;
+    if (_Py_HASHTABLE_GET(get_traces->trace_objs, key, tracemalloc_obj)) {
+        Py_INCREF(tracemalloc_obj);
+    }
+    else {
+        tracemalloc_obj = trace_to_pyobject(domain, &trace,
+                                            get_traces->tracebacks);
+        if (tracemalloc_obj == NULL)
+            return 1;
+
+        if (_Py_HASHTABLE_SET(get_traces->trace_objs, key,
+                              tracemalloc_obj) < 0) {
+            Py_DECREF(tracemalloc_obj);
+            PyErr_NoMemory();
+            return 1;
+        }
+        /* trace_objs keeps a new reference to tracemalloc_obj */
+        Py_INCREF(tracemalloc_obj);
+    }
 
     res = PyList_Append(get_traces->list, tracemalloc_obj);
     Py_DECREF(tracemalloc_obj);
@@ -1342,19 +1489,21 @@ Get traces of all memory blocks allocated by Python.
 
 Return a list of (size: int, traceback: tuple) tuples.
 traceback is a tuple of (filename: str, lineno: int) tuples.
+Identical traces are the same tuple.
 
 Return an empty list if the tracemalloc module is disabled.
 [clinic start generated code]*/
 
 static PyObject *
 _tracemalloc__get_traces_impl(PyObject *module)
-/*[clinic end generated code: output=e9929876ced4b5cc input=6c7d2230b24255aa]*/
+/*[clinic end generated code: output=e9929876ced4b5cc input=b3ecfe8fae1db34c]*/
 {
     get_traces_t get_traces;
     int err;
 
     get_traces.traces = NULL;
     get_traces.tracebacks = NULL;
+    get_traces.trace_objs = NULL;
     get_traces.list = PyList_New(0);
     if (get_traces.list == NULL)
         goto error;
@@ -1373,6 +1522,17 @@ _tracemalloc__get_traces_impl(PyObject *module)
         goto error;
     }
 
+    /* the trace hash table is used temporarily to share the trace tuple of
+       the identical traces */
+    get_traces.trace_objs = hashtable_new(sizeof(trace_key_t),
+                                          sizeof(PyObject *),
+                                          hashtable_hash_trace_key,
+                                          _Py_hashtable_compare_direct);
+    if (get_traces.trace_objs == NULL) {
+        PyErr_NoMemory();
+        goto error;
+    }
+
     TABLES_LOCK();
     get_traces.traces = _Py_hashtable_copy(tracemalloc_traces);
     TABLES_UNLOCK();
@@ -1400,6 +1560,11 @@ finally:
                               tracemalloc_pyobject_decref_cb, NULL);
         _Py_hashtable_destroy(get_traces.tracebacks);
     }
+    if (get_traces.trace_objs != NULL) {
+        _Py_hashtable_foreach(get_traces.trace_objs,
+                              tracemalloc_pyobject_decref_cb, NULL);
+        _Py_hashtable_destroy(get_traces.trace_objs);
+    }
     if (get_traces.traces != NULL) {
         _Py_hashtable_destroy(get_traces.traces);
     }
@@ -1408,6 +1573,272 @@ finally:
 }
 
 
+/* Add size bytes and count memory blocks to the statistic of the key
+   pointed by pkey */
+static int
+tracemalloc_add_stat(_Py_hashtable_t *stats, size_t key_size, const void *pkey,
+                     size_t size, size_t count)
+{
+    _Py_hashtable_entry_t *entry;
+    stat_t stat;
+
+    entry = _Py_hashtable_get_entry(stats, key_size, pkey);
+    if (entry != NULL) {
+        _Py_HASHTABLE_ENTRY_READ_DATA(stats, entry, stat);
+        stat.size += size;
+        stat.count += count;
+        _Py_HASHTABLE_ENTRY_WRITE_DATA(stats, entry, stat);
+        return 0;
+    }
+
+    stat.size = size;
+    stat.count = count;
+    return _Py_hashtable_set(stats, key_size, pkey, sizeof(stat), &stat);
+}
+
+
+static int
+tracemalloc_group_traces_cb(_Py_hashtable_t *traces,
+                            _Py_hashtable_entry_t *entry,
+                            void *user_data)
+{
+    _Py_hashtable_t *stats = user_data;
+    trace_t trace;
+
+    _Py_HASHTABLE_ENTRY_READ_DATA(traces, entry, trace);
+    return (tracemalloc_add_stat(stats, sizeof(trace.traceback),
+                                 &trace.traceback, trace.size, 1) < 0);
+}
+
+
+typedef struct {
+    _Py_hashtable_t *stats;
+    int cumulative;
+    int use_lineno;
+} group_frames_t;
+
+static int
+tracemalloc_group_frames_cb(_Py_hashtable_t *tracebacks,
+                            _Py_hashtable_entry_t *entry,
+                            void *user_data)
+{
+    group_frames_t *group = user_data;
+    traceback_t *traceback;
+    stat_t stat;
+    frame_t frame;
+    int i, nframe;
+
+    _Py_HASHTABLE_ENTRY_READ_KEY(tracebacks, entry, traceback);
+    _Py_HASHTABLE_ENTRY_READ_DATA(tracebacks, entry, stat);
+
+    nframe = traceback->nframe;
+    if (!group->cumulative && nframe > 1) {
+        /* only the most recent frame */
+        nframe = 1;
+    }
+    for (i=0; i < nframe; i++) {
+        frame.filename = traceback->frames[i].filename;
+        frame.lineno = group->use_lineno ? traceback->frames[i].lineno : 0;
+        if (tracemalloc_add_stat(group->stats, sizeof(frame), &frame,
+                                 stat.size, stat.count) < 0) {
+            return 1;
+        }
+    }
+    return 0;
+}
+
+
+static PyObject*
+stat_to_pyobject(PyObject *frames, stat_t *stat)
+{
+    PyObject *size_obj, *count_obj, *stat_obj;
+
+    size_obj = PyLong_FromSize_t(stat->size);
+    count_obj = PyLong_FromSize_t(stat->count);
+    if (size_obj == NULL || count_obj == NULL) {
+        Py_XDECREF(size_obj);
+        Py_XDECREF(count_obj);
+        return NULL;
+    }
+    stat_obj = PyTuple_Pack(3, frames, size_obj, count_obj);
+    Py_DECREF(size_obj);
+    Py_DECREF(count_obj);
+    return stat_obj;
+}
+
+
+static int
+tracemalloc_append_stat(PyObject *list, PyObject *frames, stat_t *stat)
+{
+    PyObject *stat_obj;
+    int res;
+
+    if (frames == NULL) {
+        return 1;
+    }
+    stat_obj = stat_to_pyobject(frames, stat);
+    Py_DECREF(frames);
+    if (stat_obj == NULL) {
+        return 1;
+    }
+    res = PyList_Append(list, stat_obj);
+    Py_DECREF(stat_obj);
+    return (res < 0);
+}
+
+
+static int
+tracemalloc_traceback_stats_fill(_Py_hashtable_t *stats,
+                                 _Py_hashtable_entry_t *entry,
+                                 void *user_data)
+{
+    traceback_t *traceback;
+    stat_t stat;
+
+    _Py_HASHTABLE_ENTRY_READ_KEY(stats, entry, traceback);
+    _Py_HASHTABLE_ENTRY_READ_DATA(stats, entry, stat);
+    return tracemalloc_append_stat((PyObject *)user_data,
+                                   traceback_to_pyobject(traceback, NULL),
+                                   &stat);
+}
+
+
+static int
+tracemalloc_frame_stats_fill(_Py_hashtable_t *stats,
+                             _Py_hashtable_entry_t *entry,
+                             void *user_data)
+{
+    frame_t frame;
+    stat_t stat;
+    PyObject *frame_obj, *frames;
+
+    _Py_HASHTABLE_ENTRY_READ_KEY(stats, entry, frame);
+    _Py_HASHTABLE_ENTRY_READ_DATA(stats, entry, stat);
+
+    frame_obj = frame_to_pyobject(&frame);
+    if (frame_obj == NULL) {
+        return 1;
+    }
+    frames = PyTuple_Pack(1, frame_obj);
+    Py_DECREF(frame_obj);
+    return tracemalloc_append_stat((PyObject *)user_data, frames, &stat);
+}
+
+
+/*[clinic input]
+_tracemalloc._get_statistics
+
+    key_type: unicode
+    cumulative: bool = False
+    /
+
+Get statistics on the traces of the memory blocks allocated by Python.
+
+The traces are grouped by key_type, 'traceback', 'lineno' or 'filename',
+without creating an object per trace. Return a list of
+(traceback: tuple, size: int, count: int) tuples, traceback being a tuple
+of (filename: str, lineno: int) tuples. When grouping by filename, lineno
+is 0. If cumulative is true, the size and count of the memory blocks are
+added to all the frames of their traceback, not only to the most recent.
+
+Return an empty list if the tracemalloc module is disabled.
+[clinic start generated code]*/
+
+static PyObject *
+_tracemalloc__get_statistics_impl(PyObject *module, PyObject *key_type,
+                                  int cumulative)
+/*[clinic end generated code: output=e82e176819e927da input=2b8697d66bada3c7]*/
+{
+    _Py_hashtable_t *tracebacks = NULL;
+    group_frames_t group;
+    PyObject *list = NULL;
+    int by_traceback = 0;
+    int err;
+
+    group.stats = NULL;
+    group.cumulative = cumulative;
+    group.use_lineno = 1;
+    if (_PyUnicode_EqualToASCIIString(key_type, "traceback")) {
+        by_traceback = 1;
+    }
+    else if (_PyUnicode_EqualToASCIIString(key_type, "filename")) {
+        group.use_lineno = 0;
+    }
+    else if (!_PyUnicode_EqualToASCIIString(key_type, "lineno")) {
+        PyErr_Format(PyExc_ValueError, "unknown key_type: %R", key_type);
+        return NULL;
+    }
+    if (cumulative && by_traceback) {
+        PyErr_Format(PyExc_ValueError,
+                     "cumulative mode cannot by used with key type %R",
+                     key_type);
+        return NULL;
+    }
+
+    list = PyList_New(0);
+    if (list == NULL || !tracemalloc_config.tracing)
+        return list;
+
+    /* group the traces by traceback first: the tracebacks are interned
+       and far less numerous than the traces */
+    tracebacks = hashtable_new(sizeof(traceback_t *), sizeof(stat_t),
+                               _Py_hashtable_hash_ptr,
+                               _Py_hashtable_compare_direct);
+    if (tracebacks == NULL) {
+        PyErr_NoMemory();
+        goto error;
+    }
+
+    TABLES_LOCK();
+    err = _Py_hashtable_foreach(tracemalloc_traces,
+                                tracemalloc_group_traces_cb, tracebacks);
+    TABLES_UNLOCK();
+    if (err) {
+        PyErr_NoMemory();
+        goto error;
+    }
+
+    if (!by_traceback) {
+        group.stats = hashtable_new(sizeof(frame_t), sizeof(stat_t),
+                                    hashtable_hash_frame,
+                                    _Py_hashtable_compare_direct);
+        if (group.stats == NULL
+            || _Py_hashtable_foreach(tracebacks,
+                                     tracemalloc_group_frames_cb, &group)) {
+            PyErr_NoMemory();
+            goto error;
+        }
+    }
+
+    set_reentrant(1);
+    if (by_traceback) {
+        err = _Py_hashtable_foreach(tracebacks,
+                                    tracemalloc_traceback_stats_fill, list);
+    }
+    else {
+        err = _Py_hashtable_foreach(group.stats,
+                                    tracemalloc_frame_stats_fill, list);
+    }
+    set_reentrant(0);
+    if (err)
+        goto error;
+
+    goto finally;
+
+error:
+    Py_CLEAR(list);
+
+finally:
+    if (tracebacks != NULL) {
+        _Py_hashtable_destroy(tracebacks);
+    }
+    if (group.stats != NULL) {
+        _Py_hashtable_destroy(group.stats);
+    }
+    return list;
+}
+
+
 static traceback_t*
 tracemalloc_get_traceback(unsigned int domain, uintptr_t ptr)
 {
@@ -1510,18 +1941,21 @@ _tracemalloc.start
 
     nframe: int = 1
     /
+    *
+    sampling: int = 1
 
 Start tracing Python memory allocations.
 
 Also set the maximum number of frames stored in the traceback of a
-trace to nframe.
+trace to nframe. If sampling is greater than 1, only one memory block
+in sampling is traced on average.
 [clinic start generated code]*/
 
 static PyObject *
-_tracemalloc_start_impl(PyObject *module, int nframe)
-/*[clinic end generated code: output=caae05c23c159d3c input=40d849b5b29d1933]*/
+_tracemalloc_start_impl(PyObject *module, int nframe, int sampling)
+/*[clinic end generated code: output=de3b0a4049f1d355 input=744722f89115354e]*/
 {
-    if (tracemalloc_start(nframe) < 0) {
+    if (tracemalloc_start(nframe, sampling) < 0) {
         return NULL;
     }
     Py_RETURN_NONE;
@@ -1563,6 +1997,22 @@ _tracemalloc_get_traceback_limit_impl(PyObject *module)
 
 
 
+/*[clinic input]
+_tracemalloc.get_sampling
+
+Get the average number of memory blocks allocated per traced block.
+
+By default, all the memory blocks are traced: the sampling is 1.
+[clinic start generated code]*/
+
+static PyObject *
+_tracemalloc_get_sampling_impl(PyObject *module)
+/*[clinic end generated code: output=7c8f8065cf217064 input=0a1a44e65d883be4]*/
+{
+    return PyLong_FromLong(tracemalloc_config.sampling);
+}
+
+
 /*[clinic input]
 _tracemalloc.get_tracemalloc_memory
 
@@ -1619,10 +2069,12 @@ static PyMethodDef module_methods[] = {
     _TRACEMALLOC_IS_TRACING_METHODDEF
     _TRACEMALLOC_CLEAR_TRACES_METHODDEF
     _TRACEMALLOC__GET_TRACES_METHODDEF
+    _TRACEMALLOC__GET_STATISTICS_METHODDEF
     _TRACEMALLOC__GET_OBJECT_TRACEBACK_METHODDEF
     _TRACEMALLOC_START_METHODDEF
     _TRACEMALLOC_STOP_METHODDEF
     _TRACEMALLOC_GET_TRACEBACK_LIMIT_METHODDEF
+    _TRACEMALLOC_GET_SAMPLING_METHODDEF
     _TRACEMALLOC_GET_TRACEMALLOC_MEMORY_METHODDEF
     _TRACEMALLOC_GET_TRACED_MEMORY_METHODDEF
     /* sentinel */
@@ -1663,7 +2115,7 @@ _PyTraceMalloc_Init(int nframe)
     if (nframe == 0) {
         return 0;
     }
-    return tracemalloc_start(nframe);
+    return tracemalloc_start(nframe, 1);
 }
 
 
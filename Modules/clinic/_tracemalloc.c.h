@@ -46,6 +46,7 @@ PyDoc_STRVAR(_tracemalloc__get_traces__doc__,
 "\n"
 "Return a list of (size: int, traceback: tuple) tuples.\n"
 "traceback is a tuple of (filename: str, lineno: int) tuples.\n"
+"Identical traces are the same tuple.\n"
 "\n"
 "Return an empty list if the tracemalloc module is disabled.");
 
@@ -61,6 +62,45 @@ _tracemalloc__get_traces(PyObject *module, PyObject *Py_UNUSED(ignored))
     return _tracemalloc__get_traces_impl(module);
 }
 
+PyDoc_STRVAR(_tracemalloc__get_statistics__doc__,
+"_get_statistics($module, key_type, cumulative=False, /)\n"
+"--\n"
+"\n"
+"Get statistics on the traces of the memory blocks allocated by Python.\n"
+"\n"
+"The traces are grouped by key_type, \'traceback\', \'lineno\' or \'filename\',\n"
+"without creating an object per trace. Return a list of\n"
+"(traceback: tuple, size: int, count: int) tuples, traceback being a tuple\n"
+"of (filename: str, lineno: int) tuples. When grouping by filename, lineno\n"
+"is 0. If cumulative is true, the size and count of the memory blocks are\n"
+"added to all the frames of their traceback, not only to the most recent.\n"
+"\n"
+"Return an empty list if the tracemalloc module is disabled.");
+
+#define _TRACEMALLOC__GET_STATISTICS_METHODDEF    \
+    {"_get_statistics", (PyCFunction)_tracemalloc__get_statistics, METH_FASTCALL, _tracemalloc__get_statistics__doc__},
+
+static PyObject *
+_tracemalloc__get_statistics_impl(PyObject *module, PyObject *key_type,
+                                  int cumulative);
+
+static PyObject *
+_tracemalloc__get_statistics(PyObject *module, PyObject *const *args, Py_ssize_t nargs)
+{
+    PyObject *return_value = NULL;
+    PyObject *key_type;
+    int cumulative = 0;
+
+    if (!_PyArg_ParseStack(args, nargs, "U|p:_get_statistics",
+        &key_type, &cumulative)) {
+        goto exit;
+    }
+    return_value = _tracemalloc__get_statistics_impl(module, key_type, cumulative);
+
+exit:
+    return return_value;
+}
+
 PyDoc_STRVAR(_tracemalloc__get_object_traceback__doc__,
 "_get_object_traceback($module, obj, /)\n"
 "--\n"
@@ -75,31 +115,35 @@ PyDoc_STRVAR(_tracemalloc__get_object_traceback__doc__,
     {"_get_object_traceback", (PyCFunction)_tracemalloc__get_object_traceback, METH_O, _tracemalloc__get_object_traceback__doc__},
 
 PyDoc_STRVAR(_tracemalloc_start__doc__,
-"start($module, nframe=1, /)\n"
+"start($module, nframe=1, /, *, sampling=1)\n"
 "--\n"
 "\n"
 "Start tracing Python memory allocations.\n"
 "\n"
 "Also set the maximum number of frames stored in the traceback of a\n"
-"trace to nframe.");
+"trace to nframe. If sampling is greater than 1, only one memory block\n"
+"in sampling is traced on average.");
 
 #define _TRACEMALLOC_START_METHODDEF    \
-    {"start", (PyCFunction)_tracemalloc_start, METH_FASTCALL, _tracemalloc_start__doc__},
+    {"start", (PyCFunction)_tracemalloc_start, METH_FASTCALL|METH_KEYWORDS, _tracemalloc_start__doc__},
 
 static PyObject *
-_tracemalloc_start_impl(PyObject *module, int nframe);
+_tracemalloc_start_impl(PyObject *module, int nframe, int sampling);
 
 static PyObject *
-_tracemalloc_start(PyObject *module, PyObject *const *args, Py_ssize_t nargs)
+_tracemalloc_start(PyObject *module, PyObject *const *args, Py_ssize_t nargs, PyObject *kwnames)
 {
     PyObject *return_value = NULL;
+    static const char * const _keywords[] = {"", "sampling", NULL};
+    static _PyArg_Parser _parser = {"|i$i:start", _keywords, 0};
     int nframe = 1;
+    int sampling = 1;
 
-    if (!_PyArg_ParseStack(args, nargs, "|i:start",
-        &nframe)) {
+    if (!_PyArg_ParseStackAndKeywords(args, nargs, kwnames, &_parser,
+        &nframe, &sampling)) {
         goto exit;
     }
-    return_value = _tracemalloc_start_impl(module, nframe);
+    return_value = _tracemalloc_start_impl(module, nframe, sampling);
 
 exit:
     return return_value;
@@ -146,6 +190,26 @@ _tracemalloc_get_traceback_limit(PyObject *module, PyObject *Py_UNUSED(ignored))
     return _tracemalloc_get_traceback_limit_impl(module);
 }
 
+PyDoc_STRVAR(_tracemalloc_get_sampling__doc__,
+"get_sampling($module, /)\n"
+"--\n"
+"\n"
+"Get the average number of memory blocks allocated per traced block.\n"
+"\n"
+"By default, all the memory blocks are traced: the sampling is 1.");
+
+#define _TRACEMALLOC_GET_SAMPLING_METHODDEF    \
+    {"get_sampling", (PyCFunction)_tracemalloc_get_sampling, METH_NOARGS, _tracemalloc_get_sampling__doc__},
+
+static PyObject *
+_tracemalloc_get_sampling_impl(PyObject *module);
+
+static PyObject *
+_tracemalloc_get_sampling(PyObject *module, PyObject *Py_UNUSED(ignored))
+{
+    return _tracemalloc_get_sampling_impl(module);
+}
+
 PyDoc_STRVAR(_tracemalloc_get_tracemalloc_memory__doc__,
 "get_tracemalloc_memory($module, /)\n"
 "--\n"
@@ -185,4 +249,4 @@ _tracemalloc_get_traced_memory(PyObject *module, PyObject *Py_UNUSED(ignored))
 {
     return _tracemalloc_get_traced_memory_impl(module);
 }
-/*[clinic end generated code: output=d98afded69c89d52 input=a9049054013a1b77]*/
+/*[clinic end generated code: output=09ebbcf846e0904b input=a9049054013a1b77]*/
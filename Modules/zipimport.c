@@ -5,6 +5,13 @@
 #include "osdefs.h"
 #include "marshal.h"
 #include <time.h>
+#ifdef HAVE_FCNTL_H
+#include <fcntl.h>
+#endif
+
+#if defined(HAVE_PREAD) && !defined(MS_WINDOWS)
+#define ZIPIMPORT_USE_PREAD
+#endif
 
 
 #define IS_SOURCE   0x0
@@ -49,6 +56,10 @@ struct _zipimporter {
 static PyObject *ZipImportError;
 /* read_directory() cache */
 static PyObject *zip_directory_cache = NULL;
+#ifdef ZIPIMPORT_USE_PREAD
+/* get_file() cache */
+static PyObject *zip_file_cache = NULL;
+#endif
 
 /* forward decls */
 static PyObject *read_directory(PyObject *archive);
@@ -919,6 +930,171 @@ set_file_error(PyObject *archive, int eof)
     }
 }
 
+/* An open Zip archive file.
+
+   The open files are cached by archive path and shared by all the
+   zipimporters of an archive, so that the directory is parsed and the
+   members are read without opening the file again.  They are read with
+   pread(), which fails cleanly if the file was truncated meanwhile.  A file
+   is checked against a stat() of the archive before each use and reopened
+   when the archive was replaced or its size or modification time changed. */
+#ifdef ZIPIMPORT_USE_PREAD
+typedef struct {
+    int fd;
+    off_t size;
+    dev_t dev;
+    ino_t ino;
+    time_t mtime;
+    long mtime_nsec;
+} zip_file;
+
+static void
+zip_file_destructor(PyObject *capsule)
+{
+    zip_file *zf = PyCapsule_GetPointer(capsule, "zipimport.file");
+
+    if (zf != NULL) {
+        close(zf->fd);
+        PyMem_RawFree(zf);
+    }
+}
+
+static long
+stat_mtime_nsec(const struct stat *statbuf)
+{
+#ifdef HAVE_STAT_TV_NSEC
+    return statbuf->st_mtim.tv_nsec;
+#else
+    return 0;
+#endif
+}
+
+/* Store the open archive in *p_file and return a new reference to the
+   capsule owning it, which keeps it open.  Return NULL if the archive can't
+   be opened, without setting an exception: the archive must then be read
+   with stdio. */
+static PyObject *
+get_file(PyObject *archive, zip_file **p_file)
+{
+    struct stat statbuf;
+    PyObject *capsule, *bytes;
+    zip_file *zf;
+    int fd, rv;
+
+    if (zip_file_cache == NULL) {
+        return NULL;
+    }
+    capsule = PyDict_GetItem(zip_file_cache, archive);
+    rv = _Py_stat(archive, &statbuf);
+    if (rv == -2) {
+        PyErr_Clear();
+    }
+    if (capsule != NULL) {
+        zf = NULL;
+        if (PyCapsule_IsValid(capsule, "zipimport.file")) {
+            zf = PyCapsule_GetPointer(capsule, "zipimport.file");
+        }
+        if (rv == 0 && zf != NULL &&
+            zf->dev == statbuf.st_dev &&
+            zf->ino == statbuf.st_ino &&
+            zf->size == statbuf.st_size &&
+            zf->mtime == statbuf.st_mtime &&
+            zf->mtime_nsec == stat_mtime_nsec(&statbuf)) {
+            *p_file = zf;
+            Py_INCREF(capsule);
+            return capsule;
+        }
+        /* The archive changed: close the stale file */
+        if (PyDict_DelItem(zip_file_cache, archive) < 0) {
+            PyErr_Clear();
+        }
+    }
+    if (rv != 0 || !S_ISREG(statbuf.st_mode) || statbuf.st_size <= 0 ||
+        (unsigned long long)statbuf.st_size > (unsigned long long)LONG_MAX) {
+        return NULL;
+    }
+
+    bytes = PyUnicode_EncodeFSDefault(archive);
+    if (bytes == NULL) {
+        PyErr_Clear();
+        return NULL;
+    }
+    fd = _Py_open_noraise(PyBytes_AS_STRING(bytes), O_RDONLY);
+    Py_DECREF(bytes);
+    if (fd < 0) {
+        return NULL;
+    }
+    zf = PyMem_RawMalloc(sizeof(zip_file));
+    if (zf == NULL) {
+        close(fd);
+        return NULL;
+    }
+    zf->fd = fd;
+    zf->size = statbuf.st_size;
+    zf->dev = statbuf.st_dev;
+    zf->ino = statbuf.st_ino;
+    zf->mtime = statbuf.st_mtime;
+    zf->mtime_nsec = stat_mtime_nsec(&statbuf);
+
+    capsule = PyCapsule_New(zf, "zipimport.file", zip_file_destructor);
+    if (capsule == NULL) {
+        PyErr_Clear();
+        close(fd);
+        PyMem_RawFree(zf);
+        return NULL;
+    }
+    if (PyDict_SetItem(zip_file_cache, archive, capsule) < 0) {
+        PyErr_Clear();
+    }
+    *p_file = zf;
+    return capsule;
+}
+
+/* Read size bytes at offset of the archive into buf.  Return 0 on success,
+   or -1 if the bytes could not all be read, errno being 0 at the end of
+   the file and set by pread() on I/O errors. */
+static int
+zip_file_read(zip_file *zf, void *buf, size_t size, long offset)
+{
+    char *p = buf;
+    ssize_t n;
+
+    while (size > 0) {
+        n = pread(zf->fd, p, size, (off_t)offset);
+        if (n < 0) {
+            if (errno == EINTR) {
+                continue;
+            }
+            return -1;
+        }
+        if (n == 0) {
+            errno = 0;
+            return -1;
+        }
+        p += n;
+        size -= (size_t)n;
+        offset += (long)n;
+    }
+    return 0;
+}
+#else
+typedef struct {
+    long size;
+} zip_file;
+
+static PyObject *
+get_file(PyObject *archive, zip_file **p_file)
+{
+    return NULL;
+}
+
+static int
+zip_file_read(zip_file *zf, void *buf, size_t size, long offset)
+{
+    return -1;
+}
+#endif
+
 /*
    read_directory(archive) -> files dict (new reference)
 
@@ -945,13 +1121,17 @@ static PyObject *
 read_directory(PyObject *archive)
 {
     PyObject *files = NULL;
-    FILE *fp;
+    FILE *fp = NULL;
+    PyObject *capsule;
+    zip_file *zf = NULL;
+    unsigned char *directory = NULL, *entry;
+    size_t directory_size, pos;
     unsigned short flags, compress, time, date, name_size;
     unsigned int crc, data_size, file_size, header_size, header_offset;
     unsigned long file_offset, header_position;
     unsigned long arc_offset;  /* Absolute offset to start of the zip-archive. */
-    unsigned int count, i;
-    unsigned char buffer[46];
+    unsigned int count;
+    unsigned char buffer[22];
     char name[MAXPATHLEN + 5];
     PyObject *nameobj = NULL;
     PyObject *path;
@@ -959,25 +1139,40 @@ read_directory(PyObject *archive)
     int bootstrap;
     const char *errmsg = NULL;
 
-    fp = _Py_fopen_obj(archive, "rb");
-    if (fp == NULL) {
-        if (PyErr_ExceptionMatches(PyExc_OSError)) {
-            _PyErr_FormatFromCause(ZipImportError,
-                                   "can't open Zip file: %R", archive);
+    capsule = get_file(archive, &zf);
+    if (capsule != NULL) {
+        if (zf->size < 22) {
+            goto file_error;
+        }
+        header_position = (unsigned long)(zf->size - 22);
+        if (zip_file_read(zf, buffer, 22, (long)header_position) < 0) {
+            if (errno != 0) {
+                goto read_error;
+            }
+            goto file_error;
         }
-        return NULL;
     }
+    else {
+        fp = _Py_fopen_obj(archive, "rb");
+        if (fp == NULL) {
+            if (PyErr_ExceptionMatches(PyExc_OSError)) {
+                _PyErr_FormatFromCause(ZipImportError,
+                                       "can't open Zip file: %R", archive);
+            }
+            return NULL;
+        }
 
-    if (fseek(fp, -22, SEEK_END) == -1) {
-        goto file_error;
-    }
-    header_position = (unsigned long)ftell(fp);
-    if (header_position == (unsigned long)-1) {
-        goto file_error;
-    }
-    assert(header_position <= (unsigned long)LONG_MAX);
-    if (fread(buffer, 1, 22, fp) != 22) {
-        goto file_error;
+        if (fseek(fp, -22, SEEK_END) == -1) {
+            goto file_error;
+        }
+        header_position = (unsigned long)ftell(fp);
+        if (header_position == (unsigned long)-1) {
+            goto file_error;
+        }
+        assert(header_position <= (unsigned long)LONG_MAX);
+        if (fread(buffer, 1, 22, fp) != 22) {
+            goto file_error;
+        }
     }
     if (get_uint32(buffer) != 0x06054B50u) {
         /* Bad: End of Central Dir signature */
@@ -1002,74 +1197,96 @@ read_directory(PyObject *archive)
     header_position -= header_size;
     arc_offset = header_position - header_offset;
 
+    /* Start of Central Directory, up to the end of the archive.  It is
+       read at once rather than header by header. */
+    directory_size = (size_t)header_size + 22;
+    directory = PyMem_Malloc(directory_size);
+    if (directory == NULL) {
+        PyErr_NoMemory();
+        goto error;
+    }
+    if (capsule != NULL) {
+        if (zip_file_read(zf, directory, directory_size,
+                          (long)header_position) < 0) {
+            if (errno != 0) {
+                goto read_error;
+            }
+            goto file_error;
+        }
+        Py_CLEAR(capsule);
+    }
+    else {
+        if (fseek(fp, (long)header_position, 0) == -1) {
+            goto file_error;
+        }
+        if (fread(directory, 1, directory_size, fp) != directory_size) {
+            goto file_error;
+        }
+        fclose(fp);
+        fp = NULL;
+    }
+
     files = PyDict_New();
     if (files == NULL) {
         goto error;
     }
-    /* Start of Central Directory */
     count = 0;
-    if (fseek(fp, (long)header_position, 0) == -1) {
-        goto file_error;
-    }
+    pos = 0;
     for (;;) {
         PyObject *t;
-        size_t n;
         int err;
 
-        n = fread(buffer, 1, 46, fp);
-        if (n < 4) {
+        entry = directory + pos;
+        if (directory_size - pos < 4) {
             goto eof_error;
         }
         /* Start of file header */
-        if (get_uint32(buffer) != 0x02014B50u) {
+        if (get_uint32(entry) != 0x02014B50u) {
             break;              /* Bad: Central Dir File Header */
         }
-        if (n != 46) {
+        if (directory_size - pos < 46) {
             goto eof_error;
         }
-        flags = get_uint16(buffer + 8);
-        compress = get_uint16(buffer + 10);
-        time = get_uint16(buffer + 12);
-        date = get_uint16(buffer + 14);
-        crc = get_uint32(buffer + 16);
-        data_size = get_uint32(buffer + 20);
-        file_size = get_uint32(buffer + 24);
-        name_size = get_uint16(buffer + 28);
+        flags = get_uint16(entry + 8);
+        compress = get_uint16(entry + 10);
+        time = get_uint16(entry + 12);
+        date = get_uint16(entry + 14);
+        crc = get_uint32(entry + 16);
+        data_size = get_uint32(entry + 20);
+        file_size = get_uint32(entry + 24);
+        name_size = get_uint16(entry + 28);
         header_size = (unsigned int)name_size +
-           get_uint16(buffer + 30) /* extra field */ +
-           get_uint16(buffer + 32) /* comment */;
+           get_uint16(entry + 30) /* extra field */ +
+           get_uint16(entry + 32) /* comment */;
 
-        file_offset = get_uint32(buffer + 42);
+        file_offset = get_uint32(entry + 42);
         if (file_offset > header_offset) {
             errmsg = "bad local header offset";
             goto invalid_header;
         }
         file_offset += arc_offset;
 
+        assert(header_size <= 3*0xFFFFu);
+        if (directory_size - pos - 46 < header_size) {
+            goto file_error;
+        }
         if (name_size > MAXPATHLEN) {
             name_size = MAXPATHLEN;
         }
-        if (fread(name, 1, name_size, fp) != name_size) {
-            goto file_error;
-        }
+        memcpy(name, entry + 46, name_size);
         name[name_size] = '\0';  /* Add terminating null byte */
 #if SEP != '/'
-        for (i = 0; i < name_size; i++) {
-            if (name[i] == '/') {
-                name[i] = SEP;
+        {
+            unsigned int i;
+            for (i = 0; i < name_size; i++) {
+                if (name[i] == '/') {
+                    name[i] = SEP;
+                }
             }
         }
 #endif
-        /* Skip the rest of the header.
-         * On Windows, calling fseek to skip over the fields we don't use is
-         * slower than reading the data because fseek flushes stdio's
-         * internal buffers.  See issue #8745. */
-        assert(header_size <= 3*0xFFFFu);
-        for (i = name_size; i < header_size; i++) {
-            if (getc(fp) == EOF) {
-                goto file_error;
-            }
-        }
+        /* Skip the rest of the header */
+        pos += 46 + (size_t)header_size;
 
         bootstrap = 0;
         if (flags & 0x0800) {
@@ -1118,7 +1335,7 @@ read_directory(PyObject *archive)
         }
         count++;
     }
-    fclose(fp);
+    PyMem_Free(directory);
     if (Py_VerboseFlag) {
         PySys_FormatStderr("# zipimport: found %u names in %R\n",
                            count, archive);
@@ -1126,7 +1343,11 @@ read_directory(PyObject *archive)
     return files;
 
 eof_error:
-    set_file_error(archive, !ferror(fp));
+    set_file_error(archive, fp == NULL || !ferror(fp));
+    goto error;
+
+read_error:
+    set_file_error(archive, 0);
     goto error;
 
 file_error:
@@ -1139,7 +1360,11 @@ invalid_header:
     goto error;
 
 error:
-    fclose(fp);
+    if (fp != NULL) {
+        fclose(fp);
+    }
+    Py_XDECREF(capsule);
+    PyMem_Free(directory);
     Py_XDECREF(files);
     Py_XDECREF(nameobj);
     return NULL;
@@ -1185,7 +1410,9 @@ get_data(PyObject *archive, PyObject *toc_entry)
 {
     PyObject *raw_data = NULL, *data, *decompress;
     char *buf;
-    FILE *fp;
+    FILE *fp = NULL;
+    PyObject *capsule;
+    zip_file *zf = NULL;
     PyObject *datapath;
     unsigned short compress, time, date;
     unsigned int crc;
@@ -1204,17 +1431,31 @@ get_data(PyObject *archive, PyObject *toc_entry)
         return NULL;
     }
 
-    fp = _Py_fopen_obj(archive, "rb");
-    if (!fp) {
-        return NULL;
-    }
-    /* Check to make sure the local file header is correct */
-    if (fseek(fp, file_offset, 0) == -1) {
-        goto file_error;
+    capsule = get_file(archive, &zf);
+    if (capsule != NULL) {
+        if (file_offset < 0) {
+            goto eof_error;
+        }
+        if (zip_file_read(zf, buffer, 30, file_offset) < 0) {
+            if (errno != 0) {
+                goto read_error;
+            }
+            goto eof_error;
+        }
     }
-    if (fread(buffer, 1, 30, fp) != 30) {
-        goto eof_error;
+    else {
+        fp = _Py_fopen_obj(archive, "rb");
+        if (!fp) {
+            return NULL;
+        }
+        if (fseek(fp, file_offset, 0) == -1) {
+            goto file_error;
+        }
+        if (fread(buffer, 1, 30, fp) != 30) {
+            goto eof_error;
+        }
     }
+    /* Check to make sure the local file header is correct */
     if (get_uint32(buffer) != 0x04034B50u) {
         /* Bad: Local File Header */
         errmsg = "bad local file header";
@@ -1231,10 +1472,10 @@ get_data(PyObject *archive, PyObject *toc_entry)
     file_offset += header_size;  /* Start of file data */
 
     if (data_size > LONG_MAX - 1) {
-        fclose(fp);
         PyErr_NoMemory();
-        return NULL;
+        goto error;
     }
+
     bytes_size = compress == 0 ? data_size : data_size + 1;
     if (bytes_size == 0) {
         bytes_size++;
@@ -1243,31 +1484,41 @@ get_data(PyObject *archive, PyObject *toc_entry)
     if (raw_data == NULL) {
         goto error;
     }
-    buf = PyBytes_AsString(raw_data);
+    buf = PyBytes_AS_STRING(raw_data);
 
-    if (fseek(fp, file_offset, 0) == -1) {
-        goto file_error;
-    }
-    if (fread(buf, 1, data_size, fp) != (size_t)data_size) {
-        PyErr_SetString(PyExc_OSError,
-                        "zipimport: can't read data");
-        goto error;
+    if (capsule != NULL) {
+        if (zip_file_read(zf, buf, (size_t)data_size, file_offset) < 0) {
+            if (errno != 0) {
+                goto read_error;
+            }
+            PyErr_SetString(PyExc_OSError,
+                            "zipimport: can't read data");
+            goto error;
+        }
+        Py_CLEAR(capsule);
     }
+    else {
+        if (fseek(fp, file_offset, 0) == -1) {
+            goto file_error;
+        }
+        if (fread(buf, 1, data_size, fp) != (size_t)data_size) {
+            PyErr_SetString(PyExc_OSError,
+                            "zipimport: can't read data");
+            goto error;
+        }
 
-    fclose(fp);
-    fp = NULL;
-
-    if (compress != 0) {
-        buf[data_size] = 'Z';  /* saw this in zipfile.py */
-        data_size++;
+        fclose(fp);
+        fp = NULL;
     }
-    buf[data_size] = '\0';
 
     if (compress == 0) {  /* data is not compressed */
-        data = PyBytes_FromStringAndSize(buf, data_size);
+        if (bytes_size == data_size) {
+            return raw_data;
+        }
         Py_DECREF(raw_data);
-        return data;
+        return PyBytes_FromStringAndSize(NULL, 0);
     }
+    buf[data_size] = 'Z';  /* saw this in zipfile.py */
 
     /* Decompress with zlib */
     decompress = get_decompress_func();
@@ -1291,7 +1542,11 @@ get_data(PyObject *archive, PyObject *toc_entry)
     return data;
 
 eof_error:
-    set_file_error(archive, !ferror(fp));
+    set_file_error(archive, fp == NULL || !ferror(fp));
+    goto error;
+
+read_error:
+    set_file_error(archive, 0);
     goto error;
 
 file_error:
@@ -1307,6 +1562,7 @@ error:
     if (fp != NULL) {
         fclose(fp);
     }
+    Py_XDECREF(capsule);
     Py_XDECREF(raw_data);
     return NULL;
 }
@@ -1599,12 +1855,14 @@ exit:
 PyDoc_STRVAR(zipimport_doc,
 "zipimport provides support for importing Python modules from Zip archives.\n\
 \n\
-This module exports three objects:\n\
+This module exports the following objects:\n\
 - zipimporter: a class; its constructor takes a path to a Zip archive.\n\
 - ZipImportError: exception raised by zipimporter objects. It's a\n\
   subclass of ImportError, so it can be caught as ImportError, too.\n\
 - _zip_directory_cache: a dict, mapping archive paths to zip directory\n\
   info dicts, as used in zipimporter._files.\n\
+- _zip_file_cache: a dict, mapping archive paths to the open files\n\
+  the archives are read from, where supported.\n\
 \n\
 It is usually not needed to use the zipimport module explicitly; it is\n\
 used by the builtin import mechanism for sys.path items that are paths\n\
@@ -1660,5 +1918,14 @@ PyInit_zipimport(void)
     if (PyModule_AddObject(mod, "_zip_directory_cache",
                            zip_directory_cache) < 0)
         return NULL;
+#ifdef ZIPIMPORT_USE_PREAD
+    zip_file_cache = PyDict_New();
+    if (zip_file_cache == NULL)
+        return NULL;
+    Py_INCREF(zip_file_cache);
+    if (PyModule_AddObject(mod, "_zip_file_cache",
+                           zip_file_cache) < 0)
+        return NULL;
+#endif
     return mod;
 }
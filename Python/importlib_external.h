@@ -1,26 +1,26 @@
 /* Auto-generated by Programs/_freeze_importlib.c */
 const unsigned char _Py_M__importlib_external[] = {
     99,0,0,0,0,0,0,0,0,0,0,0,0,5,0,0,
-    0,64,0,0,0,115,16,2,0,0,100,0,90,0,100,1,
+    0,64,0,0,0,115,122,2,0,0,100,0,90,0,100,1,
     90,1,100,2,90,2,101,2,101,1,23,0,90,3,100,3,
     100,4,132,0,90,4,100,5,100,6,132,0,90,5,100,7,
     100,8,132,0,90,6,100,9,100,10,132,0,90,7,100,11,
     100,12,132,0,90,8,100,13,100,14,132,0,90,9,100,15,
     100,16,132,0,90,10,100,17,100,18,132,0,90,11,100,19,
-    100,20,132,0,90,12,100,97,100,22,100,23,132,1,90,13,
+    100,20,132,0,90,12,100,116,100,22,100,23,132,1,90,13,
     101,14,101,13,106,15,131,1,90,16,100,24,160,17,100,25,
     100,26,161,2,100,27,23,0,90,18,101,19,160,20,101,18,
     100,26,161,2,90,21,100,28,90,22,100,29,90,23,100,30,
     103,1,90,24,100,31,103,1,90,25,101,25,4,0,90,26,
-    90,27,100,98,100,32,100,33,156,1,100,34,100,35,132,3,
+    90,27,100,117,100,32,100,33,156,1,100,34,100,35,132,3,
     90,28,100,36,100,37,132,0,90,29,100,38,100,39,132,0,
     90,30,100,40,100,41,132,0,90,31,100,42,100,43,132,0,
     90,32,100,44,100,45,132,0,90,33,100,46,100,47,132,0,
     90,34,100,48,100,49,132,0,90,35,100,50,100,51,132,0,
-    90,36,100,52,100,53,132,0,90,37,100,99,100,54,100,55,
-    132,1,90,38,100,100,100,57,100,58,132,1,90,39,100,101,
+    90,36,100,52,100,53,132,0,90,37,100,118,100,54,100,55,
+    132,1,90,38,100,119,100,57,100,58,132,1,90,39,100,120,
     100,60,100,61,132,1,90,40,100,62,100,63,132,0,90,41,
-    101,42,131,0,90,43,100,102,100,32,101,43,100,64,156,2,
+    101,42,131,0,90,43,100,121,100,32,101,43,100,64,156,2,
     100,65,100,66,132,3,90,44,71,0,100,67,100,68,132,0,
     100,68,131,2,90,45,71,0,100,69,100,70,132,0,100,70,
     131,2,90,46,71,0,100,71,100,72,132,0,100,72,101,46,
@@ -31,580 +31,653 @@ const unsigned char _Py_M__importlib_external[] = {
     132,0,100,80,101,48,101,46,131,4,90,52,71,0,100,81,
     100,82,132,0,100,82,131,2,90,53,71,0,100,83,100,84,
     132,0,100,84,131,2,90,54,71,0,100,85,100,86,132,0,
-    100,86,131,2,90,55,71,0,100,87,100,88,132,0,100,88,
-    131,2,90,56,100,103,100,89,100,90,132,1,90,57,100,91,
-    100,92,132,0,90,58,100,93,100,94,132,0,90,59,100,95,
-    100,96,132,0,90,60,100,32,83,0,41,104,97,94,1,0,
-    0,67,111,114,101,32,105,109,112,108,101,109,101,110,116,97,
-    116,105,111,110,32,111,102,32,112,97,116,104,45,98,97,115,
-    101,100,32,105,109,112,111,114,116,46,10,10,84,104,105,115,
-    32,109,111,100,117,108,101,32,105,115,32,78,79,84,32,109,
-    101,97,110,116,32,116,111,32,98,101,32,100,105,114,101,99,
-    116,108,121,32,105,109,112,111,114,116,101,100,33,32,73,116,
-    32,104,97,115,32,98,101,101,110,32,100,101,115,105,103,110,
-    101,100,32,115,117,99,104,10,116,104,97,116,32,105,116,32,
-    99,97,110,32,98,101,32,98,111,111,116,115,116,114,97,112,
-    112,101,100,32,105,110,116,111,32,80,121,116,104,111,110,32,
-    97,115,32,116,104,101,32,105,109,112,108,101,109,101,110,116,
-    97,116,105,111,110,32,111,102,32,105,109,112,111,114,116,46,
-    32,65,115,10,115,117,99,104,32,105,116,32,114,101,113,117,
-    105,114,101,115,32,116,104,101,32,105,110,106,101,99,116,105,
-    111,110,32,111,102,32,115,112,101,99,105,102,105,99,32,109,
-    111,100,117,108,101,115,32,97,110,100,32,97,116,116,114,105,
-    98,117,116,101,115,32,105,110,32,111,114,100,101,114,32,116,
-    111,10,119,111,114,107,46,32,79,110,101,32,115,104,111,117,
-    108,100,32,117,115,101,32,105,109,112,111,114,116,108,105,98,
-    32,97,115,32,116,104,101,32,112,117,98,108,105,99,45,102,
-    97,99,105,110,103,32,118,101,114,115,105,111,110,32,111,102,
-    32,116,104,105,115,32,109,111,100,117,108,101,46,10,10,41,
-    1,218,3,119,105,110,41,2,90,6,99,121,103,119,105,110,
-    90,6,100,97,114,119,105,110,99,0,0,0,0,0,0,0,
-    0,1,0,0,0,3,0,0,0,3,0,0,0,115,60,0,
-    0,0,116,0,106,1,160,2,116,3,161,1,114,48,116,0,
-    106,1,160,2,116,4,161,1,114,30,100,1,137,0,110,4,
-    100,2,137,0,135,0,102,1,100,3,100,4,132,8,125,0,
-    110,8,100,5,100,4,132,0,125,0,124,0,83,0,41,6,
-    78,90,12,80,89,84,72,79,78,67,65,83,69,79,75,115,
-    12,0,0,0,80,89,84,72,79,78,67,65,83,69,79,75,
-    99,0,0,0,0,0,0,0,0,0,0,0,0,2,0,0,
-    0,19,0,0,0,115,10,0,0,0,136,0,116,0,106,1,
-    107,6,83,0,41,1,122,53,84,114,117,101,32,105,102,32,
-    102,105,108,101,110,97,109,101,115,32,109,117,115,116,32,98,
-    101,32,99,104,101,99,107,101,100,32,99,97,115,101,45,105,
-    110,115,101,110,115,105,116,105,118,101,108,121,46,41,2,218,
-    3,95,111,115,90,7,101,110,118,105,114,111,110,169,0,41,
-    1,218,3,107,101,121,114,2,0,0,0,250,38,60,102,114,
-    111,122,101,110,32,105,109,112,111,114,116,108,105,98,46,95,
-    98,111,111,116,115,116,114,97,112,95,101,120,116,101,114,110,
-    97,108,62,218,11,95,114,101,108,97,120,95,99,97,115,101,
-    36,0,0,0,115,2,0,0,0,0,2,122,37,95,109,97,
-    107,101,95,114,101,108,97,120,95,99,97,115,101,46,60,108,
-    111,99,97,108,115,62,46,95,114,101,108,97,120,95,99,97,
-    115,101,99,0,0,0,0,0,0,0,0,0,0,0,0,1,
-    0,0,0,83,0,0,0,115,4,0,0,0,100,1,83,0,
-    41,2,122,53,84,114,117,101,32,105,102,32,102,105,108,101,
-    110,97,109,101,115,32,109,117,115,116,32,98,101,32,99,104,
-    101,99,107,101,100,32,99,97,115,101,45,105,110,115,101,110,
-    115,105,116,105,118,101,108,121,46,70,114,2,0,0,0,114,
-    2,0,0,0,114,2,0,0,0,114,2,0,0,0,114,4,
-    0,0,0,114,5,0,0,0,40,0,0,0,115,2,0,0,
-    0,0,2,41,5,218,3,115,121,115,218,8,112,108,97,116,
-    102,111,114,109,218,10,115,116,97,114,116,115,119,105,116,104,
-    218,27,95,67,65,83,69,95,73,78,83,69,78,83,73,84,
-    73,86,69,95,80,76,65,84,70,79,82,77,83,218,35,95,
-    67,65,83,69,95,73,78,83,69,78,83,73,84,73,86,69,
-    95,80,76,65,84,70,79,82,77,83,95,83,84,82,95,75,
-    69,89,41,1,114,5,0,0,0,114,2,0,0,0,41,1,
-    114,3,0,0,0,114,4,0,0,0,218,16,95,109,97,107,
-    101,95,114,101,108,97,120,95,99,97,115,101,29,0,0,0,
-    115,14,0,0,0,0,1,12,1,12,1,6,2,4,2,14,
-    4,8,3,114,11,0,0,0,99,1,0,0,0,0,0,0,
-    0,1,0,0,0,4,0,0,0,67,0,0,0,115,20,0,
-    0,0,116,0,124,0,131,1,100,1,64,0,160,1,100,2,
-    100,3,161,2,83,0,41,4,122,42,67,111,110,118,101,114,
-    116,32,97,32,51,50,45,98,105,116,32,105,110,116,101,103,
-    101,114,32,116,111,32,108,105,116,116,108,101,45,101,110,100,
-    105,97,110,46,108,3,0,0,0,255,127,255,127,3,0,233,
-    4,0,0,0,218,6,108,105,116,116,108,101,41,2,218,3,
-    105,110,116,218,8,116,111,95,98,121,116,101,115,41,1,218,
-    1,120,114,2,0,0,0,114,2,0,0,0,114,4,0,0,
-    0,218,7,95,119,95,108,111,110,103,46,0,0,0,115,2,
-    0,0,0,0,2,114,17,0,0,0,99,1,0,0,0,0,
-    0,0,0,1,0,0,0,4,0,0,0,67,0,0,0,115,
-    12,0,0,0,116,0,160,1,124,0,100,1,161,2,83,0,
-    41,2,122,47,67,111,110,118,101,114,116,32,52,32,98,121,
-    116,101,115,32,105,110,32,108,105,116,116,108,101,45,101,110,
-    100,105,97,110,32,116,111,32,97,110,32,105,110,116,101,103,
-    101,114,46,114,13,0,0,0,41,2,114,14,0,0,0,218,
-    10,102,114,111,109,95,98,121,116,101,115,41,1,90,9,105,
-    110,116,95,98,121,116,101,115,114,2,0,0,0,114,2,0,
-    0,0,114,4,0,0,0,218,7,95,114,95,108,111,110,103,
-    51,0,0,0,115,2,0,0,0,0,2,114,19,0,0,0,
-    99,0,0,0,0,0,0,0,0,1,0,0,0,4,0,0,
-    0,71,0,0,0,115,20,0,0,0,116,0,160,1,100,1,
-    100,2,132,0,124,0,68,0,131,1,161,1,83,0,41,3,
-    122,31,82,101,112,108,97,99,101,109,101,110,116,32,102,111,
-    114,32,111,115,46,112,97,116,104,46,106,111,105,110,40,41,
-    46,99,1,0,0,0,0,0,0,0,2,0,0,0,5,0,
-    0,0,83,0,0,0,115,26,0,0,0,103,0,124,0,93,
-    18,125,1,124,1,114,4,124,1,160,0,116,1,161,1,145,
-    2,113,4,83,0,114,2,0,0,0,41,2,218,6,114,115,
-    116,114,105,112,218,15,112,97,116,104,95,115,101,112,97,114,
-    97,116,111,114,115,41,2,218,2,46,48,218,4,112,97,114,
-    116,114,2,0,0,0,114,2,0,0,0,114,4,0,0,0,
-    250,10,60,108,105,115,116,99,111,109,112,62,58,0,0,0,
-    115,2,0,0,0,6,1,122,30,95,112,97,116,104,95,106,
-    111,105,110,46,60,108,111,99,97,108,115,62,46,60,108,105,
-    115,116,99,111,109,112,62,41,2,218,8,112,97,116,104,95,
-    115,101,112,218,4,106,111,105,110,41,1,218,10,112,97,116,
-    104,95,112,97,114,116,115,114,2,0,0,0,114,2,0,0,
-    0,114,4,0,0,0,218,10,95,112,97,116,104,95,106,111,
-    105,110,56,0,0,0,115,4,0,0,0,0,2,10,1,114,
-    28,0,0,0,99,1,0,0,0,0,0,0,0,5,0,0,
-    0,5,0,0,0,67,0,0,0,115,96,0,0,0,116,0,
-    116,1,131,1,100,1,107,2,114,36,124,0,160,2,116,3,
-    161,1,92,3,125,1,125,2,125,3,124,1,124,3,102,2,
-    83,0,120,50,116,4,124,0,131,1,68,0,93,38,125,4,
-    124,4,116,1,107,6,114,46,124,0,106,5,124,4,100,1,
-    100,2,141,2,92,2,125,1,125,3,124,1,124,3,102,2,
-    83,0,113,46,87,0,100,3,124,0,102,2,83,0,41,4,
-    122,32,82,101,112,108,97,99,101,109,101,110,116,32,102,111,
-    114,32,111,115,46,112,97,116,104,46,115,112,108,105,116,40,
-    41,46,233,1,0,0,0,41,1,90,8,109,97,120,115,112,
-    108,105,116,218,0,41,6,218,3,108,101,110,114,21,0,0,
-    0,218,10,114,112,97,114,116,105,116,105,111,110,114,25,0,
-    0,0,218,8,114,101,118,101,114,115,101,100,218,6,114,115,
-    112,108,105,116,41,5,218,4,112,97,116,104,90,5,102,114,
-    111,110,116,218,1,95,218,4,116,97,105,108,114,16,0,0,
-    0,114,2,0,0,0,114,2,0,0,0,114,4,0,0,0,
-    218,11,95,112,97,116,104,95,115,112,108,105,116,62,0,0,
-    0,115,16,0,0,0,0,2,12,1,16,1,8,1,14,1,
-    8,1,18,1,12,1,114,38,0,0,0,99,1,0,0,0,
-    0,0,0,0,1,0,0,0,3,0,0,0,67,0,0,0,
-    115,10,0,0,0,116,0,160,1,124,0,161,1,83,0,41,
-    1,122,126,83,116,97,116,32,116,104,101,32,112,97,116,104,
-    46,10,10,32,32,32,32,77,97,100,101,32,97,32,115,101,
-    112,97,114,97,116,101,32,102,117,110,99,116,105,111,110,32,
-    116,111,32,109,97,107,101,32,105,116,32,101,97,115,105,101,
-    114,32,116,111,32,111,118,101,114,114,105,100,101,32,105,110,
-    32,101,120,112,101,114,105,109,101,110,116,115,10,32,32,32,
-    32,40,101,46,103,46,32,99,97,99,104,101,32,115,116,97,
-    116,32,114,101,115,117,108,116,115,41,46,10,10,32,32,32,
-    32,41,2,114,1,0,0,0,90,4,115,116,97,116,41,1,
-    114,35,0,0,0,114,2,0,0,0,114,2,0,0,0,114,
-    4,0,0,0,218,10,95,112,97,116,104,95,115,116,97,116,
-    74,0,0,0,115,2,0,0,0,0,7,114,39,0,0,0,
-    99,2,0,0,0,0,0,0,0,3,0,0,0,8,0,0,
-    0,67,0,0,0,115,48,0,0,0,121,12,116,0,124,0,
-    131,1,125,2,87,0,110,20,4,0,116,1,107,10,114,32,
-    1,0,1,0,1,0,100,1,83,0,88,0,124,2,106,2,
-    100,2,64,0,124,1,107,2,83,0,41,3,122,49,84,101,
-    115,116,32,119,104,101,116,104,101,114,32,116,104,101,32,112,
-    97,116,104,32,105,115,32,116,104,101,32,115,112,101,99,105,
-    102,105,101,100,32,109,111,100,101,32,116,121,112,101,46,70,
-    105,0,240,0,0,41,3,114,39,0,0,0,218,7,79,83,
-    69,114,114,111,114,218,7,115,116,95,109,111,100,101,41,3,
-    114,35,0,0,0,218,4,109,111,100,101,90,9,115,116,97,
-    116,95,105,110,102,111,114,2,0,0,0,114,2,0,0,0,
-    114,4,0,0,0,218,18,95,112,97,116,104,95,105,115,95,
-    109,111,100,101,95,116,121,112,101,84,0,0,0,115,10,0,
-    0,0,0,2,2,1,12,1,14,1,6,1,114,43,0,0,
-    0,99,1,0,0,0,0,0,0,0,1,0,0,0,3,0,
-    0,0,67,0,0,0,115,10,0,0,0,116,0,124,0,100,
-    1,131,2,83,0,41,2,122,31,82,101,112,108,97,99,101,
-    109,101,110,116,32,102,111,114,32,111,115,46,112,97,116,104,
-    46,105,115,102,105,108,101,46,105,0,128,0,0,41,1,114,
-    43,0,0,0,41,1,114,35,0,0,0,114,2,0,0,0,
-    114,2,0,0,0,114,4,0,0,0,218,12,95,112,97,116,
-    104,95,105,115,102,105,108,101,93,0,0,0,115,2,0,0,
-    0,0,2,114,44,0,0,0,99,1,0,0,0,0,0,0,
-    0,1,0,0,0,3,0,0,0,67,0,0,0,115,22,0,
-    0,0,124,0,115,12,116,0,160,1,161,0,125,0,116,2,
-    124,0,100,1,131,2,83,0,41,2,122,30,82,101,112,108,
+    100,86,131,2,90,55,100,87,90,56,100,88,90,57,100,32,
+    97,58,100,89,90,59,100,25,90,60,100,32,97,61,100,122,
+    100,90,100,91,132,1,90,62,100,92,100,93,132,0,90,63,
+    100,94,100,95,132,0,90,64,100,96,100,97,132,0,90,65,
+    71,0,100,98,100,99,132,0,100,99,131,2,90,66,100,100,
+    90,67,100,101,90,68,71,0,100,102,100,103,132,0,100,103,
+    101,48,101,46,131,4,90,69,71,0,100,104,100,105,132,0,
+    100,105,131,2,90,70,100,106,100,107,132,0,90,71,100,123,
+    100,108,100,109,132,1,90,72,100,110,100,111,132,0,90,73,
+    100,112,100,113,132,0,90,74,100,114,100,115,132,0,90,75,
+    100,32,83,0,41,124,97,94,1,0,0,67,111,114,101,32,
+    105,109,112,108,101,109,101,110,116,97,116,105,111,110,32,111,
+    102,32,112,97,116,104,45,98,97,115,101,100,32,105,109,112,
+    111,114,116,46,10,10,84,104,105,115,32,109,111,100,117,108,
+    101,32,105,115,32,78,79,84,32,109,101,97,110,116,32,116,
+    111,32,98,101,32,100,105,114,101,99,116,108,121,32,105,109,
+    112,111,114,116,101,100,33,32,73,116,32,104,97,115,32,98,
+    101,101,110,32,100,101,115,105,103,110,101,100,32,115,117,99,
+    104,10,116,104,97,116,32,105,116,32,99,97,110,32,98,101,
+    32,98,111,111,116,115,116,114,97,112,112,101,100,32,105,110,
+    116,111,32,80,121,116,104,111,110,32,97,115,32,116,104,101,
+    32,105,109,112,108,101,109,101,110,116,97,116,105,111,110,32,
+    111,102,32,105,109,112,111,114,116,46,32,65,115,10,115,117,
+    99,104,32,105,116,32,114,101,113,117,105,114,101,115,32,116,
+    104,101,32,105,110,106,101,99,116,105,111,110,32,111,102,32,
+    115,112,101,99,105,102,105,99,32,109,111,100,117,108,101,115,
+    32,97,110,100,32,97,116,116,114,105,98,117,116,101,115,32,
+    105,110,32,111,114,100,101,114,32,116,111,10,119,111,114,107,
+    46,32,79,110,101,32,115,104,111,117,108,100,32,117,115,101,
+    32,105,109,112,111,114,116,108,105,98,32,97,115,32,116,104,
+    101,32,112,117,98,108,105,99,45,102,97,99,105,110,103,32,
+    118,101,114,115,105,111,110,32,111,102,32,116,104,105,115,32,
+    109,111,100,117,108,101,46,10,10,41,1,218,3,119,105,110,
+    41,2,90,6,99,121,103,119,105,110,90,6,100,97,114,119,
+    105,110,99,0,0,0,0,0,0,0,0,1,0,0,0,3,
+    0,0,0,3,0,0,0,115,60,0,0,0,116,0,106,1,
+    160,2,116,3,161,1,114,48,116,0,106,1,160,2,116,4,
+    161,1,114,30,100,1,137,0,110,4,100,2,137,0,135,0,
+    102,1,100,3,100,4,132,8,125,0,110,8,100,5,100,4,
+    132,0,125,0,124,0,83,0,41,6,78,90,12,80,89,84,
+    72,79,78,67,65,83,69,79,75,115,12,0,0,0,80,89,
+    84,72,79,78,67,65,83,69,79,75,99,0,0,0,0,0,
+    0,0,0,0,0,0,0,2,0,0,0,19,0,0,0,115,
+    10,0,0,0,136,0,116,0,106,1,107,6,83,0,41,1,
+    122,53,84,114,117,101,32,105,102,32,102,105,108,101,110,97,
+    109,101,115,32,109,117,115,116,32,98,101,32,99,104,101,99,
+    107,101,100,32,99,97,115,101,45,105,110,115,101,110,115,105,
+    116,105,118,101,108,121,46,41,2,218,3,95,111,115,218,7,
+    101,110,118,105,114,111,110,169,0,41,1,218,3,107,101,121,
+    114,3,0,0,0,250,38,60,102,114,111,122,101,110,32,105,
+    109,112,111,114,116,108,105,98,46,95,98,111,111,116,115,116,
+    114,97,112,95,101,120,116,101,114,110,97,108,62,218,11,95,
+    114,101,108,97,120,95,99,97,115,101,36,0,0,0,115,2,
+    0,0,0,0,2,122,37,95,109,97,107,101,95,114,101,108,
+    97,120,95,99,97,115,101,46,60,108,111,99,97,108,115,62,
+    46,95,114,101,108,97,120,95,99,97,115,101,99,0,0,0,
+    0,0,0,0,0,0,0,0,0,1,0,0,0,83,0,0,
+    0,115,4,0,0,0,100,1,83,0,41,2,122,53,84,114,
+    117,101,32,105,102,32,102,105,108,101,110,97,109,101,115,32,
+    109,117,115,116,32,98,101,32,99,104,101,99,107,101,100,32,
+    99,97,115,101,45,105,110,115,101,110,115,105,116,105,118,101,
+    108,121,46,70,114,3,0,0,0,114,3,0,0,0,114,3,
+    0,0,0,114,3,0,0,0,114,5,0,0,0,114,6,0,
+    0,0,40,0,0,0,115,2,0,0,0,0,2,41,5,218,
+    3,115,121,115,218,8,112,108,97,116,102,111,114,109,218,10,
+    115,116,97,114,116,115,119,105,116,104,218,27,95,67,65,83,
+    69,95,73,78,83,69,78,83,73,84,73,86,69,95,80,76,
+    65,84,70,79,82,77,83,218,35,95,67,65,83,69,95,73,
+    78,83,69,78,83,73,84,73,86,69,95,80,76,65,84,70,
+    79,82,77,83,95,83,84,82,95,75,69,89,41,1,114,6,
+    0,0,0,114,3,0,0,0,41,1,114,4,0,0,0,114,
+    5,0,0,0,218,16,95,109,97,107,101,95,114,101,108,97,
+    120,95,99,97,115,101,29,0,0,0,115,14,0,0,0,0,
+    1,12,1,12,1,6,2,4,2,14,4,8,3,114,12,0,
+    0,0,99,1,0,0,0,0,0,0,0,1,0,0,0,4,
+    0,0,0,67,0,0,0,115,20,0,0,0,116,0,124,0,
+    131,1,100,1,64,0,160,1,100,2,100,3,161,2,83,0,
+    41,4,122,42,67,111,110,118,101,114,116,32,97,32,51,50,
+    45,98,105,116,32,105,110,116,101,103,101,114,32,116,111,32,
+    108,105,116,116,108,101,45,101,110,100,105,97,110,46,108,3,
+    0,0,0,255,127,255,127,3,0,233,4,0,0,0,218,6,
+    108,105,116,116,108,101,41,2,218,3,105,110,116,218,8,116,
+    111,95,98,121,116,101,115,41,1,218,1,120,114,3,0,0,
+    0,114,3,0,0,0,114,5,0,0,0,218,7,95,119,95,
+    108,111,110,103,46,0,0,0,115,2,0,0,0,0,2,114,
+    18,0,0,0,99,1,0,0,0,0,0,0,0,1,0,0,
+    0,4,0,0,0,67,0,0,0,115,12,0,0,0,116,0,
+    160,1,124,0,100,1,161,2,83,0,41,2,122,47,67,111,
+    110,118,101,114,116,32,52,32,98,121,116,101,115,32,105,110,
+    32,108,105,116,116,108,101,45,101,110,100,105,97,110,32,116,
+    111,32,97,110,32,105,110,116,101,103,101,114,46,114,14,0,
+    0,0,41,2,114,15,0,0,0,218,10,102,114,111,109,95,
+    98,121,116,101,115,41,1,90,9,105,110,116,95,98,121,116,
+    101,115,114,3,0,0,0,114,3,0,0,0,114,5,0,0,
+    0,218,7,95,114,95,108,111,110,103,51,0,0,0,115,2,
+    0,0,0,0,2,114,20,0,0,0,99,0,0,0,0,0,
+    0,0,0,1,0,0,0,4,0,0,0,71,0,0,0,115,
+    20,0,0,0,116,0,160,1,100,1,100,2,132,0,124,0,
+    68,0,131,1,161,1,83,0,41,3,122,31,82,101,112,108,
     97,99,101,109,101,110,116,32,102,111,114,32,111,115,46,112,
-    97,116,104,46,105,115,100,105,114,46,105,0,64,0,0,41,
-    3,114,1,0,0,0,218,6,103,101,116,99,119,100,114,43,
-    0,0,0,41,1,114,35,0,0,0,114,2,0,0,0,114,
-    2,0,0,0,114,4,0,0,0,218,11,95,112,97,116,104,
-    95,105,115,100,105,114,98,0,0,0,115,6,0,0,0,0,
-    2,4,1,8,1,114,46,0,0,0,233,182,1,0,0,99,
-    3,0,0,0,0,0,0,0,6,0,0,0,11,0,0,0,
-    67,0,0,0,115,162,0,0,0,100,1,160,0,124,0,116,
-    1,124,0,131,1,161,2,125,3,116,2,160,3,124,3,116,
-    2,106,4,116,2,106,5,66,0,116,2,106,6,66,0,124,
-    2,100,2,64,0,161,3,125,4,121,50,116,7,160,8,124,
-    4,100,3,161,2,143,16,125,5,124,5,160,9,124,1,161,
-    1,1,0,87,0,100,4,81,0,82,0,88,0,116,2,160,
-    10,124,3,124,0,161,2,1,0,87,0,110,58,4,0,116,
-    11,107,10,114,156,1,0,1,0,1,0,121,14,116,2,160,
-    12,124,3,161,1,1,0,87,0,110,20,4,0,116,11,107,
-    10,114,148,1,0,1,0,1,0,89,0,110,2,88,0,130,
-    0,89,0,110,2,88,0,100,4,83,0,41,5,122,162,66,
-    101,115,116,45,101,102,102,111,114,116,32,102,117,110,99,116,
-    105,111,110,32,116,111,32,119,114,105,116,101,32,100,97,116,
-    97,32,116,111,32,97,32,112,97,116,104,32,97,116,111,109,
-    105,99,97,108,108,121,46,10,32,32,32,32,66,101,32,112,
-    114,101,112,97,114,101,100,32,116,111,32,104,97,110,100,108,
-    101,32,97,32,70,105,108,101,69,120,105,115,116,115,69,114,
-    114,111,114,32,105,102,32,99,111,110,99,117,114,114,101,110,
-    116,32,119,114,105,116,105,110,103,32,111,102,32,116,104,101,
-    10,32,32,32,32,116,101,109,112,111,114,97,114,121,32,102,
-    105,108,101,32,105,115,32,97,116,116,101,109,112,116,101,100,
-    46,122,5,123,125,46,123,125,105,182,1,0,0,90,2,119,
-    98,78,41,13,218,6,102,111,114,109,97,116,218,2,105,100,
-    114,1,0,0,0,90,4,111,112,101,110,90,6,79,95,69,
-    88,67,76,90,7,79,95,67,82,69,65,84,90,8,79,95,
-    87,82,79,78,76,89,218,3,95,105,111,218,6,70,105,108,
-    101,73,79,218,5,119,114,105,116,101,218,7,114,101,112,108,
-    97,99,101,114,40,0,0,0,90,6,117,110,108,105,110,107,
-    41,6,114,35,0,0,0,218,4,100,97,116,97,114,42,0,
-    0,0,90,8,112,97,116,104,95,116,109,112,90,2,102,100,
-    218,4,102,105,108,101,114,2,0,0,0,114,2,0,0,0,
-    114,4,0,0,0,218,13,95,119,114,105,116,101,95,97,116,
-    111,109,105,99,105,0,0,0,115,26,0,0,0,0,5,16,
-    1,6,1,26,1,2,3,14,1,20,1,16,1,14,1,2,
-    1,14,1,14,1,6,1,114,56,0,0,0,105,66,13,0,
-    0,233,2,0,0,0,114,13,0,0,0,115,2,0,0,0,
-    13,10,90,11,95,95,112,121,99,97,99,104,101,95,95,122,
-    4,111,112,116,45,122,3,46,112,121,122,4,46,112,121,99,
-    78,41,1,218,12,111,112,116,105,109,105,122,97,116,105,111,
-    110,99,2,0,0,0,1,0,0,0,11,0,0,0,6,0,
-    0,0,67,0,0,0,115,244,0,0,0,124,1,100,1,107,
-    9,114,52,116,0,160,1,100,2,116,2,161,2,1,0,124,
-    2,100,1,107,9,114,40,100,3,125,3,116,3,124,3,131,
-    1,130,1,124,1,114,48,100,4,110,2,100,5,125,2,116,
-    4,160,5,124,0,161,1,125,0,116,6,124,0,131,1,92,
-    2,125,4,125,5,124,5,160,7,100,6,161,1,92,3,125,
-    6,125,7,125,8,116,8,106,9,106,10,125,9,124,9,100,
-    1,107,8,114,114,116,11,100,7,131,1,130,1,100,4,160,
-    12,124,6,114,126,124,6,110,2,124,8,124,7,124,9,103,
-    3,161,1,125,10,124,2,100,1,107,8,114,172,116,8,106,
-    13,106,14,100,8,107,2,114,164,100,4,125,2,110,8,116,
-    8,106,13,106,14,125,2,116,15,124,2,131,1,125,2,124,
-    2,100,4,107,3,114,224,124,2,160,16,161,0,115,210,116,
-    17,100,9,160,18,124,2,161,1,131,1,130,1,100,10,160,
-    18,124,10,116,19,124,2,161,3,125,10,116,20,124,4,116,
-    21,124,10,116,22,100,8,25,0,23,0,131,3,83,0,41,
-    11,97,254,2,0,0,71,105,118,101,110,32,116,104,101,32,
-    112,97,116,104,32,116,111,32,97,32,46,112,121,32,102,105,
-    108,101,44,32,114,101,116,117,114,110,32,116,104,101,32,112,
-    97,116,104,32,116,111,32,105,116,115,32,46,112,121,99,32,
-    102,105,108,101,46,10,10,32,32,32,32,84,104,101,32,46,
-    112,121,32,102,105,108,101,32,100,111,101,115,32,110,111,116,
-    32,110,101,101,100,32,116,111,32,101,120,105,115,116,59,32,
-    116,104,105,115,32,115,105,109,112,108,121,32,114,101,116,117,
-    114,110,115,32,116,104,101,32,112,97,116,104,32,116,111,32,
-    116,104,101,10,32,32,32,32,46,112,121,99,32,102,105,108,
-    101,32,99,97,108,99,117,108,97,116,101,100,32,97,115,32,
-    105,102,32,116,104,101,32,46,112,121,32,102,105,108,101,32,
-    119,101,114,101,32,105,109,112,111,114,116,101,100,46,10,10,
-    32,32,32,32,84,104,101,32,39,111,112,116,105,109,105,122,
-    97,116,105,111,110,39,32,112,97,114,97,109,101,116,101,114,
-    32,99,111,110,116,114,111,108,115,32,116,104,101,32,112,114,
-    101,115,117,109,101,100,32,111,112,116,105,109,105,122,97,116,
-    105,111,110,32,108,101,118,101,108,32,111,102,10,32,32,32,
-    32,116,104,101,32,98,121,116,101,99,111,100,101,32,102,105,
-    108,101,46,32,73,102,32,39,111,112,116,105,109,105,122,97,
-    116,105,111,110,39,32,105,115,32,110,111,116,32,78,111,110,
-    101,44,32,116,104,101,32,115,116,114,105,110,103,32,114,101,
-    112,114,101,115,101,110,116,97,116,105,111,110,10,32,32,32,
-    32,111,102,32,116,104,101,32,97,114,103,117,109,101,110,116,
-    32,105,115,32,116,97,107,101,110,32,97,110,100,32,118,101,
-    114,105,102,105,101,100,32,116,111,32,98,101,32,97,108,112,
-    104,97,110,117,109,101,114,105,99,32,40,101,108,115,101,32,
-    86,97,108,117,101,69,114,114,111,114,10,32,32,32,32,105,
-    115,32,114,97,105,115,101,100,41,46,10,10,32,32,32,32,
-    84,104,101,32,100,101,98,117,103,95,111,118,101,114,114,105,
-    100,101,32,112,97,114,97,109,101,116,101,114,32,105,115,32,
-    100,101,112,114,101,99,97,116,101,100,46,32,73,102,32,100,
-    101,98,117,103,95,111,118,101,114,114,105,100,101,32,105,115,
-    32,110,111,116,32,78,111,110,101,44,10,32,32,32,32,97,
-    32,84,114,117,101,32,118,97,108,117,101,32,105,115,32,116,
-    104,101,32,115,97,109,101,32,97,115,32,115,101,116,116,105,
-    110,103,32,39,111,112,116,105,109,105,122,97,116,105,111,110,
-    39,32,116,111,32,116,104,101,32,101,109,112,116,121,32,115,
-    116,114,105,110,103,10,32,32,32,32,119,104,105,108,101,32,
-    97,32,70,97,108,115,101,32,118,97,108,117,101,32,105,115,
-    32,101,113,117,105,118,97,108,101,110,116,32,116,111,32,115,
-    101,116,116,105,110,103,32,39,111,112,116,105,109,105,122,97,
-    116,105,111,110,39,32,116,111,32,39,49,39,46,10,10,32,
-    32,32,32,73,102,32,115,121,115,46,105,109,112,108,101,109,
-    101,110,116,97,116,105,111,110,46,99,97,99,104,101,95,116,
-    97,103,32,105,115,32,78,111,110,101,32,116,104,101,110,32,
-    78,111,116,73,109,112,108,101,109,101,110,116,101,100,69,114,
-    114,111,114,32,105,115,32,114,97,105,115,101,100,46,10,10,
-    32,32,32,32,78,122,70,116,104,101,32,100,101,98,117,103,
-    95,111,118,101,114,114,105,100,101,32,112,97,114,97,109,101,
-    116,101,114,32,105,115,32,100,101,112,114,101,99,97,116,101,
-    100,59,32,117,115,101,32,39,111,112,116,105,109,105,122,97,
-    116,105,111,110,39,32,105,110,115,116,101,97,100,122,50,100,
-    101,98,117,103,95,111,118,101,114,114,105,100,101,32,111,114,
-    32,111,112,116,105,109,105,122,97,116,105,111,110,32,109,117,
-    115,116,32,98,101,32,115,101,116,32,116,111,32,78,111,110,
-    101,114,30,0,0,0,114,29,0,0,0,218,1,46,122,36,
+    97,116,104,46,106,111,105,110,40,41,46,99,1,0,0,0,
+    0,0,0,0,2,0,0,0,5,0,0,0,83,0,0,0,
+    115,26,0,0,0,103,0,124,0,93,18,125,1,124,1,114,
+    4,124,1,160,0,116,1,161,1,145,2,113,4,83,0,114,
+    3,0,0,0,41,2,218,6,114,115,116,114,105,112,218,15,
+    112,97,116,104,95,115,101,112,97,114,97,116,111,114,115,41,
+    2,218,2,46,48,218,4,112,97,114,116,114,3,0,0,0,
+    114,3,0,0,0,114,5,0,0,0,250,10,60,108,105,115,
+    116,99,111,109,112,62,58,0,0,0,115,2,0,0,0,6,
+    1,122,30,95,112,97,116,104,95,106,111,105,110,46,60,108,
+    111,99,97,108,115,62,46,60,108,105,115,116,99,111,109,112,
+    62,41,2,218,8,112,97,116,104,95,115,101,112,218,4,106,
+    111,105,110,41,1,218,10,112,97,116,104,95,112,97,114,116,
+    115,114,3,0,0,0,114,3,0,0,0,114,5,0,0,0,
+    218,10,95,112,97,116,104,95,106,111,105,110,56,0,0,0,
+    115,4,0,0,0,0,2,10,1,114,29,0,0,0,99,1,
+    0,0,0,0,0,0,0,5,0,0,0,5,0,0,0,67,
+    0,0,0,115,96,0,0,0,116,0,116,1,131,1,100,1,
+    107,2,114,36,124,0,160,2,116,3,161,1,92,3,125,1,
+    125,2,125,3,124,1,124,3,102,2,83,0,120,50,116,4,
+    124,0,131,1,68,0,93,38,125,4,124,4,116,1,107,6,
+    114,46,124,0,106,5,124,4,100,1,100,2,141,2,92,2,
+    125,1,125,3,124,1,124,3,102,2,83,0,113,46,87,0,
+    100,3,124,0,102,2,83,0,41,4,122,32,82,101,112,108,
+    97,99,101,109,101,110,116,32,102,111,114,32,111,115,46,112,
+    97,116,104,46,115,112,108,105,116,40,41,46,233,1,0,0,
+    0,41,1,90,8,109,97,120,115,112,108,105,116,218,0,41,
+    6,218,3,108,101,110,114,22,0,0,0,218,10,114,112,97,
+    114,116,105,116,105,111,110,114,26,0,0,0,218,8,114,101,
+    118,101,114,115,101,100,218,6,114,115,112,108,105,116,41,5,
+    218,4,112,97,116,104,90,5,102,114,111,110,116,218,1,95,
+    218,4,116,97,105,108,114,17,0,0,0,114,3,0,0,0,
+    114,3,0,0,0,114,5,0,0,0,218,11,95,112,97,116,
+    104,95,115,112,108,105,116,62,0,0,0,115,16,0,0,0,
+    0,2,12,1,16,1,8,1,14,1,8,1,18,1,12,1,
+    114,39,0,0,0,99,1,0,0,0,0,0,0,0,1,0,
+    0,0,3,0,0,0,67,0,0,0,115,10,0,0,0,116,
+    0,160,1,124,0,161,1,83,0,41,1,122,126,83,116,97,
+    116,32,116,104,101,32,112,97,116,104,46,10,10,32,32,32,
+    32,77,97,100,101,32,97,32,115,101,112,97,114,97,116,101,
+    32,102,117,110,99,116,105,111,110,32,116,111,32,109,97,107,
+    101,32,105,116,32,101,97,115,105,101,114,32,116,111,32,111,
+    118,101,114,114,105,100,101,32,105,110,32,101,120,112,101,114,
+    105,109,101,110,116,115,10,32,32,32,32,40,101,46,103,46,
+    32,99,97,99,104,101,32,115,116,97,116,32,114,101,115,117,
+    108,116,115,41,46,10,10,32,32,32,32,41,2,114,1,0,
+    0,0,90,4,115,116,97,116,41,1,114,36,0,0,0,114,
+    3,0,0,0,114,3,0,0,0,114,5,0,0,0,218,10,
+    95,112,97,116,104,95,115,116,97,116,74,0,0,0,115,2,
+    0,0,0,0,7,114,40,0,0,0,99,2,0,0,0,0,
+    0,0,0,3,0,0,0,8,0,0,0,67,0,0,0,115,
+    48,0,0,0,121,12,116,0,124,0,131,1,125,2,87,0,
+    110,20,4,0,116,1,107,10,114,32,1,0,1,0,1,0,
+    100,1,83,0,88,0,124,2,106,2,100,2,64,0,124,1,
+    107,2,83,0,41,3,122,49,84,101,115,116,32,119,104,101,
+    116,104,101,114,32,116,104,101,32,112,97,116,104,32,105,115,
+    32,116,104,101,32,115,112,101,99,105,102,105,101,100,32,109,
+    111,100,101,32,116,121,112,101,46,70,105,0,240,0,0,41,
+    3,114,40,0,0,0,218,7,79,83,69,114,114,111,114,218,
+    7,115,116,95,109,111,100,101,41,3,114,36,0,0,0,218,
+    4,109,111,100,101,90,9,115,116,97,116,95,105,110,102,111,
+    114,3,0,0,0,114,3,0,0,0,114,5,0,0,0,218,
+    18,95,112,97,116,104,95,105,115,95,109,111,100,101,95,116,
+    121,112,101,84,0,0,0,115,10,0,0,0,0,2,2,1,
+    12,1,14,1,6,1,114,44,0,0,0,99,1,0,0,0,
+    0,0,0,0,1,0,0,0,3,0,0,0,67,0,0,0,
+    115,10,0,0,0,116,0,124,0,100,1,131,2,83,0,41,
+    2,122,31,82,101,112,108,97,99,101,109,101,110,116,32,102,
+    111,114,32,111,115,46,112,97,116,104,46,105,115,102,105,108,
+    101,46,105,0,128,0,0,41,1,114,44,0,0,0,41,1,
+    114,36,0,0,0,114,3,0,0,0,114,3,0,0,0,114,
+    5,0,0,0,218,12,95,112,97,116,104,95,105,115,102,105,
+    108,101,93,0,0,0,115,2,0,0,0,0,2,114,45,0,
+    0,0,99,1,0,0,0,0,0,0,0,1,0,0,0,3,
+    0,0,0,67,0,0,0,115,22,0,0,0,124,0,115,12,
+    116,0,160,1,161,0,125,0,116,2,124,0,100,1,131,2,
+    83,0,41,2,122,30,82,101,112,108,97,99,101,109,101,110,
+    116,32,102,111,114,32,111,115,46,112,97,116,104,46,105,115,
+    100,105,114,46,105,0,64,0,0,41,3,114,1,0,0,0,
+    218,6,103,101,116,99,119,100,114,44,0,0,0,41,1,114,
+    36,0,0,0,114,3,0,0,0,114,3,0,0,0,114,5,
+    0,0,0,218,11,95,112,97,116,104,95,105,115,100,105,114,
+    98,0,0,0,115,6,0,0,0,0,2,4,1,8,1,114,
+    47,0,0,0,233,182,1,0,0,99,3,0,0,0,0,0,
+    0,0,6,0,0,0,11,0,0,0,67,0,0,0,115,162,
+    0,0,0,100,1,160,0,124,0,116,1,124,0,131,1,161,
+    2,125,3,116,2,160,3,124,3,116,2,106,4,116,2,106,
+    5,66,0,116,2,106,6,66,0,124,2,100,2,64,0,161,
+    3,125,4,121,50,116,7,160,8,124,4,100,3,161,2,143,
+    16,125,5,124,5,160,9,124,1,161,1,1,0,87,0,100,
+    4,81,0,82,0,88,0,116,2,160,10,124,3,124,0,161,
+    2,1,0,87,0,110,58,4,0,116,11,107,10,114,156,1,
+    0,1,0,1,0,121,14,116,2,160,12,124,3,161,1,1,
+    0,87,0,110,20,4,0,116,11,107,10,114,148,1,0,1,
+    0,1,0,89,0,110,2,88,0,130,0,89,0,110,2,88,
+    0,100,4,83,0,41,5,122,162,66,101,115,116,45,101,102,
+    102,111,114,116,32,102,117,110,99,116,105,111,110,32,116,111,
+    32,119,114,105,116,101,32,100,97,116,97,32,116,111,32,97,
+    32,112,97,116,104,32,97,116,111,109,105,99,97,108,108,121,
+    46,10,32,32,32,32,66,101,32,112,114,101,112,97,114,101,
+    100,32,116,111,32,104,97,110,100,108,101,32,97,32,70,105,
+    108,101,69,120,105,115,116,115,69,114,114,111,114,32,105,102,
+    32,99,111,110,99,117,114,114,101,110,116,32,119,114,105,116,
+    105,110,103,32,111,102,32,116,104,101,10,32,32,32,32,116,
+    101,109,112,111,114,97,114,121,32,102,105,108,101,32,105,115,
+    32,97,116,116,101,109,112,116,101,100,46,122,5,123,125,46,
+    123,125,105,182,1,0,0,90,2,119,98,78,41,13,218,6,
+    102,111,114,109,97,116,218,2,105,100,114,1,0,0,0,90,
+    4,111,112,101,110,90,6,79,95,69,88,67,76,90,7,79,
+    95,67,82,69,65,84,90,8,79,95,87,82,79,78,76,89,
+    218,3,95,105,111,218,6,70,105,108,101,73,79,218,5,119,
+    114,105,116,101,218,7,114,101,112,108,97,99,101,114,41,0,
+    0,0,90,6,117,110,108,105,110,107,41,6,114,36,0,0,
+    0,218,4,100,97,116,97,114,43,0,0,0,90,8,112,97,
+    116,104,95,116,109,112,90,2,102,100,218,4,102,105,108,101,
+    114,3,0,0,0,114,3,0,0,0,114,5,0,0,0,218,
+    13,95,119,114,105,116,101,95,97,116,111,109,105,99,105,0,
+    0,0,115,26,0,0,0,0,5,16,1,6,1,26,1,2,
+    3,14,1,20,1,16,1,14,1,2,1,14,1,14,1,6,
+    1,114,57,0,0,0,105,66,13,0,0,233,2,0,0,0,
+    114,14,0,0,0,115,2,0,0,0,13,10,90,11,95,95,
+    112,121,99,97,99,104,101,95,95,122,4,111,112,116,45,122,
+    3,46,112,121,122,4,46,112,121,99,78,41,1,218,12,111,
+    112,116,105,109,105,122,97,116,105,111,110,99,2,0,0,0,
+    1,0,0,0,11,0,0,0,6,0,0,0,67,0,0,0,
+    115,244,0,0,0,124,1,100,1,107,9,114,52,116,0,160,
+    1,100,2,116,2,161,2,1,0,124,2,100,1,107,9,114,
+    40,100,3,125,3,116,3,124,3,131,1,130,1,124,1,114,
+    48,100,4,110,2,100,5,125,2,116,4,160,5,124,0,161,
+    1,125,0,116,6,124,0,131,1,92,2,125,4,125,5,124,
+    5,160,7,100,6,161,1,92,3,125,6,125,7,125,8,116,
+    8,106,9,106,10,125,9,124,9,100,1,107,8,114,114,116,
+    11,100,7,131,1,130,1,100,4,160,12,124,6,114,126,124,
+    6,110,2,124,8,124,7,124,9,103,3,161,1,125,10,124,
+    2,100,1,107,8,114,172,116,8,106,13,106,14,100,8,107,
+    2,114,164,100,4,125,2,110,8,116,8,106,13,106,14,125,
+    2,116,15,124,2,131,1,125,2,124,2,100,4,107,3,114,
+    224,124,2,160,16,161,0,115,210,116,17,100,9,160,18,124,
+    2,161,1,131,1,130,1,100,10,160,18,124,10,116,19,124,
+    2,161,3,125,10,116,20,124,4,116,21,124,10,116,22,100,
+    8,25,0,23,0,131,3,83,0,41,11,97,254,2,0,0,
+    71,105,118,101,110,32,116,104,101,32,112,97,116,104,32,116,
+    111,32,97,32,46,112,121,32,102,105,108,101,44,32,114,101,
+    116,117,114,110,32,116,104,101,32,112,97,116,104,32,116,111,
+    32,105,116,115,32,46,112,121,99,32,102,105,108,101,46,10,
+    10,32,32,32,32,84,104,101,32,46,112,121,32,102,105,108,
+    101,32,100,111,101,115,32,110,111,116,32,110,101,101,100,32,
+    116,111,32,101,120,105,115,116,59,32,116,104,105,115,32,115,
+    105,109,112,108,121,32,114,101,116,117,114,110,115,32,116,104,
+    101,32,112,97,116,104,32,116,111,32,116,104,101,10,32,32,
+    32,32,46,112,121,99,32,102,105,108,101,32,99,97,108,99,
+    117,108,97,116,101,100,32,97,115,32,105,102,32,116,104,101,
+    32,46,112,121,32,102,105,108,101,32,119,101,114,101,32,105,
+    109,112,111,114,116,101,100,46,10,10,32,32,32,32,84,104,
+    101,32,39,111,112,116,105,109,105,122,97,116,105,111,110,39,
+    32,112,97,114,97,109,101,116,101,114,32,99,111,110,116,114,
+    111,108,115,32,116,104,101,32,112,114,101,115,117,109,101,100,
+    32,111,112,116,105,109,105,122,97,116,105,111,110,32,108,101,
+    118,101,108,32,111,102,10,32,32,32,32,116,104,101,32,98,
+    121,116,101,99,111,100,101,32,102,105,108,101,46,32,73,102,
+    32,39,111,112,116,105,109,105,122,97,116,105,111,110,39,32,
+    105,115,32,110,111,116,32,78,111,110,101,44,32,116,104,101,
+    32,115,116,114,105,110,103,32,114,101,112,114,101,115,101,110,
+    116,97,116,105,111,110,10,32,32,32,32,111,102,32,116,104,
+    101,32,97,114,103,117,109,101,110,116,32,105,115,32,116,97,
+    107,101,110,32,97,110,100,32,118,101,114,105,102,105,101,100,
+    32,116,111,32,98,101,32,97,108,112,104,97,110,117,109,101,
+    114,105,99,32,40,101,108,115,101,32,86,97,108,117,101,69,
+    114,114,111,114,10,32,32,32,32,105,115,32,114,97,105,115,
+    101,100,41,46,10,10,32,32,32,32,84,104,101,32,100,101,
+    98,117,103,95,111,118,101,114,114,105,100,101,32,112,97,114,
+    97,109,101,116,101,114,32,105,115,32,100,101,112,114,101,99,
+    97,116,101,100,46,32,73,102,32,100,101,98,117,103,95,111,
+    118,101,114,114,105,100,101,32,105,115,32,110,111,116,32,78,
+    111,110,101,44,10,32,32,32,32,97,32,84,114,117,101,32,
+    118,97,108,117,101,32,105,115,32,116,104,101,32,115,97,109,
+    101,32,97,115,32,115,101,116,116,105,110,103,32,39,111,112,
+    116,105,109,105,122,97,116,105,111,110,39,32,116,111,32,116,
+    104,101,32,101,109,112,116,121,32,115,116,114,105,110,103,10,
+    32,32,32,32,119,104,105,108,101,32,97,32,70,97,108,115,
+    101,32,118,97,108,117,101,32,105,115,32,101,113,117,105,118,
+    97,108,101,110,116,32,116,111,32,115,101,116,116,105,110,103,
+    32,39,111,112,116,105,109,105,122,97,116,105,111,110,39,32,
+    116,111,32,39,49,39,46,10,10,32,32,32,32,73,102,32,
     115,121,115,46,105,109,112,108,101,109,101,110,116,97,116,105,
     111,110,46,99,97,99,104,101,95,116,97,103,32,105,115,32,
-    78,111,110,101,233,0,0,0,0,122,24,123,33,114,125,32,
-    105,115,32,110,111,116,32,97,108,112,104,97,110,117,109,101,
-    114,105,99,122,7,123,125,46,123,125,123,125,41,23,218,9,
-    95,119,97,114,110,105,110,103,115,218,4,119,97,114,110,218,
-    18,68,101,112,114,101,99,97,116,105,111,110,87,97,114,110,
-    105,110,103,218,9,84,121,112,101,69,114,114,111,114,114,1,
-    0,0,0,218,6,102,115,112,97,116,104,114,38,0,0,0,
-    114,32,0,0,0,114,6,0,0,0,218,14,105,109,112,108,
-    101,109,101,110,116,97,116,105,111,110,218,9,99,97,99,104,
-    101,95,116,97,103,218,19,78,111,116,73,109,112,108,101,109,
-    101,110,116,101,100,69,114,114,111,114,114,26,0,0,0,218,
-    5,102,108,97,103,115,218,8,111,112,116,105,109,105,122,101,
-    218,3,115,116,114,218,7,105,115,97,108,110,117,109,218,10,
-    86,97,108,117,101,69,114,114,111,114,114,48,0,0,0,218,
-    4,95,79,80,84,114,28,0,0,0,218,8,95,80,89,67,
-    65,67,72,69,218,17,66,89,84,69,67,79,68,69,95,83,
-    85,70,70,73,88,69,83,41,11,114,35,0,0,0,90,14,
-    100,101,98,117,103,95,111,118,101,114,114,105,100,101,114,58,
-    0,0,0,218,7,109,101,115,115,97,103,101,218,4,104,101,
-    97,100,114,37,0,0,0,90,4,98,97,115,101,218,3,115,
-    101,112,218,4,114,101,115,116,90,3,116,97,103,90,15,97,
-    108,109,111,115,116,95,102,105,108,101,110,97,109,101,114,2,
-    0,0,0,114,2,0,0,0,114,4,0,0,0,218,17,99,
-    97,99,104,101,95,102,114,111,109,95,115,111,117,114,99,101,
-    15,1,0,0,115,48,0,0,0,0,18,8,1,6,1,6,
-    1,8,1,4,1,8,1,12,1,10,1,12,1,16,1,8,
-    1,8,1,8,1,24,1,8,1,12,1,6,2,8,1,8,
-    1,8,1,8,1,14,1,14,1,114,81,0,0,0,99,1,
-    0,0,0,0,0,0,0,8,0,0,0,5,0,0,0,67,
-    0,0,0,115,230,0,0,0,116,0,106,1,106,2,100,1,
-    107,8,114,20,116,3,100,2,131,1,130,1,116,4,160,5,
-    124,0,161,1,125,0,116,6,124,0,131,1,92,2,125,1,
-    125,2,116,6,124,1,131,1,92,2,125,1,125,3,124,3,
-    116,7,107,3,114,78,116,8,100,3,160,9,116,7,124,0,
-    161,2,131,1,130,1,124,2,160,10,100,4,161,1,125,4,
-    124,4,100,5,107,7,114,112,116,8,100,6,160,9,124,2,
-    161,1,131,1,130,1,110,86,124,4,100,7,107,2,114,198,
-    124,2,160,11,100,4,100,8,161,2,100,9,25,0,125,5,
-    124,5,160,12,116,13,161,1,115,160,116,8,100,10,160,9,
-    116,13,161,1,131,1,130,1,124,5,116,14,116,13,131,1,
-    100,1,133,2,25,0,125,6,124,6,160,15,161,0,115,198,
-    116,8,100,11,160,9,124,5,161,1,131,1,130,1,124,2,
-    160,16,100,4,161,1,100,12,25,0,125,7,116,17,124,1,
-    124,7,116,18,100,12,25,0,23,0,131,2,83,0,41,13,
-    97,110,1,0,0,71,105,118,101,110,32,116,104,101,32,112,
-    97,116,104,32,116,111,32,97,32,46,112,121,99,46,32,102,
-    105,108,101,44,32,114,101,116,117,114,110,32,116,104,101,32,
-    112,97,116,104,32,116,111,32,105,116,115,32,46,112,121,32,
-    102,105,108,101,46,10,10,32,32,32,32,84,104,101,32,46,
-    112,121,99,32,102,105,108,101,32,100,111,101,115,32,110,111,
-    116,32,110,101,101,100,32,116,111,32,101,120,105,115,116,59,
-    32,116,104,105,115,32,115,105,109,112,108,121,32,114,101,116,
-    117,114,110,115,32,116,104,101,32,112,97,116,104,32,116,111,
-    10,32,32,32,32,116,104,101,32,46,112,121,32,102,105,108,
-    101,32,99,97,108,99,117,108,97,116,101,100,32,116,111,32,
-    99,111,114,114,101,115,112,111,110,100,32,116,111,32,116,104,
-    101,32,46,112,121,99,32,102,105,108,101,46,32,32,73,102,
-    32,112,97,116,104,32,100,111,101,115,10,32,32,32,32,110,
-    111,116,32,99,111,110,102,111,114,109,32,116,111,32,80,69,
-    80,32,51,49,52,55,47,52,56,56,32,102,111,114,109,97,
-    116,44,32,86,97,108,117,101,69,114,114,111,114,32,119,105,
-    108,108,32,98,101,32,114,97,105,115,101,100,46,32,73,102,
-    10,32,32,32,32,115,121,115,46,105,109,112,108,101,109,101,
-    110,116,97,116,105,111,110,46,99,97,99,104,101,95,116,97,
-    103,32,105,115,32,78,111,110,101,32,116,104,101,110,32,78,
-    111,116,73,109,112,108,101,109,101,110,116,101,100,69,114,114,
-    111,114,32,105,115,32,114,97,105,115,101,100,46,10,10,32,
-    32,32,32,78,122,36,115,121,115,46,105,109,112,108,101,109,
-    101,110,116,97,116,105,111,110,46,99,97,99,104,101,95,116,
-    97,103,32,105,115,32,78,111,110,101,122,37,123,125,32,110,
-    111,116,32,98,111,116,116,111,109,45,108,101,118,101,108,32,
-    100,105,114,101,99,116,111,114,121,32,105,110,32,123,33,114,
-    125,114,59,0,0,0,62,2,0,0,0,114,57,0,0,0,
-    233,3,0,0,0,122,33,101,120,112,101,99,116,101,100,32,
-    111,110,108,121,32,50,32,111,114,32,51,32,100,111,116,115,
-    32,105,110,32,123,33,114,125,114,82,0,0,0,114,57,0,
-    0,0,233,254,255,255,255,122,57,111,112,116,105,109,105,122,
-    97,116,105,111,110,32,112,111,114,116,105,111,110,32,111,102,
-    32,102,105,108,101,110,97,109,101,32,100,111,101,115,32,110,
-    111,116,32,115,116,97,114,116,32,119,105,116,104,32,123,33,
-    114,125,122,52,111,112,116,105,109,105,122,97,116,105,111,110,
-    32,108,101,118,101,108,32,123,33,114,125,32,105,115,32,110,
-    111,116,32,97,110,32,97,108,112,104,97,110,117,109,101,114,
-    105,99,32,118,97,108,117,101,114,60,0,0,0,41,19,114,
-    6,0,0,0,114,66,0,0,0,114,67,0,0,0,114,68,
-    0,0,0,114,1,0,0,0,114,65,0,0,0,114,38,0,
-    0,0,114,75,0,0,0,114,73,0,0,0,114,48,0,0,
-    0,218,5,99,111,117,110,116,114,34,0,0,0,114,8,0,
-    0,0,114,74,0,0,0,114,31,0,0,0,114,72,0,0,
-    0,218,9,112,97,114,116,105,116,105,111,110,114,28,0,0,
-    0,218,15,83,79,85,82,67,69,95,83,85,70,70,73,88,
-    69,83,41,8,114,35,0,0,0,114,78,0,0,0,90,16,
-    112,121,99,97,99,104,101,95,102,105,108,101,110,97,109,101,
-    90,7,112,121,99,97,99,104,101,90,9,100,111,116,95,99,
-    111,117,110,116,114,58,0,0,0,90,9,111,112,116,95,108,
-    101,118,101,108,90,13,98,97,115,101,95,102,105,108,101,110,
-    97,109,101,114,2,0,0,0,114,2,0,0,0,114,4,0,
-    0,0,218,17,115,111,117,114,99,101,95,102,114,111,109,95,
-    99,97,99,104,101,60,1,0,0,115,46,0,0,0,0,9,
-    12,1,8,1,10,1,12,1,12,1,8,1,6,1,10,1,
-    10,1,8,1,6,1,10,1,8,1,16,1,10,1,6,1,
-    8,1,16,1,8,1,6,1,8,1,14,1,114,87,0,0,
-    0,99,1,0,0,0,0,0,0,0,5,0,0,0,9,0,
-    0,0,67,0,0,0,115,126,0,0,0,116,0,124,0,131,
-    1,100,1,107,2,114,16,100,2,83,0,124,0,160,1,100,
-    3,161,1,92,3,125,1,125,2,125,3,124,1,114,56,124,
-    3,160,2,161,0,100,4,100,5,133,2,25,0,100,6,107,
-    3,114,60,124,0,83,0,121,12,116,3,124,0,131,1,125,
-    4,87,0,110,36,4,0,116,4,116,5,102,2,107,10,114,
-    108,1,0,1,0,1,0,124,0,100,2,100,5,133,2,25,
-    0,125,4,89,0,110,2,88,0,116,6,124,4,131,1,114,
-    122,124,4,83,0,124,0,83,0,41,7,122,188,67,111,110,
-    118,101,114,116,32,97,32,98,121,116,101,99,111,100,101,32,
-    102,105,108,101,32,112,97,116,104,32,116,111,32,97,32,115,
-    111,117,114,99,101,32,112,97,116,104,32,40,105,102,32,112,
-    111,115,115,105,98,108,101,41,46,10,10,32,32,32,32,84,
-    104,105,115,32,102,117,110,99,116,105,111,110,32,101,120,105,
-    115,116,115,32,112,117,114,101,108,121,32,102,111,114,32,98,
-    97,99,107,119,97,114,100,115,45,99,111,109,112,97,116,105,
-    98,105,108,105,116,121,32,102,111,114,10,32,32,32,32,80,
-    121,73,109,112,111,114,116,95,69,120,101,99,67,111,100,101,
-    77,111,100,117,108,101,87,105,116,104,70,105,108,101,110,97,
-    109,101,115,40,41,32,105,110,32,116,104,101,32,67,32,65,
-    80,73,46,10,10,32,32,32,32,114,60,0,0,0,78,114,
-    59,0,0,0,233,253,255,255,255,233,255,255,255,255,90,2,
-    112,121,41,7,114,31,0,0,0,114,32,0,0,0,218,5,
-    108,111,119,101,114,114,87,0,0,0,114,68,0,0,0,114,
-    73,0,0,0,114,44,0,0,0,41,5,218,13,98,121,116,
-    101,99,111,100,101,95,112,97,116,104,114,80,0,0,0,114,
-    36,0,0,0,90,9,101,120,116,101,110,115,105,111,110,218,
-    11,115,111,117,114,99,101,95,112,97,116,104,114,2,0,0,
-    0,114,2,0,0,0,114,4,0,0,0,218,15,95,103,101,
-    116,95,115,111,117,114,99,101,102,105,108,101,94,1,0,0,
-    115,20,0,0,0,0,7,12,1,4,1,16,1,24,1,4,
-    1,2,1,12,1,18,1,18,1,114,93,0,0,0,99,1,
-    0,0,0,0,0,0,0,1,0,0,0,8,0,0,0,67,
-    0,0,0,115,72,0,0,0,124,0,160,0,116,1,116,2,
-    131,1,161,1,114,46,121,8,116,3,124,0,131,1,83,0,
-    4,0,116,4,107,10,114,42,1,0,1,0,1,0,89,0,
-    113,68,88,0,110,22,124,0,160,0,116,1,116,5,131,1,
-    161,1,114,64,124,0,83,0,100,0,83,0,100,0,83,0,
-    41,1,78,41,6,218,8,101,110,100,115,119,105,116,104,218,
-    5,116,117,112,108,101,114,86,0,0,0,114,81,0,0,0,
-    114,68,0,0,0,114,76,0,0,0,41,1,218,8,102,105,
-    108,101,110,97,109,101,114,2,0,0,0,114,2,0,0,0,
-    114,4,0,0,0,218,11,95,103,101,116,95,99,97,99,104,
-    101,100,113,1,0,0,115,16,0,0,0,0,1,14,1,2,
-    1,8,1,14,1,8,1,14,1,4,2,114,97,0,0,0,
-    99,1,0,0,0,0,0,0,0,2,0,0,0,8,0,0,
-    0,67,0,0,0,115,52,0,0,0,121,14,116,0,124,0,
-    131,1,106,1,125,1,87,0,110,24,4,0,116,2,107,10,
-    114,38,1,0,1,0,1,0,100,1,125,1,89,0,110,2,
-    88,0,124,1,100,2,79,0,125,1,124,1,83,0,41,3,
-    122,51,67,97,108,99,117,108,97,116,101,32,116,104,101,32,
-    109,111,100,101,32,112,101,114,109,105,115,115,105,111,110,115,
-    32,102,111,114,32,97,32,98,121,116,101,99,111,100,101,32,
-    102,105,108,101,46,105,182,1,0,0,233,128,0,0,0,41,
-    3,114,39,0,0,0,114,41,0,0,0,114,40,0,0,0,
-    41,2,114,35,0,0,0,114,42,0,0,0,114,2,0,0,
-    0,114,2,0,0,0,114,4,0,0,0,218,10,95,99,97,
-    108,99,95,109,111,100,101,125,1,0,0,115,12,0,0,0,
-    0,2,2,1,14,1,14,1,10,3,8,1,114,99,0,0,
-    0,99,1,0,0,0,0,0,0,0,3,0,0,0,8,0,
-    0,0,3,0,0,0,115,68,0,0,0,100,6,135,0,102,
-    1,100,2,100,3,132,9,125,1,121,10,116,0,106,1,125,
-    2,87,0,110,28,4,0,116,2,107,10,114,52,1,0,1,
-    0,1,0,100,4,100,5,132,0,125,2,89,0,110,2,88,
-    0,124,2,124,1,136,0,131,2,1,0,124,1,83,0,41,
-    7,122,252,68,101,99,111,114,97,116,111,114,32,116,111,32,
-    118,101,114,105,102,121,32,116,104,97,116,32,116,104,101,32,
-    109,111,100,117,108,101,32,98,101,105,110,103,32,114,101,113,
-    117,101,115,116,101,100,32,109,97,116,99,104,101,115,32,116,
-    104,101,32,111,110,101,32,116,104,101,10,32,32,32,32,108,
-    111,97,100,101,114,32,99,97,110,32,104,97,110,100,108,101,
-    46,10,10,32,32,32,32,84,104,101,32,102,105,114,115,116,
-    32,97,114,103,117,109,101,110,116,32,40,115,101,108,102,41,
-    32,109,117,115,116,32,100,101,102,105,110,101,32,95,110,97,
-    109,101,32,119,104,105,99,104,32,116,104,101,32,115,101,99,
-    111,110,100,32,97,114,103,117,109,101,110,116,32,105,115,10,
-    32,32,32,32,99,111,109,112,97,114,101,100,32,97,103,97,
-    105,110,115,116,46,32,73,102,32,116,104,101,32,99,111,109,
-    112,97,114,105,115,111,110,32,102,97,105,108,115,32,116,104,
-    101,110,32,73,109,112,111,114,116,69,114,114,111,114,32,105,
-    115,32,114,97,105,115,101,100,46,10,10,32,32,32,32,78,
-    99,2,0,0,0,0,0,0,0,4,0,0,0,4,0,0,
-    0,31,0,0,0,115,66,0,0,0,124,1,100,0,107,8,
-    114,16,124,0,106,0,125,1,110,32,124,0,106,0,124,1,
-    107,3,114,48,116,1,100,1,124,0,106,0,124,1,102,2,
-    22,0,124,1,100,2,141,2,130,1,136,0,124,0,124,1,
-    102,2,124,2,158,2,124,3,142,1,83,0,41,3,78,122,
-    30,108,111,97,100,101,114,32,102,111,114,32,37,115,32,99,
-    97,110,110,111,116,32,104,97,110,100,108,101,32,37,115,41,
-    1,218,4,110,97,109,101,41,2,114,100,0,0,0,218,11,
-    73,109,112,111,114,116,69,114,114,111,114,41,4,218,4,115,
-    101,108,102,114,100,0,0,0,218,4,97,114,103,115,90,6,
-    107,119,97,114,103,115,41,1,218,6,109,101,116,104,111,100,
-    114,2,0,0,0,114,4,0,0,0,218,19,95,99,104,101,
-    99,107,95,110,97,109,101,95,119,114,97,112,112,101,114,145,
-    1,0,0,115,12,0,0,0,0,1,8,1,8,1,10,1,
-    4,1,18,1,122,40,95,99,104,101,99,107,95,110,97,109,
-    101,46,60,108,111,99,97,108,115,62,46,95,99,104,101,99,
-    107,95,110,97,109,101,95,119,114,97,112,112,101,114,99,2,
-    0,0,0,0,0,0,0,3,0,0,0,7,0,0,0,83,
-    0,0,0,115,60,0,0,0,120,40,100,1,68,0,93,32,
-    125,2,116,0,124,1,124,2,131,2,114,6,116,1,124,0,
-    124,2,116,2,124,1,124,2,131,2,131,3,1,0,113,6,
-    87,0,124,0,106,3,160,4,124,1,106,3,161,1,1,0,
-    100,0,83,0,41,2,78,41,4,218,10,95,95,109,111,100,
-    117,108,101,95,95,218,8,95,95,110,97,109,101,95,95,218,
-    12,95,95,113,117,97,108,110,97,109,101,95,95,218,7,95,
-    95,100,111,99,95,95,41,5,218,7,104,97,115,97,116,116,
-    114,218,7,115,101,116,97,116,116,114,218,7,103,101,116,97,
-    116,116,114,218,8,95,95,100,105,99,116,95,95,218,6,117,
-    112,100,97,116,101,41,3,90,3,110,101,119,90,3,111,108,
-    100,114,53,0,0,0,114,2,0,0,0,114,2,0,0,0,
-    114,4,0,0,0,218,5,95,119,114,97,112,156,1,0,0,
-    115,8,0,0,0,0,1,10,1,10,1,22,1,122,26,95,
-    99,104,101,99,107,95,110,97,109,101,46,60,108,111,99,97,
-    108,115,62,46,95,119,114,97,112,41,1,78,41,3,218,10,
-    95,98,111,111,116,115,116,114,97,112,114,115,0,0,0,218,
-    9,78,97,109,101,69,114,114,111,114,41,3,114,104,0,0,
-    0,114,105,0,0,0,114,115,0,0,0,114,2,0,0,0,
-    41,1,114,104,0,0,0,114,4,0,0,0,218,11,95,99,
-    104,101,99,107,95,110,97,109,101,137,1,0,0,115,14,0,
-    0,0,0,8,14,7,2,1,10,1,14,2,14,5,10,1,
-    114,118,0,0,0,99,2,0,0,0,0,0,0,0,5,0,
-    0,0,6,0,0,0,67,0,0,0,115,60,0,0,0,124,
-    0,160,0,124,1,161,1,92,2,125,2,125,3,124,2,100,
-    1,107,8,114,56,116,1,124,3,131,1,114,56,100,2,125,
-    4,116,2,160,3,124,4,160,4,124,3,100,3,25,0,161,
-    1,116,5,161,2,1,0,124,2,83,0,41,4,122,155,84,
-    114,121,32,116,111,32,102,105,110,100,32,97,32,108,111,97,
-    100,101,114,32,102,111,114,32,116,104,101,32,115,112,101,99,
-    105,102,105,101,100,32,109,111,100,117,108,101,32,98,121,32,
-    100,101,108,101,103,97,116,105,110,103,32,116,111,10,32,32,
-    32,32,115,101,108,102,46,102,105,110,100,95,108,111,97,100,
-    101,114,40,41,46,10,10,32,32,32,32,84,104,105,115,32,
-    109,101,116,104,111,100,32,105,115,32,100,101,112,114,101,99,
-    97,116,101,100,32,105,110,32,102,97,118,111,114,32,111,102,
-    32,102,105,110,100,101,114,46,102,105,110,100,95,115,112,101,
-    99,40,41,46,10,10,32,32,32,32,78,122,44,78,111,116,
-    32,105,109,112,111,114,116,105,110,103,32,100,105,114,101,99,
-    116,111,114,121,32,123,125,58,32,109,105,115,115,105,110,103,
-    32,95,95,105,110,105,116,95,95,114,60,0,0,0,41,6,
-    218,11,102,105,110,100,95,108,111,97,100,101,114,114,31,0,
-    0,0,114,61,0,0,0,114,62,0,0,0,114,48,0,0,
-    0,218,13,73,109,112,111,114,116,87,97,114,110,105,110,103,
-    41,5,114,102,0,0,0,218,8,102,117,108,108,110,97,109,
-    101,218,6,108,111,97,100,101,114,218,8,112,111,114,116,105,
-    111,110,115,218,3,109,115,103,114,2,0,0,0,114,2,0,
-    0,0,114,4,0,0,0,218,17,95,102,105,110,100,95,109,
-    111,100,117,108,101,95,115,104,105,109,165,1,0,0,115,10,
-    0,0,0,0,10,14,1,16,1,4,1,22,1,114,125,0,
-    0,0,99,3,0,0,0,0,0,0,0,6,0,0,0,4,
-    0,0,0,67,0,0,0,115,158,0,0,0,124,0,100,1,
-    100,2,133,2,25,0,125,3,124,3,116,0,107,3,114,60,
-    100,3,124,1,155,2,100,4,124,3,155,2,157,4,125,4,
-    116,1,160,2,100,5,124,4,161,2,1,0,116,3,124,4,
-    102,1,124,2,142,1,130,1,116,4,124,0,131,1,100,6,
-    107,0,114,102,100,7,124,1,155,2,157,2,125,4,116,1,
-    160,2,100,5,124,4,161,2,1,0,116,5,124,4,131,1,
-    130,1,116,6,124,0,100,2,100,8,133,2,25,0,131,1,
-    125,5,124,5,100,9,64,0,114,154,100,10,124,5,155,2,
-    100,11,124,1,155,2,157,4,125,4,116,3,124,4,102,1,
-    124,2,142,1,130,1,124,5,83,0,41,12,97,84,2,0,
-    0,80,101,114,102,111,114,109,32,98,97,115,105,99,32,118,
-    97,108,105,100,105,116,121,32,99,104,101,99,107,105,110,103,
-    32,111,102,32,97,32,112,121,99,32,104,101,97,100,101,114,
-    32,97,110,100,32,114,101,116,117,114,110,32,116,104,101,32,
-    102,108,97,103,115,32,102,105,101,108,100,44,10,32,32,32,
-    32,119,104,105,99,104,32,100,101,116,101,114,109,105,110,101,
-    115,32,104,111,119,32,116,104,101,32,112,121,99,32,115,104,
-    111,117,108,100,32,98,101,32,102,117,114,116,104,101,114,32,
-    118,97,108,105,100,97,116,101,100,32,97,103,97,105,110,115,
-    116,32,116,104,101,32,115,111,117,114,99,101,46,10,10,32,
-    32,32,32,42,100,97,116,97,42,32,105,115,32,116,104,101,
-    32,99,111,110,116,101,110,116,115,32,111,102,32,116,104,101,
-    32,112,121,99,32,102,105,108,101,46,32,40,79,110,108,121,
-    32,116,104,101,32,102,105,114,115,116,32,49,54,32,98,121,
-    116,101,115,32,97,114,101,10,32,32,32,32,114,101,113,117,
-    105,114,101,100,44,32,116,104,111,117,103,104,46,41,10,10,
+    78,111,110,101,32,116,104,101,110,32,78,111,116,73,109,112,
+    108,101,109,101,110,116,101,100,69,114,114,111,114,32,105,115,
+    32,114,97,105,115,101,100,46,10,10,32,32,32,32,78,122,
+    70,116,104,101,32,100,101,98,117,103,95,111,118,101,114,114,
+    105,100,101,32,112,97,114,97,109,101,116,101,114,32,105,115,
+    32,100,101,112,114,101,99,97,116,101,100,59,32,117,115,101,
+    32,39,111,112,116,105,109,105,122,97,116,105,111,110,39,32,
+    105,110,115,116,101,97,100,122,50,100,101,98,117,103,95,111,
+    118,101,114,114,105,100,101,32,111,114,32,111,112,116,105,109,
+    105,122,97,116,105,111,110,32,109,117,115,116,32,98,101,32,
+    115,101,116,32,116,111,32,78,111,110,101,114,31,0,0,0,
+    114,30,0,0,0,218,1,46,122,36,115,121,115,46,105,109,
+    112,108,101,109,101,110,116,97,116,105,111,110,46,99,97,99,
+    104,101,95,116,97,103,32,105,115,32,78,111,110,101,233,0,
+    0,0,0,122,24,123,33,114,125,32,105,115,32,110,111,116,
+    32,97,108,112,104,97,110,117,109,101,114,105,99,122,7,123,
+    125,46,123,125,123,125,41,23,218,9,95,119,97,114,110,105,
+    110,103,115,218,4,119,97,114,110,218,18,68,101,112,114,101,
+    99,97,116,105,111,110,87,97,114,110,105,110,103,218,9,84,
+    121,112,101,69,114,114,111,114,114,1,0,0,0,218,6,102,
+    115,112,97,116,104,114,39,0,0,0,114,33,0,0,0,114,
+    7,0,0,0,218,14,105,109,112,108,101,109,101,110,116,97,
+    116,105,111,110,218,9,99,97,99,104,101,95,116,97,103,218,
+    19,78,111,116,73,109,112,108,101,109,101,110,116,101,100,69,
+    114,114,111,114,114,27,0,0,0,218,5,102,108,97,103,115,
+    218,8,111,112,116,105,109,105,122,101,218,3,115,116,114,218,
+    7,105,115,97,108,110,117,109,218,10,86,97,108,117,101,69,
+    114,114,111,114,114,49,0,0,0,218,4,95,79,80,84,114,
+    29,0,0,0,218,8,95,80,89,67,65,67,72,69,218,17,
+    66,89,84,69,67,79,68,69,95,83,85,70,70,73,88,69,
+    83,41,11,114,36,0,0,0,90,14,100,101,98,117,103,95,
+    111,118,101,114,114,105,100,101,114,59,0,0,0,218,7,109,
+    101,115,115,97,103,101,218,4,104,101,97,100,114,38,0,0,
+    0,90,4,98,97,115,101,218,3,115,101,112,218,4,114,101,
+    115,116,218,3,116,97,103,90,15,97,108,109,111,115,116,95,
+    102,105,108,101,110,97,109,101,114,3,0,0,0,114,3,0,
+    0,0,114,5,0,0,0,218,17,99,97,99,104,101,95,102,
+    114,111,109,95,115,111,117,114,99,101,15,1,0,0,115,48,
+    0,0,0,0,18,8,1,6,1,6,1,8,1,4,1,8,
+    1,12,1,10,1,12,1,16,1,8,1,8,1,8,1,24,
+    1,8,1,12,1,6,2,8,1,8,1,8,1,8,1,14,
+    1,14,1,114,83,0,0,0,99,1,0,0,0,0,0,0,
+    0,8,0,0,0,5,0,0,0,67,0,0,0,115,230,0,
+    0,0,116,0,106,1,106,2,100,1,107,8,114,20,116,3,
+    100,2,131,1,130,1,116,4,160,5,124,0,161,1,125,0,
+    116,6,124,0,131,1,92,2,125,1,125,2,116,6,124,1,
+    131,1,92,2,125,1,125,3,124,3,116,7,107,3,114,78,
+    116,8,100,3,160,9,116,7,124,0,161,2,131,1,130,1,
+    124,2,160,10,100,4,161,1,125,4,124,4,100,5,107,7,
+    114,112,116,8,100,6,160,9,124,2,161,1,131,1,130,1,
+    110,86,124,4,100,7,107,2,114,198,124,2,160,11,100,4,
+    100,8,161,2,100,9,25,0,125,5,124,5,160,12,116,13,
+    161,1,115,160,116,8,100,10,160,9,116,13,161,1,131,1,
+    130,1,124,5,116,14,116,13,131,1,100,1,133,2,25,0,
+    125,6,124,6,160,15,161,0,115,198,116,8,100,11,160,9,
+    124,5,161,1,131,1,130,1,124,2,160,16,100,4,161,1,
+    100,12,25,0,125,7,116,17,124,1,124,7,116,18,100,12,
+    25,0,23,0,131,2,83,0,41,13,97,110,1,0,0,71,
+    105,118,101,110,32,116,104,101,32,112,97,116,104,32,116,111,
+    32,97,32,46,112,121,99,46,32,102,105,108,101,44,32,114,
+    101,116,117,114,110,32,116,104,101,32,112,97,116,104,32,116,
+    111,32,105,116,115,32,46,112,121,32,102,105,108,101,46,10,
+    10,32,32,32,32,84,104,101,32,46,112,121,99,32,102,105,
+    108,101,32,100,111,101,115,32,110,111,116,32,110,101,101,100,
+    32,116,111,32,101,120,105,115,116,59,32,116,104,105,115,32,
+    115,105,109,112,108,121,32,114,101,116,117,114,110,115,32,116,
+    104,101,32,112,97,116,104,32,116,111,10,32,32,32,32,116,
+    104,101,32,46,112,121,32,102,105,108,101,32,99,97,108,99,
+    117,108,97,116,101,100,32,116,111,32,99,111,114,114,101,115,
+    112,111,110,100,32,116,111,32,116,104,101,32,46,112,121,99,
+    32,102,105,108,101,46,32,32,73,102,32,112,97,116,104,32,
+    100,111,101,115,10,32,32,32,32,110,111,116,32,99,111,110,
+    102,111,114,109,32,116,111,32,80,69,80,32,51,49,52,55,
+    47,52,56,56,32,102,111,114,109,97,116,44,32,86,97,108,
+    117,101,69,114,114,111,114,32,119,105,108,108,32,98,101,32,
+    114,97,105,115,101,100,46,32,73,102,10,32,32,32,32,115,
+    121,115,46,105,109,112,108,101,109,101,110,116,97,116,105,111,
+    110,46,99,97,99,104,101,95,116,97,103,32,105,115,32,78,
+    111,110,101,32,116,104,101,110,32,78,111,116,73,109,112,108,
+    101,109,101,110,116,101,100,69,114,114,111,114,32,105,115,32,
+    114,97,105,115,101,100,46,10,10,32,32,32,32,78,122,36,
+    115,121,115,46,105,109,112,108,101,109,101,110,116,97,116,105,
+    111,110,46,99,97,99,104,101,95,116,97,103,32,105,115,32,
+    78,111,110,101,122,37,123,125,32,110,111,116,32,98,111,116,
+    116,111,109,45,108,101,118,101,108,32,100,105,114,101,99,116,
+    111,114,121,32,105,110,32,123,33,114,125,114,60,0,0,0,
+    62,2,0,0,0,114,58,0,0,0,233,3,0,0,0,122,
+    33,101,120,112,101,99,116,101,100,32,111,110,108,121,32,50,
+    32,111,114,32,51,32,100,111,116,115,32,105,110,32,123,33,
+    114,125,114,84,0,0,0,114,58,0,0,0,233,254,255,255,
+    255,122,57,111,112,116,105,109,105,122,97,116,105,111,110,32,
+    112,111,114,116,105,111,110,32,111,102,32,102,105,108,101,110,
+    97,109,101,32,100,111,101,115,32,110,111,116,32,115,116,97,
+    114,116,32,119,105,116,104,32,123,33,114,125,122,52,111,112,
+    116,105,109,105,122,97,116,105,111,110,32,108,101,118,101,108,
+    32,123,33,114,125,32,105,115,32,110,111,116,32,97,110,32,
+    97,108,112,104,97,110,117,109,101,114,105,99,32,118,97,108,
+    117,101,114,61,0,0,0,41,19,114,7,0,0,0,114,67,
+    0,0,0,114,68,0,0,0,114,69,0,0,0,114,1,0,
+    0,0,114,66,0,0,0,114,39,0,0,0,114,76,0,0,
+    0,114,74,0,0,0,114,49,0,0,0,218,5,99,111,117,
+    110,116,114,35,0,0,0,114,9,0,0,0,114,75,0,0,
+    0,114,32,0,0,0,114,73,0,0,0,218,9,112,97,114,
+    116,105,116,105,111,110,114,29,0,0,0,218,15,83,79,85,
+    82,67,69,95,83,85,70,70,73,88,69,83,41,8,114,36,
+    0,0,0,114,79,0,0,0,90,16,112,121,99,97,99,104,
+    101,95,102,105,108,101,110,97,109,101,90,7,112,121,99,97,
+    99,104,101,90,9,100,111,116,95,99,111,117,110,116,114,59,
+    0,0,0,90,9,111,112,116,95,108,101,118,101,108,90,13,
+    98,97,115,101,95,102,105,108,101,110,97,109,101,114,3,0,
+    0,0,114,3,0,0,0,114,5,0,0,0,218,17,115,111,
+    117,114,99,101,95,102,114,111,109,95,99,97,99,104,101,60,
+    1,0,0,115,46,0,0,0,0,9,12,1,8,1,10,1,
+    12,1,12,1,8,1,6,1,10,1,10,1,8,1,6,1,
+    10,1,8,1,16,1,10,1,6,1,8,1,16,1,8,1,
+    6,1,8,1,14,1,114,89,0,0,0,99,1,0,0,0,
+    0,0,0,0,5,0,0,0,9,0,0,0,67,0,0,0,
+    115,126,0,0,0,116,0,124,0,131,1,100,1,107,2,114,
+    16,100,2,83,0,124,0,160,1,100,3,161,1,92,3,125,
+    1,125,2,125,3,124,1,114,56,124,3,160,2,161,0,100,
+    4,100,5,133,2,25,0,100,6,107,3,114,60,124,0,83,
+    0,121,12,116,3,124,0,131,1,125,4,87,0,110,36,4,
+    0,116,4,116,5,102,2,107,10,114,108,1,0,1,0,1,
+    0,124,0,100,2,100,5,133,2,25,0,125,4,89,0,110,
+    2,88,0,116,6,124,4,131,1,114,122,124,4,83,0,124,
+    0,83,0,41,7,122,188,67,111,110,118,101,114,116,32,97,
+    32,98,121,116,101,99,111,100,101,32,102,105,108,101,32,112,
+    97,116,104,32,116,111,32,97,32,115,111,117,114,99,101,32,
+    112,97,116,104,32,40,105,102,32,112,111,115,115,105,98,108,
+    101,41,46,10,10,32,32,32,32,84,104,105,115,32,102,117,
+    110,99,116,105,111,110,32,101,120,105,115,116,115,32,112,117,
+    114,101,108,121,32,102,111,114,32,98,97,99,107,119,97,114,
+    100,115,45,99,111,109,112,97,116,105,98,105,108,105,116,121,
+    32,102,111,114,10,32,32,32,32,80,121,73,109,112,111,114,
+    116,95,69,120,101,99,67,111,100,101,77,111,100,117,108,101,
+    87,105,116,104,70,105,108,101,110,97,109,101,115,40,41,32,
+    105,110,32,116,104,101,32,67,32,65,80,73,46,10,10,32,
+    32,32,32,114,61,0,0,0,78,114,60,0,0,0,233,253,
+    255,255,255,233,255,255,255,255,90,2,112,121,41,7,114,32,
+    0,0,0,114,33,0,0,0,218,5,108,111,119,101,114,114,
+    89,0,0,0,114,69,0,0,0,114,74,0,0,0,114,45,
+    0,0,0,41,5,218,13,98,121,116,101,99,111,100,101,95,
+    112,97,116,104,114,81,0,0,0,114,37,0,0,0,90,9,
+    101,120,116,101,110,115,105,111,110,218,11,115,111,117,114,99,
+    101,95,112,97,116,104,114,3,0,0,0,114,3,0,0,0,
+    114,5,0,0,0,218,15,95,103,101,116,95,115,111,117,114,
+    99,101,102,105,108,101,94,1,0,0,115,20,0,0,0,0,
+    7,12,1,4,1,16,1,24,1,4,1,2,1,12,1,18,
+    1,18,1,114,95,0,0,0,99,1,0,0,0,0,0,0,
+    0,1,0,0,0,8,0,0,0,67,0,0,0,115,72,0,
+    0,0,124,0,160,0,116,1,116,2,131,1,161,1,114,46,
+    121,8,116,3,124,0,131,1,83,0,4,0,116,4,107,10,
+    114,42,1,0,1,0,1,0,89,0,113,68,88,0,110,22,
+    124,0,160,0,116,1,116,5,131,1,161,1,114,64,124,0,
+    83,0,100,0,83,0,100,0,83,0,41,1,78,41,6,218,
+    8,101,110,100,115,119,105,116,104,218,5,116,117,112,108,101,
+    114,88,0,0,0,114,83,0,0,0,114,69,0,0,0,114,
+    77,0,0,0,41,1,218,8,102,105,108,101,110,97,109,101,
+    114,3,0,0,0,114,3,0,0,0,114,5,0,0,0,218,
+    11,95,103,101,116,95,99,97,99,104,101,100,113,1,0,0,
+    115,16,0,0,0,0,1,14,1,2,1,8,1,14,1,8,
+    1,14,1,4,2,114,99,0,0,0,99,1,0,0,0,0,
+    0,0,0,2,0,0,0,8,0,0,0,67,0,0,0,115,
+    52,0,0,0,121,14,116,0,124,0,131,1,106,1,125,1,
+    87,0,110,24,4,0,116,2,107,10,114,38,1,0,1,0,
+    1,0,100,1,125,1,89,0,110,2,88,0,124,1,100,2,
+    79,0,125,1,124,1,83,0,41,3,122,51,67,97,108,99,
+    117,108,97,116,101,32,116,104,101,32,109,111,100,101,32,112,
+    101,114,109,105,115,115,105,111,110,115,32,102,111,114,32,97,
+    32,98,121,116,101,99,111,100,101,32,102,105,108,101,46,105,
+    182,1,0,0,233,128,0,0,0,41,3,114,40,0,0,0,
+    114,42,0,0,0,114,41,0,0,0,41,2,114,36,0,0,
+    0,114,43,0,0,0,114,3,0,0,0,114,3,0,0,0,
+    114,5,0,0,0,218,10,95,99,97,108,99,95,109,111,100,
+    101,125,1,0,0,115,12,0,0,0,0,2,2,1,14,1,
+    14,1,10,3,8,1,114,101,0,0,0,99,1,0,0,0,
+    0,0,0,0,3,0,0,0,8,0,0,0,3,0,0,0,
+    115,68,0,0,0,100,6,135,0,102,1,100,2,100,3,132,
+    9,125,1,121,10,116,0,106,1,125,2,87,0,110,28,4,
+    0,116,2,107,10,114,52,1,0,1,0,1,0,100,4,100,
+    5,132,0,125,2,89,0,110,2,88,0,124,2,124,1,136,
+    0,131,2,1,0,124,1,83,0,41,7,122,252,68,101,99,
+    111,114,97,116,111,114,32,116,111,32,118,101,114,105,102,121,
+    32,116,104,97,116,32,116,104,101,32,109,111,100,117,108,101,
+    32,98,101,105,110,103,32,114,101,113,117,101,115,116,101,100,
+    32,109,97,116,99,104,101,115,32,116,104,101,32,111,110,101,
+    32,116,104,101,10,32,32,32,32,108,111,97,100,101,114,32,
+    99,97,110,32,104,97,110,100,108,101,46,10,10,32,32,32,
+    32,84,104,101,32,102,105,114,115,116,32,97,114,103,117,109,
+    101,110,116,32,40,115,101,108,102,41,32,109,117,115,116,32,
+    100,101,102,105,110,101,32,95,110,97,109,101,32,119,104,105,
+    99,104,32,116,104,101,32,115,101,99,111,110,100,32,97,114,
+    103,117,109,101,110,116,32,105,115,10,32,32,32,32,99,111,
+    109,112,97,114,101,100,32,97,103,97,105,110,115,116,46,32,
+    73,102,32,116,104,101,32,99,111,109,112,97,114,105,115,111,
+    110,32,102,97,105,108,115,32,116,104,101,110,32,73,109,112,
+    111,114,116,69,114,114,111,114,32,105,115,32,114,97,105,115,
+    101,100,46,10,10,32,32,32,32,78,99,2,0,0,0,0,
+    0,0,0,4,0,0,0,4,0,0,0,31,0,0,0,115,
+    66,0,0,0,124,1,100,0,107,8,114,16,124,0,106,0,
+    125,1,110,32,124,0,106,0,124,1,107,3,114,48,116,1,
+    100,1,124,0,106,0,124,1,102,2,22,0,124,1,100,2,
+    141,2,130,1,136,0,124,0,124,1,102,2,124,2,158,2,
+    124,3,142,1,83,0,41,3,78,122,30,108,111,97,100,101,
+    114,32,102,111,114,32,37,115,32,99,97,110,110,111,116,32,
+    104,97,110,100,108,101,32,37,115,41,1,218,4,110,97,109,
+    101,41,2,114,102,0,0,0,218,11,73,109,112,111,114,116,
+    69,114,114,111,114,41,4,218,4,115,101,108,102,114,102,0,
+    0,0,218,4,97,114,103,115,90,6,107,119,97,114,103,115,
+    41,1,218,6,109,101,116,104,111,100,114,3,0,0,0,114,
+    5,0,0,0,218,19,95,99,104,101,99,107,95,110,97,109,
+    101,95,119,114,97,112,112,101,114,145,1,0,0,115,12,0,
+    0,0,0,1,8,1,8,1,10,1,4,1,18,1,122,40,
+    95,99,104,101,99,107,95,110,97,109,101,46,60,108,111,99,
+    97,108,115,62,46,95,99,104,101,99,107,95,110,97,109,101,
+    95,119,114,97,112,112,101,114,99,2,0,0,0,0,0,0,
+    0,3,0,0,0,7,0,0,0,83,0,0,0,115,60,0,
+    0,0,120,40,100,1,68,0,93,32,125,2,116,0,124,1,
+    124,2,131,2,114,6,116,1,124,0,124,2,116,2,124,1,
+    124,2,131,2,131,3,1,0,113,6,87,0,124,0,106,3,
+    160,4,124,1,106,3,161,1,1,0,100,0,83,0,41,2,
+    78,41,4,218,10,95,95,109,111,100,117,108,101,95,95,218,
+    8,95,95,110,97,109,101,95,95,218,12,95,95,113,117,97,
+    108,110,97,109,101,95,95,218,7,95,95,100,111,99,95,95,
+    41,5,218,7,104,97,115,97,116,116,114,218,7,115,101,116,
+    97,116,116,114,218,7,103,101,116,97,116,116,114,218,8,95,
+    95,100,105,99,116,95,95,218,6,117,112,100,97,116,101,41,
+    3,90,3,110,101,119,90,3,111,108,100,114,54,0,0,0,
+    114,3,0,0,0,114,3,0,0,0,114,5,0,0,0,218,
+    5,95,119,114,97,112,156,1,0,0,115,8,0,0,0,0,
+    1,10,1,10,1,22,1,122,26,95,99,104,101,99,107,95,
+    110,97,109,101,46,60,108,111,99,97,108,115,62,46,95,119,
+    114,97,112,41,1,78,41,3,218,10,95,98,111,111,116,115,
+    116,114,97,112,114,117,0,0,0,218,9,78,97,109,101,69,
+    114,114,111,114,41,3,114,106,0,0,0,114,107,0,0,0,
+    114,117,0,0,0,114,3,0,0,0,41,1,114,106,0,0,
+    0,114,5,0,0,0,218,11,95,99,104,101,99,107,95,110,
+    97,109,101,137,1,0,0,115,14,0,0,0,0,8,14,7,
+    2,1,10,1,14,2,14,5,10,1,114,120,0,0,0,99,
+    2,0,0,0,0,0,0,0,5,0,0,0,6,0,0,0,
+    67,0,0,0,115,60,0,0,0,124,0,160,0,124,1,161,
+    1,92,2,125,2,125,3,124,2,100,1,107,8,114,56,116,
+    1,124,3,131,1,114,56,100,2,125,4,116,2,160,3,124,
+    4,160,4,124,3,100,3,25,0,161,1,116,5,161,2,1,
+    0,124,2,83,0,41,4,122,155,84,114,121,32,116,111,32,
+    102,105,110,100,32,97,32,108,111,97,100,101,114,32,102,111,
+    114,32,116,104,101,32,115,112,101,99,105,102,105,101,100,32,
+    109,111,100,117,108,101,32,98,121,32,100,101,108,101,103,97,
+    116,105,110,103,32,116,111,10,32,32,32,32,115,101,108,102,
+    46,102,105,110,100,95,108,111,97,100,101,114,40,41,46,10,
+    10,32,32,32,32,84,104,105,115,32,109,101,116,104,111,100,
+    32,105,115,32,100,101,112,114,101,99,97,116,101,100,32,105,
+    110,32,102,97,118,111,114,32,111,102,32,102,105,110,100,101,
+    114,46,102,105,110,100,95,115,112,101,99,40,41,46,10,10,
+    32,32,32,32,78,122,44,78,111,116,32,105,109,112,111,114,
+    116,105,110,103,32,100,105,114,101,99,116,111,114,121,32,123,
+    125,58,32,109,105,115,115,105,110,103,32,95,95,105,110,105,
+    116,95,95,114,61,0,0,0,41,6,218,11,102,105,110,100,
+    95,108,111,97,100,101,114,114,32,0,0,0,114,62,0,0,
+    0,114,63,0,0,0,114,49,0,0,0,218,13,73,109,112,
+    111,114,116,87,97,114,110,105,110,103,41,5,114,104,0,0,
+    0,218,8,102,117,108,108,110,97,109,101,218,6,108,111,97,
+    100,101,114,218,8,112,111,114,116,105,111,110,115,218,3,109,
+    115,103,114,3,0,0,0,114,3,0,0,0,114,5,0,0,
+    0,218,17,95,102,105,110,100,95,109,111,100,117,108,101,95,
+    115,104,105,109,165,1,0,0,115,10,0,0,0,0,10,14,
+    1,16,1,4,1,22,1,114,127,0,0,0,99,3,0,0,
+    0,0,0,0,0,6,0,0,0,4,0,0,0,67,0,0,
+    0,115,158,0,0,0,124,0,100,1,100,2,133,2,25,0,
+    125,3,124,3,116,0,107,3,114,60,100,3,124,1,155,2,
+    100,4,124,3,155,2,157,4,125,4,116,1,160,2,100,5,
+    124,4,161,2,1,0,116,3,124,4,102,1,124,2,142,1,
+    130,1,116,4,124,0,131,1,100,6,107,0,114,102,100,7,
+    124,1,155,2,157,2,125,4,116,1,160,2,100,5,124,4,
+    161,2,1,0,116,5,124,4,131,1,130,1,116,6,124,0,
+    100,2,100,8,133,2,25,0,131,1,125,5,124,5,100,9,
+    64,0,114,154,100,10,124,5,155,2,100,11,124,1,155,2,
+    157,4,125,4,116,3,124,4,102,1,124,2,142,1,130,1,
+    124,5,83,0,41,12,97,84,2,0,0,80,101,114,102,111,
+    114,109,32,98,97,115,105,99,32,118,97,108,105,100,105,116,
+    121,32,99,104,101,99,107,105,110,103,32,111,102,32,97,32,
+    112,121,99,32,104,101,97,100,101,114,32,97,110,100,32,114,
+    101,116,117,114,110,32,116,104,101,32,102,108,97,103,115,32,
+    102,105,101,108,100,44,10,32,32,32,32,119,104,105,99,104,
+    32,100,101,116,101,114,109,105,110,101,115,32,104,111,119,32,
+    116,104,101,32,112,121,99,32,115,104,111,117,108,100,32,98,
+    101,32,102,117,114,116,104,101,114,32,118,97,108,105,100,97,
+    116,101,100,32,97,103,97,105,110,115,116,32,116,104,101,32,
+    115,111,117,114,99,101,46,10,10,32,32,32,32,42,100,97,
+    116,97,42,32,105,115,32,116,104,101,32,99,111,110,116,101,
+    110,116,115,32,111,102,32,116,104,101,32,112,121,99,32,102,
+    105,108,101,46,32,40,79,110,108,121,32,116,104,101,32,102,
+    105,114,115,116,32,49,54,32,98,121,116,101,115,32,97,114,
+    101,10,32,32,32,32,114,101,113,117,105,114,101,100,44,32,
+    116,104,111,117,103,104,46,41,10,10,32,32,32,32,42,110,
+    97,109,101,42,32,105,115,32,116,104,101,32,110,97,109,101,
+    32,111,102,32,116,104,101,32,109,111,100,117,108,101,32,98,
+    101,105,110,103,32,105,109,112,111,114,116,101,100,46,32,73,
+    116,32,105,115,32,117,115,101,100,32,102,111,114,32,108,111,
+    103,103,105,110,103,46,10,10,32,32,32,32,42,101,120,99,
+    95,100,101,116,97,105,108,115,42,32,105,115,32,97,32,100,
+    105,99,116,105,111,110,97,114,121,32,112,97,115,115,101,100,
+    32,116,111,32,73,109,112,111,114,116,69,114,114,111,114,32,
+    105,102,32,105,116,32,114,97,105,115,101,100,32,102,111,114,
+    10,32,32,32,32,105,109,112,114,111,118,101,100,32,100,101,
+    98,117,103,103,105,110,103,46,10,10,32,32,32,32,73,109,
+    112,111,114,116,69,114,114,111,114,32,105,115,32,114,97,105,
+    115,101,100,32,119,104,101,110,32,116,104,101,32,109,97,103,
+    105,99,32,110,117,109,98,101,114,32,105,115,32,105,110,99,
+    111,114,114,101,99,116,32,111,114,32,119,104,101,110,32,116,
+    104,101,32,102,108,97,103,115,10,32,32,32,32,102,105,101,
+    108,100,32,105,115,32,105,110,118,97,108,105,100,46,32,69,
+    79,70,69,114,114,111,114,32,105,115,32,114,97,105,115,101,
+    100,32,119,104,101,110,32,116,104,101,32,100,97,116,97,32,
+    105,115,32,102,111,117,110,100,32,116,111,32,98,101,32,116,
+    114,117,110,99,97,116,101,100,46,10,10,32,32,32,32,78,
+    114,13,0,0,0,122,20,98,97,100,32,109,97,103,105,99,
+    32,110,117,109,98,101,114,32,105,110,32,122,2,58,32,122,
+    2,123,125,233,16,0,0,0,122,40,114,101,97,99,104,101,
+    100,32,69,79,70,32,119,104,105,108,101,32,114,101,97,100,
+    105,110,103,32,112,121,99,32,104,101,97,100,101,114,32,111,
+    102,32,233,8,0,0,0,233,252,255,255,255,122,14,105,110,
+    118,97,108,105,100,32,102,108,97,103,115,32,122,4,32,105,
+    110,32,41,7,218,12,77,65,71,73,67,95,78,85,77,66,
+    69,82,114,118,0,0,0,218,16,95,118,101,114,98,111,115,
+    101,95,109,101,115,115,97,103,101,114,103,0,0,0,114,32,
+    0,0,0,218,8,69,79,70,69,114,114,111,114,114,20,0,
+    0,0,41,6,114,55,0,0,0,114,102,0,0,0,218,11,
+    101,120,99,95,100,101,116,97,105,108,115,90,5,109,97,103,
+    105,99,114,78,0,0,0,114,70,0,0,0,114,3,0,0,
+    0,114,3,0,0,0,114,5,0,0,0,218,13,95,99,108,
+    97,115,115,105,102,121,95,112,121,99,182,1,0,0,115,28,
+    0,0,0,0,16,12,1,8,1,16,1,12,1,12,1,12,
+    1,10,1,12,1,8,1,16,2,8,1,16,1,12,1,114,
+    135,0,0,0,99,5,0,0,0,0,0,0,0,6,0,0,
+    0,4,0,0,0,67,0,0,0,115,112,0,0,0,116,0,
+    124,0,100,1,100,2,133,2,25,0,131,1,124,1,100,3,
+    64,0,107,3,114,58,100,4,124,3,155,2,157,2,125,5,
+    116,1,160,2,100,5,124,5,161,2,1,0,116,3,124,5,
+    102,1,124,4,142,1,130,1,124,2,100,6,107,9,114,108,
+    116,0,124,0,100,2,100,7,133,2,25,0,131,1,124,2,
+    100,3,64,0,107,3,114,108,116,3,100,4,124,3,155,2,
+    157,2,102,1,124,4,142,1,130,1,100,6,83,0,41,8,
+    97,7,2,0,0,86,97,108,105,100,97,116,101,32,97,32,
+    112,121,99,32,97,103,97,105,110,115,116,32,116,104,101,32,
+    115,111,117,114,99,101,32,108,97,115,116,45,109,111,100,105,
+    102,105,101,100,32,116,105,109,101,46,10,10,32,32,32,32,
+    42,100,97,116,97,42,32,105,115,32,116,104,101,32,99,111,
+    110,116,101,110,116,115,32,111,102,32,116,104,101,32,112,121,
+    99,32,102,105,108,101,46,32,40,79,110,108,121,32,116,104,
+    101,32,102,105,114,115,116,32,49,54,32,98,121,116,101,115,
+    32,97,114,101,10,32,32,32,32,114,101,113,117,105,114,101,
+    100,46,41,10,10,32,32,32,32,42,115,111,117,114,99,101,
+    95,109,116,105,109,101,42,32,105,115,32,116,104,101,32,108,
+    97,115,116,32,109,111,100,105,102,105,101,100,32,116,105,109,
+    101,115,116,97,109,112,32,111,102,32,116,104,101,32,115,111,
+    117,114,99,101,32,102,105,108,101,46,10,10,32,32,32,32,
+    42,115,111,117,114,99,101,95,115,105,122,101,42,32,105,115,
+    32,78,111,110,101,32,111,114,32,116,104,101,32,115,105,122,
+    101,32,111,102,32,116,104,101,32,115,111,117,114,99,101,32,
+    102,105,108,101,32,105,110,32,98,121,116,101,115,46,10,10,
     32,32,32,32,42,110,97,109,101,42,32,105,115,32,116,104,
     101,32,110,97,109,101,32,111,102,32,116,104,101,32,109,111,
     100,117,108,101,32,98,101,105,110,103,32,105,109,112,111,114,
@@ -616,1999 +689,2375 @@ const unsigned char _Py_M__importlib_external[] = {
     69,114,114,111,114,32,105,102,32,105,116,32,114,97,105,115,
     101,100,32,102,111,114,10,32,32,32,32,105,109,112,114,111,
     118,101,100,32,100,101,98,117,103,103,105,110,103,46,10,10,
-    32,32,32,32,73,109,112,111,114,116,69,114,114,111,114,32,
-    105,115,32,114,97,105,115,101,100,32,119,104,101,110,32,116,
-    104,101,32,109,97,103,105,99,32,110,117,109,98,101,114,32,
-    105,115,32,105,110,99,111,114,114,101,99,116,32,111,114,32,
-    119,104,101,110,32,116,104,101,32,102,108,97,103,115,10,32,
-    32,32,32,102,105,101,108,100,32,105,115,32,105,110,118,97,
-    108,105,100,46,32,69,79,70,69,114,114,111,114,32,105,115,
-    32,114,97,105,115,101,100,32,119,104,101,110,32,116,104,101,
-    32,100,97,116,97,32,105,115,32,102,111,117,110,100,32,116,
-    111,32,98,101,32,116,114,117,110,99,97,116,101,100,46,10,
-    10,32,32,32,32,78,114,12,0,0,0,122,20,98,97,100,
-    32,109,97,103,105,99,32,110,117,109,98,101,114,32,105,110,
-    32,122,2,58,32,122,2,123,125,233,16,0,0,0,122,40,
-    114,101,97,99,104,101,100,32,69,79,70,32,119,104,105,108,
-    101,32,114,101,97,100,105,110,103,32,112,121,99,32,104,101,
-    97,100,101,114,32,111,102,32,233,8,0,0,0,233,252,255,
-    255,255,122,14,105,110,118,97,108,105,100,32,102,108,97,103,
-    115,32,122,4,32,105,110,32,41,7,218,12,77,65,71,73,
-    67,95,78,85,77,66,69,82,114,116,0,0,0,218,16,95,
-    118,101,114,98,111,115,101,95,109,101,115,115,97,103,101,114,
-    101,0,0,0,114,31,0,0,0,218,8,69,79,70,69,114,
-    114,111,114,114,19,0,0,0,41,6,114,54,0,0,0,114,
-    100,0,0,0,218,11,101,120,99,95,100,101,116,97,105,108,
-    115,90,5,109,97,103,105,99,114,77,0,0,0,114,69,0,
-    0,0,114,2,0,0,0,114,2,0,0,0,114,4,0,0,
-    0,218,13,95,99,108,97,115,115,105,102,121,95,112,121,99,
-    182,1,0,0,115,28,0,0,0,0,16,12,1,8,1,16,
-    1,12,1,12,1,12,1,10,1,12,1,8,1,16,2,8,
-    1,16,1,12,1,114,133,0,0,0,99,5,0,0,0,0,
-    0,0,0,6,0,0,0,4,0,0,0,67,0,0,0,115,
-    112,0,0,0,116,0,124,0,100,1,100,2,133,2,25,0,
-    131,1,124,1,100,3,64,0,107,3,114,58,100,4,124,3,
-    155,2,157,2,125,5,116,1,160,2,100,5,124,5,161,2,
-    1,0,116,3,124,5,102,1,124,4,142,1,130,1,124,2,
-    100,6,107,9,114,108,116,0,124,0,100,2,100,7,133,2,
-    25,0,131,1,124,2,100,3,64,0,107,3,114,108,116,3,
-    100,4,124,3,155,2,157,2,102,1,124,4,142,1,130,1,
-    100,6,83,0,41,8,97,7,2,0,0,86,97,108,105,100,
-    97,116,101,32,97,32,112,121,99,32,97,103,97,105,110,115,
-    116,32,116,104,101,32,115,111,117,114,99,101,32,108,97,115,
-    116,45,109,111,100,105,102,105,101,100,32,116,105,109,101,46,
-    10,10,32,32,32,32,42,100,97,116,97,42,32,105,115,32,
-    116,104,101,32,99,111,110,116,101,110,116,115,32,111,102,32,
-    116,104,101,32,112,121,99,32,102,105,108,101,46,32,40,79,
-    110,108,121,32,116,104,101,32,102,105,114,115,116,32,49,54,
-    32,98,121,116,101,115,32,97,114,101,10,32,32,32,32,114,
-    101,113,117,105,114,101,100,46,41,10,10,32,32,32,32,42,
-    115,111,117,114,99,101,95,109,116,105,109,101,42,32,105,115,
-    32,116,104,101,32,108,97,115,116,32,109,111,100,105,102,105,
-    101,100,32,116,105,109,101,115,116,97,109,112,32,111,102,32,
-    116,104,101,32,115,111,117,114,99,101,32,102,105,108,101,46,
-    10,10,32,32,32,32,42,115,111,117,114,99,101,95,115,105,
-    122,101,42,32,105,115,32,78,111,110,101,32,111,114,32,116,
-    104,101,32,115,105,122,101,32,111,102,32,116,104,101,32,115,
-    111,117,114,99,101,32,102,105,108,101,32,105,110,32,98,121,
-    116,101,115,46,10,10,32,32,32,32,42,110,97,109,101,42,
-    32,105,115,32,116,104,101,32,110,97,109,101,32,111,102,32,
-    116,104,101,32,109,111,100,117,108,101,32,98,101,105,110,103,
-    32,105,109,112,111,114,116,101,100,46,32,73,116,32,105,115,
-    32,117,115,101,100,32,102,111,114,32,108,111,103,103,105,110,
-    103,46,10,10,32,32,32,32,42,101,120,99,95,100,101,116,
-    97,105,108,115,42,32,105,115,32,97,32,100,105,99,116,105,
-    111,110,97,114,121,32,112,97,115,115,101,100,32,116,111,32,
-    73,109,112,111,114,116,69,114,114,111,114,32,105,102,32,105,
-    116,32,114,97,105,115,101,100,32,102,111,114,10,32,32,32,
-    32,105,109,112,114,111,118,101,100,32,100,101,98,117,103,103,
-    105,110,103,46,10,10,32,32,32,32,65,110,32,73,109,112,
-    111,114,116,69,114,114,111,114,32,105,115,32,114,97,105,115,
-    101,100,32,105,102,32,116,104,101,32,98,121,116,101,99,111,
-    100,101,32,105,115,32,115,116,97,108,101,46,10,10,32,32,
-    32,32,114,127,0,0,0,233,12,0,0,0,108,3,0,0,
-    0,255,127,255,127,3,0,122,22,98,121,116,101,99,111,100,
-    101,32,105,115,32,115,116,97,108,101,32,102,111,114,32,122,
-    2,123,125,78,114,126,0,0,0,41,4,114,19,0,0,0,
-    114,116,0,0,0,114,130,0,0,0,114,101,0,0,0,41,
-    6,114,54,0,0,0,218,12,115,111,117,114,99,101,95,109,
-    116,105,109,101,218,11,115,111,117,114,99,101,95,115,105,122,
-    101,114,100,0,0,0,114,132,0,0,0,114,77,0,0,0,
-    114,2,0,0,0,114,2,0,0,0,114,4,0,0,0,218,
-    23,95,118,97,108,105,100,97,116,101,95,116,105,109,101,115,
-    116,97,109,112,95,112,121,99,215,1,0,0,115,14,0,0,
-    0,0,19,24,1,10,1,12,1,12,1,8,1,24,1,114,
-    137,0,0,0,99,4,0,0,0,0,0,0,0,4,0,0,
-    0,3,0,0,0,67,0,0,0,115,38,0,0,0,124,0,
-    100,1,100,2,133,2,25,0,124,1,107,3,114,34,116,0,
-    100,3,124,2,155,2,157,2,102,1,124,3,142,1,130,1,
-    100,4,83,0,41,5,97,243,1,0,0,86,97,108,105,100,
-    97,116,101,32,97,32,104,97,115,104,45,98,97,115,101,100,
-    32,112,121,99,32,98,121,32,99,104,101,99,107,105,110,103,
-    32,116,104,101,32,114,101,97,108,32,115,111,117,114,99,101,
-    32,104,97,115,104,32,97,103,97,105,110,115,116,32,116,104,
-    101,32,111,110,101,32,105,110,10,32,32,32,32,116,104,101,
-    32,112,121,99,32,104,101,97,100,101,114,46,10,10,32,32,
-    32,32,42,100,97,116,97,42,32,105,115,32,116,104,101,32,
-    99,111,110,116,101,110,116,115,32,111,102,32,116,104,101,32,
-    112,121,99,32,102,105,108,101,46,32,40,79,110,108,121,32,
-    116,104,101,32,102,105,114,115,116,32,49,54,32,98,121,116,
-    101,115,32,97,114,101,10,32,32,32,32,114,101,113,117,105,
-    114,101,100,46,41,10,10,32,32,32,32,42,115,111,117,114,
-    99,101,95,104,97,115,104,42,32,105,115,32,116,104,101,32,
-    105,109,112,111,114,116,108,105,98,46,117,116,105,108,46,115,
-    111,117,114,99,101,95,104,97,115,104,40,41,32,111,102,32,
-    116,104,101,32,115,111,117,114,99,101,32,102,105,108,101,46,
-    10,10,32,32,32,32,42,110,97,109,101,42,32,105,115,32,
-    116,104,101,32,110,97,109,101,32,111,102,32,116,104,101,32,
-    109,111,100,117,108,101,32,98,101,105,110,103,32,105,109,112,
-    111,114,116,101,100,46,32,73,116,32,105,115,32,117,115,101,
-    100,32,102,111,114,32,108,111,103,103,105,110,103,46,10,10,
-    32,32,32,32,42,101,120,99,95,100,101,116,97,105,108,115,
-    42,32,105,115,32,97,32,100,105,99,116,105,111,110,97,114,
-    121,32,112,97,115,115,101,100,32,116,111,32,73,109,112,111,
-    114,116,69,114,114,111,114,32,105,102,32,105,116,32,114,97,
-    105,115,101,100,32,102,111,114,10,32,32,32,32,105,109,112,
-    114,111,118,101,100,32,100,101,98,117,103,103,105,110,103,46,
-    10,10,32,32,32,32,65,110,32,73,109,112,111,114,116,69,
-    114,114,111,114,32,105,115,32,114,97,105,115,101,100,32,105,
-    102,32,116,104,101,32,98,121,116,101,99,111,100,101,32,105,
-    115,32,115,116,97,108,101,46,10,10,32,32,32,32,114,127,
-    0,0,0,114,126,0,0,0,122,46,104,97,115,104,32,105,
-    110,32,98,121,116,101,99,111,100,101,32,100,111,101,115,110,
-    39,116,32,109,97,116,99,104,32,104,97,115,104,32,111,102,
-    32,115,111,117,114,99,101,32,78,41,1,114,101,0,0,0,
-    41,4,114,54,0,0,0,218,11,115,111,117,114,99,101,95,
-    104,97,115,104,114,100,0,0,0,114,132,0,0,0,114,2,
-    0,0,0,114,2,0,0,0,114,4,0,0,0,218,18,95,
-    118,97,108,105,100,97,116,101,95,104,97,115,104,95,112,121,
-    99,243,1,0,0,115,8,0,0,0,0,17,16,1,2,1,
-    10,1,114,139,0,0,0,99,4,0,0,0,0,0,0,0,
-    5,0,0,0,5,0,0,0,67,0,0,0,115,80,0,0,
-    0,116,0,160,1,124,0,161,1,125,4,116,2,124,4,116,
-    3,131,2,114,56,116,4,160,5,100,1,124,2,161,2,1,
-    0,124,3,100,2,107,9,114,52,116,6,160,7,124,4,124,
-    3,161,2,1,0,124,4,83,0,116,8,100,3,160,9,124,
-    2,161,1,124,1,124,2,100,4,141,3,130,1,100,2,83,
-    0,41,5,122,35,67,111,109,112,105,108,101,32,98,121,116,
-    101,99,111,100,101,32,97,115,32,102,111,117,110,100,32,105,
-    110,32,97,32,112,121,99,46,122,21,99,111,100,101,32,111,
-    98,106,101,99,116,32,102,114,111,109,32,123,33,114,125,78,
-    122,23,78,111,110,45,99,111,100,101,32,111,98,106,101,99,
-    116,32,105,110,32,123,33,114,125,41,2,114,100,0,0,0,
-    114,35,0,0,0,41,10,218,7,109,97,114,115,104,97,108,
-    90,5,108,111,97,100,115,218,10,105,115,105,110,115,116,97,
-    110,99,101,218,10,95,99,111,100,101,95,116,121,112,101,114,
-    116,0,0,0,114,130,0,0,0,218,4,95,105,109,112,90,
-    16,95,102,105,120,95,99,111,95,102,105,108,101,110,97,109,
-    101,114,101,0,0,0,114,48,0,0,0,41,5,114,54,0,
-    0,0,114,100,0,0,0,114,91,0,0,0,114,92,0,0,
-    0,218,4,99,111,100,101,114,2,0,0,0,114,2,0,0,
-    0,114,4,0,0,0,218,17,95,99,111,109,112,105,108,101,
-    95,98,121,116,101,99,111,100,101,11,2,0,0,115,16,0,
-    0,0,0,2,10,1,10,1,12,1,8,1,12,1,4,2,
-    10,1,114,145,0,0,0,114,60,0,0,0,99,3,0,0,
-    0,0,0,0,0,4,0,0,0,5,0,0,0,67,0,0,
-    0,115,70,0,0,0,116,0,116,1,131,1,125,3,124,3,
-    160,2,116,3,100,1,131,1,161,1,1,0,124,3,160,2,
-    116,3,124,1,131,1,161,1,1,0,124,3,160,2,116,3,
-    124,2,131,1,161,1,1,0,124,3,160,2,116,4,160,5,
-    124,0,161,1,161,1,1,0,124,3,83,0,41,2,122,43,
-    80,114,111,100,117,99,101,32,116,104,101,32,100,97,116,97,
-    32,102,111,114,32,97,32,116,105,109,101,115,116,97,109,112,
-    45,98,97,115,101,100,32,112,121,99,46,114,60,0,0,0,
-    41,6,218,9,98,121,116,101,97,114,114,97,121,114,129,0,
-    0,0,218,6,101,120,116,101,110,100,114,17,0,0,0,114,
-    140,0,0,0,218,5,100,117,109,112,115,41,4,114,144,0,
-    0,0,218,5,109,116,105,109,101,114,136,0,0,0,114,54,
-    0,0,0,114,2,0,0,0,114,2,0,0,0,114,4,0,
-    0,0,218,22,95,99,111,100,101,95,116,111,95,116,105,109,
-    101,115,116,97,109,112,95,112,121,99,24,2,0,0,115,12,
-    0,0,0,0,2,8,1,14,1,14,1,14,1,16,1,114,
-    150,0,0,0,84,99,3,0,0,0,0,0,0,0,5,0,
-    0,0,5,0,0,0,67,0,0,0,115,80,0,0,0,116,
-    0,116,1,131,1,125,3,100,1,124,2,100,1,62,0,66,
-    0,125,4,124,3,160,2,116,3,124,4,131,1,161,1,1,
-    0,116,4,124,1,131,1,100,2,107,2,115,50,116,5,130,
-    1,124,3,160,2,124,1,161,1,1,0,124,3,160,2,116,
-    6,160,7,124,0,161,1,161,1,1,0,124,3,83,0,41,
-    3,122,38,80,114,111,100,117,99,101,32,116,104,101,32,100,
-    97,116,97,32,102,111,114,32,97,32,104,97,115,104,45,98,
-    97,115,101,100,32,112,121,99,46,114,29,0,0,0,114,127,
-    0,0,0,41,8,114,146,0,0,0,114,129,0,0,0,114,
-    147,0,0,0,114,17,0,0,0,114,31,0,0,0,218,14,
-    65,115,115,101,114,116,105,111,110,69,114,114,111,114,114,140,
-    0,0,0,114,148,0,0,0,41,5,114,144,0,0,0,114,
-    138,0,0,0,90,7,99,104,101,99,107,101,100,114,54,0,
-    0,0,114,69,0,0,0,114,2,0,0,0,114,2,0,0,
-    0,114,4,0,0,0,218,17,95,99,111,100,101,95,116,111,
-    95,104,97,115,104,95,112,121,99,34,2,0,0,115,14,0,
-    0,0,0,2,8,1,12,1,14,1,16,1,10,1,16,1,
-    114,152,0,0,0,99,1,0,0,0,0,0,0,0,5,0,
-    0,0,6,0,0,0,67,0,0,0,115,62,0,0,0,100,
-    1,100,2,108,0,125,1,116,1,160,2,124,0,161,1,106,
-    3,125,2,124,1,160,4,124,2,161,1,125,3,116,1,160,
-    5,100,2,100,3,161,2,125,4,124,4,160,6,124,0,160,
-    6,124,3,100,1,25,0,161,1,161,1,83,0,41,4,122,
-    121,68,101,99,111,100,101,32,98,121,116,101,115,32,114,101,
-    112,114,101,115,101,110,116,105,110,103,32,115,111,117,114,99,
-    101,32,99,111,100,101,32,97,110,100,32,114,101,116,117,114,
-    110,32,116,104,101,32,115,116,114,105,110,103,46,10,10,32,
-    32,32,32,85,110,105,118,101,114,115,97,108,32,110,101,119,
-    108,105,110,101,32,115,117,112,112,111,114,116,32,105,115,32,
-    117,115,101,100,32,105,110,32,116,104,101,32,100,101,99,111,
-    100,105,110,103,46,10,32,32,32,32,114,60,0,0,0,78,
-    84,41,7,218,8,116,111,107,101,110,105,122,101,114,50,0,
-    0,0,90,7,66,121,116,101,115,73,79,90,8,114,101,97,
-    100,108,105,110,101,90,15,100,101,116,101,99,116,95,101,110,
-    99,111,100,105,110,103,90,25,73,110,99,114,101,109,101,110,
-    116,97,108,78,101,119,108,105,110,101,68,101,99,111,100,101,
-    114,218,6,100,101,99,111,100,101,41,5,218,12,115,111,117,
-    114,99,101,95,98,121,116,101,115,114,153,0,0,0,90,21,
-    115,111,117,114,99,101,95,98,121,116,101,115,95,114,101,97,
-    100,108,105,110,101,218,8,101,110,99,111,100,105,110,103,90,
-    15,110,101,119,108,105,110,101,95,100,101,99,111,100,101,114,
-    114,2,0,0,0,114,2,0,0,0,114,4,0,0,0,218,
-    13,100,101,99,111,100,101,95,115,111,117,114,99,101,45,2,
-    0,0,115,10,0,0,0,0,5,8,1,12,1,10,1,12,
-    1,114,157,0,0,0,41,2,114,122,0,0,0,218,26,115,
-    117,98,109,111,100,117,108,101,95,115,101,97,114,99,104,95,
-    108,111,99,97,116,105,111,110,115,99,2,0,0,0,2,0,
-    0,0,9,0,0,0,8,0,0,0,67,0,0,0,115,18,
-    1,0,0,124,1,100,1,107,8,114,60,100,2,125,1,116,
-    0,124,2,100,3,131,2,114,70,121,14,124,2,160,1,124,
-    0,161,1,125,1,87,0,113,70,4,0,116,2,107,10,114,
-    56,1,0,1,0,1,0,89,0,113,70,88,0,110,10,116,
-    3,160,4,124,1,161,1,125,1,116,5,106,6,124,0,124,
-    2,124,1,100,4,141,3,125,4,100,5,124,4,95,7,124,
-    2,100,1,107,8,114,156,120,54,116,8,131,0,68,0,93,
-    40,92,2,125,5,125,6,124,1,160,9,116,10,124,6,131,
-    1,161,1,114,108,124,5,124,0,124,1,131,2,125,2,124,
-    2,124,4,95,11,80,0,113,108,87,0,100,1,83,0,124,
-    3,116,12,107,8,114,222,116,0,124,2,100,6,131,2,114,
-    228,121,14,124,2,160,13,124,0,161,1,125,7,87,0,110,
-    20,4,0,116,2,107,10,114,208,1,0,1,0,1,0,89,
-    0,113,228,88,0,124,7,114,228,103,0,124,4,95,14,110,
-    6,124,3,124,4,95,14,124,4,106,14,103,0,107,2,144,
-    1,114,14,124,1,144,1,114,14,116,15,124,1,131,1,100,
-    7,25,0,125,8,124,4,106,14,160,16,124,8,161,1,1,
-    0,124,4,83,0,41,8,97,61,1,0,0,82,101,116,117,
-    114,110,32,97,32,109,111,100,117,108,101,32,115,112,101,99,
-    32,98,97,115,101,100,32,111,110,32,97,32,102,105,108,101,
-    32,108,111,99,97,116,105,111,110,46,10,10,32,32,32,32,
-    84,111,32,105,110,100,105,99,97,116,101,32,116,104,97,116,
-    32,116,104,101,32,109,111,100,117,108,101,32,105,115,32,97,
-    32,112,97,99,107,97,103,101,44,32,115,101,116,10,32,32,
-    32,32,115,117,98,109,111,100,117,108,101,95,115,101,97,114,
-    99,104,95,108,111,99,97,116,105,111,110,115,32,116,111,32,
-    97,32,108,105,115,116,32,111,102,32,100,105,114,101,99,116,
-    111,114,121,32,112,97,116,104,115,46,32,32,65,110,10,32,
-    32,32,32,101,109,112,116,121,32,108,105,115,116,32,105,115,
-    32,115,117,102,102,105,99,105,101,110,116,44,32,116,104,111,
-    117,103,104,32,105,116,115,32,110,111,116,32,111,116,104,101,
-    114,119,105,115,101,32,117,115,101,102,117,108,32,116,111,32,
-    116,104,101,10,32,32,32,32,105,109,112,111,114,116,32,115,
-    121,115,116,101,109,46,10,10,32,32,32,32,84,104,101,32,
-    108,111,97,100,101,114,32,109,117,115,116,32,116,97,107,101,
-    32,97,32,115,112,101,99,32,97,115,32,105,116,115,32,111,
-    110,108,121,32,95,95,105,110,105,116,95,95,40,41,32,97,
-    114,103,46,10,10,32,32,32,32,78,122,9,60,117,110,107,
-    110,111,119,110,62,218,12,103,101,116,95,102,105,108,101,110,
-    97,109,101,41,1,218,6,111,114,105,103,105,110,84,218,10,
-    105,115,95,112,97,99,107,97,103,101,114,60,0,0,0,41,
-    17,114,110,0,0,0,114,159,0,0,0,114,101,0,0,0,
-    114,1,0,0,0,114,65,0,0,0,114,116,0,0,0,218,
-    10,77,111,100,117,108,101,83,112,101,99,90,13,95,115,101,
-    116,95,102,105,108,101,97,116,116,114,218,27,95,103,101,116,
-    95,115,117,112,112,111,114,116,101,100,95,102,105,108,101,95,
-    108,111,97,100,101,114,115,114,94,0,0,0,114,95,0,0,
-    0,114,122,0,0,0,218,9,95,80,79,80,85,76,65,84,
-    69,114,161,0,0,0,114,158,0,0,0,114,38,0,0,0,
-    218,6,97,112,112,101,110,100,41,9,114,100,0,0,0,90,
-    8,108,111,99,97,116,105,111,110,114,122,0,0,0,114,158,
-    0,0,0,218,4,115,112,101,99,218,12,108,111,97,100,101,
-    114,95,99,108,97,115,115,218,8,115,117,102,102,105,120,101,
-    115,114,161,0,0,0,90,7,100,105,114,110,97,109,101,114,
-    2,0,0,0,114,2,0,0,0,114,4,0,0,0,218,23,
-    115,112,101,99,95,102,114,111,109,95,102,105,108,101,95,108,
-    111,99,97,116,105,111,110,62,2,0,0,115,62,0,0,0,
-    0,12,8,4,4,1,10,2,2,1,14,1,14,1,8,2,
-    10,8,16,1,6,3,8,1,16,1,14,1,10,1,6,1,
-    6,2,4,3,8,2,10,1,2,1,14,1,14,1,6,2,
-    4,1,8,2,6,1,12,1,6,1,12,1,12,2,114,169,
-    0,0,0,99,0,0,0,0,0,0,0,0,0,0,0,0,
-    4,0,0,0,64,0,0,0,115,80,0,0,0,101,0,90,
-    1,100,0,90,2,100,1,90,3,100,2,90,4,100,3,90,
-    5,100,4,90,6,101,7,100,5,100,6,132,0,131,1,90,
-    8,101,7,100,7,100,8,132,0,131,1,90,9,101,7,100,
-    14,100,10,100,11,132,1,131,1,90,10,101,7,100,15,100,
-    12,100,13,132,1,131,1,90,11,100,9,83,0,41,16,218,
-    21,87,105,110,100,111,119,115,82,101,103,105,115,116,114,121,
-    70,105,110,100,101,114,122,62,77,101,116,97,32,112,97,116,
-    104,32,102,105,110,100,101,114,32,102,111,114,32,109,111,100,
-    117,108,101,115,32,100,101,99,108,97,114,101,100,32,105,110,
-    32,116,104,101,32,87,105,110,100,111,119,115,32,114,101,103,
-    105,115,116,114,121,46,122,59,83,111,102,116,119,97,114,101,
-    92,80,121,116,104,111,110,92,80,121,116,104,111,110,67,111,
-    114,101,92,123,115,121,115,95,118,101,114,115,105,111,110,125,
-    92,77,111,100,117,108,101,115,92,123,102,117,108,108,110,97,
-    109,101,125,122,65,83,111,102,116,119,97,114,101,92,80,121,
-    116,104,111,110,92,80,121,116,104,111,110,67,111,114,101,92,
-    123,115,121,115,95,118,101,114,115,105,111,110,125,92,77,111,
-    100,117,108,101,115,92,123,102,117,108,108,110,97,109,101,125,
-    92,68,101,98,117,103,70,99,2,0,0,0,0,0,0,0,
-    2,0,0,0,8,0,0,0,67,0,0,0,115,50,0,0,
-    0,121,14,116,0,160,1,116,0,106,2,124,1,161,2,83,
-    0,4,0,116,3,107,10,114,44,1,0,1,0,1,0,116,
-    0,160,1,116,0,106,4,124,1,161,2,83,0,88,0,100,
-    0,83,0,41,1,78,41,5,218,7,95,119,105,110,114,101,
-    103,90,7,79,112,101,110,75,101,121,90,17,72,75,69,89,
-    95,67,85,82,82,69,78,84,95,85,83,69,82,114,40,0,
-    0,0,90,18,72,75,69,89,95,76,79,67,65,76,95,77,
-    65,67,72,73,78,69,41,2,218,3,99,108,115,114,3,0,
-    0,0,114,2,0,0,0,114,2,0,0,0,114,4,0,0,
-    0,218,14,95,111,112,101,110,95,114,101,103,105,115,116,114,
-    121,142,2,0,0,115,8,0,0,0,0,2,2,1,14,1,
-    14,1,122,36,87,105,110,100,111,119,115,82,101,103,105,115,
-    116,114,121,70,105,110,100,101,114,46,95,111,112,101,110,95,
-    114,101,103,105,115,116,114,121,99,2,0,0,0,0,0,0,
-    0,6,0,0,0,9,0,0,0,67,0,0,0,115,112,0,
-    0,0,124,0,106,0,114,14,124,0,106,1,125,2,110,6,
-    124,0,106,2,125,2,124,2,106,3,124,1,100,1,116,4,
-    106,5,100,0,100,2,133,2,25,0,22,0,100,3,141,2,
-    125,3,121,38,124,0,160,6,124,3,161,1,143,18,125,4,
-    116,7,160,8,124,4,100,4,161,2,125,5,87,0,100,0,
-    81,0,82,0,88,0,87,0,110,20,4,0,116,9,107,10,
-    114,106,1,0,1,0,1,0,100,0,83,0,88,0,124,5,
-    83,0,41,5,78,122,5,37,100,46,37,100,114,57,0,0,
-    0,41,2,114,121,0,0,0,90,11,115,121,115,95,118,101,
-    114,115,105,111,110,114,30,0,0,0,41,10,218,11,68,69,
-    66,85,71,95,66,85,73,76,68,218,18,82,69,71,73,83,
-    84,82,89,95,75,69,89,95,68,69,66,85,71,218,12,82,
-    69,71,73,83,84,82,89,95,75,69,89,114,48,0,0,0,
-    114,6,0,0,0,218,12,118,101,114,115,105,111,110,95,105,
-    110,102,111,114,173,0,0,0,114,171,0,0,0,90,10,81,
-    117,101,114,121,86,97,108,117,101,114,40,0,0,0,41,6,
-    114,172,0,0,0,114,121,0,0,0,90,12,114,101,103,105,
-    115,116,114,121,95,107,101,121,114,3,0,0,0,90,4,104,
-    107,101,121,218,8,102,105,108,101,112,97,116,104,114,2,0,
-    0,0,114,2,0,0,0,114,4,0,0,0,218,16,95,115,
-    101,97,114,99,104,95,114,101,103,105,115,116,114,121,149,2,
-    0,0,115,22,0,0,0,0,2,6,1,8,2,6,1,6,
-    1,22,1,2,1,12,1,26,1,14,1,6,1,122,38,87,
+    32,32,32,32,65,110,32,73,109,112,111,114,116,69,114,114,
+    111,114,32,105,115,32,114,97,105,115,101,100,32,105,102,32,
+    116,104,101,32,98,121,116,101,99,111,100,101,32,105,115,32,
+    115,116,97,108,101,46,10,10,32,32,32,32,114,129,0,0,
+    0,233,12,0,0,0,108,3,0,0,0,255,127,255,127,3,
+    0,122,22,98,121,116,101,99,111,100,101,32,105,115,32,115,
+    116,97,108,101,32,102,111,114,32,122,2,123,125,78,114,128,
+    0,0,0,41,4,114,20,0,0,0,114,118,0,0,0,114,
+    132,0,0,0,114,103,0,0,0,41,6,114,55,0,0,0,
+    218,12,115,111,117,114,99,101,95,109,116,105,109,101,218,11,
+    115,111,117,114,99,101,95,115,105,122,101,114,102,0,0,0,
+    114,134,0,0,0,114,78,0,0,0,114,3,0,0,0,114,
+    3,0,0,0,114,5,0,0,0,218,23,95,118,97,108,105,
+    100,97,116,101,95,116,105,109,101,115,116,97,109,112,95,112,
+    121,99,215,1,0,0,115,14,0,0,0,0,19,24,1,10,
+    1,12,1,12,1,8,1,24,1,114,139,0,0,0,99,4,
+    0,0,0,0,0,0,0,4,0,0,0,3,0,0,0,67,
+    0,0,0,115,38,0,0,0,124,0,100,1,100,2,133,2,
+    25,0,124,1,107,3,114,34,116,0,100,3,124,2,155,2,
+    157,2,102,1,124,3,142,1,130,1,100,4,83,0,41,5,
+    97,243,1,0,0,86,97,108,105,100,97,116,101,32,97,32,
+    104,97,115,104,45,98,97,115,101,100,32,112,121,99,32,98,
+    121,32,99,104,101,99,107,105,110,103,32,116,104,101,32,114,
+    101,97,108,32,115,111,117,114,99,101,32,104,97,115,104,32,
+    97,103,97,105,110,115,116,32,116,104,101,32,111,110,101,32,
+    105,110,10,32,32,32,32,116,104,101,32,112,121,99,32,104,
+    101,97,100,101,114,46,10,10,32,32,32,32,42,100,97,116,
+    97,42,32,105,115,32,116,104,101,32,99,111,110,116,101,110,
+    116,115,32,111,102,32,116,104,101,32,112,121,99,32,102,105,
+    108,101,46,32,40,79,110,108,121,32,116,104,101,32,102,105,
+    114,115,116,32,49,54,32,98,121,116,101,115,32,97,114,101,
+    10,32,32,32,32,114,101,113,117,105,114,101,100,46,41,10,
+    10,32,32,32,32,42,115,111,117,114,99,101,95,104,97,115,
+    104,42,32,105,115,32,116,104,101,32,105,109,112,111,114,116,
+    108,105,98,46,117,116,105,108,46,115,111,117,114,99,101,95,
+    104,97,115,104,40,41,32,111,102,32,116,104,101,32,115,111,
+    117,114,99,101,32,102,105,108,101,46,10,10,32,32,32,32,
+    42,110,97,109,101,42,32,105,115,32,116,104,101,32,110,97,
+    109,101,32,111,102,32,116,104,101,32,109,111,100,117,108,101,
+    32,98,101,105,110,103,32,105,109,112,111,114,116,101,100,46,
+    32,73,116,32,105,115,32,117,115,101,100,32,102,111,114,32,
+    108,111,103,103,105,110,103,46,10,10,32,32,32,32,42,101,
+    120,99,95,100,101,116,97,105,108,115,42,32,105,115,32,97,
+    32,100,105,99,116,105,111,110,97,114,121,32,112,97,115,115,
+    101,100,32,116,111,32,73,109,112,111,114,116,69,114,114,111,
+    114,32,105,102,32,105,116,32,114,97,105,115,101,100,32,102,
+    111,114,10,32,32,32,32,105,109,112,114,111,118,101,100,32,
+    100,101,98,117,103,103,105,110,103,46,10,10,32,32,32,32,
+    65,110,32,73,109,112,111,114,116,69,114,114,111,114,32,105,
+    115,32,114,97,105,115,101,100,32,105,102,32,116,104,101,32,
+    98,121,116,101,99,111,100,101,32,105,115,32,115,116,97,108,
+    101,46,10,10,32,32,32,32,114,129,0,0,0,114,128,0,
+    0,0,122,46,104,97,115,104,32,105,110,32,98,121,116,101,
+    99,111,100,101,32,100,111,101,115,110,39,116,32,109,97,116,
+    99,104,32,104,97,115,104,32,111,102,32,115,111,117,114,99,
+    101,32,78,41,1,114,103,0,0,0,41,4,114,55,0,0,
+    0,218,11,115,111,117,114,99,101,95,104,97,115,104,114,102,
+    0,0,0,114,134,0,0,0,114,3,0,0,0,114,3,0,
+    0,0,114,5,0,0,0,218,18,95,118,97,108,105,100,97,
+    116,101,95,104,97,115,104,95,112,121,99,243,1,0,0,115,
+    8,0,0,0,0,17,16,1,2,1,10,1,114,141,0,0,
+    0,99,4,0,0,0,0,0,0,0,5,0,0,0,5,0,
+    0,0,67,0,0,0,115,80,0,0,0,116,0,160,1,124,
+    0,161,1,125,4,116,2,124,4,116,3,131,2,114,56,116,
+    4,160,5,100,1,124,2,161,2,1,0,124,3,100,2,107,
+    9,114,52,116,6,160,7,124,4,124,3,161,2,1,0,124,
+    4,83,0,116,8,100,3,160,9,124,2,161,1,124,1,124,
+    2,100,4,141,3,130,1,100,2,83,0,41,5,122,35,67,
+    111,109,112,105,108,101,32,98,121,116,101,99,111,100,101,32,
+    97,115,32,102,111,117,110,100,32,105,110,32,97,32,112,121,
+    99,46,122,21,99,111,100,101,32,111,98,106,101,99,116,32,
+    102,114,111,109,32,123,33,114,125,78,122,23,78,111,110,45,
+    99,111,100,101,32,111,98,106,101,99,116,32,105,110,32,123,
+    33,114,125,41,2,114,102,0,0,0,114,36,0,0,0,41,
+    10,218,7,109,97,114,115,104,97,108,218,5,108,111,97,100,
+    115,218,10,105,115,105,110,115,116,97,110,99,101,218,10,95,
+    99,111,100,101,95,116,121,112,101,114,118,0,0,0,114,132,
+    0,0,0,218,4,95,105,109,112,90,16,95,102,105,120,95,
+    99,111,95,102,105,108,101,110,97,109,101,114,103,0,0,0,
+    114,49,0,0,0,41,5,114,55,0,0,0,114,102,0,0,
+    0,114,93,0,0,0,114,94,0,0,0,218,4,99,111,100,
+    101,114,3,0,0,0,114,3,0,0,0,114,5,0,0,0,
+    218,17,95,99,111,109,112,105,108,101,95,98,121,116,101,99,
+    111,100,101,11,2,0,0,115,16,0,0,0,0,2,10,1,
+    10,1,12,1,8,1,12,1,4,2,10,1,114,148,0,0,
+    0,114,61,0,0,0,99,3,0,0,0,0,0,0,0,4,
+    0,0,0,5,0,0,0,67,0,0,0,115,70,0,0,0,
+    116,0,116,1,131,1,125,3,124,3,160,2,116,3,100,1,
+    131,1,161,1,1,0,124,3,160,2,116,3,124,1,131,1,
+    161,1,1,0,124,3,160,2,116,3,124,2,131,1,161,1,
+    1,0,124,3,160,2,116,4,160,5,124,0,161,1,161,1,
+    1,0,124,3,83,0,41,2,122,43,80,114,111,100,117,99,
+    101,32,116,104,101,32,100,97,116,97,32,102,111,114,32,97,
+    32,116,105,109,101,115,116,97,109,112,45,98,97,115,101,100,
+    32,112,121,99,46,114,61,0,0,0,41,6,218,9,98,121,
+    116,101,97,114,114,97,121,114,131,0,0,0,218,6,101,120,
+    116,101,110,100,114,18,0,0,0,114,142,0,0,0,218,5,
+    100,117,109,112,115,41,4,114,147,0,0,0,218,5,109,116,
+    105,109,101,114,138,0,0,0,114,55,0,0,0,114,3,0,
+    0,0,114,3,0,0,0,114,5,0,0,0,218,22,95,99,
+    111,100,101,95,116,111,95,116,105,109,101,115,116,97,109,112,
+    95,112,121,99,24,2,0,0,115,12,0,0,0,0,2,8,
+    1,14,1,14,1,14,1,16,1,114,153,0,0,0,84,99,
+    3,0,0,0,0,0,0,0,5,0,0,0,5,0,0,0,
+    67,0,0,0,115,80,0,0,0,116,0,116,1,131,1,125,
+    3,100,1,124,2,100,1,62,0,66,0,125,4,124,3,160,
+    2,116,3,124,4,131,1,161,1,1,0,116,4,124,1,131,
+    1,100,2,107,2,115,50,116,5,130,1,124,3,160,2,124,
+    1,161,1,1,0,124,3,160,2,116,6,160,7,124,0,161,
+    1,161,1,1,0,124,3,83,0,41,3,122,38,80,114,111,
+    100,117,99,101,32,116,104,101,32,100,97,116,97,32,102,111,
+    114,32,97,32,104,97,115,104,45,98,97,115,101,100,32,112,
+    121,99,46,114,30,0,0,0,114,129,0,0,0,41,8,114,
+    149,0,0,0,114,131,0,0,0,114,150,0,0,0,114,18,
+    0,0,0,114,32,0,0,0,218,14,65,115,115,101,114,116,
+    105,111,110,69,114,114,111,114,114,142,0,0,0,114,151,0,
+    0,0,41,5,114,147,0,0,0,114,140,0,0,0,90,7,
+    99,104,101,99,107,101,100,114,55,0,0,0,114,70,0,0,
+    0,114,3,0,0,0,114,3,0,0,0,114,5,0,0,0,
+    218,17,95,99,111,100,101,95,116,111,95,104,97,115,104,95,
+    112,121,99,34,2,0,0,115,14,0,0,0,0,2,8,1,
+    12,1,14,1,16,1,10,1,16,1,114,155,0,0,0,99,
+    1,0,0,0,0,0,0,0,5,0,0,0,6,0,0,0,
+    67,0,0,0,115,62,0,0,0,100,1,100,2,108,0,125,
+    1,116,1,160,2,124,0,161,1,106,3,125,2,124,1,160,
+    4,124,2,161,1,125,3,116,1,160,5,100,2,100,3,161,
+    2,125,4,124,4,160,6,124,0,160,6,124,3,100,1,25,
+    0,161,1,161,1,83,0,41,4,122,121,68,101,99,111,100,
+    101,32,98,121,116,101,115,32,114,101,112,114,101,115,101,110,
+    116,105,110,103,32,115,111,117,114,99,101,32,99,111,100,101,
+    32,97,110,100,32,114,101,116,117,114,110,32,116,104,101,32,
+    115,116,114,105,110,103,46,10,10,32,32,32,32,85,110,105,
+    118,101,114,115,97,108,32,110,101,119,108,105,110,101,32,115,
+    117,112,112,111,114,116,32,105,115,32,117,115,101,100,32,105,
+    110,32,116,104,101,32,100,101,99,111,100,105,110,103,46,10,
+    32,32,32,32,114,61,0,0,0,78,84,41,7,218,8,116,
+    111,107,101,110,105,122,101,114,51,0,0,0,90,7,66,121,
+    116,101,115,73,79,90,8,114,101,97,100,108,105,110,101,90,
+    15,100,101,116,101,99,116,95,101,110,99,111,100,105,110,103,
+    90,25,73,110,99,114,101,109,101,110,116,97,108,78,101,119,
+    108,105,110,101,68,101,99,111,100,101,114,218,6,100,101,99,
+    111,100,101,41,5,218,12,115,111,117,114,99,101,95,98,121,
+    116,101,115,114,156,0,0,0,90,21,115,111,117,114,99,101,
+    95,98,121,116,101,115,95,114,101,97,100,108,105,110,101,218,
+    8,101,110,99,111,100,105,110,103,90,15,110,101,119,108,105,
+    110,101,95,100,101,99,111,100,101,114,114,3,0,0,0,114,
+    3,0,0,0,114,5,0,0,0,218,13,100,101,99,111,100,
+    101,95,115,111,117,114,99,101,45,2,0,0,115,10,0,0,
+    0,0,5,8,1,12,1,10,1,12,1,114,160,0,0,0,
+    41,2,114,124,0,0,0,218,26,115,117,98,109,111,100,117,
+    108,101,95,115,101,97,114,99,104,95,108,111,99,97,116,105,
+    111,110,115,99,2,0,0,0,2,0,0,0,9,0,0,0,
+    8,0,0,0,67,0,0,0,115,18,1,0,0,124,1,100,
+    1,107,8,114,60,100,2,125,1,116,0,124,2,100,3,131,
+    2,114,70,121,14,124,2,160,1,124,0,161,1,125,1,87,
+    0,113,70,4,0,116,2,107,10,114,56,1,0,1,0,1,
+    0,89,0,113,70,88,0,110,10,116,3,160,4,124,1,161,
+    1,125,1,116,5,106,6,124,0,124,2,124,1,100,4,141,
+    3,125,4,100,5,124,4,95,7,124,2,100,1,107,8,114,
+    156,120,54,116,8,131,0,68,0,93,40,92,2,125,5,125,
+    6,124,1,160,9,116,10,124,6,131,1,161,1,114,108,124,
+    5,124,0,124,1,131,2,125,2,124,2,124,4,95,11,80,
+    0,113,108,87,0,100,1,83,0,124,3,116,12,107,8,114,
+    222,116,0,124,2,100,6,131,2,114,228,121,14,124,2,160,
+    13,124,0,161,1,125,7,87,0,110,20,4,0,116,2,107,
+    10,114,208,1,0,1,0,1,0,89,0,113,228,88,0,124,
+    7,114,228,103,0,124,4,95,14,110,6,124,3,124,4,95,
+    14,124,4,106,14,103,0,107,2,144,1,114,14,124,1,144,
+    1,114,14,116,15,124,1,131,1,100,7,25,0,125,8,124,
+    4,106,14,160,16,124,8,161,1,1,0,124,4,83,0,41,
+    8,97,61,1,0,0,82,101,116,117,114,110,32,97,32,109,
+    111,100,117,108,101,32,115,112,101,99,32,98,97,115,101,100,
+    32,111,110,32,97,32,102,105,108,101,32,108,111,99,97,116,
+    105,111,110,46,10,10,32,32,32,32,84,111,32,105,110,100,
+    105,99,97,116,101,32,116,104,97,116,32,116,104,101,32,109,
+    111,100,117,108,101,32,105,115,32,97,32,112,97,99,107,97,
+    103,101,44,32,115,101,116,10,32,32,32,32,115,117,98,109,
+    111,100,117,108,101,95,115,101,97,114,99,104,95,108,111,99,
+    97,116,105,111,110,115,32,116,111,32,97,32,108,105,115,116,
+    32,111,102,32,100,105,114,101,99,116,111,114,121,32,112,97,
+    116,104,115,46,32,32,65,110,10,32,32,32,32,101,109,112,
+    116,121,32,108,105,115,116,32,105,115,32,115,117,102,102,105,
+    99,105,101,110,116,44,32,116,104,111,117,103,104,32,105,116,
+    115,32,110,111,116,32,111,116,104,101,114,119,105,115,101,32,
+    117,115,101,102,117,108,32,116,111,32,116,104,101,10,32,32,
+    32,32,105,109,112,111,114,116,32,115,121,115,116,101,109,46,
+    10,10,32,32,32,32,84,104,101,32,108,111,97,100,101,114,
+    32,109,117,115,116,32,116,97,107,101,32,97,32,115,112,101,
+    99,32,97,115,32,105,116,115,32,111,110,108,121,32,95,95,
+    105,110,105,116,95,95,40,41,32,97,114,103,46,10,10,32,
+    32,32,32,78,122,9,60,117,110,107,110,111,119,110,62,218,
+    12,103,101,116,95,102,105,108,101,110,97,109,101,41,1,218,
+    6,111,114,105,103,105,110,84,218,10,105,115,95,112,97,99,
+    107,97,103,101,114,61,0,0,0,41,17,114,112,0,0,0,
+    114,162,0,0,0,114,103,0,0,0,114,1,0,0,0,114,
+    66,0,0,0,114,118,0,0,0,218,10,77,111,100,117,108,
+    101,83,112,101,99,90,13,95,115,101,116,95,102,105,108,101,
+    97,116,116,114,218,27,95,103,101,116,95,115,117,112,112,111,
+    114,116,101,100,95,102,105,108,101,95,108,111,97,100,101,114,
+    115,114,96,0,0,0,114,97,0,0,0,114,124,0,0,0,
+    218,9,95,80,79,80,85,76,65,84,69,114,164,0,0,0,
+    114,161,0,0,0,114,39,0,0,0,218,6,97,112,112,101,
+    110,100,41,9,114,102,0,0,0,90,8,108,111,99,97,116,
+    105,111,110,114,124,0,0,0,114,161,0,0,0,218,4,115,
+    112,101,99,218,12,108,111,97,100,101,114,95,99,108,97,115,
+    115,218,8,115,117,102,102,105,120,101,115,114,164,0,0,0,
+    90,7,100,105,114,110,97,109,101,114,3,0,0,0,114,3,
+    0,0,0,114,5,0,0,0,218,23,115,112,101,99,95,102,
+    114,111,109,95,102,105,108,101,95,108,111,99,97,116,105,111,
+    110,62,2,0,0,115,62,0,0,0,0,12,8,4,4,1,
+    10,2,2,1,14,1,14,1,8,2,10,8,16,1,6,3,
+    8,1,16,1,14,1,10,1,6,1,6,2,4,3,8,2,
+    10,1,2,1,14,1,14,1,6,2,4,1,8,2,6,1,
+    12,1,6,1,12,1,12,2,114,172,0,0,0,99,0,0,
+    0,0,0,0,0,0,0,0,0,0,4,0,0,0,64,0,
+    0,0,115,80,0,0,0,101,0,90,1,100,0,90,2,100,
+    1,90,3,100,2,90,4,100,3,90,5,100,4,90,6,101,
+    7,100,5,100,6,132,0,131,1,90,8,101,7,100,7,100,
+    8,132,0,131,1,90,9,101,7,100,14,100,10,100,11,132,
+    1,131,1,90,10,101,7,100,15,100,12,100,13,132,1,131,
+    1,90,11,100,9,83,0,41,16,218,21,87,105,110,100,111,
+    119,115,82,101,103,105,115,116,114,121,70,105,110,100,101,114,
+    122,62,77,101,116,97,32,112,97,116,104,32,102,105,110,100,
+    101,114,32,102,111,114,32,109,111,100,117,108,101,115,32,100,
+    101,99,108,97,114,101,100,32,105,110,32,116,104,101,32,87,
+    105,110,100,111,119,115,32,114,101,103,105,115,116,114,121,46,
+    122,59,83,111,102,116,119,97,114,101,92,80,121,116,104,111,
+    110,92,80,121,116,104,111,110,67,111,114,101,92,123,115,121,
+    115,95,118,101,114,115,105,111,110,125,92,77,111,100,117,108,
+    101,115,92,123,102,117,108,108,110,97,109,101,125,122,65,83,
+    111,102,116,119,97,114,101,92,80,121,116,104,111,110,92,80,
+    121,116,104,111,110,67,111,114,101,92,123,115,121,115,95,118,
+    101,114,115,105,111,110,125,92,77,111,100,117,108,101,115,92,
+    123,102,117,108,108,110,97,109,101,125,92,68,101,98,117,103,
+    70,99,2,0,0,0,0,0,0,0,2,0,0,0,8,0,
+    0,0,67,0,0,0,115,50,0,0,0,121,14,116,0,160,
+    1,116,0,106,2,124,1,161,2,83,0,4,0,116,3,107,
+    10,114,44,1,0,1,0,1,0,116,0,160,1,116,0,106,
+    4,124,1,161,2,83,0,88,0,100,0,83,0,41,1,78,
+    41,5,218,7,95,119,105,110,114,101,103,90,7,79,112,101,
+    110,75,101,121,90,17,72,75,69,89,95,67,85,82,82,69,
+    78,84,95,85,83,69,82,114,41,0,0,0,90,18,72,75,
+    69,89,95,76,79,67,65,76,95,77,65,67,72,73,78,69,
+    41,2,218,3,99,108,115,114,4,0,0,0,114,3,0,0,
+    0,114,3,0,0,0,114,5,0,0,0,218,14,95,111,112,
+    101,110,95,114,101,103,105,115,116,114,121,142,2,0,0,115,
+    8,0,0,0,0,2,2,1,14,1,14,1,122,36,87,105,
+    110,100,111,119,115,82,101,103,105,115,116,114,121,70,105,110,
+    100,101,114,46,95,111,112,101,110,95,114,101,103,105,115,116,
+    114,121,99,2,0,0,0,0,0,0,0,6,0,0,0,9,
+    0,0,0,67,0,0,0,115,112,0,0,0,124,0,106,0,
+    114,14,124,0,106,1,125,2,110,6,124,0,106,2,125,2,
+    124,2,106,3,124,1,100,1,116,4,106,5,100,0,100,2,
+    133,2,25,0,22,0,100,3,141,2,125,3,121,38,124,0,
+    160,6,124,3,161,1,143,18,125,4,116,7,160,8,124,4,
+    100,4,161,2,125,5,87,0,100,0,81,0,82,0,88,0,
+    87,0,110,20,4,0,116,9,107,10,114,106,1,0,1,0,
+    1,0,100,0,83,0,88,0,124,5,83,0,41,5,78,122,
+    5,37,100,46,37,100,114,58,0,0,0,41,2,114,123,0,
+    0,0,90,11,115,121,115,95,118,101,114,115,105,111,110,114,
+    31,0,0,0,41,10,218,11,68,69,66,85,71,95,66,85,
+    73,76,68,218,18,82,69,71,73,83,84,82,89,95,75,69,
+    89,95,68,69,66,85,71,218,12,82,69,71,73,83,84,82,
+    89,95,75,69,89,114,49,0,0,0,114,7,0,0,0,218,
+    12,118,101,114,115,105,111,110,95,105,110,102,111,114,176,0,
+    0,0,114,174,0,0,0,90,10,81,117,101,114,121,86,97,
+    108,117,101,114,41,0,0,0,41,6,114,175,0,0,0,114,
+    123,0,0,0,90,12,114,101,103,105,115,116,114,121,95,107,
+    101,121,114,4,0,0,0,90,4,104,107,101,121,218,8,102,
+    105,108,101,112,97,116,104,114,3,0,0,0,114,3,0,0,
+    0,114,5,0,0,0,218,16,95,115,101,97,114,99,104,95,
+    114,101,103,105,115,116,114,121,149,2,0,0,115,22,0,0,
+    0,0,2,6,1,8,2,6,1,6,1,22,1,2,1,12,
+    1,26,1,14,1,6,1,122,38,87,105,110,100,111,119,115,
+    82,101,103,105,115,116,114,121,70,105,110,100,101,114,46,95,
+    115,101,97,114,99,104,95,114,101,103,105,115,116,114,121,78,
+    99,4,0,0,0,0,0,0,0,8,0,0,0,8,0,0,
+    0,67,0,0,0,115,120,0,0,0,124,0,160,0,124,1,
+    161,1,125,4,124,4,100,0,107,8,114,22,100,0,83,0,
+    121,12,116,1,124,4,131,1,1,0,87,0,110,20,4,0,
+    116,2,107,10,114,54,1,0,1,0,1,0,100,0,83,0,
+    88,0,120,58,116,3,131,0,68,0,93,48,92,2,125,5,
+    125,6,124,4,160,4,116,5,124,6,131,1,161,1,114,64,
+    116,6,106,7,124,1,124,5,124,1,124,4,131,2,124,4,
+    100,1,141,3,125,7,124,7,83,0,113,64,87,0,100,0,
+    83,0,41,2,78,41,1,114,163,0,0,0,41,8,114,182,
+    0,0,0,114,40,0,0,0,114,41,0,0,0,114,166,0,
+    0,0,114,96,0,0,0,114,97,0,0,0,114,118,0,0,
+    0,218,16,115,112,101,99,95,102,114,111,109,95,108,111,97,
+    100,101,114,41,8,114,175,0,0,0,114,123,0,0,0,114,
+    36,0,0,0,218,6,116,97,114,103,101,116,114,181,0,0,
+    0,114,124,0,0,0,114,171,0,0,0,114,169,0,0,0,
+    114,3,0,0,0,114,3,0,0,0,114,5,0,0,0,218,
+    9,102,105,110,100,95,115,112,101,99,164,2,0,0,115,26,
+    0,0,0,0,2,10,1,8,1,4,1,2,1,12,1,14,
+    1,6,1,16,1,14,1,6,1,8,1,8,1,122,31,87,
     105,110,100,111,119,115,82,101,103,105,115,116,114,121,70,105,
-    110,100,101,114,46,95,115,101,97,114,99,104,95,114,101,103,
-    105,115,116,114,121,78,99,4,0,0,0,0,0,0,0,8,
-    0,0,0,8,0,0,0,67,0,0,0,115,120,0,0,0,
-    124,0,160,0,124,1,161,1,125,4,124,4,100,0,107,8,
-    114,22,100,0,83,0,121,12,116,1,124,4,131,1,1,0,
-    87,0,110,20,4,0,116,2,107,10,114,54,1,0,1,0,
-    1,0,100,0,83,0,88,0,120,58,116,3,131,0,68,0,
-    93,48,92,2,125,5,125,6,124,4,160,4,116,5,124,6,
-    131,1,161,1,114,64,116,6,106,7,124,1,124,5,124,1,
-    124,4,131,2,124,4,100,1,141,3,125,7,124,7,83,0,
-    113,64,87,0,100,0,83,0,41,2,78,41,1,114,160,0,
-    0,0,41,8,114,179,0,0,0,114,39,0,0,0,114,40,
-    0,0,0,114,163,0,0,0,114,94,0,0,0,114,95,0,
-    0,0,114,116,0,0,0,218,16,115,112,101,99,95,102,114,
-    111,109,95,108,111,97,100,101,114,41,8,114,172,0,0,0,
-    114,121,0,0,0,114,35,0,0,0,218,6,116,97,114,103,
-    101,116,114,178,0,0,0,114,122,0,0,0,114,168,0,0,
-    0,114,166,0,0,0,114,2,0,0,0,114,2,0,0,0,
-    114,4,0,0,0,218,9,102,105,110,100,95,115,112,101,99,
-    164,2,0,0,115,26,0,0,0,0,2,10,1,8,1,4,
-    1,2,1,12,1,14,1,6,1,16,1,14,1,6,1,8,
-    1,8,1,122,31,87,105,110,100,111,119,115,82,101,103,105,
-    115,116,114,121,70,105,110,100,101,114,46,102,105,110,100,95,
-    115,112,101,99,99,3,0,0,0,0,0,0,0,4,0,0,
-    0,4,0,0,0,67,0,0,0,115,34,0,0,0,124,0,
-    160,0,124,1,124,2,161,2,125,3,124,3,100,1,107,9,
-    114,26,124,3,106,1,83,0,100,1,83,0,100,1,83,0,
-    41,2,122,108,70,105,110,100,32,109,111,100,117,108,101,32,
-    110,97,109,101,100,32,105,110,32,116,104,101,32,114,101,103,
-    105,115,116,114,121,46,10,10,32,32,32,32,32,32,32,32,
-    84,104,105,115,32,109,101,116,104,111,100,32,105,115,32,100,
-    101,112,114,101,99,97,116,101,100,46,32,32,85,115,101,32,
-    101,120,101,99,95,109,111,100,117,108,101,40,41,32,105,110,
-    115,116,101,97,100,46,10,10,32,32,32,32,32,32,32,32,
-    78,41,2,114,182,0,0,0,114,122,0,0,0,41,4,114,
-    172,0,0,0,114,121,0,0,0,114,35,0,0,0,114,166,
-    0,0,0,114,2,0,0,0,114,2,0,0,0,114,4,0,
-    0,0,218,11,102,105,110,100,95,109,111,100,117,108,101,180,
-    2,0,0,115,8,0,0,0,0,7,12,1,8,1,6,2,
-    122,33,87,105,110,100,111,119,115,82,101,103,105,115,116,114,
-    121,70,105,110,100,101,114,46,102,105,110,100,95,109,111,100,
-    117,108,101,41,2,78,78,41,1,78,41,12,114,107,0,0,
-    0,114,106,0,0,0,114,108,0,0,0,114,109,0,0,0,
-    114,176,0,0,0,114,175,0,0,0,114,174,0,0,0,218,
-    11,99,108,97,115,115,109,101,116,104,111,100,114,173,0,0,
-    0,114,179,0,0,0,114,182,0,0,0,114,183,0,0,0,
-    114,2,0,0,0,114,2,0,0,0,114,2,0,0,0,114,
-    4,0,0,0,114,170,0,0,0,130,2,0,0,115,20,0,
-    0,0,8,2,4,3,4,3,4,2,4,2,12,7,12,15,
-    2,1,12,15,2,1,114,170,0,0,0,99,0,0,0,0,
-    0,0,0,0,0,0,0,0,2,0,0,0,64,0,0,0,
-    115,48,0,0,0,101,0,90,1,100,0,90,2,100,1,90,
-    3,100,2,100,3,132,0,90,4,100,4,100,5,132,0,90,
-    5,100,6,100,7,132,0,90,6,100,8,100,9,132,0,90,
-    7,100,10,83,0,41,11,218,13,95,76,111,97,100,101,114,
-    66,97,115,105,99,115,122,83,66,97,115,101,32,99,108,97,
-    115,115,32,111,102,32,99,111,109,109,111,110,32,99,111,100,
-    101,32,110,101,101,100,101,100,32,98,121,32,98,111,116,104,
-    32,83,111,117,114,99,101,76,111,97,100,101,114,32,97,110,
-    100,10,32,32,32,32,83,111,117,114,99,101,108,101,115,115,
-    70,105,108,101,76,111,97,100,101,114,46,99,2,0,0,0,
-    0,0,0,0,5,0,0,0,4,0,0,0,67,0,0,0,
-    115,64,0,0,0,116,0,124,0,160,1,124,1,161,1,131,
-    1,100,1,25,0,125,2,124,2,160,2,100,2,100,1,161,
-    2,100,3,25,0,125,3,124,1,160,3,100,2,161,1,100,
-    4,25,0,125,4,124,3,100,5,107,2,111,62,124,4,100,
-    5,107,3,83,0,41,6,122,141,67,111,110,99,114,101,116,
-    101,32,105,109,112,108,101,109,101,110,116,97,116,105,111,110,
-    32,111,102,32,73,110,115,112,101,99,116,76,111,97,100,101,
-    114,46,105,115,95,112,97,99,107,97,103,101,32,98,121,32,
-    99,104,101,99,107,105,110,103,32,105,102,10,32,32,32,32,
-    32,32,32,32,116,104,101,32,112,97,116,104,32,114,101,116,
-    117,114,110,101,100,32,98,121,32,103,101,116,95,102,105,108,
-    101,110,97,109,101,32,104,97,115,32,97,32,102,105,108,101,
-    110,97,109,101,32,111,102,32,39,95,95,105,110,105,116,95,
-    95,46,112,121,39,46,114,29,0,0,0,114,59,0,0,0,
-    114,60,0,0,0,114,57,0,0,0,218,8,95,95,105,110,
-    105,116,95,95,41,4,114,38,0,0,0,114,159,0,0,0,
-    114,34,0,0,0,114,32,0,0,0,41,5,114,102,0,0,
-    0,114,121,0,0,0,114,96,0,0,0,90,13,102,105,108,
-    101,110,97,109,101,95,98,97,115,101,90,9,116,97,105,108,
-    95,110,97,109,101,114,2,0,0,0,114,2,0,0,0,114,
-    4,0,0,0,114,161,0,0,0,199,2,0,0,115,8,0,
-    0,0,0,3,18,1,16,1,14,1,122,24,95,76,111,97,
-    100,101,114,66,97,115,105,99,115,46,105,115,95,112,97,99,
-    107,97,103,101,99,2,0,0,0,0,0,0,0,2,0,0,
-    0,1,0,0,0,67,0,0,0,115,4,0,0,0,100,1,
-    83,0,41,2,122,42,85,115,101,32,100,101,102,97,117,108,
-    116,32,115,101,109,97,110,116,105,99,115,32,102,111,114,32,
-    109,111,100,117,108,101,32,99,114,101,97,116,105,111,110,46,
-    78,114,2,0,0,0,41,2,114,102,0,0,0,114,166,0,
-    0,0,114,2,0,0,0,114,2,0,0,0,114,4,0,0,
-    0,218,13,99,114,101,97,116,101,95,109,111,100,117,108,101,
-    207,2,0,0,115,2,0,0,0,0,1,122,27,95,76,111,
-    97,100,101,114,66,97,115,105,99,115,46,99,114,101,97,116,
-    101,95,109,111,100,117,108,101,99,2,0,0,0,0,0,0,
-    0,3,0,0,0,5,0,0,0,67,0,0,0,115,56,0,
-    0,0,124,0,160,0,124,1,106,1,161,1,125,2,124,2,
-    100,1,107,8,114,36,116,2,100,2,160,3,124,1,106,1,
-    161,1,131,1,130,1,116,4,160,5,116,6,124,2,124,1,
-    106,7,161,3,1,0,100,1,83,0,41,3,122,19,69,120,
-    101,99,117,116,101,32,116,104,101,32,109,111,100,117,108,101,
-    46,78,122,52,99,97,110,110,111,116,32,108,111,97,100,32,
-    109,111,100,117,108,101,32,123,33,114,125,32,119,104,101,110,
-    32,103,101,116,95,99,111,100,101,40,41,32,114,101,116,117,
-    114,110,115,32,78,111,110,101,41,8,218,8,103,101,116,95,
-    99,111,100,101,114,107,0,0,0,114,101,0,0,0,114,48,
-    0,0,0,114,116,0,0,0,218,25,95,99,97,108,108,95,
-    119,105,116,104,95,102,114,97,109,101,115,95,114,101,109,111,
-    118,101,100,218,4,101,120,101,99,114,113,0,0,0,41,3,
-    114,102,0,0,0,218,6,109,111,100,117,108,101,114,144,0,
-    0,0,114,2,0,0,0,114,2,0,0,0,114,4,0,0,
-    0,218,11,101,120,101,99,95,109,111,100,117,108,101,210,2,
-    0,0,115,10,0,0,0,0,2,12,1,8,1,6,1,10,
-    1,122,25,95,76,111,97,100,101,114,66,97,115,105,99,115,
-    46,101,120,101,99,95,109,111,100,117,108,101,99,2,0,0,
-    0,0,0,0,0,2,0,0,0,4,0,0,0,67,0,0,
-    0,115,12,0,0,0,116,0,160,1,124,0,124,1,161,2,
-    83,0,41,1,122,26,84,104,105,115,32,109,111,100,117,108,
-    101,32,105,115,32,100,101,112,114,101,99,97,116,101,100,46,
-    41,2,114,116,0,0,0,218,17,95,108,111,97,100,95,109,
-    111,100,117,108,101,95,115,104,105,109,41,2,114,102,0,0,
-    0,114,121,0,0,0,114,2,0,0,0,114,2,0,0,0,
-    114,4,0,0,0,218,11,108,111,97,100,95,109,111,100,117,
-    108,101,218,2,0,0,115,2,0,0,0,0,2,122,25,95,
-    76,111,97,100,101,114,66,97,115,105,99,115,46,108,111,97,
-    100,95,109,111,100,117,108,101,78,41,8,114,107,0,0,0,
-    114,106,0,0,0,114,108,0,0,0,114,109,0,0,0,114,
-    161,0,0,0,114,187,0,0,0,114,192,0,0,0,114,194,
-    0,0,0,114,2,0,0,0,114,2,0,0,0,114,2,0,
-    0,0,114,4,0,0,0,114,185,0,0,0,194,2,0,0,
-    115,10,0,0,0,8,3,4,2,8,8,8,3,8,8,114,
-    185,0,0,0,99,0,0,0,0,0,0,0,0,0,0,0,
-    0,3,0,0,0,64,0,0,0,115,74,0,0,0,101,0,
-    90,1,100,0,90,2,100,1,100,2,132,0,90,3,100,3,
-    100,4,132,0,90,4,100,5,100,6,132,0,90,5,100,7,
-    100,8,132,0,90,6,100,9,100,10,132,0,90,7,100,11,
-    100,12,156,1,100,13,100,14,132,2,90,8,100,15,100,16,
-    132,0,90,9,100,17,83,0,41,18,218,12,83,111,117,114,
-    99,101,76,111,97,100,101,114,99,2,0,0,0,0,0,0,
-    0,2,0,0,0,1,0,0,0,67,0,0,0,115,8,0,
-    0,0,116,0,130,1,100,1,83,0,41,2,122,178,79,112,
-    116,105,111,110,97,108,32,109,101,116,104,111,100,32,116,104,
-    97,116,32,114,101,116,117,114,110,115,32,116,104,101,32,109,
-    111,100,105,102,105,99,97,116,105,111,110,32,116,105,109,101,
-    32,40,97,110,32,105,110,116,41,32,102,111,114,32,116,104,
-    101,10,32,32,32,32,32,32,32,32,115,112,101,99,105,102,
-    105,101,100,32,112,97,116,104,44,32,119,104,101,114,101,32,
-    112,97,116,104,32,105,115,32,97,32,115,116,114,46,10,10,
-    32,32,32,32,32,32,32,32,82,97,105,115,101,115,32,79,
-    83,69,114,114,111,114,32,119,104,101,110,32,116,104,101,32,
-    112,97,116,104,32,99,97,110,110,111,116,32,98,101,32,104,
-    97,110,100,108,101,100,46,10,32,32,32,32,32,32,32,32,
-    78,41,1,114,40,0,0,0,41,2,114,102,0,0,0,114,
-    35,0,0,0,114,2,0,0,0,114,2,0,0,0,114,4,
-    0,0,0,218,10,112,97,116,104,95,109,116,105,109,101,225,
-    2,0,0,115,2,0,0,0,0,6,122,23,83,111,117,114,
-    99,101,76,111,97,100,101,114,46,112,97,116,104,95,109,116,
-    105,109,101,99,2,0,0,0,0,0,0,0,2,0,0,0,
-    4,0,0,0,67,0,0,0,115,14,0,0,0,100,1,124,
-    0,160,0,124,1,161,1,105,1,83,0,41,2,97,170,1,
-    0,0,79,112,116,105,111,110,97,108,32,109,101,116,104,111,
-    100,32,114,101,116,117,114,110,105,110,103,32,97,32,109,101,
-    116,97,100,97,116,97,32,100,105,99,116,32,102,111,114,32,
-    116,104,101,32,115,112,101,99,105,102,105,101,100,32,112,97,
-    116,104,10,32,32,32,32,32,32,32,32,116,111,32,98,121,
-    32,116,104,101,32,112,97,116,104,32,40,115,116,114,41,46,
-    10,32,32,32,32,32,32,32,32,80,111,115,115,105,98,108,
-    101,32,107,101,121,115,58,10,32,32,32,32,32,32,32,32,
-    45,32,39,109,116,105,109,101,39,32,40,109,97,110,100,97,
-    116,111,114,121,41,32,105,115,32,116,104,101,32,110,117,109,
-    101,114,105,99,32,116,105,109,101,115,116,97,109,112,32,111,
-    102,32,108,97,115,116,32,115,111,117,114,99,101,10,32,32,
-    32,32,32,32,32,32,32,32,99,111,100,101,32,109,111,100,
-    105,102,105,99,97,116,105,111,110,59,10,32,32,32,32,32,
-    32,32,32,45,32,39,115,105,122,101,39,32,40,111,112,116,
-    105,111,110,97,108,41,32,105,115,32,116,104,101,32,115,105,
-    122,101,32,105,110,32,98,121,116,101,115,32,111,102,32,116,
-    104,101,32,115,111,117,114,99,101,32,99,111,100,101,46,10,
-    10,32,32,32,32,32,32,32,32,73,109,112,108,101,109,101,
-    110,116,105,110,103,32,116,104,105,115,32,109,101,116,104,111,
-    100,32,97,108,108,111,119,115,32,116,104,101,32,108,111,97,
-    100,101,114,32,116,111,32,114,101,97,100,32,98,121,116,101,
-    99,111,100,101,32,102,105,108,101,115,46,10,32,32,32,32,
-    32,32,32,32,82,97,105,115,101,115,32,79,83,69,114,114,
-    111,114,32,119,104,101,110,32,116,104,101,32,112,97,116,104,
-    32,99,97,110,110,111,116,32,98,101,32,104,97,110,100,108,
-    101,100,46,10,32,32,32,32,32,32,32,32,114,149,0,0,
-    0,41,1,114,196,0,0,0,41,2,114,102,0,0,0,114,
-    35,0,0,0,114,2,0,0,0,114,2,0,0,0,114,4,
-    0,0,0,218,10,112,97,116,104,95,115,116,97,116,115,233,
-    2,0,0,115,2,0,0,0,0,11,122,23,83,111,117,114,
-    99,101,76,111,97,100,101,114,46,112,97,116,104,95,115,116,
-    97,116,115,99,4,0,0,0,0,0,0,0,4,0,0,0,
-    4,0,0,0,67,0,0,0,115,12,0,0,0,124,0,160,
-    0,124,2,124,3,161,2,83,0,41,1,122,228,79,112,116,
-    105,111,110,97,108,32,109,101,116,104,111,100,32,119,104,105,
-    99,104,32,119,114,105,116,101,115,32,100,97,116,97,32,40,
-    98,121,116,101,115,41,32,116,111,32,97,32,102,105,108,101,
-    32,112,97,116,104,32,40,97,32,115,116,114,41,46,10,10,
-    32,32,32,32,32,32,32,32,73,109,112,108,101,109,101,110,
-    116,105,110,103,32,116,104,105,115,32,109,101,116,104,111,100,
-    32,97,108,108,111,119,115,32,102,111,114,32,116,104,101,32,
-    119,114,105,116,105,110,103,32,111,102,32,98,121,116,101,99,
-    111,100,101,32,102,105,108,101,115,46,10,10,32,32,32,32,
-    32,32,32,32,84,104,101,32,115,111,117,114,99,101,32,112,
-    97,116,104,32,105,115,32,110,101,101,100,101,100,32,105,110,
-    32,111,114,100,101,114,32,116,111,32,99,111,114,114,101,99,
-    116,108,121,32,116,114,97,110,115,102,101,114,32,112,101,114,
-    109,105,115,115,105,111,110,115,10,32,32,32,32,32,32,32,
-    32,41,1,218,8,115,101,116,95,100,97,116,97,41,4,114,
-    102,0,0,0,114,92,0,0,0,90,10,99,97,99,104,101,
-    95,112,97,116,104,114,54,0,0,0,114,2,0,0,0,114,
-    2,0,0,0,114,4,0,0,0,218,15,95,99,97,99,104,
-    101,95,98,121,116,101,99,111,100,101,246,2,0,0,115,2,
-    0,0,0,0,8,122,28,83,111,117,114,99,101,76,111,97,
-    100,101,114,46,95,99,97,99,104,101,95,98,121,116,101,99,
-    111,100,101,99,3,0,0,0,0,0,0,0,3,0,0,0,
-    1,0,0,0,67,0,0,0,115,4,0,0,0,100,1,83,
-    0,41,2,122,150,79,112,116,105,111,110,97,108,32,109,101,
-    116,104,111,100,32,119,104,105,99,104,32,119,114,105,116,101,
-    115,32,100,97,116,97,32,40,98,121,116,101,115,41,32,116,
-    111,32,97,32,102,105,108,101,32,112,97,116,104,32,40,97,
-    32,115,116,114,41,46,10,10,32,32,32,32,32,32,32,32,
-    73,109,112,108,101,109,101,110,116,105,110,103,32,116,104,105,
-    115,32,109,101,116,104,111,100,32,97,108,108,111,119,115,32,
-    102,111,114,32,116,104,101,32,119,114,105,116,105,110,103,32,
-    111,102,32,98,121,116,101,99,111,100,101,32,102,105,108,101,
-    115,46,10,32,32,32,32,32,32,32,32,78,114,2,0,0,
-    0,41,3,114,102,0,0,0,114,35,0,0,0,114,54,0,
-    0,0,114,2,0,0,0,114,2,0,0,0,114,4,0,0,
-    0,114,198,0,0,0,0,3,0,0,115,2,0,0,0,0,
-    4,122,21,83,111,117,114,99,101,76,111,97,100,101,114,46,
-    115,101,116,95,100,97,116,97,99,2,0,0,0,0,0,0,
-    0,5,0,0,0,10,0,0,0,67,0,0,0,115,82,0,
-    0,0,124,0,160,0,124,1,161,1,125,2,121,14,124,0,
-    160,1,124,2,161,1,125,3,87,0,110,48,4,0,116,2,
-    107,10,114,72,1,0,125,4,1,0,122,18,116,3,100,1,
-    124,1,100,2,141,2,124,4,130,2,87,0,100,3,100,3,
-    125,4,126,4,88,0,89,0,110,2,88,0,116,4,124,3,
-    131,1,83,0,41,4,122,52,67,111,110,99,114,101,116,101,
-    32,105,109,112,108,101,109,101,110,116,97,116,105,111,110,32,
-    111,102,32,73,110,115,112,101,99,116,76,111,97,100,101,114,
-    46,103,101,116,95,115,111,117,114,99,101,46,122,39,115,111,
-    117,114,99,101,32,110,111,116,32,97,118,97,105,108,97,98,
-    108,101,32,116,104,114,111,117,103,104,32,103,101,116,95,100,
-    97,116,97,40,41,41,1,114,100,0,0,0,78,41,5,114,
-    159,0,0,0,218,8,103,101,116,95,100,97,116,97,114,40,
-    0,0,0,114,101,0,0,0,114,157,0,0,0,41,5,114,
-    102,0,0,0,114,121,0,0,0,114,35,0,0,0,114,155,
-    0,0,0,218,3,101,120,99,114,2,0,0,0,114,2,0,
-    0,0,114,4,0,0,0,218,10,103,101,116,95,115,111,117,
-    114,99,101,7,3,0,0,115,14,0,0,0,0,2,10,1,
-    2,1,14,1,16,1,4,1,28,1,122,23,83,111,117,114,
-    99,101,76,111,97,100,101,114,46,103,101,116,95,115,111,117,
-    114,99,101,114,89,0,0,0,41,1,218,9,95,111,112,116,
-    105,109,105,122,101,99,3,0,0,0,1,0,0,0,4,0,
-    0,0,8,0,0,0,67,0,0,0,115,22,0,0,0,116,
-    0,106,1,116,2,124,1,124,2,100,1,100,2,124,3,100,
-    3,141,6,83,0,41,4,122,130,82,101,116,117,114,110,32,
-    116,104,101,32,99,111,100,101,32,111,98,106,101,99,116,32,
-    99,111,109,112,105,108,101,100,32,102,114,111,109,32,115,111,
-    117,114,99,101,46,10,10,32,32,32,32,32,32,32,32,84,
-    104,101,32,39,100,97,116,97,39,32,97,114,103,117,109,101,
-    110,116,32,99,97,110,32,98,101,32,97,110,121,32,111,98,
-    106,101,99,116,32,116,121,112,101,32,116,104,97,116,32,99,
-    111,109,112,105,108,101,40,41,32,115,117,112,112,111,114,116,
-    115,46,10,32,32,32,32,32,32,32,32,114,190,0,0,0,
-    84,41,2,218,12,100,111,110,116,95,105,110,104,101,114,105,
-    116,114,70,0,0,0,41,3,114,116,0,0,0,114,189,0,
-    0,0,218,7,99,111,109,112,105,108,101,41,4,114,102,0,
-    0,0,114,54,0,0,0,114,35,0,0,0,114,203,0,0,
-    0,114,2,0,0,0,114,2,0,0,0,114,4,0,0,0,
-    218,14,115,111,117,114,99,101,95,116,111,95,99,111,100,101,
-    17,3,0,0,115,4,0,0,0,0,5,12,1,122,27,83,
-    111,117,114,99,101,76,111,97,100,101,114,46,115,111,117,114,
-    99,101,95,116,111,95,99,111,100,101,99,2,0,0,0,0,
-    0,0,0,15,0,0,0,9,0,0,0,67,0,0,0,115,
-    46,2,0,0,124,0,160,0,124,1,161,1,125,2,100,1,
-    125,3,100,1,125,4,100,1,125,5,100,2,125,6,100,3,
-    125,7,121,12,116,1,124,2,131,1,125,8,87,0,110,26,
-    4,0,116,2,107,10,114,68,1,0,1,0,1,0,100,1,
-    125,8,89,0,144,1,110,48,88,0,121,14,124,0,160,3,
-    124,2,161,1,125,9,87,0,110,22,4,0,116,4,107,10,
-    114,106,1,0,1,0,1,0,89,0,144,1,110,10,88,0,
-    116,5,124,9,100,4,25,0,131,1,125,3,121,14,124,0,
-    160,6,124,8,161,1,125,10,87,0,110,20,4,0,116,4,
-    107,10,114,154,1,0,1,0,1,0,89,0,110,218,88,0,
-    124,1,124,8,100,5,156,2,125,11,121,148,116,7,124,10,
-    124,1,124,11,131,3,125,12,116,8,124,10,131,1,100,6,
-    100,1,133,2,25,0,125,13,124,12,100,7,64,0,100,8,
-    107,3,125,6,124,6,144,1,114,36,124,12,100,9,64,0,
-    100,8,107,3,125,7,116,9,106,10,100,10,107,3,144,1,
-    114,56,124,7,115,254,116,9,106,10,100,11,107,2,144,1,
-    114,56,124,0,160,6,124,2,161,1,125,4,116,9,160,11,
-    116,12,124,4,161,2,125,5,116,13,124,10,124,5,124,1,
-    124,11,131,4,1,0,110,20,116,14,124,10,124,3,124,9,
-    100,12,25,0,124,1,124,11,131,5,1,0,87,0,110,26,
-    4,0,116,15,116,16,102,2,107,10,144,1,114,84,1,0,
-    1,0,1,0,89,0,110,32,88,0,116,17,160,18,100,13,
-    124,8,124,2,161,3,1,0,116,19,124,13,124,1,124,8,
-    124,2,100,14,141,4,83,0,124,4,100,1,107,8,144,1,
-    114,136,124,0,160,6,124,2,161,1,125,4,124,0,160,20,
-    124,4,124,2,161,2,125,14,116,17,160,18,100,15,124,2,
-    161,2,1,0,116,21,106,22,144,2,115,42,124,8,100,1,
-    107,9,144,2,114,42,124,3,100,1,107,9,144,2,114,42,
-    124,6,144,1,114,228,124,5,100,1,107,8,144,1,114,214,
-    116,9,160,11,124,4,161,1,125,5,116,23,124,14,124,5,
-    124,7,131,3,125,10,110,16,116,24,124,14,124,3,116,25,
-    124,4,131,1,131,3,125,10,121,30,124,0,160,26,124,2,
-    124,8,124,10,161,3,1,0,116,17,160,18,100,16,124,8,
-    161,2,1,0,87,0,110,22,4,0,116,2,107,10,144,2,
-    114,40,1,0,1,0,1,0,89,0,110,2,88,0,124,14,
-    83,0,41,17,122,190,67,111,110,99,114,101,116,101,32,105,
-    109,112,108,101,109,101,110,116,97,116,105,111,110,32,111,102,
-    32,73,110,115,112,101,99,116,76,111,97,100,101,114,46,103,
-    101,116,95,99,111,100,101,46,10,10,32,32,32,32,32,32,
-    32,32,82,101,97,100,105,110,103,32,111,102,32,98,121,116,
-    101,99,111,100,101,32,114,101,113,117,105,114,101,115,32,112,
-    97,116,104,95,115,116,97,116,115,32,116,111,32,98,101,32,
-    105,109,112,108,101,109,101,110,116,101,100,46,32,84,111,32,
-    119,114,105,116,101,10,32,32,32,32,32,32,32,32,98,121,
-    116,101,99,111,100,101,44,32,115,101,116,95,100,97,116,97,
-    32,109,117,115,116,32,97,108,115,111,32,98,101,32,105,109,
-    112,108,101,109,101,110,116,101,100,46,10,10,32,32,32,32,
-    32,32,32,32,78,70,84,114,149,0,0,0,41,2,114,100,
-    0,0,0,114,35,0,0,0,114,126,0,0,0,114,29,0,
-    0,0,114,60,0,0,0,114,57,0,0,0,90,5,110,101,
-    118,101,114,90,6,97,108,119,97,121,115,218,4,115,105,122,
-    101,122,13,123,125,32,109,97,116,99,104,101,115,32,123,125,
-    41,3,114,100,0,0,0,114,91,0,0,0,114,92,0,0,
-    0,122,19,99,111,100,101,32,111,98,106,101,99,116,32,102,
-    114,111,109,32,123,125,122,10,119,114,111,116,101,32,123,33,
-    114,125,41,27,114,159,0,0,0,114,81,0,0,0,114,68,
-    0,0,0,114,197,0,0,0,114,40,0,0,0,114,14,0,
-    0,0,114,200,0,0,0,114,133,0,0,0,218,10,109,101,
-    109,111,114,121,118,105,101,119,114,143,0,0,0,90,21,99,
-    104,101,99,107,95,104,97,115,104,95,98,97,115,101,100,95,
-    112,121,99,115,114,138,0,0,0,218,17,95,82,65,87,95,
-    77,65,71,73,67,95,78,85,77,66,69,82,114,139,0,0,
-    0,114,137,0,0,0,114,101,0,0,0,114,131,0,0,0,
-    114,116,0,0,0,114,130,0,0,0,114,145,0,0,0,114,
-    206,0,0,0,114,6,0,0,0,218,19,100,111,110,116,95,
-    119,114,105,116,101,95,98,121,116,101,99,111,100,101,114,152,
-    0,0,0,114,150,0,0,0,114,31,0,0,0,114,199,0,
-    0,0,41,15,114,102,0,0,0,114,121,0,0,0,114,92,
-    0,0,0,114,135,0,0,0,114,155,0,0,0,114,138,0,
-    0,0,90,10,104,97,115,104,95,98,97,115,101,100,90,12,
-    99,104,101,99,107,95,115,111,117,114,99,101,114,91,0,0,
-    0,218,2,115,116,114,54,0,0,0,114,132,0,0,0,114,
-    69,0,0,0,90,10,98,121,116,101,115,95,100,97,116,97,
-    90,11,99,111,100,101,95,111,98,106,101,99,116,114,2,0,
-    0,0,114,2,0,0,0,114,4,0,0,0,114,188,0,0,
-    0,25,3,0,0,115,134,0,0,0,0,7,10,1,4,1,
-    4,1,4,1,4,1,4,1,2,1,12,1,14,1,12,2,
-    2,1,14,1,14,1,8,2,12,1,2,1,14,1,14,1,
-    6,3,2,1,8,2,2,1,12,1,16,1,12,1,6,1,
-    12,1,12,1,4,1,12,1,10,1,4,1,2,1,6,2,
-    8,1,8,2,2,1,2,1,2,1,6,1,2,1,10,2,
-    20,1,6,2,8,1,6,1,6,1,2,1,8,1,10,1,
-    10,1,12,1,12,1,18,1,10,1,6,1,10,1,10,1,
-    14,2,6,1,10,1,2,1,14,1,16,1,16,1,6,1,
-    122,21,83,111,117,114,99,101,76,111,97,100,101,114,46,103,
-    101,116,95,99,111,100,101,78,41,10,114,107,0,0,0,114,
-    106,0,0,0,114,108,0,0,0,114,196,0,0,0,114,197,
-    0,0,0,114,199,0,0,0,114,198,0,0,0,114,202,0,
-    0,0,114,206,0,0,0,114,188,0,0,0,114,2,0,0,
-    0,114,2,0,0,0,114,2,0,0,0,114,4,0,0,0,
-    114,195,0,0,0,223,2,0,0,115,14,0,0,0,8,2,
-    8,8,8,13,8,10,8,7,8,10,14,8,114,195,0,0,
-    0,99,0,0,0,0,0,0,0,0,0,0,0,0,4,0,
-    0,0,0,0,0,0,115,124,0,0,0,101,0,90,1,100,
-    0,90,2,100,1,90,3,100,2,100,3,132,0,90,4,100,
-    4,100,5,132,0,90,5,100,6,100,7,132,0,90,6,101,
-    7,135,0,102,1,100,8,100,9,132,8,131,1,90,8,101,
-    7,100,10,100,11,132,0,131,1,90,9,100,12,100,13,132,
-    0,90,10,101,7,100,14,100,15,132,0,131,1,90,11,100,
-    16,100,17,132,0,90,12,100,18,100,19,132,0,90,13,100,
-    20,100,21,132,0,90,14,100,22,100,23,132,0,90,15,135,
-    0,4,0,90,16,83,0,41,24,218,10,70,105,108,101,76,
-    111,97,100,101,114,122,103,66,97,115,101,32,102,105,108,101,
-    32,108,111,97,100,101,114,32,99,108,97,115,115,32,119,104,
-    105,99,104,32,105,109,112,108,101,109,101,110,116,115,32,116,
-    104,101,32,108,111,97,100,101,114,32,112,114,111,116,111,99,
-    111,108,32,109,101,116,104,111,100,115,32,116,104,97,116,10,
-    32,32,32,32,114,101,113,117,105,114,101,32,102,105,108,101,
-    32,115,121,115,116,101,109,32,117,115,97,103,101,46,99,3,
-    0,0,0,0,0,0,0,3,0,0,0,2,0,0,0,67,
-    0,0,0,115,16,0,0,0,124,1,124,0,95,0,124,2,
-    124,0,95,1,100,1,83,0,41,2,122,75,67,97,99,104,
-    101,32,116,104,101,32,109,111,100,117,108,101,32,110,97,109,
-    101,32,97,110,100,32,116,104,101,32,112,97,116,104,32,116,
-    111,32,116,104,101,32,102,105,108,101,32,102,111,117,110,100,
-    32,98,121,32,116,104,101,10,32,32,32,32,32,32,32,32,
-    102,105,110,100,101,114,46,78,41,2,114,100,0,0,0,114,
-    35,0,0,0,41,3,114,102,0,0,0,114,121,0,0,0,
-    114,35,0,0,0,114,2,0,0,0,114,2,0,0,0,114,
-    4,0,0,0,114,186,0,0,0,116,3,0,0,115,4,0,
-    0,0,0,3,6,1,122,19,70,105,108,101,76,111,97,100,
-    101,114,46,95,95,105,110,105,116,95,95,99,2,0,0,0,
-    0,0,0,0,2,0,0,0,2,0,0,0,67,0,0,0,
-    115,24,0,0,0,124,0,106,0,124,1,106,0,107,2,111,
-    22,124,0,106,1,124,1,106,1,107,2,83,0,41,1,78,
-    41,2,218,9,95,95,99,108,97,115,115,95,95,114,113,0,
-    0,0,41,2,114,102,0,0,0,218,5,111,116,104,101,114,
-    114,2,0,0,0,114,2,0,0,0,114,4,0,0,0,218,
-    6,95,95,101,113,95,95,122,3,0,0,115,4,0,0,0,
-    0,1,12,1,122,17,70,105,108,101,76,111,97,100,101,114,
-    46,95,95,101,113,95,95,99,1,0,0,0,0,0,0,0,
-    1,0,0,0,3,0,0,0,67,0,0,0,115,20,0,0,
-    0,116,0,124,0,106,1,131,1,116,0,124,0,106,2,131,
-    1,65,0,83,0,41,1,78,41,3,218,4,104,97,115,104,
-    114,100,0,0,0,114,35,0,0,0,41,1,114,102,0,0,
-    0,114,2,0,0,0,114,2,0,0,0,114,4,0,0,0,
-    218,8,95,95,104,97,115,104,95,95,126,3,0,0,115,2,
-    0,0,0,0,1,122,19,70,105,108,101,76,111,97,100,101,
-    114,46,95,95,104,97,115,104,95,95,99,2,0,0,0,0,
-    0,0,0,2,0,0,0,3,0,0,0,3,0,0,0,115,
-    16,0,0,0,116,0,116,1,124,0,131,2,160,2,124,1,
-    161,1,83,0,41,1,122,100,76,111,97,100,32,97,32,109,
-    111,100,117,108,101,32,102,114,111,109,32,97,32,102,105,108,
-    101,46,10,10,32,32,32,32,32,32,32,32,84,104,105,115,
-    32,109,101,116,104,111,100,32,105,115,32,100,101,112,114,101,
-    99,97,116,101,100,46,32,32,85,115,101,32,101,120,101,99,
-    95,109,111,100,117,108,101,40,41,32,105,110,115,116,101,97,
-    100,46,10,10,32,32,32,32,32,32,32,32,41,3,218,5,
-    115,117,112,101,114,114,212,0,0,0,114,194,0,0,0,41,
-    2,114,102,0,0,0,114,121,0,0,0,41,1,114,213,0,
-    0,0,114,2,0,0,0,114,4,0,0,0,114,194,0,0,
-    0,129,3,0,0,115,2,0,0,0,0,10,122,22,70,105,
-    108,101,76,111,97,100,101,114,46,108,111,97,100,95,109,111,
-    100,117,108,101,99,2,0,0,0,0,0,0,0,2,0,0,
-    0,1,0,0,0,67,0,0,0,115,6,0,0,0,124,0,
-    106,0,83,0,41,1,122,58,82,101,116,117,114,110,32,116,
-    104,101,32,112,97,116,104,32,116,111,32,116,104,101,32,115,
-    111,117,114,99,101,32,102,105,108,101,32,97,115,32,102,111,
-    117,110,100,32,98,121,32,116,104,101,32,102,105,110,100,101,
-    114,46,41,1,114,35,0,0,0,41,2,114,102,0,0,0,
-    114,121,0,0,0,114,2,0,0,0,114,2,0,0,0,114,
-    4,0,0,0,114,159,0,0,0,141,3,0,0,115,2,0,
-    0,0,0,3,122,23,70,105,108,101,76,111,97,100,101,114,
-    46,103,101,116,95,102,105,108,101,110,97,109,101,99,2,0,
-    0,0,0,0,0,0,3,0,0,0,9,0,0,0,67,0,
-    0,0,115,32,0,0,0,116,0,160,1,124,1,100,1,161,
-    2,143,10,125,2,124,2,160,2,161,0,83,0,81,0,82,
-    0,88,0,100,2,83,0,41,3,122,39,82,101,116,117,114,
-    110,32,116,104,101,32,100,97,116,97,32,102,114,111,109,32,
-    112,97,116,104,32,97,115,32,114,97,119,32,98,121,116,101,
-    115,46,218,1,114,78,41,3,114,50,0,0,0,114,51,0,
-    0,0,90,4,114,101,97,100,41,3,114,102,0,0,0,114,
-    35,0,0,0,114,55,0,0,0,114,2,0,0,0,114,2,
-    0,0,0,114,4,0,0,0,114,200,0,0,0,146,3,0,
-    0,115,4,0,0,0,0,2,14,1,122,19,70,105,108,101,
-    76,111,97,100,101,114,46,103,101,116,95,100,97,116,97,99,
-    2,0,0,0,0,0,0,0,2,0,0,0,3,0,0,0,
-    67,0,0,0,115,18,0,0,0,124,0,160,0,124,1,161,
-    1,114,14,124,0,83,0,100,0,83,0,41,1,78,41,1,
-    114,161,0,0,0,41,2,114,102,0,0,0,114,191,0,0,
-    0,114,2,0,0,0,114,2,0,0,0,114,4,0,0,0,
-    218,19,103,101,116,95,114,101,115,111,117,114,99,101,95,114,
-    101,97,100,101,114,153,3,0,0,115,6,0,0,0,0,2,
-    10,1,4,1,122,30,70,105,108,101,76,111,97,100,101,114,
-    46,103,101,116,95,114,101,115,111,117,114,99,101,95,114,101,
-    97,100,101,114,99,2,0,0,0,0,0,0,0,3,0,0,
-    0,4,0,0,0,67,0,0,0,115,32,0,0,0,116,0,
-    116,1,124,0,106,2,131,1,100,1,25,0,124,1,131,2,
-    125,2,116,3,160,4,124,2,100,2,161,2,83,0,41,3,
-    78,114,60,0,0,0,114,219,0,0,0,41,5,114,28,0,
-    0,0,114,38,0,0,0,114,35,0,0,0,114,50,0,0,
-    0,114,51,0,0,0,41,3,114,102,0,0,0,218,8,114,
-    101,115,111,117,114,99,101,114,35,0,0,0,114,2,0,0,
-    0,114,2,0,0,0,114,4,0,0,0,218,13,111,112,101,
-    110,95,114,101,115,111,117,114,99,101,159,3,0,0,115,4,
-    0,0,0,0,1,20,1,122,24,70,105,108,101,76,111,97,
-    100,101,114,46,111,112,101,110,95,114,101,115,111,117,114,99,
-    101,99,2,0,0,0,0,0,0,0,3,0,0,0,3,0,
-    0,0,67,0,0,0,115,38,0,0,0,124,0,160,0,124,
-    1,161,1,115,14,116,1,130,1,116,2,116,3,124,0,106,
-    4,131,1,100,1,25,0,124,1,131,2,125,2,124,2,83,
-    0,41,2,78,114,60,0,0,0,41,5,218,11,105,115,95,
-    114,101,115,111,117,114,99,101,218,17,70,105,108,101,78,111,
-    116,70,111,117,110,100,69,114,114,111,114,114,28,0,0,0,
-    114,38,0,0,0,114,35,0,0,0,41,3,114,102,0,0,
-    0,114,221,0,0,0,114,35,0,0,0,114,2,0,0,0,
-    114,2,0,0,0,114,4,0,0,0,218,13,114,101,115,111,
-    117,114,99,101,95,112,97,116,104,163,3,0,0,115,8,0,
-    0,0,0,1,10,1,4,1,20,1,122,24,70,105,108,101,
-    76,111,97,100,101,114,46,114,101,115,111,117,114,99,101,95,
-    112,97,116,104,99,2,0,0,0,0,0,0,0,3,0,0,
-    0,3,0,0,0,67,0,0,0,115,40,0,0,0,116,0,
-    124,1,107,6,114,12,100,1,83,0,116,1,116,2,124,0,
-    106,3,131,1,100,2,25,0,124,1,131,2,125,2,116,4,
-    124,2,131,1,83,0,41,3,78,70,114,60,0,0,0,41,
-    5,114,25,0,0,0,114,28,0,0,0,114,38,0,0,0,
-    114,35,0,0,0,114,44,0,0,0,41,3,114,102,0,0,
-    0,114,100,0,0,0,114,35,0,0,0,114,2,0,0,0,
-    114,2,0,0,0,114,4,0,0,0,114,223,0,0,0,169,
-    3,0,0,115,8,0,0,0,0,1,8,1,4,1,20,1,
-    122,22,70,105,108,101,76,111,97,100,101,114,46,105,115,95,
-    114,101,115,111,117,114,99,101,99,1,0,0,0,0,0,0,
-    0,1,0,0,0,5,0,0,0,67,0,0,0,115,24,0,
-    0,0,116,0,116,1,160,2,116,3,124,0,106,4,131,1,
-    100,1,25,0,161,1,131,1,83,0,41,2,78,114,60,0,
-    0,0,41,5,218,4,105,116,101,114,114,1,0,0,0,218,
-    7,108,105,115,116,100,105,114,114,38,0,0,0,114,35,0,
-    0,0,41,1,114,102,0,0,0,114,2,0,0,0,114,2,
-    0,0,0,114,4,0,0,0,218,8,99,111,110,116,101,110,
-    116,115,175,3,0,0,115,2,0,0,0,0,1,122,19,70,
-    105,108,101,76,111,97,100,101,114,46,99,111,110,116,101,110,
-    116,115,41,17,114,107,0,0,0,114,106,0,0,0,114,108,
-    0,0,0,114,109,0,0,0,114,186,0,0,0,114,215,0,
-    0,0,114,217,0,0,0,114,118,0,0,0,114,194,0,0,
-    0,114,159,0,0,0,114,200,0,0,0,114,220,0,0,0,
-    114,222,0,0,0,114,225,0,0,0,114,223,0,0,0,114,
-    228,0,0,0,90,13,95,95,99,108,97,115,115,99,101,108,
-    108,95,95,114,2,0,0,0,114,2,0,0,0,41,1,114,
-    213,0,0,0,114,4,0,0,0,114,212,0,0,0,111,3,
-    0,0,115,24,0,0,0,8,3,4,2,8,6,8,4,8,
-    3,16,12,12,5,8,7,12,6,8,4,8,6,8,6,114,
-    212,0,0,0,99,0,0,0,0,0,0,0,0,0,0,0,
-    0,3,0,0,0,64,0,0,0,115,46,0,0,0,101,0,
-    90,1,100,0,90,2,100,1,90,3,100,2,100,3,132,0,
-    90,4,100,4,100,5,132,0,90,5,100,6,100,7,156,1,
-    100,8,100,9,132,2,90,6,100,10,83,0,41,11,218,16,
-    83,111,117,114,99,101,70,105,108,101,76,111,97,100,101,114,
-    122,62,67,111,110,99,114,101,116,101,32,105,109,112,108,101,
-    109,101,110,116,97,116,105,111,110,32,111,102,32,83,111,117,
-    114,99,101,76,111,97,100,101,114,32,117,115,105,110,103,32,
-    116,104,101,32,102,105,108,101,32,115,121,115,116,101,109,46,
-    99,2,0,0,0,0,0,0,0,3,0,0,0,3,0,0,
-    0,67,0,0,0,115,22,0,0,0,116,0,124,1,131,1,
-    125,2,124,2,106,1,124,2,106,2,100,1,156,2,83,0,
-    41,2,122,33,82,101,116,117,114,110,32,116,104,101,32,109,
-    101,116,97,100,97,116,97,32,102,111,114,32,116,104,101,32,
-    112,97,116,104,46,41,2,114,149,0,0,0,114,207,0,0,
-    0,41,3,114,39,0,0,0,218,8,115,116,95,109,116,105,
-    109,101,90,7,115,116,95,115,105,122,101,41,3,114,102,0,
-    0,0,114,35,0,0,0,114,211,0,0,0,114,2,0,0,
-    0,114,2,0,0,0,114,4,0,0,0,114,197,0,0,0,
-    183,3,0,0,115,4,0,0,0,0,2,8,1,122,27,83,
-    111,117,114,99,101,70,105,108,101,76,111,97,100,101,114,46,
-    112,97,116,104,95,115,116,97,116,115,99,4,0,0,0,0,
-    0,0,0,5,0,0,0,5,0,0,0,67,0,0,0,115,
-    24,0,0,0,116,0,124,1,131,1,125,4,124,0,106,1,
-    124,2,124,3,124,4,100,1,141,3,83,0,41,2,78,41,
-    1,218,5,95,109,111,100,101,41,2,114,99,0,0,0,114,
-    198,0,0,0,41,5,114,102,0,0,0,114,92,0,0,0,
-    114,91,0,0,0,114,54,0,0,0,114,42,0,0,0,114,
-    2,0,0,0,114,2,0,0,0,114,4,0,0,0,114,199,
-    0,0,0,188,3,0,0,115,4,0,0,0,0,2,8,1,
-    122,32,83,111,117,114,99,101,70,105,108,101,76,111,97,100,
-    101,114,46,95,99,97,99,104,101,95,98,121,116,101,99,111,
-    100,101,105,182,1,0,0,41,1,114,231,0,0,0,99,3,
-    0,0,0,1,0,0,0,9,0,0,0,11,0,0,0,67,
-    0,0,0,115,250,0,0,0,116,0,124,1,131,1,92,2,
-    125,4,125,5,103,0,125,6,120,38,124,4,114,54,116,1,
-    124,4,131,1,115,54,116,0,124,4,131,1,92,2,125,4,
-    125,7,124,6,160,2,124,7,161,1,1,0,113,18,87,0,
-    120,110,116,3,124,6,131,1,68,0,93,98,125,7,116,4,
-    124,4,124,7,131,2,125,4,121,14,116,5,160,6,124,4,
-    161,1,1,0,87,0,113,66,4,0,116,7,107,10,114,116,
-    1,0,1,0,1,0,119,66,89,0,113,66,4,0,116,8,
-    107,10,114,162,1,0,125,8,1,0,122,18,116,9,160,10,
-    100,1,124,4,124,8,161,3,1,0,100,2,83,0,100,2,
-    125,8,126,8,88,0,89,0,113,66,88,0,113,66,87,0,
-    121,28,116,11,124,1,124,2,124,3,131,3,1,0,116,9,
-    160,10,100,3,124,1,161,2,1,0,87,0,110,48,4,0,
-    116,8,107,10,114,244,1,0,125,8,1,0,122,18,116,9,
-    160,10,100,1,124,1,124,8,161,3,1,0,87,0,100,2,
-    100,2,125,8,126,8,88,0,89,0,110,2,88,0,100,2,
-    83,0,41,4,122,27,87,114,105,116,101,32,98,121,116,101,
-    115,32,100,97,116,97,32,116,111,32,97,32,102,105,108,101,
-    46,122,27,99,111,117,108,100,32,110,111,116,32,99,114,101,
-    97,116,101,32,123,33,114,125,58,32,123,33,114,125,78,122,
-    12,99,114,101,97,116,101,100,32,123,33,114,125,41,12,114,
-    38,0,0,0,114,46,0,0,0,114,165,0,0,0,114,33,
-    0,0,0,114,28,0,0,0,114,1,0,0,0,90,5,109,
-    107,100,105,114,218,15,70,105,108,101,69,120,105,115,116,115,
-    69,114,114,111,114,114,40,0,0,0,114,116,0,0,0,114,
-    130,0,0,0,114,56,0,0,0,41,9,114,102,0,0,0,
-    114,35,0,0,0,114,54,0,0,0,114,231,0,0,0,218,
-    6,112,97,114,101,110,116,114,96,0,0,0,114,27,0,0,
-    0,114,23,0,0,0,114,201,0,0,0,114,2,0,0,0,
-    114,2,0,0,0,114,4,0,0,0,114,198,0,0,0,193,
-    3,0,0,115,42,0,0,0,0,2,12,1,4,2,14,1,
-    12,1,14,2,14,1,10,1,2,1,14,1,14,2,6,1,
-    16,3,6,1,8,1,22,1,2,1,12,1,16,1,16,2,
-    8,1,122,25,83,111,117,114,99,101,70,105,108,101,76,111,
-    97,100,101,114,46,115,101,116,95,100,97,116,97,78,41,7,
-    114,107,0,0,0,114,106,0,0,0,114,108,0,0,0,114,
-    109,0,0,0,114,197,0,0,0,114,199,0,0,0,114,198,
-    0,0,0,114,2,0,0,0,114,2,0,0,0,114,2,0,
-    0,0,114,4,0,0,0,114,229,0,0,0,179,3,0,0,
-    115,8,0,0,0,8,2,4,2,8,5,8,5,114,229,0,
-    0,0,99,0,0,0,0,0,0,0,0,0,0,0,0,2,
-    0,0,0,64,0,0,0,115,32,0,0,0,101,0,90,1,
-    100,0,90,2,100,1,90,3,100,2,100,3,132,0,90,4,
-    100,4,100,5,132,0,90,5,100,6,83,0,41,7,218,20,
+    110,100,101,114,46,102,105,110,100,95,115,112,101,99,99,3,
+    0,0,0,0,0,0,0,4,0,0,0,4,0,0,0,67,
+    0,0,0,115,34,0,0,0,124,0,160,0,124,1,124,2,
+    161,2,125,3,124,3,100,1,107,9,114,26,124,3,106,1,
+    83,0,100,1,83,0,100,1,83,0,41,2,122,108,70,105,
+    110,100,32,109,111,100,117,108,101,32,110,97,109,101,100,32,
+    105,110,32,116,104,101,32,114,101,103,105,115,116,114,121,46,
+    10,10,32,32,32,32,32,32,32,32,84,104,105,115,32,109,
+    101,116,104,111,100,32,105,115,32,100,101,112,114,101,99,97,
+    116,101,100,46,32,32,85,115,101,32,101,120,101,99,95,109,
+    111,100,117,108,101,40,41,32,105,110,115,116,101,97,100,46,
+    10,10,32,32,32,32,32,32,32,32,78,41,2,114,185,0,
+    0,0,114,124,0,0,0,41,4,114,175,0,0,0,114,123,
+    0,0,0,114,36,0,0,0,114,169,0,0,0,114,3,0,
+    0,0,114,3,0,0,0,114,5,0,0,0,218,11,102,105,
+    110,100,95,109,111,100,117,108,101,180,2,0,0,115,8,0,
+    0,0,0,7,12,1,8,1,6,2,122,33,87,105,110,100,
+    111,119,115,82,101,103,105,115,116,114,121,70,105,110,100,101,
+    114,46,102,105,110,100,95,109,111,100,117,108,101,41,2,78,
+    78,41,1,78,41,12,114,109,0,0,0,114,108,0,0,0,
+    114,110,0,0,0,114,111,0,0,0,114,179,0,0,0,114,
+    178,0,0,0,114,177,0,0,0,218,11,99,108,97,115,115,
+    109,101,116,104,111,100,114,176,0,0,0,114,182,0,0,0,
+    114,185,0,0,0,114,186,0,0,0,114,3,0,0,0,114,
+    3,0,0,0,114,3,0,0,0,114,5,0,0,0,114,173,
+    0,0,0,130,2,0,0,115,20,0,0,0,8,2,4,3,
+    4,3,4,2,4,2,12,7,12,15,2,1,12,15,2,1,
+    114,173,0,0,0,99,0,0,0,0,0,0,0,0,0,0,
+    0,0,2,0,0,0,64,0,0,0,115,48,0,0,0,101,
+    0,90,1,100,0,90,2,100,1,90,3,100,2,100,3,132,
+    0,90,4,100,4,100,5,132,0,90,5,100,6,100,7,132,
+    0,90,6,100,8,100,9,132,0,90,7,100,10,83,0,41,
+    11,218,13,95,76,111,97,100,101,114,66,97,115,105,99,115,
+    122,83,66,97,115,101,32,99,108,97,115,115,32,111,102,32,
+    99,111,109,109,111,110,32,99,111,100,101,32,110,101,101,100,
+    101,100,32,98,121,32,98,111,116,104,32,83,111,117,114,99,
+    101,76,111,97,100,101,114,32,97,110,100,10,32,32,32,32,
     83,111,117,114,99,101,108,101,115,115,70,105,108,101,76,111,
-    97,100,101,114,122,45,76,111,97,100,101,114,32,119,104,105,
-    99,104,32,104,97,110,100,108,101,115,32,115,111,117,114,99,
-    101,108,101,115,115,32,102,105,108,101,32,105,109,112,111,114,
-    116,115,46,99,2,0,0,0,0,0,0,0,5,0,0,0,
-    5,0,0,0,67,0,0,0,115,68,0,0,0,124,0,160,
-    0,124,1,161,1,125,2,124,0,160,1,124,2,161,1,125,
-    3,124,1,124,2,100,1,156,2,125,4,116,2,124,3,124,
-    1,124,4,131,3,1,0,116,3,116,4,124,3,131,1,100,
-    2,100,0,133,2,25,0,124,1,124,2,100,3,141,3,83,
-    0,41,4,78,41,2,114,100,0,0,0,114,35,0,0,0,
-    114,126,0,0,0,41,2,114,100,0,0,0,114,91,0,0,
-    0,41,5,114,159,0,0,0,114,200,0,0,0,114,133,0,
-    0,0,114,145,0,0,0,114,208,0,0,0,41,5,114,102,
-    0,0,0,114,121,0,0,0,114,35,0,0,0,114,54,0,
-    0,0,114,132,0,0,0,114,2,0,0,0,114,2,0,0,
-    0,114,4,0,0,0,114,188,0,0,0,228,3,0,0,115,
-    18,0,0,0,0,1,10,1,10,4,2,1,8,2,12,1,
-    2,1,14,1,2,1,122,29,83,111,117,114,99,101,108,101,
-    115,115,70,105,108,101,76,111,97,100,101,114,46,103,101,116,
-    95,99,111,100,101,99,2,0,0,0,0,0,0,0,2,0,
-    0,0,1,0,0,0,67,0,0,0,115,4,0,0,0,100,
-    1,83,0,41,2,122,39,82,101,116,117,114,110,32,78,111,
-    110,101,32,97,115,32,116,104,101,114,101,32,105,115,32,110,
-    111,32,115,111,117,114,99,101,32,99,111,100,101,46,78,114,
-    2,0,0,0,41,2,114,102,0,0,0,114,121,0,0,0,
-    114,2,0,0,0,114,2,0,0,0,114,4,0,0,0,114,
-    202,0,0,0,244,3,0,0,115,2,0,0,0,0,2,122,
-    31,83,111,117,114,99,101,108,101,115,115,70,105,108,101,76,
-    111,97,100,101,114,46,103,101,116,95,115,111,117,114,99,101,
-    78,41,6,114,107,0,0,0,114,106,0,0,0,114,108,0,
-    0,0,114,109,0,0,0,114,188,0,0,0,114,202,0,0,
-    0,114,2,0,0,0,114,2,0,0,0,114,2,0,0,0,
-    114,4,0,0,0,114,234,0,0,0,224,3,0,0,115,6,
-    0,0,0,8,2,4,2,8,16,114,234,0,0,0,99,0,
+    97,100,101,114,46,99,2,0,0,0,0,0,0,0,5,0,
+    0,0,4,0,0,0,67,0,0,0,115,64,0,0,0,116,
+    0,124,0,160,1,124,1,161,1,131,1,100,1,25,0,125,
+    2,124,2,160,2,100,2,100,1,161,2,100,3,25,0,125,
+    3,124,1,160,3,100,2,161,1,100,4,25,0,125,4,124,
+    3,100,5,107,2,111,62,124,4,100,5,107,3,83,0,41,
+    6,122,141,67,111,110,99,114,101,116,101,32,105,109,112,108,
+    101,109,101,110,116,97,116,105,111,110,32,111,102,32,73,110,
+    115,112,101,99,116,76,111,97,100,101,114,46,105,115,95,112,
+    97,99,107,97,103,101,32,98,121,32,99,104,101,99,107,105,
+    110,103,32,105,102,10,32,32,32,32,32,32,32,32,116,104,
+    101,32,112,97,116,104,32,114,101,116,117,114,110,101,100,32,
+    98,121,32,103,101,116,95,102,105,108,101,110,97,109,101,32,
+    104,97,115,32,97,32,102,105,108,101,110,97,109,101,32,111,
+    102,32,39,95,95,105,110,105,116,95,95,46,112,121,39,46,
+    114,30,0,0,0,114,60,0,0,0,114,61,0,0,0,114,
+    58,0,0,0,218,8,95,95,105,110,105,116,95,95,41,4,
+    114,39,0,0,0,114,162,0,0,0,114,35,0,0,0,114,
+    33,0,0,0,41,5,114,104,0,0,0,114,123,0,0,0,
+    114,98,0,0,0,90,13,102,105,108,101,110,97,109,101,95,
+    98,97,115,101,90,9,116,97,105,108,95,110,97,109,101,114,
+    3,0,0,0,114,3,0,0,0,114,5,0,0,0,114,164,
+    0,0,0,199,2,0,0,115,8,0,0,0,0,3,18,1,
+    16,1,14,1,122,24,95,76,111,97,100,101,114,66,97,115,
+    105,99,115,46,105,115,95,112,97,99,107,97,103,101,99,2,
+    0,0,0,0,0,0,0,2,0,0,0,1,0,0,0,67,
+    0,0,0,115,4,0,0,0,100,1,83,0,41,2,122,42,
+    85,115,101,32,100,101,102,97,117,108,116,32,115,101,109,97,
+    110,116,105,99,115,32,102,111,114,32,109,111,100,117,108,101,
+    32,99,114,101,97,116,105,111,110,46,78,114,3,0,0,0,
+    41,2,114,104,0,0,0,114,169,0,0,0,114,3,0,0,
+    0,114,3,0,0,0,114,5,0,0,0,218,13,99,114,101,
+    97,116,101,95,109,111,100,117,108,101,207,2,0,0,115,2,
+    0,0,0,0,1,122,27,95,76,111,97,100,101,114,66,97,
+    115,105,99,115,46,99,114,101,97,116,101,95,109,111,100,117,
+    108,101,99,2,0,0,0,0,0,0,0,3,0,0,0,5,
+    0,0,0,67,0,0,0,115,56,0,0,0,124,0,160,0,
+    124,1,106,1,161,1,125,2,124,2,100,1,107,8,114,36,
+    116,2,100,2,160,3,124,1,106,1,161,1,131,1,130,1,
+    116,4,160,5,116,6,124,2,124,1,106,7,161,3,1,0,
+    100,1,83,0,41,3,122,19,69,120,101,99,117,116,101,32,
+    116,104,101,32,109,111,100,117,108,101,46,78,122,52,99,97,
+    110,110,111,116,32,108,111,97,100,32,109,111,100,117,108,101,
+    32,123,33,114,125,32,119,104,101,110,32,103,101,116,95,99,
+    111,100,101,40,41,32,114,101,116,117,114,110,115,32,78,111,
+    110,101,41,8,218,8,103,101,116,95,99,111,100,101,114,109,
+    0,0,0,114,103,0,0,0,114,49,0,0,0,114,118,0,
+    0,0,218,25,95,99,97,108,108,95,119,105,116,104,95,102,
+    114,97,109,101,115,95,114,101,109,111,118,101,100,218,4,101,
+    120,101,99,114,115,0,0,0,41,3,114,104,0,0,0,218,
+    6,109,111,100,117,108,101,114,147,0,0,0,114,3,0,0,
+    0,114,3,0,0,0,114,5,0,0,0,218,11,101,120,101,
+    99,95,109,111,100,117,108,101,210,2,0,0,115,10,0,0,
+    0,0,2,12,1,8,1,6,1,10,1,122,25,95,76,111,
+    97,100,101,114,66,97,115,105,99,115,46,101,120,101,99,95,
+    109,111,100,117,108,101,99,2,0,0,0,0,0,0,0,2,
+    0,0,0,4,0,0,0,67,0,0,0,115,12,0,0,0,
+    116,0,160,1,124,0,124,1,161,2,83,0,41,1,122,26,
+    84,104,105,115,32,109,111,100,117,108,101,32,105,115,32,100,
+    101,112,114,101,99,97,116,101,100,46,41,2,114,118,0,0,
+    0,218,17,95,108,111,97,100,95,109,111,100,117,108,101,95,
+    115,104,105,109,41,2,114,104,0,0,0,114,123,0,0,0,
+    114,3,0,0,0,114,3,0,0,0,114,5,0,0,0,218,
+    11,108,111,97,100,95,109,111,100,117,108,101,218,2,0,0,
+    115,2,0,0,0,0,2,122,25,95,76,111,97,100,101,114,
+    66,97,115,105,99,115,46,108,111,97,100,95,109,111,100,117,
+    108,101,78,41,8,114,109,0,0,0,114,108,0,0,0,114,
+    110,0,0,0,114,111,0,0,0,114,164,0,0,0,114,190,
+    0,0,0,114,195,0,0,0,114,197,0,0,0,114,3,0,
+    0,0,114,3,0,0,0,114,3,0,0,0,114,5,0,0,
+    0,114,188,0,0,0,194,2,0,0,115,10,0,0,0,8,
+    3,4,2,8,8,8,3,8,8,114,188,0,0,0,99,0,
     0,0,0,0,0,0,0,0,0,0,0,3,0,0,0,64,
-    0,0,0,115,92,0,0,0,101,0,90,1,100,0,90,2,
-    100,1,90,3,100,2,100,3,132,0,90,4,100,4,100,5,
-    132,0,90,5,100,6,100,7,132,0,90,6,100,8,100,9,
-    132,0,90,7,100,10,100,11,132,0,90,8,100,12,100,13,
-    132,0,90,9,100,14,100,15,132,0,90,10,100,16,100,17,
-    132,0,90,11,101,12,100,18,100,19,132,0,131,1,90,13,
-    100,20,83,0,41,21,218,19,69,120,116,101,110,115,105,111,
-    110,70,105,108,101,76,111,97,100,101,114,122,93,76,111,97,
-    100,101,114,32,102,111,114,32,101,120,116,101,110,115,105,111,
-    110,32,109,111,100,117,108,101,115,46,10,10,32,32,32,32,
-    84,104,101,32,99,111,110,115,116,114,117,99,116,111,114,32,
-    105,115,32,100,101,115,105,103,110,101,100,32,116,111,32,119,
-    111,114,107,32,119,105,116,104,32,70,105,108,101,70,105,110,
-    100,101,114,46,10,10,32,32,32,32,99,3,0,0,0,0,
-    0,0,0,3,0,0,0,2,0,0,0,67,0,0,0,115,
-    16,0,0,0,124,1,124,0,95,0,124,2,124,0,95,1,
-    100,0,83,0,41,1,78,41,2,114,100,0,0,0,114,35,
-    0,0,0,41,3,114,102,0,0,0,114,100,0,0,0,114,
-    35,0,0,0,114,2,0,0,0,114,2,0,0,0,114,4,
-    0,0,0,114,186,0,0,0,5,4,0,0,115,4,0,0,
-    0,0,1,6,1,122,28,69,120,116,101,110,115,105,111,110,
-    70,105,108,101,76,111,97,100,101,114,46,95,95,105,110,105,
-    116,95,95,99,2,0,0,0,0,0,0,0,2,0,0,0,
-    2,0,0,0,67,0,0,0,115,24,0,0,0,124,0,106,
-    0,124,1,106,0,107,2,111,22,124,0,106,1,124,1,106,
-    1,107,2,83,0,41,1,78,41,2,114,213,0,0,0,114,
-    113,0,0,0,41,2,114,102,0,0,0,114,214,0,0,0,
-    114,2,0,0,0,114,2,0,0,0,114,4,0,0,0,114,
-    215,0,0,0,9,4,0,0,115,4,0,0,0,0,1,12,
-    1,122,26,69,120,116,101,110,115,105,111,110,70,105,108,101,
-    76,111,97,100,101,114,46,95,95,101,113,95,95,99,1,0,
-    0,0,0,0,0,0,1,0,0,0,3,0,0,0,67,0,
-    0,0,115,20,0,0,0,116,0,124,0,106,1,131,1,116,
-    0,124,0,106,2,131,1,65,0,83,0,41,1,78,41,3,
-    114,216,0,0,0,114,100,0,0,0,114,35,0,0,0,41,
-    1,114,102,0,0,0,114,2,0,0,0,114,2,0,0,0,
-    114,4,0,0,0,114,217,0,0,0,13,4,0,0,115,2,
-    0,0,0,0,1,122,28,69,120,116,101,110,115,105,111,110,
-    70,105,108,101,76,111,97,100,101,114,46,95,95,104,97,115,
-    104,95,95,99,2,0,0,0,0,0,0,0,3,0,0,0,
-    5,0,0,0,67,0,0,0,115,36,0,0,0,116,0,160,
-    1,116,2,106,3,124,1,161,2,125,2,116,0,160,4,100,
-    1,124,1,106,5,124,0,106,6,161,3,1,0,124,2,83,
-    0,41,2,122,38,67,114,101,97,116,101,32,97,110,32,117,
-    110,105,116,105,97,108,105,122,101,100,32,101,120,116,101,110,
-    115,105,111,110,32,109,111,100,117,108,101,122,38,101,120,116,
-    101,110,115,105,111,110,32,109,111,100,117,108,101,32,123,33,
-    114,125,32,108,111,97,100,101,100,32,102,114,111,109,32,123,
-    33,114,125,41,7,114,116,0,0,0,114,189,0,0,0,114,
-    143,0,0,0,90,14,99,114,101,97,116,101,95,100,121,110,
-    97,109,105,99,114,130,0,0,0,114,100,0,0,0,114,35,
-    0,0,0,41,3,114,102,0,0,0,114,166,0,0,0,114,
-    191,0,0,0,114,2,0,0,0,114,2,0,0,0,114,4,
-    0,0,0,114,187,0,0,0,16,4,0,0,115,10,0,0,
-    0,0,2,4,1,10,1,6,1,12,1,122,33,69,120,116,
+    0,0,0,115,74,0,0,0,101,0,90,1,100,0,90,2,
+    100,1,100,2,132,0,90,3,100,3,100,4,132,0,90,4,
+    100,5,100,6,132,0,90,5,100,7,100,8,132,0,90,6,
+    100,9,100,10,132,0,90,7,100,11,100,12,156,1,100,13,
+    100,14,132,2,90,8,100,15,100,16,132,0,90,9,100,17,
+    83,0,41,18,218,12,83,111,117,114,99,101,76,111,97,100,
+    101,114,99,2,0,0,0,0,0,0,0,2,0,0,0,1,
+    0,0,0,67,0,0,0,115,8,0,0,0,116,0,130,1,
+    100,1,83,0,41,2,122,178,79,112,116,105,111,110,97,108,
+    32,109,101,116,104,111,100,32,116,104,97,116,32,114,101,116,
+    117,114,110,115,32,116,104,101,32,109,111,100,105,102,105,99,
+    97,116,105,111,110,32,116,105,109,101,32,40,97,110,32,105,
+    110,116,41,32,102,111,114,32,116,104,101,10,32,32,32,32,
+    32,32,32,32,115,112,101,99,105,102,105,101,100,32,112,97,
+    116,104,44,32,119,104,101,114,101,32,112,97,116,104,32,105,
+    115,32,97,32,115,116,114,46,10,10,32,32,32,32,32,32,
+    32,32,82,97,105,115,101,115,32,79,83,69,114,114,111,114,
+    32,119,104,101,110,32,116,104,101,32,112,97,116,104,32,99,
+    97,110,110,111,116,32,98,101,32,104,97,110,100,108,101,100,
+    46,10,32,32,32,32,32,32,32,32,78,41,1,114,41,0,
+    0,0,41,2,114,104,0,0,0,114,36,0,0,0,114,3,
+    0,0,0,114,3,0,0,0,114,5,0,0,0,218,10,112,
+    97,116,104,95,109,116,105,109,101,225,2,0,0,115,2,0,
+    0,0,0,6,122,23,83,111,117,114,99,101,76,111,97,100,
+    101,114,46,112,97,116,104,95,109,116,105,109,101,99,2,0,
+    0,0,0,0,0,0,2,0,0,0,4,0,0,0,67,0,
+    0,0,115,14,0,0,0,100,1,124,0,160,0,124,1,161,
+    1,105,1,83,0,41,2,97,170,1,0,0,79,112,116,105,
+    111,110,97,108,32,109,101,116,104,111,100,32,114,101,116,117,
+    114,110,105,110,103,32,97,32,109,101,116,97,100,97,116,97,
+    32,100,105,99,116,32,102,111,114,32,116,104,101,32,115,112,
+    101,99,105,102,105,101,100,32,112,97,116,104,10,32,32,32,
+    32,32,32,32,32,116,111,32,98,121,32,116,104,101,32,112,
+    97,116,104,32,40,115,116,114,41,46,10,32,32,32,32,32,
+    32,32,32,80,111,115,115,105,98,108,101,32,107,101,121,115,
+    58,10,32,32,32,32,32,32,32,32,45,32,39,109,116,105,
+    109,101,39,32,40,109,97,110,100,97,116,111,114,121,41,32,
+    105,115,32,116,104,101,32,110,117,109,101,114,105,99,32,116,
+    105,109,101,115,116,97,109,112,32,111,102,32,108,97,115,116,
+    32,115,111,117,114,99,101,10,32,32,32,32,32,32,32,32,
+    32,32,99,111,100,101,32,109,111,100,105,102,105,99,97,116,
+    105,111,110,59,10,32,32,32,32,32,32,32,32,45,32,39,
+    115,105,122,101,39,32,40,111,112,116,105,111,110,97,108,41,
+    32,105,115,32,116,104,101,32,115,105,122,101,32,105,110,32,
+    98,121,116,101,115,32,111,102,32,116,104,101,32,115,111,117,
+    114,99,101,32,99,111,100,101,46,10,10,32,32,32,32,32,
+    32,32,32,73,109,112,108,101,109,101,110,116,105,110,103,32,
+    116,104,105,115,32,109,101,116,104,111,100,32,97,108,108,111,
+    119,115,32,116,104,101,32,108,111,97,100,101,114,32,116,111,
+    32,114,101,97,100,32,98,121,116,101,99,111,100,101,32,102,
+    105,108,101,115,46,10,32,32,32,32,32,32,32,32,82,97,
+    105,115,101,115,32,79,83,69,114,114,111,114,32,119,104,101,
+    110,32,116,104,101,32,112,97,116,104,32,99,97,110,110,111,
+    116,32,98,101,32,104,97,110,100,108,101,100,46,10,32,32,
+    32,32,32,32,32,32,114,152,0,0,0,41,1,114,199,0,
+    0,0,41,2,114,104,0,0,0,114,36,0,0,0,114,3,
+    0,0,0,114,3,0,0,0,114,5,0,0,0,218,10,112,
+    97,116,104,95,115,116,97,116,115,233,2,0,0,115,2,0,
+    0,0,0,11,122,23,83,111,117,114,99,101,76,111,97,100,
+    101,114,46,112,97,116,104,95,115,116,97,116,115,99,4,0,
+    0,0,0,0,0,0,4,0,0,0,4,0,0,0,67,0,
+    0,0,115,12,0,0,0,124,0,160,0,124,2,124,3,161,
+    2,83,0,41,1,122,228,79,112,116,105,111,110,97,108,32,
+    109,101,116,104,111,100,32,119,104,105,99,104,32,119,114,105,
+    116,101,115,32,100,97,116,97,32,40,98,121,116,101,115,41,
+    32,116,111,32,97,32,102,105,108,101,32,112,97,116,104,32,
+    40,97,32,115,116,114,41,46,10,10,32,32,32,32,32,32,
+    32,32,73,109,112,108,101,109,101,110,116,105,110,103,32,116,
+    104,105,115,32,109,101,116,104,111,100,32,97,108,108,111,119,
+    115,32,102,111,114,32,116,104,101,32,119,114,105,116,105,110,
+    103,32,111,102,32,98,121,116,101,99,111,100,101,32,102,105,
+    108,101,115,46,10,10,32,32,32,32,32,32,32,32,84,104,
+    101,32,115,111,117,114,99,101,32,112,97,116,104,32,105,115,
+    32,110,101,101,100,101,100,32,105,110,32,111,114,100,101,114,
+    32,116,111,32,99,111,114,114,101,99,116,108,121,32,116,114,
+    97,110,115,102,101,114,32,112,101,114,109,105,115,115,105,111,
+    110,115,10,32,32,32,32,32,32,32,32,41,1,218,8,115,
+    101,116,95,100,97,116,97,41,4,114,104,0,0,0,114,94,
+    0,0,0,90,10,99,97,99,104,101,95,112,97,116,104,114,
+    55,0,0,0,114,3,0,0,0,114,3,0,0,0,114,5,
+    0,0,0,218,15,95,99,97,99,104,101,95,98,121,116,101,
+    99,111,100,101,246,2,0,0,115,2,0,0,0,0,8,122,
+    28,83,111,117,114,99,101,76,111,97,100,101,114,46,95,99,
+    97,99,104,101,95,98,121,116,101,99,111,100,101,99,3,0,
+    0,0,0,0,0,0,3,0,0,0,1,0,0,0,67,0,
+    0,0,115,4,0,0,0,100,1,83,0,41,2,122,150,79,
+    112,116,105,111,110,97,108,32,109,101,116,104,111,100,32,119,
+    104,105,99,104,32,119,114,105,116,101,115,32,100,97,116,97,
+    32,40,98,121,116,101,115,41,32,116,111,32,97,32,102,105,
+    108,101,32,112,97,116,104,32,40,97,32,115,116,114,41,46,
+    10,10,32,32,32,32,32,32,32,32,73,109,112,108,101,109,
+    101,110,116,105,110,103,32,116,104,105,115,32,109,101,116,104,
+    111,100,32,97,108,108,111,119,115,32,102,111,114,32,116,104,
+    101,32,119,114,105,116,105,110,103,32,111,102,32,98,121,116,
+    101,99,111,100,101,32,102,105,108,101,115,46,10,32,32,32,
+    32,32,32,32,32,78,114,3,0,0,0,41,3,114,104,0,
+    0,0,114,36,0,0,0,114,55,0,0,0,114,3,0,0,
+    0,114,3,0,0,0,114,5,0,0,0,114,201,0,0,0,
+    0,3,0,0,115,2,0,0,0,0,4,122,21,83,111,117,
+    114,99,101,76,111,97,100,101,114,46,115,101,116,95,100,97,
+    116,97,99,2,0,0,0,0,0,0,0,5,0,0,0,10,
+    0,0,0,67,0,0,0,115,82,0,0,0,124,0,160,0,
+    124,1,161,1,125,2,121,14,124,0,160,1,124,2,161,1,
+    125,3,87,0,110,48,4,0,116,2,107,10,114,72,1,0,
+    125,4,1,0,122,18,116,3,100,1,124,1,100,2,141,2,
+    124,4,130,2,87,0,100,3,100,3,125,4,126,4,88,0,
+    89,0,110,2,88,0,116,4,124,3,131,1,83,0,41,4,
+    122,52,67,111,110,99,114,101,116,101,32,105,109,112,108,101,
+    109,101,110,116,97,116,105,111,110,32,111,102,32,73,110,115,
+    112,101,99,116,76,111,97,100,101,114,46,103,101,116,95,115,
+    111,117,114,99,101,46,122,39,115,111,117,114,99,101,32,110,
+    111,116,32,97,118,97,105,108,97,98,108,101,32,116,104,114,
+    111,117,103,104,32,103,101,116,95,100,97,116,97,40,41,41,
+    1,114,102,0,0,0,78,41,5,114,162,0,0,0,218,8,
+    103,101,116,95,100,97,116,97,114,41,0,0,0,114,103,0,
+    0,0,114,160,0,0,0,41,5,114,104,0,0,0,114,123,
+    0,0,0,114,36,0,0,0,114,158,0,0,0,218,3,101,
+    120,99,114,3,0,0,0,114,3,0,0,0,114,5,0,0,
+    0,218,10,103,101,116,95,115,111,117,114,99,101,7,3,0,
+    0,115,14,0,0,0,0,2,10,1,2,1,14,1,16,1,
+    4,1,28,1,122,23,83,111,117,114,99,101,76,111,97,100,
+    101,114,46,103,101,116,95,115,111,117,114,99,101,114,91,0,
+    0,0,41,1,218,9,95,111,112,116,105,109,105,122,101,99,
+    3,0,0,0,1,0,0,0,4,0,0,0,8,0,0,0,
+    67,0,0,0,115,22,0,0,0,116,0,106,1,116,2,124,
+    1,124,2,100,1,100,2,124,3,100,3,141,6,83,0,41,
+    4,122,130,82,101,116,117,114,110,32,116,104,101,32,99,111,
+    100,101,32,111,98,106,101,99,116,32,99,111,109,112,105,108,
+    101,100,32,102,114,111,109,32,115,111,117,114,99,101,46,10,
+    10,32,32,32,32,32,32,32,32,84,104,101,32,39,100,97,
+    116,97,39,32,97,114,103,117,109,101,110,116,32,99,97,110,
+    32,98,101,32,97,110,121,32,111,98,106,101,99,116,32,116,
+    121,112,101,32,116,104,97,116,32,99,111,109,112,105,108,101,
+    40,41,32,115,117,112,112,111,114,116,115,46,10,32,32,32,
+    32,32,32,32,32,114,193,0,0,0,84,41,2,218,12,100,
+    111,110,116,95,105,110,104,101,114,105,116,114,71,0,0,0,
+    41,3,114,118,0,0,0,114,192,0,0,0,218,7,99,111,
+    109,112,105,108,101,41,4,114,104,0,0,0,114,55,0,0,
+    0,114,36,0,0,0,114,206,0,0,0,114,3,0,0,0,
+    114,3,0,0,0,114,5,0,0,0,218,14,115,111,117,114,
+    99,101,95,116,111,95,99,111,100,101,17,3,0,0,115,4,
+    0,0,0,0,5,12,1,122,27,83,111,117,114,99,101,76,
+    111,97,100,101,114,46,115,111,117,114,99,101,95,116,111,95,
+    99,111,100,101,99,2,0,0,0,0,0,0,0,15,0,0,
+    0,10,0,0,0,67,0,0,0,115,162,2,0,0,124,0,
+    160,0,124,1,161,1,125,2,100,1,125,3,100,1,125,4,
+    100,1,125,5,100,2,125,6,100,3,125,7,121,12,116,1,
+    124,2,131,1,125,8,87,0,110,26,4,0,116,2,107,10,
+    114,68,1,0,1,0,1,0,100,1,125,8,89,0,144,1,
+    110,164,88,0,124,8,116,3,131,0,107,6,114,182,121,32,
+    124,0,160,4,124,8,161,1,125,9,116,5,124,9,124,1,
+    124,1,124,8,100,4,156,2,131,3,1,0,87,0,110,26,
+    4,0,116,6,116,7,116,8,102,3,107,10,114,138,1,0,
+    1,0,1,0,89,0,110,44,88,0,116,9,160,10,100,5,
+    124,8,124,2,161,3,1,0,116,11,116,12,124,9,131,1,
+    100,6,100,1,133,2,25,0,124,1,124,8,124,2,100,7,
+    141,4,83,0,121,14,124,0,160,13,124,2,161,1,125,10,
+    87,0,110,22,4,0,116,8,107,10,114,218,1,0,1,0,
+    1,0,89,0,144,1,110,14,88,0,116,14,124,10,100,8,
+    25,0,131,1,125,3,121,14,124,0,160,4,124,8,161,1,
+    125,9,87,0,110,22,4,0,116,8,107,10,144,1,114,12,
+    1,0,1,0,1,0,89,0,110,220,88,0,124,1,124,8,
+    100,4,156,2,125,11,121,150,116,5,124,9,124,1,124,11,
+    131,3,125,12,116,12,124,9,131,1,100,6,100,1,133,2,
+    25,0,125,13,124,12,100,9,64,0,100,10,107,3,125,6,
+    124,6,144,1,114,152,124,12,100,11,64,0,100,10,107,3,
+    125,7,116,15,106,16,100,12,107,3,144,1,114,172,124,7,
+    144,1,115,114,116,15,106,16,100,13,107,2,144,1,114,172,
+    124,0,160,4,124,2,161,1,125,4,116,15,160,17,116,18,
+    124,4,161,2,125,5,116,19,124,9,124,5,124,1,124,11,
+    131,4,1,0,110,20,116,20,124,9,124,3,124,10,100,14,
+    25,0,124,1,124,11,131,5,1,0,87,0,110,26,4,0,
+    116,6,116,7,102,2,107,10,144,1,114,200,1,0,1,0,
+    1,0,89,0,110,32,88,0,116,9,160,10,100,15,124,8,
+    124,2,161,3,1,0,116,11,124,13,124,1,124,8,124,2,
+    100,7,141,4,83,0,124,4,100,1,107,8,144,1,114,252,
+    124,0,160,4,124,2,161,1,125,4,124,0,160,21,124,4,
+    124,2,161,2,125,14,116,9,160,10,100,16,124,2,161,2,
+    1,0,116,22,106,23,144,2,115,158,124,8,100,1,107,9,
+    144,2,114,158,124,3,100,1,107,9,144,2,114,158,124,6,
+    144,2,114,88,124,5,100,1,107,8,144,2,114,74,116,15,
+    160,17,124,4,161,1,125,5,116,24,124,14,124,5,124,7,
+    131,3,125,9,110,16,116,25,124,14,124,3,116,26,124,4,
+    131,1,131,3,125,9,121,30,124,0,160,27,124,2,124,8,
+    124,9,161,3,1,0,116,9,160,10,100,17,124,8,161,2,
+    1,0,87,0,110,22,4,0,116,2,107,10,144,2,114,156,
+    1,0,1,0,1,0,89,0,110,2,88,0,124,14,83,0,
+    41,18,122,190,67,111,110,99,114,101,116,101,32,105,109,112,
+    108,101,109,101,110,116,97,116,105,111,110,32,111,102,32,73,
+    110,115,112,101,99,116,76,111,97,100,101,114,46,103,101,116,
+    95,99,111,100,101,46,10,10,32,32,32,32,32,32,32,32,
+    82,101,97,100,105,110,103,32,111,102,32,98,121,116,101,99,
+    111,100,101,32,114,101,113,117,105,114,101,115,32,112,97,116,
+    104,95,115,116,97,116,115,32,116,111,32,98,101,32,105,109,
+    112,108,101,109,101,110,116,101,100,46,32,84,111,32,119,114,
+    105,116,101,10,32,32,32,32,32,32,32,32,98,121,116,101,
+    99,111,100,101,44,32,115,101,116,95,100,97,116,97,32,109,
+    117,115,116,32,97,108,115,111,32,98,101,32,105,109,112,108,
+    101,109,101,110,116,101,100,46,10,10,32,32,32,32,32,32,
+    32,32,78,70,84,41,2,114,102,0,0,0,114,36,0,0,
+    0,122,17,123,125,32,116,114,117,115,116,101,100,32,102,111,
+    114,32,123,125,114,128,0,0,0,41,3,114,102,0,0,0,
+    114,93,0,0,0,114,94,0,0,0,114,152,0,0,0,114,
+    30,0,0,0,114,61,0,0,0,114,58,0,0,0,90,5,
+    110,101,118,101,114,90,6,97,108,119,97,121,115,218,4,115,
+    105,122,101,122,13,123,125,32,109,97,116,99,104,101,115,32,
+    123,125,122,19,99,111,100,101,32,111,98,106,101,99,116,32,
+    102,114,111,109,32,123,125,122,10,119,114,111,116,101,32,123,
+    33,114,125,41,28,114,162,0,0,0,114,83,0,0,0,114,
+    69,0,0,0,218,17,95,103,101,116,95,112,121,99,95,109,
+    97,110,105,102,101,115,116,114,203,0,0,0,114,135,0,0,
+    0,114,103,0,0,0,114,133,0,0,0,114,41,0,0,0,
+    114,118,0,0,0,114,132,0,0,0,114,148,0,0,0,218,
+    10,109,101,109,111,114,121,118,105,101,119,114,200,0,0,0,
+    114,15,0,0,0,114,146,0,0,0,90,21,99,104,101,99,
+    107,95,104,97,115,104,95,98,97,115,101,100,95,112,121,99,
+    115,114,140,0,0,0,218,17,95,82,65,87,95,77,65,71,
+    73,67,95,78,85,77,66,69,82,114,141,0,0,0,114,139,
+    0,0,0,114,209,0,0,0,114,7,0,0,0,218,19,100,
+    111,110,116,95,119,114,105,116,101,95,98,121,116,101,99,111,
+    100,101,114,155,0,0,0,114,153,0,0,0,114,32,0,0,
+    0,114,202,0,0,0,41,15,114,104,0,0,0,114,123,0,
+    0,0,114,94,0,0,0,114,137,0,0,0,114,158,0,0,
+    0,114,140,0,0,0,90,10,104,97,115,104,95,98,97,115,
+    101,100,90,12,99,104,101,99,107,95,115,111,117,114,99,101,
+    114,93,0,0,0,114,55,0,0,0,218,2,115,116,114,134,
+    0,0,0,114,70,0,0,0,90,10,98,121,116,101,115,95,
+    100,97,116,97,90,11,99,111,100,101,95,111,98,106,101,99,
+    116,114,3,0,0,0,114,3,0,0,0,114,5,0,0,0,
+    114,191,0,0,0,25,3,0,0,115,160,0,0,0,0,7,
+    10,1,4,1,4,1,4,1,4,1,4,1,2,1,12,1,
+    14,1,12,2,10,3,2,1,10,1,8,1,14,1,20,1,
+    6,2,6,1,8,1,16,1,2,1,2,1,8,1,2,1,
+    14,1,14,1,8,2,12,1,2,1,14,1,16,1,6,3,
+    2,1,8,2,2,1,12,1,16,1,12,1,6,1,12,1,
+    12,1,6,1,12,1,10,1,4,1,2,1,6,2,8,1,
+    8,2,2,1,2,1,2,1,6,1,2,1,10,2,20,1,
+    6,2,8,1,6,1,6,1,2,1,8,1,10,1,10,1,
+    12,1,12,1,18,1,10,1,6,1,10,1,10,1,14,2,
+    6,1,10,1,2,1,14,1,16,1,16,1,6,1,122,21,
+    83,111,117,114,99,101,76,111,97,100,101,114,46,103,101,116,
+    95,99,111,100,101,78,41,10,114,109,0,0,0,114,108,0,
+    0,0,114,110,0,0,0,114,199,0,0,0,114,200,0,0,
+    0,114,202,0,0,0,114,201,0,0,0,114,205,0,0,0,
+    114,209,0,0,0,114,191,0,0,0,114,3,0,0,0,114,
+    3,0,0,0,114,3,0,0,0,114,5,0,0,0,114,198,
+    0,0,0,223,2,0,0,115,14,0,0,0,8,2,8,8,
+    8,13,8,10,8,7,8,10,14,8,114,198,0,0,0,99,
+    0,0,0,0,0,0,0,0,0,0,0,0,4,0,0,0,
+    0,0,0,0,115,124,0,0,0,101,0,90,1,100,0,90,
+    2,100,1,90,3,100,2,100,3,132,0,90,4,100,4,100,
+    5,132,0,90,5,100,6,100,7,132,0,90,6,101,7,135,
+    0,102,1,100,8,100,9,132,8,131,1,90,8,101,7,100,
+    10,100,11,132,0,131,1,90,9,100,12,100,13,132,0,90,
+    10,101,7,100,14,100,15,132,0,131,1,90,11,100,16,100,
+    17,132,0,90,12,100,18,100,19,132,0,90,13,100,20,100,
+    21,132,0,90,14,100,22,100,23,132,0,90,15,135,0,4,
+    0,90,16,83,0,41,24,218,10,70,105,108,101,76,111,97,
+    100,101,114,122,103,66,97,115,101,32,102,105,108,101,32,108,
+    111,97,100,101,114,32,99,108,97,115,115,32,119,104,105,99,
+    104,32,105,109,112,108,101,109,101,110,116,115,32,116,104,101,
+    32,108,111,97,100,101,114,32,112,114,111,116,111,99,111,108,
+    32,109,101,116,104,111,100,115,32,116,104,97,116,10,32,32,
+    32,32,114,101,113,117,105,114,101,32,102,105,108,101,32,115,
+    121,115,116,101,109,32,117,115,97,103,101,46,99,3,0,0,
+    0,0,0,0,0,3,0,0,0,2,0,0,0,67,0,0,
+    0,115,16,0,0,0,124,1,124,0,95,0,124,2,124,0,
+    95,1,100,1,83,0,41,2,122,75,67,97,99,104,101,32,
+    116,104,101,32,109,111,100,117,108,101,32,110,97,109,101,32,
+    97,110,100,32,116,104,101,32,112,97,116,104,32,116,111,32,
+    116,104,101,32,102,105,108,101,32,102,111,117,110,100,32,98,
+    121,32,116,104,101,10,32,32,32,32,32,32,32,32,102,105,
+    110,100,101,114,46,78,41,2,114,102,0,0,0,114,36,0,
+    0,0,41,3,114,104,0,0,0,114,123,0,0,0,114,36,
+    0,0,0,114,3,0,0,0,114,3,0,0,0,114,5,0,
+    0,0,114,189,0,0,0,132,3,0,0,115,4,0,0,0,
+    0,3,6,1,122,19,70,105,108,101,76,111,97,100,101,114,
+    46,95,95,105,110,105,116,95,95,99,2,0,0,0,0,0,
+    0,0,2,0,0,0,2,0,0,0,67,0,0,0,115,24,
+    0,0,0,124,0,106,0,124,1,106,0,107,2,111,22,124,
+    0,106,1,124,1,106,1,107,2,83,0,41,1,78,41,2,
+    218,9,95,95,99,108,97,115,115,95,95,114,115,0,0,0,
+    41,2,114,104,0,0,0,218,5,111,116,104,101,114,114,3,
+    0,0,0,114,3,0,0,0,114,5,0,0,0,218,6,95,
+    95,101,113,95,95,138,3,0,0,115,4,0,0,0,0,1,
+    12,1,122,17,70,105,108,101,76,111,97,100,101,114,46,95,
+    95,101,113,95,95,99,1,0,0,0,0,0,0,0,1,0,
+    0,0,3,0,0,0,67,0,0,0,115,20,0,0,0,116,
+    0,124,0,106,1,131,1,116,0,124,0,106,2,131,1,65,
+    0,83,0,41,1,78,41,3,218,4,104,97,115,104,114,102,
+    0,0,0,114,36,0,0,0,41,1,114,104,0,0,0,114,
+    3,0,0,0,114,3,0,0,0,114,5,0,0,0,218,8,
+    95,95,104,97,115,104,95,95,142,3,0,0,115,2,0,0,
+    0,0,1,122,19,70,105,108,101,76,111,97,100,101,114,46,
+    95,95,104,97,115,104,95,95,99,2,0,0,0,0,0,0,
+    0,2,0,0,0,3,0,0,0,3,0,0,0,115,16,0,
+    0,0,116,0,116,1,124,0,131,2,160,2,124,1,161,1,
+    83,0,41,1,122,100,76,111,97,100,32,97,32,109,111,100,
+    117,108,101,32,102,114,111,109,32,97,32,102,105,108,101,46,
+    10,10,32,32,32,32,32,32,32,32,84,104,105,115,32,109,
+    101,116,104,111,100,32,105,115,32,100,101,112,114,101,99,97,
+    116,101,100,46,32,32,85,115,101,32,101,120,101,99,95,109,
+    111,100,117,108,101,40,41,32,105,110,115,116,101,97,100,46,
+    10,10,32,32,32,32,32,32,32,32,41,3,218,5,115,117,
+    112,101,114,114,216,0,0,0,114,197,0,0,0,41,2,114,
+    104,0,0,0,114,123,0,0,0,41,1,114,217,0,0,0,
+    114,3,0,0,0,114,5,0,0,0,114,197,0,0,0,145,
+    3,0,0,115,2,0,0,0,0,10,122,22,70,105,108,101,
+    76,111,97,100,101,114,46,108,111,97,100,95,109,111,100,117,
+    108,101,99,2,0,0,0,0,0,0,0,2,0,0,0,1,
+    0,0,0,67,0,0,0,115,6,0,0,0,124,0,106,0,
+    83,0,41,1,122,58,82,101,116,117,114,110,32,116,104,101,
+    32,112,97,116,104,32,116,111,32,116,104,101,32,115,111,117,
+    114,99,101,32,102,105,108,101,32,97,115,32,102,111,117,110,
+    100,32,98,121,32,116,104,101,32,102,105,110,100,101,114,46,
+    41,1,114,36,0,0,0,41,2,114,104,0,0,0,114,123,
+    0,0,0,114,3,0,0,0,114,3,0,0,0,114,5,0,
+    0,0,114,162,0,0,0,157,3,0,0,115,2,0,0,0,
+    0,3,122,23,70,105,108,101,76,111,97,100,101,114,46,103,
+    101,116,95,102,105,108,101,110,97,109,101,99,2,0,0,0,
+    0,0,0,0,3,0,0,0,9,0,0,0,67,0,0,0,
+    115,32,0,0,0,116,0,160,1,124,1,100,1,161,2,143,
+    10,125,2,124,2,160,2,161,0,83,0,81,0,82,0,88,
+    0,100,2,83,0,41,3,122,39,82,101,116,117,114,110,32,
+    116,104,101,32,100,97,116,97,32,102,114,111,109,32,112,97,
+    116,104,32,97,115,32,114,97,119,32,98,121,116,101,115,46,
+    218,1,114,78,41,3,114,51,0,0,0,114,52,0,0,0,
+    218,4,114,101,97,100,41,3,114,104,0,0,0,114,36,0,
+    0,0,114,56,0,0,0,114,3,0,0,0,114,3,0,0,
+    0,114,5,0,0,0,114,203,0,0,0,162,3,0,0,115,
+    4,0,0,0,0,2,14,1,122,19,70,105,108,101,76,111,
+    97,100,101,114,46,103,101,116,95,100,97,116,97,99,2,0,
+    0,0,0,0,0,0,2,0,0,0,3,0,0,0,67,0,
+    0,0,115,18,0,0,0,124,0,160,0,124,1,161,1,114,
+    14,124,0,83,0,100,0,83,0,41,1,78,41,1,114,164,
+    0,0,0,41,2,114,104,0,0,0,114,194,0,0,0,114,
+    3,0,0,0,114,3,0,0,0,114,5,0,0,0,218,19,
+    103,101,116,95,114,101,115,111,117,114,99,101,95,114,101,97,
+    100,101,114,169,3,0,0,115,6,0,0,0,0,2,10,1,
+    4,1,122,30,70,105,108,101,76,111,97,100,101,114,46,103,
+    101,116,95,114,101,115,111,117,114,99,101,95,114,101,97,100,
+    101,114,99,2,0,0,0,0,0,0,0,3,0,0,0,4,
+    0,0,0,67,0,0,0,115,32,0,0,0,116,0,116,1,
+    124,0,106,2,131,1,100,1,25,0,124,1,131,2,125,2,
+    116,3,160,4,124,2,100,2,161,2,83,0,41,3,78,114,
+    61,0,0,0,114,223,0,0,0,41,5,114,29,0,0,0,
+    114,39,0,0,0,114,36,0,0,0,114,51,0,0,0,114,
+    52,0,0,0,41,3,114,104,0,0,0,218,8,114,101,115,
+    111,117,114,99,101,114,36,0,0,0,114,3,0,0,0,114,
+    3,0,0,0,114,5,0,0,0,218,13,111,112,101,110,95,
+    114,101,115,111,117,114,99,101,175,3,0,0,115,4,0,0,
+    0,0,1,20,1,122,24,70,105,108,101,76,111,97,100,101,
+    114,46,111,112,101,110,95,114,101,115,111,117,114,99,101,99,
+    2,0,0,0,0,0,0,0,3,0,0,0,3,0,0,0,
+    67,0,0,0,115,38,0,0,0,124,0,160,0,124,1,161,
+    1,115,14,116,1,130,1,116,2,116,3,124,0,106,4,131,
+    1,100,1,25,0,124,1,131,2,125,2,124,2,83,0,41,
+    2,78,114,61,0,0,0,41,5,218,11,105,115,95,114,101,
+    115,111,117,114,99,101,218,17,70,105,108,101,78,111,116,70,
+    111,117,110,100,69,114,114,111,114,114,29,0,0,0,114,39,
+    0,0,0,114,36,0,0,0,41,3,114,104,0,0,0,114,
+    226,0,0,0,114,36,0,0,0,114,3,0,0,0,114,3,
+    0,0,0,114,5,0,0,0,218,13,114,101,115,111,117,114,
+    99,101,95,112,97,116,104,179,3,0,0,115,8,0,0,0,
+    0,1,10,1,4,1,20,1,122,24,70,105,108,101,76,111,
+    97,100,101,114,46,114,101,115,111,117,114,99,101,95,112,97,
+    116,104,99,2,0,0,0,0,0,0,0,3,0,0,0,3,
+    0,0,0,67,0,0,0,115,40,0,0,0,116,0,124,1,
+    107,6,114,12,100,1,83,0,116,1,116,2,124,0,106,3,
+    131,1,100,2,25,0,124,1,131,2,125,2,116,4,124,2,
+    131,1,83,0,41,3,78,70,114,61,0,0,0,41,5,114,
+    26,0,0,0,114,29,0,0,0,114,39,0,0,0,114,36,
+    0,0,0,114,45,0,0,0,41,3,114,104,0,0,0,114,
+    102,0,0,0,114,36,0,0,0,114,3,0,0,0,114,3,
+    0,0,0,114,5,0,0,0,114,228,0,0,0,185,3,0,
+    0,115,8,0,0,0,0,1,8,1,4,1,20,1,122,22,
+    70,105,108,101,76,111,97,100,101,114,46,105,115,95,114,101,
+    115,111,117,114,99,101,99,1,0,0,0,0,0,0,0,1,
+    0,0,0,5,0,0,0,67,0,0,0,115,24,0,0,0,
+    116,0,116,1,160,2,116,3,124,0,106,4,131,1,100,1,
+    25,0,161,1,131,1,83,0,41,2,78,114,61,0,0,0,
+    41,5,218,4,105,116,101,114,114,1,0,0,0,218,7,108,
+    105,115,116,100,105,114,114,39,0,0,0,114,36,0,0,0,
+    41,1,114,104,0,0,0,114,3,0,0,0,114,3,0,0,
+    0,114,5,0,0,0,218,8,99,111,110,116,101,110,116,115,
+    191,3,0,0,115,2,0,0,0,0,1,122,19,70,105,108,
+    101,76,111,97,100,101,114,46,99,111,110,116,101,110,116,115,
+    41,17,114,109,0,0,0,114,108,0,0,0,114,110,0,0,
+    0,114,111,0,0,0,114,189,0,0,0,114,219,0,0,0,
+    114,221,0,0,0,114,120,0,0,0,114,197,0,0,0,114,
+    162,0,0,0,114,203,0,0,0,114,225,0,0,0,114,227,
+    0,0,0,114,230,0,0,0,114,228,0,0,0,114,233,0,
+    0,0,90,13,95,95,99,108,97,115,115,99,101,108,108,95,
+    95,114,3,0,0,0,114,3,0,0,0,41,1,114,217,0,
+    0,0,114,5,0,0,0,114,216,0,0,0,127,3,0,0,
+    115,24,0,0,0,8,3,4,2,8,6,8,4,8,3,16,
+    12,12,5,8,7,12,6,8,4,8,6,8,6,114,216,0,
+    0,0,99,0,0,0,0,0,0,0,0,0,0,0,0,3,
+    0,0,0,64,0,0,0,115,46,0,0,0,101,0,90,1,
+    100,0,90,2,100,1,90,3,100,2,100,3,132,0,90,4,
+    100,4,100,5,132,0,90,5,100,6,100,7,156,1,100,8,
+    100,9,132,2,90,6,100,10,83,0,41,11,218,16,83,111,
+    117,114,99,101,70,105,108,101,76,111,97,100,101,114,122,62,
+    67,111,110,99,114,101,116,101,32,105,109,112,108,101,109,101,
+    110,116,97,116,105,111,110,32,111,102,32,83,111,117,114,99,
+    101,76,111,97,100,101,114,32,117,115,105,110,103,32,116,104,
+    101,32,102,105,108,101,32,115,121,115,116,101,109,46,99,2,
+    0,0,0,0,0,0,0,3,0,0,0,3,0,0,0,67,
+    0,0,0,115,22,0,0,0,116,0,124,1,131,1,125,2,
+    124,2,106,1,124,2,106,2,100,1,156,2,83,0,41,2,
+    122,33,82,101,116,117,114,110,32,116,104,101,32,109,101,116,
+    97,100,97,116,97,32,102,111,114,32,116,104,101,32,112,97,
+    116,104,46,41,2,114,152,0,0,0,114,210,0,0,0,41,
+    3,114,40,0,0,0,218,8,115,116,95,109,116,105,109,101,
+    90,7,115,116,95,115,105,122,101,41,3,114,104,0,0,0,
+    114,36,0,0,0,114,215,0,0,0,114,3,0,0,0,114,
+    3,0,0,0,114,5,0,0,0,114,200,0,0,0,199,3,
+    0,0,115,4,0,0,0,0,2,8,1,122,27,83,111,117,
+    114,99,101,70,105,108,101,76,111,97,100,101,114,46,112,97,
+    116,104,95,115,116,97,116,115,99,4,0,0,0,0,0,0,
+    0,5,0,0,0,5,0,0,0,67,0,0,0,115,24,0,
+    0,0,116,0,124,1,131,1,125,4,124,0,106,1,124,2,
+    124,3,124,4,100,1,141,3,83,0,41,2,78,41,1,218,
+    5,95,109,111,100,101,41,2,114,101,0,0,0,114,201,0,
+    0,0,41,5,114,104,0,0,0,114,94,0,0,0,114,93,
+    0,0,0,114,55,0,0,0,114,43,0,0,0,114,3,0,
+    0,0,114,3,0,0,0,114,5,0,0,0,114,202,0,0,
+    0,204,3,0,0,115,4,0,0,0,0,2,8,1,122,32,
+    83,111,117,114,99,101,70,105,108,101,76,111,97,100,101,114,
+    46,95,99,97,99,104,101,95,98,121,116,101,99,111,100,101,
+    105,182,1,0,0,41,1,114,236,0,0,0,99,3,0,0,
+    0,1,0,0,0,9,0,0,0,11,0,0,0,67,0,0,
+    0,115,250,0,0,0,116,0,124,1,131,1,92,2,125,4,
+    125,5,103,0,125,6,120,38,124,4,114,54,116,1,124,4,
+    131,1,115,54,116,0,124,4,131,1,92,2,125,4,125,7,
+    124,6,160,2,124,7,161,1,1,0,113,18,87,0,120,110,
+    116,3,124,6,131,1,68,0,93,98,125,7,116,4,124,4,
+    124,7,131,2,125,4,121,14,116,5,160,6,124,4,161,1,
+    1,0,87,0,113,66,4,0,116,7,107,10,114,116,1,0,
+    1,0,1,0,119,66,89,0,113,66,4,0,116,8,107,10,
+    114,162,1,0,125,8,1,0,122,18,116,9,160,10,100,1,
+    124,4,124,8,161,3,1,0,100,2,83,0,100,2,125,8,
+    126,8,88,0,89,0,113,66,88,0,113,66,87,0,121,28,
+    116,11,124,1,124,2,124,3,131,3,1,0,116,9,160,10,
+    100,3,124,1,161,2,1,0,87,0,110,48,4,0,116,8,
+    107,10,114,244,1,0,125,8,1,0,122,18,116,9,160,10,
+    100,1,124,1,124,8,161,3,1,0,87,0,100,2,100,2,
+    125,8,126,8,88,0,89,0,110,2,88,0,100,2,83,0,
+    41,4,122,27,87,114,105,116,101,32,98,121,116,101,115,32,
+    100,97,116,97,32,116,111,32,97,32,102,105,108,101,46,122,
+    27,99,111,117,108,100,32,110,111,116,32,99,114,101,97,116,
+    101,32,123,33,114,125,58,32,123,33,114,125,78,122,12,99,
+    114,101,97,116,101,100,32,123,33,114,125,41,12,114,39,0,
+    0,0,114,47,0,0,0,114,168,0,0,0,114,34,0,0,
+    0,114,29,0,0,0,114,1,0,0,0,90,5,109,107,100,
+    105,114,218,15,70,105,108,101,69,120,105,115,116,115,69,114,
+    114,111,114,114,41,0,0,0,114,118,0,0,0,114,132,0,
+    0,0,114,57,0,0,0,41,9,114,104,0,0,0,114,36,
+    0,0,0,114,55,0,0,0,114,236,0,0,0,218,6,112,
+    97,114,101,110,116,114,98,0,0,0,114,28,0,0,0,114,
+    24,0,0,0,114,204,0,0,0,114,3,0,0,0,114,3,
+    0,0,0,114,5,0,0,0,114,201,0,0,0,209,3,0,
+    0,115,42,0,0,0,0,2,12,1,4,2,14,1,12,1,
+    14,2,14,1,10,1,2,1,14,1,14,2,6,1,16,3,
+    6,1,8,1,22,1,2,1,12,1,16,1,16,2,8,1,
+    122,25,83,111,117,114,99,101,70,105,108,101,76,111,97,100,
+    101,114,46,115,101,116,95,100,97,116,97,78,41,7,114,109,
+    0,0,0,114,108,0,0,0,114,110,0,0,0,114,111,0,
+    0,0,114,200,0,0,0,114,202,0,0,0,114,201,0,0,
+    0,114,3,0,0,0,114,3,0,0,0,114,3,0,0,0,
+    114,5,0,0,0,114,234,0,0,0,195,3,0,0,115,8,
+    0,0,0,8,2,4,2,8,5,8,5,114,234,0,0,0,
+    99,0,0,0,0,0,0,0,0,0,0,0,0,2,0,0,
+    0,64,0,0,0,115,32,0,0,0,101,0,90,1,100,0,
+    90,2,100,1,90,3,100,2,100,3,132,0,90,4,100,4,
+    100,5,132,0,90,5,100,6,83,0,41,7,218,20,83,111,
+    117,114,99,101,108,101,115,115,70,105,108,101,76,111,97,100,
+    101,114,122,45,76,111,97,100,101,114,32,119,104,105,99,104,
+    32,104,97,110,100,108,101,115,32,115,111,117,114,99,101,108,
+    101,115,115,32,102,105,108,101,32,105,109,112,111,114,116,115,
+    46,99,2,0,0,0,0,0,0,0,5,0,0,0,5,0,
+    0,0,67,0,0,0,115,68,0,0,0,124,0,160,0,124,
+    1,161,1,125,2,124,0,160,1,124,2,161,1,125,3,124,
+    1,124,2,100,1,156,2,125,4,116,2,124,3,124,1,124,
+    4,131,3,1,0,116,3,116,4,124,3,131,1,100,2,100,
+    0,133,2,25,0,124,1,124,2,100,3,141,3,83,0,41,
+    4,78,41,2,114,102,0,0,0,114,36,0,0,0,114,128,
+    0,0,0,41,2,114,102,0,0,0,114,93,0,0,0,41,
+    5,114,162,0,0,0,114,203,0,0,0,114,135,0,0,0,
+    114,148,0,0,0,114,212,0,0,0,41,5,114,104,0,0,
+    0,114,123,0,0,0,114,36,0,0,0,114,55,0,0,0,
+    114,134,0,0,0,114,3,0,0,0,114,3,0,0,0,114,
+    5,0,0,0,114,191,0,0,0,244,3,0,0,115,18,0,
+    0,0,0,1,10,1,10,4,2,1,8,2,12,1,2,1,
+    14,1,2,1,122,29,83,111,117,114,99,101,108,101,115,115,
+    70,105,108,101,76,111,97,100,101,114,46,103,101,116,95,99,
+    111,100,101,99,2,0,0,0,0,0,0,0,2,0,0,0,
+    1,0,0,0,67,0,0,0,115,4,0,0,0,100,1,83,
+    0,41,2,122,39,82,101,116,117,114,110,32,78,111,110,101,
+    32,97,115,32,116,104,101,114,101,32,105,115,32,110,111,32,
+    115,111,117,114,99,101,32,99,111,100,101,46,78,114,3,0,
+    0,0,41,2,114,104,0,0,0,114,123,0,0,0,114,3,
+    0,0,0,114,3,0,0,0,114,5,0,0,0,114,205,0,
+    0,0,4,4,0,0,115,2,0,0,0,0,2,122,31,83,
+    111,117,114,99,101,108,101,115,115,70,105,108,101,76,111,97,
+    100,101,114,46,103,101,116,95,115,111,117,114,99,101,78,41,
+    6,114,109,0,0,0,114,108,0,0,0,114,110,0,0,0,
+    114,111,0,0,0,114,191,0,0,0,114,205,0,0,0,114,
+    3,0,0,0,114,3,0,0,0,114,3,0,0,0,114,5,
+    0,0,0,114,239,0,0,0,240,3,0,0,115,6,0,0,
+    0,8,2,4,2,8,16,114,239,0,0,0,99,0,0,0,
+    0,0,0,0,0,0,0,0,0,3,0,0,0,64,0,0,
+    0,115,92,0,0,0,101,0,90,1,100,0,90,2,100,1,
+    90,3,100,2,100,3,132,0,90,4,100,4,100,5,132,0,
+    90,5,100,6,100,7,132,0,90,6,100,8,100,9,132,0,
+    90,7,100,10,100,11,132,0,90,8,100,12,100,13,132,0,
+    90,9,100,14,100,15,132,0,90,10,100,16,100,17,132,0,
+    90,11,101,12,100,18,100,19,132,0,131,1,90,13,100,20,
+    83,0,41,21,218,19,69,120,116,101,110,115,105,111,110,70,
+    105,108,101,76,111,97,100,101,114,122,93,76,111,97,100,101,
+    114,32,102,111,114,32,101,120,116,101,110,115,105,111,110,32,
+    109,111,100,117,108,101,115,46,10,10,32,32,32,32,84,104,
+    101,32,99,111,110,115,116,114,117,99,116,111,114,32,105,115,
+    32,100,101,115,105,103,110,101,100,32,116,111,32,119,111,114,
+    107,32,119,105,116,104,32,70,105,108,101,70,105,110,100,101,
+    114,46,10,10,32,32,32,32,99,3,0,0,0,0,0,0,
+    0,3,0,0,0,2,0,0,0,67,0,0,0,115,16,0,
+    0,0,124,1,124,0,95,0,124,2,124,0,95,1,100,0,
+    83,0,41,1,78,41,2,114,102,0,0,0,114,36,0,0,
+    0,41,3,114,104,0,0,0,114,102,0,0,0,114,36,0,
+    0,0,114,3,0,0,0,114,3,0,0,0,114,5,0,0,
+    0,114,189,0,0,0,21,4,0,0,115,4,0,0,0,0,
+    1,6,1,122,28,69,120,116,101,110,115,105,111,110,70,105,
+    108,101,76,111,97,100,101,114,46,95,95,105,110,105,116,95,
+    95,99,2,0,0,0,0,0,0,0,2,0,0,0,2,0,
+    0,0,67,0,0,0,115,24,0,0,0,124,0,106,0,124,
+    1,106,0,107,2,111,22,124,0,106,1,124,1,106,1,107,
+    2,83,0,41,1,78,41,2,114,217,0,0,0,114,115,0,
+    0,0,41,2,114,104,0,0,0,114,218,0,0,0,114,3,
+    0,0,0,114,3,0,0,0,114,5,0,0,0,114,219,0,
+    0,0,25,4,0,0,115,4,0,0,0,0,1,12,1,122,
+    26,69,120,116,101,110,115,105,111,110,70,105,108,101,76,111,
+    97,100,101,114,46,95,95,101,113,95,95,99,1,0,0,0,
+    0,0,0,0,1,0,0,0,3,0,0,0,67,0,0,0,
+    115,20,0,0,0,116,0,124,0,106,1,131,1,116,0,124,
+    0,106,2,131,1,65,0,83,0,41,1,78,41,3,114,220,
+    0,0,0,114,102,0,0,0,114,36,0,0,0,41,1,114,
+    104,0,0,0,114,3,0,0,0,114,3,0,0,0,114,5,
+    0,0,0,114,221,0,0,0,29,4,0,0,115,2,0,0,
+    0,0,1,122,28,69,120,116,101,110,115,105,111,110,70,105,
+    108,101,76,111,97,100,101,114,46,95,95,104,97,115,104,95,
+    95,99,2,0,0,0,0,0,0,0,3,0,0,0,5,0,
+    0,0,67,0,0,0,115,36,0,0,0,116,0,160,1,116,
+    2,106,3,124,1,161,2,125,2,116,0,160,4,100,1,124,
+    1,106,5,124,0,106,6,161,3,1,0,124,2,83,0,41,
+    2,122,38,67,114,101,97,116,101,32,97,110,32,117,110,105,
+    116,105,97,108,105,122,101,100,32,101,120,116,101,110,115,105,
+    111,110,32,109,111,100,117,108,101,122,38,101,120,116,101,110,
+    115,105,111,110,32,109,111,100,117,108,101,32,123,33,114,125,
+    32,108,111,97,100,101,100,32,102,114,111,109,32,123,33,114,
+    125,41,7,114,118,0,0,0,114,192,0,0,0,114,146,0,
+    0,0,90,14,99,114,101,97,116,101,95,100,121,110,97,109,
+    105,99,114,132,0,0,0,114,102,0,0,0,114,36,0,0,
+    0,41,3,114,104,0,0,0,114,169,0,0,0,114,194,0,
+    0,0,114,3,0,0,0,114,3,0,0,0,114,5,0,0,
+    0,114,190,0,0,0,32,4,0,0,115,10,0,0,0,0,
+    2,4,1,10,1,6,1,12,1,122,33,69,120,116,101,110,
+    115,105,111,110,70,105,108,101,76,111,97,100,101,114,46,99,
+    114,101,97,116,101,95,109,111,100,117,108,101,99,2,0,0,
+    0,0,0,0,0,2,0,0,0,5,0,0,0,67,0,0,
+    0,115,36,0,0,0,116,0,160,1,116,2,106,3,124,1,
+    161,2,1,0,116,0,160,4,100,1,124,0,106,5,124,0,
+    106,6,161,3,1,0,100,2,83,0,41,3,122,30,73,110,
+    105,116,105,97,108,105,122,101,32,97,110,32,101,120,116,101,
+    110,115,105,111,110,32,109,111,100,117,108,101,122,40,101,120,
+    116,101,110,115,105,111,110,32,109,111,100,117,108,101,32,123,
+    33,114,125,32,101,120,101,99,117,116,101,100,32,102,114,111,
+    109,32,123,33,114,125,78,41,7,114,118,0,0,0,114,192,
+    0,0,0,114,146,0,0,0,90,12,101,120,101,99,95,100,
+    121,110,97,109,105,99,114,132,0,0,0,114,102,0,0,0,
+    114,36,0,0,0,41,2,114,104,0,0,0,114,194,0,0,
+    0,114,3,0,0,0,114,3,0,0,0,114,5,0,0,0,
+    114,195,0,0,0,40,4,0,0,115,6,0,0,0,0,2,
+    14,1,6,1,122,31,69,120,116,101,110,115,105,111,110,70,
+    105,108,101,76,111,97,100,101,114,46,101,120,101,99,95,109,
+    111,100,117,108,101,99,2,0,0,0,0,0,0,0,2,0,
+    0,0,4,0,0,0,3,0,0,0,115,36,0,0,0,116,
+    0,124,0,106,1,131,1,100,1,25,0,137,0,116,2,135,
+    0,102,1,100,2,100,3,132,8,116,3,68,0,131,1,131,
+    1,83,0,41,4,122,49,82,101,116,117,114,110,32,84,114,
+    117,101,32,105,102,32,116,104,101,32,101,120,116,101,110,115,
+    105,111,110,32,109,111,100,117,108,101,32,105,115,32,97,32,
+    112,97,99,107,97,103,101,46,114,30,0,0,0,99,1,0,
+    0,0,0,0,0,0,2,0,0,0,4,0,0,0,51,0,
+    0,0,115,26,0,0,0,124,0,93,18,125,1,136,0,100,
+    0,124,1,23,0,107,2,86,0,1,0,113,2,100,1,83,
+    0,41,2,114,189,0,0,0,78,114,3,0,0,0,41,2,
+    114,23,0,0,0,218,6,115,117,102,102,105,120,41,1,218,
+    9,102,105,108,101,95,110,97,109,101,114,3,0,0,0,114,
+    5,0,0,0,250,9,60,103,101,110,101,120,112,114,62,49,
+    4,0,0,115,2,0,0,0,4,1,122,49,69,120,116,101,
+    110,115,105,111,110,70,105,108,101,76,111,97,100,101,114,46,
+    105,115,95,112,97,99,107,97,103,101,46,60,108,111,99,97,
+    108,115,62,46,60,103,101,110,101,120,112,114,62,41,4,114,
+    39,0,0,0,114,36,0,0,0,218,3,97,110,121,218,18,
+    69,88,84,69,78,83,73,79,78,95,83,85,70,70,73,88,
+    69,83,41,2,114,104,0,0,0,114,123,0,0,0,114,3,
+    0,0,0,41,1,114,242,0,0,0,114,5,0,0,0,114,
+    164,0,0,0,46,4,0,0,115,6,0,0,0,0,2,14,
+    1,12,1,122,30,69,120,116,101,110,115,105,111,110,70,105,
+    108,101,76,111,97,100,101,114,46,105,115,95,112,97,99,107,
+    97,103,101,99,2,0,0,0,0,0,0,0,2,0,0,0,
+    1,0,0,0,67,0,0,0,115,4,0,0,0,100,1,83,
+    0,41,2,122,63,82,101,116,117,114,110,32,78,111,110,101,
+    32,97,115,32,97,110,32,101,120,116,101,110,115,105,111,110,
+    32,109,111,100,117,108,101,32,99,97,110,110,111,116,32,99,
+    114,101,97,116,101,32,97,32,99,111,100,101,32,111,98,106,
+    101,99,116,46,78,114,3,0,0,0,41,2,114,104,0,0,
+    0,114,123,0,0,0,114,3,0,0,0,114,3,0,0,0,
+    114,5,0,0,0,114,191,0,0,0,52,4,0,0,115,2,
+    0,0,0,0,2,122,28,69,120,116,101,110,115,105,111,110,
+    70,105,108,101,76,111,97,100,101,114,46,103,101,116,95,99,
+    111,100,101,99,2,0,0,0,0,0,0,0,2,0,0,0,
+    1,0,0,0,67,0,0,0,115,4,0,0,0,100,1,83,
+    0,41,2,122,53,82,101,116,117,114,110,32,78,111,110,101,
+    32,97,115,32,101,120,116,101,110,115,105,111,110,32,109,111,
+    100,117,108,101,115,32,104,97,118,101,32,110,111,32,115,111,
+    117,114,99,101,32,99,111,100,101,46,78,114,3,0,0,0,
+    41,2,114,104,0,0,0,114,123,0,0,0,114,3,0,0,
+    0,114,3,0,0,0,114,5,0,0,0,114,205,0,0,0,
+    56,4,0,0,115,2,0,0,0,0,2,122,30,69,120,116,
     101,110,115,105,111,110,70,105,108,101,76,111,97,100,101,114,
-    46,99,114,101,97,116,101,95,109,111,100,117,108,101,99,2,
-    0,0,0,0,0,0,0,2,0,0,0,5,0,0,0,67,
-    0,0,0,115,36,0,0,0,116,0,160,1,116,2,106,3,
-    124,1,161,2,1,0,116,0,160,4,100,1,124,0,106,5,
-    124,0,106,6,161,3,1,0,100,2,83,0,41,3,122,30,
-    73,110,105,116,105,97,108,105,122,101,32,97,110,32,101,120,
-    116,101,110,115,105,111,110,32,109,111,100,117,108,101,122,40,
-    101,120,116,101,110,115,105,111,110,32,109,111,100,117,108,101,
-    32,123,33,114,125,32,101,120,101,99,117,116,101,100,32,102,
-    114,111,109,32,123,33,114,125,78,41,7,114,116,0,0,0,
-    114,189,0,0,0,114,143,0,0,0,90,12,101,120,101,99,
-    95,100,121,110,97,109,105,99,114,130,0,0,0,114,100,0,
-    0,0,114,35,0,0,0,41,2,114,102,0,0,0,114,191,
-    0,0,0,114,2,0,0,0,114,2,0,0,0,114,4,0,
-    0,0,114,192,0,0,0,24,4,0,0,115,6,0,0,0,
-    0,2,14,1,6,1,122,31,69,120,116,101,110,115,105,111,
-    110,70,105,108,101,76,111,97,100,101,114,46,101,120,101,99,
-    95,109,111,100,117,108,101,99,2,0,0,0,0,0,0,0,
-    2,0,0,0,4,0,0,0,3,0,0,0,115,36,0,0,
-    0,116,0,124,0,106,1,131,1,100,1,25,0,137,0,116,
-    2,135,0,102,1,100,2,100,3,132,8,116,3,68,0,131,
-    1,131,1,83,0,41,4,122,49,82,101,116,117,114,110,32,
-    84,114,117,101,32,105,102,32,116,104,101,32,101,120,116,101,
-    110,115,105,111,110,32,109,111,100,117,108,101,32,105,115,32,
-    97,32,112,97,99,107,97,103,101,46,114,29,0,0,0,99,
-    1,0,0,0,0,0,0,0,2,0,0,0,4,0,0,0,
-    51,0,0,0,115,26,0,0,0,124,0,93,18,125,1,136,
-    0,100,0,124,1,23,0,107,2,86,0,1,0,113,2,100,
-    1,83,0,41,2,114,186,0,0,0,78,114,2,0,0,0,
-    41,2,114,22,0,0,0,218,6,115,117,102,102,105,120,41,
-    1,218,9,102,105,108,101,95,110,97,109,101,114,2,0,0,
-    0,114,4,0,0,0,250,9,60,103,101,110,101,120,112,114,
-    62,33,4,0,0,115,2,0,0,0,4,1,122,49,69,120,
-    116,101,110,115,105,111,110,70,105,108,101,76,111,97,100,101,
-    114,46,105,115,95,112,97,99,107,97,103,101,46,60,108,111,
-    99,97,108,115,62,46,60,103,101,110,101,120,112,114,62,41,
-    4,114,38,0,0,0,114,35,0,0,0,218,3,97,110,121,
-    218,18,69,88,84,69,78,83,73,79,78,95,83,85,70,70,
-    73,88,69,83,41,2,114,102,0,0,0,114,121,0,0,0,
-    114,2,0,0,0,41,1,114,237,0,0,0,114,4,0,0,
-    0,114,161,0,0,0,30,4,0,0,115,6,0,0,0,0,
-    2,14,1,12,1,122,30,69,120,116,101,110,115,105,111,110,
-    70,105,108,101,76,111,97,100,101,114,46,105,115,95,112,97,
-    99,107,97,103,101,99,2,0,0,0,0,0,0,0,2,0,
-    0,0,1,0,0,0,67,0,0,0,115,4,0,0,0,100,
-    1,83,0,41,2,122,63,82,101,116,117,114,110,32,78,111,
-    110,101,32,97,115,32,97,110,32,101,120,116,101,110,115,105,
-    111,110,32,109,111,100,117,108,101,32,99,97,110,110,111,116,
-    32,99,114,101,97,116,101,32,97,32,99,111,100,101,32,111,
-    98,106,101,99,116,46,78,114,2,0,0,0,41,2,114,102,
-    0,0,0,114,121,0,0,0,114,2,0,0,0,114,2,0,
-    0,0,114,4,0,0,0,114,188,0,0,0,36,4,0,0,
-    115,2,0,0,0,0,2,122,28,69,120,116,101,110,115,105,
-    111,110,70,105,108,101,76,111,97,100,101,114,46,103,101,116,
-    95,99,111,100,101,99,2,0,0,0,0,0,0,0,2,0,
-    0,0,1,0,0,0,67,0,0,0,115,4,0,0,0,100,
-    1,83,0,41,2,122,53,82,101,116,117,114,110,32,78,111,
-    110,101,32,97,115,32,101,120,116,101,110,115,105,111,110,32,
-    109,111,100,117,108,101,115,32,104,97,118,101,32,110,111,32,
-    115,111,117,114,99,101,32,99,111,100,101,46,78,114,2,0,
-    0,0,41,2,114,102,0,0,0,114,121,0,0,0,114,2,
-    0,0,0,114,2,0,0,0,114,4,0,0,0,114,202,0,
-    0,0,40,4,0,0,115,2,0,0,0,0,2,122,30,69,
-    120,116,101,110,115,105,111,110,70,105,108,101,76,111,97,100,
-    101,114,46,103,101,116,95,115,111,117,114,99,101,99,2,0,
-    0,0,0,0,0,0,2,0,0,0,1,0,0,0,67,0,
-    0,0,115,6,0,0,0,124,0,106,0,83,0,41,1,122,
-    58,82,101,116,117,114,110,32,116,104,101,32,112,97,116,104,
-    32,116,111,32,116,104,101,32,115,111,117,114,99,101,32,102,
-    105,108,101,32,97,115,32,102,111,117,110,100,32,98,121,32,
-    116,104,101,32,102,105,110,100,101,114,46,41,1,114,35,0,
-    0,0,41,2,114,102,0,0,0,114,121,0,0,0,114,2,
-    0,0,0,114,2,0,0,0,114,4,0,0,0,114,159,0,
-    0,0,44,4,0,0,115,2,0,0,0,0,3,122,32,69,
-    120,116,101,110,115,105,111,110,70,105,108,101,76,111,97,100,
-    101,114,46,103,101,116,95,102,105,108,101,110,97,109,101,78,
-    41,14,114,107,0,0,0,114,106,0,0,0,114,108,0,0,
-    0,114,109,0,0,0,114,186,0,0,0,114,215,0,0,0,
-    114,217,0,0,0,114,187,0,0,0,114,192,0,0,0,114,
-    161,0,0,0,114,188,0,0,0,114,202,0,0,0,114,118,
-    0,0,0,114,159,0,0,0,114,2,0,0,0,114,2,0,
-    0,0,114,2,0,0,0,114,4,0,0,0,114,235,0,0,
-    0,253,3,0,0,115,20,0,0,0,8,6,4,2,8,4,
-    8,4,8,3,8,8,8,6,8,6,8,4,8,4,114,235,
-    0,0,0,99,0,0,0,0,0,0,0,0,0,0,0,0,
-    2,0,0,0,64,0,0,0,115,96,0,0,0,101,0,90,
-    1,100,0,90,2,100,1,90,3,100,2,100,3,132,0,90,
-    4,100,4,100,5,132,0,90,5,100,6,100,7,132,0,90,
-    6,100,8,100,9,132,0,90,7,100,10,100,11,132,0,90,
-    8,100,12,100,13,132,0,90,9,100,14,100,15,132,0,90,
-    10,100,16,100,17,132,0,90,11,100,18,100,19,132,0,90,
-    12,100,20,100,21,132,0,90,13,100,22,83,0,41,23,218,
-    14,95,78,97,109,101,115,112,97,99,101,80,97,116,104,97,
-    38,1,0,0,82,101,112,114,101,115,101,110,116,115,32,97,
-    32,110,97,109,101,115,112,97,99,101,32,112,97,99,107,97,
-    103,101,39,115,32,112,97,116,104,46,32,32,73,116,32,117,
-    115,101,115,32,116,104,101,32,109,111,100,117,108,101,32,110,
-    97,109,101,10,32,32,32,32,116,111,32,102,105,110,100,32,
-    105,116,115,32,112,97,114,101,110,116,32,109,111,100,117,108,
-    101,44,32,97,110,100,32,102,114,111,109,32,116,104,101,114,
-    101,32,105,116,32,108,111,111,107,115,32,117,112,32,116,104,
-    101,32,112,97,114,101,110,116,39,115,10,32,32,32,32,95,
-    95,112,97,116,104,95,95,46,32,32,87,104,101,110,32,116,
-    104,105,115,32,99,104,97,110,103,101,115,44,32,116,104,101,
-    32,109,111,100,117,108,101,39,115,32,111,119,110,32,112,97,
-    116,104,32,105,115,32,114,101,99,111,109,112,117,116,101,100,
-    44,10,32,32,32,32,117,115,105,110,103,32,112,97,116,104,
-    95,102,105,110,100,101,114,46,32,32,70,111,114,32,116,111,
-    112,45,108,101,118,101,108,32,109,111,100,117,108,101,115,44,
-    32,116,104,101,32,112,97,114,101,110,116,32,109,111,100,117,
-    108,101,39,115,32,112,97,116,104,10,32,32,32,32,105,115,
-    32,115,121,115,46,112,97,116,104,46,99,4,0,0,0,0,
-    0,0,0,4,0,0,0,3,0,0,0,67,0,0,0,115,
-    36,0,0,0,124,1,124,0,95,0,124,2,124,0,95,1,
-    116,2,124,0,160,3,161,0,131,1,124,0,95,4,124,3,
-    124,0,95,5,100,0,83,0,41,1,78,41,6,218,5,95,
-    110,97,109,101,218,5,95,112,97,116,104,114,95,0,0,0,
-    218,16,95,103,101,116,95,112,97,114,101,110,116,95,112,97,
-    116,104,218,17,95,108,97,115,116,95,112,97,114,101,110,116,
-    95,112,97,116,104,218,12,95,112,97,116,104,95,102,105,110,
-    100,101,114,41,4,114,102,0,0,0,114,100,0,0,0,114,
-    35,0,0,0,218,11,112,97,116,104,95,102,105,110,100,101,
-    114,114,2,0,0,0,114,2,0,0,0,114,4,0,0,0,
-    114,186,0,0,0,57,4,0,0,115,8,0,0,0,0,1,
-    6,1,6,1,14,1,122,23,95,78,97,109,101,115,112,97,
-    99,101,80,97,116,104,46,95,95,105,110,105,116,95,95,99,
-    1,0,0,0,0,0,0,0,4,0,0,0,3,0,0,0,
-    67,0,0,0,115,38,0,0,0,124,0,106,0,160,1,100,
-    1,161,1,92,3,125,1,125,2,125,3,124,2,100,2,107,
-    2,114,30,100,3,83,0,124,1,100,4,102,2,83,0,41,
-    5,122,62,82,101,116,117,114,110,115,32,97,32,116,117,112,
-    108,101,32,111,102,32,40,112,97,114,101,110,116,45,109,111,
-    100,117,108,101,45,110,97,109,101,44,32,112,97,114,101,110,
-    116,45,112,97,116,104,45,97,116,116,114,45,110,97,109,101,
-    41,114,59,0,0,0,114,30,0,0,0,41,2,114,6,0,
-    0,0,114,35,0,0,0,90,8,95,95,112,97,116,104,95,
-    95,41,2,114,242,0,0,0,114,32,0,0,0,41,4,114,
-    102,0,0,0,114,233,0,0,0,218,3,100,111,116,90,2,
-    109,101,114,2,0,0,0,114,2,0,0,0,114,4,0,0,
-    0,218,23,95,102,105,110,100,95,112,97,114,101,110,116,95,
-    112,97,116,104,95,110,97,109,101,115,63,4,0,0,115,8,
-    0,0,0,0,2,18,1,8,2,4,3,122,38,95,78,97,
-    109,101,115,112,97,99,101,80,97,116,104,46,95,102,105,110,
-    100,95,112,97,114,101,110,116,95,112,97,116,104,95,110,97,
-    109,101,115,99,1,0,0,0,0,0,0,0,3,0,0,0,
-    3,0,0,0,67,0,0,0,115,28,0,0,0,124,0,160,
-    0,161,0,92,2,125,1,125,2,116,1,116,2,106,3,124,
-    1,25,0,124,2,131,2,83,0,41,1,78,41,4,114,249,
-    0,0,0,114,112,0,0,0,114,6,0,0,0,218,7,109,
-    111,100,117,108,101,115,41,3,114,102,0,0,0,90,18,112,
-    97,114,101,110,116,95,109,111,100,117,108,101,95,110,97,109,
-    101,90,14,112,97,116,104,95,97,116,116,114,95,110,97,109,
-    101,114,2,0,0,0,114,2,0,0,0,114,4,0,0,0,
-    114,244,0,0,0,73,4,0,0,115,4,0,0,0,0,1,
-    12,1,122,31,95,78,97,109,101,115,112,97,99,101,80,97,
-    116,104,46,95,103,101,116,95,112,97,114,101,110,116,95,112,
-    97,116,104,99,1,0,0,0,0,0,0,0,3,0,0,0,
-    4,0,0,0,67,0,0,0,115,80,0,0,0,116,0,124,
-    0,160,1,161,0,131,1,125,1,124,1,124,0,106,2,107,
-    3,114,74,124,0,160,3,124,0,106,4,124,1,161,2,125,
-    2,124,2,100,0,107,9,114,68,124,2,106,5,100,0,107,
-    8,114,68,124,2,106,6,114,68,124,2,106,6,124,0,95,
-    7,124,1,124,0,95,2,124,0,106,7,83,0,41,1,78,
-    41,8,114,95,0,0,0,114,244,0,0,0,114,245,0,0,
-    0,114,246,0,0,0,114,242,0,0,0,114,122,0,0,0,
-    114,158,0,0,0,114,243,0,0,0,41,3,114,102,0,0,
-    0,90,11,112,97,114,101,110,116,95,112,97,116,104,114,166,
-    0,0,0,114,2,0,0,0,114,2,0,0,0,114,4,0,
-    0,0,218,12,95,114,101,99,97,108,99,117,108,97,116,101,
-    77,4,0,0,115,16,0,0,0,0,2,12,1,10,1,14,
-    3,18,1,6,1,8,1,6,1,122,27,95,78,97,109,101,
-    115,112,97,99,101,80,97,116,104,46,95,114,101,99,97,108,
-    99,117,108,97,116,101,99,1,0,0,0,0,0,0,0,1,
-    0,0,0,3,0,0,0,67,0,0,0,115,12,0,0,0,
-    116,0,124,0,160,1,161,0,131,1,83,0,41,1,78,41,
-    2,114,226,0,0,0,114,251,0,0,0,41,1,114,102,0,
-    0,0,114,2,0,0,0,114,2,0,0,0,114,4,0,0,
-    0,218,8,95,95,105,116,101,114,95,95,90,4,0,0,115,
-    2,0,0,0,0,1,122,23,95,78,97,109,101,115,112,97,
-    99,101,80,97,116,104,46,95,95,105,116,101,114,95,95,99,
-    3,0,0,0,0,0,0,0,3,0,0,0,3,0,0,0,
-    67,0,0,0,115,14,0,0,0,124,2,124,0,106,0,124,
-    1,60,0,100,0,83,0,41,1,78,41,1,114,243,0,0,
-    0,41,3,114,102,0,0,0,218,5,105,110,100,101,120,114,
-    35,0,0,0,114,2,0,0,0,114,2,0,0,0,114,4,
-    0,0,0,218,11,95,95,115,101,116,105,116,101,109,95,95,
-    93,4,0,0,115,2,0,0,0,0,1,122,26,95,78,97,
-    109,101,115,112,97,99,101,80,97,116,104,46,95,95,115,101,
-    116,105,116,101,109,95,95,99,1,0,0,0,0,0,0,0,
-    1,0,0,0,3,0,0,0,67,0,0,0,115,12,0,0,
-    0,116,0,124,0,160,1,161,0,131,1,83,0,41,1,78,
-    41,2,114,31,0,0,0,114,251,0,0,0,41,1,114,102,
-    0,0,0,114,2,0,0,0,114,2,0,0,0,114,4,0,
-    0,0,218,7,95,95,108,101,110,95,95,96,4,0,0,115,
-    2,0,0,0,0,1,122,22,95,78,97,109,101,115,112,97,
-    99,101,80,97,116,104,46,95,95,108,101,110,95,95,99,1,
-    0,0,0,0,0,0,0,1,0,0,0,3,0,0,0,67,
-    0,0,0,115,12,0,0,0,100,1,160,0,124,0,106,1,
-    161,1,83,0,41,2,78,122,20,95,78,97,109,101,115,112,
-    97,99,101,80,97,116,104,40,123,33,114,125,41,41,2,114,
-    48,0,0,0,114,243,0,0,0,41,1,114,102,0,0,0,
-    114,2,0,0,0,114,2,0,0,0,114,4,0,0,0,218,
-    8,95,95,114,101,112,114,95,95,99,4,0,0,115,2,0,
+    46,103,101,116,95,115,111,117,114,99,101,99,2,0,0,0,
+    0,0,0,0,2,0,0,0,1,0,0,0,67,0,0,0,
+    115,6,0,0,0,124,0,106,0,83,0,41,1,122,58,82,
+    101,116,117,114,110,32,116,104,101,32,112,97,116,104,32,116,
+    111,32,116,104,101,32,115,111,117,114,99,101,32,102,105,108,
+    101,32,97,115,32,102,111,117,110,100,32,98,121,32,116,104,
+    101,32,102,105,110,100,101,114,46,41,1,114,36,0,0,0,
+    41,2,114,104,0,0,0,114,123,0,0,0,114,3,0,0,
+    0,114,3,0,0,0,114,5,0,0,0,114,162,0,0,0,
+    60,4,0,0,115,2,0,0,0,0,3,122,32,69,120,116,
+    101,110,115,105,111,110,70,105,108,101,76,111,97,100,101,114,
+    46,103,101,116,95,102,105,108,101,110,97,109,101,78,41,14,
+    114,109,0,0,0,114,108,0,0,0,114,110,0,0,0,114,
+    111,0,0,0,114,189,0,0,0,114,219,0,0,0,114,221,
+    0,0,0,114,190,0,0,0,114,195,0,0,0,114,164,0,
+    0,0,114,191,0,0,0,114,205,0,0,0,114,120,0,0,
+    0,114,162,0,0,0,114,3,0,0,0,114,3,0,0,0,
+    114,3,0,0,0,114,5,0,0,0,114,240,0,0,0,13,
+    4,0,0,115,20,0,0,0,8,6,4,2,8,4,8,4,
+    8,3,8,8,8,6,8,6,8,4,8,4,114,240,0,0,
+    0,99,0,0,0,0,0,0,0,0,0,0,0,0,2,0,
+    0,0,64,0,0,0,115,96,0,0,0,101,0,90,1,100,
+    0,90,2,100,1,90,3,100,2,100,3,132,0,90,4,100,
+    4,100,5,132,0,90,5,100,6,100,7,132,0,90,6,100,
+    8,100,9,132,0,90,7,100,10,100,11,132,0,90,8,100,
+    12,100,13,132,0,90,9,100,14,100,15,132,0,90,10,100,
+    16,100,17,132,0,90,11,100,18,100,19,132,0,90,12,100,
+    20,100,21,132,0,90,13,100,22,83,0,41,23,218,14,95,
+    78,97,109,101,115,112,97,99,101,80,97,116,104,97,38,1,
+    0,0,82,101,112,114,101,115,101,110,116,115,32,97,32,110,
+    97,109,101,115,112,97,99,101,32,112,97,99,107,97,103,101,
+    39,115,32,112,97,116,104,46,32,32,73,116,32,117,115,101,
+    115,32,116,104,101,32,109,111,100,117,108,101,32,110,97,109,
+    101,10,32,32,32,32,116,111,32,102,105,110,100,32,105,116,
+    115,32,112,97,114,101,110,116,32,109,111,100,117,108,101,44,
+    32,97,110,100,32,102,114,111,109,32,116,104,101,114,101,32,
+    105,116,32,108,111,111,107,115,32,117,112,32,116,104,101,32,
+    112,97,114,101,110,116,39,115,10,32,32,32,32,95,95,112,
+    97,116,104,95,95,46,32,32,87,104,101,110,32,116,104,105,
+    115,32,99,104,97,110,103,101,115,44,32,116,104,101,32,109,
+    111,100,117,108,101,39,115,32,111,119,110,32,112,97,116,104,
+    32,105,115,32,114,101,99,111,109,112,117,116,101,100,44,10,
+    32,32,32,32,117,115,105,110,103,32,112,97,116,104,95,102,
+    105,110,100,101,114,46,32,32,70,111,114,32,116,111,112,45,
+    108,101,118,101,108,32,109,111,100,117,108,101,115,44,32,116,
+    104,101,32,112,97,114,101,110,116,32,109,111,100,117,108,101,
+    39,115,32,112,97,116,104,10,32,32,32,32,105,115,32,115,
+    121,115,46,112,97,116,104,46,99,4,0,0,0,0,0,0,
+    0,4,0,0,0,3,0,0,0,67,0,0,0,115,36,0,
+    0,0,124,1,124,0,95,0,124,2,124,0,95,1,116,2,
+    124,0,160,3,161,0,131,1,124,0,95,4,124,3,124,0,
+    95,5,100,0,83,0,41,1,78,41,6,218,5,95,110,97,
+    109,101,218,5,95,112,97,116,104,114,97,0,0,0,218,16,
+    95,103,101,116,95,112,97,114,101,110,116,95,112,97,116,104,
+    218,17,95,108,97,115,116,95,112,97,114,101,110,116,95,112,
+    97,116,104,218,12,95,112,97,116,104,95,102,105,110,100,101,
+    114,41,4,114,104,0,0,0,114,102,0,0,0,114,36,0,
+    0,0,218,11,112,97,116,104,95,102,105,110,100,101,114,114,
+    3,0,0,0,114,3,0,0,0,114,5,0,0,0,114,189,
+    0,0,0,73,4,0,0,115,8,0,0,0,0,1,6,1,
+    6,1,14,1,122,23,95,78,97,109,101,115,112,97,99,101,
+    80,97,116,104,46,95,95,105,110,105,116,95,95,99,1,0,
+    0,0,0,0,0,0,4,0,0,0,3,0,0,0,67,0,
+    0,0,115,38,0,0,0,124,0,106,0,160,1,100,1,161,
+    1,92,3,125,1,125,2,125,3,124,2,100,2,107,2,114,
+    30,100,3,83,0,124,1,100,4,102,2,83,0,41,5,122,
+    62,82,101,116,117,114,110,115,32,97,32,116,117,112,108,101,
+    32,111,102,32,40,112,97,114,101,110,116,45,109,111,100,117,
+    108,101,45,110,97,109,101,44,32,112,97,114,101,110,116,45,
+    112,97,116,104,45,97,116,116,114,45,110,97,109,101,41,114,
+    60,0,0,0,114,31,0,0,0,41,2,114,7,0,0,0,
+    114,36,0,0,0,90,8,95,95,112,97,116,104,95,95,41,
+    2,114,247,0,0,0,114,33,0,0,0,41,4,114,104,0,
+    0,0,114,238,0,0,0,218,3,100,111,116,90,2,109,101,
+    114,3,0,0,0,114,3,0,0,0,114,5,0,0,0,218,
+    23,95,102,105,110,100,95,112,97,114,101,110,116,95,112,97,
+    116,104,95,110,97,109,101,115,79,4,0,0,115,8,0,0,
+    0,0,2,18,1,8,2,4,3,122,38,95,78,97,109,101,
+    115,112,97,99,101,80,97,116,104,46,95,102,105,110,100,95,
+    112,97,114,101,110,116,95,112,97,116,104,95,110,97,109,101,
+    115,99,1,0,0,0,0,0,0,0,3,0,0,0,3,0,
+    0,0,67,0,0,0,115,28,0,0,0,124,0,160,0,161,
+    0,92,2,125,1,125,2,116,1,116,2,106,3,124,1,25,
+    0,124,2,131,2,83,0,41,1,78,41,4,114,254,0,0,
+    0,114,114,0,0,0,114,7,0,0,0,218,7,109,111,100,
+    117,108,101,115,41,3,114,104,0,0,0,90,18,112,97,114,
+    101,110,116,95,109,111,100,117,108,101,95,110,97,109,101,90,
+    14,112,97,116,104,95,97,116,116,114,95,110,97,109,101,114,
+    3,0,0,0,114,3,0,0,0,114,5,0,0,0,114,249,
+    0,0,0,89,4,0,0,115,4,0,0,0,0,1,12,1,
+    122,31,95,78,97,109,101,115,112,97,99,101,80,97,116,104,
+    46,95,103,101,116,95,112,97,114,101,110,116,95,112,97,116,
+    104,99,1,0,0,0,0,0,0,0,3,0,0,0,4,0,
+    0,0,67,0,0,0,115,80,0,0,0,116,0,124,0,160,
+    1,161,0,131,1,125,1,124,1,124,0,106,2,107,3,114,
+    74,124,0,160,3,124,0,106,4,124,1,161,2,125,2,124,
+    2,100,0,107,9,114,68,124,2,106,5,100,0,107,8,114,
+    68,124,2,106,6,114,68,124,2,106,6,124,0,95,7,124,
+    1,124,0,95,2,124,0,106,7,83,0,41,1,78,41,8,
+    114,97,0,0,0,114,249,0,0,0,114,250,0,0,0,114,
+    251,0,0,0,114,247,0,0,0,114,124,0,0,0,114,161,
+    0,0,0,114,248,0,0,0,41,3,114,104,0,0,0,90,
+    11,112,97,114,101,110,116,95,112,97,116,104,114,169,0,0,
+    0,114,3,0,0,0,114,3,0,0,0,114,5,0,0,0,
+    218,12,95,114,101,99,97,108,99,117,108,97,116,101,93,4,
+    0,0,115,16,0,0,0,0,2,12,1,10,1,14,3,18,
+    1,6,1,8,1,6,1,122,27,95,78,97,109,101,115,112,
+    97,99,101,80,97,116,104,46,95,114,101,99,97,108,99,117,
+    108,97,116,101,99,1,0,0,0,0,0,0,0,1,0,0,
+    0,3,0,0,0,67,0,0,0,115,12,0,0,0,116,0,
+    124,0,160,1,161,0,131,1,83,0,41,1,78,41,2,114,
+    231,0,0,0,114,0,1,0,0,41,1,114,104,0,0,0,
+    114,3,0,0,0,114,3,0,0,0,114,5,0,0,0,218,
+    8,95,95,105,116,101,114,95,95,106,4,0,0,115,2,0,
     0,0,0,1,122,23,95,78,97,109,101,115,112,97,99,101,
-    80,97,116,104,46,95,95,114,101,112,114,95,95,99,2,0,
+    80,97,116,104,46,95,95,105,116,101,114,95,95,99,3,0,
+    0,0,0,0,0,0,3,0,0,0,3,0,0,0,67,0,
+    0,0,115,14,0,0,0,124,2,124,0,106,0,124,1,60,
+    0,100,0,83,0,41,1,78,41,1,114,248,0,0,0,41,
+    3,114,104,0,0,0,218,5,105,110,100,101,120,114,36,0,
+    0,0,114,3,0,0,0,114,3,0,0,0,114,5,0,0,
+    0,218,11,95,95,115,101,116,105,116,101,109,95,95,109,4,
+    0,0,115,2,0,0,0,0,1,122,26,95,78,97,109,101,
+    115,112,97,99,101,80,97,116,104,46,95,95,115,101,116,105,
+    116,101,109,95,95,99,1,0,0,0,0,0,0,0,1,0,
+    0,0,3,0,0,0,67,0,0,0,115,12,0,0,0,116,
+    0,124,0,160,1,161,0,131,1,83,0,41,1,78,41,2,
+    114,32,0,0,0,114,0,1,0,0,41,1,114,104,0,0,
+    0,114,3,0,0,0,114,3,0,0,0,114,5,0,0,0,
+    218,7,95,95,108,101,110,95,95,112,4,0,0,115,2,0,
+    0,0,0,1,122,22,95,78,97,109,101,115,112,97,99,101,
+    80,97,116,104,46,95,95,108,101,110,95,95,99,1,0,0,
+    0,0,0,0,0,1,0,0,0,3,0,0,0,67,0,0,
+    0,115,12,0,0,0,100,1,160,0,124,0,106,1,161,1,
+    83,0,41,2,78,122,20,95,78,97,109,101,115,112,97,99,
+    101,80,97,116,104,40,123,33,114,125,41,41,2,114,49,0,
+    0,0,114,248,0,0,0,41,1,114,104,0,0,0,114,3,
+    0,0,0,114,3,0,0,0,114,5,0,0,0,218,8,95,
+    95,114,101,112,114,95,95,115,4,0,0,115,2,0,0,0,
+    0,1,122,23,95,78,97,109,101,115,112,97,99,101,80,97,
+    116,104,46,95,95,114,101,112,114,95,95,99,2,0,0,0,
+    0,0,0,0,2,0,0,0,3,0,0,0,67,0,0,0,
+    115,12,0,0,0,124,1,124,0,160,0,161,0,107,6,83,
+    0,41,1,78,41,1,114,0,1,0,0,41,2,114,104,0,
+    0,0,218,4,105,116,101,109,114,3,0,0,0,114,3,0,
+    0,0,114,5,0,0,0,218,12,95,95,99,111,110,116,97,
+    105,110,115,95,95,118,4,0,0,115,2,0,0,0,0,1,
+    122,27,95,78,97,109,101,115,112,97,99,101,80,97,116,104,
+    46,95,95,99,111,110,116,97,105,110,115,95,95,99,2,0,
     0,0,0,0,0,0,2,0,0,0,3,0,0,0,67,0,
-    0,0,115,12,0,0,0,124,1,124,0,160,0,161,0,107,
-    6,83,0,41,1,78,41,1,114,251,0,0,0,41,2,114,
-    102,0,0,0,218,4,105,116,101,109,114,2,0,0,0,114,
-    2,0,0,0,114,4,0,0,0,218,12,95,95,99,111,110,
-    116,97,105,110,115,95,95,102,4,0,0,115,2,0,0,0,
-    0,1,122,27,95,78,97,109,101,115,112,97,99,101,80,97,
-    116,104,46,95,95,99,111,110,116,97,105,110,115,95,95,99,
-    2,0,0,0,0,0,0,0,2,0,0,0,3,0,0,0,
-    67,0,0,0,115,16,0,0,0,124,0,106,0,160,1,124,
-    1,161,1,1,0,100,0,83,0,41,1,78,41,2,114,243,
-    0,0,0,114,165,0,0,0,41,2,114,102,0,0,0,114,
-    1,1,0,0,114,2,0,0,0,114,2,0,0,0,114,4,
-    0,0,0,114,165,0,0,0,105,4,0,0,115,2,0,0,
-    0,0,1,122,21,95,78,97,109,101,115,112,97,99,101,80,
-    97,116,104,46,97,112,112,101,110,100,78,41,14,114,107,0,
-    0,0,114,106,0,0,0,114,108,0,0,0,114,109,0,0,
-    0,114,186,0,0,0,114,249,0,0,0,114,244,0,0,0,
-    114,251,0,0,0,114,252,0,0,0,114,254,0,0,0,114,
-    255,0,0,0,114,0,1,0,0,114,2,1,0,0,114,165,
-    0,0,0,114,2,0,0,0,114,2,0,0,0,114,2,0,
-    0,0,114,4,0,0,0,114,241,0,0,0,50,4,0,0,
-    115,22,0,0,0,8,5,4,2,8,6,8,10,8,4,8,
-    13,8,3,8,3,8,3,8,3,8,3,114,241,0,0,0,
-    99,0,0,0,0,0,0,0,0,0,0,0,0,3,0,0,
-    0,64,0,0,0,115,80,0,0,0,101,0,90,1,100,0,
-    90,2,100,1,100,2,132,0,90,3,101,4,100,3,100,4,
-    132,0,131,1,90,5,100,5,100,6,132,0,90,6,100,7,
-    100,8,132,0,90,7,100,9,100,10,132,0,90,8,100,11,
-    100,12,132,0,90,9,100,13,100,14,132,0,90,10,100,15,
-    100,16,132,0,90,11,100,17,83,0,41,18,218,16,95,78,
-    97,109,101,115,112,97,99,101,76,111,97,100,101,114,99,4,
-    0,0,0,0,0,0,0,4,0,0,0,4,0,0,0,67,
-    0,0,0,115,18,0,0,0,116,0,124,1,124,2,124,3,
-    131,3,124,0,95,1,100,0,83,0,41,1,78,41,2,114,
-    241,0,0,0,114,243,0,0,0,41,4,114,102,0,0,0,
-    114,100,0,0,0,114,35,0,0,0,114,247,0,0,0,114,
-    2,0,0,0,114,2,0,0,0,114,4,0,0,0,114,186,
-    0,0,0,111,4,0,0,115,2,0,0,0,0,1,122,25,
+    0,0,115,16,0,0,0,124,0,106,0,160,1,124,1,161,
+    1,1,0,100,0,83,0,41,1,78,41,2,114,248,0,0,
+    0,114,168,0,0,0,41,2,114,104,0,0,0,114,6,1,
+    0,0,114,3,0,0,0,114,3,0,0,0,114,5,0,0,
+    0,114,168,0,0,0,121,4,0,0,115,2,0,0,0,0,
+    1,122,21,95,78,97,109,101,115,112,97,99,101,80,97,116,
+    104,46,97,112,112,101,110,100,78,41,14,114,109,0,0,0,
+    114,108,0,0,0,114,110,0,0,0,114,111,0,0,0,114,
+    189,0,0,0,114,254,0,0,0,114,249,0,0,0,114,0,
+    1,0,0,114,1,1,0,0,114,3,1,0,0,114,4,1,
+    0,0,114,5,1,0,0,114,7,1,0,0,114,168,0,0,
+    0,114,3,0,0,0,114,3,0,0,0,114,3,0,0,0,
+    114,5,0,0,0,114,246,0,0,0,66,4,0,0,115,22,
+    0,0,0,8,5,4,2,8,6,8,10,8,4,8,13,8,
+    3,8,3,8,3,8,3,8,3,114,246,0,0,0,99,0,
+    0,0,0,0,0,0,0,0,0,0,0,3,0,0,0,64,
+    0,0,0,115,80,0,0,0,101,0,90,1,100,0,90,2,
+    100,1,100,2,132,0,90,3,101,4,100,3,100,4,132,0,
+    131,1,90,5,100,5,100,6,132,0,90,6,100,7,100,8,
+    132,0,90,7,100,9,100,10,132,0,90,8,100,11,100,12,
+    132,0,90,9,100,13,100,14,132,0,90,10,100,15,100,16,
+    132,0,90,11,100,17,83,0,41,18,218,16,95,78,97,109,
+    101,115,112,97,99,101,76,111,97,100,101,114,99,4,0,0,
+    0,0,0,0,0,4,0,0,0,4,0,0,0,67,0,0,
+    0,115,18,0,0,0,116,0,124,1,124,2,124,3,131,3,
+    124,0,95,1,100,0,83,0,41,1,78,41,2,114,246,0,
+    0,0,114,248,0,0,0,41,4,114,104,0,0,0,114,102,
+    0,0,0,114,36,0,0,0,114,252,0,0,0,114,3,0,
+    0,0,114,3,0,0,0,114,5,0,0,0,114,189,0,0,
+    0,127,4,0,0,115,2,0,0,0,0,1,122,25,95,78,
+    97,109,101,115,112,97,99,101,76,111,97,100,101,114,46,95,
+    95,105,110,105,116,95,95,99,2,0,0,0,0,0,0,0,
+    2,0,0,0,3,0,0,0,67,0,0,0,115,12,0,0,
+    0,100,1,160,0,124,1,106,1,161,1,83,0,41,2,122,
+    115,82,101,116,117,114,110,32,114,101,112,114,32,102,111,114,
+    32,116,104,101,32,109,111,100,117,108,101,46,10,10,32,32,
+    32,32,32,32,32,32,84,104,101,32,109,101,116,104,111,100,
+    32,105,115,32,100,101,112,114,101,99,97,116,101,100,46,32,
+    32,84,104,101,32,105,109,112,111,114,116,32,109,97,99,104,
+    105,110,101,114,121,32,100,111,101,115,32,116,104,101,32,106,
+    111,98,32,105,116,115,101,108,102,46,10,10,32,32,32,32,
+    32,32,32,32,122,25,60,109,111,100,117,108,101,32,123,33,
+    114,125,32,40,110,97,109,101,115,112,97,99,101,41,62,41,
+    2,114,49,0,0,0,114,109,0,0,0,41,2,114,175,0,
+    0,0,114,194,0,0,0,114,3,0,0,0,114,3,0,0,
+    0,114,5,0,0,0,218,11,109,111,100,117,108,101,95,114,
+    101,112,114,130,4,0,0,115,2,0,0,0,0,7,122,28,
     95,78,97,109,101,115,112,97,99,101,76,111,97,100,101,114,
-    46,95,95,105,110,105,116,95,95,99,2,0,0,0,0,0,
-    0,0,2,0,0,0,3,0,0,0,67,0,0,0,115,12,
-    0,0,0,100,1,160,0,124,1,106,1,161,1,83,0,41,
-    2,122,115,82,101,116,117,114,110,32,114,101,112,114,32,102,
-    111,114,32,116,104,101,32,109,111,100,117,108,101,46,10,10,
-    32,32,32,32,32,32,32,32,84,104,101,32,109,101,116,104,
-    111,100,32,105,115,32,100,101,112,114,101,99,97,116,101,100,
-    46,32,32,84,104,101,32,105,109,112,111,114,116,32,109,97,
-    99,104,105,110,101,114,121,32,100,111,101,115,32,116,104,101,
-    32,106,111,98,32,105,116,115,101,108,102,46,10,10,32,32,
-    32,32,32,32,32,32,122,25,60,109,111,100,117,108,101,32,
-    123,33,114,125,32,40,110,97,109,101,115,112,97,99,101,41,
-    62,41,2,114,48,0,0,0,114,107,0,0,0,41,2,114,
-    172,0,0,0,114,191,0,0,0,114,2,0,0,0,114,2,
-    0,0,0,114,4,0,0,0,218,11,109,111,100,117,108,101,
-    95,114,101,112,114,114,4,0,0,115,2,0,0,0,0,7,
-    122,28,95,78,97,109,101,115,112,97,99,101,76,111,97,100,
-    101,114,46,109,111,100,117,108,101,95,114,101,112,114,99,2,
-    0,0,0,0,0,0,0,2,0,0,0,1,0,0,0,67,
-    0,0,0,115,4,0,0,0,100,1,83,0,41,2,78,84,
-    114,2,0,0,0,41,2,114,102,0,0,0,114,121,0,0,
-    0,114,2,0,0,0,114,2,0,0,0,114,4,0,0,0,
-    114,161,0,0,0,123,4,0,0,115,2,0,0,0,0,1,
-    122,27,95,78,97,109,101,115,112,97,99,101,76,111,97,100,
-    101,114,46,105,115,95,112,97,99,107,97,103,101,99,2,0,
-    0,0,0,0,0,0,2,0,0,0,1,0,0,0,67,0,
-    0,0,115,4,0,0,0,100,1,83,0,41,2,78,114,30,
-    0,0,0,114,2,0,0,0,41,2,114,102,0,0,0,114,
-    121,0,0,0,114,2,0,0,0,114,2,0,0,0,114,4,
-    0,0,0,114,202,0,0,0,126,4,0,0,115,2,0,0,
-    0,0,1,122,27,95,78,97,109,101,115,112,97,99,101,76,
-    111,97,100,101,114,46,103,101,116,95,115,111,117,114,99,101,
-    99,2,0,0,0,0,0,0,0,2,0,0,0,6,0,0,
-    0,67,0,0,0,115,16,0,0,0,116,0,100,1,100,2,
-    100,3,100,4,100,5,141,4,83,0,41,6,78,114,30,0,
-    0,0,122,8,60,115,116,114,105,110,103,62,114,190,0,0,
-    0,84,41,1,114,204,0,0,0,41,1,114,205,0,0,0,
-    41,2,114,102,0,0,0,114,121,0,0,0,114,2,0,0,
-    0,114,2,0,0,0,114,4,0,0,0,114,188,0,0,0,
-    129,4,0,0,115,2,0,0,0,0,1,122,25,95,78,97,
-    109,101,115,112,97,99,101,76,111,97,100,101,114,46,103,101,
-    116,95,99,111,100,101,99,2,0,0,0,0,0,0,0,2,
-    0,0,0,1,0,0,0,67,0,0,0,115,4,0,0,0,
-    100,1,83,0,41,2,122,42,85,115,101,32,100,101,102,97,
-    117,108,116,32,115,101,109,97,110,116,105,99,115,32,102,111,
-    114,32,109,111,100,117,108,101,32,99,114,101,97,116,105,111,
-    110,46,78,114,2,0,0,0,41,2,114,102,0,0,0,114,
-    166,0,0,0,114,2,0,0,0,114,2,0,0,0,114,4,
-    0,0,0,114,187,0,0,0,132,4,0,0,115,2,0,0,
-    0,0,1,122,30,95,78,97,109,101,115,112,97,99,101,76,
-    111,97,100,101,114,46,99,114,101,97,116,101,95,109,111,100,
-    117,108,101,99,2,0,0,0,0,0,0,0,2,0,0,0,
-    1,0,0,0,67,0,0,0,115,4,0,0,0,100,0,83,
-    0,41,1,78,114,2,0,0,0,41,2,114,102,0,0,0,
-    114,191,0,0,0,114,2,0,0,0,114,2,0,0,0,114,
-    4,0,0,0,114,192,0,0,0,135,4,0,0,115,2,0,
-    0,0,0,1,122,28,95,78,97,109,101,115,112,97,99,101,
-    76,111,97,100,101,114,46,101,120,101,99,95,109,111,100,117,
-    108,101,99,2,0,0,0,0,0,0,0,2,0,0,0,4,
-    0,0,0,67,0,0,0,115,26,0,0,0,116,0,160,1,
-    100,1,124,0,106,2,161,2,1,0,116,0,160,3,124,0,
-    124,1,161,2,83,0,41,2,122,98,76,111,97,100,32,97,
-    32,110,97,109,101,115,112,97,99,101,32,109,111,100,117,108,
-    101,46,10,10,32,32,32,32,32,32,32,32,84,104,105,115,
-    32,109,101,116,104,111,100,32,105,115,32,100,101,112,114,101,
-    99,97,116,101,100,46,32,32,85,115,101,32,101,120,101,99,
-    95,109,111,100,117,108,101,40,41,32,105,110,115,116,101,97,
-    100,46,10,10,32,32,32,32,32,32,32,32,122,38,110,97,
-    109,101,115,112,97,99,101,32,109,111,100,117,108,101,32,108,
-    111,97,100,101,100,32,119,105,116,104,32,112,97,116,104,32,
-    123,33,114,125,41,4,114,116,0,0,0,114,130,0,0,0,
-    114,243,0,0,0,114,193,0,0,0,41,2,114,102,0,0,
-    0,114,121,0,0,0,114,2,0,0,0,114,2,0,0,0,
-    114,4,0,0,0,114,194,0,0,0,138,4,0,0,115,6,
-    0,0,0,0,7,6,1,8,1,122,28,95,78,97,109,101,
-    115,112,97,99,101,76,111,97,100,101,114,46,108,111,97,100,
-    95,109,111,100,117,108,101,78,41,12,114,107,0,0,0,114,
-    106,0,0,0,114,108,0,0,0,114,186,0,0,0,114,184,
-    0,0,0,114,4,1,0,0,114,161,0,0,0,114,202,0,
-    0,0,114,188,0,0,0,114,187,0,0,0,114,192,0,0,
-    0,114,194,0,0,0,114,2,0,0,0,114,2,0,0,0,
-    114,2,0,0,0,114,4,0,0,0,114,3,1,0,0,110,
-    4,0,0,115,16,0,0,0,8,1,8,3,12,9,8,3,
-    8,3,8,3,8,3,8,3,114,3,1,0,0,99,0,0,
-    0,0,0,0,0,0,0,0,0,0,4,0,0,0,64,0,
-    0,0,115,106,0,0,0,101,0,90,1,100,0,90,2,100,
-    1,90,3,101,4,100,2,100,3,132,0,131,1,90,5,101,
-    4,100,4,100,5,132,0,131,1,90,6,101,4,100,6,100,
-    7,132,0,131,1,90,7,101,4,100,8,100,9,132,0,131,
-    1,90,8,101,4,100,17,100,11,100,12,132,1,131,1,90,
-    9,101,4,100,18,100,13,100,14,132,1,131,1,90,10,101,
-    4,100,19,100,15,100,16,132,1,131,1,90,11,100,10,83,
-    0,41,20,218,10,80,97,116,104,70,105,110,100,101,114,122,
-    62,77,101,116,97,32,112,97,116,104,32,102,105,110,100,101,
-    114,32,102,111,114,32,115,121,115,46,112,97,116,104,32,97,
-    110,100,32,112,97,99,107,97,103,101,32,95,95,112,97,116,
-    104,95,95,32,97,116,116,114,105,98,117,116,101,115,46,99,
-    1,0,0,0,0,0,0,0,3,0,0,0,4,0,0,0,
-    67,0,0,0,115,68,0,0,0,120,62,116,0,116,1,106,
-    2,160,3,161,0,131,1,68,0,93,44,92,2,125,1,125,
-    2,124,2,100,1,107,8,114,42,116,1,106,2,124,1,61,
-    0,113,16,116,4,124,2,100,2,131,2,114,16,124,2,160,
-    5,161,0,1,0,113,16,87,0,100,1,83,0,41,3,122,
-    125,67,97,108,108,32,116,104,101,32,105,110,118,97,108,105,
-    100,97,116,101,95,99,97,99,104,101,115,40,41,32,109,101,
-    116,104,111,100,32,111,110,32,97,108,108,32,112,97,116,104,
-    32,101,110,116,114,121,32,102,105,110,100,101,114,115,10,32,
-    32,32,32,32,32,32,32,115,116,111,114,101,100,32,105,110,
-    32,115,121,115,46,112,97,116,104,95,105,109,112,111,114,116,
-    101,114,95,99,97,99,104,101,115,32,40,119,104,101,114,101,
-    32,105,109,112,108,101,109,101,110,116,101,100,41,46,78,218,
-    17,105,110,118,97,108,105,100,97,116,101,95,99,97,99,104,
-    101,115,41,6,218,4,108,105,115,116,114,6,0,0,0,218,
-    19,112,97,116,104,95,105,109,112,111,114,116,101,114,95,99,
-    97,99,104,101,218,5,105,116,101,109,115,114,110,0,0,0,
-    114,6,1,0,0,41,3,114,172,0,0,0,114,100,0,0,
-    0,218,6,102,105,110,100,101,114,114,2,0,0,0,114,2,
-    0,0,0,114,4,0,0,0,114,6,1,0,0,156,4,0,
-    0,115,10,0,0,0,0,4,24,1,8,1,10,1,10,1,
-    122,28,80,97,116,104,70,105,110,100,101,114,46,105,110,118,
-    97,108,105,100,97,116,101,95,99,97,99,104,101,115,99,2,
-    0,0,0,0,0,0,0,3,0,0,0,9,0,0,0,67,
-    0,0,0,115,84,0,0,0,116,0,106,1,100,1,107,9,
-    114,28,116,0,106,1,115,28,116,2,160,3,100,2,116,4,
-    161,2,1,0,120,50,116,0,106,1,68,0,93,36,125,2,
-    121,8,124,2,124,1,131,1,83,0,4,0,116,5,107,10,
-    114,70,1,0,1,0,1,0,119,36,89,0,113,36,88,0,
-    113,36,87,0,100,1,83,0,100,1,83,0,41,3,122,46,
-    83,101,97,114,99,104,32,115,121,115,46,112,97,116,104,95,
-    104,111,111,107,115,32,102,111,114,32,97,32,102,105,110,100,
-    101,114,32,102,111,114,32,39,112,97,116,104,39,46,78,122,
-    23,115,121,115,46,112,97,116,104,95,104,111,111,107,115,32,
-    105,115,32,101,109,112,116,121,41,6,114,6,0,0,0,218,
-    10,112,97,116,104,95,104,111,111,107,115,114,61,0,0,0,
-    114,62,0,0,0,114,120,0,0,0,114,101,0,0,0,41,
-    3,114,172,0,0,0,114,35,0,0,0,90,4,104,111,111,
-    107,114,2,0,0,0,114,2,0,0,0,114,4,0,0,0,
-    218,11,95,112,97,116,104,95,104,111,111,107,115,166,4,0,
-    0,115,16,0,0,0,0,3,16,1,12,1,12,1,2,1,
-    8,1,14,1,12,2,122,22,80,97,116,104,70,105,110,100,
-    101,114,46,95,112,97,116,104,95,104,111,111,107,115,99,2,
-    0,0,0,0,0,0,0,3,0,0,0,8,0,0,0,67,
-    0,0,0,115,102,0,0,0,124,1,100,1,107,2,114,42,
-    121,12,116,0,160,1,161,0,125,1,87,0,110,20,4,0,
-    116,2,107,10,114,40,1,0,1,0,1,0,100,2,83,0,
-    88,0,121,14,116,3,106,4,124,1,25,0,125,2,87,0,
-    110,40,4,0,116,5,107,10,114,96,1,0,1,0,1,0,
-    124,0,160,6,124,1,161,1,125,2,124,2,116,3,106,4,
-    124,1,60,0,89,0,110,2,88,0,124,2,83,0,41,3,
-    122,210,71,101,116,32,116,104,101,32,102,105,110,100,101,114,
-    32,102,111,114,32,116,104,101,32,112,97,116,104,32,101,110,
-    116,114,121,32,102,114,111,109,32,115,121,115,46,112,97,116,
-    104,95,105,109,112,111,114,116,101,114,95,99,97,99,104,101,
-    46,10,10,32,32,32,32,32,32,32,32,73,102,32,116,104,
-    101,32,112,97,116,104,32,101,110,116,114,121,32,105,115,32,
-    110,111,116,32,105,110,32,116,104,101,32,99,97,99,104,101,
-    44,32,102,105,110,100,32,116,104,101,32,97,112,112,114,111,
-    112,114,105,97,116,101,32,102,105,110,100,101,114,10,32,32,
-    32,32,32,32,32,32,97,110,100,32,99,97,99,104,101,32,
-    105,116,46,32,73,102,32,110,111,32,102,105,110,100,101,114,
-    32,105,115,32,97,118,97,105,108,97,98,108,101,44,32,115,
-    116,111,114,101,32,78,111,110,101,46,10,10,32,32,32,32,
-    32,32,32,32,114,30,0,0,0,78,41,7,114,1,0,0,
-    0,114,45,0,0,0,114,224,0,0,0,114,6,0,0,0,
-    114,8,1,0,0,218,8,75,101,121,69,114,114,111,114,114,
-    12,1,0,0,41,3,114,172,0,0,0,114,35,0,0,0,
-    114,10,1,0,0,114,2,0,0,0,114,2,0,0,0,114,
-    4,0,0,0,218,20,95,112,97,116,104,95,105,109,112,111,
-    114,116,101,114,95,99,97,99,104,101,179,4,0,0,115,22,
-    0,0,0,0,8,8,1,2,1,12,1,14,3,6,1,2,
-    1,14,1,14,1,10,1,16,1,122,31,80,97,116,104,70,
-    105,110,100,101,114,46,95,112,97,116,104,95,105,109,112,111,
-    114,116,101,114,95,99,97,99,104,101,99,3,0,0,0,0,
-    0,0,0,6,0,0,0,4,0,0,0,67,0,0,0,115,
-    82,0,0,0,116,0,124,2,100,1,131,2,114,26,124,2,
-    160,1,124,1,161,1,92,2,125,3,125,4,110,14,124,2,
-    160,2,124,1,161,1,125,3,103,0,125,4,124,3,100,0,
-    107,9,114,60,116,3,160,4,124,1,124,3,161,2,83,0,
-    116,3,160,5,124,1,100,0,161,2,125,5,124,4,124,5,
-    95,6,124,5,83,0,41,2,78,114,119,0,0,0,41,7,
-    114,110,0,0,0,114,119,0,0,0,114,183,0,0,0,114,
-    116,0,0,0,114,180,0,0,0,114,162,0,0,0,114,158,
-    0,0,0,41,6,114,172,0,0,0,114,121,0,0,0,114,
-    10,1,0,0,114,122,0,0,0,114,123,0,0,0,114,166,
-    0,0,0,114,2,0,0,0,114,2,0,0,0,114,4,0,
-    0,0,218,16,95,108,101,103,97,99,121,95,103,101,116,95,
-    115,112,101,99,201,4,0,0,115,18,0,0,0,0,4,10,
-    1,16,2,10,1,4,1,8,1,12,1,12,1,6,1,122,
-    27,80,97,116,104,70,105,110,100,101,114,46,95,108,101,103,
-    97,99,121,95,103,101,116,95,115,112,101,99,78,99,4,0,
-    0,0,0,0,0,0,9,0,0,0,5,0,0,0,67,0,
-    0,0,115,170,0,0,0,103,0,125,4,120,160,124,2,68,
-    0,93,130,125,5,116,0,124,5,116,1,116,2,102,2,131,
-    2,115,30,113,10,124,0,160,3,124,5,161,1,125,6,124,
-    6,100,1,107,9,114,10,116,4,124,6,100,2,131,2,114,
-    72,124,6,160,5,124,1,124,3,161,2,125,7,110,12,124,
-    0,160,6,124,1,124,6,161,2,125,7,124,7,100,1,107,
-    8,114,94,113,10,124,7,106,7,100,1,107,9,114,108,124,
-    7,83,0,124,7,106,8,125,8,124,8,100,1,107,8,114,
-    130,116,9,100,3,131,1,130,1,124,4,160,10,124,8,161,
-    1,1,0,113,10,87,0,116,11,160,12,124,1,100,1,161,
-    2,125,7,124,4,124,7,95,8,124,7,83,0,100,1,83,
-    0,41,4,122,63,70,105,110,100,32,116,104,101,32,108,111,
-    97,100,101,114,32,111,114,32,110,97,109,101,115,112,97,99,
-    101,95,112,97,116,104,32,102,111,114,32,116,104,105,115,32,
-    109,111,100,117,108,101,47,112,97,99,107,97,103,101,32,110,
-    97,109,101,46,78,114,182,0,0,0,122,19,115,112,101,99,
-    32,109,105,115,115,105,110,103,32,108,111,97,100,101,114,41,
-    13,114,141,0,0,0,114,71,0,0,0,218,5,98,121,116,
-    101,115,114,14,1,0,0,114,110,0,0,0,114,182,0,0,
-    0,114,15,1,0,0,114,122,0,0,0,114,158,0,0,0,
-    114,101,0,0,0,114,147,0,0,0,114,116,0,0,0,114,
-    162,0,0,0,41,9,114,172,0,0,0,114,121,0,0,0,
-    114,35,0,0,0,114,181,0,0,0,218,14,110,97,109,101,
-    115,112,97,99,101,95,112,97,116,104,90,5,101,110,116,114,
-    121,114,10,1,0,0,114,166,0,0,0,114,123,0,0,0,
-    114,2,0,0,0,114,2,0,0,0,114,4,0,0,0,218,
-    9,95,103,101,116,95,115,112,101,99,216,4,0,0,115,40,
-    0,0,0,0,5,4,1,10,1,14,1,2,1,10,1,8,
-    1,10,1,14,2,12,1,8,1,2,1,10,1,4,1,6,
-    1,8,1,8,5,14,2,12,1,6,1,122,20,80,97,116,
-    104,70,105,110,100,101,114,46,95,103,101,116,95,115,112,101,
-    99,99,4,0,0,0,0,0,0,0,6,0,0,0,5,0,
-    0,0,67,0,0,0,115,100,0,0,0,124,2,100,1,107,
-    8,114,14,116,0,106,1,125,2,124,0,160,2,124,1,124,
-    2,124,3,161,3,125,4,124,4,100,1,107,8,114,40,100,
-    1,83,0,124,4,106,3,100,1,107,8,114,92,124,4,106,
-    4,125,5,124,5,114,86,100,1,124,4,95,5,116,6,124,
-    1,124,5,124,0,106,2,131,3,124,4,95,4,124,4,83,
-    0,100,1,83,0,110,4,124,4,83,0,100,1,83,0,41,
-    2,122,141,84,114,121,32,116,111,32,102,105,110,100,32,97,
-    32,115,112,101,99,32,102,111,114,32,39,102,117,108,108,110,
-    97,109,101,39,32,111,110,32,115,121,115,46,112,97,116,104,
-    32,111,114,32,39,112,97,116,104,39,46,10,10,32,32,32,
-    32,32,32,32,32,84,104,101,32,115,101,97,114,99,104,32,
-    105,115,32,98,97,115,101,100,32,111,110,32,115,121,115,46,
-    112,97,116,104,95,104,111,111,107,115,32,97,110,100,32,115,
+    46,109,111,100,117,108,101,95,114,101,112,114,99,2,0,0,
+    0,0,0,0,0,2,0,0,0,1,0,0,0,67,0,0,
+    0,115,4,0,0,0,100,1,83,0,41,2,78,84,114,3,
+    0,0,0,41,2,114,104,0,0,0,114,123,0,0,0,114,
+    3,0,0,0,114,3,0,0,0,114,5,0,0,0,114,164,
+    0,0,0,139,4,0,0,115,2,0,0,0,0,1,122,27,
+    95,78,97,109,101,115,112,97,99,101,76,111,97,100,101,114,
+    46,105,115,95,112,97,99,107,97,103,101,99,2,0,0,0,
+    0,0,0,0,2,0,0,0,1,0,0,0,67,0,0,0,
+    115,4,0,0,0,100,1,83,0,41,2,78,114,31,0,0,
+    0,114,3,0,0,0,41,2,114,104,0,0,0,114,123,0,
+    0,0,114,3,0,0,0,114,3,0,0,0,114,5,0,0,
+    0,114,205,0,0,0,142,4,0,0,115,2,0,0,0,0,
+    1,122,27,95,78,97,109,101,115,112,97,99,101,76,111,97,
+    100,101,114,46,103,101,116,95,115,111,117,114,99,101,99,2,
+    0,0,0,0,0,0,0,2,0,0,0,6,0,0,0,67,
+    0,0,0,115,16,0,0,0,116,0,100,1,100,2,100,3,
+    100,4,100,5,141,4,83,0,41,6,78,114,31,0,0,0,
+    122,8,60,115,116,114,105,110,103,62,114,193,0,0,0,84,
+    41,1,114,207,0,0,0,41,1,114,208,0,0,0,41,2,
+    114,104,0,0,0,114,123,0,0,0,114,3,0,0,0,114,
+    3,0,0,0,114,5,0,0,0,114,191,0,0,0,145,4,
+    0,0,115,2,0,0,0,0,1,122,25,95,78,97,109,101,
+    115,112,97,99,101,76,111,97,100,101,114,46,103,101,116,95,
+    99,111,100,101,99,2,0,0,0,0,0,0,0,2,0,0,
+    0,1,0,0,0,67,0,0,0,115,4,0,0,0,100,1,
+    83,0,41,2,122,42,85,115,101,32,100,101,102,97,117,108,
+    116,32,115,101,109,97,110,116,105,99,115,32,102,111,114,32,
+    109,111,100,117,108,101,32,99,114,101,97,116,105,111,110,46,
+    78,114,3,0,0,0,41,2,114,104,0,0,0,114,169,0,
+    0,0,114,3,0,0,0,114,3,0,0,0,114,5,0,0,
+    0,114,190,0,0,0,148,4,0,0,115,2,0,0,0,0,
+    1,122,30,95,78,97,109,101,115,112,97,99,101,76,111,97,
+    100,101,114,46,99,114,101,97,116,101,95,109,111,100,117,108,
+    101,99,2,0,0,0,0,0,0,0,2,0,0,0,1,0,
+    0,0,67,0,0,0,115,4,0,0,0,100,0,83,0,41,
+    1,78,114,3,0,0,0,41,2,114,104,0,0,0,114,194,
+    0,0,0,114,3,0,0,0,114,3,0,0,0,114,5,0,
+    0,0,114,195,0,0,0,151,4,0,0,115,2,0,0,0,
+    0,1,122,28,95,78,97,109,101,115,112,97,99,101,76,111,
+    97,100,101,114,46,101,120,101,99,95,109,111,100,117,108,101,
+    99,2,0,0,0,0,0,0,0,2,0,0,0,4,0,0,
+    0,67,0,0,0,115,26,0,0,0,116,0,160,1,100,1,
+    124,0,106,2,161,2,1,0,116,0,160,3,124,0,124,1,
+    161,2,83,0,41,2,122,98,76,111,97,100,32,97,32,110,
+    97,109,101,115,112,97,99,101,32,109,111,100,117,108,101,46,
+    10,10,32,32,32,32,32,32,32,32,84,104,105,115,32,109,
+    101,116,104,111,100,32,105,115,32,100,101,112,114,101,99,97,
+    116,101,100,46,32,32,85,115,101,32,101,120,101,99,95,109,
+    111,100,117,108,101,40,41,32,105,110,115,116,101,97,100,46,
+    10,10,32,32,32,32,32,32,32,32,122,38,110,97,109,101,
+    115,112,97,99,101,32,109,111,100,117,108,101,32,108,111,97,
+    100,101,100,32,119,105,116,104,32,112,97,116,104,32,123,33,
+    114,125,41,4,114,118,0,0,0,114,132,0,0,0,114,248,
+    0,0,0,114,196,0,0,0,41,2,114,104,0,0,0,114,
+    123,0,0,0,114,3,0,0,0,114,3,0,0,0,114,5,
+    0,0,0,114,197,0,0,0,154,4,0,0,115,6,0,0,
+    0,0,7,6,1,8,1,122,28,95,78,97,109,101,115,112,
+    97,99,101,76,111,97,100,101,114,46,108,111,97,100,95,109,
+    111,100,117,108,101,78,41,12,114,109,0,0,0,114,108,0,
+    0,0,114,110,0,0,0,114,189,0,0,0,114,187,0,0,
+    0,114,9,1,0,0,114,164,0,0,0,114,205,0,0,0,
+    114,191,0,0,0,114,190,0,0,0,114,195,0,0,0,114,
+    197,0,0,0,114,3,0,0,0,114,3,0,0,0,114,3,
+    0,0,0,114,5,0,0,0,114,8,1,0,0,126,4,0,
+    0,115,16,0,0,0,8,1,8,3,12,9,8,3,8,3,
+    8,3,8,3,8,3,114,8,1,0,0,99,0,0,0,0,
+    0,0,0,0,0,0,0,0,4,0,0,0,64,0,0,0,
+    115,106,0,0,0,101,0,90,1,100,0,90,2,100,1,90,
+    3,101,4,100,2,100,3,132,0,131,1,90,5,101,4,100,
+    4,100,5,132,0,131,1,90,6,101,4,100,6,100,7,132,
+    0,131,1,90,7,101,4,100,8,100,9,132,0,131,1,90,
+    8,101,4,100,17,100,11,100,12,132,1,131,1,90,9,101,
+    4,100,18,100,13,100,14,132,1,131,1,90,10,101,4,100,
+    19,100,15,100,16,132,1,131,1,90,11,100,10,83,0,41,
+    20,218,10,80,97,116,104,70,105,110,100,101,114,122,62,77,
+    101,116,97,32,112,97,116,104,32,102,105,110,100,101,114,32,
+    102,111,114,32,115,121,115,46,112,97,116,104,32,97,110,100,
+    32,112,97,99,107,97,103,101,32,95,95,112,97,116,104,95,
+    95,32,97,116,116,114,105,98,117,116,101,115,46,99,1,0,
+    0,0,0,0,0,0,3,0,0,0,4,0,0,0,67,0,
+    0,0,115,68,0,0,0,120,62,116,0,116,1,106,2,160,
+    3,161,0,131,1,68,0,93,44,92,2,125,1,125,2,124,
+    2,100,1,107,8,114,42,116,1,106,2,124,1,61,0,113,
+    16,116,4,124,2,100,2,131,2,114,16,124,2,160,5,161,
+    0,1,0,113,16,87,0,100,1,83,0,41,3,122,125,67,
+    97,108,108,32,116,104,101,32,105,110,118,97,108,105,100,97,
+    116,101,95,99,97,99,104,101,115,40,41,32,109,101,116,104,
+    111,100,32,111,110,32,97,108,108,32,112,97,116,104,32,101,
+    110,116,114,121,32,102,105,110,100,101,114,115,10,32,32,32,
+    32,32,32,32,32,115,116,111,114,101,100,32,105,110,32,115,
     121,115,46,112,97,116,104,95,105,109,112,111,114,116,101,114,
-    95,99,97,99,104,101,46,10,32,32,32,32,32,32,32,32,
-    78,41,7,114,6,0,0,0,114,35,0,0,0,114,18,1,
-    0,0,114,122,0,0,0,114,158,0,0,0,114,160,0,0,
-    0,114,241,0,0,0,41,6,114,172,0,0,0,114,121,0,
-    0,0,114,35,0,0,0,114,181,0,0,0,114,166,0,0,
-    0,114,17,1,0,0,114,2,0,0,0,114,2,0,0,0,
-    114,4,0,0,0,114,182,0,0,0,248,4,0,0,115,26,
-    0,0,0,0,6,8,1,6,1,14,1,8,1,4,1,10,
-    1,6,1,4,3,6,1,16,1,4,2,6,2,122,20,80,
-    97,116,104,70,105,110,100,101,114,46,102,105,110,100,95,115,
-    112,101,99,99,3,0,0,0,0,0,0,0,4,0,0,0,
-    4,0,0,0,67,0,0,0,115,30,0,0,0,124,0,160,
-    0,124,1,124,2,161,2,125,3,124,3,100,1,107,8,114,
-    24,100,1,83,0,124,3,106,1,83,0,41,2,122,170,102,
-    105,110,100,32,116,104,101,32,109,111,100,117,108,101,32,111,
-    110,32,115,121,115,46,112,97,116,104,32,111,114,32,39,112,
-    97,116,104,39,32,98,97,115,101,100,32,111,110,32,115,121,
-    115,46,112,97,116,104,95,104,111,111,107,115,32,97,110,100,
-    10,32,32,32,32,32,32,32,32,115,121,115,46,112,97,116,
-    104,95,105,109,112,111,114,116,101,114,95,99,97,99,104,101,
+    95,99,97,99,104,101,115,32,40,119,104,101,114,101,32,105,
+    109,112,108,101,109,101,110,116,101,100,41,46,78,218,17,105,
+    110,118,97,108,105,100,97,116,101,95,99,97,99,104,101,115,
+    41,6,218,4,108,105,115,116,114,7,0,0,0,218,19,112,
+    97,116,104,95,105,109,112,111,114,116,101,114,95,99,97,99,
+    104,101,218,5,105,116,101,109,115,114,112,0,0,0,114,11,
+    1,0,0,41,3,114,175,0,0,0,114,102,0,0,0,218,
+    6,102,105,110,100,101,114,114,3,0,0,0,114,3,0,0,
+    0,114,5,0,0,0,114,11,1,0,0,172,4,0,0,115,
+    10,0,0,0,0,4,24,1,8,1,10,1,10,1,122,28,
+    80,97,116,104,70,105,110,100,101,114,46,105,110,118,97,108,
+    105,100,97,116,101,95,99,97,99,104,101,115,99,2,0,0,
+    0,0,0,0,0,3,0,0,0,9,0,0,0,67,0,0,
+    0,115,84,0,0,0,116,0,106,1,100,1,107,9,114,28,
+    116,0,106,1,115,28,116,2,160,3,100,2,116,4,161,2,
+    1,0,120,50,116,0,106,1,68,0,93,36,125,2,121,8,
+    124,2,124,1,131,1,83,0,4,0,116,5,107,10,114,70,
+    1,0,1,0,1,0,119,36,89,0,113,36,88,0,113,36,
+    87,0,100,1,83,0,100,1,83,0,41,3,122,46,83,101,
+    97,114,99,104,32,115,121,115,46,112,97,116,104,95,104,111,
+    111,107,115,32,102,111,114,32,97,32,102,105,110,100,101,114,
+    32,102,111,114,32,39,112,97,116,104,39,46,78,122,23,115,
+    121,115,46,112,97,116,104,95,104,111,111,107,115,32,105,115,
+    32,101,109,112,116,121,41,6,114,7,0,0,0,218,10,112,
+    97,116,104,95,104,111,111,107,115,114,62,0,0,0,114,63,
+    0,0,0,114,122,0,0,0,114,103,0,0,0,41,3,114,
+    175,0,0,0,114,36,0,0,0,90,4,104,111,111,107,114,
+    3,0,0,0,114,3,0,0,0,114,5,0,0,0,218,11,
+    95,112,97,116,104,95,104,111,111,107,115,182,4,0,0,115,
+    16,0,0,0,0,3,16,1,12,1,12,1,2,1,8,1,
+    14,1,12,2,122,22,80,97,116,104,70,105,110,100,101,114,
+    46,95,112,97,116,104,95,104,111,111,107,115,99,2,0,0,
+    0,0,0,0,0,3,0,0,0,8,0,0,0,67,0,0,
+    0,115,102,0,0,0,124,1,100,1,107,2,114,42,121,12,
+    116,0,160,1,161,0,125,1,87,0,110,20,4,0,116,2,
+    107,10,114,40,1,0,1,0,1,0,100,2,83,0,88,0,
+    121,14,116,3,106,4,124,1,25,0,125,2,87,0,110,40,
+    4,0,116,5,107,10,114,96,1,0,1,0,1,0,124,0,
+    160,6,124,1,161,1,125,2,124,2,116,3,106,4,124,1,
+    60,0,89,0,110,2,88,0,124,2,83,0,41,3,122,210,
+    71,101,116,32,116,104,101,32,102,105,110,100,101,114,32,102,
+    111,114,32,116,104,101,32,112,97,116,104,32,101,110,116,114,
+    121,32,102,114,111,109,32,115,121,115,46,112,97,116,104,95,
+    105,109,112,111,114,116,101,114,95,99,97,99,104,101,46,10,
+    10,32,32,32,32,32,32,32,32,73,102,32,116,104,101,32,
+    112,97,116,104,32,101,110,116,114,121,32,105,115,32,110,111,
+    116,32,105,110,32,116,104,101,32,99,97,99,104,101,44,32,
+    102,105,110,100,32,116,104,101,32,97,112,112,114,111,112,114,
+    105,97,116,101,32,102,105,110,100,101,114,10,32,32,32,32,
+    32,32,32,32,97,110,100,32,99,97,99,104,101,32,105,116,
+    46,32,73,102,32,110,111,32,102,105,110,100,101,114,32,105,
+    115,32,97,118,97,105,108,97,98,108,101,44,32,115,116,111,
+    114,101,32,78,111,110,101,46,10,10,32,32,32,32,32,32,
+    32,32,114,31,0,0,0,78,41,7,114,1,0,0,0,114,
+    46,0,0,0,114,229,0,0,0,114,7,0,0,0,114,13,
+    1,0,0,218,8,75,101,121,69,114,114,111,114,114,17,1,
+    0,0,41,3,114,175,0,0,0,114,36,0,0,0,114,15,
+    1,0,0,114,3,0,0,0,114,3,0,0,0,114,5,0,
+    0,0,218,20,95,112,97,116,104,95,105,109,112,111,114,116,
+    101,114,95,99,97,99,104,101,195,4,0,0,115,22,0,0,
+    0,0,8,8,1,2,1,12,1,14,3,6,1,2,1,14,
+    1,14,1,10,1,16,1,122,31,80,97,116,104,70,105,110,
+    100,101,114,46,95,112,97,116,104,95,105,109,112,111,114,116,
+    101,114,95,99,97,99,104,101,99,3,0,0,0,0,0,0,
+    0,6,0,0,0,4,0,0,0,67,0,0,0,115,82,0,
+    0,0,116,0,124,2,100,1,131,2,114,26,124,2,160,1,
+    124,1,161,1,92,2,125,3,125,4,110,14,124,2,160,2,
+    124,1,161,1,125,3,103,0,125,4,124,3,100,0,107,9,
+    114,60,116,3,160,4,124,1,124,3,161,2,83,0,116,3,
+    160,5,124,1,100,0,161,2,125,5,124,4,124,5,95,6,
+    124,5,83,0,41,2,78,114,121,0,0,0,41,7,114,112,
+    0,0,0,114,121,0,0,0,114,186,0,0,0,114,118,0,
+    0,0,114,183,0,0,0,114,165,0,0,0,114,161,0,0,
+    0,41,6,114,175,0,0,0,114,123,0,0,0,114,15,1,
+    0,0,114,124,0,0,0,114,125,0,0,0,114,169,0,0,
+    0,114,3,0,0,0,114,3,0,0,0,114,5,0,0,0,
+    218,16,95,108,101,103,97,99,121,95,103,101,116,95,115,112,
+    101,99,217,4,0,0,115,18,0,0,0,0,4,10,1,16,
+    2,10,1,4,1,8,1,12,1,12,1,6,1,122,27,80,
+    97,116,104,70,105,110,100,101,114,46,95,108,101,103,97,99,
+    121,95,103,101,116,95,115,112,101,99,78,99,4,0,0,0,
+    0,0,0,0,9,0,0,0,5,0,0,0,67,0,0,0,
+    115,170,0,0,0,103,0,125,4,120,160,124,2,68,0,93,
+    130,125,5,116,0,124,5,116,1,116,2,102,2,131,2,115,
+    30,113,10,124,0,160,3,124,5,161,1,125,6,124,6,100,
+    1,107,9,114,10,116,4,124,6,100,2,131,2,114,72,124,
+    6,160,5,124,1,124,3,161,2,125,7,110,12,124,0,160,
+    6,124,1,124,6,161,2,125,7,124,7,100,1,107,8,114,
+    94,113,10,124,7,106,7,100,1,107,9,114,108,124,7,83,
+    0,124,7,106,8,125,8,124,8,100,1,107,8,114,130,116,
+    9,100,3,131,1,130,1,124,4,160,10,124,8,161,1,1,
+    0,113,10,87,0,116,11,160,12,124,1,100,1,161,2,125,
+    7,124,4,124,7,95,8,124,7,83,0,100,1,83,0,41,
+    4,122,63,70,105,110,100,32,116,104,101,32,108,111,97,100,
+    101,114,32,111,114,32,110,97,109,101,115,112,97,99,101,95,
+    112,97,116,104,32,102,111,114,32,116,104,105,115,32,109,111,
+    100,117,108,101,47,112,97,99,107,97,103,101,32,110,97,109,
+    101,46,78,114,185,0,0,0,122,19,115,112,101,99,32,109,
+    105,115,115,105,110,103,32,108,111,97,100,101,114,41,13,114,
+    144,0,0,0,114,72,0,0,0,218,5,98,121,116,101,115,
+    114,19,1,0,0,114,112,0,0,0,114,185,0,0,0,114,
+    20,1,0,0,114,124,0,0,0,114,161,0,0,0,114,103,
+    0,0,0,114,150,0,0,0,114,118,0,0,0,114,165,0,
+    0,0,41,9,114,175,0,0,0,114,123,0,0,0,114,36,
+    0,0,0,114,184,0,0,0,218,14,110,97,109,101,115,112,
+    97,99,101,95,112,97,116,104,218,5,101,110,116,114,121,114,
+    15,1,0,0,114,169,0,0,0,114,125,0,0,0,114,3,
+    0,0,0,114,3,0,0,0,114,5,0,0,0,218,9,95,
+    103,101,116,95,115,112,101,99,232,4,0,0,115,40,0,0,
+    0,0,5,4,1,10,1,14,1,2,1,10,1,8,1,10,
+    1,14,2,12,1,8,1,2,1,10,1,4,1,6,1,8,
+    1,8,5,14,2,12,1,6,1,122,20,80,97,116,104,70,
+    105,110,100,101,114,46,95,103,101,116,95,115,112,101,99,99,
+    4,0,0,0,0,0,0,0,6,0,0,0,5,0,0,0,
+    67,0,0,0,115,100,0,0,0,124,2,100,1,107,8,114,
+    14,116,0,106,1,125,2,124,0,160,2,124,1,124,2,124,
+    3,161,3,125,4,124,4,100,1,107,8,114,40,100,1,83,
+    0,124,4,106,3,100,1,107,8,114,92,124,4,106,4,125,
+    5,124,5,114,86,100,1,124,4,95,5,116,6,124,1,124,
+    5,124,0,106,2,131,3,124,4,95,4,124,4,83,0,100,
+    1,83,0,110,4,124,4,83,0,100,1,83,0,41,2,122,
+    141,84,114,121,32,116,111,32,102,105,110,100,32,97,32,115,
+    112,101,99,32,102,111,114,32,39,102,117,108,108,110,97,109,
+    101,39,32,111,110,32,115,121,115,46,112,97,116,104,32,111,
+    114,32,39,112,97,116,104,39,46,10,10,32,32,32,32,32,
+    32,32,32,84,104,101,32,115,101,97,114,99,104,32,105,115,
+    32,98,97,115,101,100,32,111,110,32,115,121,115,46,112,97,
+    116,104,95,104,111,111,107,115,32,97,110,100,32,115,121,115,
+    46,112,97,116,104,95,105,109,112,111,114,116,101,114,95,99,
+    97,99,104,101,46,10,32,32,32,32,32,32,32,32,78,41,
+    7,114,7,0,0,0,114,36,0,0,0,114,24,1,0,0,
+    114,124,0,0,0,114,161,0,0,0,114,163,0,0,0,114,
+    246,0,0,0,41,6,114,175,0,0,0,114,123,0,0,0,
+    114,36,0,0,0,114,184,0,0,0,114,169,0,0,0,114,
+    22,1,0,0,114,3,0,0,0,114,3,0,0,0,114,5,
+    0,0,0,114,185,0,0,0,8,5,0,0,115,26,0,0,
+    0,0,6,8,1,6,1,14,1,8,1,4,1,10,1,6,
+    1,4,3,6,1,16,1,4,2,6,2,122,20,80,97,116,
+    104,70,105,110,100,101,114,46,102,105,110,100,95,115,112,101,
+    99,99,3,0,0,0,0,0,0,0,4,0,0,0,4,0,
+    0,0,67,0,0,0,115,30,0,0,0,124,0,160,0,124,
+    1,124,2,161,2,125,3,124,3,100,1,107,8,114,24,100,
+    1,83,0,124,3,106,1,83,0,41,2,122,170,102,105,110,
+    100,32,116,104,101,32,109,111,100,117,108,101,32,111,110,32,
+    115,121,115,46,112,97,116,104,32,111,114,32,39,112,97,116,
+    104,39,32,98,97,115,101,100,32,111,110,32,115,121,115,46,
+    112,97,116,104,95,104,111,111,107,115,32,97,110,100,10,32,
+    32,32,32,32,32,32,32,115,121,115,46,112,97,116,104,95,
+    105,109,112,111,114,116,101,114,95,99,97,99,104,101,46,10,
+    10,32,32,32,32,32,32,32,32,84,104,105,115,32,109,101,
+    116,104,111,100,32,105,115,32,100,101,112,114,101,99,97,116,
+    101,100,46,32,32,85,115,101,32,102,105,110,100,95,115,112,
+    101,99,40,41,32,105,110,115,116,101,97,100,46,10,10,32,
+    32,32,32,32,32,32,32,78,41,2,114,185,0,0,0,114,
+    124,0,0,0,41,4,114,175,0,0,0,114,123,0,0,0,
+    114,36,0,0,0,114,169,0,0,0,114,3,0,0,0,114,
+    3,0,0,0,114,5,0,0,0,114,186,0,0,0,32,5,
+    0,0,115,8,0,0,0,0,8,12,1,8,1,4,1,122,
+    22,80,97,116,104,70,105,110,100,101,114,46,102,105,110,100,
+    95,109,111,100,117,108,101,41,1,78,41,2,78,78,41,1,
+    78,41,12,114,109,0,0,0,114,108,0,0,0,114,110,0,
+    0,0,114,111,0,0,0,114,187,0,0,0,114,11,1,0,
+    0,114,17,1,0,0,114,19,1,0,0,114,20,1,0,0,
+    114,24,1,0,0,114,185,0,0,0,114,186,0,0,0,114,
+    3,0,0,0,114,3,0,0,0,114,3,0,0,0,114,5,
+    0,0,0,114,10,1,0,0,168,4,0,0,115,22,0,0,
+    0,8,2,4,2,12,10,12,13,12,22,12,15,2,1,12,
+    31,2,1,12,23,2,1,114,10,1,0,0,90,9,112,97,
+    116,104,105,110,100,101,120,114,30,0,0,0,218,11,112,121,
+    99,109,97,110,105,102,101,115,116,99,2,0,0,0,0,0,
+    0,0,3,0,0,0,3,0,0,0,67,0,0,0,115,90,
+    0,0,0,124,1,100,1,107,9,114,40,116,0,106,1,160,
+    2,124,1,161,1,125,2,124,2,100,1,107,9,114,40,124,
+    2,100,2,107,9,114,40,124,2,83,0,116,0,106,3,106,
+    4,114,52,100,1,83,0,116,0,106,5,160,6,116,7,161,
+    1,115,74,124,0,160,8,100,3,161,1,125,0,116,9,106,
+    10,160,2,124,0,161,1,112,88,100,1,83,0,41,4,122,
+    128,82,101,116,117,114,110,32,116,104,101,32,102,105,108,101,
+    32,110,97,109,101,32,103,105,118,101,110,32,98,121,32,116,
+    104,101,32,45,88,32,111,112,116,105,111,110,32,42,120,111,
+    112,116,105,111,110,42,32,111,114,32,101,108,115,101,32,98,
+    121,32,116,104,101,10,32,32,32,32,101,110,118,105,114,111,
+    110,109,101,110,116,32,118,97,114,105,97,98,108,101,32,42,
+    110,97,109,101,42,44,32,111,114,32,78,111,110,101,32,105,
+    102,32,110,101,105,116,104,101,114,32,105,115,32,115,101,116,
+    46,78,84,218,5,97,115,99,105,105,41,11,114,7,0,0,
+    0,90,9,95,120,111,112,116,105,111,110,115,218,3,103,101,
+    116,114,70,0,0,0,218,18,105,103,110,111,114,101,95,101,
+    110,118,105,114,111,110,109,101,110,116,114,8,0,0,0,114,
+    9,0,0,0,114,11,0,0,0,218,6,101,110,99,111,100,
+    101,114,1,0,0,0,114,2,0,0,0,41,3,114,102,0,
+    0,0,90,7,120,111,112,116,105,111,110,114,98,0,0,0,
+    114,3,0,0,0,114,3,0,0,0,114,5,0,0,0,218,
+    9,95,101,110,118,95,102,105,108,101,57,5,0,0,115,18,
+    0,0,0,0,3,8,1,12,1,16,1,4,1,8,1,4,
+    1,12,1,10,1,114,30,1,0,0,99,4,0,0,0,0,
+    0,0,0,9,0,0,0,11,0,0,0,67,0,0,0,115,
+    154,0,0,0,121,48,116,0,160,1,124,0,100,1,161,2,
+    143,26,125,4,116,2,160,3,124,4,160,4,161,0,161,1,
+    92,3,125,5,125,6,125,7,87,0,100,2,81,0,82,0,
+    88,0,87,0,110,56,4,0,116,5,116,6,116,7,116,8,
+    102,4,107,10,114,104,1,0,125,8,1,0,122,18,116,9,
+    160,10,100,3,124,0,124,8,161,3,1,0,100,2,83,0,
+    100,2,125,8,126,8,88,0,89,0,110,2,88,0,124,5,
+    124,1,107,3,115,132,124,6,124,2,107,3,115,132,116,11,
+    124,7,124,3,131,2,115,150,116,9,160,10,100,4,124,1,
+    124,0,161,3,1,0,100,2,83,0,124,7,83,0,41,5,
+    122,210,82,101,116,117,114,110,32,116,104,101,32,100,97,116,
+    97,32,111,102,32,97,32,109,97,114,115,104,97,108,32,102,
+    105,108,101,32,119,114,105,116,116,101,110,32,97,115,32,40,
+    116,97,103,44,32,118,101,114,115,105,111,110,44,32,100,97,
+    116,97,41,46,10,10,32,32,32,32,78,111,110,101,32,105,
+    115,32,114,101,116,117,114,110,101,100,32,105,102,32,116,104,
+    101,32,102,105,108,101,32,99,97,110,110,111,116,32,98,101,
+    32,114,101,97,100,44,32,111,114,32,105,102,32,105,116,32,
+    105,115,32,111,102,32,97,110,111,116,104,101,114,10,32,32,
+    32,32,102,111,114,109,97,116,32,111,114,32,118,101,114,115,
+    105,111,110,32,111,114,32,105,102,32,116,104,101,32,100,97,
+    116,97,32,105,115,32,110,111,116,32,97,110,32,105,110,115,
+    116,97,110,99,101,32,111,102,32,107,105,110,100,46,10,10,
+    32,32,32,32,114,223,0,0,0,78,122,20,99,97,110,110,
+    111,116,32,114,101,97,100,32,123,33,114,125,58,32,123,125,
+    122,16,98,97,100,32,123,125,32,102,105,108,101,32,123,33,
+    114,125,41,12,114,51,0,0,0,114,52,0,0,0,114,142,
+    0,0,0,114,143,0,0,0,114,224,0,0,0,114,41,0,
+    0,0,114,133,0,0,0,114,74,0,0,0,114,65,0,0,
+    0,114,118,0,0,0,114,132,0,0,0,114,144,0,0,0,
+    41,9,114,98,0,0,0,114,82,0,0,0,218,7,118,101,
+    114,115,105,111,110,90,4,107,105,110,100,114,56,0,0,0,
+    90,8,102,105,108,101,95,116,97,103,90,12,102,105,108,101,
+    95,118,101,114,115,105,111,110,114,55,0,0,0,114,204,0,
+    0,0,114,3,0,0,0,114,3,0,0,0,114,5,0,0,
+    0,218,18,95,108,111,97,100,95,109,97,114,115,104,97,108,
+    95,102,105,108,101,71,5,0,0,115,22,0,0,0,0,7,
+    2,1,14,1,34,1,24,1,14,1,18,1,16,1,10,1,
+    14,1,4,1,114,32,1,0,0,99,0,0,0,0,0,0,
+    0,0,2,0,0,0,5,0,0,0,67,0,0,0,115,54,
+    0,0,0,116,0,100,1,107,8,114,50,116,1,100,2,131,
+    1,125,0,100,1,125,1,124,0,100,1,107,9,114,42,116,
+    2,124,0,116,3,116,4,116,5,131,4,125,1,124,1,112,
+    48,105,0,97,0,116,0,83,0,41,3,97,79,1,0,0,
+    82,101,116,117,114,110,32,116,104,101,32,100,105,114,101,99,
+    116,111,114,121,32,105,110,100,101,120,32,110,97,109,101,100,
+    32,98,121,32,116,104,101,32,80,89,84,72,79,78,80,65,
+    84,72,73,78,68,69,88,32,101,110,118,105,114,111,110,109,
+    101,110,116,10,32,32,32,32,118,97,114,105,97,98,108,101,
+    46,10,10,32,32,32,32,84,104,101,32,105,110,100,101,120,
+    32,109,97,112,115,32,100,105,114,101,99,116,111,114,121,32,
+    112,97,116,104,115,32,116,111,32,40,109,116,105,109,101,44,
+    32,99,111,110,116,101,110,116,115,41,32,112,97,105,114,115,
+    44,32,99,111,110,116,101,110,116,115,10,32,32,32,32,109,
+    97,112,112,105,110,103,32,116,104,101,32,110,97,109,101,32,
+    111,102,32,101,97,99,104,32,100,105,114,101,99,116,111,114,
+    121,32,101,110,116,114,121,32,116,111,32,84,114,117,101,32,
+    102,111,114,32,100,105,114,101,99,116,111,114,105,101,115,32,
+    97,110,100,10,32,32,32,32,70,97,108,115,101,32,102,111,
+    114,32,111,116,104,101,114,32,102,105,108,101,115,46,32,32,
+    65,110,32,101,109,112,116,121,32,100,105,99,116,32,105,115,
+    32,114,101,116,117,114,110,101,100,32,105,102,32,110,111,32,
+    105,110,100,101,120,32,105,115,32,115,101,116,10,32,32,32,
+    32,111,114,32,105,102,32,105,116,32,99,97,110,110,111,116,
+    32,98,101,32,114,101,97,100,46,10,10,32,32,32,32,78,
+    90,15,80,89,84,72,79,78,80,65,84,72,73,78,68,69,
+    88,41,6,218,11,95,112,97,116,104,95,105,110,100,101,120,
+    114,30,1,0,0,114,32,1,0,0,218,15,95,80,65,84,
+    72,95,73,78,68,69,88,95,84,65,71,218,19,95,80,65,
+    84,72,95,73,78,68,69,88,95,86,69,82,83,73,79,78,
+    218,4,100,105,99,116,41,2,114,98,0,0,0,114,2,1,
+    0,0,114,3,0,0,0,114,3,0,0,0,114,5,0,0,
+    0,218,15,95,103,101,116,95,112,97,116,104,95,105,110,100,
+    101,120,91,5,0,0,115,16,0,0,0,0,11,8,1,8,
+    1,4,1,8,1,6,1,8,1,8,1,114,37,1,0,0,
+    99,0,0,0,0,0,0,0,0,2,0,0,0,5,0,0,
+    0,67,0,0,0,115,58,0,0,0,116,0,100,1,107,8,
+    114,54,116,1,100,2,100,3,131,2,125,0,100,1,125,1,
+    124,0,100,1,107,9,114,44,116,2,124,0,116,3,116,4,
+    116,5,131,4,125,1,124,1,112,52,116,5,131,0,97,0,
+    116,0,83,0,41,4,97,54,1,0,0,82,101,116,117,114,
+    110,32,116,104,101,32,115,101,116,32,111,102,32,116,114,117,
+    115,116,101,100,32,98,121,116,101,99,111,100,101,32,112,97,
+    116,104,115,46,10,10,32,32,32,32,84,104,101,32,109,97,
+    110,105,102,101,115,116,32,105,115,32,110,97,109,101,100,32,
+    98,121,32,116,104,101,32,45,88,32,112,121,99,109,97,110,
+    105,102,101,115,116,32,111,112,116,105,111,110,32,111,114,32,
+    116,104,101,10,32,32,32,32,80,89,84,72,79,78,80,89,
+    67,77,65,78,73,70,69,83,84,32,101,110,118,105,114,111,
+    110,109,101,110,116,32,118,97,114,105,97,98,108,101,46,32,
+    32,84,104,101,32,108,105,115,116,101,100,32,98,121,116,101,
+    99,111,100,101,32,102,105,108,101,115,32,97,114,101,10,32,
+    32,32,32,108,111,97,100,101,100,32,119,105,116,104,111,117,
+    116,32,99,104,101,99,107,105,110,103,32,116,104,101,105,114,
+    32,115,111,117,114,99,101,32,102,105,108,101,115,46,32,32,
+    65,110,32,101,109,112,116,121,32,115,101,116,32,105,115,32,
+    114,101,116,117,114,110,101,100,10,32,32,32,32,105,102,32,
+    110,111,32,109,97,110,105,102,101,115,116,32,105,115,32,115,
+    101,116,32,111,114,32,105,102,32,105,116,32,99,97,110,110,
+    111,116,32,98,101,32,114,101,97,100,46,10,10,32,32,32,
+    32,78,90,17,80,89,84,72,79,78,80,89,67,77,65,78,
+    73,70,69,83,84,114,25,1,0,0,41,6,218,13,95,112,
+    121,99,95,109,97,110,105,102,101,115,116,114,30,1,0,0,
+    114,32,1,0,0,218,17,95,80,89,67,95,77,65,78,73,
+    70,69,83,84,95,84,65,71,218,21,95,80,89,67,95,77,
+    65,78,73,70,69,83,84,95,86,69,82,83,73,79,78,218,
+    9,102,114,111,122,101,110,115,101,116,41,2,114,98,0,0,
+    0,90,8,109,97,110,105,102,101,115,116,114,3,0,0,0,
+    114,3,0,0,0,114,5,0,0,0,114,211,0,0,0,112,
+    5,0,0,115,16,0,0,0,0,10,8,1,10,1,4,1,
+    8,1,6,1,8,1,10,1,114,211,0,0,0,99,0,0,
+    0,0,0,0,0,0,0,0,0,0,3,0,0,0,64,0,
+    0,0,115,92,0,0,0,101,0,90,1,100,0,90,2,100,
+    1,90,3,100,2,100,3,132,0,90,4,100,4,100,5,132,
+    0,90,5,101,6,90,7,100,6,100,7,132,0,90,8,100,
+    8,100,9,132,0,90,9,100,19,100,11,100,12,132,1,90,
+    10,100,20,100,13,100,14,132,1,90,11,101,12,100,15,100,
+    16,132,0,131,1,90,13,100,17,100,18,132,0,90,14,100,
+    10,83,0,41,21,218,10,70,105,108,101,70,105,110,100,101,
+    114,122,172,70,105,108,101,45,98,97,115,101,100,32,102,105,
+    110,100,101,114,46,10,10,32,32,32,32,73,110,116,101,114,
+    97,99,116,105,111,110,115,32,119,105,116,104,32,116,104,101,
+    32,102,105,108,101,32,115,121,115,116,101,109,32,97,114,101,
+    32,99,97,99,104,101,100,32,102,111,114,32,112,101,114,102,
+    111,114,109,97,110,99,101,44,32,98,101,105,110,103,10,32,
+    32,32,32,114,101,102,114,101,115,104,101,100,32,119,104,101,
+    110,32,116,104,101,32,100,105,114,101,99,116,111,114,121,32,
+    116,104,101,32,102,105,110,100,101,114,32,105,115,32,104,97,
+    110,100,108,105,110,103,32,104,97,115,32,98,101,101,110,32,
+    109,111,100,105,102,105,101,100,46,10,10,32,32,32,32,99,
+    2,0,0,0,0,0,0,0,5,0,0,0,6,0,0,0,
+    7,0,0,0,115,94,0,0,0,103,0,125,3,120,40,124,
+    2,68,0,93,32,92,2,137,0,125,4,124,3,160,0,135,
+    0,102,1,100,1,100,2,132,8,124,4,68,0,131,1,161,
+    1,1,0,113,10,87,0,124,3,124,0,95,1,124,1,112,
+    58,100,3,124,0,95,2,100,4,124,0,95,3,116,4,131,
+    0,124,0,95,5,116,4,131,0,124,0,95,6,105,0,124,
+    0,95,7,100,5,83,0,41,6,122,154,73,110,105,116,105,
+    97,108,105,122,101,32,119,105,116,104,32,116,104,101,32,112,
+    97,116,104,32,116,111,32,115,101,97,114,99,104,32,111,110,
+    32,97,110,100,32,97,32,118,97,114,105,97,98,108,101,32,
+    110,117,109,98,101,114,32,111,102,10,32,32,32,32,32,32,
+    32,32,50,45,116,117,112,108,101,115,32,99,111,110,116,97,
+    105,110,105,110,103,32,116,104,101,32,108,111,97,100,101,114,
+    32,97,110,100,32,116,104,101,32,102,105,108,101,32,115,117,
+    102,102,105,120,101,115,32,116,104,101,32,108,111,97,100,101,
+    114,10,32,32,32,32,32,32,32,32,114,101,99,111,103,110,
+    105,122,101,115,46,99,1,0,0,0,0,0,0,0,2,0,
+    0,0,3,0,0,0,51,0,0,0,115,22,0,0,0,124,
+    0,93,14,125,1,124,1,136,0,102,2,86,0,1,0,113,
+    2,100,0,83,0,41,1,78,114,3,0,0,0,41,2,114,
+    23,0,0,0,114,241,0,0,0,41,1,114,124,0,0,0,
+    114,3,0,0,0,114,5,0,0,0,114,243,0,0,0,147,
+    5,0,0,115,2,0,0,0,4,0,122,38,70,105,108,101,
+    70,105,110,100,101,114,46,95,95,105,110,105,116,95,95,46,
+    60,108,111,99,97,108,115,62,46,60,103,101,110,101,120,112,
+    114,62,114,60,0,0,0,114,91,0,0,0,78,41,8,114,
+    150,0,0,0,218,8,95,108,111,97,100,101,114,115,114,36,
+    0,0,0,218,11,95,112,97,116,104,95,109,116,105,109,101,
+    218,3,115,101,116,218,11,95,112,97,116,104,95,99,97,99,
+    104,101,218,19,95,114,101,108,97,120,101,100,95,112,97,116,
+    104,95,99,97,99,104,101,218,11,95,112,97,116,104,95,107,
+    105,110,100,115,41,5,114,104,0,0,0,114,36,0,0,0,
+    218,14,108,111,97,100,101,114,95,100,101,116,97,105,108,115,
+    90,7,108,111,97,100,101,114,115,114,171,0,0,0,114,3,
+    0,0,0,41,1,114,124,0,0,0,114,5,0,0,0,114,
+    189,0,0,0,141,5,0,0,115,18,0,0,0,0,4,4,
+    1,14,1,28,1,6,2,10,1,6,1,8,1,8,3,122,
+    19,70,105,108,101,70,105,110,100,101,114,46,95,95,105,110,
+    105,116,95,95,99,1,0,0,0,0,0,0,0,1,0,0,
+    0,2,0,0,0,67,0,0,0,115,10,0,0,0,100,1,
+    124,0,95,0,100,2,83,0,41,3,122,31,73,110,118,97,
+    108,105,100,97,116,101,32,116,104,101,32,100,105,114,101,99,
+    116,111,114,121,32,109,116,105,109,101,46,114,91,0,0,0,
+    78,41,1,114,44,1,0,0,41,1,114,104,0,0,0,114,
+    3,0,0,0,114,3,0,0,0,114,5,0,0,0,114,11,
+    1,0,0,158,5,0,0,115,2,0,0,0,0,2,122,28,
+    70,105,108,101,70,105,110,100,101,114,46,105,110,118,97,108,
+    105,100,97,116,101,95,99,97,99,104,101,115,99,2,0,0,
+    0,0,0,0,0,3,0,0,0,3,0,0,0,67,0,0,
+    0,115,42,0,0,0,124,0,160,0,124,1,161,1,125,2,
+    124,2,100,1,107,8,114,26,100,1,103,0,102,2,83,0,
+    124,2,106,1,124,2,106,2,112,38,103,0,102,2,83,0,
+    41,2,122,197,84,114,121,32,116,111,32,102,105,110,100,32,
+    97,32,108,111,97,100,101,114,32,102,111,114,32,116,104,101,
+    32,115,112,101,99,105,102,105,101,100,32,109,111,100,117,108,
+    101,44,32,111,114,32,116,104,101,32,110,97,109,101,115,112,
+    97,99,101,10,32,32,32,32,32,32,32,32,112,97,99,107,
+    97,103,101,32,112,111,114,116,105,111,110,115,46,32,82,101,
+    116,117,114,110,115,32,40,108,111,97,100,101,114,44,32,108,
+    105,115,116,45,111,102,45,112,111,114,116,105,111,110,115,41,
     46,10,10,32,32,32,32,32,32,32,32,84,104,105,115,32,
     109,101,116,104,111,100,32,105,115,32,100,101,112,114,101,99,
     97,116,101,100,46,32,32,85,115,101,32,102,105,110,100,95,
     115,112,101,99,40,41,32,105,110,115,116,101,97,100,46,10,
-    10,32,32,32,32,32,32,32,32,78,41,2,114,182,0,0,
-    0,114,122,0,0,0,41,4,114,172,0,0,0,114,121,0,
-    0,0,114,35,0,0,0,114,166,0,0,0,114,2,0,0,
-    0,114,2,0,0,0,114,4,0,0,0,114,183,0,0,0,
-    16,5,0,0,115,8,0,0,0,0,8,12,1,8,1,4,
-    1,122,22,80,97,116,104,70,105,110,100,101,114,46,102,105,
-    110,100,95,109,111,100,117,108,101,41,1,78,41,2,78,78,
-    41,1,78,41,12,114,107,0,0,0,114,106,0,0,0,114,
-    108,0,0,0,114,109,0,0,0,114,184,0,0,0,114,6,
-    1,0,0,114,12,1,0,0,114,14,1,0,0,114,15,1,
-    0,0,114,18,1,0,0,114,182,0,0,0,114,183,0,0,
-    0,114,2,0,0,0,114,2,0,0,0,114,2,0,0,0,
-    114,4,0,0,0,114,5,1,0,0,152,4,0,0,115,22,
-    0,0,0,8,2,4,2,12,10,12,13,12,22,12,15,2,
-    1,12,31,2,1,12,23,2,1,114,5,1,0,0,99,0,
-    0,0,0,0,0,0,0,0,0,0,0,3,0,0,0,64,
-    0,0,0,115,90,0,0,0,101,0,90,1,100,0,90,2,
-    100,1,90,3,100,2,100,3,132,0,90,4,100,4,100,5,
-    132,0,90,5,101,6,90,7,100,6,100,7,132,0,90,8,
-    100,8,100,9,132,0,90,9,100,19,100,11,100,12,132,1,
-    90,10,100,13,100,14,132,0,90,11,101,12,100,15,100,16,
-    132,0,131,1,90,13,100,17,100,18,132,0,90,14,100,10,
-    83,0,41,20,218,10,70,105,108,101,70,105,110,100,101,114,
-    122,172,70,105,108,101,45,98,97,115,101,100,32,102,105,110,
-    100,101,114,46,10,10,32,32,32,32,73,110,116,101,114,97,
-    99,116,105,111,110,115,32,119,105,116,104,32,116,104,101,32,
-    102,105,108,101,32,115,121,115,116,101,109,32,97,114,101,32,
-    99,97,99,104,101,100,32,102,111,114,32,112,101,114,102,111,
-    114,109,97,110,99,101,44,32,98,101,105,110,103,10,32,32,
-    32,32,114,101,102,114,101,115,104,101,100,32,119,104,101,110,
-    32,116,104,101,32,100,105,114,101,99,116,111,114,121,32,116,
-    104,101,32,102,105,110,100,101,114,32,105,115,32,104,97,110,
-    100,108,105,110,103,32,104,97,115,32,98,101,101,110,32,109,
-    111,100,105,102,105,101,100,46,10,10,32,32,32,32,99,2,
-    0,0,0,0,0,0,0,5,0,0,0,6,0,0,0,7,
-    0,0,0,115,88,0,0,0,103,0,125,3,120,40,124,2,
-    68,0,93,32,92,2,137,0,125,4,124,3,160,0,135,0,
-    102,1,100,1,100,2,132,8,124,4,68,0,131,1,161,1,
-    1,0,113,10,87,0,124,3,124,0,95,1,124,1,112,58,
-    100,3,124,0,95,2,100,4,124,0,95,3,116,4,131,0,
-    124,0,95,5,116,4,131,0,124,0,95,6,100,5,83,0,
-    41,6,122,154,73,110,105,116,105,97,108,105,122,101,32,119,
-    105,116,104,32,116,104,101,32,112,97,116,104,32,116,111,32,
-    115,101,97,114,99,104,32,111,110,32,97,110,100,32,97,32,
-    118,97,114,105,97,98,108,101,32,110,117,109,98,101,114,32,
-    111,102,10,32,32,32,32,32,32,32,32,50,45,116,117,112,
-    108,101,115,32,99,111,110,116,97,105,110,105,110,103,32,116,
-    104,101,32,108,111,97,100,101,114,32,97,110,100,32,116,104,
-    101,32,102,105,108,101,32,115,117,102,102,105,120,101,115,32,
-    116,104,101,32,108,111,97,100,101,114,10,32,32,32,32,32,
-    32,32,32,114,101,99,111,103,110,105,122,101,115,46,99,1,
-    0,0,0,0,0,0,0,2,0,0,0,3,0,0,0,51,
-    0,0,0,115,22,0,0,0,124,0,93,14,125,1,124,1,
-    136,0,102,2,86,0,1,0,113,2,100,0,83,0,41,1,
-    78,114,2,0,0,0,41,2,114,22,0,0,0,114,236,0,
-    0,0,41,1,114,122,0,0,0,114,2,0,0,0,114,4,
-    0,0,0,114,238,0,0,0,45,5,0,0,115,2,0,0,
-    0,4,0,122,38,70,105,108,101,70,105,110,100,101,114,46,
-    95,95,105,110,105,116,95,95,46,60,108,111,99,97,108,115,
-    62,46,60,103,101,110,101,120,112,114,62,114,59,0,0,0,
-    114,89,0,0,0,78,41,7,114,147,0,0,0,218,8,95,
-    108,111,97,100,101,114,115,114,35,0,0,0,218,11,95,112,
-    97,116,104,95,109,116,105,109,101,218,3,115,101,116,218,11,
-    95,112,97,116,104,95,99,97,99,104,101,218,19,95,114,101,
-    108,97,120,101,100,95,112,97,116,104,95,99,97,99,104,101,
-    41,5,114,102,0,0,0,114,35,0,0,0,218,14,108,111,
-    97,100,101,114,95,100,101,116,97,105,108,115,90,7,108,111,
-    97,100,101,114,115,114,168,0,0,0,114,2,0,0,0,41,
-    1,114,122,0,0,0,114,4,0,0,0,114,186,0,0,0,
-    39,5,0,0,115,16,0,0,0,0,4,4,1,14,1,28,
-    1,6,2,10,1,6,1,8,1,122,19,70,105,108,101,70,
-    105,110,100,101,114,46,95,95,105,110,105,116,95,95,99,1,
-    0,0,0,0,0,0,0,1,0,0,0,2,0,0,0,67,
-    0,0,0,115,10,0,0,0,100,1,124,0,95,0,100,2,
-    83,0,41,3,122,31,73,110,118,97,108,105,100,97,116,101,
-    32,116,104,101,32,100,105,114,101,99,116,111,114,121,32,109,
-    116,105,109,101,46,114,89,0,0,0,78,41,1,114,21,1,
-    0,0,41,1,114,102,0,0,0,114,2,0,0,0,114,2,
-    0,0,0,114,4,0,0,0,114,6,1,0,0,53,5,0,
-    0,115,2,0,0,0,0,2,122,28,70,105,108,101,70,105,
-    110,100,101,114,46,105,110,118,97,108,105,100,97,116,101,95,
-    99,97,99,104,101,115,99,2,0,0,0,0,0,0,0,3,
-    0,0,0,3,0,0,0,67,0,0,0,115,42,0,0,0,
-    124,0,160,0,124,1,161,1,125,2,124,2,100,1,107,8,
-    114,26,100,1,103,0,102,2,83,0,124,2,106,1,124,2,
-    106,2,112,38,103,0,102,2,83,0,41,2,122,197,84,114,
-    121,32,116,111,32,102,105,110,100,32,97,32,108,111,97,100,
-    101,114,32,102,111,114,32,116,104,101,32,115,112,101,99,105,
-    102,105,101,100,32,109,111,100,117,108,101,44,32,111,114,32,
-    116,104,101,32,110,97,109,101,115,112,97,99,101,10,32,32,
-    32,32,32,32,32,32,112,97,99,107,97,103,101,32,112,111,
-    114,116,105,111,110,115,46,32,82,101,116,117,114,110,115,32,
-    40,108,111,97,100,101,114,44,32,108,105,115,116,45,111,102,
-    45,112,111,114,116,105,111,110,115,41,46,10,10,32,32,32,
-    32,32,32,32,32,84,104,105,115,32,109,101,116,104,111,100,
-    32,105,115,32,100,101,112,114,101,99,97,116,101,100,46,32,
-    32,85,115,101,32,102,105,110,100,95,115,112,101,99,40,41,
-    32,105,110,115,116,101,97,100,46,10,10,32,32,32,32,32,
-    32,32,32,78,41,3,114,182,0,0,0,114,122,0,0,0,
-    114,158,0,0,0,41,3,114,102,0,0,0,114,121,0,0,
-    0,114,166,0,0,0,114,2,0,0,0,114,2,0,0,0,
-    114,4,0,0,0,114,119,0,0,0,59,5,0,0,115,8,
-    0,0,0,0,7,10,1,8,1,8,1,122,22,70,105,108,
-    101,70,105,110,100,101,114,46,102,105,110,100,95,108,111,97,
-    100,101,114,99,6,0,0,0,0,0,0,0,7,0,0,0,
-    6,0,0,0,67,0,0,0,115,26,0,0,0,124,1,124,
-    2,124,3,131,2,125,6,116,0,124,2,124,3,124,6,124,
-    4,100,1,141,4,83,0,41,2,78,41,2,114,122,0,0,
-    0,114,158,0,0,0,41,1,114,169,0,0,0,41,7,114,
-    102,0,0,0,114,167,0,0,0,114,121,0,0,0,114,35,
-    0,0,0,90,4,115,109,115,108,114,181,0,0,0,114,122,
-    0,0,0,114,2,0,0,0,114,2,0,0,0,114,4,0,
-    0,0,114,18,1,0,0,71,5,0,0,115,6,0,0,0,
-    0,1,10,1,8,1,122,20,70,105,108,101,70,105,110,100,
-    101,114,46,95,103,101,116,95,115,112,101,99,78,99,3,0,
-    0,0,0,0,0,0,14,0,0,0,8,0,0,0,67,0,
-    0,0,115,98,1,0,0,100,1,125,3,124,1,160,0,100,
-    2,161,1,100,3,25,0,125,4,121,24,116,1,124,0,106,
-    2,112,34,116,3,160,4,161,0,131,1,106,5,125,5,87,
-    0,110,24,4,0,116,6,107,10,114,66,1,0,1,0,1,
-    0,100,4,125,5,89,0,110,2,88,0,124,5,124,0,106,
-    7,107,3,114,92,124,0,160,8,161,0,1,0,124,5,124,
-    0,95,7,116,9,131,0,114,114,124,0,106,10,125,6,124,
-    4,160,11,161,0,125,7,110,10,124,0,106,12,125,6,124,
-    4,125,7,124,7,124,6,107,6,114,218,116,13,124,0,106,
-    2,124,4,131,2,125,8,120,72,124,0,106,14,68,0,93,
-    54,92,2,125,9,125,10,100,5,124,9,23,0,125,11,116,
-    13,124,8,124,11,131,2,125,12,116,15,124,12,131,1,114,
-    152,124,0,160,16,124,10,124,1,124,12,124,8,103,1,124,
-    2,161,5,83,0,113,152,87,0,116,17,124,8,131,1,125,
-    3,120,88,124,0,106,14,68,0,93,78,92,2,125,9,125,
-    10,116,13,124,0,106,2,124,4,124,9,23,0,131,2,125,
-    12,116,18,106,19,100,6,124,12,100,3,100,7,141,3,1,
-    0,124,7,124,9,23,0,124,6,107,6,114,226,116,15,124,
-    12,131,1,114,226,124,0,160,16,124,10,124,1,124,12,100,
-    8,124,2,161,5,83,0,113,226,87,0,124,3,144,1,114,
-    94,116,18,160,19,100,9,124,8,161,2,1,0,116,18,160,
-    20,124,1,100,8,161,2,125,13,124,8,103,1,124,13,95,
-    21,124,13,83,0,100,8,83,0,41,10,122,111,84,114,121,
-    32,116,111,32,102,105,110,100,32,97,32,115,112,101,99,32,
-    102,111,114,32,116,104,101,32,115,112,101,99,105,102,105,101,
-    100,32,109,111,100,117,108,101,46,10,10,32,32,32,32,32,
-    32,32,32,82,101,116,117,114,110,115,32,116,104,101,32,109,
-    97,116,99,104,105,110,103,32,115,112,101,99,44,32,111,114,
-    32,78,111,110,101,32,105,102,32,110,111,116,32,102,111,117,
-    110,100,46,10,32,32,32,32,32,32,32,32,70,114,59,0,
-    0,0,114,57,0,0,0,114,89,0,0,0,114,186,0,0,
-    0,122,9,116,114,121,105,110,103,32,123,125,41,1,90,9,
-    118,101,114,98,111,115,105,116,121,78,122,25,112,111,115,115,
-    105,98,108,101,32,110,97,109,101,115,112,97,99,101,32,102,
-    111,114,32,123,125,41,22,114,32,0,0,0,114,39,0,0,
-    0,114,35,0,0,0,114,1,0,0,0,114,45,0,0,0,
-    114,230,0,0,0,114,40,0,0,0,114,21,1,0,0,218,
-    11,95,102,105,108,108,95,99,97,99,104,101,114,5,0,0,
-    0,114,24,1,0,0,114,90,0,0,0,114,23,1,0,0,
-    114,28,0,0,0,114,20,1,0,0,114,44,0,0,0,114,
-    18,1,0,0,114,46,0,0,0,114,116,0,0,0,114,130,
-    0,0,0,114,162,0,0,0,114,158,0,0,0,41,14,114,
-    102,0,0,0,114,121,0,0,0,114,181,0,0,0,90,12,
-    105,115,95,110,97,109,101,115,112,97,99,101,90,11,116,97,
-    105,108,95,109,111,100,117,108,101,114,149,0,0,0,90,5,
-    99,97,99,104,101,90,12,99,97,99,104,101,95,109,111,100,
-    117,108,101,90,9,98,97,115,101,95,112,97,116,104,114,236,
-    0,0,0,114,167,0,0,0,90,13,105,110,105,116,95,102,
-    105,108,101,110,97,109,101,90,9,102,117,108,108,95,112,97,
-    116,104,114,166,0,0,0,114,2,0,0,0,114,2,0,0,
-    0,114,4,0,0,0,114,182,0,0,0,76,5,0,0,115,
-    70,0,0,0,0,5,4,1,14,1,2,1,24,1,14,1,
-    10,1,10,1,8,1,6,2,6,1,6,1,10,2,6,1,
-    4,2,8,1,12,1,16,1,8,1,10,1,8,1,24,4,
-    8,2,16,1,16,1,16,1,12,1,8,1,10,1,12,1,
-    6,1,12,1,12,1,8,1,4,1,122,20,70,105,108,101,
-    70,105,110,100,101,114,46,102,105,110,100,95,115,112,101,99,
-    99,1,0,0,0,0,0,0,0,9,0,0,0,10,0,0,
-    0,67,0,0,0,115,194,0,0,0,124,0,106,0,125,1,
-    121,22,116,1,160,2,124,1,112,22,116,1,160,3,161,0,
-    161,1,125,2,87,0,110,30,4,0,116,4,116,5,116,6,
-    102,3,107,10,114,58,1,0,1,0,1,0,103,0,125,2,
-    89,0,110,2,88,0,116,7,106,8,160,9,100,1,161,1,
-    115,84,116,10,124,2,131,1,124,0,95,11,110,78,116,10,
-    131,0,125,3,120,64,124,2,68,0,93,56,125,4,124,4,
-    160,12,100,2,161,1,92,3,125,5,125,6,125,7,124,6,
-    114,138,100,3,160,13,124,5,124,7,160,14,161,0,161,2,
-    125,8,110,4,124,5,125,8,124,3,160,15,124,8,161,1,
-    1,0,113,96,87,0,124,3,124,0,95,11,116,7,106,8,
-    160,9,116,16,161,1,114,190,100,4,100,5,132,0,124,2,
-    68,0,131,1,124,0,95,17,100,6,83,0,41,7,122,68,
-    70,105,108,108,32,116,104,101,32,99,97,99,104,101,32,111,
-    102,32,112,111,116,101,110,116,105,97,108,32,109,111,100,117,
-    108,101,115,32,97,110,100,32,112,97,99,107,97,103,101,115,
-    32,102,111,114,32,116,104,105,115,32,100,105,114,101,99,116,
-    111,114,121,46,114,0,0,0,0,114,59,0,0,0,122,5,
-    123,125,46,123,125,99,1,0,0,0,0,0,0,0,2,0,
-    0,0,4,0,0,0,83,0,0,0,115,20,0,0,0,104,
-    0,124,0,93,12,125,1,124,1,160,0,161,0,146,2,113,
-    4,83,0,114,2,0,0,0,41,1,114,90,0,0,0,41,
-    2,114,22,0,0,0,90,2,102,110,114,2,0,0,0,114,
-    2,0,0,0,114,4,0,0,0,250,9,60,115,101,116,99,
-    111,109,112,62,153,5,0,0,115,2,0,0,0,6,0,122,
-    41,70,105,108,101,70,105,110,100,101,114,46,95,102,105,108,
-    108,95,99,97,99,104,101,46,60,108,111,99,97,108,115,62,
-    46,60,115,101,116,99,111,109,112,62,78,41,18,114,35,0,
-    0,0,114,1,0,0,0,114,227,0,0,0,114,45,0,0,
-    0,114,224,0,0,0,218,15,80,101,114,109,105,115,115,105,
-    111,110,69,114,114,111,114,218,18,78,111,116,65,68,105,114,
-    101,99,116,111,114,121,69,114,114,111,114,114,6,0,0,0,
-    114,7,0,0,0,114,8,0,0,0,114,22,1,0,0,114,
-    23,1,0,0,114,85,0,0,0,114,48,0,0,0,114,90,
-    0,0,0,218,3,97,100,100,114,9,0,0,0,114,24,1,
-    0,0,41,9,114,102,0,0,0,114,35,0,0,0,114,228,
-    0,0,0,90,21,108,111,119,101,114,95,115,117,102,102,105,
-    120,95,99,111,110,116,101,110,116,115,114,1,1,0,0,114,
-    100,0,0,0,114,248,0,0,0,114,236,0,0,0,90,8,
-    110,101,119,95,110,97,109,101,114,2,0,0,0,114,2,0,
-    0,0,114,4,0,0,0,114,26,1,0,0,124,5,0,0,
-    115,34,0,0,0,0,2,6,1,2,1,22,1,20,3,10,
-    3,12,1,12,7,6,1,10,1,16,1,4,1,18,2,4,
-    1,14,1,6,1,12,1,122,22,70,105,108,101,70,105,110,
-    100,101,114,46,95,102,105,108,108,95,99,97,99,104,101,99,
-    1,0,0,0,0,0,0,0,3,0,0,0,3,0,0,0,
-    7,0,0,0,115,18,0,0,0,135,0,135,1,102,2,100,
-    1,100,2,132,8,125,2,124,2,83,0,41,3,97,20,1,
-    0,0,65,32,99,108,97,115,115,32,109,101,116,104,111,100,
-    32,119,104,105,99,104,32,114,101,116,117,114,110,115,32,97,
-    32,99,108,111,115,117,114,101,32,116,111,32,117,115,101,32,
-    111,110,32,115,121,115,46,112,97,116,104,95,104,111,111,107,
-    10,32,32,32,32,32,32,32,32,119,104,105,99,104,32,119,
-    105,108,108,32,114,101,116,117,114,110,32,97,110,32,105,110,
-    115,116,97,110,99,101,32,117,115,105,110,103,32,116,104,101,
-    32,115,112,101,99,105,102,105,101,100,32,108,111,97,100,101,
-    114,115,32,97,110,100,32,116,104,101,32,112,97,116,104,10,
-    32,32,32,32,32,32,32,32,99,97,108,108,101,100,32,111,
-    110,32,116,104,101,32,99,108,111,115,117,114,101,46,10,10,
-    32,32,32,32,32,32,32,32,73,102,32,116,104,101,32,112,
-    97,116,104,32,99,97,108,108,101,100,32,111,110,32,116,104,
-    101,32,99,108,111,115,117,114,101,32,105,115,32,110,111,116,
-    32,97,32,100,105,114,101,99,116,111,114,121,44,32,73,109,
-    112,111,114,116,69,114,114,111,114,32,105,115,10,32,32,32,
-    32,32,32,32,32,114,97,105,115,101,100,46,10,10,32,32,
-    32,32,32,32,32,32,99,1,0,0,0,0,0,0,0,1,
-    0,0,0,4,0,0,0,19,0,0,0,115,34,0,0,0,
-    116,0,124,0,131,1,115,20,116,1,100,1,124,0,100,2,
-    141,2,130,1,136,0,124,0,102,1,136,1,158,2,142,0,
-    83,0,41,3,122,45,80,97,116,104,32,104,111,111,107,32,
-    102,111,114,32,105,109,112,111,114,116,108,105,98,46,109,97,
-    99,104,105,110,101,114,121,46,70,105,108,101,70,105,110,100,
-    101,114,46,122,30,111,110,108,121,32,100,105,114,101,99,116,
-    111,114,105,101,115,32,97,114,101,32,115,117,112,112,111,114,
-    116,101,100,41,1,114,35,0,0,0,41,2,114,46,0,0,
-    0,114,101,0,0,0,41,1,114,35,0,0,0,41,2,114,
-    172,0,0,0,114,25,1,0,0,114,2,0,0,0,114,4,
-    0,0,0,218,24,112,97,116,104,95,104,111,111,107,95,102,
-    111,114,95,70,105,108,101,70,105,110,100,101,114,165,5,0,
-    0,115,6,0,0,0,0,2,8,1,12,1,122,54,70,105,
-    108,101,70,105,110,100,101,114,46,112,97,116,104,95,104,111,
-    111,107,46,60,108,111,99,97,108,115,62,46,112,97,116,104,
-    95,104,111,111,107,95,102,111,114,95,70,105,108,101,70,105,
-    110,100,101,114,114,2,0,0,0,41,3,114,172,0,0,0,
-    114,25,1,0,0,114,31,1,0,0,114,2,0,0,0,41,
-    2,114,172,0,0,0,114,25,1,0,0,114,4,0,0,0,
-    218,9,112,97,116,104,95,104,111,111,107,155,5,0,0,115,
-    4,0,0,0,0,10,14,6,122,20,70,105,108,101,70,105,
-    110,100,101,114,46,112,97,116,104,95,104,111,111,107,99,1,
-    0,0,0,0,0,0,0,1,0,0,0,3,0,0,0,67,
-    0,0,0,115,12,0,0,0,100,1,160,0,124,0,106,1,
-    161,1,83,0,41,2,78,122,16,70,105,108,101,70,105,110,
-    100,101,114,40,123,33,114,125,41,41,2,114,48,0,0,0,
-    114,35,0,0,0,41,1,114,102,0,0,0,114,2,0,0,
-    0,114,2,0,0,0,114,4,0,0,0,114,0,1,0,0,
-    173,5,0,0,115,2,0,0,0,0,1,122,19,70,105,108,
-    101,70,105,110,100,101,114,46,95,95,114,101,112,114,95,95,
-    41,1,78,41,15,114,107,0,0,0,114,106,0,0,0,114,
-    108,0,0,0,114,109,0,0,0,114,186,0,0,0,114,6,
-    1,0,0,114,125,0,0,0,114,183,0,0,0,114,119,0,
-    0,0,114,18,1,0,0,114,182,0,0,0,114,26,1,0,
-    0,114,184,0,0,0,114,32,1,0,0,114,0,1,0,0,
-    114,2,0,0,0,114,2,0,0,0,114,2,0,0,0,114,
-    4,0,0,0,114,19,1,0,0,30,5,0,0,115,20,0,
-    0,0,8,7,4,2,8,14,8,4,4,2,8,12,8,5,
-    10,48,8,31,12,18,114,19,1,0,0,99,4,0,0,0,
-    0,0,0,0,6,0,0,0,8,0,0,0,67,0,0,0,
-    115,146,0,0,0,124,0,160,0,100,1,161,1,125,4,124,
-    0,160,0,100,2,161,1,125,5,124,4,115,66,124,5,114,
-    36,124,5,106,1,125,4,110,30,124,2,124,3,107,2,114,
-    56,116,2,124,1,124,2,131,2,125,4,110,10,116,3,124,
-    1,124,2,131,2,125,4,124,5,115,84,116,4,124,1,124,
-    2,124,4,100,3,141,3,125,5,121,36,124,5,124,0,100,
-    2,60,0,124,4,124,0,100,1,60,0,124,2,124,0,100,
-    4,60,0,124,3,124,0,100,5,60,0,87,0,110,20,4,
-    0,116,5,107,10,114,140,1,0,1,0,1,0,89,0,110,
-    2,88,0,100,0,83,0,41,6,78,218,10,95,95,108,111,
-    97,100,101,114,95,95,218,8,95,95,115,112,101,99,95,95,
-    41,1,114,122,0,0,0,90,8,95,95,102,105,108,101,95,
-    95,90,10,95,95,99,97,99,104,101,100,95,95,41,6,218,
-    3,103,101,116,114,122,0,0,0,114,234,0,0,0,114,229,
-    0,0,0,114,169,0,0,0,218,9,69,120,99,101,112,116,
-    105,111,110,41,6,90,2,110,115,114,100,0,0,0,90,8,
-    112,97,116,104,110,97,109,101,90,9,99,112,97,116,104,110,
-    97,109,101,114,122,0,0,0,114,166,0,0,0,114,2,0,
-    0,0,114,2,0,0,0,114,4,0,0,0,218,14,95,102,
-    105,120,95,117,112,95,109,111,100,117,108,101,179,5,0,0,
-    115,34,0,0,0,0,2,10,1,10,1,4,1,4,1,8,
-    1,8,1,12,2,10,1,4,1,14,1,2,1,8,1,8,
-    1,8,1,12,1,14,2,114,37,1,0,0,99,0,0,0,
-    0,0,0,0,0,3,0,0,0,3,0,0,0,67,0,0,
-    0,115,38,0,0,0,116,0,116,1,160,2,161,0,102,2,
-    125,0,116,3,116,4,102,2,125,1,116,5,116,6,102,2,
-    125,2,124,0,124,1,124,2,103,3,83,0,41,1,122,95,
-    82,101,116,117,114,110,115,32,97,32,108,105,115,116,32,111,
-    102,32,102,105,108,101,45,98,97,115,101,100,32,109,111,100,
-    117,108,101,32,108,111,97,100,101,114,115,46,10,10,32,32,
-    32,32,69,97,99,104,32,105,116,101,109,32,105,115,32,97,
-    32,116,117,112,108,101,32,40,108,111,97,100,101,114,44,32,
-    115,117,102,102,105,120,101,115,41,46,10,32,32,32,32,41,
-    7,114,235,0,0,0,114,143,0,0,0,218,18,101,120,116,
-    101,110,115,105,111,110,95,115,117,102,102,105,120,101,115,114,
-    229,0,0,0,114,86,0,0,0,114,234,0,0,0,114,76,
-    0,0,0,41,3,90,10,101,120,116,101,110,115,105,111,110,
-    115,90,6,115,111,117,114,99,101,90,8,98,121,116,101,99,
-    111,100,101,114,2,0,0,0,114,2,0,0,0,114,4,0,
-    0,0,114,163,0,0,0,202,5,0,0,115,8,0,0,0,
-    0,5,12,1,8,1,8,1,114,163,0,0,0,99,1,0,
-    0,0,0,0,0,0,12,0,0,0,9,0,0,0,67,0,
-    0,0,115,156,1,0,0,124,0,97,0,116,0,106,1,97,
-    1,116,0,106,2,97,2,116,1,106,3,116,4,25,0,125,
-    1,120,56,100,1,68,0,93,48,125,2,124,2,116,1,106,
-    3,107,7,114,58,116,0,160,5,124,2,161,1,125,3,110,
-    10,116,1,106,3,124,2,25,0,125,3,116,6,124,1,124,
-    2,124,3,131,3,1,0,113,32,87,0,100,2,100,3,103,
-    1,102,2,100,4,100,5,100,3,103,2,102,2,102,2,125,
-    4,120,118,124,4,68,0,93,102,92,2,125,5,125,6,116,
-    7,100,6,100,7,132,0,124,6,68,0,131,1,131,1,115,
-    142,116,8,130,1,124,6,100,8,25,0,125,7,124,5,116,
-    1,106,3,107,6,114,174,116,1,106,3,124,5,25,0,125,
-    8,80,0,113,112,121,16,116,0,160,5,124,5,161,1,125,
-    8,80,0,87,0,113,112,4,0,116,9,107,10,114,212,1,
-    0,1,0,1,0,119,112,89,0,113,112,88,0,113,112,87,
-    0,116,9,100,9,131,1,130,1,116,6,124,1,100,10,124,
-    8,131,3,1,0,116,6,124,1,100,11,124,7,131,3,1,
-    0,116,6,124,1,100,12,100,13,160,10,124,6,161,1,131,
-    3,1,0,116,0,160,5,100,14,161,1,125,9,116,6,124,
-    1,100,14,124,9,131,3,1,0,116,0,160,5,100,15,161,
-    1,125,10,116,6,124,1,100,15,124,10,131,3,1,0,124,
-    5,100,4,107,2,144,1,114,88,116,0,160,5,100,16,161,
-    1,125,11,116,6,124,1,100,17,124,11,131,3,1,0,116,
-    6,124,1,100,18,116,11,131,0,131,3,1,0,116,12,160,
-    13,116,2,160,14,161,0,161,1,1,0,124,5,100,4,107,
-    2,144,1,114,152,116,15,160,16,100,19,161,1,1,0,100,
-    20,116,12,107,6,144,1,114,152,100,21,116,17,95,18,100,
-    22,83,0,41,23,122,205,83,101,116,117,112,32,116,104,101,
-    32,112,97,116,104,45,98,97,115,101,100,32,105,109,112,111,
-    114,116,101,114,115,32,102,111,114,32,105,109,112,111,114,116,
-    108,105,98,32,98,121,32,105,109,112,111,114,116,105,110,103,
-    32,110,101,101,100,101,100,10,32,32,32,32,98,117,105,108,
-    116,45,105,110,32,109,111,100,117,108,101,115,32,97,110,100,
-    32,105,110,106,101,99,116,105,110,103,32,116,104,101,109,32,
-    105,110,116,111,32,116,104,101,32,103,108,111,98,97,108,32,
-    110,97,109,101,115,112,97,99,101,46,10,10,32,32,32,32,
-    79,116,104,101,114,32,99,111,109,112,111,110,101,110,116,115,
-    32,97,114,101,32,101,120,116,114,97,99,116,101,100,32,102,
-    114,111,109,32,116,104,101,32,99,111,114,101,32,98,111,111,
-    116,115,116,114,97,112,32,109,111,100,117,108,101,46,10,10,
-    32,32,32,32,41,4,114,50,0,0,0,114,61,0,0,0,
-    218,8,98,117,105,108,116,105,110,115,114,140,0,0,0,90,
-    5,112,111,115,105,120,250,1,47,90,2,110,116,250,1,92,
-    99,1,0,0,0,0,0,0,0,2,0,0,0,3,0,0,
-    0,115,0,0,0,115,26,0,0,0,124,0,93,18,125,1,
-    116,0,124,1,131,1,100,0,107,2,86,0,1,0,113,2,
-    100,1,83,0,41,2,114,29,0,0,0,78,41,1,114,31,
-    0,0,0,41,2,114,22,0,0,0,114,79,0,0,0,114,
-    2,0,0,0,114,2,0,0,0,114,4,0,0,0,114,238,
-    0,0,0,238,5,0,0,115,2,0,0,0,4,0,122,25,
-    95,115,101,116,117,112,46,60,108,111,99,97,108,115,62,46,
-    60,103,101,110,101,120,112,114,62,114,60,0,0,0,122,30,
-    105,109,112,111,114,116,108,105,98,32,114,101,113,117,105,114,
-    101,115,32,112,111,115,105,120,32,111,114,32,110,116,114,1,
-    0,0,0,114,25,0,0,0,114,21,0,0,0,114,30,0,
-    0,0,90,7,95,116,104,114,101,97,100,90,8,95,119,101,
-    97,107,114,101,102,90,6,119,105,110,114,101,103,114,171,0,
-    0,0,114,5,0,0,0,122,4,46,112,121,119,122,6,95,
-    100,46,112,121,100,84,78,41,19,114,116,0,0,0,114,6,
-    0,0,0,114,143,0,0,0,114,250,0,0,0,114,107,0,
-    0,0,90,18,95,98,117,105,108,116,105,110,95,102,114,111,
-    109,95,110,97,109,101,114,111,0,0,0,218,3,97,108,108,
-    114,151,0,0,0,114,101,0,0,0,114,26,0,0,0,114,
-    11,0,0,0,114,240,0,0,0,114,147,0,0,0,114,38,
-    1,0,0,114,86,0,0,0,114,165,0,0,0,114,170,0,
-    0,0,114,174,0,0,0,41,12,218,17,95,98,111,111,116,
-    115,116,114,97,112,95,109,111,100,117,108,101,90,11,115,101,
-    108,102,95,109,111,100,117,108,101,90,12,98,117,105,108,116,
-    105,110,95,110,97,109,101,90,14,98,117,105,108,116,105,110,
-    95,109,111,100,117,108,101,90,10,111,115,95,100,101,116,97,
-    105,108,115,90,10,98,117,105,108,116,105,110,95,111,115,114,
-    21,0,0,0,114,25,0,0,0,90,9,111,115,95,109,111,
-    100,117,108,101,90,13,116,104,114,101,97,100,95,109,111,100,
-    117,108,101,90,14,119,101,97,107,114,101,102,95,109,111,100,
-    117,108,101,90,13,119,105,110,114,101,103,95,109,111,100,117,
-    108,101,114,2,0,0,0,114,2,0,0,0,114,4,0,0,
-    0,218,6,95,115,101,116,117,112,213,5,0,0,115,76,0,
-    0,0,0,8,4,1,6,1,6,3,10,1,10,1,10,1,
-    12,2,10,1,16,3,22,1,14,2,22,1,8,1,10,1,
-    10,1,4,2,2,1,10,1,6,1,14,1,12,2,8,1,
-    12,1,12,1,18,3,10,1,12,3,10,1,12,3,10,1,
-    10,1,12,3,14,1,14,1,10,1,10,1,10,1,114,44,
-    1,0,0,99,1,0,0,0,0,0,0,0,2,0,0,0,
-    4,0,0,0,67,0,0,0,115,50,0,0,0,116,0,124,
-    0,131,1,1,0,116,1,131,0,125,1,116,2,106,3,160,
-    4,116,5,106,6,124,1,142,0,103,1,161,1,1,0,116,
-    2,106,7,160,8,116,9,161,1,1,0,100,1,83,0,41,
-    2,122,41,73,110,115,116,97,108,108,32,116,104,101,32,112,
-    97,116,104,45,98,97,115,101,100,32,105,109,112,111,114,116,
-    32,99,111,109,112,111,110,101,110,116,115,46,78,41,10,114,
-    44,1,0,0,114,163,0,0,0,114,6,0,0,0,114,11,
-    1,0,0,114,147,0,0,0,114,19,1,0,0,114,32,1,
-    0,0,218,9,109,101,116,97,95,112,97,116,104,114,165,0,
-    0,0,114,5,1,0,0,41,2,114,43,1,0,0,90,17,
-    115,117,112,112,111,114,116,101,100,95,108,111,97,100,101,114,
-    115,114,2,0,0,0,114,2,0,0,0,114,4,0,0,0,
-    218,8,95,105,110,115,116,97,108,108,21,6,0,0,115,8,
-    0,0,0,0,2,8,1,6,1,20,1,114,46,1,0,0,
-    41,1,114,47,0,0,0,41,1,78,41,3,78,78,78,41,
-    2,114,60,0,0,0,114,60,0,0,0,41,1,84,41,1,
-    78,41,1,78,41,61,114,109,0,0,0,114,10,0,0,0,
-    90,37,95,67,65,83,69,95,73,78,83,69,78,83,73,84,
-    73,86,69,95,80,76,65,84,70,79,82,77,83,95,66,89,
-    84,69,83,95,75,69,89,114,9,0,0,0,114,11,0,0,
-    0,114,17,0,0,0,114,19,0,0,0,114,28,0,0,0,
-    114,38,0,0,0,114,39,0,0,0,114,43,0,0,0,114,
-    44,0,0,0,114,46,0,0,0,114,56,0,0,0,218,4,
-    116,121,112,101,218,8,95,95,99,111,100,101,95,95,114,142,
-    0,0,0,114,15,0,0,0,114,129,0,0,0,114,14,0,
-    0,0,114,18,0,0,0,114,209,0,0,0,114,75,0,0,
-    0,114,74,0,0,0,114,86,0,0,0,114,76,0,0,0,
-    90,23,68,69,66,85,71,95,66,89,84,69,67,79,68,69,
-    95,83,85,70,70,73,88,69,83,90,27,79,80,84,73,77,
-    73,90,69,68,95,66,89,84,69,67,79,68,69,95,83,85,
-    70,70,73,88,69,83,114,81,0,0,0,114,87,0,0,0,
-    114,93,0,0,0,114,97,0,0,0,114,99,0,0,0,114,
-    118,0,0,0,114,125,0,0,0,114,133,0,0,0,114,137,
-    0,0,0,114,139,0,0,0,114,145,0,0,0,114,150,0,
-    0,0,114,152,0,0,0,114,157,0,0,0,218,6,111,98,
-    106,101,99,116,114,164,0,0,0,114,169,0,0,0,114,170,
-    0,0,0,114,185,0,0,0,114,195,0,0,0,114,212,0,
-    0,0,114,229,0,0,0,114,234,0,0,0,114,240,0,0,
-    0,114,235,0,0,0,114,241,0,0,0,114,3,1,0,0,
-    114,5,1,0,0,114,19,1,0,0,114,37,1,0,0,114,
-    163,0,0,0,114,44,1,0,0,114,46,1,0,0,114,2,
-    0,0,0,114,2,0,0,0,114,2,0,0,0,114,4,0,
-    0,0,218,8,60,109,111,100,117,108,101,62,8,0,0,0,
-    115,118,0,0,0,4,15,4,1,4,1,2,1,6,3,8,
-    17,8,5,8,5,8,6,8,12,8,10,8,9,8,5,8,
-    7,10,22,10,127,0,5,16,1,12,2,4,1,4,2,6,
-    2,6,2,8,2,16,45,8,34,8,19,8,12,8,12,8,
-    28,8,17,8,33,8,28,8,24,10,13,10,10,10,11,8,
-    14,6,3,4,1,14,67,14,64,14,29,16,127,0,17,14,
-    68,18,45,18,26,4,3,18,53,14,60,14,42,14,127,0,
-    7,14,127,0,22,10,23,8,11,8,64,
+    10,32,32,32,32,32,32,32,32,78,41,3,114,185,0,0,
+    0,114,124,0,0,0,114,161,0,0,0,41,3,114,104,0,
+    0,0,114,123,0,0,0,114,169,0,0,0,114,3,0,0,
+    0,114,3,0,0,0,114,5,0,0,0,114,121,0,0,0,
+    164,5,0,0,115,8,0,0,0,0,7,10,1,8,1,8,
+    1,122,22,70,105,108,101,70,105,110,100,101,114,46,102,105,
+    110,100,95,108,111,97,100,101,114,99,6,0,0,0,0,0,
+    0,0,7,0,0,0,6,0,0,0,67,0,0,0,115,26,
+    0,0,0,124,1,124,2,124,3,131,2,125,6,116,0,124,
+    2,124,3,124,6,124,4,100,1,141,4,83,0,41,2,78,
+    41,2,114,124,0,0,0,114,161,0,0,0,41,1,114,172,
+    0,0,0,41,7,114,104,0,0,0,114,170,0,0,0,114,
+    123,0,0,0,114,36,0,0,0,218,4,115,109,115,108,114,
+    184,0,0,0,114,124,0,0,0,114,3,0,0,0,114,3,
+    0,0,0,114,5,0,0,0,114,24,1,0,0,176,5,0,
+    0,115,6,0,0,0,0,1,10,1,8,1,122,20,70,105,
+    108,101,70,105,110,100,101,114,46,95,103,101,116,95,115,112,
+    101,99,78,99,3,0,0,0,0,0,0,0,14,0,0,0,
+    8,0,0,0,67,0,0,0,115,142,1,0,0,100,1,125,
+    3,124,1,160,0,100,2,161,1,100,3,25,0,125,4,121,
+    24,116,1,124,0,106,2,112,34,116,3,160,4,161,0,131,
+    1,106,5,125,5,87,0,110,24,4,0,116,6,107,10,114,
+    66,1,0,1,0,1,0,100,4,125,5,89,0,110,2,88,
+    0,124,5,124,0,106,7,107,3,114,94,124,0,160,8,124,
+    5,161,1,1,0,124,5,124,0,95,7,116,9,131,0,114,
+    116,124,0,106,10,125,6,124,4,160,11,161,0,125,7,110,
+    10,124,0,106,12,125,6,124,4,125,7,124,7,124,6,107,
+    6,114,240,116,13,124,0,106,2,124,4,131,2,125,8,120,
+    92,124,0,106,14,68,0,93,54,92,2,125,9,125,10,100,
+    5,124,9,23,0,125,11,116,13,124,8,124,11,131,2,125,
+    12,116,15,124,12,131,1,114,154,124,0,160,16,124,10,124,
+    1,124,12,124,8,103,1,124,2,161,5,83,0,113,154,87,
+    0,124,0,106,17,160,18,124,7,161,1,125,3,124,3,100,
+    6,107,8,114,240,116,19,124,8,131,1,125,3,120,110,124,
+    0,106,14,68,0,93,100,92,2,125,9,125,10,116,13,124,
+    0,106,2,124,4,124,9,23,0,131,2,125,12,116,20,106,
+    21,100,7,124,12,100,3,100,8,141,3,1,0,124,7,124,
+    9,23,0,124,6,107,6,114,248,124,0,106,17,160,18,124,
+    7,124,9,23,0,161,1,100,1,107,8,144,1,115,74,116,
+    15,124,12,131,1,114,248,124,0,160,16,124,10,124,1,124,
+    12,100,6,124,2,161,5,83,0,113,248,87,0,124,3,144,
+    1,114,138,116,20,160,21,100,9,124,8,161,2,1,0,116,
+    20,160,22,124,1,100,6,161,2,125,13,124,8,103,1,124,
+    13,95,23,124,13,83,0,100,6,83,0,41,10,122,111,84,
+    114,121,32,116,111,32,102,105,110,100,32,97,32,115,112,101,
+    99,32,102,111,114,32,116,104,101,32,115,112,101,99,105,102,
+    105,101,100,32,109,111,100,117,108,101,46,10,10,32,32,32,
+    32,32,32,32,32,82,101,116,117,114,110,115,32,116,104,101,
+    32,109,97,116,99,104,105,110,103,32,115,112,101,99,44,32,
+    111,114,32,78,111,110,101,32,105,102,32,110,111,116,32,102,
+    111,117,110,100,46,10,32,32,32,32,32,32,32,32,70,114,
+    60,0,0,0,114,58,0,0,0,114,91,0,0,0,114,189,
+    0,0,0,78,122,9,116,114,121,105,110,103,32,123,125,41,
+    1,90,9,118,101,114,98,111,115,105,116,121,122,25,112,111,
+    115,115,105,98,108,101,32,110,97,109,101,115,112,97,99,101,
+    32,102,111,114,32,123,125,41,24,114,33,0,0,0,114,40,
+    0,0,0,114,36,0,0,0,114,1,0,0,0,114,46,0,
+    0,0,114,235,0,0,0,114,41,0,0,0,114,44,1,0,
+    0,218,11,95,102,105,108,108,95,99,97,99,104,101,114,6,
+    0,0,0,114,47,1,0,0,114,92,0,0,0,114,46,1,
+    0,0,114,29,0,0,0,114,43,1,0,0,114,45,0,0,
+    0,114,24,1,0,0,114,48,1,0,0,114,27,1,0,0,
+    114,47,0,0,0,114,118,0,0,0,114,132,0,0,0,114,
+    165,0,0,0,114,161,0,0,0,41,14,114,104,0,0,0,
+    114,123,0,0,0,114,184,0,0,0,90,12,105,115,95,110,
+    97,109,101,115,112,97,99,101,90,11,116,97,105,108,95,109,
+    111,100,117,108,101,114,152,0,0,0,90,5,99,97,99,104,
+    101,90,12,99,97,99,104,101,95,109,111,100,117,108,101,90,
+    9,98,97,115,101,95,112,97,116,104,114,241,0,0,0,114,
+    170,0,0,0,90,13,105,110,105,116,95,102,105,108,101,110,
+    97,109,101,90,9,102,117,108,108,95,112,97,116,104,114,169,
+    0,0,0,114,3,0,0,0,114,3,0,0,0,114,5,0,
+    0,0,114,185,0,0,0,181,5,0,0,115,76,0,0,0,
+    0,5,4,1,14,1,2,1,24,1,14,1,10,1,10,1,
+    10,1,6,2,6,1,6,1,10,2,6,1,4,2,8,1,
+    12,1,16,1,8,1,10,1,8,1,24,4,12,1,8,1,
+    8,2,16,1,16,1,16,1,12,1,22,1,8,1,10,1,
+    12,1,6,1,12,1,12,1,8,1,4,1,122,20,70,105,
+    108,101,70,105,110,100,101,114,46,102,105,110,100,95,115,112,
+    101,99,99,2,0,0,0,0,0,0,0,11,0,0,0,10,
+    0,0,0,67,0,0,0,115,6,1,0,0,124,0,106,0,
+    125,2,105,0,124,0,95,1,124,1,100,1,107,9,114,32,
+    116,2,131,0,160,3,124,2,161,1,110,2,100,1,125,3,
+    124,3,100,1,107,9,114,72,124,3,100,2,25,0,124,1,
+    107,2,114,72,124,3,100,3,25,0,4,0,124,0,95,1,
+    125,4,110,54,121,22,116,4,160,5,124,2,112,88,116,4,
+    160,6,161,0,161,1,125,4,87,0,110,30,4,0,116,7,
+    116,8,116,9,102,3,107,10,114,124,1,0,1,0,1,0,
+    103,0,125,4,89,0,110,2,88,0,116,10,106,11,160,12,
+    100,4,161,1,115,150,116,13,124,4,131,1,124,0,95,14,
+    110,78,116,13,131,0,125,5,120,64,124,4,68,0,93,56,
+    125,6,124,6,160,15,100,5,161,1,92,3,125,7,125,8,
+    125,9,124,8,114,204,100,6,160,16,124,7,124,9,160,17,
+    161,0,161,2,125,10,110,4,124,7,125,10,124,5,160,18,
+    124,10,161,1,1,0,113,162,87,0,124,5,124,0,95,14,
+    116,10,106,11,160,12,116,19,161,1,144,1,114,2,100,7,
+    100,8,132,0,124,4,68,0,131,1,124,0,95,20,100,1,
+    83,0,41,9,97,9,1,0,0,70,105,108,108,32,116,104,
+    101,32,99,97,99,104,101,32,111,102,32,112,111,116,101,110,
+    116,105,97,108,32,109,111,100,117,108,101,115,32,97,110,100,
+    32,112,97,99,107,97,103,101,115,32,102,111,114,32,116,104,
+    105,115,32,100,105,114,101,99,116,111,114,121,46,10,10,32,
+    32,32,32,32,32,32,32,73,102,32,109,116,105,109,101,32,
+    105,115,32,103,105,118,101,110,32,97,110,100,32,109,97,116,
+    99,104,101,115,32,116,104,101,32,109,111,100,105,102,105,99,
+    97,116,105,111,110,32,116,105,109,101,32,114,101,99,111,114,
+    100,101,100,32,102,111,114,32,116,104,101,10,32,32,32,32,
+    32,32,32,32,100,105,114,101,99,116,111,114,121,32,105,110,
+    32,116,104,101,32,112,97,116,104,32,105,110,100,101,120,44,
+    32,116,104,101,32,105,110,100,101,120,101,100,32,99,111,110,
+    116,101,110,116,115,32,97,114,101,32,117,115,101,100,32,105,
+    110,115,116,101,97,100,32,111,102,10,32,32,32,32,32,32,
+    32,32,108,105,115,116,105,110,103,32,116,104,101,32,100,105,
+    114,101,99,116,111,114,121,46,10,10,32,32,32,32,32,32,
+    32,32,78,114,61,0,0,0,114,30,0,0,0,114,0,0,
+    0,0,114,60,0,0,0,122,5,123,125,46,123,125,99,1,
+    0,0,0,0,0,0,0,2,0,0,0,4,0,0,0,83,
+    0,0,0,115,20,0,0,0,104,0,124,0,93,12,125,1,
+    124,1,160,0,161,0,146,2,113,4,83,0,114,3,0,0,
+    0,41,1,114,92,0,0,0,41,2,114,23,0,0,0,90,
+    2,102,110,114,3,0,0,0,114,3,0,0,0,114,5,0,
+    0,0,250,9,60,115,101,116,99,111,109,112,62,16,6,0,
+    0,115,2,0,0,0,6,0,122,41,70,105,108,101,70,105,
+    110,100,101,114,46,95,102,105,108,108,95,99,97,99,104,101,
+    46,60,108,111,99,97,108,115,62,46,60,115,101,116,99,111,
+    109,112,62,41,21,114,36,0,0,0,114,48,1,0,0,114,
+    37,1,0,0,114,27,1,0,0,114,1,0,0,0,114,232,
+    0,0,0,114,46,0,0,0,114,229,0,0,0,218,15,80,
+    101,114,109,105,115,115,105,111,110,69,114,114,111,114,218,18,
+    78,111,116,65,68,105,114,101,99,116,111,114,121,69,114,114,
+    111,114,114,7,0,0,0,114,8,0,0,0,114,9,0,0,
+    0,114,45,1,0,0,114,46,1,0,0,114,87,0,0,0,
+    114,49,0,0,0,114,92,0,0,0,218,3,97,100,100,114,
+    10,0,0,0,114,47,1,0,0,41,11,114,104,0,0,0,
+    114,152,0,0,0,114,36,0,0,0,114,23,1,0,0,114,
+    233,0,0,0,90,21,108,111,119,101,114,95,115,117,102,102,
+    105,120,95,99,111,110,116,101,110,116,115,114,6,1,0,0,
+    114,102,0,0,0,114,253,0,0,0,114,241,0,0,0,90,
+    8,110,101,119,95,110,97,109,101,114,3,0,0,0,114,3,
+    0,0,0,114,5,0,0,0,114,51,1,0,0,232,5,0,
+    0,115,42,0,0,0,0,8,6,1,6,1,24,1,20,1,
+    16,2,2,1,22,1,20,3,10,3,12,1,12,7,6,1,
+    10,1,16,1,4,1,18,2,4,1,14,1,6,1,14,1,
+    122,22,70,105,108,101,70,105,110,100,101,114,46,95,102,105,
+    108,108,95,99,97,99,104,101,99,1,0,0,0,0,0,0,
+    0,3,0,0,0,3,0,0,0,7,0,0,0,115,18,0,
+    0,0,135,0,135,1,102,2,100,1,100,2,132,8,125,2,
+    124,2,83,0,41,3,97,20,1,0,0,65,32,99,108,97,
+    115,115,32,109,101,116,104,111,100,32,119,104,105,99,104,32,
+    114,101,116,117,114,110,115,32,97,32,99,108,111,115,117,114,
+    101,32,116,111,32,117,115,101,32,111,110,32,115,121,115,46,
+    112,97,116,104,95,104,111,111,107,10,32,32,32,32,32,32,
+    32,32,119,104,105,99,104,32,119,105,108,108,32,114,101,116,
+    117,114,110,32,97,110,32,105,110,115,116,97,110,99,101,32,
+    117,115,105,110,103,32,116,104,101,32,115,112,101,99,105,102,
+    105,101,100,32,108,111,97,100,101,114,115,32,97,110,100,32,
+    116,104,101,32,112,97,116,104,10,32,32,32,32,32,32,32,
+    32,99,97,108,108,101,100,32,111,110,32,116,104,101,32,99,
+    108,111,115,117,114,101,46,10,10,32,32,32,32,32,32,32,
+    32,73,102,32,116,104,101,32,112,97,116,104,32,99,97,108,
+    108,101,100,32,111,110,32,116,104,101,32,99,108,111,115,117,
+    114,101,32,105,115,32,110,111,116,32,97,32,100,105,114,101,
+    99,116,111,114,121,44,32,73,109,112,111,114,116,69,114,114,
+    111,114,32,105,115,10,32,32,32,32,32,32,32,32,114,97,
+    105,115,101,100,46,10,10,32,32,32,32,32,32,32,32,99,
+    1,0,0,0,0,0,0,0,1,0,0,0,4,0,0,0,
+    19,0,0,0,115,34,0,0,0,116,0,124,0,131,1,115,
+    20,116,1,100,1,124,0,100,2,141,2,130,1,136,0,124,
+    0,102,1,136,1,158,2,142,0,83,0,41,3,122,45,80,
+    97,116,104,32,104,111,111,107,32,102,111,114,32,105,109,112,
+    111,114,116,108,105,98,46,109,97,99,104,105,110,101,114,121,
+    46,70,105,108,101,70,105,110,100,101,114,46,122,30,111,110,
+    108,121,32,100,105,114,101,99,116,111,114,105,101,115,32,97,
+    114,101,32,115,117,112,112,111,114,116,101,100,41,1,114,36,
+    0,0,0,41,2,114,47,0,0,0,114,103,0,0,0,41,
+    1,114,36,0,0,0,41,2,114,175,0,0,0,114,49,1,
+    0,0,114,3,0,0,0,114,5,0,0,0,218,24,112,97,
+    116,104,95,104,111,111,107,95,102,111,114,95,70,105,108,101,
+    70,105,110,100,101,114,28,6,0,0,115,6,0,0,0,0,
+    2,8,1,12,1,122,54,70,105,108,101,70,105,110,100,101,
+    114,46,112,97,116,104,95,104,111,111,107,46,60,108,111,99,
+    97,108,115,62,46,112,97,116,104,95,104,111,111,107,95,102,
+    111,114,95,70,105,108,101,70,105,110,100,101,114,114,3,0,
+    0,0,41,3,114,175,0,0,0,114,49,1,0,0,114,56,
+    1,0,0,114,3,0,0,0,41,2,114,175,0,0,0,114,
+    49,1,0,0,114,5,0,0,0,218,9,112,97,116,104,95,
+    104,111,111,107,18,6,0,0,115,4,0,0,0,0,10,14,
+    6,122,20,70,105,108,101,70,105,110,100,101,114,46,112,97,
+    116,104,95,104,111,111,107,99,1,0,0,0,0,0,0,0,
+    1,0,0,0,3,0,0,0,67,0,0,0,115,12,0,0,
+    0,100,1,160,0,124,0,106,1,161,1,83,0,41,2,78,
+    122,16,70,105,108,101,70,105,110,100,101,114,40,123,33,114,
+    125,41,41,2,114,49,0,0,0,114,36,0,0,0,41,1,
+    114,104,0,0,0,114,3,0,0,0,114,3,0,0,0,114,
+    5,0,0,0,114,5,1,0,0,36,6,0,0,115,2,0,
+    0,0,0,1,122,19,70,105,108,101,70,105,110,100,101,114,
+    46,95,95,114,101,112,114,95,95,41,1,78,41,1,78,41,
+    15,114,109,0,0,0,114,108,0,0,0,114,110,0,0,0,
+    114,111,0,0,0,114,189,0,0,0,114,11,1,0,0,114,
+    127,0,0,0,114,186,0,0,0,114,121,0,0,0,114,24,
+    1,0,0,114,185,0,0,0,114,51,1,0,0,114,187,0,
+    0,0,114,57,1,0,0,114,5,1,0,0,114,3,0,0,
+    0,114,3,0,0,0,114,3,0,0,0,114,5,0,0,0,
+    114,42,1,0,0,132,5,0,0,115,20,0,0,0,8,7,
+    4,2,8,17,8,4,4,2,8,12,8,5,10,51,10,42,
+    12,18,114,42,1,0,0,115,4,0,0,0,80,89,65,82,
+    233,24,0,0,0,99,0,0,0,0,0,0,0,0,0,0,
+    0,0,2,0,0,0,64,0,0,0,115,48,0,0,0,101,
+    0,90,1,100,0,90,2,100,1,90,3,100,2,100,3,132,
+    0,90,4,100,4,100,5,132,0,90,5,100,6,100,7,132,
+    0,90,6,100,8,100,9,132,0,90,7,100,10,83,0,41,
+    11,218,13,65,114,99,104,105,118,101,76,111,97,100,101,114,
+    122,176,76,111,97,100,101,114,32,102,111,114,32,109,111,100,
+    117,108,101,115,32,112,97,99,107,101,100,32,105,110,32,97,
+    32,109,111,100,117,108,101,32,97,114,99,104,105,118,101,46,
+    10,10,32,32,32,32,84,104,101,32,112,97,116,104,32,111,
+    102,32,116,104,101,32,108,111,97,100,101,114,32,105,115,32,
+    116,104,101,32,111,114,105,103,105,110,97,108,32,112,97,116,
+    104,32,111,102,32,116,104,101,32,115,111,117,114,99,101,32,
+    102,105,108,101,44,32,119,104,105,99,104,32,105,115,10,32,
+    32,32,32,111,110,108,121,32,117,115,101,100,32,102,111,114,
+    32,103,101,116,95,115,111,117,114,99,101,40,41,32,97,110,
+    100,32,114,101,115,111,117,114,99,101,115,46,10,10,32,32,
+    32,32,99,4,0,0,0,0,0,0,0,4,0,0,0,5,
+    0,0,0,67,0,0,0,115,24,0,0,0,116,0,160,1,
+    124,0,124,2,124,3,161,3,1,0,124,1,124,0,95,2,
+    100,0,83,0,41,1,78,41,3,114,216,0,0,0,114,189,
+    0,0,0,114,15,1,0,0,41,4,114,104,0,0,0,114,
+    15,1,0,0,114,123,0,0,0,114,36,0,0,0,114,3,
+    0,0,0,114,3,0,0,0,114,5,0,0,0,114,189,0,
+    0,0,61,6,0,0,115,4,0,0,0,0,1,14,1,122,
+    22,65,114,99,104,105,118,101,76,111,97,100,101,114,46,95,
+    95,105,110,105,116,95,95,99,2,0,0,0,0,0,0,0,
+    2,0,0,0,2,0,0,0,67,0,0,0,115,16,0,0,
+    0,124,0,106,0,106,1,124,1,25,0,100,1,25,0,83,
+    0,41,2,78,114,58,0,0,0,41,2,114,15,1,0,0,
+    218,6,95,105,110,100,101,120,41,2,114,104,0,0,0,114,
+    123,0,0,0,114,3,0,0,0,114,3,0,0,0,114,5,
+    0,0,0,114,164,0,0,0,65,6,0,0,115,2,0,0,
+    0,0,1,122,24,65,114,99,104,105,118,101,76,111,97,100,
+    101,114,46,105,115,95,112,97,99,107,97,103,101,99,2,0,
+    0,0,0,0,0,0,2,0,0,0,3,0,0,0,67,0,
+    0,0,115,12,0,0,0,124,0,106,0,160,1,124,1,161,
+    1,83,0,41,1,78,41,2,114,15,1,0,0,114,191,0,
+    0,0,41,2,114,104,0,0,0,114,123,0,0,0,114,3,
+    0,0,0,114,3,0,0,0,114,5,0,0,0,114,191,0,
+    0,0,68,6,0,0,115,2,0,0,0,0,1,122,22,65,
+    114,99,104,105,118,101,76,111,97,100,101,114,46,103,101,116,
+    95,99,111,100,101,99,2,0,0,0,0,0,0,0,3,0,
+    0,0,8,0,0,0,67,0,0,0,115,46,0,0,0,121,
+    16,124,0,160,0,124,0,106,1,161,1,125,2,87,0,110,
+    20,4,0,116,2,107,10,114,36,1,0,1,0,1,0,100,
+    0,83,0,88,0,116,3,124,2,131,1,83,0,41,1,78,
+    41,4,114,203,0,0,0,114,36,0,0,0,114,41,0,0,
+    0,114,160,0,0,0,41,3,114,104,0,0,0,114,123,0,
+    0,0,114,158,0,0,0,114,3,0,0,0,114,3,0,0,
+    0,114,5,0,0,0,114,205,0,0,0,71,6,0,0,115,
+    10,0,0,0,0,1,2,1,16,1,14,1,6,1,122,24,
+    65,114,99,104,105,118,101,76,111,97,100,101,114,46,103,101,
+    116,95,115,111,117,114,99,101,78,41,8,114,109,0,0,0,
+    114,108,0,0,0,114,110,0,0,0,114,111,0,0,0,114,
+    189,0,0,0,114,164,0,0,0,114,191,0,0,0,114,205,
+    0,0,0,114,3,0,0,0,114,3,0,0,0,114,3,0,
+    0,0,114,5,0,0,0,114,59,1,0,0,52,6,0,0,
+    115,10,0,0,0,8,7,4,2,8,4,8,3,8,3,114,
+    59,1,0,0,99,0,0,0,0,0,0,0,0,0,0,0,
+    0,3,0,0,0,64,0,0,0,115,66,0,0,0,101,0,
+    90,1,100,0,90,2,100,1,90,3,100,2,100,3,132,0,
+    90,4,100,4,100,5,132,0,90,5,100,6,100,7,132,0,
+    90,6,100,8,100,9,132,0,90,7,100,15,100,11,100,12,
+    132,1,90,8,100,13,100,14,132,0,90,9,100,10,83,0,
+    41,16,218,13,65,114,99,104,105,118,101,70,105,110,100,101,
+    114,97,47,1,0,0,77,101,116,97,32,112,97,116,104,32,
+    102,105,110,100,101,114,32,102,111,114,32,116,104,101,32,109,
+    111,100,117,108,101,115,32,112,97,99,107,101,100,32,105,110,
+    32,97,32,109,111,100,117,108,101,32,97,114,99,104,105,118,
+    101,46,10,10,32,32,32,32,84,104,101,32,97,114,99,104,
+    105,118,101,32,105,115,32,111,112,101,110,101,100,32,111,110,
+    99,101,32,97,110,100,32,101,97,99,104,32,109,111,100,117,
+    108,101,32,105,115,32,114,101,97,100,32,119,105,116,104,32,
+    97,32,115,105,110,103,108,101,32,114,101,97,100,32,111,102,
+    10,32,32,32,32,105,116,115,32,99,111,100,101,32,111,98,
+    106,101,99,116,44,32,119,105,116,104,111,117,116,32,102,117,
+    114,116,104,101,114,32,102,105,108,101,32,115,121,115,116,101,
+    109,32,99,97,108,108,115,46,32,32,84,104,101,32,97,114,
+    99,104,105,118,101,100,32,99,111,100,101,10,32,32,32,32,
+    105,115,32,117,115,101,100,32,101,118,101,110,32,105,102,32,
+    116,104,101,32,115,111,117,114,99,101,32,102,105,108,101,115,
+    32,119,101,114,101,32,109,111,100,105,102,105,101,100,32,115,
+    105,110,99,101,32,116,104,101,32,97,114,99,104,105,118,101,
+    32,119,97,115,10,32,32,32,32,98,117,105,108,116,46,10,
+    10,32,32,32,32,99,2,0,0,0,0,0,0,0,5,0,
+    0,0,8,0,0,0,67,0,0,0,115,248,0,0,0,124,
+    1,124,0,95,0,116,1,160,2,124,1,100,1,161,2,125,
+    2,121,172,124,2,160,3,116,4,161,1,125,3,116,5,124,
+    3,131,1,116,4,107,3,115,58,124,3,100,0,100,2,133,
+    2,25,0,116,6,107,3,114,76,116,7,100,3,160,8,124,
+    1,161,1,124,1,100,4,141,2,130,1,124,3,100,2,100,
+    5,133,2,25,0,116,9,107,3,114,110,116,7,100,6,160,
+    8,124,1,161,1,124,1,100,4,141,2,130,1,124,2,160,
+    10,116,11,124,3,100,5,100,7,133,2,25,0,131,1,161,
+    1,1,0,116,12,160,13,124,2,160,3,116,11,124,3,100,
+    7,100,8,133,2,25,0,131,1,161,1,161,1,125,4,116,
+    14,124,4,116,15,131,2,115,188,116,7,100,9,160,8,124,
+    1,161,1,124,1,100,4,141,2,130,1,87,0,110,30,4,
+    0,116,16,107,10,114,220,1,0,1,0,1,0,124,2,160,
+    17,161,0,1,0,130,0,89,0,110,2,88,0,124,2,124,
+    0,95,18,124,4,124,0,95,19,116,20,160,21,161,0,124,
+    0,95,22,100,0,83,0,41,10,78,114,223,0,0,0,114,
+    13,0,0,0,122,23,98,97,100,32,109,111,100,117,108,101,
+    32,97,114,99,104,105,118,101,32,123,33,114,125,41,1,114,
+    36,0,0,0,114,129,0,0,0,122,39,98,97,100,32,109,
+    97,103,105,99,32,110,117,109,98,101,114,32,105,110,32,109,
+    111,100,117,108,101,32,97,114,99,104,105,118,101,32,123,33,
+    114,125,114,128,0,0,0,114,58,1,0,0,122,32,98,97,
+    100,32,109,111,100,117,108,101,32,97,114,99,104,105,118,101,
+    32,105,110,100,101,120,32,105,110,32,123,33,114,125,41,23,
+    114,36,0,0,0,114,51,0,0,0,114,52,0,0,0,114,
+    224,0,0,0,218,20,95,65,82,67,72,73,86,69,95,72,
+    69,65,68,69,82,95,83,73,90,69,114,32,0,0,0,218,
+    14,95,65,82,67,72,73,86,69,95,77,65,71,73,67,114,
+    103,0,0,0,114,49,0,0,0,114,131,0,0,0,218,4,
+    115,101,101,107,114,20,0,0,0,114,142,0,0,0,114,143,
+    0,0,0,114,144,0,0,0,114,36,1,0,0,218,13,66,
+    97,115,101,69,120,99,101,112,116,105,111,110,218,5,99,108,
+    111,115,101,218,5,95,102,105,108,101,114,60,1,0,0,218,
+    7,95,116,104,114,101,97,100,90,13,97,108,108,111,99,97,
+    116,101,95,108,111,99,107,218,5,95,108,111,99,107,41,5,
+    114,104,0,0,0,114,36,0,0,0,114,56,0,0,0,90,
+    6,104,101,97,100,101,114,114,2,1,0,0,114,3,0,0,
+    0,114,3,0,0,0,114,5,0,0,0,114,189,0,0,0,
+    90,6,0,0,115,44,0,0,0,0,1,6,1,12,1,2,
+    1,10,1,12,1,16,1,10,1,8,1,16,1,6,1,12,
+    1,22,1,28,1,10,1,6,1,16,1,14,1,8,1,8,
+    1,6,1,6,1,122,22,65,114,99,104,105,118,101,70,105,
+    110,100,101,114,46,95,95,105,110,105,116,95,95,99,1,0,
+    0,0,0,0,0,0,1,0,0,0,3,0,0,0,67,0,
+    0,0,115,12,0,0,0,100,1,160,0,124,0,106,1,161,
+    1,83,0,41,2,78,122,19,65,114,99,104,105,118,101,70,
+    105,110,100,101,114,40,123,33,114,125,41,41,2,114,49,0,
+    0,0,114,36,0,0,0,41,1,114,104,0,0,0,114,3,
+    0,0,0,114,3,0,0,0,114,5,0,0,0,114,5,1,
+    0,0,114,6,0,0,115,2,0,0,0,0,1,122,22,65,
+    114,99,104,105,118,101,70,105,110,100,101,114,46,95,95,114,
+    101,112,114,95,95,99,1,0,0,0,0,0,0,0,1,0,
+    0,0,1,0,0,0,67,0,0,0,115,4,0,0,0,100,
+    1,83,0,41,2,122,38,84,104,101,32,97,114,99,104,105,
+    118,101,32,110,101,118,101,114,32,99,104,97,110,103,101,115,
+    58,32,100,111,32,110,111,116,104,105,110,103,46,78,114,3,
+    0,0,0,41,1,114,104,0,0,0,114,3,0,0,0,114,
+    3,0,0,0,114,5,0,0,0,114,11,1,0,0,117,6,
+    0,0,115,2,0,0,0,0,1,122,31,65,114,99,104,105,
+    118,101,70,105,110,100,101,114,46,105,110,118,97,108,105,100,
+    97,116,101,95,99,97,99,104,101,115,99,1,0,0,0,0,
+    0,0,0,1,0,0,0,9,0,0,0,67,0,0,0,115,
+    38,0,0,0,124,0,106,0,143,22,1,0,105,0,124,0,
+    95,1,124,0,106,2,160,3,161,0,1,0,87,0,100,1,
+    81,0,82,0,88,0,100,1,83,0,41,2,122,57,67,108,
+    111,115,101,32,116,104,101,32,97,114,99,104,105,118,101,32,
+    102,105,108,101,59,32,110,111,32,109,111,100,117,108,101,32,
+    105,115,32,102,111,117,110,100,32,105,110,32,105,116,32,97,
+    110,121,109,111,114,101,46,78,41,4,114,69,1,0,0,114,
+    60,1,0,0,114,67,1,0,0,114,66,1,0,0,41,1,
+    114,104,0,0,0,114,3,0,0,0,114,3,0,0,0,114,
+    5,0,0,0,114,66,1,0,0,120,6,0,0,115,6,0,
+    0,0,0,2,8,1,6,1,122,19,65,114,99,104,105,118,
+    101,70,105,110,100,101,114,46,99,108,111,115,101,78,99,4,
+    0,0,0,0,0,0,0,11,0,0,0,8,0,0,0,67,
+    0,0,0,115,98,0,0,0,121,22,124,0,106,0,124,1,
+    25,0,92,4,125,4,125,5,125,6,125,7,87,0,110,20,
+    4,0,116,1,107,10,114,42,1,0,1,0,1,0,100,0,
+    83,0,88,0,116,2,124,0,124,1,124,7,131,3,125,8,
+    124,6,114,74,116,3,124,7,131,1,100,1,25,0,103,1,
+    110,2,100,0,125,9,116,4,124,1,124,7,124,8,124,9,
+    100,2,141,4,125,10,124,10,83,0,41,3,78,114,61,0,
+    0,0,41,2,114,124,0,0,0,114,161,0,0,0,41,5,
+    114,60,1,0,0,114,18,1,0,0,114,59,1,0,0,114,
+    39,0,0,0,114,172,0,0,0,41,11,114,104,0,0,0,
+    114,123,0,0,0,114,36,0,0,0,114,184,0,0,0,218,
+    6,111,102,102,115,101,116,114,210,0,0,0,114,164,0,0,
+    0,114,163,0,0,0,114,124,0,0,0,114,50,1,0,0,
+    114,169,0,0,0,114,3,0,0,0,114,3,0,0,0,114,
+    5,0,0,0,114,185,0,0,0,126,6,0,0,115,18,0,
+    0,0,0,1,2,1,22,1,14,1,6,1,12,1,22,1,
+    8,1,8,1,122,23,65,114,99,104,105,118,101,70,105,110,
+    100,101,114,46,102,105,110,100,95,115,112,101,99,99,2,0,
+    0,0,0,0,0,0,7,0,0,0,9,0,0,0,67,0,
+    0,0,115,200,0,0,0,121,22,124,0,106,0,124,1,25,
+    0,92,4,125,2,125,3,125,4,125,5,87,0,110,48,4,
+    0,116,1,107,10,114,70,1,0,1,0,1,0,116,2,100,
+    1,160,3,124,1,124,0,106,4,161,2,124,1,124,0,106,
+    4,100,2,141,3,100,3,130,2,89,0,110,2,88,0,124,
+    0,106,5,143,62,1,0,124,0,106,6,106,7,114,112,116,
+    2,100,4,160,3,124,0,106,4,161,1,124,1,124,0,106,
+    4,100,2,141,3,130,1,124,0,106,6,160,8,124,2,161,
+    1,1,0,124,0,106,6,160,9,124,3,161,1,125,6,87,
+    0,100,3,81,0,82,0,88,0,116,10,124,6,131,1,124,
+    3,107,3,114,174,116,11,100,5,160,3,124,0,106,4,161,
+    1,131,1,130,1,116,12,160,13,100,6,124,1,124,0,106,
+    4,161,3,1,0,116,14,160,15,124,6,161,1,83,0,41,
+    7,122,48,82,101,116,117,114,110,32,116,104,101,32,99,111,
+    100,101,32,111,98,106,101,99,116,32,111,102,32,116,104,101,
+    32,109,111,100,117,108,101,32,42,102,117,108,108,110,97,109,
+    101,42,46,122,38,123,33,114,125,32,105,115,32,110,111,116,
+    32,105,110,32,116,104,101,32,109,111,100,117,108,101,32,97,
+    114,99,104,105,118,101,32,123,33,114,125,41,2,114,102,0,
+    0,0,114,36,0,0,0,78,122,29,109,111,100,117,108,101,
+    32,97,114,99,104,105,118,101,32,123,33,114,125,32,105,115,
+    32,99,108,111,115,101,100,122,29,116,114,117,110,99,97,116,
+    101,100,32,109,111,100,117,108,101,32,97,114,99,104,105,118,
+    101,32,123,33,114,125,122,25,99,111,100,101,32,111,98,106,
+    101,99,116,32,111,102,32,123,125,32,102,114,111,109,32,123,
+    125,41,16,114,60,1,0,0,114,18,1,0,0,114,103,0,
+    0,0,114,49,0,0,0,114,36,0,0,0,114,69,1,0,
+    0,114,67,1,0,0,218,6,99,108,111,115,101,100,114,64,
+    1,0,0,114,224,0,0,0,114,32,0,0,0,114,133,0,
+    0,0,114,118,0,0,0,114,132,0,0,0,114,142,0,0,
+    0,114,143,0,0,0,41,7,114,104,0,0,0,114,123,0,
+    0,0,114,70,1,0,0,114,210,0,0,0,114,164,0,0,
+    0,114,163,0,0,0,114,55,0,0,0,114,3,0,0,0,
+    114,3,0,0,0,114,5,0,0,0,114,191,0,0,0,137,
+    6,0,0,115,34,0,0,0,0,2,2,1,22,1,14,1,
+    6,1,8,1,20,1,8,1,8,1,6,1,18,1,12,1,
+    22,1,12,1,16,1,8,1,8,1,122,22,65,114,99,104,
+    105,118,101,70,105,110,100,101,114,46,103,101,116,95,99,111,
+    100,101,41,2,78,78,41,10,114,109,0,0,0,114,108,0,
+    0,0,114,110,0,0,0,114,111,0,0,0,114,189,0,0,
+    0,114,5,1,0,0,114,11,1,0,0,114,66,1,0,0,
+    114,185,0,0,0,114,191,0,0,0,114,3,0,0,0,114,
+    3,0,0,0,114,3,0,0,0,114,5,0,0,0,114,61,
+    1,0,0,79,6,0,0,115,14,0,0,0,8,9,4,2,
+    8,24,8,3,8,3,8,6,10,11,114,61,1,0,0,99,
+    0,0,0,0,0,0,0,0,2,0,0,0,12,0,0,0,
+    67,0,0,0,115,94,0,0,0,116,0,100,1,100,2,131,
+    2,125,0,124,0,100,3,107,8,114,22,100,3,83,0,121,
+    8,116,1,124,0,131,1,83,0,4,0,116,2,116,3,116,
+    4,116,5,116,6,102,5,107,10,114,88,1,0,125,1,1,
+    0,122,18,116,7,160,8,100,4,124,0,124,1,161,3,1,
+    0,100,3,83,0,100,3,125,1,126,1,88,0,89,0,110,
+    2,88,0,100,3,83,0,41,5,122,149,82,101,116,117,114,
+    110,32,97,110,32,65,114,99,104,105,118,101,70,105,110,100,
+    101,114,32,102,111,114,32,116,104,101,32,109,111,100,117,108,
+    101,32,97,114,99,104,105,118,101,32,110,97,109,101,100,32,
+    98,121,32,116,104,101,32,45,88,10,32,32,32,32,109,111,
+    100,117,108,101,97,114,99,104,105,118,101,32,111,112,116,105,
+    111,110,32,111,114,32,116,104,101,32,80,89,84,72,79,78,
+    77,79,68,85,76,69,65,82,67,72,73,86,69,32,101,110,
+    118,105,114,111,110,109,101,110,116,32,118,97,114,105,97,98,
+    108,101,44,10,32,32,32,32,111,114,32,78,111,110,101,46,
+    90,19,80,89,84,72,79,78,77,79,68,85,76,69,65,82,
+    67,72,73,86,69,90,13,109,111,100,117,108,101,97,114,99,
+    104,105,118,101,78,122,34,99,97,110,110,111,116,32,117,115,
+    101,32,109,111,100,117,108,101,32,97,114,99,104,105,118,101,
+    32,123,33,114,125,58,32,123,125,41,9,114,30,1,0,0,
+    114,61,1,0,0,114,41,0,0,0,114,103,0,0,0,114,
+    133,0,0,0,114,74,0,0,0,114,65,0,0,0,114,118,
+    0,0,0,114,132,0,0,0,41,2,114,98,0,0,0,114,
+    204,0,0,0,114,3,0,0,0,114,3,0,0,0,114,5,
+    0,0,0,218,19,95,103,101,116,95,97,114,99,104,105,118,
+    101,95,102,105,110,100,101,114,158,6,0,0,115,18,0,0,
+    0,0,4,10,1,8,1,4,1,2,1,8,1,26,1,6,
+    1,8,1,114,72,1,0,0,99,4,0,0,0,0,0,0,
+    0,6,0,0,0,8,0,0,0,67,0,0,0,115,146,0,
+    0,0,124,0,160,0,100,1,161,1,125,4,124,0,160,0,
+    100,2,161,1,125,5,124,4,115,66,124,5,114,36,124,5,
+    106,1,125,4,110,30,124,2,124,3,107,2,114,56,116,2,
+    124,1,124,2,131,2,125,4,110,10,116,3,124,1,124,2,
+    131,2,125,4,124,5,115,84,116,4,124,1,124,2,124,4,
+    100,3,141,3,125,5,121,36,124,5,124,0,100,2,60,0,
+    124,4,124,0,100,1,60,0,124,2,124,0,100,4,60,0,
+    124,3,124,0,100,5,60,0,87,0,110,20,4,0,116,5,
+    107,10,114,140,1,0,1,0,1,0,89,0,110,2,88,0,
+    100,0,83,0,41,6,78,218,10,95,95,108,111,97,100,101,
+    114,95,95,218,8,95,95,115,112,101,99,95,95,41,1,114,
+    124,0,0,0,90,8,95,95,102,105,108,101,95,95,90,10,
+    95,95,99,97,99,104,101,100,95,95,41,6,114,27,1,0,
+    0,114,124,0,0,0,114,239,0,0,0,114,234,0,0,0,
+    114,172,0,0,0,218,9,69,120,99,101,112,116,105,111,110,
+    41,6,90,2,110,115,114,102,0,0,0,90,8,112,97,116,
+    104,110,97,109,101,90,9,99,112,97,116,104,110,97,109,101,
+    114,124,0,0,0,114,169,0,0,0,114,3,0,0,0,114,
+    3,0,0,0,114,5,0,0,0,218,14,95,102,105,120,95,
+    117,112,95,109,111,100,117,108,101,175,6,0,0,115,34,0,
+    0,0,0,2,10,1,10,1,4,1,4,1,8,1,8,1,
+    12,2,10,1,4,1,14,1,2,1,8,1,8,1,8,1,
+    12,1,14,2,114,76,1,0,0,99,0,0,0,0,0,0,
+    0,0,3,0,0,0,3,0,0,0,67,0,0,0,115,38,
+    0,0,0,116,0,116,1,160,2,161,0,102,2,125,0,116,
+    3,116,4,102,2,125,1,116,5,116,6,102,2,125,2,124,
+    0,124,1,124,2,103,3,83,0,41,1,122,95,82,101,116,
+    117,114,110,115,32,97,32,108,105,115,116,32,111,102,32,102,
+    105,108,101,45,98,97,115,101,100,32,109,111,100,117,108,101,
+    32,108,111,97,100,101,114,115,46,10,10,32,32,32,32,69,
+    97,99,104,32,105,116,101,109,32,105,115,32,97,32,116,117,
+    112,108,101,32,40,108,111,97,100,101,114,44,32,115,117,102,
+    102,105,120,101,115,41,46,10,32,32,32,32,41,7,114,240,
+    0,0,0,114,146,0,0,0,218,18,101,120,116,101,110,115,
+    105,111,110,95,115,117,102,102,105,120,101,115,114,234,0,0,
+    0,114,88,0,0,0,114,239,0,0,0,114,77,0,0,0,
+    41,3,90,10,101,120,116,101,110,115,105,111,110,115,90,6,
+    115,111,117,114,99,101,90,8,98,121,116,101,99,111,100,101,
+    114,3,0,0,0,114,3,0,0,0,114,5,0,0,0,114,
+    166,0,0,0,198,6,0,0,115,8,0,0,0,0,5,12,
+    1,8,1,8,1,114,166,0,0,0,99,1,0,0,0,0,
+    0,0,0,12,0,0,0,9,0,0,0,67,0,0,0,115,
+    156,1,0,0,124,0,97,0,116,0,106,1,97,1,116,0,
+    106,2,97,2,116,1,106,3,116,4,25,0,125,1,120,56,
+    100,1,68,0,93,48,125,2,124,2,116,1,106,3,107,7,
+    114,58,116,0,160,5,124,2,161,1,125,3,110,10,116,1,
+    106,3,124,2,25,0,125,3,116,6,124,1,124,2,124,3,
+    131,3,1,0,113,32,87,0,100,2,100,3,103,1,102,2,
+    100,4,100,5,100,3,103,2,102,2,102,2,125,4,120,118,
+    124,4,68,0,93,102,92,2,125,5,125,6,116,7,100,6,
+    100,7,132,0,124,6,68,0,131,1,131,1,115,142,116,8,
+    130,1,124,6,100,8,25,0,125,7,124,5,116,1,106,3,
+    107,6,114,174,116,1,106,3,124,5,25,0,125,8,80,0,
+    113,112,121,16,116,0,160,5,124,5,161,1,125,8,80,0,
+    87,0,113,112,4,0,116,9,107,10,114,212,1,0,1,0,
+    1,0,119,112,89,0,113,112,88,0,113,112,87,0,116,9,
+    100,9,131,1,130,1,116,6,124,1,100,10,124,8,131,3,
+    1,0,116,6,124,1,100,11,124,7,131,3,1,0,116,6,
+    124,1,100,12,100,13,160,10,124,6,161,1,131,3,1,0,
+    116,0,160,5,100,14,161,1,125,9,116,6,124,1,100,14,
+    124,9,131,3,1,0,116,0,160,5,100,15,161,1,125,10,
+    116,6,124,1,100,15,124,10,131,3,1,0,124,5,100,4,
+    107,2,144,1,114,88,116,0,160,5,100,16,161,1,125,11,
+    116,6,124,1,100,17,124,11,131,3,1,0,116,6,124,1,
+    100,18,116,11,131,0,131,3,1,0,116,12,160,13,116,2,
+    160,14,161,0,161,1,1,0,124,5,100,4,107,2,144,1,
+    114,152,116,15,160,16,100,19,161,1,1,0,100,20,116,12,
+    107,6,144,1,114,152,100,21,116,17,95,18,100,22,83,0,
+    41,23,122,205,83,101,116,117,112,32,116,104,101,32,112,97,
+    116,104,45,98,97,115,101,100,32,105,109,112,111,114,116,101,
+    114,115,32,102,111,114,32,105,109,112,111,114,116,108,105,98,
+    32,98,121,32,105,109,112,111,114,116,105,110,103,32,110,101,
+    101,100,101,100,10,32,32,32,32,98,117,105,108,116,45,105,
+    110,32,109,111,100,117,108,101,115,32,97,110,100,32,105,110,
+    106,101,99,116,105,110,103,32,116,104,101,109,32,105,110,116,
+    111,32,116,104,101,32,103,108,111,98,97,108,32,110,97,109,
+    101,115,112,97,99,101,46,10,10,32,32,32,32,79,116,104,
+    101,114,32,99,111,109,112,111,110,101,110,116,115,32,97,114,
+    101,32,101,120,116,114,97,99,116,101,100,32,102,114,111,109,
+    32,116,104,101,32,99,111,114,101,32,98,111,111,116,115,116,
+    114,97,112,32,109,111,100,117,108,101,46,10,10,32,32,32,
+    32,41,4,114,51,0,0,0,114,62,0,0,0,218,8,98,
+    117,105,108,116,105,110,115,114,142,0,0,0,90,5,112,111,
+    115,105,120,250,1,47,90,2,110,116,250,1,92,99,1,0,
+    0,0,0,0,0,0,2,0,0,0,3,0,0,0,115,0,
+    0,0,115,26,0,0,0,124,0,93,18,125,1,116,0,124,
+    1,131,1,100,0,107,2,86,0,1,0,113,2,100,1,83,
+    0,41,2,114,30,0,0,0,78,41,1,114,32,0,0,0,
+    41,2,114,23,0,0,0,114,80,0,0,0,114,3,0,0,
+    0,114,3,0,0,0,114,5,0,0,0,114,243,0,0,0,
+    234,6,0,0,115,2,0,0,0,4,0,122,25,95,115,101,
+    116,117,112,46,60,108,111,99,97,108,115,62,46,60,103,101,
+    110,101,120,112,114,62,114,61,0,0,0,122,30,105,109,112,
+    111,114,116,108,105,98,32,114,101,113,117,105,114,101,115,32,
+    112,111,115,105,120,32,111,114,32,110,116,114,1,0,0,0,
+    114,26,0,0,0,114,22,0,0,0,114,31,0,0,0,114,
+    68,1,0,0,90,8,95,119,101,97,107,114,101,102,90,6,
+    119,105,110,114,101,103,114,174,0,0,0,114,6,0,0,0,
+    122,4,46,112,121,119,122,6,95,100,46,112,121,100,84,78,
+    41,19,114,118,0,0,0,114,7,0,0,0,114,146,0,0,
+    0,114,255,0,0,0,114,109,0,0,0,90,18,95,98,117,
+    105,108,116,105,110,95,102,114,111,109,95,110,97,109,101,114,
+    113,0,0,0,218,3,97,108,108,114,154,0,0,0,114,103,
+    0,0,0,114,27,0,0,0,114,12,0,0,0,114,245,0,
+    0,0,114,150,0,0,0,114,77,1,0,0,114,88,0,0,
+    0,114,168,0,0,0,114,173,0,0,0,114,177,0,0,0,
+    41,12,218,17,95,98,111,111,116,115,116,114,97,112,95,109,
+    111,100,117,108,101,90,11,115,101,108,102,95,109,111,100,117,
+    108,101,90,12,98,117,105,108,116,105,110,95,110,97,109,101,
+    90,14,98,117,105,108,116,105,110,95,109,111,100,117,108,101,
+    90,10,111,115,95,100,101,116,97,105,108,115,90,10,98,117,
+    105,108,116,105,110,95,111,115,114,22,0,0,0,114,26,0,
+    0,0,90,9,111,115,95,109,111,100,117,108,101,90,13,116,
+    104,114,101,97,100,95,109,111,100,117,108,101,90,14,119,101,
+    97,107,114,101,102,95,109,111,100,117,108,101,90,13,119,105,
+    110,114,101,103,95,109,111,100,117,108,101,114,3,0,0,0,
+    114,3,0,0,0,114,5,0,0,0,218,6,95,115,101,116,
+    117,112,209,6,0,0,115,76,0,0,0,0,8,4,1,6,
+    1,6,3,10,1,10,1,10,1,12,2,10,1,16,3,22,
+    1,14,2,22,1,8,1,10,1,10,1,4,2,2,1,10,
+    1,6,1,14,1,12,2,8,1,12,1,12,1,18,3,10,
+    1,12,3,10,1,12,3,10,1,10,1,12,3,14,1,14,
+    1,10,1,10,1,10,1,114,83,1,0,0,99,1,0,0,
+    0,0,0,0,0,3,0,0,0,4,0,0,0,67,0,0,
+    0,115,76,0,0,0,116,0,124,0,131,1,1,0,116,1,
+    131,0,125,1,116,2,106,3,160,4,116,5,106,6,124,1,
+    142,0,103,1,161,1,1,0,116,7,131,0,125,2,124,2,
+    100,1,107,9,114,60,116,2,106,8,160,9,124,2,161,1,
+    1,0,116,2,106,8,160,9,116,10,161,1,1,0,100,1,
+    83,0,41,2,122,41,73,110,115,116,97,108,108,32,116,104,
+    101,32,112,97,116,104,45,98,97,115,101,100,32,105,109,112,
+    111,114,116,32,99,111,109,112,111,110,101,110,116,115,46,78,
+    41,11,114,83,1,0,0,114,166,0,0,0,114,7,0,0,
+    0,114,16,1,0,0,114,150,0,0,0,114,42,1,0,0,
+    114,57,1,0,0,114,72,1,0,0,218,9,109,101,116,97,
+    95,112,97,116,104,114,168,0,0,0,114,10,1,0,0,41,
+    3,114,82,1,0,0,90,17,115,117,112,112,111,114,116,101,
+    100,95,108,111,97,100,101,114,115,90,14,97,114,99,104,105,
+    118,101,95,102,105,110,100,101,114,114,3,0,0,0,114,3,
+    0,0,0,114,5,0,0,0,218,8,95,105,110,115,116,97,
+    108,108,17,7,0,0,115,14,0,0,0,0,2,8,1,6,
+    1,20,1,6,1,8,1,12,1,114,85,1,0,0,41,1,
+    114,48,0,0,0,41,1,78,41,3,78,78,78,41,2,114,
+    61,0,0,0,114,61,0,0,0,41,1,84,41,1,78,41,
+    1,78,41,1,78,41,76,114,111,0,0,0,114,11,0,0,
+    0,90,37,95,67,65,83,69,95,73,78,83,69,78,83,73,
+    84,73,86,69,95,80,76,65,84,70,79,82,77,83,95,66,
+    89,84,69,83,95,75,69,89,114,10,0,0,0,114,12,0,
+    0,0,114,18,0,0,0,114,20,0,0,0,114,29,0,0,
+    0,114,39,0,0,0,114,40,0,0,0,114,44,0,0,0,
+    114,45,0,0,0,114,47,0,0,0,114,57,0,0,0,218,
+    4,116,121,112,101,218,8,95,95,99,111,100,101,95,95,114,
+    145,0,0,0,114,16,0,0,0,114,131,0,0,0,114,15,
+    0,0,0,114,19,0,0,0,114,213,0,0,0,114,76,0,
+    0,0,114,75,0,0,0,114,88,0,0,0,114,77,0,0,
+    0,90,23,68,69,66,85,71,95,66,89,84,69,67,79,68,
+    69,95,83,85,70,70,73,88,69,83,90,27,79,80,84,73,
+    77,73,90,69,68,95,66,89,84,69,67,79,68,69,95,83,
+    85,70,70,73,88,69,83,114,83,0,0,0,114,89,0,0,
+    0,114,95,0,0,0,114,99,0,0,0,114,101,0,0,0,
+    114,120,0,0,0,114,127,0,0,0,114,135,0,0,0,114,
+    139,0,0,0,114,141,0,0,0,114,148,0,0,0,114,153,
+    0,0,0,114,155,0,0,0,114,160,0,0,0,218,6,111,
+    98,106,101,99,116,114,167,0,0,0,114,172,0,0,0,114,
+    173,0,0,0,114,188,0,0,0,114,198,0,0,0,114,216,
+    0,0,0,114,234,0,0,0,114,239,0,0,0,114,245,0,
+    0,0,114,240,0,0,0,114,246,0,0,0,114,8,1,0,
+    0,114,10,1,0,0,114,34,1,0,0,114,35,1,0,0,
+    114,33,1,0,0,114,39,1,0,0,114,40,1,0,0,114,
+    38,1,0,0,114,30,1,0,0,114,32,1,0,0,114,37,
+    1,0,0,114,211,0,0,0,114,42,1,0,0,114,63,1,
+    0,0,114,62,1,0,0,114,59,1,0,0,114,61,1,0,
+    0,114,72,1,0,0,114,76,1,0,0,114,166,0,0,0,
+    114,83,1,0,0,114,85,1,0,0,114,3,0,0,0,114,
+    3,0,0,0,114,3,0,0,0,114,5,0,0,0,218,8,
+    60,109,111,100,117,108,101,62,8,0,0,0,115,148,0,0,
+    0,4,15,4,1,4,1,2,1,6,3,8,17,8,5,8,
+    5,8,6,8,12,8,10,8,9,8,5,8,7,10,22,10,
+    127,0,5,16,1,12,2,4,1,4,2,6,2,6,2,8,
+    2,16,45,8,34,8,19,8,12,8,12,8,28,8,17,8,
+    33,8,28,8,24,10,13,10,10,10,11,8,14,6,3,4,
+    1,14,67,14,64,14,29,16,127,0,33,14,68,18,45,18,
+    26,4,3,18,53,14,60,14,42,14,127,0,9,4,1,4,
+    1,4,2,4,1,4,1,4,3,10,14,8,20,8,21,8,
+    20,14,127,0,45,4,1,4,3,18,27,14,79,8,17,10,
+    23,8,11,8,64,
 };
@@ -37,6 +37,12 @@ LATENCY_DURATION = 2.0
 BANDWIDTH_PACKET_SIZE = 1024
 BANDWIDTH_DURATION = 2.0
 
+SCALING_DURATION = 1.0
+SCALING_IO_WAIT = 0.001
+SCALING_PAYLOAD_SIZES = [1024, 1024 * 1024]
+SCALING_BACKENDS = ["thread", "process", "pool", "asyncio"]
+WAKEUP_INTERVAL = 0.001
+
 
 def task_pidigits():
     """Pi calculation (Python)"""
@@ -131,6 +137,10 @@ def task_hashing():
         hashlib.sha1(s).digest()
     return compute, (arg, )
 
+def task_io_wait():
+    """I/O wait"""
+    return time.sleep, (SCALING_IO_WAIT, )
+
 
 throughput_tasks = [task_pidigits, task_regex]
 for mod in 'bz2', 'hashlib':
@@ -151,6 +161,8 @@ else:
 
 latency_tasks = throughput_tasks
 bandwidth_tasks = [task_pidigits]
+# A task holding the GIL, a task releasing it and a task waiting for I/O
+scaling_tasks = [task_pidigits, throughput_tasks[-1], task_io_wait]
 
 
 class TimedLoop:
@@ -527,6 +539,194 @@ def run_bandwidth_tests(max_threads):
         print()
 
 
+_scaling_funcs = {}
+
+def scaling_job(task, payload):
+    """Run a task once in a worker and send the payload back."""
+    try:
+        func, args = _scaling_funcs[task]
+    except KeyError:
+        func, args = _scaling_funcs[task] = task()
+    func(*args)
+    return payload
+
+class WakeupMonitor(threading.Thread):
+    """Measure how late a thread of the parent process wakes up from short
+    sleeps.  A thread wanting the GIL waits for the holder to release it,
+    up to the switch interval: the lateness indicates the GIL contention."""
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.delays = []
+        self.stop = threading.Event()
+
+    def run(self):
+        _time = time.perf_counter
+        _sleep = time.sleep
+        delays = self.delays
+        while not self.stop.is_set():
+            t = _time()
+            _sleep(WAKEUP_INTERVAL)
+            delays.append(_time() - t - WAKEUP_INTERVAL)
+
+def _run_executor(submit, task, payload, workers, duration):
+    # Keep twice as many jobs as workers in flight, so that the workers
+    # never wait for the parent, and count the jobs completed before the
+    # deadline.
+    from concurrent.futures import wait, FIRST_COMPLETED
+    _time = time.perf_counter
+    futures = set(submit(scaling_job, task, payload)
+                  for i in range(2 * workers))
+    njobs = 0
+    start_time = end_time = _time()
+    deadline = start_time + duration
+    while end_time < deadline:
+        finished, futures = wait(futures, return_when=FIRST_COMPLETED)
+        end_time = _time()
+        for future in finished:
+            future.result()
+            njobs += 1
+            futures.add(submit(scaling_job, task, payload))
+    wait(futures)
+    return njobs, end_time - start_time
+
+def _pool_submit(pool):
+    from concurrent.futures import Future
+    def submit(func, *args):
+        future = Future()
+        pool.apply_async(func, args, callback=future.set_result,
+                         error_callback=future.set_exception)
+        return future
+    return submit
+
+def _run_asyncio(task, payload, workers, duration):
+    # The jobs are chained with callbacks rather than written as coroutines
+    # to keep this file importable by Python 2.  At most 'workers' jobs are
+    # in flight: the I/O waits overlap, the other tasks block the event loop.
+    import asyncio
+    loop = asyncio.new_event_loop()
+    _time = time.perf_counter
+    func, args = task()
+    state = {'njobs': 0, 'active': 0}
+    all_done = loop.create_future()
+
+    def start_job():
+        state['active'] += 1
+        future = loop.create_future()
+        if task is task_io_wait:
+            loop.call_later(SCALING_IO_WAIT, future.set_result, payload)
+        else:
+            func(*args)
+            future.set_result(payload)
+        future.add_done_callback(job_done)
+
+    def job_done(future):
+        future.result()
+        state['njobs'] += 1
+        state['active'] -= 1
+        state['end_time'] = _time()
+        if state['end_time'] < deadline:
+            start_job()
+        elif not state['active']:
+            all_done.set_result(None)
+
+    try:
+        start_time = _time()
+        deadline = start_time + duration
+        for i in range(workers):
+            start_job()
+        loop.run_until_complete(all_done)
+    finally:
+        loop.close()
+    return state['njobs'], state['end_time'] - start_time
+
+def run_scaling_test(backend, task, payload_size, workers):
+    payload = b'x' * payload_size
+    duration = SCALING_DURATION
+    monitor = WakeupMonitor()
+    executor = None
+    if backend == "thread":
+        from concurrent.futures import ThreadPoolExecutor
+        executor = ThreadPoolExecutor(workers)
+        submit = executor.submit
+    elif backend == "process":
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(workers)
+        submit = executor.submit
+    elif backend == "pool":
+        import multiprocessing
+        executor = multiprocessing.Pool(workers)
+        submit = _pool_submit(executor)
+    elif backend != "asyncio":
+        raise ValueError("unknown backend: %r" % backend)
+    try:
+        if executor is not None:
+            # Warm up: start the workers before the measurement
+            _run_executor(submit, task, payload, workers, 0.0)
+        cpu_time = time.process_time()
+        monitor.start()
+        if executor is not None:
+            njobs, elapsed = _run_executor(submit, task, payload, workers,
+                                           duration)
+        else:
+            njobs, elapsed = _run_asyncio(task, payload, workers, duration)
+        monitor.stop.set()
+        monitor.join()
+        cpu_time = time.process_time() - cpu_time
+    finally:
+        if backend == "pool":
+            executor.terminate()
+            executor.join()
+        elif executor is not None:
+            executor.shutdown()
+    delays = monitor.delays or [0.0]
+    return {
+        'task': task.__doc__,
+        'backend': backend,
+        'payload_size': payload_size,
+        'workers': workers,
+        'jobs_per_sec': njobs / elapsed,
+        # The CPU time of the parent only: it is capped to a single CPU by
+        # the GIL for the thread and asyncio backends, and is the cost of
+        # dispatching the jobs for the process ones.
+        'parent_cpu': cpu_time / elapsed,
+        'wakeup_avg': sum(delays) / len(delays),
+        'wakeup_max': max(delays),
+    }
+
+def run_scaling_tests(backends, workers_list, payload_sizes):
+    results = []
+    for task in scaling_tasks:
+        for payload_size in payload_sizes:
+            print("%s, payload of %d bytes" % (task.__doc__, payload_size))
+            print()
+            for backend in backends:
+                baseline = None
+                for workers in workers_list:
+                    result = run_scaling_test(backend, task, payload_size,
+                                              workers)
+                    speed = result['jobs_per_sec']
+                    if baseline is None:
+                        baseline = (speed, workers)
+                    speedup = speed / baseline[0]
+                    result['speedup'] = speedup
+                    result['efficiency'] = speedup * baseline[1] / workers
+                    results.append(result)
+                    print("%s workers=%d: %d jobs/s." % (backend, workers,
+                                                         speed), end="")
+                    print(" ( %d %%, efficiency %d %%)"
+                          % (speedup * 100, result['efficiency'] * 100),
+                          end="")
+                    print(" parent CPU %.2f, wakeup latency %.2f ms"
+                          " (max: %.2f ms)"
+                          % (result['parent_cpu'],
+                             result['wakeup_avg'] * 1000,
+                             result['wakeup_max'] * 1000))
+                print()
+    return results
+
+
 def main():
     usage = "usage: %prog [-h|--help] [options]"
     parser = OptionParser(usage=usage)
@@ -539,6 +739,30 @@ def main():
     parser.add_option("-b", "--bandwidth",
                       action="store_true", dest="bandwidth", default=False,
                       help="run I/O bandwidth tests")
+    parser.add_option("-s", "--scaling",
+                      action="store_true", dest="scaling", default=False,
+                      help="run scaling tests of threads, processes and "
+                           "asyncio (not run by default)")
+    parser.add_option("", "--backends",
+                      action="store", dest="backends",
+                      default=",".join(SCALING_BACKENDS),
+                      help="comma-separated backends of the scaling tests "
+                           "(default: %default)")
+    parser.add_option("", "--workers",
+                      action="store", dest="workers", default=None,
+                      help="comma-separated numbers of workers of the "
+                           "scaling tests (default: powers of 2 up to the "
+                           "number of CPUs)")
+    parser.add_option("", "--payload-sizes",
+                      action="store", dest="payload_sizes",
+                      default=",".join(map(str, SCALING_PAYLOAD_SIZES)),
+                      help="comma-separated sizes in bytes of the data sent "
+                           "to and back from the jobs of the scaling tests "
+                           "(default: %default)")
+    parser.add_option("", "--json",
+                      action="store", dest="json_file", default=None,
+                      help="write the results of the scaling tests to a "
+                           "JSON file")
     parser.add_option("-i", "--interval",
                       action="store", type="int", dest="check_interval", default=None,
                       help="sys.setcheckinterval() value")
@@ -571,7 +795,20 @@ def main():
         bandwidth_client(**kwargs)
         return
 
-    if not options.throughput and not options.latency and not options.bandwidth:
+    if options.scaling:
+        backends = options.backends.split(",")
+        for backend in backends:
+            if backend not in SCALING_BACKENDS:
+                parser.error("unknown backend: %r" % backend)
+        if options.workers:
+            workers_list = [int(n) for n in options.workers.split(",")]
+        else:
+            workers_list = [1]
+            while workers_list[-1] * 2 <= max(os.cpu_count() or 1, 4):
+                workers_list.append(workers_list[-1] * 2)
+        payload_sizes = [int(n) for n in options.payload_sizes.split(",")]
+    elif (not options.throughput and not options.latency
+          and not options.bandwidth):
         options.throughput = options.latency = options.bandwidth = True
     if options.check_interval:
         sys.setcheckinterval(options.check_interval)
@@ -607,5 +844,14 @@ def main():
         print()
         run_bandwidth_tests(options.nthreads)
 
+    if options.scaling:
+        print("--- Scaling ---")
+        print()
+        results = run_scaling_tests(backends, workers_list, payload_sizes)
+        if options.json_file:
+            import json
+            with open(options.json_file, "w") as f:
+                json.dump(results, f, indent=2)
+
 if __name__ == "__main__":
     main()
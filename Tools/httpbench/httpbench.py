@@ -0,0 +1,162 @@
+"""Load test comparing asyncio.httpstreams with http.server.
+
+A server is started in a child process, either the asyncio HTTP server
+or http.server.ThreadingHTTPServer, and loaded by a number of concurrent
+keep-alive clients (asyncio.httpstreams connections) for a fixed duration.
+The throughput and the latency percentiles are reported for each server.
+
+"""
+import asyncio
+import http.server
+import json
+import subprocess
+import sys
+import time
+from asyncio import httpstreams
+
+
+SERVERS = ('asyncio', 'threading')
+
+
+# Servers
+
+def _body(path, size):
+    return b'x' * size if path.startswith('/data') else path.encode('ascii')
+
+
+def serve_asyncio(size):
+    async def handler(request, response):
+        await request.read()
+        body = _body(request.path, size)
+        response.send_response(200)
+        response.send_header('Content-Length', str(len(body)))
+        response.end_headers()
+        await response.write(body)
+
+    loop = asyncio.get_event_loop()
+    server = loop.run_until_complete(
+        httpstreams.start_http_server(handler, '127.0.0.1', 0))
+    print(server.sockets[0].getsockname()[1], flush=True)
+    loop.run_forever()
+
+
+def serve_threading(size):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # the head and the body are written separately: avoid waiting for
+        # delayed ACKs of the client between them
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            body = _body(self.path, size)
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    print(server.server_address[1], flush=True)
+    server.serve_forever()
+
+
+# Load generator
+
+async def client(port, path, deadline, latencies):
+    conn = await httpstreams.open_http_connection('127.0.0.1', port)
+    try:
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            response = await conn.request('GET', path)
+            await response.read()
+            latencies.append(time.perf_counter() - t0)
+    finally:
+        conn.close()
+
+
+def percentile(sorted_values, fraction):
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run(server, concurrency, duration, size):
+    proc = subprocess.Popen([sys.executable, __file__, '--serve', server,
+                             '--size', str(size)],
+                            stdout=subprocess.PIPE)
+    try:
+        port = int(proc.stdout.readline())
+        path = '/data' if size else '/'
+        latencies = []
+        loop = asyncio.new_event_loop()
+        try:
+            deadline = time.perf_counter() + duration
+            loop.run_until_complete(asyncio.gather(
+                *[client(port, path, deadline, latencies)
+                  for i in range(concurrency)], loop=loop))
+        finally:
+            loop.close()
+    finally:
+        proc.kill()
+        proc.wait()
+        proc.stdout.close()
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'requests_per_sec': len(latencies) / duration,
+        'latency_median_ms': percentile(latencies, 0.5) * 1e3,
+        'latency_p90_ms': percentile(latencies, 0.9) * 1e3,
+        'latency_p99_ms': percentile(latencies, 0.99) * 1e3,
+    }
+
+
+def main(options):
+    results = {}
+    print("Server      Concurrency  Requests/s  Median ms    P90 ms    P99 ms")
+    for server in options.servers:
+        for concurrency in options.concurrency:
+            result = run(server, concurrency, options.duration, options.size)
+            results['%s/%d' % (server, concurrency)] = result
+            print("{:10s}  {:11d}  {:10,.0f}  {:9.2f}  {:8.2f}  {:8.2f}".format(
+                server, concurrency, result['requests_per_sec'],
+                result['latency_median_ms'], result['latency_p90_ms'],
+                result['latency_p99_ms']))
+            sys.stdout.flush()
+    if options.dest_file:
+        with options.dest_file:
+            json.dump(results, options.dest_file, indent=2)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--serve', choices=SERVERS, help=argparse.SUPPRESS)
+    parser.add_argument('-s', '--server', dest='servers', action='append',
+                        choices=SERVERS,
+                        help='server to benchmark (default: all)')
+    parser.add_argument('-c', '--concurrency', type=int, action='append',
+                        help='number of concurrent client connections '
+                             '(default: 1, 10 and 50)')
+    parser.add_argument('-d', '--duration', type=float, default=3.0,
+                        help='duration of each run in seconds')
+    parser.add_argument('--size', type=int, default=0,
+                        help='size of the response bodies in bytes '
+                             '(default: echo the short request path)')
+    parser.add_argument('-w', '--write', dest='dest_file',
+                        type=argparse.FileType('w'),
+                        help='file to write the results to, as JSON')
+    options = parser.parse_args()
+    if options.serve:
+        try:
+            if options.serve == 'asyncio':
+                serve_asyncio(options.size)
+            else:
+                serve_threading(options.size)
+        except KeyboardInterrupt:
+            pass
+        sys.exit()
+    options.servers = options.servers or list(SERVERS)
+    options.concurrency = options.concurrency or [1, 10, 50]
+    main(options)
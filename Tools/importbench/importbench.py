@@ -5,16 +5,22 @@ thus has no external changes made to import-related attributes in sys.
 
 """
 from test.test_importlib import util
+import codecs
 import decimal
+import contextlib
 import imp
 import importlib
 import importlib.machinery
+from importlib import _bootstrap_external
 import json
 import os
 import py_compile
 import sys
 import tabnanny
+import tempfile
 import timeit
+import zipfile
+import zipimport
 
 
 def bench(name, cleanup=lambda: None, *, seconds=1, repeat=3):
@@ -162,6 +168,98 @@ tabnanny_using_bytecode = _using_bytecode(tabnanny)
 decimal_using_bytecode = _using_bytecode(decimal)
 
 
+@contextlib.contextmanager
+def _pyc_manifest(*sources):
+    """Trust the bytecode of sources as a pyc manifest (-X pycmanifest)."""
+    old_manifest = _bootstrap_external._pyc_manifest
+    _bootstrap_external._pyc_manifest = frozenset(
+        imp.cache_from_source(source) for source in sources)
+    try:
+        yield
+    finally:
+        _bootstrap_external._pyc_manifest = old_manifest
+
+
+def source_using_trusted_bytecode(seconds, repeat):
+    """Source w/ trusted bytecode: small"""
+    name = '__importlib_test_benchmark__'
+    with util.create_modules(name) as mapping:
+        sys.meta_path.append(importlib.machinery.PathFinder)
+        loader = (importlib.machinery.SourceFileLoader,
+                  importlib.machinery.SOURCE_SUFFIXES)
+        sys.path_hooks.append(importlib.machinery.FileFinder.path_hook(loader))
+        py_compile.compile(mapping[name])
+        assert os.path.exists(imp.cache_from_source(mapping[name]))
+        with _pyc_manifest(mapping[name]):
+            yield from bench(name, lambda: sys.modules.pop(name),
+                             repeat=repeat, seconds=seconds)
+
+
+def _using_trusted_bytecode(module):
+    name = module.__name__
+    def using_trusted_bytecode_benchmark(seconds, repeat):
+        """Source w/ trusted bytecode: {}"""
+        py_compile.compile(module.__file__)
+        with _pyc_manifest(module.__file__):
+            yield from bench(name, lambda: sys.modules.pop(name),
+                             repeat=repeat, seconds=seconds)
+
+    using_trusted_bytecode_benchmark.__doc__ = (
+                    using_trusted_bytecode_benchmark.__doc__.format(name))
+    return using_trusted_bytecode_benchmark
+
+tabnanny_using_trusted_bytecode = _using_trusted_bytecode(tabnanny)
+decimal_using_trusted_bytecode = _using_trusted_bytecode(decimal)
+
+
+@contextlib.contextmanager
+def _zip_archive(count):
+    """Import from a zip archive of count compiled modules, as a zipapp
+    deployment would, and yield the archive path and the module names."""
+    names = ['__importlib_test_zip{}__'.format(i) for i in range(count)]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        archive = os.path.join(temp_dir, 'modules.zip')
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for name in names:
+                source = 'attr = {!r}\n'.format(name) * 20
+                code = compile(source, name + '.py', 'exec')
+                data = _bootstrap_external._code_to_hash_pyc(
+                    code, bytes(8), checked=False)
+                zf.writestr(name + '.pyc', data)
+        # zipimport decodes the member names with cp437, which can't be
+        # imported once sys.meta_path is replaced
+        codecs.lookup('cp437')
+        with util.import_state(meta_path=[importlib.machinery.PathFinder],
+                               path_hooks=[zipimport.zipimporter],
+                               path=[archive]):
+            try:
+                yield archive, names
+            finally:
+                zipimport._zip_directory_cache.clear()
+                for name in names:
+                    sys.modules.pop(name, None)
+
+
+def zip_archive_small(seconds, repeat):
+    """Zip archive: small"""
+    with _zip_archive(1) as (archive, names):
+        name = names[0]
+        yield from bench(name, lambda: sys.modules.pop(name), repeat=repeat,
+                         seconds=seconds)
+
+
+def zip_archive_first_import(seconds, repeat):
+    """Zip archive: first import from 5000 modules"""
+    with _zip_archive(5000) as (archive, names):
+        name = names[-1]
+        def cleanup():
+            # Forget the archive, as a freshly started process would
+            sys.modules.pop(name)
+            sys.path_importer_cache.clear()
+            zipimport._zip_directory_cache.clear()
+        yield from bench(name, cleanup, repeat=repeat, seconds=seconds)
+
+
 def main(import_, options):
     if options.source_file:
         with options.source_file:
@@ -172,10 +270,14 @@ def main(import_, options):
     benchmarks = (from_cache, builtin_mod,
                   source_writing_bytecode,
                   source_wo_bytecode, source_using_bytecode,
+                  source_using_trusted_bytecode,
                   tabnanny_writing_bytecode,
                   tabnanny_wo_bytecode, tabnanny_using_bytecode,
+                  tabnanny_using_trusted_bytecode,
                   decimal_writing_bytecode,
                   decimal_wo_bytecode, decimal_using_bytecode,
+                  decimal_using_trusted_bytecode,
+                  zip_archive_small, zip_archive_first_import,
                 )
     if options.benchmark:
         for b in benchmarks:
@@ -0,0 +1,372 @@
+"""Benchmark the hot paths of commonly used stdlib modules.
+
+Each benchmark is a function setting up its data and returning the callable
+to time.  The callables are timed by timeit.repeat_in_processes(), in fresh
+processes run one after the other, so that a benchmark does not depend on
+the state left by the others.  The results can be written to a JSON file
+and compared with the results of a previous run, for example of another
+build, to detect the regressions of the modules.
+
+"""
+import io
+import json
+import os
+import platform
+import sys
+import timeit
+
+
+# Benchmarks
+
+def _document():
+    return [{'id': i,
+             'name': 'item %d' % i,
+             'price': i * 1.25,
+             'tags': ['alpha', 'beta', 'gamma'][:i % 4],
+             'available': bool(i % 2),
+             'parent': None}
+            for i in range(100)]
+
+
+def json_dumps():
+    """json.dumps() of 100 records"""
+    import json
+    document = _document()
+    return lambda: json.dumps(document)
+
+
+def json_loads():
+    """json.loads() of 100 records"""
+    import json
+    text = json.dumps(_document())
+    return lambda: json.loads(text)
+
+
+def pickle_dumps():
+    """pickle.dumps() of 100 records"""
+    import pickle
+    document = _document()
+    return lambda: pickle.dumps(document, pickle.HIGHEST_PROTOCOL)
+
+
+def pickle_loads():
+    """pickle.loads() of 100 records"""
+    import pickle
+    data = pickle.dumps(_document(), pickle.HIGHEST_PROTOCOL)
+    return lambda: pickle.loads(data)
+
+
+_EMAIL_PATTERN = r'[\w.+-]+@[\w-]+\.[\w.-]+'
+
+
+def re_compile():
+    """re.compile() of a pattern missing the cache"""
+    import re
+    def run():
+        re.purge()
+        re.compile(_EMAIL_PATTERN)
+    return run
+
+
+def re_findall():
+    """Pattern.findall() on 10 kB of text"""
+    import re
+    pattern = re.compile(_EMAIL_PATTERN)
+    text = ('Lorem ipsum dolor sit amet, contact: user%d@example.org; '
+            * 20 % tuple(range(20))) * 10
+    return lambda: pattern.findall(text)
+
+
+def re_sub():
+    """Pattern.sub() with a function on 10 kB of text"""
+    import re
+    pattern = re.compile(r'\b(\w)(\w*)\b')
+    text = 'the quick brown fox jumps over the lazy dog ' * 230
+    repl = lambda m: m.group(1).upper() + m.group(2)
+    return lambda: pattern.sub(repl, text)
+
+
+def asyncio_echo():
+    """asyncio streams, 100 round trips of 1 kB over a TCP connection"""
+    import asyncio
+    import atexit
+    loop = asyncio.new_event_loop()
+    closed = loop.create_future()
+
+    async def handle(reader, writer):
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            writer.write(data)
+        writer.close()
+        closed.set_result(None)
+
+    server = loop.run_until_complete(
+        asyncio.start_server(handle, '127.0.0.1', 0, loop=loop))
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = loop.run_until_complete(
+        asyncio.open_connection('127.0.0.1', port, loop=loop))
+    message = b'x' * 1024
+
+    async def echo():
+        for i in range(100):
+            writer.write(message)
+            await reader.readexactly(len(message))
+
+    def close():
+        writer.close()
+        server.close()
+        loop.run_until_complete(closed)
+        loop.close()
+
+    atexit.register(close)
+    return lambda: loop.run_until_complete(echo())
+
+
+def http_server():
+    """http.server and http.client, 10 keep-alive GET requests"""
+    import http.client
+    import http.server
+    import threading
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # the head and the body are written separately: avoid waiting for
+        # delayed ACKs of the client between them
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            body = b'x' * 1024
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    conn = http.client.HTTPConnection(*server.server_address)
+
+    def run():
+        for i in range(10):
+            conn.request('GET', '/')
+            conn.getresponse().read()
+    return run
+
+
+class _NullStream:
+    def write(self, s):
+        pass
+
+    def flush(self):
+        pass
+
+
+def _logger(level):
+    import logging
+    logger = logging.Logger('stdlibbench', level)
+    handler = logging.StreamHandler(_NullStream())
+    handler.setFormatter(logging.Formatter(
+        '%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    logger.addHandler(handler)
+    return logger
+
+
+def logging_format():
+    """Logger.info() of 100 records formatted to a stream"""
+    logger = _logger('INFO')
+    def run():
+        for i in range(100):
+            logger.info('message %d: %s', i, 'text')
+    return run
+
+
+def logging_silent():
+    """Logger.debug() of 100 records below the level of the logger"""
+    logger = _logger('INFO')
+    def run():
+        for i in range(100):
+            logger.debug('message %d: %s', i, 'text')
+    return run
+
+
+def _rows():
+    return [[i, 'name %d' % i, i * 1.25, 'a "quoted" value', 'x,y', '']
+            for i in range(100)]
+
+
+def csv_writer():
+    """csv.writer().writerows() of 100 rows"""
+    import csv
+    rows = _rows()
+    return lambda: csv.writer(io.StringIO()).writerows(rows)
+
+
+def csv_reader():
+    """csv.reader() of 100 rows"""
+    import csv
+    stream = io.StringIO()
+    csv.writer(stream).writerows(_rows())
+    lines = stream.getvalue().splitlines(True)
+    return lambda: list(csv.reader(lines))
+
+
+def decimal_arith():
+    """decimal, sum of 100 squares quantized to 4 places"""
+    from decimal import Decimal
+    values = [Decimal(i) / 7 for i in range(1, 101)]
+    exponent = Decimal('0.0001')
+    def run():
+        total = Decimal(0)
+        for value in values:
+            total += value * value
+        return total.quantize(exponent)
+    return run
+
+
+_IMPORTED_MODULES = ('asyncio', 'decimal', 'email.message', 'http.client',
+                     'json', 'logging', 'pickle', 're', 'csv', 'subprocess')
+
+
+def _python(code):
+    import subprocess
+    args = [sys.executable, '-I', '-c', code]
+    return lambda: subprocess.run(args, check=True)
+
+
+def startup():
+    """Startup of a Python process doing nothing"""
+    return _python('pass')
+
+
+def import_time():
+    """Startup of a Python process importing the benchmarked modules"""
+    return _python('import ' + ', '.join(_IMPORTED_MODULES))
+
+
+BENCHMARKS = (json_dumps, json_loads, pickle_dumps, pickle_loads,
+              re_compile, re_findall, re_sub, asyncio_echo, http_server,
+              logging_format, logging_silent, csv_writer, csv_reader,
+              decimal_arith, startup, import_time)
+
+
+# Runner
+
+_prepared = {}
+
+
+def prepare(name):
+    """Return the callable of a benchmark, set up once per process."""
+    # Timer runs the setup before each timing: reuse the servers and the
+    # connections of the previous timings.
+    try:
+        return _prepared[name]
+    except KeyError:
+        func = _prepared[name] = globals()[name]()
+        return func
+
+
+def run(benchmark, processes, repeat, warmup):
+    """Return the list of the timings of a single call of the benchmark."""
+    setup = ('import sys; sys.path.insert(0, %r); import stdlibbench; '
+             'run = stdlibbench.prepare(%r)'
+             % (os.path.dirname(os.path.abspath(__file__)),
+                benchmark.__name__))
+    number, timings = timeit.repeat_in_processes(
+        'run()', setup, processes=processes, repeat=repeat, warmup=warmup)
+    return [timing / number for timing in timings]
+
+
+def format_time(dt):
+    for unit, scale in (('sec', 1.0), ('ms', 1e-3), ('us', 1e-6),
+                        ('ns', 1e-9)):
+        if dt >= scale:
+            break
+    return '%.3g %s' % (dt / scale, unit)
+
+
+def compare(old, new):
+    """Return the change from old to new statistics as a string."""
+    # Welch's t-test on the means, as done by "python -m timeit --compare"
+    t, ratio = timeit.compare(old, new)
+    if abs(t) < 2.0:
+        return 'not significant'
+    if ratio >= 1.0:
+        return '%.2fx faster' % ratio
+    return '%.2fx slower' % (1.0 / ratio)
+
+
+def main(options):
+    benchmarks = BENCHMARKS
+    if options.benchmarks:
+        names = {benchmark.__name__: benchmark for benchmark in BENCHMARKS}
+        unknown = [name for name in options.benchmarks if name not in names]
+        if unknown:
+            print('Unknown benchmark: {}'.format(', '.join(unknown)),
+                  file=sys.stderr)
+            sys.exit(1)
+        benchmarks = [names[name] for name in options.benchmarks]
+    if options.list:
+        for benchmark in benchmarks:
+            print('{:16} {}'.format(benchmark.__name__, benchmark.__doc__))
+        return
+    if options.source_file:
+        with options.source_file:
+            prev_results = json.load(options.source_file)['benchmarks']
+    else:
+        prev_results = {}
+
+    print('{} processes x {} timings per benchmark, {} warmup'.format(
+          options.processes, options.repeat, options.warmup))
+    new_results = {}
+    for benchmark in benchmarks:
+        name = benchmark.__name__
+        timings = run(benchmark, options.processes, options.repeat,
+                      options.warmup)
+        stats = timeit.summarize(timings)
+        new_results[name] = {'timings': timings, 'stats': stats}
+        line = '{:16} {:>10} +- {:<10}'.format(
+               name, format_time(stats['median']), format_time(stats['stdev']))
+        if name in prev_results:
+            old = prev_results[name]['stats']
+            line += ' {:>10} -> {:>10}: {}'.format(
+                    format_time(old['median']), format_time(stats['median']),
+                    compare(old, stats))
+        print(line, flush=True)
+
+    if options.dest_file:
+        with options.dest_file:
+            json.dump({'python': sys.version,
+                       'platform': platform.platform(),
+                       'benchmarks': new_results},
+                      options.dest_file, indent=2)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('benchmarks', nargs='*', metavar='benchmark',
+                        help='benchmarks to run (default: all)')
+    parser.add_argument('-l', '--list', action='store_true',
+                        help='list the benchmarks and exit')
+    parser.add_argument('-p', '--processes', type=int, default=3,
+                        help='number of processes per benchmark '
+                             '(default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of timings per process '
+                             '(default: %(default)s)')
+    parser.add_argument('--warmup', type=int, default=1,
+                        help='number of discarded timings per process '
+                             '(default: %(default)s)')
+    parser.add_argument('-r', '--read', dest='source_file',
+                        type=argparse.FileType('r'),
+                        help='file to read benchmark data from to compare '
+                             'against')
+    parser.add_argument('-w', '--write', dest='dest_file',
+                        type=argparse.FileType('w'),
+                        help='file to write benchmark data to')
+    main(parser.parse_args())